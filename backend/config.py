@@ -69,3 +69,52 @@ RATE_LIMIT_AUTH = os.environ.get('RATE_LIMIT_AUTH', '5/minute')  # 5 requests pe
 
 # Frontend URL (for email links)
 FRONTEND_URL = os.environ.get('FRONTEND_URL', 'https://go.leaderlix.com')
+
+# Query Instrumentation (per-request MongoDB command stats)
+QUERY_INSTRUMENTATION_ENABLED = os.environ.get('QUERY_INSTRUMENTATION_ENABLED', 'true').lower() == 'true'
+SLOW_REQUEST_MS = int(os.environ.get('SLOW_REQUEST_MS', '500'))  # Requests slower than this go to the slow log
+QUERY_COUNT_ALERT_THRESHOLD = int(os.environ.get('QUERY_COUNT_ALERT_THRESHOLD', '50'))  # Alert when a request issues more queries
+SLOW_REQUEST_BUFFER_SIZE = int(os.environ.get('SLOW_REQUEST_BUFFER_SIZE', '200'))  # Ring buffer size for slow requests / alerts
+
+# Response cache for public website / blog / LMS endpoints (services/response_cache.py)
+RESPONSE_CACHE_ENABLED = os.environ.get('RESPONSE_CACHE_ENABLED', 'true').lower() == 'true'
+RESPONSE_CACHE_MAX_ENTRIES = int(os.environ.get('RESPONSE_CACHE_MAX_ENTRIES', '500'))  # LRU bound (entries are keyed by path + query)
+
+# Google Calendar local event cache (services/calendar_sync.py)
+CALENDAR_SYNC_INTERVAL_MINUTES = int(os.environ.get('CALENDAR_SYNC_INTERVAL_MINUTES', '5'))  # Incremental syncToken sync cadence
+CALENDAR_SYNC_MAX_STALENESS_MINUTES = int(os.environ.get('CALENDAR_SYNC_MAX_STALENESS_MINUTES', '15'))  # Readers sync inline if the cache is older
+CALENDAR_SYNC_PAST_DAYS = int(os.environ.get('CALENDAR_SYNC_PAST_DAYS', '7'))  # Events that ended longer ago are pruned
+
+# Contact duplicate candidates cache (services/contact_dedup.py)
+CONTACT_DEDUP_INTERVAL_MINUTES = int(os.environ.get('CONTACT_DEDUP_INTERVAL_MINUTES', '15'))  # Incremental update cadence (contacts changed since last run)
+CONTACT_DEDUP_NAME_THRESHOLD = int(os.environ.get('CONTACT_DEDUP_NAME_THRESHOLD', '80'))  # Min rapidfuzz name score (0-100) within a company block
+CONTACT_DEDUP_MAX_KEY_BLOCK = int(os.environ.get('CONTACT_DEDUP_MAX_KEY_BLOCK', '25'))  # Larger email/phone/LinkedIn blocks are shared switchboards, not duplicates
+CONTACT_DEDUP_INCREMENTAL_MAX_CONTACTS = int(os.environ.get('CONTACT_DEDUP_INCREMENTAL_MAX_CONTACTS', '5000'))  # Bigger neighbourhoods fall back to a full refresh
+
+# Hot timestamp fields stored as BSON dates (services/timestamp_migration.py)
+TIMESTAMP_MIGRATION_BATCH_SIZE = int(os.environ.get('TIMESTAMP_MIGRATION_BATCH_SIZE', '1000'))  # Documents per bulk write when converting ISO strings
+EMAIL_QUEUE_SENT_RETENTION_DAYS = int(os.environ.get('EMAIL_QUEUE_SENT_RETENTION_DAYS', '90'))  # TTL for sent email / WhatsApp queue items
+MESSAGE_LOG_RETENTION_DAYS = int(os.environ.get('MESSAGE_LOG_RETENTION_DAYS', '365'))  # TTL for email_logs / whatsapp_logs
+SCRAPING_LOG_RETENTION_DAYS = int(os.environ.get('SCRAPING_LOG_RETENTION_DAYS', '180'))  # TTL for scraping_logs
+
+# Counter-backed dashboard statistics (services/stats_counters.py)
+STATS_RECONCILE_INTERVAL_MINUTES = int(os.environ.get('STATS_RECONCILE_INTERVAL_MINUTES', '15'))  # Recompute counters from the collections
+STATS_DAILY_WINDOW_DAYS = int(os.environ.get('STATS_DAILY_WINDOW_DAYS', '35'))  # Days of per-day email outcome counters rebuilt by each reconciliation
+
+# Keyset pagination for contact / company / content lists (utils/pagination.py)
+PAGINATION_TOTAL_CACHE_SECONDS = int(os.environ.get('PAGINATION_TOTAL_CACHE_SECONDS', '60'))  # List totals are reused per filter for this long
+PAGINATION_TOTAL_CACHE_MAX_ENTRIES = int(os.environ.get('PAGINATION_TOTAL_CACHE_MAX_ENTRIES', '1000'))  # LRU bound (entries are keyed by collection + filter hash)
+
+# Contact -> company key index (services/company_association.py)
+COMPANY_KEYS_SYNC_INTERVAL_MINUTES = int(os.environ.get('COMPANY_KEYS_SYNC_INTERVAL_MINUTES', '10'))  # Re-key contacts changed since the watermark
+COMPANY_KEYS_BATCH_SIZE = int(os.environ.get('COMPANY_KEYS_BATCH_SIZE', '1000'))  # Contacts per bulk write when re-keying
+
+# Company / industry classification propagation (services/classification_propagation.py)
+CLASSIFICATION_PROPAGATION_BATCH_SIZE = int(os.environ.get('CLASSIFICATION_PROPAGATION_BATCH_SIZE', '1000'))  # Contact ids per UpdateMany in the bulk write
+CLASSIFICATION_PROPAGATION_BACKGROUND_COMPANIES = int(os.environ.get('CLASSIFICATION_PROPAGATION_BACKGROUND_COMPANIES', '200'))  # Larger industries propagate as a background job
+
+# Streaming CSV / XLSX exports (services/exports.py)
+EXPORT_DIR = os.environ.get('EXPORT_DIR', '/tmp/leaderlix_exports')  # Files written by background export jobs
+EXPORT_BATCH_SIZE = int(os.environ.get('EXPORT_BATCH_SIZE', '1000'))  # Cursor batch size / rows per streamed chunk
+EXPORT_STREAM_MAX_ROWS = int(os.environ.get('EXPORT_STREAM_MAX_ROWS', '50000'))  # Larger exports must run as background jobs
+EXPORT_FILE_RETENTION_HOURS = int(os.environ.get('EXPORT_FILE_RETENTION_HOURS', '24'))  # Finished export files are deleted after this long
@@ -7,7 +7,7 @@ all production data including ~28,000 contacts. DO NOT change DB_NAME
 without explicit user approval.
 """
 from motor.motor_asyncio import AsyncIOMotorClient
-from config import MONGO_URL, DB_NAME
+from config import MONGO_URL, DB_NAME, QUERY_INSTRUMENTATION_ENABLED
 import logging
 
 logger = logging.getLogger(__name__)
@@ -20,7 +20,15 @@ if DB_NAME != EXPECTED_DB_NAME:
         f"The production database is '{EXPECTED_DB_NAME}' with ~28,000 contacts."
     )
 
-client = AsyncIOMotorClient(MONGO_URL)
+# Per-request query accounting (see services/query_instrumentation.py)
+event_listeners = []
+if QUERY_INSTRUMENTATION_ENABLED:
+    from services.query_instrumentation import query_listener
+    event_listeners.append(query_listener)
+
+# BSON dates come back naive (UTC); code that mixes them with aware values
+# goes through utils/timestamps.parse_timestamp
+client = AsyncIOMotorClient(MONGO_URL, event_listeners=event_listeners)
 db = client[DB_NAME]
 
 logger.info(f"✅ Connected to database: {DB_NAME}")
@@ -72,6 +80,19 @@ async def ensure_indexes():
         await db.lessons.create_index("course_id")
         await db.lms_progress.create_index([("user_id", 1), ("course_id", 1)])
         
+        # Blog indexes (public list + denormalized classification filters)
+        await db.blog_posts.create_index([("is_published", 1), ("language", 1), ("created_at", -1)])
+        await db.blog_posts.create_index("program_name")
+        await db.blog_posts.create_index("competency_name")
+        await db.blog_posts.create_index("level_name")
+        await db.blog_posts.create_index("content_item_id")
+        
+        # Calendar event cache (services/calendar_sync.py)
+        await db.calendar_events.create_index([("calendar_id", 1), ("id", 1)], unique=True)
+        await db.calendar_events.create_index([("calendar_id", 1), ("start_at", 1)])
+        await db.calendar_events.create_index("attendee_emails")
+        await db.calendar_events.create_index("end_at")
+        
         # Companies indexes
         await db.companies.create_index("name")
         await db.companies.create_index("status")
@@ -80,6 +101,50 @@ async def ensure_indexes():
         await db.events.create_index("date")
         await db.events.create_index("event_type")
 
+        # Email queue indexes (queue processor: next due pending email)
+        await db.email_queue.create_index([("status", 1), ("scheduled_at", 1)])
+
+        # Contact duplicate candidates cache (services/contact_dedup.py)
+        await db.unified_contacts.create_index("updated_at")
+        await db.contact_duplicate_candidates.create_index("contact_ids")
+        await db.contact_duplicate_candidates.create_index([("confidence", -1), ("size", -1)])
+        await db.contact_dedup_keys.create_index("contact_id", unique=True)
+        await db.contact_dedup_keys.create_index("keys")
+
+        # Rule template snapshots referenced by queue items (services/email_templates.py)
+        await db.email_rule_templates.create_index("id", unique=True)
+
+        # Job queue indexes (event-driven workers: next pending job)
+        await db.persona_reclassification_jobs.create_index([("status", 1), ("created_at", 1)])
+        await db.persona_reclassification_jobs.create_index("job_id")
+
+        # Scraper URL cache (pipeline crawler change detection)
+        await db.scraper_url_cache.create_index("url", unique=True)
+
+        # Apify run cache (identical actor + input reuses the run's dataset)
+        await db.apify_run_cache.create_index("input_hash", unique=True)
+
+        # HubSpot sync: rollback snapshots (one per record, read newest first) and audit lookup
+        await db.hubspot_sync_snapshots.create_index([("operation_id", 1), ("seq", -1)], unique=True)
+        await db.migration_audit.create_index("operation_id")
+
+        # Keyset pagination: (sort field, _id) of the list endpoints (utils/pagination.py)
+        await db.unified_contacts.create_index([("created_at", -1), ("_id", -1)])
+        await db.unified_contacts.create_index([("stage", 1), ("created_at", -1), ("_id", -1)])
+        await db.unified_companies.create_index([("name", 1), ("_id", 1)])
+        await db.content_items.create_index([("created_at", -1), ("_id", -1)])
+
+        # Contact -> company key index (services/company_association.py)
+        await db.unified_contacts.create_index("company_key")
+        await db.unified_contacts.create_index("company_keys")
+
+        # Background export jobs (services/exports.py)
+        await db.export_jobs.create_index("job_id", unique=True)
+        await db.export_jobs.create_index([("status", 1), ("created_at", -1)])
+
+        # Dashboard stat counters (services/stats_counters.py)
+        await db.stat_counters.create_index([("scope", 1), ("dimension", 1), ("day", 1)])
+
         # Import batches indexes
         await db.import_batches.create_index("batch_id", unique=True)
         await db.import_batches.create_index(
@@ -90,3 +155,7 @@ async def ensure_indexes():
         logger.info("✅ Database indexes created successfully (including Persona Classifier V3)")
     except Exception as e:
         logger.warning(f"⚠️ Error creating indexes (may already exist): {e}")
+
+    # TTL indexes for queue / log data (created one by one, see services/timestamp_migration.py)
+    from services.timestamp_migration import ensure_timestamp_indexes
+    await ensure_timestamp_indexes()
@@ -11,7 +11,8 @@ It processes LinkedIn import jobs with:
 - Profile locking to prevent concurrent imports
 
 Architecture:
-- Called every 10 seconds by APScheduler
+- Worker loop wakes on new jobs (change stream / in-process notify),
+  with a slow fallback poll (see scheduler_worker.start_worker_loops)
 - Uses MongoDB for job queue (persistent)
 - Locks prevent concurrent processing of same profile
 """
@@ -30,6 +31,9 @@ import logging
 
 # Import database from main app
 from database import db
+from services.job_wakeup import job_wakeup, CHANNEL_LINKEDIN_IMPORT
+from services.stats_counters import counter_projection, track_changes
+from utils.timestamps import parse_timestamp
 
 # Configure logging
 logger = logging.getLogger('linkedin_import_worker')
@@ -50,6 +54,15 @@ RETRY_BACKOFF = {
     3: 0        # 3rd attempt = final (no more retries)
 }
 
+
+def schedule_retry_wakeup(backoff_seconds: float):
+    """Wake the worker loop when a pending_retry job becomes due, instead of
+    leaving it to the fallback poll"""
+    asyncio.get_running_loop().call_later(
+        backoff_seconds + 1, job_wakeup.notify, CHANNEL_LINKEDIN_IMPORT
+    )
+
+
 # Error reason codes
 class ErrorReasonCode:
     INVALID_MISSING_IDENTIFIERS = "invalid_missing_identifiers"
@@ -330,14 +343,17 @@ async def recover_orphaned_jobs():
                     "$inc": {"attempts": 1}
                 }
             )
+            schedule_retry_wakeup(backoff_seconds)
             await db.linkedin_import_locks.delete_one({"job_id": job_id})
 
 
 async def find_next_job() -> Optional[dict]:
-    """Find next job to process (uploaded or pending_retry with backoff respected)"""
-    # First, recover any orphaned jobs
-    await recover_orphaned_jobs()
+    """
+    Find next job to process (uploaded or pending_retry with backoff respected).
     
+    Orphan recovery is NOT done here - it runs on its own slow cadence
+    (scheduler_worker.linkedin_import_maintenance).
+    """
     now = datetime.now(timezone.utc)
     now_str = now.isoformat()
     
@@ -717,9 +733,18 @@ async def process_batch(
         try:
             result = await db.unified_contacts.bulk_write(bulk_ops, ordered=False)
             logger.debug(f"Bulk write: {result.modified_count} modified, {result.upserted_count} upserted")
+            upserted_ids = list(result.upserted_ids.values())
         except BulkWriteError as e:
             logger.warning(f"Bulk write partial error: {e.details}")
             # Continue processing - some ops may have succeeded
+            upserted_ids = [item["_id"] for item in e.details.get("upserted", [])]
+        
+        # Updates don't touch counted fields; count the contacts actually inserted
+        if upserted_ids:
+            inserted = await db.unified_contacts.find(
+                {"_id": {"$in": upserted_ids}}, counter_projection("unified_contacts")
+            ).to_list(len(upserted_ids))
+            await track_changes("unified_contacts", [(None, contact) for contact in inserted])
     
     # Insert conflicts
     if conflicts_to_insert:
@@ -895,7 +920,7 @@ def create_update_operation(
     # Update first_connected_on_linkedin if we have a parsed date and contact doesn't have one
     if data.get("connected_on"):
         if not existing.get("first_connected_on_linkedin"):
-            update_fields["first_connected_on_linkedin"] = data["connected_on"]
+            update_fields["first_connected_on_linkedin"] = parse_timestamp(data["connected_on"])
     
     # Handle company linking
     if data.get("company_id") and data.get("company_name"):
@@ -1008,7 +1033,7 @@ def create_upsert_operation(data: dict, profile: str, now: str) -> Optional[Upda
         "classification": "outbound",
         "source": f"linkedin_connections_{profile.lower()}",
         "source_details": {"profile": profile, "imported_at": now},
-        "first_connected_on_linkedin": data.get("connected_on"),
+        "first_connected_on_linkedin": parse_timestamp(data.get("connected_on")),
         "created_at": now,
         "updated_at": now
     }
@@ -1284,6 +1309,7 @@ async def process_job(job: dict):
                     }
                 }
             )
+            schedule_retry_wakeup(backoff_seconds)
             logger.info(f"Job {job_id} set to retry after {backoff_seconds}s (attempt {attempts})")
     
     finally:
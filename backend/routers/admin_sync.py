@@ -4,16 +4,20 @@ Provides preview, execution, and rollback for HubSpot → MongoDB synchronizatio
 Preserves all local edits using namespacing strategy
 """
 import asyncio
+import hashlib
+import json
 import uuid
 import logging
 from datetime import datetime, timezone
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple
 from fastapi import APIRouter, HTTPException, Depends, Query
 from pydantic import BaseModel
+from pymongo import DeleteOne, InsertOne, UpdateOne
+from pymongo.errors import BulkWriteError
 
 from database import db
 from routers.auth import get_current_user
-from utils.hubspot_helpers import get_hubspot_token, get_hubspot_headers
+from services.hubspot_client import hubspot, HubSpotError, sync_pipeline
 
 logger = logging.getLogger(__name__)
 
@@ -26,6 +30,7 @@ class SyncPreviewResult(BaseModel):
     would_insert: int
     would_update_snapshot_only: int
     would_update_base_fields: int
+    unchanged: int = 0
     conflicts: int
     samples: Dict[str, List[dict]]
 
@@ -71,6 +76,27 @@ HUBSPOT_SNAPSHOT_FIELDS = [
     'lastmodifieddate', 'mobilephone', 'city', 'country'
 ]
 
+# Properties requested from HubSpot by the contacts sync
+HUBSPOT_SYNC_PROPERTIES = [
+    'firstname', 'lastname', 'email', 'phone', 'company',
+    'jobtitle', 'hs_persona', 'mobilephone', 'city', 'country'
+]
+
+# Compact projection for matching: ~28k contacts stay in memory during a sync
+LOCAL_INDEX_PROJECTION = {'_id': 0, 'id': 1, 'email': 1, 'hubspot_contact_id': 1, 'hubspot_snapshot_hash': 1}
+
+# Fields loaded (per page, changed contacts only) to decide and snapshot an update
+CONTACT_DETAIL_PROJECTION = {
+    '_id': 0, 'id': 1, 'name': 1, 'first_name': 1, 'last_name': 1, 'email': 1, 'phone': 1,
+    'company': 1, 'job_title': 1, 'source': 1, 'buyer_persona_name': 1, 'classified_area': 1,
+    'tags': 1, 'notes': 1, 'webinar_history': 1, 'created_at': 1, 'updated_at': 1,
+    'hubspot_contact_id': 1, 'hubspot_snapshot': 1, 'hubspot_snapshot_hash': 1,
+}
+
+PREVIEW_SAMPLE_SIZE = 20
+ROLLBACK_BATCH_SIZE = 500
+MAX_AUDIT_ERRORS = 100  # Error messages kept in the audit record (the count is always exact)
+
 # ============ HELPER FUNCTIONS ============
 
 def normalize_email(email: str) -> Optional[str]:
@@ -91,6 +117,11 @@ def create_hubspot_snapshot(hs_contact: dict) -> dict:
             snapshot[field] = props[field]
     return snapshot
 
+def hubspot_snapshot_hash(snapshot: dict) -> str:
+    """Hash of the HubSpot data in a snapshot (synced_at excluded), for change detection"""
+    data = {k: v for k, v in snapshot.items() if k != 'synced_at'}
+    return hashlib.sha1(json.dumps(data, sort_keys=True, default=str).encode()).hexdigest()
+
 def contact_was_edited(local_contact: dict) -> bool:
     """Check if contact has local edits that should be preserved"""
     # Check for classification fields
@@ -111,6 +142,188 @@ def contact_was_edited(local_contact: dict) -> bool:
         return True
     return False
 
+def add_audit_error(stats: dict, message: str):
+    """Count an error; only the first MAX_AUDIT_ERRORS messages are kept"""
+    stats['error_count'] = stats.get('error_count', 0) + 1
+    if len(stats['errors']) < MAX_AUDIT_ERRORS:
+        stats['errors'].append(message)
+
+
+class LocalContactIndex:
+    """
+    Compact in-memory index of unified_contacts for matching HubSpot contacts:
+    only id, hubspot id and snapshot hash per contact, keyed by hubspot id and
+    normalized email. Full documents are loaded per page, for matched contacts
+    whose snapshot hash changed (load_details).
+    """
+
+    def __init__(self):
+        self.by_email: Dict[str, dict] = {}
+        self.by_hubspot_id: Dict[str, dict] = {}
+
+    @classmethod
+    async def load(cls) -> "LocalContactIndex":
+        index = cls()
+        async for contact in db.unified_contacts.find({}, LOCAL_INDEX_PROJECTION):
+            index.add(contact)
+        return index
+
+    def add(self, contact: dict):
+        entry = {
+            'id': contact.get('id'),
+            'hubspot_contact_id': str(contact['hubspot_contact_id']) if contact.get('hubspot_contact_id') else None,
+            'hubspot_snapshot_hash': contact.get('hubspot_snapshot_hash'),
+        }
+        email = normalize_email(contact.get('email'))
+        if email:
+            self.by_email[email] = entry
+        if entry['hubspot_contact_id']:
+            self.by_hubspot_id[entry['hubspot_contact_id']] = entry
+
+    def match(self, hs_id: str, hs_email: Optional[str]) -> Tuple[Optional[dict], Optional[str]]:
+        """Local entry for a HubSpot contact: by hubspot_contact_id first, then by email"""
+        if hs_id in self.by_hubspot_id:
+            return self.by_hubspot_id[hs_id], 'hubspot_id'
+        if hs_email and hs_email in self.by_email:
+            return self.by_email[hs_email], 'email'
+        return None, None
+
+    @staticmethod
+    async def load_details(contact_ids: List[str]) -> Dict[str, dict]:
+        """Fields needed to decide and snapshot an update, for one page of contacts"""
+        if not contact_ids:
+            return {}
+        cursor = db.unified_contacts.find({'id': {'$in': contact_ids}}, CONTACT_DETAIL_PROJECTION)
+        return {c['id']: c async for c in cursor}
+
+
+def contact_sync_plan(hs: dict, local: Optional[dict]) -> Tuple[str, dict]:
+    """
+    Decide what a sync does with one HubSpot contact. Returns (action, doc):
+    ('insert', new contact), ('update_base' | 'update_snapshot', $set doc).
+    `local` is the matched contact with CONTACT_DETAIL_PROJECTION fields.
+    """
+    props = hs.get('properties', {})
+    hs_id = str(hs.get('id', ''))
+    snapshot = create_hubspot_snapshot(hs)
+    snapshot_hash = hubspot_snapshot_hash(snapshot)
+    now = datetime.now(timezone.utc).isoformat()
+    
+    if not local:
+        return 'insert', {
+            'id': str(uuid.uuid4()),
+            'hubspot_contact_id': hs_id,
+            'hubspot_snapshot': snapshot,
+            'hubspot_snapshot_hash': snapshot_hash,
+            'name': f"{props.get('firstname', '')} {props.get('lastname', '')}".strip(),
+            'first_name': props.get('firstname'),
+            'last_name': props.get('lastname'),
+            'email': props.get('email'),
+            'phone': props.get('phone') or props.get('mobilephone'),
+            'company': props.get('company'),
+            'job_title': props.get('jobtitle'),
+            'classification': 'inbound',
+            'stage': 1,
+            'companies': [{'company_name': props.get('company')}] if props.get('company') else [],
+            'source': 'hubspot',
+            'created_at': now,
+            'updated_at': now
+        }
+    
+    # Always update hubspot_snapshot
+    update_doc = {
+        'hubspot_contact_id': hs_id,
+        'hubspot_snapshot': snapshot,
+        'hubspot_snapshot_hash': snapshot_hash,
+        'updated_at': now
+    }
+    if contact_was_edited(local):
+        return 'update_snapshot', update_doc
+    
+    # No local edits: base fields can be filled in too
+    if not local.get('name') or local.get('source') == 'hubspot':
+        update_doc['name'] = f"{props.get('firstname', '')} {props.get('lastname', '')}".strip()
+        update_doc['first_name'] = props.get('firstname')
+        update_doc['last_name'] = props.get('lastname')
+    if not local.get('email'):
+        update_doc['email'] = props.get('email')
+    if not local.get('phone'):
+        update_doc['phone'] = props.get('phone') or props.get('mobilephone')
+    if not local.get('company'):
+        update_doc['company'] = props.get('company')
+    if not local.get('job_title'):
+        update_doc['job_title'] = props.get('jobtitle')
+    return 'update_base', update_doc
+
+
+def rollback_snapshot(operation_id: str, seq: int, collection: str, action: str, doc_id: str,
+                      hubspot_id: str, before: Optional[dict] = None, unset: Optional[List[str]] = None) -> dict:
+    """One hubspot_sync_snapshots document (pre-change state of one record)"""
+    snap = {
+        'operation_id': operation_id,
+        'seq': seq,
+        'collection': collection,
+        'action': action,
+        'doc_id': doc_id,
+        'hubspot_id': hubspot_id,
+    }
+    if before is not None:
+        snap['before'] = before
+        snap['unset'] = unset or []
+    return snap
+
+
+async def apply_rollback(operation_id: str, collection, legacy_snapshots: List[dict], id_key: str) -> Tuple[int, List[str]]:
+    """
+    Undo a sync from its snapshots, newest first, ROLLBACK_BATCH_SIZE writes per
+    bulk_write. Reads hubspot_sync_snapshots, plus the snapshots array that
+    audit records written before the separate collection carried.
+    """
+    rolled_back = 0
+    errors: List[str] = []
+    operations = []
+    
+    async def flush():
+        nonlocal rolled_back
+        if not operations:
+            return
+        try:
+            await collection.bulk_write(operations, ordered=True)
+            rolled_back += len(operations)
+        except BulkWriteError as e:
+            rolled_back += e.details['nRemoved'] + e.details['nModified']
+            errors.extend(err.get('errmsg', '')[:200] for err in e.details['writeErrors'])
+        operations.clear()
+    
+    def to_operation(snap: dict):
+        doc_id = snap.get('doc_id') or snap.get(id_key)
+        if snap['action'] == 'insert':
+            return DeleteOne({'id': doc_id})
+        if snap['action'] == 'update' and snap.get('before') is not None:
+            update = {}
+            if snap['before']:
+                update['$set'] = snap['before']
+            if snap.get('unset'):
+                update['$unset'] = {field: "" for field in snap['unset']}
+            return UpdateOne({'id': doc_id}, update) if update else None
+        return None
+    
+    snapshots = db.hubspot_sync_snapshots.find({'operation_id': operation_id}, {'_id': 0}).sort('seq', -1)
+    async for snap in snapshots:
+        operation = to_operation(snap)
+        if operation:
+            operations.append(operation)
+        if len(operations) >= ROLLBACK_BATCH_SIZE:
+            await flush()
+    for snap in reversed(legacy_snapshots):
+        operation = to_operation(snap)
+        if operation:
+            operations.append(operation)
+        if len(operations) >= ROLLBACK_BATCH_SIZE:
+            await flush()
+    await flush()
+    return rolled_back, errors
+
 # ============ CONTACTS SYNC ============
 
 @router.get("/contacts/preview", response_model=SyncPreviewResult)
@@ -122,128 +335,91 @@ async def preview_contacts_sync(
     Preview what would happen if we sync contacts from HubSpot.
     Does NOT modify any data.
     """
-    import httpx
-    
-    headers = await get_hubspot_headers()
+    index = await LocalContactIndex.load()
     
-    # Fetch contacts from HubSpot
-    hs_contacts = []
-    after = None
-    
-    async with httpx.AsyncClient(timeout=60.0) as client:
-        while len(hs_contacts) < limit:
-            url = "https://api.hubapi.com/crm/v3/objects/contacts?limit=100"
-            url += "&properties=firstname,lastname,email,phone,company,jobtitle,hs_persona"
-            if after:
-                url += f"&after={after}"
-            
-            resp = await client.get(url, headers=headers)
-            if resp.status_code != 200:
-                raise HTTPException(status_code=500, detail=f"HubSpot API error: {resp.status_code}")
-            
-            data = resp.json()
-            hs_contacts.extend(data.get('results', []))
-            
-            paging = data.get('paging', {})
-            if 'next' in paging:
-                after = paging['next'].get('after')
-            else:
-                break
-    
-    # Analyze what would happen
+    total = 0
+    unchanged = 0
     would_insert = []
     would_update_snapshot = []
     would_update_base = []
     conflicts = []
-    
-    # Build email index of local contacts
-    local_by_email = {}
-    local_by_hubspot_id = {}
-    
-    async for contact in db.unified_contacts.find({}, {'_id': 0}):
-        email = normalize_email(contact.get('email'))
-        if email:
-            local_by_email[email] = contact
-        hs_id = contact.get('hubspot_contact_id')
-        if hs_id:
-            local_by_hubspot_id[str(hs_id)] = contact
-    
-    # Note: hubspot_contacts cache is deprecated - all edits are now in unified_contacts
-    # This sync is primarily for reference/audit purposes
-    hubspot_cache_edits = {}
-    
-    for hs in hs_contacts:
-        hs_id = str(hs.get('id', ''))
-        hs_email = normalize_email(hs.get('properties', {}).get('email'))
-        
-        # Try to find local match
-        local = None
-        match_type = None
-        
-        # Priority 1: Match by hubspot_contact_id
-        if hs_id in local_by_hubspot_id:
-            local = local_by_hubspot_id[hs_id]
-            match_type = 'hubspot_id'
-        # Priority 2: Match by email
-        elif hs_email and hs_email in local_by_email:
-            local = local_by_email[hs_email]
-            match_type = 'email'
-        
-        # Check for edits in hubspot_contacts cache
-        cache_edits = hubspot_cache_edits.get(hs_id, {})
-        
-        if not local:
-            # New contact - would insert
-            would_insert.append({
-                'hubspot_id': hs_id,
-                'email': hs_email,
-                'name': f"{hs.get('properties', {}).get('firstname', '')} {hs.get('properties', {}).get('lastname', '')}".strip(),
-                'has_cache_edits': bool(cache_edits)
-            })
-        else:
-            # Existing contact - check what would update
-            has_local_edits = contact_was_edited(local)
+    counts = {'insert': 0, 'update_snapshot': 0, 'update_base': 0, 'conflicts': 0}
+    
+    try:
+        async for page in hubspot.pages(
+            "/crm/v3/objects/contacts",
+            params={"limit": 100, "properties": ",".join(HUBSPOT_SYNC_PROPERTIES)},
+            limit=limit
+        ):
+            total += len(page)
+            matches = []
+            for hs in page:
+                hs_id = str(hs.get('id', ''))
+                hs_email = normalize_email(hs.get('properties', {}).get('email'))
+                local, match_type = index.match(hs_id, hs_email)
+                
+                # Check for conflicts
+                by_email = index.by_email.get(hs_email) if hs_email else None
+                if by_email and by_email['hubspot_contact_id'] and by_email['hubspot_contact_id'] != hs_id:
+                    counts['conflicts'] += 1
+                    if len(conflicts) < PREVIEW_SAMPLE_SIZE:
+                        conflicts.append({
+                            'type': 'hubspot_id_mismatch',
+                            'email': hs_email,
+                            'local_hubspot_id': by_email['hubspot_contact_id'],
+                            'incoming_hubspot_id': hs_id
+                        })
+                
+                if not local:
+                    counts['insert'] += 1
+                    if len(would_insert) < PREVIEW_SAMPLE_SIZE:
+                        props = hs.get('properties', {})
+                        would_insert.append({
+                            'hubspot_id': hs_id,
+                            'email': hs_email,
+                            'name': f"{props.get('firstname', '')} {props.get('lastname', '')}".strip(),
+                            'has_cache_edits': False
+                        })
+                elif local['hubspot_snapshot_hash'] == hubspot_snapshot_hash(create_hubspot_snapshot(hs)):
+                    unchanged += 1
+                else:
+                    matches.append((hs, hs_id, hs_email, local, match_type))
             
-            if has_local_edits or cache_edits:
-                # Only update hubspot_snapshot, preserve all local data
-                would_update_snapshot.append({
-                    'local_id': local.get('id'),
-                    'hubspot_id': hs_id,
-                    'email': hs_email,
-                    'match_type': match_type,
-                    'local_edits_preserved': list(UI_MANAGED_FIELDS & set(local.keys()))
-                })
-            else:
-                # Can update base fields too (no local edits)
-                would_update_base.append({
-                    'local_id': local.get('id'),
-                    'hubspot_id': hs_id,
-                    'email': hs_email,
-                    'match_type': match_type
-                })
-        
-        # Check for conflicts
-        if hs_email and hs_email in local_by_email:
-            local_hs_id = local_by_email[hs_email].get('hubspot_contact_id')
-            if local_hs_id and str(local_hs_id) != hs_id:
-                conflicts.append({
-                    'type': 'hubspot_id_mismatch',
-                    'email': hs_email,
-                    'local_hubspot_id': local_hs_id,
-                    'incoming_hubspot_id': hs_id
-                })
+            details = await LocalContactIndex.load_details([m[3]['id'] for m in matches])
+            for hs, hs_id, hs_email, local, match_type in matches:
+                contact = details.get(local['id'], {})
+                action, _ = contact_sync_plan(hs, contact)
+                counts[action] += 1
+                if action == 'update_snapshot' and len(would_update_snapshot) < PREVIEW_SAMPLE_SIZE:
+                    would_update_snapshot.append({
+                        'local_id': local['id'],
+                        'hubspot_id': hs_id,
+                        'email': hs_email,
+                        'match_type': match_type,
+                        'local_edits_preserved': sorted(UI_MANAGED_FIELDS & set(contact.keys()))
+                    })
+                elif action == 'update_base' and len(would_update_base) < PREVIEW_SAMPLE_SIZE:
+                    would_update_base.append({
+                        'local_id': local['id'],
+                        'hubspot_id': hs_id,
+                        'email': hs_email,
+                        'match_type': match_type
+                    })
+    except HubSpotError as e:
+        raise HTTPException(status_code=500, detail=f"HubSpot API error: {e.status_code}")
     
     return SyncPreviewResult(
-        total_in_hubspot=len(hs_contacts),
-        would_insert=len(would_insert),
-        would_update_snapshot_only=len(would_update_snapshot),
-        would_update_base_fields=len(would_update_base),
-        conflicts=len(conflicts),
+        total_in_hubspot=total,
+        would_insert=counts['insert'],
+        would_update_snapshot_only=counts['update_snapshot'],
+        would_update_base_fields=counts['update_base'],
+        unchanged=unchanged,
+        conflicts=counts['conflicts'],
         samples={
-            'would_insert': would_insert[:20],
-            'would_update_snapshot': would_update_snapshot[:20],
-            'would_update_base': would_update_base[:20],
-            'conflicts': conflicts[:20]
+            'would_insert': would_insert,
+            'would_update_snapshot': would_update_snapshot,
+            'would_update_base': would_update_base,
+            'conflicts': conflicts
         }
     )
 
@@ -258,9 +434,12 @@ async def run_contacts_sync(
     """
     Execute contacts sync from HubSpot to MongoDB.
     Creates audit trail and preserves all local edits.
-    """
-    import httpx
     
+    Matches against a compact index of local contacts and skips HubSpot
+    contacts whose snapshot hash is unchanged. Each page of changes is one
+    bulk_write; pre-change state goes to hubspot_sync_snapshots (one document
+    per record, keyed by operation_id) so the audit record stays small.
+    """
     operation_id = str(uuid.uuid4())
     started_at = datetime.now(timezone.utc).isoformat()
     
@@ -276,179 +455,97 @@ async def run_contacts_sync(
             'inserted': 0,
             'updated_snapshot': 0,
             'updated_base': 0,
+            'unchanged': 0,
+            'skipped_no_email': 0,
             'conflicts_skipped': 0,
+            'snapshots': 0,
             'errors': []
-        },
-        'snapshots': []  # For rollback
+        }
     }
     
     if not dry_run:
-        await db.migration_audit.insert_one(audit_record)
-    
-    headers = await get_hubspot_headers()
+        await db.migration_audit.insert_one(dict(audit_record))
     
-    # Build local indexes
-    local_by_email = {}
-    local_by_hubspot_id = {}
-    
-    async for contact in db.unified_contacts.find({}, {'_id': 0}):
-        email = normalize_email(contact.get('email'))
-        if email:
-            local_by_email[email] = contact
-        hs_id = contact.get('hubspot_contact_id')
-        if hs_id:
-            local_by_hubspot_id[str(hs_id)] = contact
-    
-    # Note: hubspot_contacts cache is deprecated - all edits are now in unified_contacts
-    # This sync is primarily for reference/audit purposes
-    hubspot_cache_edits = {}
-    
-    # Fetch and process HubSpot contacts
-    processed = 0
-    after = None
+    index = await LocalContactIndex.load()
     stats = audit_record['stats']
     
-    async with httpx.AsyncClient(timeout=60.0) as client:
-        while processed < limit:
-            url = f"https://api.hubapi.com/crm/v3/objects/contacts?limit={batch_size}"
-            url += "&properties=firstname,lastname,email,phone,company,jobtitle,hs_persona,mobilephone,city,country"
-            if after:
-                url += f"&after={after}"
-            
-            resp = await client.get(url, headers=headers)
-            if resp.status_code != 200:
-                stats['errors'].append(f"HubSpot API error at offset {processed}: {resp.status_code}")
-                break
+    async def diff(hs_contacts: List[dict]) -> list:
+        pending = []
+        for hs in hs_contacts:
+            hs_id = str(hs.get('id', ''))
+            hs_email = normalize_email(hs.get('properties', {}).get('email'))
             
-            data = resp.json()
-            hs_contacts = data.get('results', [])
+            # Skip contacts without valid email (avoids duplicate key errors)
+            if not hs_email:
+                stats['skipped_no_email'] += 1
+                continue
             
-            for hs in hs_contacts:
-                hs_id = str(hs.get('id', ''))
-                props = hs.get('properties', {})
-                hs_email = normalize_email(props.get('email'))
-                
-                # Skip contacts without valid email (avoids duplicate key errors)
-                if not hs_email:
-                    stats['errors'].append(f"Skipped hubspot_id {hs_id}: no email")
-                    continue
-                
-                # Find local match
-                local = None
-                if hs_id in local_by_hubspot_id:
-                    local = local_by_hubspot_id[hs_id]
-                elif hs_email and hs_email in local_by_email:
-                    local = local_by_email[hs_email]
-                
-                # Get cache edits
-                cache_edits = hubspot_cache_edits.get(hs_id, {})
-                
-                if not local:
-                    # INSERT new contact
-                    new_contact = {
-                        'id': str(uuid.uuid4()),
-                        'hubspot_contact_id': hs_id,
-                        'hubspot_snapshot': create_hubspot_snapshot(hs),
-                        'name': f"{props.get('firstname', '')} {props.get('lastname', '')}".strip(),
-                        'first_name': props.get('firstname'),
-                        'last_name': props.get('lastname'),
-                        'email': props.get('email'),
-                        'phone': props.get('phone') or props.get('mobilephone'),
-                        'company': props.get('company'),
-                        'job_title': props.get('jobtitle'),
-                        'classification': 'inbound',
-                        'stage': 1,
-                        'companies': [{'company_name': props.get('company')}] if props.get('company') else [],
-                        'source': 'hubspot',
-                        'created_at': datetime.now(timezone.utc).isoformat(),
-                        'updated_at': datetime.now(timezone.utc).isoformat()
-                    }
-                    
-                    # Apply cached edits if any
-                    for field in ['buyer_persona_name', 'buyer_persona_display_name', 'classified_area', 
-                                  'classified_sector', 'classification_confidence', 'company_industry']:
-                        if cache_edits.get(field):
-                            new_contact[field] = cache_edits[field]
-                    
-                    if not dry_run:
-                        try:
-                            await db.unified_contacts.insert_one(new_contact)
-                            # Save snapshot for rollback
-                            audit_record['snapshots'].append({
-                                'action': 'insert',
-                                'contact_id': new_contact['id'],
-                                'hubspot_id': hs_id
-                            })
-                            stats['inserted'] += 1
-                            local_by_email[hs_email] = new_contact  # Update index
-                        except Exception as e:
-                            stats['errors'].append(f"Insert error for {hs_id}: {str(e)[:100]}")
-                    else:
-                        stats['inserted'] += 1
-                    
-                else:
-                    # UPDATE existing contact
-                    has_local_edits = contact_was_edited(local) or bool(cache_edits)
-                    
-                    # Always update hubspot_snapshot
-                    update_doc = {
-                        'hubspot_contact_id': hs_id,
-                        'hubspot_snapshot': create_hubspot_snapshot(hs),
-                        'updated_at': datetime.now(timezone.utc).isoformat()
-                    }
-                    
-                    if not has_local_edits:
-                        # Can update base fields too
-                        if not local.get('name') or local.get('source') == 'hubspot':
-                            update_doc['name'] = f"{props.get('firstname', '')} {props.get('lastname', '')}".strip()
-                            update_doc['first_name'] = props.get('firstname')
-                            update_doc['last_name'] = props.get('lastname')
-                        if not local.get('email'):
-                            update_doc['email'] = props.get('email')
-                        if not local.get('phone'):
-                            update_doc['phone'] = props.get('phone') or props.get('mobilephone')
-                        if not local.get('company'):
-                            update_doc['company'] = props.get('company')
-                        if not local.get('job_title'):
-                            update_doc['job_title'] = props.get('jobtitle')
-                        
-                        stats['updated_base'] += 1
-                    else:
-                        stats['updated_snapshot'] += 1
-                    
-                    if not dry_run:
-                        # Save pre-update snapshot for rollback
-                        audit_record['snapshots'].append({
-                            'action': 'update',
-                            'contact_id': local.get('id'),
-                            'hubspot_id': hs_id,
-                            'before': {k: local.get(k) for k in update_doc.keys() if k in local}
-                        })
-                        
-                        await db.unified_contacts.update_one(
-                            {'id': local.get('id')},
-                            {'$set': update_doc}
-                        )
-                
-                processed += 1
+            local, _ = index.match(hs_id, hs_email)
+            if local and local['hubspot_snapshot_hash'] == hubspot_snapshot_hash(create_hubspot_snapshot(hs)):
+                stats['unchanged'] += 1
+                continue
+            pending.append((hs, hs_id, hs_email, local))
+        
+        details = await LocalContactIndex.load_details([p[3]['id'] for p in pending if p[3]])
+        operations = []
+        snapshots = []
+        for hs, hs_id, hs_email, local in pending:
+            contact = details.get(local['id']) if local else None
+            if local and contact is None:
+                add_audit_error(stats, f"Local contact {local['id']} for hubspot_id {hs_id} disappeared")
+                continue
+            action, doc = contact_sync_plan(hs, contact)
             
-            paging = data.get('paging', {})
-            if 'next' in paging:
-                after = paging['next'].get('after')
+            if action == 'insert':
+                operations.append(InsertOne(doc))
+                snapshots.append(rollback_snapshot(operation_id, stats['snapshots'] + len(snapshots),
+                                                   'unified_contacts', 'insert', doc['id'], hs_id))
+                index.add(doc)  # Later pages match the new contact
+                stats['inserted'] += 1
             else:
-                break
+                operations.append(UpdateOne({'id': contact['id']}, {'$set': doc}))
+                snapshots.append(rollback_snapshot(
+                    operation_id, stats['snapshots'] + len(snapshots), 'unified_contacts', 'update',
+                    contact['id'], hs_id,
+                    before={k: contact[k] for k in doc if k in contact},
+                    unset=[k for k in doc if k not in contact]
+                ))
+                local['hubspot_contact_id'] = hs_id
+                local['hubspot_snapshot_hash'] = doc['hubspot_snapshot_hash']
+                stats['updated_base' if action == 'update_base' else 'updated_snapshot'] += 1
+        
+        # Snapshots are written before the page they describe
+        if snapshots and not dry_run:
+            await db.hubspot_sync_snapshots.insert_many(snapshots, ordered=False)
+        stats['snapshots'] += len(snapshots)
+        return operations
+    
+    try:
+        result = await sync_pipeline(
+            hubspot.pages(
+                "/crm/v3/objects/contacts",
+                params={"limit": min(batch_size, 100), "properties": ",".join(HUBSPOT_SYNC_PROPERTIES)},
+                limit=limit
+            ),
+            diff,
+            collection=db.unified_contacts,
+            dry_run=dry_run
+        )
+        stats['fetched'] = result['fetched']
+        if result['write_errors']:
+            add_audit_error(stats, f"{result['write_errors']} writes failed (see server log)")
+    except HubSpotError as e:
+        add_audit_error(stats, f"HubSpot API error: {e.status_code}")
     
     completed_at = datetime.now(timezone.utc).isoformat()
     
-    # Update audit record with snapshots for rollback capability
     if not dry_run:
         await db.migration_audit.update_one(
             {'operation_id': operation_id},
             {'$set': {
                 'completed_at': completed_at,
                 'status': 'completed',
-                'stats': stats,
-                'snapshots': audit_record['snapshots']  # Critical: save snapshots for rollback
+                'stats': stats
             }}
         )
     
@@ -477,26 +574,9 @@ async def rollback_contacts_sync(
     if audit.get('status') == 'rolled_back':
         raise HTTPException(status_code=400, detail="Operation already rolled back")
     
-    snapshots = audit.get('snapshots', [])
-    rolled_back = 0
-    errors = []
-    
-    for snap in reversed(snapshots):  # Process in reverse order
-        try:
-            if snap['action'] == 'insert':
-                # Delete inserted contact
-                await db.unified_contacts.delete_one({'id': snap['contact_id']})
-                rolled_back += 1
-            elif snap['action'] == 'update':
-                # Restore previous values
-                if snap.get('before'):
-                    await db.unified_contacts.update_one(
-                        {'id': snap['contact_id']},
-                        {'$set': snap['before']}
-                    )
-                    rolled_back += 1
-        except Exception as e:
-            errors.append(f"Error rolling back {snap['contact_id']}: {str(e)}")
+    rolled_back, errors = await apply_rollback(
+        operation_id, db.unified_contacts, audit.get('snapshots', []), id_key='contact_id'
+    )
     
     # Mark as rolled back
     await db.migration_audit.update_one(
@@ -507,7 +587,7 @@ async def rollback_contacts_sync(
             'rolled_back_by': current_user.get('email'),
             'rollback_stats': {
                 'rolled_back': rolled_back,
-                'errors': errors
+                'errors': errors[:MAX_AUDIT_ERRORS]
             }
         }}
     )
@@ -529,33 +609,17 @@ async def preview_cases_sync(
     """
     Preview what would happen if we sync deals from HubSpot.
     """
-    import httpx
-    
-    headers = await get_hubspot_headers()
-    
     # Fetch deals from HubSpot
     hs_deals = []
-    after = None
-    
-    async with httpx.AsyncClient(timeout=60.0) as client:
-        while len(hs_deals) < limit:
-            url = "https://api.hubapi.com/crm/v3/objects/deals?limit=100"
-            url += "&properties=dealname,amount,closedate,dealstage,pipeline,hs_object_id"
-            if after:
-                url += f"&after={after}"
-            
-            resp = await client.get(url, headers=headers)
-            if resp.status_code != 200:
-                raise HTTPException(status_code=500, detail=f"HubSpot API error: {resp.status_code}")
-            
-            data = resp.json()
-            hs_deals.extend(data.get('results', []))
-            
-            paging = data.get('paging', {})
-            if 'next' in paging:
-                after = paging['next'].get('after')
-            else:
-                break
+    try:
+        async for page in hubspot.pages(
+            "/crm/v3/objects/deals",
+            params={"limit": 100, "properties": "dealname,amount,closedate,dealstage,pipeline,hs_object_id"},
+            limit=limit
+        ):
+            hs_deals.extend(page)
+    except HubSpotError as e:
+        raise HTTPException(status_code=500, detail=f"HubSpot API error: {e.status_code}")
     
     # Build local index
     local_by_hubspot_id = {}
@@ -614,6 +678,17 @@ async def preview_cases_sync(
     }
 
 
+def deal_snapshot(props: dict) -> dict:
+    return {
+        'dealname': props.get('dealname', ''),
+        'amount': props.get('amount'),
+        'closedate': props.get('closedate'),
+        'dealstage': props.get('dealstage'),
+        'pipeline': props.get('pipeline'),
+        'synced_at': datetime.now(timezone.utc).isoformat()
+    }
+
+
 @router.post("/cases/run")
 async def run_cases_sync(
     dry_run: bool = Query(default=True),
@@ -623,9 +698,10 @@ async def run_cases_sync(
     """
     Execute deals sync from HubSpot to cases collection.
     Preserves all local data (contacts, checklists, notes).
-    """
-    import httpx
     
+    Runs as a fetch -> diff -> bulk_write pipeline: the next HubSpot page
+    downloads while the current one is diffed and written in one bulk_write.
+    """
     operation_id = str(uuid.uuid4())
     started_at = datetime.now(timezone.utc).isoformat()
     
@@ -636,128 +712,94 @@ async def run_cases_sync(
         'started_by': current_user.get('email'),
         'dry_run': dry_run,
         'status': 'running',
-        'stats': {'inserted': 0, 'updated': 0, 'errors': []},
-        'snapshots': []
+        'stats': {'inserted': 0, 'updated': 0, 'snapshots': 0, 'errors': []}
     }
     
     if not dry_run:
-        await db.migration_audit.insert_one(audit_record)
-    
-    headers = await get_hubspot_headers()
+        await db.migration_audit.insert_one(dict(audit_record))
     
     # Build local indexes
     local_by_hubspot_id = {}
     local_by_name = {}
     
-    async for case in db.cases.find({}, {'_id': 0}):
+    async for case in db.cases.find({}, {'_id': 0, 'id': 1, 'hubspot_deal_id': 1, 'name': 1, 'hubspot_snapshot': 1}):
         hs_id = case.get('hubspot_deal_id')
         if hs_id:
             local_by_hubspot_id[str(hs_id)] = case
-        name = case.get('name', '').lower().strip()
+        name = (case.get('name') or '').lower().strip()
         if name:
             local_by_name[name] = case
     
-    processed = 0
-    after = None
     stats = audit_record['stats']
     
-    async with httpx.AsyncClient(timeout=60.0) as client:
-        while processed < limit:
-            url = "https://api.hubapi.com/crm/v3/objects/deals?limit=100"
-            url += "&properties=dealname,amount,closedate,dealstage,pipeline,hs_object_id,hubspot_owner_id"
-            if after:
-                url += f"&after={after}"
-            
-            resp = await client.get(url, headers=headers)
-            if resp.status_code != 200:
-                stats['errors'].append(f"HubSpot API error: {resp.status_code}")
-                break
+    async def diff(deals: List[dict]) -> list:
+        operations = []
+        snapshots = []
+        for deal in deals:
+            deal_id = str(deal.get('id', ''))
+            props = deal.get('properties', {})
+            dealname = props.get('dealname', '')
             
-            data = resp.json()
-            deals = data.get('results', [])
+            # Find local match
+            local = local_by_hubspot_id.get(deal_id)
+            if not local and dealname:
+                local = local_by_name.get(dealname.lower().strip())
             
-            for deal in deals:
-                deal_id = str(deal.get('id', ''))
-                props = deal.get('properties', {})
-                dealname = props.get('dealname', '')
-                
-                # Find local match
-                local = local_by_hubspot_id.get(deal_id)
-                if not local and dealname:
-                    local = local_by_name.get(dealname.lower().strip())
-                
-                if not local:
-                    # INSERT new case
-                    new_case = {
-                        'id': str(uuid.uuid4()),
-                        'hubspot_deal_id': deal_id,
-                        'hubspot_snapshot': {
-                            'dealname': dealname,
-                            'amount': props.get('amount'),
-                            'closedate': props.get('closedate'),
-                            'dealstage': props.get('dealstage'),
-                            'pipeline': props.get('pipeline'),
-                            'synced_at': datetime.now(timezone.utc).isoformat()
-                        },
-                        'name': dealname,
-                        'company_name': '',  # Will need association lookup
-                        'company_names': [],
-                        'stage': 3,  # Default to Stage 3
-                        'status': 'active',
-                        'contact_ids': [],
-                        'created_at': datetime.now(timezone.utc).isoformat(),
-                        'updated_at': datetime.now(timezone.utc).isoformat()
-                    }
-                    
-                    if not dry_run:
-                        await db.cases.insert_one(new_case)
-                        audit_record['snapshots'].append({
-                            'action': 'insert',
-                            'case_id': new_case['id'],
-                            'hubspot_deal_id': deal_id
-                        })
-                    
-                    stats['inserted'] += 1
-                    
-                else:
-                    # UPDATE - only hubspot_snapshot, preserve local data
-                    update_doc = {
-                        'hubspot_deal_id': deal_id,
-                        'hubspot_snapshot': {
-                            'dealname': dealname,
-                            'amount': props.get('amount'),
-                            'closedate': props.get('closedate'),
-                            'dealstage': props.get('dealstage'),
-                            'pipeline': props.get('pipeline'),
-                            'synced_at': datetime.now(timezone.utc).isoformat()
-                        },
-                        'updated_at': datetime.now(timezone.utc).isoformat()
-                    }
-                    
-                    if not dry_run:
-                        audit_record['snapshots'].append({
-                            'action': 'update',
-                            'case_id': local.get('id'),
-                            'hubspot_deal_id': deal_id,
-                            'before': {
-                                'hubspot_snapshot': local.get('hubspot_snapshot')
-                            }
-                        })
-                        
-                        await db.cases.update_one(
-                            {'id': local.get('id')},
-                            {'$set': update_doc}
-                        )
-                    
-                    stats['updated'] += 1
-                
-                processed += 1
-            
-            paging = data.get('paging', {})
-            if 'next' in paging:
-                after = paging['next'].get('after')
+            if not local:
+                # INSERT new case
+                now = datetime.now(timezone.utc).isoformat()
+                new_case = {
+                    'id': str(uuid.uuid4()),
+                    'hubspot_deal_id': deal_id,
+                    'hubspot_snapshot': deal_snapshot(props),
+                    'name': dealname,
+                    'company_name': '',  # Will need association lookup
+                    'company_names': [],
+                    'stage': 3,  # Default to Stage 3
+                    'status': 'active',
+                    'contact_ids': [],
+                    'created_at': now,
+                    'updated_at': now
+                }
+                operations.append(InsertOne(new_case))
+                snapshots.append(rollback_snapshot(operation_id, stats['snapshots'] + len(snapshots),
+                                                   'cases', 'insert', new_case['id'], deal_id))
+                stats['inserted'] += 1
             else:
-                break
+                # UPDATE - only hubspot_snapshot, preserve local data
+                update_doc = {
+                    'hubspot_deal_id': deal_id,
+                    'hubspot_snapshot': deal_snapshot(props),
+                    'updated_at': datetime.now(timezone.utc).isoformat()
+                }
+                operations.append(UpdateOne({'id': local.get('id')}, {'$set': update_doc}))
+                snapshots.append(rollback_snapshot(
+                    operation_id, stats['snapshots'] + len(snapshots), 'cases', 'update', local.get('id'), deal_id,
+                    before={'hubspot_snapshot': local.get('hubspot_snapshot')}
+                ))
+                stats['updated'] += 1
+        
+        if snapshots and not dry_run:
+            await db.hubspot_sync_snapshots.insert_many(snapshots, ordered=False)
+        stats['snapshots'] += len(snapshots)
+        return operations
+    
+    try:
+        await sync_pipeline(
+            hubspot.pages(
+                "/crm/v3/objects/deals",
+                params={
+                    "limit": 100,
+                    "properties": "dealname,amount,closedate,dealstage,pipeline,hs_object_id,hubspot_owner_id"
+                },
+                limit=limit
+            ),
+            diff,
+            collection=db.cases,
+            dry_run=dry_run
+        )
+    except HubSpotError as e:
+        add_audit_error(stats, f"HubSpot API error: {e.status_code}")
     
     completed_at = datetime.now(timezone.utc).isoformat()
     
@@ -767,8 +809,7 @@ async def run_cases_sync(
             {'$set': {
                 'completed_at': completed_at,
                 'status': 'completed',
-                'stats': stats,
-                'snapshots': audit_record['snapshots']  # Critical: save snapshots for rollback
+                'stats': stats
             }}
         )
     
@@ -794,23 +835,9 @@ async def rollback_cases_sync(
     if audit.get('status') == 'rolled_back':
         raise HTTPException(status_code=400, detail="Already rolled back")
     
-    snapshots = audit.get('snapshots', [])
-    rolled_back = 0
-    errors = []
-    
-    for snap in reversed(snapshots):
-        try:
-            if snap['action'] == 'insert':
-                await db.cases.delete_one({'id': snap['case_id']})
-                rolled_back += 1
-            elif snap['action'] == 'update' and snap.get('before'):
-                await db.cases.update_one(
-                    {'id': snap['case_id']},
-                    {'$set': snap['before']}
-                )
-                rolled_back += 1
-        except Exception as e:
-            errors.append(str(e))
+    rolled_back, errors = await apply_rollback(
+        operation_id, db.cases, audit.get('snapshots', []), id_key='case_id'
+    )
     
     await db.migration_audit.update_one(
         {'operation_id': operation_id},
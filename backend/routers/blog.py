@@ -8,6 +8,9 @@ import uuid
 router = APIRouter(prefix="/blog", tags=["Blog"])
 
 from database import db
+from utils.timestamps import parse_timestamp
+from services.response_cache import response_cache
+from services import blog_classification
 
 # ============ MODELS ============
 
@@ -66,6 +69,14 @@ def estimate_reading_time(content: str) -> int:
     words = len(content.split())
     return max(1, round(words / 200))
 
+def is_visible_now(post: dict, now: datetime) -> bool:
+    """False only for posts with a valid publish_date in the future"""
+    publish_date = post.get("publish_date")
+    if not publish_date:
+        return True
+    published_at = parse_timestamp(publish_date)
+    return published_at is None or published_at <= now
+
 # ============ CATEGORY ENDPOINTS ============
 
 @router.get("/categories")
@@ -94,6 +105,7 @@ async def create_category(data: CategoryCreate):
     
     await db.blog_categories.insert_one(cat_doc)
     del cat_doc["_id"]
+    response_cache.invalidate("blog")
     return {"success": True, "category": cat_doc}
 
 @router.delete("/categories/{category_id}")
@@ -103,6 +115,7 @@ async def delete_category(category_id: str):
     result = await db.blog_categories.delete_one(query)
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Category not found")
+    response_cache.invalidate("blog")
     return {"success": True}
 
 # ============ POST ENDPOINTS ============
@@ -199,6 +212,7 @@ async def create_post(data: PostCreate):
     post_doc["id"] = str(result.inserted_id)
     del post_doc["_id"]
     
+    response_cache.invalidate("blog")
     return {"success": True, "post": post_doc}
 
 @router.put("/posts/{post_id}")
@@ -221,6 +235,7 @@ async def update_post(post_id: str, data: PostUpdate):
     if not result:
         raise HTTPException(status_code=404, detail="Post not found")
     
+    response_cache.invalidate("blog")
     return {"success": True, "post": serialize_doc(result)}
 
 @router.delete("/posts/{post_id}")
@@ -232,6 +247,7 @@ async def delete_post(post_id: str):
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Post not found")
     
+    response_cache.invalidate("blog")
     return {"success": True}
 
 # ============ PUBLIC ENDPOINTS ============
@@ -260,76 +276,21 @@ async def get_public_posts(
     if tag:
         query["tags"] = tag
     
-    posts = await db.blog_posts.find(query).sort("created_at", -1).to_list(limit * 3)  # Get more to filter
+    # Classification is denormalized onto posts (services/blog_classification.py)
+    if program:
+        query["program_name"] = program
+    if competency:
+        query["competency_name"] = competency
+    if level:
+        query["level_name"] = level
     
-    # Filter by publish date
+    # Skip posts scheduled for later, reading until the page is full
     filtered_posts = []
-    for p in posts:
-        publish_date = p.get("publish_date")
-        if publish_date:
-            try:
-                pd = datetime.fromisoformat(publish_date.replace('Z', '+00:00'))
-                if pd <= now:
-                    filtered_posts.append(p)
-            except:
-                filtered_posts.append(p)
-        else:
+    async for p in db.blog_posts.find(query).sort("created_at", -1):
+        if is_visible_now(p, now):
             filtered_posts.append(p)
-    
-    # If filtering by program, competency, or level, we need to check content_items
-    if program or competency or level:
-        final_posts = []
-        for p in filtered_posts:
-            content_item_id = p.get("content_item_id")
-            if not content_item_id:
-                continue
-            
-            content_item = await db.content_items.find_one(
-                {"id": content_item_id},
-                {"_id": 0, "course_id": 1, "competency_id": 1, "level": 1}
-            )
-            if not content_item:
-                continue
-            
-            matches = True
-            
-            # Check program filter
-            if program and matches:
-                if content_item.get("course_id"):
-                    course = await db.courses.find_one({"id": content_item.get("course_id")}, {"_id": 0, "name": 1, "title": 1})
-                    course_name = course.get("name") or course.get("title") if course else None
-                    if course_name != program:
-                        matches = False
-                else:
-                    matches = False
-            
-            # Check competency filter
-            if competency and matches:
-                if content_item.get("competency_id"):
-                    comp = await db.competencies.find_one({"id": content_item.get("competency_id")}, {"_id": 0, "name": 1})
-                    comp_name = comp.get("name") if comp else None
-                    if comp_name != competency:
-                        matches = False
-                else:
-                    matches = False
-            
-            # Check level filter
-            if level and matches:
-                level_num = content_item.get("level")
-                if level_num:
-                    nivel = await db.niveles_certificacion.find_one({"order": level_num}, {"_id": 0, "advancement_es": 1})
-                    level_name = nivel.get("advancement_es") if nivel else None
-                    if level_name != level:
-                        matches = False
-                else:
-                    matches = False
-            
-            if matches:
-                final_posts.append(p)
-        
-        filtered_posts = final_posts[:limit]
-    else:
-        filtered_posts = filtered_posts[:limit]
+            if len(filtered_posts) >= limit:
+                break
     
     # Clean markdown wrapper from content
     for p in filtered_posts:
@@ -347,45 +308,24 @@ async def get_public_posts(
             excerpt = excerpt[:-3]
         p["excerpt"] = excerpt.strip()
     
-    # Get all tags for sidebar (from current language only)
-    all_posts = await db.blog_posts.find({"is_published": True, "language": lang}).to_list(500)
-    all_tags = set()
-    for p in all_posts:
-        all_tags.update(p.get("tags", []))
+    # Sidebar tags and filter options (from current language only)
+    sidebar_query = {"is_published": True, "language": lang}
+    all_tags = await db.blog_posts.distinct("tags", sidebar_query)
+    programs = await db.blog_posts.distinct("program_name", sidebar_query)
+    competencies_set = await db.blog_posts.distinct("competency_name", sidebar_query)
+    levels_set = await db.blog_posts.distinct("level_name", sidebar_query)
     
     # Get categories
     categories = await db.blog_categories.find().to_list(50)
     
-    # Get unique programs, competencies, and levels for filters
-    programs = set()
-    competencies_set = set()
-    levels_set = set()
-    
-    for p in all_posts:
-        if p.get("content_item_id"):
-            ci = await db.content_items.find_one({"id": p.get("content_item_id")}, {"_id": 0, "course_id": 1, "competency_id": 1, "level": 1})
-            if ci:
-                if ci.get("course_id"):
-                    course = await db.courses.find_one({"id": ci.get("course_id")}, {"_id": 0, "name": 1, "title": 1})
-                    if course:
-                        programs.add(course.get("name") or course.get("title"))
-                if ci.get("competency_id"):
-                    comp = await db.competencies.find_one({"id": ci.get("competency_id")}, {"_id": 0, "name": 1})
-                    if comp:
-                        competencies_set.add(comp.get("name"))
-                if ci.get("level"):
-                    nivel = await db.niveles_certificacion.find_one({"order": ci.get("level")}, {"_id": 0, "advancement_es": 1})
-                    if nivel:
-                        levels_set.add(nivel.get("advancement_es"))
-    
     return {
         "posts": [serialize_doc(p) for p in filtered_posts],
-        "tags": sorted(list(all_tags)),
+        "tags": sorted(t for t in all_tags if t),
         "categories": [serialize_doc(c) for c in categories],
         "filters": {
-            "programs": sorted(list(programs)),
-            "competencies": sorted(list(competencies_set)),
-            "levels": sorted(list(levels_set))
+            "programs": sorted(p for p in programs if p),
+            "competencies": sorted(c for c in competencies_set if c),
+            "levels": sorted(l for l in levels_set if l)
         }
     }
 
@@ -522,6 +462,7 @@ async def sync_slide_images_to_blogs():
             )
             updated_count += 1
     
+    response_cache.invalidate("blog")
     return {
         "success": True,
         "blogs_updated": updated_count,
@@ -558,12 +499,19 @@ async def fix_all_image_urls():
             )
             fixed_items += 1
     
+    response_cache.invalidate("blog")
     return {
         "success": True,
         "blogs_fixed": fixed_blogs,
         "items_fixed": fixed_items
     }
 
+@router.post("/sync-classification")
+async def sync_blog_classification():
+    """Recompute program / competency / level names on all blog posts from their content items"""
+    result = await blog_classification.sync_all()
+    return {"success": True, **result}
+
 @router.post("/sync-slugs-to-items")
 async def sync_slugs_to_content_items():
     """Sync blog slugs back to content items for direct linking"""
@@ -16,6 +16,7 @@ from google.auth.transport.requests import Request as GoogleRequest
 from database import db
 from config import GOOGLE_CLIENT_ID, GOOGLE_CLIENT_SECRET
 from routers.auth import get_current_user
+from services.calendar_sync import calendar_sync
 
 logger = logging.getLogger(__name__)
 
@@ -266,6 +267,7 @@ async def disconnect_calendar(current_user: dict = Depends(get_current_user)):
             "$set": {"updated_at": datetime.now(timezone.utc).isoformat()}
         }
     )
+    await calendar_sync.clear()
     
     return {"success": True, "message": "Google Calendar disconnected"}
 
@@ -290,49 +292,13 @@ async def get_calendar_events(
         raise HTTPException(status_code=400, detail="Calendar credentials not found")
     
     try:
-        # Refresh credentials if needed
-        calendar_credentials = refresh_credentials_if_needed(calendar_credentials)
-        
-        # Update stored credentials if they were refreshed
-        if calendar_credentials.get("token") != settings.get("calendar_credentials", {}).get("token"):
-            await db.settings.update_one(
-                {},
-                {"$set": {"calendar_credentials": calendar_credentials}}
-            )
-        
-        # Build credentials object
-        credentials = Credentials(
-            token=calendar_credentials.get("token"),
-            refresh_token=calendar_credentials.get("refresh_token"),
-            token_uri=calendar_credentials.get("token_uri", "https://oauth2.googleapis.com/token"),
-            client_id=calendar_credentials.get("client_id", GOOGLE_CLIENT_ID),
-            client_secret=calendar_credentials.get("client_secret", GOOGLE_CLIENT_SECRET),
-            scopes=calendar_credentials.get("scopes", CALENDAR_SCOPES)
-        )
-        
-        # Build Calendar service
-        service = build('calendar', 'v3', credentials=credentials)
-        
-        # Calculate time range
+        # Served from the local cache kept up to date by the scheduler (services/calendar_sync.py)
         now = datetime.now(timezone.utc)
         time_min = now.isoformat()
         time_max = (now + timedelta(days=days)).isoformat()
         
-        # Fetch events
-        events_result = service.events().list(
-            calendarId='primary',
-            timeMin=time_min,
-            timeMax=time_max,
-            singleEvents=True,
-            orderBy='startTime',
-            showDeleted=False  # Exclude cancelled events
-        ).execute()
-        
-        events = events_result.get('items', [])
-        
-        # Get calendar timezone
-        calendar_info = service.calendars().get(calendarId='primary').execute()
-        default_timezone = calendar_info.get('timeZone', 'America/Mexico_City')
+        events = await calendar_sync.get_events(days=days)
+        default_timezone = await calendar_sync.time_zone() or 'America/Mexico_City'
         
         # Process events
         processed_events = []
@@ -387,3 +353,26 @@ async def get_calendar_events(
     except Exception as e:
         logger.error(f"Error fetching calendar events: {e}")
         raise HTTPException(status_code=500, detail=f"Error fetching calendar events: {str(e)}")
+
+
+@router.post("/sync")
+async def sync_calendar(
+    force_full: bool = False,
+    current_user: dict = Depends(get_current_user)
+):
+    """Sync the local event cache now (incremental unless force_full)"""
+    settings = await get_settings()
+    if not settings.get("calendar_connected"):
+        raise HTTPException(status_code=400, detail="Google Calendar not connected. Please connect in Settings.")
+    
+    try:
+        result = await calendar_sync.sync(force_full=force_full)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error syncing calendar: {str(e)}")
+    return {**result, "status": await calendar_sync.status()}
+
+
+@router.get("/sync-status")
+async def get_calendar_sync_status(current_user: dict = Depends(get_current_user)):
+    """Last sync times, cached event count and sync counters"""
+    return await calendar_sync.status()
@@ -26,7 +26,8 @@ from routers.events_v2 import (
     ensure_company_exists,
     classify_buyer_persona_by_job_title
 )
-from utils.hubspot_helpers import get_hubspot_token, get_hubspot_headers
+from services.hubspot_client import hubspot, HubSpotError
+from services.stats_counters import track_change
 from constants.stages import (
     STAGE_3_VALUES, STAGE_4_VALUES, ALL_CASE_STAGES,
     is_stage_3, is_stage_4, get_stage_phase, validate_stage_transition
@@ -124,177 +125,96 @@ class CreateCaseRequest(BaseModel):
 
 # ============ HUBSPOT DEALS FUNCTIONS ============
 
+HUBSPOT_QUOTE_PROPERTIES = [
+    "hs_title", "hs_status", "hs_quote_amount", "hs_public_url_key", "hs_pdf_download_link", "hs_createdate"
+]
+
+
 async def get_hubspot_list_deals(list_id: str) -> List[str]:
     """Get all deal IDs from a HubSpot list (deals list)"""
-    import httpx
-    
-    headers = await get_hubspot_headers()
-    
-    async with httpx.AsyncClient() as client:
-        all_ids = []
-        after = None
-        
-        while True:
-            url = f"https://api.hubapi.com/crm/v3/lists/{list_id}/memberships?limit=500"
-            if after:
-                url += f"&after={after}"
-            
-            response = await client.get(
-                url,
-                headers=headers,
-                timeout=30.0
-            )
-            
-            if response.status_code != 200:
-                logger.error(f"HubSpot list error: {response.status_code} - {response.text}")
-                break
-            
-            data = response.json()
-            ids = [r["recordId"] for r in data.get("results", [])]
-            all_ids.extend(ids)
-            
-            paging = data.get("paging", {})
-            if "next" in paging:
-                after = paging["next"].get("after")
-            else:
-                break
-        
-        return all_ids
+    try:
+        return await hubspot.list_memberships(list_id)
+    except HubSpotError as e:
+        logger.error(f"HubSpot list error: {e}")
+        return []
 
 
 async def get_hubspot_deals_batch(deal_ids: List[str]) -> List[dict]:
-    """Get full details for a batch of deals from HubSpot"""
-    import httpx
-    
+    """Get full details for deals from HubSpot (any number of ids)"""
     if not deal_ids:
         return []
-    
-    headers = await get_hubspot_headers()
-    
-    async with httpx.AsyncClient() as client:
-        response = await client.post(
-            "https://api.hubapi.com/crm/v3/objects/deals/batch/read",
-            headers=headers,
-            json={
-                "properties": HUBSPOT_DEAL_PROPERTIES,
-                "inputs": [{"id": str(did)} for did in deal_ids]
-            },
-            timeout=60.0
-        )
-        
-        if response.status_code == 200:
-            return response.json().get("results", [])
-        else:
-            logger.error(f"HubSpot deals batch error: {response.status_code} - {response.text}")
-            return []
+    try:
+        return await hubspot.batch_read("deals", deal_ids, HUBSPOT_DEAL_PROPERTIES)
+    except HubSpotError as e:
+        logger.error(f"HubSpot deals batch error: {e}")
+        return []
+
+
+def contacts_with_labels(associations: List[dict]) -> List[dict]:
+    """v4 association results -> [{hubspot_id, labels}]"""
+    return [
+        {
+            "hubspot_id": a["toObjectId"],
+            "labels": [t["label"] for t in a.get("associationTypes", []) if t.get("label")]
+        }
+        for a in associations
+    ]
+
+
+def quote_from_hubspot(quote: dict) -> dict:
+    quote_id = quote.get("id")
+    props = quote.get("properties", {})
+    return {
+        "hubspot_quote_id": quote_id,
+        "title": props.get("hs_title", "Sin título"),
+        "amount": props.get("hs_quote_amount"),
+        "status": props.get("hs_status"),
+        "public_url": f"https://app.hubspot.com/quotes/{quote_id}" if props.get("hs_public_url_key") else None,
+        "pdf_url": props.get("hs_pdf_download_link"),
+        "created_at": props.get("hs_createdate"),
+        "source": "hubspot_native"
+    }
+
+
+async def get_deals_associations(deal_ids: List[str], to_type: str) -> dict:
+    """deal id -> v4 associations to `to_type`, read in batches of 100 deals"""
+    try:
+        return await hubspot.batch_associations("deals", deal_ids, to_type)
+    except HubSpotError as e:
+        logger.warning(f"Could not get deal {to_type} associations: {e}")
+        return {str(deal_id): [] for deal_id in deal_ids}
+
+
+async def get_quotes_batch(quote_ids: List[str]) -> dict:
+    """quote id -> quote dict (case format)"""
+    if not quote_ids:
+        return {}
+    try:
+        quotes = await hubspot.batch_read("quotes", quote_ids, HUBSPOT_QUOTE_PROPERTIES)
+    except HubSpotError as e:
+        logger.warning(f"Could not get quotes: {e}")
+        return {}
+    return {str(q.get("id")): quote_from_hubspot(q) for q in quotes}
 
 
 async def get_deal_associated_contacts(deal_id: str) -> List[dict]:
     """Get contact IDs and association labels from a deal"""
-    import httpx
-    
-    headers = await get_hubspot_headers()
-    
-    async with httpx.AsyncClient() as client:
-        response = await client.get(
-            f"https://api.hubapi.com/crm/v4/objects/deals/{deal_id}/associations/contacts",
-            headers=headers,
-            timeout=30.0
-        )
-        
-        if response.status_code == 200:
-            results = response.json().get("results", [])
-            contacts_with_labels = []
-            for r in results:
-                contact_id = r["toObjectId"]
-                # Extract labels from associationTypes
-                labels = []
-                for assoc_type in r.get("associationTypes", []):
-                    label = assoc_type.get("label")
-                    if label:
-                        labels.append(label)
-                contacts_with_labels.append({
-                    "hubspot_id": contact_id,
-                    "labels": labels
-                })
-            return contacts_with_labels
-        else:
-            logger.warning(f"Could not get deal contact associations for {deal_id}: {response.status_code}")
-            return []
+    associations = await get_deals_associations([deal_id], "contacts")
+    return contacts_with_labels(associations.get(str(deal_id), []))
 
 
 async def get_deal_associated_companies(deal_id: str) -> List[str]:
     """Get ALL company IDs associated with a deal"""
-    import httpx
-    
-    headers = await get_hubspot_headers()
-    
-    async with httpx.AsyncClient() as client:
-        response = await client.get(
-            f"https://api.hubapi.com/crm/v4/objects/deals/{deal_id}/associations/companies",
-            headers=headers,
-            timeout=30.0
-        )
-        
-        if response.status_code == 200:
-            results = response.json().get("results", [])
-            return [r["toObjectId"] for r in results]
-        else:
-            logger.warning(f"Could not get deal company associations for {deal_id}: {response.status_code}")
-            return []
+    associations = await get_deals_associations([deal_id], "companies")
+    return [a["toObjectId"] for a in associations.get(str(deal_id), [])]
 
 
 async def get_deal_associated_quotes(deal_id: str) -> List[dict]:
     """Get ALL quotes associated with a deal from HubSpot"""
-    import httpx
-    
-    headers = await get_hubspot_headers()
-    
-    async with httpx.AsyncClient() as client:
-        # First get quote IDs
-        response = await client.get(
-            f"https://api.hubapi.com/crm/v4/objects/deals/{deal_id}/associations/quotes",
-            headers=headers,
-            timeout=30.0
-        )
-        
-        if response.status_code != 200:
-            logger.warning(f"Could not get deal quote associations for {deal_id}: {response.status_code}")
-            return []
-        
-        results = response.json().get("results", [])
-        quote_ids = [r["toObjectId"] for r in results]
-        
-        if not quote_ids:
-            return []
-        
-        # Fetch quote details
-        quotes = []
-        for quote_id in quote_ids:
-            quote_response = await client.get(
-                f"https://api.hubapi.com/crm/v3/objects/quotes/{quote_id}",
-                headers=headers,
-                params={
-                    "properties": "hs_title,hs_status,hs_quote_amount,hs_public_url_key,hs_pdf_download_link,hs_createdate"
-                },
-                timeout=30.0
-            )
-            
-            if quote_response.status_code == 200:
-                quote_data = quote_response.json()
-                props = quote_data.get("properties", {})
-                quotes.append({
-                    "hubspot_quote_id": quote_id,
-                    "title": props.get("hs_title", "Sin título"),
-                    "amount": props.get("hs_quote_amount"),
-                    "status": props.get("hs_status"),
-                    "public_url": f"https://app.hubspot.com/quotes/{quote_id}" if props.get("hs_public_url_key") else None,
-                    "pdf_url": props.get("hs_pdf_download_link"),
-                    "created_at": props.get("hs_createdate"),
-                    "source": "hubspot_native"
-                })
-        
-        return quotes
+    associations = await get_deals_associations([deal_id], "quotes")
+    quote_ids = [str(a["toObjectId"]) for a in associations.get(str(deal_id), [])]
+    quotes = await get_quotes_batch(quote_ids)
+    return [quotes[q] for q in quote_ids if q in quotes]
 
 
 # ============ IMPORT PROGRESS TRACKING ============
@@ -361,18 +281,34 @@ async def import_hubspot_deals_with_progress(
             "percent": 5
         })
         
-        # Fetch deals in batches
+        # Fetch deals in batches (concurrent chunks of 100, yielded in order)
         all_deals = []
-        batch_size = 100
-        for i in range(0, len(deal_ids), batch_size):
-            batch = deal_ids[i:i + batch_size]
-            deals = await get_hubspot_deals_batch(batch)
-            all_deals.extend(deals)
-            
-            cases_import_progress[import_id].update({
-                "phase": f"Obteniendo datos: {len(all_deals)}/{total_deals}",
-                "percent": int(5 + (len(all_deals) / total_deals * 15))
-            })
+        try:
+            async for deals in hubspot.iter_batch_read("deals", deal_ids, HUBSPOT_DEAL_PROPERTIES):
+                all_deals.extend(deals)
+                
+                cases_import_progress[import_id].update({
+                    "phase": f"Obteniendo datos: {len(all_deals)}/{total_deals}",
+                    "percent": int(5 + (len(all_deals) / total_deals * 15))
+                })
+        except HubSpotError as e:
+            logger.error(f"HubSpot deals batch error: {e}")
+        
+        # Associations and associated records for every deal, in batches
+        fetched_deal_ids = [str(deal.get("id")) for deal in all_deals]
+        companies_by_deal = await get_deals_associations(fetched_deal_ids, "companies")
+        quotes_by_deal = await get_deals_associations(fetched_deal_ids, "quotes")
+        contacts_by_deal = await get_deals_associations(fetched_deal_ids, "contacts")
+        
+        quotes_by_id = await get_quotes_batch(list({
+            str(a["toObjectId"]) for associations in quotes_by_deal.values() for a in associations
+        }))
+        associated_contact_ids = list({
+            str(a["toObjectId"]) for associations in contacts_by_deal.values() for a in associations
+        })
+        contacts_by_id = {
+            str(c.get("id")): c for c in await get_hubspot_contacts_batch(associated_contact_ids)
+        } if associated_contact_ids else {}
         
         # Process each deal
         created = 0
@@ -394,7 +330,7 @@ async def import_hubspot_deals_with_progress(
                 existing_case = await db.cases.find_one({"hubspot_deal_id": hubspot_deal_id})
                 
                 # Get ALL associated companies
-                company_hs_ids = await get_deal_associated_companies(hubspot_deal_id)
+                company_hs_ids = [a["toObjectId"] for a in companies_by_deal.get(str(hubspot_deal_id), [])]
                 company_ids = []
                 company_names = []
                 
@@ -411,7 +347,11 @@ async def import_hubspot_deals_with_progress(
                         companies_imported += 1
                 
                 # Get ALL associated quotes from HubSpot
-                hubspot_quotes = await get_deal_associated_quotes(hubspot_deal_id)
+                hubspot_quotes = [
+                    quotes_by_id[str(a["toObjectId"])]
+                    for a in quotes_by_deal.get(str(hubspot_deal_id), [])
+                    if str(a["toObjectId"]) in quotes_by_id
+                ]
                 quotes_imported += len(hubspot_quotes)
                 
                 # Add Google Drive quote if available
@@ -424,7 +364,7 @@ async def import_hubspot_deals_with_progress(
                     })
                 
                 # Get associated contacts with labels
-                contact_associations = await get_deal_associated_contacts(hubspot_deal_id)
+                contact_associations = contacts_with_labels(contacts_by_deal.get(str(hubspot_deal_id), []))
                 contact_internal_ids = []
                 
                 # Process each associated contact
@@ -440,11 +380,10 @@ async def import_hubspot_deals_with_progress(
                             if role not in roles_from_labels:
                                 roles_from_labels.append(role)
                     
-                    contacts = await get_hubspot_contacts_batch([contact_hs_id])
-                    if not contacts:
+                    contact = contacts_by_id.get(str(contact_hs_id))
+                    if not contact:
                         continue
                     
-                    contact = contacts[0]
                     c_props = contact.get("properties", {})
                     email = (c_props.get("email") or "").strip().lower()
                     
@@ -498,6 +437,7 @@ async def import_hubspot_deals_with_progress(
                                 "updated_at": now
                             }}
                         )
+                        await track_change("unified_contacts", existing_contact, {"stage": new_stage})
                         contact_internal_ids.append(existing_contact["id"])
                         contacts_updated += 1
                     else:
@@ -528,6 +468,7 @@ async def import_hubspot_deals_with_progress(
                         
                         try:
                             await db.unified_contacts.insert_one(new_contact)
+                            await track_change("unified_contacts", None, new_contact)
                             contact_internal_ids.append(new_contact_id)
                             contacts_updated += 1
                         except Exception as e:
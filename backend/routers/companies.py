@@ -16,6 +16,9 @@ import logging
 
 from .auth import get_current_user
 from .legacy import db
+from services.company_association import company_key, ensure_company_keys, rename_contact_company
+from utils.pagination import InvalidCursor, cached_total, keyset_page
+from services.response_cache import response_cache
 from services.company_auto_merge import (
     run_auto_merge,
     get_duplicate_domains_preview,
@@ -143,14 +146,7 @@ async def merge_companies(
     for company in companies_to_merge:
         company_name = company.get("name", "")
         if company_name:
-            result = await db.unified_contacts.update_many(
-                {"company": {"$regex": f"^{re.escape(company_name)}$", "$options": "i"}},
-                {"$set": {
-                    "company": primary_name,
-                    "updated_at": now
-                }}
-            )
-            contacts_updated += result.modified_count
+            contacts_updated += await rename_contact_company(db, [company_name], primary_name, {"updated_at": now})
     
     # Mark merged companies as merged in unified_companies
     for merge_id in merge_ids:
@@ -187,6 +183,7 @@ async def merge_companies(
         "initiated_by_email": current_user.get("email")
     })
     
+    response_cache.invalidate("public_website")
     return {
         "success": True,
         "primary_company_id": primary_id,
@@ -202,9 +199,11 @@ async def list_companies(
     industry: Optional[str] = None,
     limit: int = 100,
     skip: int = 0,
+    cursor: Optional[str] = None,
+    include_total: bool = True,
     current_user: dict = Depends(get_current_user)
 ):
-    """List companies with optional filtering from unified_companies"""
+    """List companies with optional filtering from unified_companies (pass next_cursor as cursor for the next page)"""
     # Build query for unified_companies (single source of truth)
     query = {"is_merged": {"$ne": True}}
     
@@ -216,13 +215,18 @@ async def list_companies(
         query["industry"] = industry
     
     # Get companies from unified_companies
-    companies = await db.unified_companies.find(
-        query,
-        {"_id": 0, "id": 1, "hs_object_id": 1, "hubspot_id": 1, "name": 1, "domain": 1, "domains": 1, "industry": 1, "industry_code": 1, "classification": 1}
-    ).sort("name", 1).skip(skip).limit(limit).to_list(limit)
+    try:
+        companies, next_cursor = await keyset_page(
+            db.unified_companies,
+            query,
+            {"_id": 0, "id": 1, "hs_object_id": 1, "hubspot_id": 1, "name": 1, "domain": 1, "domains": 1, "industry": 1, "industry_code": 1, "classification": 1},
+            "name", 1, limit, cursor=cursor, skip=skip
+        )
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
-    # Get total count
-    total = await db.unified_companies.count_documents(query)
+    # Get total count (cached per filter)
+    total = await cached_total(db.unified_companies, query) if include_total else None
     
     # Ensure each company has an id field
     for c in companies:
@@ -232,6 +236,7 @@ async def list_companies(
     return {
         "companies": companies,
         "total": total,
+        "next_cursor": next_cursor,
         "limit": limit,
         "skip": skip
     }
@@ -288,6 +293,7 @@ async def create_company(
     
     await db.unified_companies.insert_one(new_company)
     
+    response_cache.invalidate("public_website")
     return {
         "success": True,
         "company": {
@@ -607,18 +613,18 @@ async def get_company_detail(
     
     company_name = company.get("name", "")
     
-    # Get count of associated contacts first
+    # Get count of associated contacts first (indexed company key)
     contacts_count = 0
-    if company_name:
-        contacts_count = await db.unified_contacts.count_documents(
-            {"company": {"$regex": f"^{re.escape(company_name)}$", "$options": "i"}}
-        )
+    name_key = company_key(company_name)
+    if name_key:
+        await ensure_company_keys(db)
+        contacts_count = await db.unified_contacts.count_documents({"company_key": name_key})
     
     # Get associated contacts (no practical limit - up to 100k)
     contacts = []
-    if company_name:
+    if name_key:
         contacts = await db.unified_contacts.find(
-            {"company": {"$regex": f"^{re.escape(company_name)}$", "$options": "i"}},
+            {"company_key": name_key},
             {"_id": 0, "id": 1, "name": 1, "email": 1, "phone": 1, "job_title": 1, 
              "stage": 1, "roles": 1, "buyer_persona": 1}
         ).sort("name", 1).to_list(100000)
@@ -779,11 +785,7 @@ async def update_company(
     
     if request.name and old_name and new_name != old_name:
         # Update contacts
-        result = await db.unified_contacts.update_many(
-            {"company": {"$regex": f"^{re.escape(old_name)}$", "$options": "i"}},
-            {"$set": {"company": new_name, "updated_at": now}}
-        )
-        contacts_updated = result.modified_count
+        contacts_updated = await rename_contact_company(db, [old_name], new_name, {"updated_at": now})
         
         # Update cases
         result = await db.cases.update_many(
@@ -792,6 +794,7 @@ async def update_company(
         )
         cases_updated = result.modified_count
     
+    response_cache.invalidate("public_website")
     return {
         "success": True,
         "company_id": company_id,
@@ -1139,11 +1142,7 @@ async def merge_two_companies(
     # 5. Update contacts: change company name from secondary to primary
     contacts_updated = 0
     if secondary_name:
-        result = await db.unified_contacts.update_many(
-            {"company": {"$regex": f"^{re.escape(secondary_name)}$", "$options": "i"}},
-            {"$set": {"company": primary_name, "updated_at": now}}
-        )
-        contacts_updated = result.modified_count
+        contacts_updated = await rename_contact_company(db, [secondary_name], primary_name, {"updated_at": now})
     
     # 6. Update cases: change company_name and company_names
     cases_updated = 0
@@ -1210,6 +1209,7 @@ async def merge_two_companies(
         "initiated_by_email": current_user.get("email")
     })
     
+    response_cache.invalidate("public_website")
     return {
         "success": True,
         "message": f"'{secondary_name}' combinada con '{primary_name}'",
@@ -14,6 +14,8 @@ import logging
 import asyncio
 
 from database import db
+from utils.timestamps import timestamp_query
+from services.stats_counters import track_change
 from routers.auth import get_current_user
 from routers.contacts import normalize_phone_to_e164, normalize_email_entry, CONTACT_TYPES
 
@@ -875,6 +877,7 @@ async def run_import_background(
                     }
 
                     await db.unified_contacts.insert_one(new_contact)
+                    await track_change("unified_contacts", None, new_contact)
                     created += 1
                     email = processed_data.get("emails", [{}])[0].get("email", "") if processed_data.get("emails") else ""
                     if email and event:
@@ -964,6 +967,7 @@ async def run_import_background(
                             {"id": contact_id},
                             {"$set": update_data}
                         )
+                        await track_change("unified_contacts", existing, update_data)
                         updated += 1
                     else:
                         errors += 1
@@ -1193,14 +1197,14 @@ async def schedule_e6_for_batch(event_id: str, contacts_imported: int) -> int:
     
     # Find contacts recently added to this event
     now = datetime.now(timezone.utc)
-    one_hour_ago = (now - timedelta(hours=1)).isoformat()
+    one_hour_ago = now - timedelta(hours=1)
     
     # Get contacts with recent registration to this event
     contacts = await db.unified_contacts.find({
         "webinar_history": {
             "$elemMatch": {
                 "event_id": event_id,
-                "registered_at": {"$gte": one_hour_ago}
+                **timestamp_query("registered_at", gte=one_hour_ago)
             }
         },
         f"last_email_e6_sent.{event_id}": {"$exists": False}  # Not already sent E6 for this event
@@ -11,7 +11,13 @@ import logging
 
 from .auth import get_current_user
 from database import db
-from services.company_association import associate_contact_with_company, find_company_by_email_domain
+from utils.pagination import InvalidCursor, cached_total, keyset_page
+from utils.timestamps import timestamp_query
+from services.stats_counters import counter_projection, ensure_counters, get_counters, get_counters_state, track_change
+from services.company_association import (
+    associate_contact_with_company, company_key, company_key_fields, company_keys_for,
+    ensure_company_keys, find_company_by_email_domain
+)
 
 logger = logging.getLogger(__name__)
 
@@ -519,8 +525,7 @@ async def search_contacts_simple(
     return {"contacts": contacts, "total": len(contacts)}
 
 
-@router.get("")
-async def get_contacts(
+async def build_contacts_query(
     stage: Optional[int] = None,
     buyer_persona: Optional[str] = None,
     status: Optional[str] = None,
@@ -528,13 +533,10 @@ async def get_contacts(
     tag: Optional[str] = None,
     source: Optional[str] = None,
     company: Optional[str] = None,
-    companies: Optional[str] = None,  # Comma-separated list of companies
-    role: Optional[str] = None,
-    limit: int = 100,
-    skip: int = 0,
-    current_user: dict = Depends(get_current_user)
-):
-    """Get all contacts with optional filters"""
+    companies: Optional[str] = None,
+    role: Optional[str] = None
+) -> dict:
+    """Contact filter of GET /contacts (shared with the contact export)"""
     query = {}
     
     if stage is not None:
@@ -553,9 +555,9 @@ async def get_contacts(
         # Multiple companies filter - case insensitive
         company_list = [c.strip() for c in companies.split(",") if c.strip()]
         if company_list:
-            # Use $or with regex for case-insensitive matching
-            company_conditions = [{"company": {"$regex": f"^{escape_regex(c)}$", "$options": "i"}} for c in company_list]
-            company_filter = {"$or": company_conditions}
+            # Case-insensitive exact match through the indexed company key
+            await ensure_company_keys(db)
+            company_filter = {"company_key": {"$in": company_keys_for(company_list)}}
     elif company:
         company_filter = {"company": {"$regex": company, "$options": "i"}}
     
@@ -596,24 +598,57 @@ async def get_contacts(
         else:
             query["$or"] = search_conditions
     
-    total = await db.unified_contacts.count_documents(query)
-    contacts = await db.unified_contacts.find(
-        query, {"_id": 0}
-    ).sort("created_at", -1).skip(skip).limit(limit).to_list(limit)
+    return query
+
+
+@router.get("")
+async def get_contacts(
+    stage: Optional[int] = None,
+    buyer_persona: Optional[str] = None,
+    status: Optional[str] = None,
+    search: Optional[str] = None,
+    tag: Optional[str] = None,
+    source: Optional[str] = None,
+    company: Optional[str] = None,
+    companies: Optional[str] = None,  # Comma-separated list of companies
+    role: Optional[str] = None,
+    limit: int = 100,
+    skip: int = 0,
+    cursor: Optional[str] = None,
+    include_total: bool = True,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Get all contacts with optional filters.
     
-    # Count by stage - optimized single aggregation query
-    stage_pipeline = [
-        {"$group": {"_id": "$stage", "count": {"$sum": 1}}}
-    ]
-    stage_results = await db.unified_contacts.aggregate(stage_pipeline).to_list(None)
+    Pass the returned next_cursor as `cursor` to get the next page (constant
+    time at any depth); skip is only used without a cursor. `total` is cached
+    per filter for a short while, or omitted with include_total=false.
+    """
+    query = await build_contacts_query(
+        stage=stage, buyer_persona=buyer_persona, status=status, search=search, tag=tag,
+        source=source, company=company, companies=companies, role=role
+    )
+    
+    try:
+        contacts, next_cursor = await keyset_page(
+            db.unified_contacts, query, {"_id": 0}, "created_at", -1, limit, cursor=cursor, skip=skip
+        )
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    total = await cached_total(db.unified_contacts, query) if include_total else None
+    
+    # Count by stage (stat counters)
+    await ensure_counters()
+    stage_results = await get_counters("unified_contacts", "stage")
     stage_counts = {}
     for s in range(1, 6):
-        count = next((r["count"] for r in stage_results if r["_id"] == s), 0)
-        stage_counts[s] = {"count": count, "name": STAGE_NAMES[s]}
+        stage_counts[s] = {"count": stage_results.get(str(s), 0), "name": STAGE_NAMES[s]}
     
     return {
         "contacts": contacts,
         "total": total,
+        "next_cursor": next_cursor,
         "stage_counts": stage_counts
 }
 
@@ -624,9 +659,11 @@ async def get_contacts_by_stage(
     buyer_persona: Optional[str] = None,
     limit: int = 100,
     skip: int = 0,
+    cursor: Optional[str] = None,
+    include_total: bool = True,
     current_user: dict = Depends(get_current_user)
 ):
-    """Get contacts for a specific stage"""
+    """Get contacts for a specific stage (cursor pagination as in GET /contacts)"""
     if stage < 1 or stage > 5:
         raise HTTPException(status_code=400, detail="Stage must be between 1 and 5")
     
@@ -642,14 +679,18 @@ async def get_contacts_by_stage(
             {"company": {"$regex": safe_search, "$options": "i"}}
         ]
     
-    total = await db.unified_contacts.count_documents(query)
-    contacts = await db.unified_contacts.find(
-        query, {"_id": 0}
-    ).sort("created_at", -1).skip(skip).limit(limit).to_list(limit)
+    try:
+        contacts, next_cursor = await keyset_page(
+            db.unified_contacts, query, {"_id": 0}, "created_at", -1, limit, cursor=cursor, skip=skip
+        )
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    total = await cached_total(db.unified_contacts, query) if include_total else None
     
     return {
         "contacts": contacts,
         "total": total,
+        "next_cursor": next_cursor,
         "stage": stage,
         "stage_name": STAGE_NAMES[stage]
     }
@@ -682,60 +723,52 @@ async def get_companies(
 
 @router.get("/stats")
 async def get_contact_stats(current_user: dict = Depends(get_current_user)):
-    """Get contact statistics across all stages"""
-    total = await db.unified_contacts.count_documents({})
+    """
+    Get contact statistics across all stages. Stage / status / persona come
+    from the stat counters; `counters` says when they were last reconciled.
+    """
+    await ensure_counters()
+    by_stage = await get_counters("unified_contacts", "stage")
+    total = sum(by_stage.values())
     
     # Get new contacts this month
     from datetime import datetime, timezone
     now = datetime.now(timezone.utc)
     first_of_month = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-    new_this_month = await db.unified_contacts.count_documents({
-        "created_at": {"$gte": first_of_month.isoformat()}
-    })
+    new_this_month = await db.unified_contacts.count_documents(
+        timestamp_query("created_at", gte=first_of_month)
+    )
     
     stats = {
         "total": total,
         "new_this_month": new_this_month,
         "by_stage": {},
         "by_status": {},
-        "by_persona": {}
+        "by_persona": {},
+        "counters": await get_counters_state()
     }
     
     # Count by stage (use numeric keys for frontend compatibility)
     for s in range(1, 6):
-        count = await db.unified_contacts.count_documents({"stage": s})
-        stats["by_stage"][str(s)] = count
+        stats["by_stage"][str(s)] = by_stage.get(str(s), 0)
     
     # Count by status
-    pipeline = [
-        {"$group": {"_id": "$status", "count": {"$sum": 1}}}
-    ]
-    status_counts = await db.unified_contacts.aggregate(pipeline).to_list(20)
-    for item in status_counts:
-        stats["by_status"][item["_id"] or "unknown"] = item["count"]
+    for status, count in (await get_counters("unified_contacts", "status")).items():
+        stats["by_status"][status or "unknown"] = stats["by_status"].get(status or "unknown", 0) + count
     
     # Count by persona
-    pipeline = [
-        {"$match": {"buyer_persona": {"$ne": ""}}},
-        {"$group": {"_id": "$buyer_persona", "count": {"$sum": 1}}}
-    ]
-    persona_counts = await db.unified_contacts.aggregate(pipeline).to_list(50)
-    for item in persona_counts:
-        if item["_id"]:
-            stats["by_persona"][item["_id"]] = item["count"]
+    for persona, count in (await get_counters("unified_contacts", "buyer_persona")).items():
+        if persona:
+            stats["by_persona"][persona] = count
     
     return stats
 
 @router.get("/sources")
 async def get_contact_sources(current_user: dict = Depends(get_current_user)):
-    """Get all unique sources from contacts"""
-    pipeline = [
-        {"$match": {"source": {"$nin": [None, ""]}}},
-        {"$group": {"_id": "$source", "count": {"$sum": 1}}},
-        {"$sort": {"count": -1}}
-    ]
-    results = await db.unified_contacts.aggregate(pipeline).to_list(100)
-    sources = [item["_id"] for item in results if item["_id"]]
+    """Get all unique sources from contacts (from the stat counters, most used first)"""
+    await ensure_counters()
+    counts = await get_counters("unified_contacts", "source")
+    sources = sorted((source for source in counts if source), key=lambda source: -counts[source])[:100]
     return {"sources": sources, "total": len(sources)}
 
 @router.get("/{contact_id}")
@@ -860,8 +893,10 @@ async def create_contact(
         "updated_at": now,
         "notes": contact.notes
     }
+    new_contact.update(company_key_fields(new_contact))
     
     await db.unified_contacts.insert_one(new_contact)
+    await track_change("unified_contacts", None, new_contact)
     del new_contact["_id"]
     return new_contact
 
@@ -935,6 +970,9 @@ async def update_contact(
                 }]
                 logger.info(f"Auto-associated contact with company '{company_match['company_name']}' by email domain on update")
     
+    if "company" in update_data or "companies" in update_data:
+        update_data.update(company_key_fields({**(existing or {}), **update_data}))
+    
     if not existing:
         # Contact doesn't exist - create it (upsert behavior)
         # This handles contacts from calendar that don't have a DB record yet
@@ -948,6 +986,7 @@ async def update_contact(
             **update_data
         }
         await db.unified_contacts.insert_one(new_contact)
+        await track_change("unified_contacts", None, new_contact)
         logger.info(f"Created new contact from upsert: {contact_id}")
         created = await db.unified_contacts.find_one({"id": contact_id}, {"_id": 0})
         return created
@@ -956,6 +995,7 @@ async def update_contact(
         {"id": contact_id},
         {"$set": update_data}
     )
+    await track_change("unified_contacts", existing, update_data)
     
     updated = await db.unified_contacts.find_one({"id": contact_id}, {"_id": 0})
     return updated
@@ -983,6 +1023,7 @@ async def update_contact_stage(
             "updated_at": datetime.now(timezone.utc).isoformat()
         }}
     )
+    await track_change("unified_contacts", existing, {"stage": stage})
     
     # NOTE: Automatic Stage 4/5 → Outbound classification was REMOVED per design decision.
     # Company classification is now ONLY set via:
@@ -1052,9 +1093,10 @@ async def remove_contact_tag(
 @router.delete("/{contact_id}")
 async def delete_contact(contact_id: str, current_user: dict = Depends(get_current_user)):
     """Delete a contact"""
-    result = await db.unified_contacts.delete_one({"id": contact_id})
-    if result.deleted_count == 0:
+    existing = await db.unified_contacts.find_one_and_delete({"id": contact_id}, counter_projection("unified_contacts"))
+    if existing is None:
         raise HTTPException(status_code=404, detail="Contact not found")
+    await track_change("unified_contacts", existing, None)
     return {"success": True, "deleted_id": contact_id}
 
 @router.post("/cleanup/non-mexico")
@@ -1570,11 +1612,12 @@ async def get_company_orgchart(
     current_user: dict = Depends(get_current_user)
 ):
     """Get all contacts for a company formatted for org chart visualization"""
-    # Get all contacts for this company
-    contacts = await db.unified_contacts.find(
-        {"company": {"$regex": f"^{company_name}$", "$options": "i"}},
-        {"_id": 0}
-    ).to_list(500)
+    # Get all contacts for this company (indexed company key)
+    contacts = []
+    key = company_key(company_name)
+    if key:
+        await ensure_company_keys(db)
+        contacts = await db.unified_contacts.find({"company_key": key}, {"_id": 0}).to_list(500)
     
     if not contacts:
         return {
@@ -2003,7 +2046,7 @@ class MergeRequest(BaseModel):
 
 @router.get("/admin/find-duplicates")
 async def admin_find_duplicate_contacts(
-    method: str = "name_company",  # name_company, email, phone
+    method: str = "name_company",  # name_company, email, phone, linkedin, all
     threshold: float = 0.8,
     current_user: dict = Depends(get_current_user)
 ):
@@ -2014,152 +2057,79 @@ async def admin_find_duplicate_contacts(
     - name_company: Match by similar name + same company
     - email: Match by shared email addresses
     - phone: Match by shared phone numbers
+    - linkedin: Match by the same LinkedIn profile
+    - all: Any of the above
+    
+    Groups come from the contact duplicate candidates cache
+    (services/contact_dedup.py), which joins all match types: a group is
+    listed under every method that links it. The cache scores names at
+    CONTACT_DEDUP_NAME_THRESHOLD; a higher threshold narrows name matches.
     """
-    import re
-    from difflib import SequenceMatcher
+    from services.contact_dedup import get_contact_candidates, get_dedup_state, refresh_contact_candidates_cache
     
-    contacts = await db.unified_contacts.find(
-        {"is_merged": {"$ne": True}},
-        {"_id": 0, "id": 1, "name": 1, "first_name": 1, "last_name": 1, 
-         "email": 1, "emails": 1, "phone": 1, "phones": 1, "company": 1, 
-         "job_title": 1, "linkedin_url": 1, "stage": 1, "buyer_persona": 1}
-    ).to_list(20000)
+    if not await get_dedup_state():
+        await refresh_contact_candidates_cache()
     
-    duplicate_groups = []
-    processed_ids = set()
+    cached = await get_contact_candidates(
+        match_type=None if method == "all" else method,
+        min_name_score=threshold * 100 if method == "name_company" else None
+    )
     
-    def normalize_name(name):
-        if not name:
-            return ""
-        return re.sub(r'[^a-z0-9]', '', name.lower())
+    contact_ids = [cid for g in cached["groups"] for cid in g["contact_ids"]]
+    contacts_by_id = {
+        c["id"]: c async for c in db.unified_contacts.find(
+            {"id": {"$in": contact_ids}, "is_merged": {"$ne": True}},
+            {"_id": 0, "id": 1, "name": 1, "first_name": 1, "last_name": 1, 
+             "email": 1, "emails": 1, "phone": 1, "phones": 1, "company": 1, 
+             "job_title": 1, "linkedin_url": 1, "stage": 1, "buyer_persona": 1}
+        )
+    }
     
-    def get_all_emails(contact):
-        emails = set()
-        if contact.get("email"):
-            emails.add(contact["email"].lower().strip())
-        for e in contact.get("emails", []):
-            if e.get("email"):
-                emails.add(e["email"].lower().strip())
-        return emails
-    
-    def get_all_phones(contact):
-        phones = set()
-        if contact.get("phone"):
-            # Normalize: keep only digits
-            normalized = re.sub(r'[^0-9]', '', contact["phone"])
-            if len(normalized) >= 10:
-                phones.add(normalized[-10:])  # Last 10 digits
-        for p in contact.get("phones", []):
-            raw = p.get("raw_input", "") or p.get("e164", "")
-            normalized = re.sub(r'[^0-9]', '', raw)
-            if len(normalized) >= 10:
-                phones.add(normalized[-10:])
-        return phones
-    
-    if method == "name_company":
-        # Group by company first
-        by_company = {}
-        for c in contacts:
-            company = normalize_name(c.get("company", ""))
-            if company:
-                if company not in by_company:
-                    by_company[company] = []
-                by_company[company].append(c)
-        
-        # Find similar names within each company
-        for company, company_contacts in by_company.items():
-            if len(company_contacts) < 2:
-                continue
-                
-            for i, c1 in enumerate(company_contacts):
-                if c1["id"] in processed_ids:
-                    continue
-                    
-                name1 = normalize_name(c1.get("name") or f"{c1.get('first_name', '')} {c1.get('last_name', '')}".strip())
-                if not name1:
-                    continue
-                
-                group = [c1]
-                
-                for j, c2 in enumerate(company_contacts):
-                    if i >= j or c2["id"] in processed_ids:
-                        continue
-                    
-                    name2 = normalize_name(c2.get("name") or f"{c2.get('first_name', '')} {c2.get('last_name', '')}".strip())
-                    if not name2:
-                        continue
-                    
-                    # Calculate similarity
-                    similarity = SequenceMatcher(None, name1, name2).ratio()
-                    if similarity >= threshold:
-                        group.append(c2)
-                
-                if len(group) > 1:
-                    for c in group:
-                        processed_ids.add(c["id"])
-                    duplicate_groups.append({
-                        "match_type": "name_company",
-                        "match_key": c1.get("company", ""),
-                        "contacts": group,
-                        "confidence": round(similarity * 100)
-                    })
-    
-    elif method == "email":
-        # Group by email
-        email_map = {}
-        for c in contacts:
-            for email in get_all_emails(c):
-                if email not in email_map:
-                    email_map[email] = []
-                email_map[email].append(c)
-        
-        for email, email_contacts in email_map.items():
-            if len(email_contacts) > 1:
-                ids = [c["id"] for c in email_contacts]
-                if not any(id in processed_ids for id in ids):
-                    for id in ids:
-                        processed_ids.add(id)
-                    duplicate_groups.append({
-                        "match_type": "email",
-                        "match_key": email,
-                        "contacts": email_contacts,
-                        "confidence": 100
-                    })
-    
-    elif method == "phone":
-        # Group by phone
-        phone_map = {}
-        for c in contacts:
-            for phone in get_all_phones(c):
-                if phone not in phone_map:
-                    phone_map[phone] = []
-                phone_map[phone].append(c)
-        
-        for phone, phone_contacts in phone_map.items():
-            if len(phone_contacts) > 1:
-                ids = [c["id"] for c in phone_contacts]
-                if not any(id in processed_ids for id in ids):
-                    for id in ids:
-                        processed_ids.add(id)
-                    duplicate_groups.append({
-                        "match_type": "phone",
-                        "match_key": phone,
-                        "contacts": phone_contacts,
-                        "confidence": 95
-                    })
-    
-    # Sort by confidence descending
-    duplicate_groups.sort(key=lambda x: (x["confidence"], len(x["contacts"])), reverse=True)
+    duplicate_groups = []
+    for group in cached["groups"]:
+        # Contacts merged or deleted since the last cache update are dropped
+        contacts = [contacts_by_id[cid] for cid in group["contact_ids"] if cid in contacts_by_id]
+        if len(contacts) > 1:
+            duplicate_groups.append({
+                "match_type": group["match_type"],
+                "match_types": group["match_types"],
+                "match_key": group["match_key"],
+                "contacts": contacts,
+                "confidence": group["confidence"]
+            })
     
     return {
         "method": method,
         "threshold": threshold,
-        "total_groups": len(duplicate_groups),
-        "total_duplicates": sum(len(g["contacts"]) for g in duplicate_groups),
-        "groups": duplicate_groups[:50]  # Return top 50 groups
+        "total_groups": cached["total_groups"],
+        "total_duplicates": cached["total_duplicates"],
+        "groups": duplicate_groups  # Top 50 groups
     }
 
 
+@router.post("/admin/find-duplicates/refresh")
+async def admin_refresh_duplicate_candidates(
+    current_user: dict = Depends(get_current_user)
+):
+    """Rebuild the contact duplicate candidates cache"""
+    from services.contact_dedup import refresh_contact_candidates_cache
+    
+    result = await refresh_contact_candidates_cache()
+    if not result.get("success"):
+        raise HTTPException(status_code=500, detail=result.get("error"))
+    return result
+
+
+@router.get("/admin/find-duplicates/status")
+async def admin_duplicate_candidates_status(
+    current_user: dict = Depends(get_current_user)
+):
+    """Last refresh, watermark and totals of the contact duplicate candidates cache"""
+    from services.contact_dedup import get_dedup_state
+    
+    return await get_dedup_state() or {"watermark": None, "last_full_refresh": None}
+
+
 @router.post("/admin/merge")
 async def admin_merge_contacts(
     request: MergeRequest,
@@ -2294,6 +2264,10 @@ async def admin_merge_contacts(
         }}
     )
     
+    # Merged contacts leave the duplicate candidates right away
+    from services.contact_dedup import update_contact_candidates
+    await update_contact_candidates([primary_id] + merge_ids)
+    
     # Create audit log
     await db.admin_operations.insert_one({
         "operation_id": str(uuid.uuid4()),
@@ -2346,6 +2320,9 @@ async def unmerge_contact(
         }}
     )
     
+    from services.contact_dedup import update_contact_candidates
+    await update_contact_candidates([contact_id])
+    
     return {
         "success": True,
         "message": "Contact restored successfully"
@@ -2362,13 +2339,12 @@ async def get_distinct_sources(
     List all distinct source values in the unified_contacts collection.
     Useful for identifying which source names to target for cleanup.
     """
-    sources = await db.unified_contacts.distinct("source")
+    await ensure_counters()
+    counts = await get_counters("unified_contacts", "source")
+    sources = [source or None for source in counts]
     
     # Count contacts per source
-    source_counts = {}
-    for source in sources:
-        count = await db.unified_contacts.count_documents({"source": source})
-        source_counts[source or "null"] = count
+    source_counts = {source or "null": count for source, count in counts.items()}
     
     return {
         "success": True,
@@ -18,7 +18,10 @@ import os
 import logging
 
 from database import db
+from services.response_cache import response_cache
+from services import blog_classification
 from routers.auth import get_current_user
+from utils.pagination import InvalidCursor, cached_total, keyset_page
 
 logger = logging.getLogger(__name__)
 
@@ -126,6 +129,7 @@ async def create_course(
     
     await db.courses.insert_one(course)
     
+    response_cache.invalidate("lms")
     return {"success": True, "course": {k: v for k, v in course.items() if k != "_id"}}
 
 
@@ -149,6 +153,9 @@ async def update_course(
     await db.courses.update_one({"id": course_id}, {"$set": update_data})
     
     updated = await db.courses.find_one({"id": course_id}, {"_id": 0})
+    if data.name is not None:
+        await blog_classification.propagate_course_name(course_id, blog_classification.course_display_name(updated))
+    response_cache.invalidate("lms")
     return {"success": True, "course": updated}
 
 
@@ -178,6 +185,7 @@ async def delete_course(
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Course not found")
     
+    response_cache.invalidate("lms")
     return {"success": True, "message": "Course deleted"}
 
 
@@ -250,6 +258,9 @@ async def update_competency(
     
     await db.competencies.update_one({"id": competency_id}, {"$set": update_data})
     
+    if data.name is not None:
+        await blog_classification.propagate_competency_name(competency_id)
+    
     updated = await db.competencies.find_one({"id": competency_id}, {"_id": 0})
     return {"success": True, "competency": updated}
 
@@ -303,6 +314,7 @@ async def fix_content_item_course_ids(
                 {"id": item["id"]},
                 {"$set": {"course_id": course_id}}
             )
+            await blog_classification.sync_content_item(item["id"])
             fixed_count += 1
     
     return {
@@ -425,6 +437,7 @@ async def assign_item_to_cell(
     }
     
     await db.content_items.update_one({"id": item_id}, {"$set": update_data})
+    await blog_classification.sync_content_item(item_id)
     
     updated = await db.content_items.find_one({"id": item_id}, {"_id": 0})
     
@@ -452,6 +465,7 @@ async def unassign_item_from_cell(
             "$unset": {"competency_id": "", "level": ""}
         }
     )
+    await blog_classification.sync_content_item(item_id)
     
     updated = await db.content_items.find_one({"id": item_id}, {"_id": 0})
     
@@ -577,9 +591,11 @@ async def list_content_items(
     level: Optional[int] = None,
     limit: int = 50,
     offset: int = 0,
+    cursor: Optional[str] = None,
+    include_total: bool = True,
     current_user: dict = Depends(get_current_user)
 ):
-    """List content items with optional filters"""
+    """List content items with optional filters (pass next_cursor as cursor for the next page)"""
     query = {}
     
     if status:
@@ -591,16 +607,19 @@ async def list_content_items(
     if level:
         query["level"] = level
     
-    total = await db.content_items.count_documents(query)
-    
-    items = await db.content_items.find(query, {"_id": 0}).sort(
-        "created_at", -1
-    ).skip(offset).limit(limit).to_list(limit)
+    try:
+        items, next_cursor = await keyset_page(
+            db.content_items, query, {"_id": 0}, "created_at", -1, limit, cursor=cursor, skip=offset
+        )
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    total = await cached_total(db.content_items, query) if include_total else None
     
     return {
         "success": True,
         "items": items,
         "total": total,
+        "next_cursor": next_cursor,
         "limit": limit,
         "offset": offset
     }
@@ -775,6 +794,9 @@ async def update_content_item(
     if result.modified_count == 0:
         raise HTTPException(status_code=404, detail="Content item not found")
     
+    if "competency_id" in update_data or "level" in update_data:
+        await blog_classification.sync_content_item(item_id)
+    
     return {"success": True}
 
 
@@ -1577,6 +1599,7 @@ async def create_lms_lesson(
     
     logger.info(f"LMS lesson created/updated for content item {item_id}")
     
+    response_cache.invalidate("lms")
     return {
         "success": True,
         "lesson_id": lesson_id,
@@ -2452,6 +2475,7 @@ Texto:
         slug = slug.replace(" ", "-")[:50]
         
         slide_image_urls = results.get("slide_image_urls", [])
+        classification = await blog_classification.classification_for_item(content_item)
         
         def extract_title_from_markdown(markdown_text, fallback_title):
             if not markdown_text:
@@ -2492,11 +2516,13 @@ Texto:
                         "views": 0,
                         "language": "es",
                         "slide_images": slide_image_urls,
+                        **classification,
                         "created_at": datetime.now(timezone.utc),
                         "updated_at": datetime.now(timezone.utc)
                     }
                     
                     await db.blog_posts.insert_one(blog_doc_es)
+                    response_cache.invalidate("blog")
                     await db.content_items.update_one(
                         {"id": item_id},
                         {"$set": {
@@ -2539,12 +2565,14 @@ Texto:
                         "reading_time_minutes": max(1, len(blog_content.split()) // 200),
                         "views": 0,
                         "slide_images": slide_image_urls,
+                        **classification,
                         "language": "en",
                         "created_at": datetime.now(timezone.utc),
                         "updated_at": datetime.now(timezone.utc)
                     }
                     
                     await db.blog_posts.insert_one(blog_doc_en)
+                    response_cache.invalidate("blog")
                     await db.content_items.update_one(
                         {"id": item_id},
                         {"$set": {
@@ -2834,6 +2862,9 @@ Texto:
     # Get slide images to include in blogs
     slide_image_urls = results.get("slide_image_urls", [])
     
+    # Program / competency / level names for the public blog filters
+    classification = await blog_classification.classification_for_item(content_item)
+    
     # Helper to extract title from markdown (first H1)
     def extract_title_from_markdown(markdown_text, fallback_title):
         """Extract title from first H1 header in markdown"""
@@ -2875,11 +2906,13 @@ Texto:
                     "views": 0,
                     "language": "es",
                     "slide_images": slide_image_urls,  # Include slide images
+                    **classification,
                     "created_at": datetime.now(timezone.utc),
                     "updated_at": datetime.now(timezone.utc)
                 }
                 
                 await db.blog_posts.insert_one(blog_doc_es)
+                response_cache.invalidate("blog")
                 await db.content_items.update_one(
                     {"id": item_id},
                     {"$set": {
@@ -2922,12 +2955,14 @@ Texto:
                     "reading_time_minutes": max(1, len(blog_content.split()) // 200),
                     "views": 0,
                     "slide_images": slide_image_urls,  # Include slide images
+                    **classification,
                     "language": "en",
                     "created_at": datetime.now(timezone.utc),
                     "updated_at": datetime.now(timezone.utc)
                 }
                 
                 await db.blog_posts.insert_one(blog_doc_en)
+                response_cache.invalidate("blog")
                 await db.content_items.update_one(
                     {"id": item_id},
                     {"$set": {
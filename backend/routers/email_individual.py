@@ -27,6 +27,7 @@ import os
 import logging
 
 from database import db
+from utils.timestamps import timestamp_iso, timestamp_query
 from utils.contact_helpers import (
     STUDENT_ROLES_QUERY, 
     build_cadence_query, CADENCE_PERIODS
@@ -34,6 +35,7 @@ from utils.contact_helpers import (
 from routers.auth import get_current_user
 from services.email_service import email_service
 from services.email_queue import email_queue
+from services.stats_counters import count_email_event
 
 # Gemini integration
 from emergentintegrations.llm.chat import LlmChat, UserMessage
@@ -969,6 +971,7 @@ async def send_email(
         "clicked_at": None
     }
     await db.email_logs.insert_one(email_log)
+    await count_email_event("sent", now)
     
     return {
         "success": True,
@@ -984,16 +987,14 @@ async def get_email_stats(
     current_user: dict = Depends(get_current_user)
 ):
     """Get email sending statistics"""
-    today_start = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0).isoformat()
+    today_start = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
     
     # Count emails sent today
-    today_count = await db.email_logs.count_documents({
-        "sent_at": {"$gte": today_start}
-    })
+    today_count = await db.email_logs.count_documents(timestamp_query("sent_at", gte=today_start))
     
     # Count by rule type today
     pipeline = [
-        {"$match": {"sent_at": {"$gte": today_start}}},
+        {"$match": timestamp_query("sent_at", gte=today_start)},
         {"$group": {"_id": "$rule_type", "count": {"$sum": 1}}}
     ]
     by_type = await db.email_logs.aggregate(pipeline).to_list(10)
@@ -1040,11 +1041,11 @@ async def get_email_metrics_dashboard(
     Get comprehensive email metrics for dashboard.
     Includes: sent count, open rate, reply rate by rule type.
     """
-    start_date = (datetime.now(timezone.utc) - timedelta(days=days)).isoformat()
+    start_date = datetime.now(timezone.utc) - timedelta(days=days)
     
     # Get all emails in period
     emails = await db.email_logs.find(
-        {"sent_at": {"$gte": start_date}},
+        timestamp_query("sent_at", gte=start_date),
         {"_id": 0}
     ).to_list(10000)
     
@@ -1076,7 +1077,7 @@ async def get_email_metrics_dashboard(
     # Daily breakdown for chart
     daily_metrics = {}
     for email in emails:
-        sent_date = email.get("sent_at", "")[:10]  # YYYY-MM-DD
+        sent_date = (timestamp_iso(email.get("sent_at")) or "")[:10]  # YYYY-MM-DD
         if sent_date not in daily_metrics:
             daily_metrics[sent_date] = {"sent": 0, "opened": 0, "replied": 0}
         daily_metrics[sent_date]["sent"] += 1
@@ -1213,6 +1214,8 @@ async def track_email_open(email_id: str):
             }
         }
     )
+    if result.modified_count:
+        await count_email_event("opened")
     
     # Return 1x1 transparent PNG
     from fastapi.responses import Response
@@ -1224,13 +1227,16 @@ async def track_email_open(email_id: str):
 @router.post("/track/click/{email_id}")
 async def track_email_click(email_id: str, url: str = ""):
     """Track link click in email"""
-    await db.email_logs.update_one(
+    before = await db.email_logs.find_one_and_update(
         {"id": email_id},
         {
             "$set": {"clicked": True, "clicked_at": datetime.now(timezone.utc).isoformat()},
             "$push": {"clicked_urls": {"url": url, "at": datetime.now(timezone.utc).isoformat()}}
-        }
+        },
+        projection={"_id": 0, "clicked": 1}
     )
+    if before is not None and not before.get("clicked"):
+        await count_email_event("clicked")
     
     # Redirect to original URL
     from fastapi.responses import RedirectResponse
@@ -1267,10 +1273,10 @@ async def get_weekly_report(
     current_user: dict = Depends(get_current_user)
 ):
     """Get a weekly summary report for quick review"""
-    start_date = (datetime.now(timezone.utc) - timedelta(days=7)).isoformat()
+    start_date = datetime.now(timezone.utc) - timedelta(days=7)
     
     emails = await db.email_logs.find(
-        {"sent_at": {"$gte": start_date}},
+        timestamp_query("sent_at", gte=start_date),
         {"_id": 0}
     ).to_list(1000)
     
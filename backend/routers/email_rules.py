@@ -8,8 +8,19 @@ from typing import Optional, List, Dict, Any
 from datetime import datetime, timezone, timedelta
 import uuid
 
+from pymongo import UpdateOne
+
 from database import db
 from routers.auth import get_current_user
+from services.job_wakeup import job_wakeup, CHANNEL_EMAIL_QUEUE
+from services.stats_counters import count_email_event, increment
+from services.email_templates import register_template, render_text, render_queue_items
+from services.rule_context import RuleEvaluationContext, iter_contacts, has_any, normalize_email
+from utils.timestamps import parse_timestamp, timestamp_in_range, timestamp_query, utc_now
+from services.queue_grouping import (
+    MEMBERS_DEFAULT_PAGE_SIZE, pending_buckets, page_members, normalized_key, normalized_key_filter,
+    value_filter, cases_for_contacts, case_members_filter, case_group_id, build_case_groups
+)
 
 router = APIRouter(prefix="/email-rules", tags=["email-rules"])
 
@@ -57,6 +68,9 @@ async def toggle_auto_send(current_user: dict = Depends(get_current_user)):
         },
         upsert=True
     )
+    if new_state:
+        # Start draining whatever queued up while auto-send was off
+        job_wakeup.notify(CHANNEL_EMAIL_QUEUE)
     
     return {
         "auto_send_enabled": new_state,
@@ -339,14 +353,14 @@ async def get_traffic_light_status(
     - Green: All today's messages have been sent (pending = 0)
     """
     now = datetime.now(timezone.utc)
-    today_start = now.replace(hour=0, minute=0, second=0, microsecond=0).isoformat()
-    today_end = now.replace(hour=23, minute=59, second=59).isoformat()
+    today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    today_end = now.replace(hour=23, minute=59, second=59)
     
     # Count pending emails for today or earlier
     pending_count = await db.email_queue.count_documents({
         "status": "pending",
         "$or": [
-            {"scheduled_at": {"$lte": today_end}},
+            *timestamp_query("scheduled_at", lte=today_end)["$or"],
             {"scheduled_at": {"$exists": False}},
             {"scheduled_at": None}
         ]
@@ -355,7 +369,7 @@ async def get_traffic_light_status(
     # Count emails sent today
     sent_today = await db.email_logs.count_documents({
         "status": "sent",
-        "sent_at": {"$gte": today_start, "$lte": today_end}
+        **timestamp_query("sent_at", gte=today_start, lte=today_end)
     })
     
     # Determine traffic light status
@@ -475,7 +489,7 @@ async def diagnose_contact_email_rules(
             cadence_days = CADENCE_PERIODS.get("email_e1", 7)
             if last_sent:
                 try:
-                    last_date = datetime.fromisoformat(last_sent.replace('Z', '+00:00'))
+                    last_date = parse_timestamp(last_sent)
                     days_since = (now - last_date).days
                     if days_since >= cadence_days:
                         e1_reasons.append(f"✅ Cadencia cumplida ({days_since} días desde último envío)")
@@ -514,7 +528,7 @@ async def diagnose_contact_email_rules(
             cadence_days = CADENCE_PERIODS.get("email_e2", 7)
             if last_sent:
                 try:
-                    last_date = datetime.fromisoformat(last_sent.replace('Z', '+00:00'))
+                    last_date = parse_timestamp(last_sent)
                     days_since = (now - last_date).days
                     if days_since >= cadence_days:
                         e2_reasons.append(f"✅ Cadencia cumplida ({days_since} días)")
@@ -550,7 +564,7 @@ async def diagnose_contact_email_rules(
             cadence_days = CADENCE_PERIODS.get("email_e3", 7)
             if last_sent:
                 try:
-                    last_date = datetime.fromisoformat(last_sent.replace('Z', '+00:00'))
+                    last_date = parse_timestamp(last_sent)
                     days_since = (now - last_date).days
                     if days_since >= cadence_days:
                         e3_reasons.append(f"✅ Cadencia cumplida ({days_since} días)")
@@ -586,7 +600,7 @@ async def diagnose_contact_email_rules(
             cadence_days = CADENCE_PERIODS.get("email_e4", 90)
             if last_sent:
                 try:
-                    last_date = datetime.fromisoformat(last_sent.replace('Z', '+00:00'))
+                    last_date = parse_timestamp(last_sent)
                     days_since = (now - last_date).days
                     if days_since >= cadence_days:
                         e4_reasons.append(f"✅ Cadencia cumplida ({days_since} días)")
@@ -622,7 +636,7 @@ async def diagnose_contact_email_rules(
             cadence_days = CADENCE_PERIODS.get("email_e5", 90)
             if last_sent:
                 try:
-                    last_date = datetime.fromisoformat(last_sent.replace('Z', '+00:00'))
+                    last_date = parse_timestamp(last_sent)
                     days_since = (now - last_date).days
                     if days_since >= cadence_days:
                         e5_reasons.append(f"✅ Cadencia cumplida ({days_since} días)")
@@ -765,6 +779,9 @@ async def get_rule_pending_emails(
         {"_id": 0}
     ).sort("scheduled_at", 1).skip(skip).limit(page_size).to_list(page_size)
     
+    # Template-referenced items are rendered for the preview
+    await render_queue_items(pending_emails)
+    
     # Get total count
     total_count = await db.email_queue.count_documents({
         "rule": rule_id,
@@ -781,36 +798,164 @@ async def get_rule_pending_emails(
     }
 
 
+# Rules that group by webinar (then buyer_persona)
+EMAIL_WEBINAR_RULES = ["E01", "E06", "E07", "E08", "E09", "E10"]
+# Rules that group by buyer_persona
+EMAIL_PERSONA_RULES = ["E02", "E04", "E05"]
+# Rules that group by case/project (like W12)
+EMAIL_CASE_RULES = ["E03"]
+
+# Group views never need the bodies (rendered or template variables)
+EMAIL_MEMBER_PROJECTION = {"_id": 0, "body_html": 0, "body_text": 0, "template_vars": 0}
+
+
+EMAIL_NO_PERSONA = "no_persona"
+EMAIL_PERSONA_KEY = normalized_key("metadata.buyer_persona", EMAIL_NO_PERSONA)
+
+
+def _email_due_today_match(rule_id: str) -> Dict[str, Any]:
+    """Pending emails of a rule scheduled for today or earlier (overdue)"""
+    now = datetime.now(timezone.utc)
+    today_end = now.replace(hour=23, minute=59, second=59)
+    return {
+        "rule": rule_id,
+        "status": "pending",
+        "$or": [
+            *timestamp_query("scheduled_at", lte=today_end)["$or"],
+            {"scheduled_at": {"$exists": False}},
+            {"scheduled_at": None}
+        ]
+    }
+
+
+async def _email_pending_buckets(rule_id: str):
+    """
+    Pending emails of a rule counted per grouping key, each bucket tagged
+    with its group_id (and subgroup_id for webinar / case rules).
+    Buckets that are not shown (past webinars for E06, contacts without a
+    case for E03, rules without grouping) get group_id None.
+    """
+    match = _email_due_today_match(rule_id)
+
+    if rule_id in EMAIL_WEBINAR_RULES:
+        fields = {"webinar": "metadata.webinar_id", "date": "metadata.webinar_date", "bp": EMAIL_PERSONA_KEY}
+        buckets = await pending_buckets(
+            db.email_queue, match, fields,
+            first={
+                "webinar_name": "metadata.webinar_name",
+                "webinar_time": "metadata.webinar_time",
+                "bp": "metadata.buyer_persona",
+            },
+            sort=[("scheduled_at", 1)]
+        )
+        
+        # Webinar data fills whatever the queue metadata is missing
+        webinar_ids = list({b["keys"]["webinar"] for b in buckets if b["keys"]["webinar"]})
+        webinar_data_cache = {}
+        if webinar_ids:
+            webinars = await db.webinar_events_v2.find(
+                {"id": {"$in": webinar_ids}},
+                {"_id": 0, "id": 1, "name": 1, "webinar_date": 1, "webinar_time": 1, "landing_page_url": 1}
+            ).to_list(None)
+            webinar_data_cache = {w["id"]: w for w in webinars}
+        
+        today_str = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+        for b in buckets:
+            webinar_id = b["keys"]["webinar"]
+            info = {
+                "webinar_name": b["first"].get("webinar_name") or "Sin webinar",
+                "webinar_date": b["keys"]["date"] or "",
+                "webinar_time": b["first"].get("webinar_time") or "",
+                "webinar_link": "",
+            }
+            if webinar_id:
+                cached = webinar_data_cache.get(webinar_id, {})
+                if not info["webinar_date"]:
+                    info["webinar_date"] = cached.get("webinar_date", "")
+                if info["webinar_name"] == "Sin webinar":
+                    info["webinar_name"] = cached.get("name", info["webinar_name"])
+                if not info["webinar_time"]:
+                    info["webinar_time"] = cached.get("webinar_time", "")
+                info["webinar_link"] = cached.get("landing_page_url", "")
+            b["info"] = info
+            
+            # For E06, skip past webinars
+            if rule_id == "E06" and info["webinar_date"] and info["webinar_date"] < today_str:
+                b["group_id"] = None
+                continue
+            b["group_id"] = webinar_id or "no_webinar"
+            b["subgroup_id"] = b["keys"]["bp"]
+
+    elif rule_id in EMAIL_CASE_RULES:
+        buckets = await pending_buckets(db.email_queue, match, {"contact": "contact_id"})
+        cases = await cases_for_contacts([b["keys"]["contact"] for b in buckets if b["keys"]["contact"]])
+        for b in buckets:
+            case = cases.get(b["keys"]["contact"])
+            if not case:
+                b["group_id"] = None  # Skip if no valid case found
+                continue
+            b["case"] = case
+            b["group_id"] = case_group_id(case)
+            b["subgroup_id"] = case["id"]
+
+    elif rule_id in EMAIL_PERSONA_RULES:
+        buckets = await pending_buckets(
+            db.email_queue, match, {"bp": EMAIL_PERSONA_KEY}, first={"bp": "metadata.buyer_persona"}
+        )
+        for b in buckets:
+            b["group_id"] = b["keys"]["bp"]
+
+    else:
+        buckets = await pending_buckets(db.email_queue, match, {})
+        for b in buckets:
+            b["group_id"] = None
+
+    return buckets
+
+
+async def _email_group_filter(rule_id: str, group_id: str, subgroup_id: Optional[str]):
+    """Filter selecting the due pending emails of one group (or subgroup) of _email_pending_buckets"""
+    if rule_id in EMAIL_WEBINAR_RULES:
+        webinar_id = None if group_id == "no_webinar" else group_id
+        conditions = [value_filter("metadata.webinar_id", group_id, "no_webinar")]
+        if subgroup_id:
+            conditions.append(normalized_key_filter("metadata.buyer_persona", subgroup_id, EMAIL_NO_PERSONA))
+        if rule_id == "E06":
+            # Same past-webinar rule as the grouped view: the queue's date, else the webinar's
+            today_str = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+            date_ok = [{"metadata.webinar_date": {"$gte": today_str}}]
+            webinar = await db.webinar_events_v2.find_one({"id": webinar_id}, {"_id": 0, "webinar_date": 1}) if webinar_id else None
+            if not (webinar and webinar.get("webinar_date") and webinar["webinar_date"] < today_str):
+                date_ok.append({"metadata.webinar_date": {"$in": [None, ""]}})
+            conditions.append({"$or": date_ok})
+        group = {"$and": conditions}
+    elif rule_id in EMAIL_CASE_RULES:
+        group = await case_members_filter(group_id, subgroup_id)
+        if group is None:
+            return None
+    elif rule_id in EMAIL_PERSONA_RULES:
+        group = normalized_key_filter("metadata.buyer_persona", group_id, EMAIL_NO_PERSONA)
+    else:
+        return None
+    return {"$and": [_email_due_today_match(rule_id), group]}
+
+
 @router.get("/rule/{rule_id}/pending-grouped")
 async def get_rule_pending_emails_grouped(
     rule_id: str,
     current_user: dict = Depends(get_current_user)
 ):
     """
-    Get pending emails for a rule grouped by webinar (E1,E6-E10) or buyer_persona (E2-E5).
+    Get pending email groups for a rule (keys and counts only), by webinar
+    (E1,E6-E10) or buyer_persona (E2,E4,E5), or by case (E3).
     For webinar rules, also sub-groups by buyer_persona within each webinar.
-    Only returns emails scheduled for today or earlier (overdue).
+    Only counts emails scheduled for today or earlier (overdue).
+    Members are loaded per group from /rule/{rule_id}/pending-grouped/members.
     """
     rule_id = rule_id.upper()
-    now = datetime.now(timezone.utc)
-    today_str = now.strftime("%Y-%m-%d")
-    today_end = now.replace(hour=23, minute=59, second=59).isoformat()
-    
-    # Get pending emails for this rule that are scheduled for today or earlier
-    pending_emails = await db.email_queue.find(
-        {
-            "rule": rule_id, 
-            "status": "pending",
-            "$or": [
-                {"scheduled_at": {"$lte": today_end}},
-                {"scheduled_at": {"$exists": False}},
-                {"scheduled_at": None}
-            ]
-        },
-        {"_id": 0}
-    ).sort("scheduled_at", 1).to_list(5000)
-    
-    total_count = len(pending_emails)
+    buckets = await _email_pending_buckets(rule_id)
+    total_count = sum(b["count"] for b in buckets)
+    shown = [b for b in buckets if b["group_id"] is not None]
     
     # Get buyer persona display names
     buyer_personas_db = {}
@@ -818,266 +963,94 @@ async def get_rule_pending_emails_grouped(
     for bp in bps:
         buyer_personas_db[bp.get("code", "").lower()] = bp.get("name", bp.get("code", ""))
     
-    # Rules that group by webinar
-    webinar_rules = ["E01", "E06", "E07", "E08", "E09", "E10"]
-    # Rules that group by buyer_persona
-    persona_rules = ["E02", "E04", "E05"]
-    # Rules that group by case/project (like W12)
-    case_rules = ["E03"]
+    def persona_name(bucket):
+        return buyer_personas_db.get(bucket["keys"]["bp"], bucket["first"]["bp"] or "Sin clasificar")
     
     groups = []
     
-    if rule_id in webinar_rules:
-        # Pre-load webinar data to get dates
-        webinar_data_cache = {}
-        webinars = await db.webinar_events_v2.find(
-            {},
-            {"_id": 0, "id": 1, "name": 1, "webinar_date": 1, "webinar_time": 1, "landing_page_url": 1}
-        ).to_list(500)
-        for w in webinars:
-            webinar_data_cache[w["id"]] = w
-        
-        # Group by webinar, then by buyer_persona
+    if rule_id in EMAIL_WEBINAR_RULES:
         webinar_groups = {}
-        no_webinar_emails = []
-        
-        for email in pending_emails:
-            metadata = email.get("metadata", {})
-            webinar_id = metadata.get("webinar_id")
-            webinar_name = metadata.get("webinar_name", "Sin webinar")
-            webinar_date = metadata.get("webinar_date", "")
-            webinar_time = metadata.get("webinar_time", "")
-            webinar_link = ""
-            
-            # Get webinar data from cache if not in metadata
-            if webinar_id:
-                cached = webinar_data_cache.get(webinar_id, {})
-                if not webinar_date:
-                    webinar_date = cached.get("webinar_date", "")
-                if not webinar_name or webinar_name == "Sin webinar":
-                    webinar_name = cached.get("name", webinar_name)
-                if not webinar_time:
-                    webinar_time = cached.get("webinar_time", "")
-                if not webinar_link:
-                    webinar_link = cached.get("landing_page_url", "")
-            
-            bp = metadata.get("buyer_persona", "")
-            bp_lower = (bp or "").lower().strip()
-            bp_display = buyer_personas_db.get(bp_lower, bp or "Sin clasificar")
-            
-            # For E06, skip past webinars
-            if rule_id == "E06" and webinar_date and webinar_date < today_str:
-                continue
-            
-            if webinar_id:
-                if webinar_id not in webinar_groups:
-                    webinar_groups[webinar_id] = {
-                        "group_id": webinar_id,
-                        "group_type": "webinar",
-                        "group_name": webinar_name,
-                        "group_date": webinar_date,
-                        "group_time": webinar_time,
-                        "group_link": webinar_link,
-                        "subgroups": {},
-                        "count": 0
-                    }
-                
-                # Add to buyer_persona subgroup
-                if bp_lower not in webinar_groups[webinar_id]["subgroups"]:
-                    webinar_groups[webinar_id]["subgroups"][bp_lower] = {
-                        "subgroup_id": bp_lower or "no_persona",
-                        "subgroup_name": bp_display,
-                        "emails": [],
-                        "count": 0,
-                        "has_error": not bp_lower
-                    }
-                
-                webinar_groups[webinar_id]["subgroups"][bp_lower]["emails"].append(email)
-                webinar_groups[webinar_id]["subgroups"][bp_lower]["count"] += 1
-                webinar_groups[webinar_id]["count"] += 1
+        for b in shown:
+            info = b["info"]
+            if b["group_id"] == "no_webinar":
+                group = webinar_groups.setdefault("no_webinar", {
+                    "group_id": "no_webinar",
+                    "group_type": "webinar",
+                    "group_name": "Sin webinar asignado",
+                    "group_date": None,
+                    "subgroups": {},
+                    "count": 0,
+                    "has_error": True
+                })
             else:
-                no_webinar_emails.append(email)
+                group = webinar_groups.setdefault(b["group_id"], {
+                    "group_id": b["group_id"],
+                    "group_type": "webinar",
+                    "group_name": info["webinar_name"],
+                    "group_date": info["webinar_date"],
+                    "group_time": info["webinar_time"],
+                    "group_link": info["webinar_link"],
+                    "subgroups": {},
+                    "count": 0
+                })
+            
+            subgroup = group["subgroups"].setdefault(b["subgroup_id"], {
+                "subgroup_id": b["subgroup_id"],
+                "subgroup_name": persona_name(b),
+                "count": 0,
+                "has_error": b["subgroup_id"] == EMAIL_NO_PERSONA
+            })
+            subgroup["count"] += b["count"]
+            group["count"] += b["count"]
         
-        # Convert subgroups dict to sorted list
-        for webinar_id, webinar_data in webinar_groups.items():
-            sorted_subgroups = sorted(
-                webinar_data["subgroups"].values(), 
+        no_webinar = webinar_groups.pop("no_webinar", None)
+        for webinar in webinar_groups.values():
+            webinar["subgroups"] = sorted(
+                webinar["subgroups"].values(),
                 key=lambda x: (x.get("has_error", False), x["subgroup_name"])
             )
-            webinar_data["subgroups"] = sorted_subgroups
         
-        # Sort webinar groups by date
-        sorted_groups = sorted(webinar_groups.values(), key=lambda x: x["group_date"] or "9999")
-        groups.extend(sorted_groups)
-        
-        # Add "no webinar" group if there are any
-        if no_webinar_emails:
-            # Group by buyer_persona within no_webinar
-            no_webinar_subgroups = {}
-            for email in no_webinar_emails:
-                metadata = email.get("metadata", {})
-                bp = metadata.get("buyer_persona", "")
-                bp_lower = (bp or "").lower().strip()
-                bp_display = buyer_personas_db.get(bp_lower, bp or "Sin clasificar")
-                
-                if bp_lower not in no_webinar_subgroups:
-                    no_webinar_subgroups[bp_lower] = {
-                        "subgroup_id": bp_lower or "no_persona",
-                        "subgroup_name": bp_display,
-                        "emails": [],
-                        "count": 0,
-                        "has_error": not bp_lower
-                    }
-                no_webinar_subgroups[bp_lower]["emails"].append(email)
-                no_webinar_subgroups[bp_lower]["count"] += 1
-            
-            groups.append({
-                "group_id": "no_webinar",
-                "group_type": "webinar",
-                "group_name": "Sin webinar asignado",
-                "group_date": None,
-                "subgroups": sorted(no_webinar_subgroups.values(), key=lambda x: x["subgroup_name"]),
-                "count": len(no_webinar_emails),
-                "has_error": True
-            })
+        # Sort webinar groups by date, "no webinar" group last
+        groups.extend(sorted(webinar_groups.values(), key=lambda x: x["group_date"] or "9999"))
+        if no_webinar:
+            no_webinar["subgroups"] = sorted(no_webinar["subgroups"].values(), key=lambda x: x["subgroup_name"])
+            groups.append(no_webinar)
     
-    elif rule_id in case_rules:
+    elif rule_id in EMAIL_CASE_RULES:
         # ============ E03: COACHEE - Group by Case Stage, then by Case (like W12) ============
-        # Define the two main groups
-        casos_en_curso_stages = ["ganados"]
-        casos_cerrados_stages = ["concluidos", "contenidos_transcritos", "reporte_presentado", "caso_publicado"]
-        
-        # Structure: { "en_curso": { case_id: {...} }, "cerrados": { case_id: {...} } }
-        main_groups = {
-            "en_curso": {},
-            "cerrados": {}
-        }
-        
-        for email in pending_emails:
-            contact_id = email.get("contact_id")
-            metadata = email.get("metadata", {})
-            
-            # Find the Stage 4 case where this contact is associated
-            case = await db.cases.find_one({
-                "status": "active",
-                "stage": {"$in": casos_en_curso_stages + casos_cerrados_stages},
-                "contact_ids": contact_id
-            }, {"_id": 0, "id": 1, "name": 1, "company_names": 1, "stage": 1})
-            
-            if not case:
-                continue  # Skip if no valid case found
-            
-            case_id = case.get("id")
-            case_name = case.get("name", "Sin nombre")
-            case_stage = case.get("stage", "")
-            company = case.get("company_names", [""])[0] if case.get("company_names") else ""
-            display_name = f"{case_name}" + (f" ({company})" if company else "")
-            
-            # Determine which main group
-            if case_stage in casos_en_curso_stages:
-                main_group_key = "en_curso"
-            else:
-                main_group_key = "cerrados"
-            
-            # Add to appropriate group
-            if case_id not in main_groups[main_group_key]:
-                main_groups[main_group_key][case_id] = {
-                    "subgroup_id": case_id,
-                    "subgroup_name": display_name,
-                    "case_stage": case_stage,
-                    "emails": [],
-                    "count": 0
-                }
-            
-            main_groups[main_group_key][case_id]["emails"].append(email)
-            main_groups[main_group_key][case_id]["count"] += 1
-        
-        # Group 1: Casos en curso
-        en_curso_cases = list(main_groups["en_curso"].values())
-        if en_curso_cases:
-            groups.append({
-                "group_id": "casos_en_curso",
-                "group_type": "main_category",
-                "group_name": "Casos en curso",
-                "description": "Estado: Ganados",
-                "subgroups": en_curso_cases,
-                "count": sum(c["count"] for c in en_curso_cases),
-                "has_error": False
-            })
-        
-        # Group 2: Casos cerrados con alumnos activos
-        cerrados_cases = list(main_groups["cerrados"].values())
-        if cerrados_cases:
-            groups.append({
-                "group_id": "casos_cerrados",
-                "group_type": "main_category", 
-                "group_name": "Casos cerrados con alumnos activos",
-                "description": "Estados: Concluidos, Transcritos, Reporte Presentado, Publicado",
-                "subgroups": cerrados_cases,
-                "count": sum(c["count"] for c in cerrados_cases),
-                "has_error": False
-            })
+        groups = build_case_groups(shown)
     
-    elif rule_id in persona_rules:
+    elif rule_id in EMAIL_PERSONA_RULES:
         # Group by buyer_persona only (no subgroups)
         persona_groups = {}
-        no_persona_emails = []
-        
-        for email in pending_emails:
-            metadata = email.get("metadata", {})
-            bp = metadata.get("buyer_persona", "")
-            bp_lower = (bp or "").lower().strip()
-            bp_display = buyer_personas_db.get(bp_lower, bp or "Sin clasificar")
-            
-            if bp_lower:
-                if bp_lower not in persona_groups:
-                    persona_groups[bp_lower] = {
-                        "group_id": bp_lower,
-                        "group_type": "buyer_persona",
-                        "group_name": bp_display,
-                        "group_date": None,
-                        "emails": [],
-                        "count": 0
-                    }
-                persona_groups[bp_lower]["emails"].append(email)
-                persona_groups[bp_lower]["count"] += 1
-            else:
-                no_persona_emails.append(email)
+        for b in shown:
+            group = persona_groups.setdefault(b["group_id"], {
+                "group_id": b["group_id"],
+                "group_type": "buyer_persona",
+                "group_name": persona_name(b),
+                "group_date": None,
+                "count": 0
+            })
+            group["count"] += b["count"]
         
         # Sort persona groups alphabetically
-        sorted_groups = sorted(persona_groups.values(), key=lambda x: x["group_name"])
-        groups.extend(sorted_groups)
+        no_persona = persona_groups.pop(EMAIL_NO_PERSONA, None)
+        groups.extend(sorted(persona_groups.values(), key=lambda x: x["group_name"]))
         
         # Add "no persona" group if there are any - this is an error
-        if no_persona_emails:
-            error_contacts = []
-            for email in no_persona_emails:
-                error_contacts.append({
-                    "contact_id": email.get("contact_id"),
-                    "contact_name": email.get("contact_name"),
-                    "contact_email": email.get("contact_email")
-                })
-            
-            groups.append({
-                "group_id": "no_persona",
-                "group_type": "buyer_persona",
-                "group_name": "Sin buyer persona (Error)",
-                "group_date": None,
-                "emails": no_persona_emails,
-                "count": len(no_persona_emails),
-                "has_error": True,
-                "error_contacts": error_contacts
-            })
+        if no_persona:
+            no_persona.update({"group_name": "Sin buyer persona (Error)", "has_error": True})
+            groups.append(no_persona)
     
     # Recalculate total count after filtering (for E6)
     if rule_id == "E06":
         total_count = sum(g.get("count", 0) for g in groups)
     
     # Determine group_type and has_subgroups
-    if rule_id in webinar_rules:
+    if rule_id in EMAIL_WEBINAR_RULES:
         group_type = "webinar"
         has_subgroups = True
-    elif rule_id in case_rules:
+    elif rule_id in EMAIL_CASE_RULES:
         group_type = "case"
         has_subgroups = True
     else:
@@ -1093,6 +1066,26 @@ async def get_rule_pending_emails_grouped(
     }
 
 
+@router.get("/rule/{rule_id}/pending-grouped/members")
+async def get_rule_pending_group_members(
+    rule_id: str,
+    group_id: str,
+    subgroup_id: Optional[str] = None,
+    page: int = 1,
+    page_size: int = MEMBERS_DEFAULT_PAGE_SIZE,
+    current_user: dict = Depends(get_current_user)
+):
+    """Paginated pending emails (without bodies) of one group or subgroup from pending-grouped"""
+    rule_id = rule_id.upper()
+    query = await _email_group_filter(rule_id, group_id, subgroup_id)
+    
+    result = await page_members(
+        db.email_queue, query, EMAIL_MEMBER_PROJECTION,
+        page=page, page_size=page_size, sort=[("scheduled_at", 1), ("id", 1)]
+    )
+    return {"rule_id": rule_id, "group_id": group_id, "subgroup_id": subgroup_id, **result}
+
+
 @router.post("/rule/{rule_id}/generate")
 async def generate_emails_for_single_rule(
     rule_id: str,
@@ -1118,9 +1111,8 @@ async def generate_emails_for_single_rule(
     if rule_config and not rule_config.get("enabled", True):
         raise HTTPException(status_code=400, detail=f"La regla {rule_id} está deshabilitada")
     
-    # Get eligible contacts
-    limit = max_contacts if max_contacts > 0 else 50000
-    contacts = await get_eligible_contacts_for_rule(rule_id, limit)
+    # Get eligible contacts (streamed; max_contacts=0 means no limit)
+    contacts = await get_eligible_contacts_for_rule(rule_id, max_contacts)
     
     if not contacts:
         return {
@@ -1164,24 +1156,22 @@ async def generate_emails_for_single_rule(
                 continue
             
             # Generate email content
-            email_content = await generate_email_for_contact(rule_id, contact, rule_config)
+            email_content = await queued_email_content(rule_id, contact, rule_config)
             
             if not email_content:
                 errors += 1
                 continue
             
             # Add to queue
-            now_iso = datetime.now(timezone.utc).isoformat()
+            queued_at = utc_now()
             email_doc = {
                 "id": str(uuid.uuid4()),
                 "rule": rule_id,
                 "contact_id": contact_id,
                 "contact_email": contact["email"],
                 "contact_name": contact.get("name", ""),
-                "subject": email_content["subject"],
-                "body_html": email_content["body"],
-                "body_text": "",
-                "scheduled_at": now_iso,
+                **email_content,
+                "scheduled_at": queued_at,
                 "status": "pending",
                 "attempts": 0,
                 "sent_at": None,
@@ -1194,11 +1184,13 @@ async def generate_emails_for_single_rule(
                     "webinar_date": contact.get("webinar_date"),
                     "webinar_id": contact.get("webinar_id")
                 },
-                "created_at": now_iso,
-                "updated_at": now_iso
+                "created_at": queued_at,
+                "updated_at": queued_at
             }
             
             await db.email_queue.insert_one(email_doc)
+            await increment("email_queue", "status", "pending")
+            job_wakeup.notify(CHANNEL_EMAIL_QUEUE)
             queued += 1
             
         except Exception:
@@ -1558,6 +1550,82 @@ async def cancel_queued_email(
     return {"success": True, "cancelled": email_id}
 
 
+async def compact_pending_queue_items(batch_size: int = 500) -> dict:
+    """
+    Migration: turn pending rule emails that still store a rendered body into
+    template references. An item is converted only if re-rendering the
+    rule's template (current or default) with variables rebuilt from the item
+    reproduces its stored subject and body exactly; others keep their body
+    and only drop a stored body_text (derived from the HTML at send time).
+    """
+    rule_ids = [rule["id"] for rule in DEFAULT_RULES]
+    rule_configs = {
+        rule["id"]: rule
+        async for rule in db.email_rules.find({"id": {"$in": rule_ids}}, {"_id": 0, "id": 1, "template_subject": 1, "template_body": 1})
+    }
+    
+    stats = {"scanned": 0, "templated": 0, "body_text_removed": 0}
+    operations = []
+    
+    async def flush():
+        if operations:
+            await db.email_queue.bulk_write(operations, ordered=False)
+            operations.clear()
+    
+    cursor = db.email_queue.find(
+        {"status": "pending", "template_id": {"$exists": False}, "body_html": {"$exists": True}},
+        {"_id": 0, "id": 1, "rule": 1, "contact_name": 1, "subject": 1, "body_html": 1, "body_text": 1, "metadata": 1}
+    )
+    async for item in cursor:
+        stats["scanned"] += 1
+        update = None
+        
+        if item.get("rule") in rule_ids:
+            metadata = item.get("metadata") or {}
+            contacts = [
+                {"name": item.get("contact_name", ""), **metadata},
+                {"name": item.get("contact_name", ""), **{k: v for k, v in metadata.items() if v is not None}},
+            ]
+            templates = {
+                resolve_rule_templates(item["rule"], rule_configs.get(item["rule"])),
+                resolve_rule_templates(item["rule"])
+            }
+            for template_subject, template_body in templates:
+                for contact in contacts:
+                    variables = email_template_variables(contact)
+                    if (render_text(template_body, variables) == item.get("body_html")
+                            and render_text(template_subject, variables) == item.get("subject")):
+                        template_id, version = await register_template(item["rule"], template_subject, template_body)
+                        update = {
+                            "$set": {"template_id": template_id, "template_version": version, "template_vars": variables},
+                            "$unset": {"body_html": "", "body_text": ""}
+                        }
+                        break
+                if update:
+                    break
+        
+        if update:
+            stats["templated"] += 1
+        elif "body_text" in item:
+            update = {"$unset": {"body_text": ""}}
+            stats["body_text_removed"] += 1
+        
+        if update:
+            operations.append(UpdateOne({"id": item["id"]}, update))
+            if len(operations) >= batch_size:
+                await flush()
+    
+    await flush()
+    return stats
+
+
+@router.post("/queue/compact")
+async def compact_email_queue(current_user: dict = Depends(get_current_user)):
+    """Migrate pending emails with stored bodies to template references"""
+    stats = await compact_pending_queue_items()
+    return {"success": True, **stats}
+
+
 # ============ SEND TO SUBGROUP ENDPOINT ============
 
 class SendToSubgroupRequest(BaseModel):
@@ -1681,28 +1749,35 @@ async def send_to_subgroup(
                     "rule": rule_id,
                     "subject": subject,
                     "status": "sent",
-                    "sent_at": datetime.now(timezone.utc).isoformat(),
+                    "sent_at": utc_now(),
                     "sent_by": current_user.get("email"),
                     "group_key": request.group_key,
                     "subgroup_key": request.subgroup_key,
                     "message_id": result.get("message_id")
                 })
+                await count_email_event("sent")
                 
                 # Update contact's last email sent for this rule
                 await db.unified_contacts.update_one(
                     {"id": contact.get("id")},
-                    {"$set": {f"last_email_{rule_id.lower()}_sent": datetime.now(timezone.utc).isoformat()}}
+                    {"$set": {f"last_email_{rule_id.lower()}_sent": utc_now()}}
                 )
                 
                 # Remove from email queue (mark as sent or delete)
-                await db.email_queue.update_many(
+                sent_at = utc_now()
+                dequeued = await db.email_queue.update_many(
                     {
                         "contact_id": contact.get("id"),
                         "rule": rule_id,
                         "status": "pending"
                     },
-                    {"$set": {"status": "sent", "sent_at": datetime.now(timezone.utc).isoformat()}}
+                    {"$set": {"status": "sent", "sent_at": sent_at}}
                 )
+                if dequeued.modified_count:
+                    await increment("email_queue", "status", "pending", -dequeued.modified_count)
+                    await increment("email_queue", "status", "sent", dequeued.modified_count)
+                    await increment("email_queue", "sent_by_rule", rule_id, dequeued.modified_count,
+                                    day=sent_at.date().isoformat())
             else:
                 failed_count += 1
                 errors.append(f"{contact_email}: {result.get('error', 'Unknown error')}")
@@ -1760,6 +1835,27 @@ async def _run_email_generation_job(job_id: str, rules_to_process: list, max_per
         cleanup_count = await cleanup_email_queue()
         logger.info(f"Email queue cleanup removed {cleanup_count} obsolete items")
         
+        # Evaluate every enabled rule in one pass: supporting data is loaded
+        # once and unified_contacts is scanned once for all rules
+        await db.email_generation_jobs.update_one(
+            {"id": job_id},
+            {"$set": {
+                "status_message": "Buscando contactos elegibles...",
+                "updated_at": datetime.now(timezone.utc).isoformat()
+            }}
+        )
+        rule_configs = {
+            rule["id"]: rule
+            async for rule in db.email_rules.find({"id": {"$in": rules_to_process}}, {"_id": 0})
+        }
+        enabled_rules = [
+            r for r in rules_to_process
+            if r in valid_rules and rule_configs.get(r, {}).get("enabled", True)
+        ]
+        eligible_by_rule = await get_eligible_contacts_for_rules(
+            enabled_rules, max_per_rule, await RuleEvaluationContext.load()
+        )
+        
         for rule_index, rule_id in enumerate(rules_to_process):
             if rule_id not in valid_rules:
                 results[rule_id] = {"error": "Invalid rule"}
@@ -1778,23 +1874,13 @@ async def _run_email_generation_job(job_id: str, rules_to_process: list, max_per
             )
             
             # Check if rule is enabled
-            rule_config = await db.email_rules.find_one({"id": rule_id}, {"_id": 0})
-            if rule_config and not rule_config.get("enabled", True):
+            rule_config = rule_configs.get(rule_id)
+            if rule_id not in enabled_rules:
                 results[rule_id] = {"skipped": "Rule is disabled"}
                 continue
             
             try:
-                # Update status: finding contacts
-                await db.email_generation_jobs.update_one(
-                    {"id": job_id},
-                    {"$set": {
-                        "status_message": f"Buscando contactos para {rule_id}...",
-                        "updated_at": datetime.now(timezone.utc).isoformat()
-                    }}
-                )
-                
-                # Get eligible contacts for this rule
-                contacts = await get_eligible_contacts_for_rule(rule_id, max_per_rule)
+                contacts = eligible_by_rule[rule_id]
                 
                 # Update status: found contacts
                 await db.email_generation_jobs.update_one(
@@ -1853,7 +1939,7 @@ async def _run_email_generation_job(job_id: str, rules_to_process: list, max_per
                             continue
                         
                         # Generate email content (template - instant)
-                        email_content = await generate_email_for_contact(rule_id, contact, rule_config)
+                        email_content = await queued_email_content(rule_id, contact, rule_config)
                         
                         if not email_content:
                             errors += 1
@@ -1861,17 +1947,15 @@ async def _run_email_generation_job(job_id: str, rules_to_process: list, max_per
                         
                         # Prepare email document for batch insert
                         email_id = str(uuid.uuid4())
-                        now_iso = datetime.now(timezone.utc).isoformat()
+                        queued_at = utc_now()
                         emails_to_insert.append({
                             "id": email_id,
                             "rule": rule_id,
                             "contact_id": contact_id,
                             "contact_email": contact["email"],
                             "contact_name": contact.get("name", ""),
-                            "subject": email_content["subject"],
-                            "body_html": email_content["body"],
-                            "body_text": "",
-                            "scheduled_at": now_iso,
+                            **email_content,
+                            "scheduled_at": queued_at,
                             "status": "pending",
                             "attempts": 0,
                             "sent_at": None,
@@ -1884,14 +1968,16 @@ async def _run_email_generation_job(job_id: str, rules_to_process: list, max_per
                                 "webinar_date": contact.get("webinar_date"),
                                 "webinar_id": contact.get("webinar_id")
                             },
-                            "created_at": now_iso,
-                            "updated_at": now_iso
+                            "created_at": queued_at,
+                            "updated_at": queued_at
                         })
                         queued += 1
                         
                         # Batch insert when we have enough
                         if len(emails_to_insert) >= batch_size:
                             await db.email_queue.insert_many(emails_to_insert)
+                            await increment("email_queue", "status", "pending", len(emails_to_insert))
+                            job_wakeup.notify(CHANNEL_EMAIL_QUEUE)
                             logger.info(f"Batch inserted {len(emails_to_insert)} emails for {rule_id}")
                             emails_to_insert = []
                         
@@ -1903,6 +1989,8 @@ async def _run_email_generation_job(job_id: str, rules_to_process: list, max_per
                 # Insert remaining emails
                 if emails_to_insert:
                     await db.email_queue.insert_many(emails_to_insert)
+                    await increment("email_queue", "status", "pending", len(emails_to_insert))
+                    job_wakeup.notify(CHANNEL_EMAIL_QUEUE)
                     logger.info(f"Final batch inserted {len(emails_to_insert)} emails for {rule_id}")
                 
                 results[rule_id] = {
@@ -2052,21 +2140,6 @@ async def cancel_generation(current_user: dict = Depends(get_current_user)):
     }
 
 
-def _normalize_email(email_value) -> str:
-    """Normalize email field that could be string or list to lowercase string"""
-    if email_value is None:
-        return ""
-    if isinstance(email_value, list):
-        # If it's a list, take the first valid email
-        for e in email_value:
-            if isinstance(e, str) and "@" in e:
-                return e.lower().strip()
-        return ""
-    if isinstance(email_value, str):
-        return email_value.lower().strip() if "@" in email_value else ""
-    return ""
-
-
 async def cleanup_email_queue():
     """
     Clean up email queue items for contacts that no longer meet criteria.
@@ -2075,433 +2148,304 @@ async def cleanup_email_queue():
     """
     cleanup_count = 0
     
-    # E03 cleanup: contacts must be Stage 4 + coachee
-    e03_items = await db.email_queue.find(
-        {"rule": "E03", "status": "pending"},
-        {"_id": 0, "contact_id": 1}
-    ).to_list(5000)
-    
-    if e03_items:
-        e03_to_remove = []
-        for item in e03_items:
-            contact_id = item.get("contact_id")
-            contact = await db.unified_contacts.find_one(
-                {"id": contact_id},
-                {"_id": 0, "stage": 1, "roles": 1}
+    for rule_id, required_stage in (("E03", 4), ("E05", 5)):
+        contact_ids = [
+            item.get("contact_id") async for item in db.email_queue.find(
+                {"rule": rule_id, "status": "pending"},
+                {"_id": 0, "contact_id": 1}
             )
-            
-            if not contact:
-                e03_to_remove.append(contact_id)
-                continue
-            
-            is_stage_4 = contact.get("stage") == 4
-            has_coachee = any(r.lower() == "coachee" for r in (contact.get("roles") or []))
-            
-            if not is_stage_4 or not has_coachee:
-                e03_to_remove.append(contact_id)
+        ]
+        if not contact_ids:
+            continue
         
-        if e03_to_remove:
-            result = await db.email_queue.delete_many({
-                "rule": "E03",
-                "status": "pending",
-                "contact_id": {"$in": e03_to_remove}
-            })
-            cleanup_count += result.deleted_count
-    
-    # E05 cleanup: contacts must be Stage 5 + coachee
-    e05_items = await db.email_queue.find(
-        {"rule": "E05", "status": "pending"},
-        {"_id": 0, "contact_id": 1}
-    ).to_list(5000)
-    
-    if e05_items:
-        e05_to_remove = []
-        for item in e05_items:
-            contact_id = item.get("contact_id")
-            contact = await db.unified_contacts.find_one(
-                {"id": contact_id},
-                {"_id": 0, "stage": 1, "roles": 1}
-            )
-            
-            if not contact:
-                e05_to_remove.append(contact_id)
-                continue
-            
-            is_stage_5 = contact.get("stage") == 5
-            has_coachee = any(r.lower() == "coachee" for r in (contact.get("roles") or []))
-            
-            if not is_stage_5 or not has_coachee:
-                e05_to_remove.append(contact_id)
+        # One query for all queued contacts instead of a find_one per item
+        still_valid = set()
+        async for contact in db.unified_contacts.find(
+            {"id": {"$in": list(set(contact_ids))}},
+            {"_id": 0, "id": 1, "stage": 1, "roles": 1}
+        ):
+            has_coachee = any(isinstance(r, str) and r.lower() == "coachee" for r in (contact.get("roles") or []))
+            if contact.get("stage") == required_stage and has_coachee:
+                still_valid.add(contact["id"])
         
-        if e05_to_remove:
+        to_remove = [cid for cid in contact_ids if cid not in still_valid]
+        if to_remove:
             result = await db.email_queue.delete_many({
-                "rule": "E05",
+                "rule": rule_id,
                 "status": "pending",
-                "contact_id": {"$in": e05_to_remove}
+                "contact_id": {"$in": to_remove}
             })
             cleanup_count += result.deleted_count
+            if result.deleted_count:
+                await increment("email_queue", "status", "pending", -result.deleted_count)
     
     return cleanup_count
 
 
-async def get_eligible_contacts_for_rule(rule_id: str, limit: int = 0) -> list:
-    """Get contacts eligible for a specific email rule. limit=0 means no limit."""
-    from utils.contact_helpers import build_cadence_query, CADENCE_PERIODS
-    
-    now = datetime.now(timezone.utc)
-    contacts = []
-    max_contacts = limit if limit > 0 else 50000  # Use high number if no limit
-    
+# ============ RULE EVALUATION ============
+# Each rule is a MongoDB prefilter (for index use) plus an in-memory evaluator
+# that applies the full criteria against a RuleEvaluationContext. Several
+# rules can therefore share one streamed scan of unified_contacts.
+
+EMAIL_COACHEE_ROLES = ["coachee", "Coachee", "COACHEE"]
+EMAIL_DEAL_MAKER_ROLES = ["deal_maker", "Deal Maker", "dealmaker", "DealMaker"]
+EMAIL_REMINDER_RULES = ["E07", "E08", "E09", "E10"]
+EMAIL_IMPORT_SOURCES = ["csv_import", "manual"]
+
+EMAIL_VALID_QUERY = {"email": {"$type": "string", "$regex": "@"}}
+
+EMAIL_RULE_CONTACT_PROJECTION = {
+    "_id": 0, "id": 1, "name": 1, "email": 1, "company": 1, "buyer_persona": 1,
+    "stage": 1, "roles": 1, "webinar_history": 1,
+    # Cadence fields (E01-E05), E06 sent map, E07-E10 sent maps (as named by the sender)
+    **{f"last_email_e{n}_sent": 1 for n in range(1, 7)},
+    **{f"last_email_{rule_id.lower()}_sent": 1 for rule_id in ["E07", "E08", "E09", "E10"]}
+}
+
+
+def _email_cadence(rule_id: str):
+    """(field, days) of a cadence-limited rule"""
+    from utils.contact_helpers import CADENCE_PERIODS
+
+    n = int(rule_id[1:])
+    default_days = 90 if rule_id in ("E04", "E05") else 7
+    return f"last_email_e{n}_sent", CADENCE_PERIODS.get(f"email_e{n}", default_days)
+
+
+def _email_rule_query(rule_id: str, ctx: RuleEvaluationContext) -> Optional[Dict[str, Any]]:
+    """MongoDB prefilter for a rule; None when nothing can match"""
     if rule_id == "E01":
         # E1: Stage 1-2, not registered to future webinar, matched by buyer_persona
-        cadence_query = build_cadence_query("last_email_e1_sent", CADENCE_PERIODS.get("email_e1", 7))
-        
-        # Get future webinars with their buyer_personas
-        future_webinars = await db.webinar_events_v2.find(
-            {"webinar_date": {"$gte": now.strftime("%Y-%m-%d")}},
-            {"_id": 0, "id": 1, "name": 1, "webinar_date": 1, "webinar_time": 1, 
-             "buyer_personas": 1, "registrants": 1, "watching_room_url": 1}
-        ).sort("webinar_date", 1).to_list(100)
-        
-        if not future_webinars:
-            return []
-        
-        # Build set of registered emails per webinar
-        webinar_registered = {}
-        for webinar in future_webinars:
-            registered_emails = set()
-            for reg in webinar.get("registrants", []):
-                email = _normalize_email(reg.get("email"))
-                if email:
-                    registered_emails.add(email)
-            webinar_registered[webinar["id"]] = registered_emails
-        
-        # Get all registered emails across all webinars
-        all_registered = set()
-        for emails in webinar_registered.values():
-            all_registered.update(emails)
-        
-        # Get eligible contacts (Stage 1-2, valid email, cadence OK)
-        query = {
+        if not ctx.future_webinars:
+            return None
+        return {
             "stage": {"$in": [1, 2]},
-            "email": {"$type": "string", "$regex": "@"},
+            **EMAIL_VALID_QUERY,
             "buyer_persona": {"$exists": True, "$nin": [None, ""]},
-            **cadence_query
+            **ctx.cadence_query(*_email_cadence(rule_id))
         }
-        
-        raw_contacts = await db.unified_contacts.find(
-            query,
-            {"_id": 0, "id": 1, "name": 1, "email": 1, "company": 1, "buyer_persona": 1}
-        ).limit(max_contacts).to_list(max_contacts)
-        
-        # Match contacts to webinars by buyer_persona
-        for c in raw_contacts:
-            email = _normalize_email(c.get("email"))
-            if not email:
-                continue
-            
-            # Skip if already registered to any future webinar
-            if email in all_registered:
+    if rule_id == "E02":
+        # E2: Stage 3 with quote
+        if not ctx.quote_by_email:
+            return None
+        return {"stage": 3, **EMAIL_VALID_QUERY, **ctx.cadence_query(*_email_cadence(rule_id))}
+    if rule_id in ("E03", "E05"):
+        # E3: Stage 4 coachees / E5: Stage 5 coachees (alumni)
+        return {
+            "stage": 4 if rule_id == "E03" else 5,
+            "roles": {"$in": EMAIL_COACHEE_ROLES},
+            **EMAIL_VALID_QUERY,
+            **ctx.cadence_query(*_email_cadence(rule_id))
+        }
+    if rule_id == "E04":
+        # E4: Stage 5 Deal Makers
+        return {
+            "stage": 5,
+            "roles": {"$in": EMAIL_DEAL_MAKER_ROLES},
+            **EMAIL_VALID_QUERY,
+            **ctx.cadence_query(*_email_cadence(rule_id))
+        }
+    if rule_id == "E06":
+        # E6: Imported to a webinar in the last week
+        return {
+            "webinar_history": {"$elemMatch": {
+                **timestamp_query("registered_at", gte=ctx.now - timedelta(days=7)),
+                "source": {"$in": EMAIL_IMPORT_SOURCES}
+            }},
+            **EMAIL_VALID_QUERY
+        }
+    if rule_id in EMAIL_REMINDER_RULES:
+        # E7-E10: Registered to a future webinar
+        if not ctx.future_webinars:
+            return None
+        return {
+            "webinar_history": {"$elemMatch": {
+                "event_id": {"$in": list(ctx.future_webinars_by_id)},
+                "status": "registered"
+            }},
+            **EMAIL_VALID_QUERY
+        }
+    return None
+
+
+def _email_base_entry(contact: dict, email: str, rule_id: str) -> dict:
+    return {
+        "contact_id": contact["id"],
+        "name": contact.get("name", ""),
+        "email": email,
+        "company": contact.get("company"),
+        "buyer_persona": contact.get("buyer_persona"),
+        "rule_type": rule_id
+    }
+
+
+def _webinar_event_datetime(event: dict) -> Optional[datetime]:
+    try:
+        event_datetime = datetime.fromisoformat(f"{event.get('webinar_date')}T{event.get('webinar_time', '10:00')}:00")
+    except (ValueError, TypeError):
+        return None
+    if event_datetime.tzinfo is None:
+        event_datetime = event_datetime.replace(tzinfo=timezone.utc)
+    return event_datetime
+
+
+def evaluate_email_rule(rule_id: str, contact: dict, ctx: RuleEvaluationContext) -> List[dict]:
+    """Eligible entries for one contact and rule (the full criteria, in memory)"""
+    raw_email = contact.get("email")
+    if not isinstance(raw_email, str) or "@" not in raw_email:
+        return []
+    email = normalize_email(raw_email)
+    if not email:
+        return []
+    stage = contact.get("stage")
+
+    if rule_id == "E01":
+        if stage not in (1, 2) or contact.get("buyer_persona") in (None, ""):
+            return []
+        if not ctx.cadence_ok(contact, *_email_cadence(rule_id)):
+            return []
+        # Skip if already registered to any future webinar
+        if email in ctx.registered_emails:
+            return []
+        # Only match to first (closest) webinar for this buyer_persona
+        webinars = ctx.webinars_for_persona(contact.get("buyer_persona"))
+        if not webinars:
+            return []
+        webinar = webinars[0]
+        return [{
+            **_email_base_entry(contact, email, rule_id),
+            "webinar_id": webinar["id"],
+            "webinar_name": webinar.get("name"),
+            "webinar_date": webinar.get("webinar_date"),
+            "webinar_time": webinar.get("webinar_time"),
+            "watching_room_url": webinar.get("watching_room_url"),
+        }]
+
+    if rule_id in ("E02", "E03", "E04", "E05"):
+        if rule_id == "E02":
+            matches = stage == 3 and email in ctx.quote_by_email
+        elif rule_id == "E04":
+            matches = stage == 5 and has_any(contact.get("roles"), EMAIL_DEAL_MAKER_ROLES)
+        else:
+            matches = stage == (4 if rule_id == "E03" else 5) and has_any(contact.get("roles"), EMAIL_COACHEE_ROLES)
+        if not matches or not ctx.cadence_ok(contact, *_email_cadence(rule_id)):
+            return []
+        return [_email_base_entry(contact, email, rule_id)]
+
+    if rule_id == "E06":
+        one_week_ago = ctx.now - timedelta(days=7)
+        history = [reg for reg in contact.get("webinar_history") or [] if isinstance(reg, dict)]
+        if not any(
+            timestamp_in_range(reg.get("registered_at"), gte=one_week_ago)
+            and reg.get("source") in EMAIL_IMPORT_SOURCES
+            for reg in history
+        ):
+            return []
+        e6_sent = contact.get("last_email_e6_sent") or {}
+        entries = []
+        for reg in history:
+            webinar_id = reg.get("event_id")
+            if not webinar_id or not timestamp_in_range(reg.get("registered_at"), gte=one_week_ago):
                 continue
-            
-            contact_bp = (c.get("buyer_persona") or "").lower().strip()
-            if not contact_bp:
+            # Only future webinars, and E6 not yet sent for that webinar
+            webinar_info = ctx.future_webinars_by_id.get(webinar_id)
+            if webinar_info is None or webinar_id in e6_sent:
                 continue
-            
-            # Find matching webinar for this contact's buyer_persona
-            for webinar in future_webinars:
-                webinar_bps = [bp.lower().strip() for bp in webinar.get("buyer_personas", [])]
-                
-                if contact_bp in webinar_bps:
-                    contacts.append({
-                        "contact_id": c["id"],
-                        "name": c.get("name", ""),
-                        "email": email,
-                        "company": c.get("company"),
-                        "buyer_persona": c.get("buyer_persona"),
-                        "webinar_id": webinar["id"],
-                        "webinar_name": webinar.get("name"),
-                        "webinar_date": webinar.get("webinar_date"),
-                        "webinar_time": webinar.get("webinar_time"),
-                        "watching_room_url": webinar.get("watching_room_url"),
-                        "rule_type": "E01"
-                    })
-                    break  # Only match to first (closest) webinar
-            
-            if len(contacts) >= max_contacts:
-                break
-    
-    elif rule_id == "E02":
-        # E2: Stage 3 with quote + past calendar event after quote
-        cadence_query = build_cadence_query("last_email_e2_sent", CADENCE_PERIODS.get("email_e2", 7))
-        
-        # Get emails with quotes
-        quotes = await db.quotes.find(
-            {"status": {"$ne": "cancelled"}},
-            {"_id": 0, "client_email": 1, "created_at": 1}
-        ).to_list(1000)
-        
-        quote_data = {}
-        for q in quotes:
-            email = _normalize_email(q.get("client_email"))
-            if email:
-                created = q.get("created_at", "")
-                if email not in quote_data or created > quote_data[email]:
-                    quote_data[email] = created
-        
-        raw_contacts = await db.unified_contacts.find(
-            {
-                "stage": 3,
-                "email": {"$type": "string", "$regex": "@"},  # Valid email only
-                **cadence_query
-            },
-            {"_id": 0, "id": 1, "name": 1, "email": 1, "company": 1, "buyer_persona": 1}
-        ).to_list(max_contacts)
-        
-        for c in raw_contacts:
-            email = _normalize_email(c.get("email"))
-            if email and email in quote_data:
-                contacts.append({
-                    "contact_id": c["id"],
-                    "name": c.get("name", ""),
-                    "email": email,
-                    "company": c.get("company"),
-                    "buyer_persona": c.get("buyer_persona"),
-                    "rule_type": "E02"
-                })
-                if len(contacts) >= max_contacts:
-                    break
-    
-    elif rule_id == "E03":
-        # E3: Stage 4 coachees without calendar event in 60 days
-        cadence_query = build_cadence_query("last_email_e3_sent", CADENCE_PERIODS.get("email_e3", 7))
-        
-        raw_contacts = await db.unified_contacts.find(
-            {
-                "stage": 4,
-                "roles": {"$in": ["coachee", "Coachee", "COACHEE"]},
-                "email": {"$type": "string", "$regex": "@"},  # Valid email only
-                **cadence_query
-            },
-            {"_id": 0, "id": 1, "name": 1, "email": 1, "company": 1, "buyer_persona": 1}
-        ).to_list(max_contacts)
-        
-        for c in raw_contacts:
-            email = _normalize_email(c.get("email"))
-            if email:
-                contacts.append({
-                    "contact_id": c["id"],
-                    "name": c.get("name", ""),
-                    "email": email,
-                    "company": c.get("company"),
-                    "buyer_persona": c.get("buyer_persona"),
-                    "rule_type": "E03"
-                })
-    
-    elif rule_id == "E04":
-        # E4: Stage 5 Deal Makers
-        cadence_query = build_cadence_query("last_email_e4_sent", CADENCE_PERIODS.get("email_e4", 90))
-        
-        raw_contacts = await db.unified_contacts.find(
-            {
-                "stage": 5,
-                "roles": {"$in": ["deal_maker", "Deal Maker", "dealmaker", "DealMaker"]},
-                "email": {"$type": "string", "$regex": "@"},  # Valid email only
-                **cadence_query
-            },
-            {"_id": 0, "id": 1, "name": 1, "email": 1, "company": 1, "buyer_persona": 1}
-        ).to_list(max_contacts)
-        
-        for c in raw_contacts:
-            email = _normalize_email(c.get("email"))
-            if email:
-                contacts.append({
-                    "contact_id": c["id"],
-                    "name": c.get("name", ""),
-                    "email": email,
-                    "company": c.get("company"),
-                    "buyer_persona": c.get("buyer_persona"),
-                    "rule_type": "E04"
-                })
-    
-    elif rule_id == "E05":
-        # E5: Stage 5 Coachees (alumni)
-        cadence_query = build_cadence_query("last_email_e5_sent", CADENCE_PERIODS.get("email_e5", 90))
-        
-        raw_contacts = await db.unified_contacts.find(
-            {
-                "stage": 5,
-                "roles": {"$in": ["coachee", "Coachee", "COACHEE"]},
-                "email": {"$type": "string", "$regex": "@"},  # Valid email only
-                **cadence_query
-            },
-            {"_id": 0, "id": 1, "name": 1, "email": 1, "company": 1, "buyer_persona": 1}
-        ).to_list(max_contacts)
-        
-        for c in raw_contacts:
-            email = _normalize_email(c.get("email"))
-            if email:
-                contacts.append({
-                    "contact_id": c["id"],
-                    "name": c.get("name", ""),
-                    "email": email,
-                    "company": c.get("company"),
-                    "buyer_persona": c.get("buyer_persona"),
-                    "rule_type": "E05"
-                })
-    
-    elif rule_id == "E06":
-        # E6: Contacts imported to webinar in last week, never sent E6 for that webinar
-        # ONLY for future webinars
-        one_week_ago = (now - timedelta(days=7)).isoformat()
-        today_str = now.strftime("%Y-%m-%d")
-        
-        # Get future webinars to filter
-        future_webinars = await db.webinar_events_v2.find(
-            {"webinar_date": {"$gte": today_str}},
-            {"_id": 0, "id": 1, "name": 1, "webinar_date": 1, "webinar_time": 1, "buyer_personas": 1}
-        ).to_list(100)
-        future_webinar_ids = {w["id"] for w in future_webinars}
-        future_webinar_data = {w["id"]: w for w in future_webinars}
-        
-        # Get contacts with webinar registrations in last week
-        raw_contacts = await db.unified_contacts.find({
-            "webinar_history": {
-                "$elemMatch": {
-                    "registered_at": {"$gte": one_week_ago},
-                    "source": {"$in": ["csv_import", "manual"]}
-                }
-            },
-            "email": {"$type": "string", "$regex": "@"}  # Valid email only
-        }, {"_id": 0}).to_list(max_contacts)
-        
-        for c in raw_contacts:
-            email = _normalize_email(c.get("email"))
-            if not email:
+            entries.append({
+                **_email_base_entry(contact, email, rule_id),
+                "webinar_id": webinar_id,
+                "webinar_name": webinar_info.get("name") or reg.get("event_name", "Webinar"),
+                "webinar_date": webinar_info.get("webinar_date"),
+                "webinar_time": webinar_info.get("webinar_time"),
+            })
+        return entries
+
+    if rule_id in EMAIL_REMINDER_RULES:
+        registered = {
+            reg.get("event_id") for reg in contact.get("webinar_history") or []
+            if isinstance(reg, dict) and reg.get("status") == "registered"
+        }
+        sent_map = contact.get(f"last_email_{rule_id.lower()}_sent") or {}
+        entries = []
+        for event in ctx.future_webinars:
+            event_id = event["id"]
+            if event_id not in registered or event_id in sent_map:
                 continue
-            
-            e6_sent = c.get("last_email_e6_sent", {})
-            
-            for reg in c.get("webinar_history", []):
-                webinar_id = reg.get("event_id")
-                reg_date = reg.get("registered_at", "")
-                
-                if not webinar_id or reg_date < one_week_ago:
-                    continue
-                
-                # Skip if webinar is in the past
-                if webinar_id not in future_webinar_ids:
-                    continue
-                
-                # Skip if E6 already sent for this webinar
-                if webinar_id in e6_sent:
-                    continue
-                
-                webinar_info = future_webinar_data.get(webinar_id, {})
-                
-                contacts.append({
-                    "contact_id": c["id"],
-                    "name": c.get("name", ""),
-                    "email": email,
-                    "company": c.get("company"),
-                    "buyer_persona": c.get("buyer_persona"),
-                    "webinar_id": webinar_id,
-                    "webinar_name": webinar_info.get("name") or reg.get("event_name", "Webinar"),
-                    "webinar_date": webinar_info.get("webinar_date"),
-                    "webinar_time": webinar_info.get("webinar_time"),
-                    "rule_type": "E06"
-                })
-                
-                if len(contacts) >= max_contacts:
-                    break
-            
-            if len(contacts) >= max_contacts:
-                break
-    
-    elif rule_id in ["E07", "E08", "E09", "E10"]:
-        # E7-E10: Webinar reminders based on time
-        # Get future webinars
-        future_events = await db.webinar_events_v2.find(
-            {"webinar_date": {"$gte": now.strftime("%Y-%m-%d")}},
-            {"_id": 0, "id": 1, "name": 1, "webinar_date": 1, "webinar_time": 1, "watching_room_url": 1}
-        ).to_list(50)
-        
-        for event in future_events:
-            event_id = event.get("id")
-            event_name = event.get("name", "Webinar")
-            event_date = event.get("webinar_date")
-            event_time = event.get("webinar_time", "10:00")
-            watching_room_url = event.get("watching_room_url", f"https://leaderlix.com/nurture/lms/webinar/{event_id}")
-            
-            try:
-                event_datetime = datetime.fromisoformat(f"{event_date}T{event_time}:00")
-                if event_datetime.tzinfo is None:
-                    event_datetime = event_datetime.replace(tzinfo=timezone.utc)
-            except (ValueError, TypeError):
+            event_datetime = _webinar_event_datetime(event)
+            if event_datetime is None:
                 continue
-            
-            # Get registered contacts for this event
-            registered = await db.unified_contacts.find({
-                "webinar_history": {"$elemMatch": {"event_id": event_id, "status": "registered"}},
-                "email": {"$type": "string", "$regex": "@"}  # Valid email only
-            }, {"_id": 0, "id": 1, "name": 1, "email": 1, "last_email_e7_sent": 1, 
-                "last_email_e8_sent": 1, "last_email_e9_sent": 1, "last_email_e10_sent": 1}).to_list(500)
-            
-            for c in registered:
-                email = _normalize_email(c.get("email"))
-                if not email:
-                    continue
-                
-                # Check if already sent for this webinar
-                sent_field = f"last_email_{rule_id.lower()}_sent"
-                sent_map = c.get(sent_field, {})
-                if event_id in sent_map:
-                    continue
-                
-                contacts.append({
-                    "contact_id": c["id"],
-                    "name": c.get("name", ""),
-                    "email": email,
-                    "webinar_id": event_id,
-                    "webinar_name": event_name,
-                    "webinar_date": event_date,
-                    "webinar_time": event_time,
-                    "watching_room_url": watching_room_url,
-                    "event_datetime": event_datetime.isoformat(),
-                    "rule_type": rule_id
-                })
-                
-                if len(contacts) >= max_contacts:
-                    break
-            
-            if len(contacts) >= max_contacts:
+            entries.append({
+                "contact_id": contact["id"],
+                "name": contact.get("name", ""),
+                "email": email,
+                "webinar_id": event_id,
+                "webinar_name": event.get("name", "Webinar"),
+                "webinar_date": event.get("webinar_date"),
+                "webinar_time": event.get("webinar_time", "10:00"),
+                "watching_room_url": event.get("watching_room_url", f"https://leaderlix.com/nurture/lms/webinar/{event_id}"),
+                "event_datetime": event_datetime.isoformat(),
+                "rule_type": rule_id
+            })
+        return entries
+
+    return []
+
+
+async def get_eligible_contacts_for_rules(
+    rule_ids: List[str],
+    limit: int = 0,
+    ctx: Optional[RuleEvaluationContext] = None
+) -> Dict[str, list]:
+    """
+    Eligible contacts per rule from a single streamed scan of unified_contacts.
+    limit=0 means no limit (applied per rule).
+    """
+    ctx = ctx or await RuleEvaluationContext.load()
+    results: Dict[str, list] = {rule_id: [] for rule_id in rule_ids}
+    queries = {}
+    for rule_id in rule_ids:
+        query = _email_rule_query(rule_id, ctx)
+        if query is not None:
+            queries[rule_id] = query
+    if not queries:
+        return results
+
+    active = list(queries)
+    query = next(iter(queries.values())) if len(queries) == 1 else {"$or": list(queries.values())}
+    async for contact in iter_contacts(query, EMAIL_RULE_CONTACT_PROJECTION):
+        for rule_id in active:
+            entries = evaluate_email_rule(rule_id, contact, ctx)
+            if entries:
+                results[rule_id].extend(entries)
+        if limit > 0:
+            for rule_id in active:
+                if len(results[rule_id]) >= limit:
+                    del results[rule_id][limit:]
+            active = [r for r in active if len(results[r]) < limit]
+            if not active:
                 break
-    
-    return contacts
+    return results
 
 
-async def generate_email_for_contact(rule_id: str, contact: dict, rule_config: dict = None) -> dict:
-    """Generate email subject and body for a contact based on rule template"""
-    
-    # Prepare variables for template substitution
-    contact_name = contact.get("name", "").split()[0] if contact.get("name") else "Hola"
-    company = contact.get("company", "tu empresa")
-    webinar_name = contact.get("webinar_name", "nuestro próximo webinar")
-    webinar_date = contact.get("webinar_date", "próximamente")
-    webinar_time = contact.get("webinar_time", "")
-    webinar_link = contact.get("watching_room_url", "https://leaderlix.com")
-    
-    # Template variables map
-    variables = {
-        "contact_name": contact_name,
-        "company": company,
-        "webinar_name": webinar_name,
-        "webinar_date": webinar_date,
-        "webinar_time": webinar_time,
-        "webinar_link": webinar_link,
+async def get_eligible_contacts_for_rule(rule_id: str, limit: int = 0, ctx: Optional[RuleEvaluationContext] = None) -> list:
+    """Get contacts eligible for a specific email rule. limit=0 means no limit."""
+    return (await get_eligible_contacts_for_rules([rule_id], limit, ctx))[rule_id]
+
+
+def email_template_variables(contact: dict) -> dict:
+    """Per-recipient template variables for a rule email"""
+    return {
+        "contact_name": contact.get("name", "").split()[0] if contact.get("name") else "Hola",
+        "company": contact.get("company", "tu empresa"),
+        "webinar_name": contact.get("webinar_name", "nuestro próximo webinar"),
+        "webinar_date": contact.get("webinar_date", "próximamente"),
+        "webinar_time": contact.get("webinar_time", ""),
+        "webinar_link": contact.get("watching_room_url", "https://leaderlix.com"),
     }
-    
-    # Get templates from rule_config (from DB) or fallback to DEFAULT_RULES
+
+
+def resolve_rule_templates(rule_id: str, rule_config: dict = None) -> tuple:
+    """(template_subject, template_body) from rule_config (DB), DEFAULT_RULES or a generic fallback"""
     template_subject = None
     template_body = None
     
@@ -2523,26 +2467,35 @@ async def generate_email_for_contact(rule_id: str, contact: dict, rule_config: d
     if not template_body:
         template_body = "<p>Hola {contact_name}!</p>"
     
-    # Substitute variables in templates
-    try:
-        subject = template_subject.format(**variables)
-    except KeyError:
-        # If a variable is missing, use safe substitution
-        subject = template_subject
-        for key, value in variables.items():
-            subject = subject.replace("{" + key + "}", str(value))
+    return template_subject, template_body
+
+
+async def generate_email_for_contact(rule_id: str, contact: dict, rule_config: dict = None) -> dict:
+    """Generate email subject and body for a contact based on rule template"""
+    variables = email_template_variables(contact)
+    template_subject, template_body = resolve_rule_templates(rule_id, rule_config)
     
-    try:
-        body = template_body.format(**variables)
-    except KeyError:
-        # If a variable is missing, use safe substitution
-        body = template_body
-        for key, value in variables.items():
-            body = body.replace("{" + key + "}", str(value))
+    return {
+        "subject": render_text(template_subject, variables),
+        "body": render_text(template_body, variables)
+    }
+
+
+async def queued_email_content(rule_id: str, contact: dict, rule_config: dict = None) -> dict:
+    """
+    Queue fields for a rule email: rendered subject plus a reference to the
+    rule's template and this contact's variables. The body is rendered at
+    send / preview time (services/email_templates.py).
+    """
+    variables = email_template_variables(contact)
+    template_subject, template_body = resolve_rule_templates(rule_id, rule_config)
+    template_id, version = await register_template(rule_id, template_subject, template_body)
     
     return {
-        "subject": subject,
-        "body": body
+        "subject": render_text(template_subject, variables),
+        "template_id": template_id,
+        "template_version": version,
+        "template_vars": variables
     }
 
 
@@ -2554,10 +2507,10 @@ async def get_rules_stats(current_user: dict = Depends(get_current_user)):
     queue_stats = await email_queue.get_queue_stats()
     
     # Get sent emails by rule in last 7 days
-    seven_days_ago = (datetime.now(timezone.utc) - timedelta(days=7)).isoformat()
+    seven_days_ago = datetime.now(timezone.utc) - timedelta(days=7)
     
     pipeline = [
-        {"$match": {"sent_at": {"$gte": seven_days_ago}}},
+        {"$match": timestamp_query("sent_at", gte=seven_days_ago)},
         {"$group": {
             "_id": "$rule",
             "sent": {"$sum": 1},
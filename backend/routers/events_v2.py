@@ -15,6 +15,8 @@ from dotenv import load_dotenv
 load_dotenv()
 
 from database import db
+from services.response_cache import response_cache
+from services.stats_counters import track_change
 from routers.auth import get_current_user
 from routers.webinar_emails import send_registration_confirmation
 import logging
@@ -188,8 +190,8 @@ def generate_event_schedule(creation_date: datetime, webinar_date: datetime) ->
 
 # ============ HUBSPOT INTEGRATION ============
 
-# Import centralized HubSpot token helper
-from utils.hubspot_helpers import get_hubspot_token, get_hubspot_headers
+# Shared pooled / rate-limited HubSpot client
+from services.hubspot_client import hubspot, HubSpotError
 
 def parse_hubspot_list_url(url: str) -> Optional[str]:
     """Extract list ID from HubSpot list URL"""
@@ -212,95 +214,45 @@ def parse_hubspot_list_url(url: str) -> Optional[str]:
 
 async def get_hubspot_list_members(list_id: str) -> List[str]:
     """Get all contact IDs from a HubSpot list"""
-    import httpx
-    
-    headers = await get_hubspot_headers()
-    
-    async with httpx.AsyncClient() as client:
-        all_ids = []
-        after = None
-        
-        while True:
-            url = f"https://api.hubapi.com/crm/v3/lists/{list_id}/memberships?limit=500"
-            if after:
-                url += f"&after={after}"
-            
-            response = await client.get(
-                url,
-                headers=headers,
-                timeout=30.0
-            )
-            
-            if response.status_code != 200:
-                logger.error(f"HubSpot list error: {response.status_code} - {response.text}")
-                break
-                
-            data = response.json()
-            ids = [r["recordId"] for r in data.get("results", [])]
-            all_ids.extend(ids)
-            
-            paging = data.get("paging", {})
-            if "next" in paging:
-                after = paging["next"].get("after")
-            else:
-                break
-        
-        return all_ids
+    try:
+        return await hubspot.list_memberships(list_id)
+    except HubSpotError as e:
+        logger.error(f"HubSpot list error: {e}")
+        return []
+
+
+HUBSPOT_IMPORT_CONTACT_PROPERTIES = [
+    "firstname", "lastname", "email", "hs_additional_emails",
+    "phone", "mobilephone", "other_phone",
+    "company", "jobtitle", "associatedcompanyid"
+]
 
 
 async def get_hubspot_contacts_batch(contact_ids: List[str]) -> List[dict]:
-    """Get full details for a batch of contacts from HubSpot"""
-    import httpx
-    
+    """Get full details for contacts from HubSpot (batch read, 100 per request)"""
     if not contact_ids:
         return []
     
-    headers = await get_hubspot_headers()
-    
-    async with httpx.AsyncClient() as client:
-        response = await client.post(
-            "https://api.hubapi.com/crm/v3/objects/contacts/batch/read",
-            headers=headers,
-            json={
-                "properties": [
-                    "firstname", "lastname", "email", "hs_additional_emails",
-                    "phone", "mobilephone", "other_phone",
-                    "company", "jobtitle", "associatedcompanyid"
-                ],
-                "inputs": [{"id": str(cid)} for cid in contact_ids]
-            },
-            timeout=60.0
-        )
-        
-        if response.status_code == 200:
-            return response.json().get("results", [])
-        else:
-            logger.error(f"HubSpot batch error: {response.status_code} - {response.text}")
-            return []
+    try:
+        return await hubspot.batch_read("contacts", contact_ids, HUBSPOT_IMPORT_CONTACT_PROPERTIES)
+    except HubSpotError as e:
+        logger.error(f"HubSpot batch error: {e}")
+        return []
 
 
 async def get_hubspot_company(company_id: str) -> Optional[dict]:
     """Get company details from HubSpot by ID"""
-    import httpx
-    
     if not company_id:
         return None
     
-    headers = await get_hubspot_headers()
-    
-    async with httpx.AsyncClient() as client:
-        response = await client.get(
-            f"https://api.hubapi.com/crm/v3/objects/companies/{company_id}",
-            headers=headers,
-            params={"properties": "name,domain,industry,phone,city,country"},
-            timeout=30.0
+    try:
+        return await hubspot.get(
+            f"/crm/v3/objects/companies/{company_id}",
+            params={"properties": "name,domain,industry,phone,city,country"}
         )
-        
-        if response.status_code == 200:
-            return response.json()
-        else:
-            logger.warning(f"Could not fetch HubSpot company {company_id}: {response.status_code}")
-            return None
+    except HubSpotError as e:
+        logger.warning(f"Could not fetch HubSpot company {company_id}: {e.status_code}")
+        return None
 
 
 async def ensure_company_exists(company_id: str, company_name: str = None) -> Optional[str]:
@@ -313,10 +265,13 @@ async def ensure_company_exists(company_id: str, company_name: str = None) -> Op
     
     # First, check if company already exists by HubSpot ID in unified_companies
     if company_id:
+        # hs_object_id is stored as the int HubSpot returns; match either form
+        hs_ids = [company_id, str(company_id)]
+        if str(company_id).isdigit():
+            hs_ids.append(int(company_id))
         existing = await db.unified_companies.find_one(
             {"$or": [
-                {"hs_object_id": company_id}, 
-                {"hs_object_id": str(company_id)},
+                {"hs_object_id": {"$in": hs_ids}},
                 {"hubspot_id": str(company_id)},
                 {"id": str(company_id)}
             ]},
@@ -386,13 +341,8 @@ async def import_hubspot_list_to_event(list_url: str, event_id: str, event_name:
     
     logger.info(f"Found {len(contact_ids)} contacts in HubSpot list")
     
-    # Fetch contact details in batches of 100
-    all_contacts = []
-    batch_size = 100
-    for i in range(0, len(contact_ids), batch_size):
-        batch = contact_ids[i:i + batch_size]
-        contacts = await get_hubspot_contacts_batch(batch)
-        all_contacts.extend(contacts)
+    # Fetch contact details (batch reads of 100, run concurrently)
+    all_contacts = await get_hubspot_contacts_batch(contact_ids)
     
     logger.info(f"Fetched details for {len(all_contacts)} contacts")
     
@@ -490,6 +440,7 @@ async def import_hubspot_list_to_event(list_url: str, event_id: str, event_name:
                 {"id": existing["id"]},
                 {"$set": update_data}
             )
+            await track_change("unified_contacts", existing, update_data)
             updated += 1
         else:
             # Create new contact
@@ -519,6 +470,7 @@ async def import_hubspot_list_to_event(list_url: str, event_id: str, event_name:
                 "updated_at": now
             }
             await db.unified_contacts.insert_one(new_contact)
+            await track_change("unified_contacts", None, new_contact)
             created += 1
     
     logger.info(f"HubSpot import complete: {created} created, {updated} updated")
@@ -1190,6 +1142,7 @@ async def create_event_v2(
         event["hubspot_import"] = hubspot_import_result
     
     logger.info(f"Created event v2: {data.name} with {len(tasks)} tasks")
+    response_cache.invalidate("events")
     return event
 
 
@@ -1282,6 +1235,7 @@ async def update_event_v2(
     updated_event = await db.webinar_events_v2.find_one({"id": event_id}, {"_id": 0})
     updated_event["traffic_light"] = calculate_event_traffic_light(updated_event)
     
+    response_cache.invalidate("events")
     return updated_event
 
 
@@ -1316,6 +1270,7 @@ async def delete_event_v2(
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Evento no encontrado")
     
+    response_cache.invalidate("events")
     return {"success": True, "message": "Evento eliminado"}
 
 
@@ -1516,6 +1471,7 @@ async def register_for_event(slug: str, data: EventRegistrationRequest):
             {"email": data.email},
             {"$set": update_data}
         )
+        await track_change("unified_contacts", existing_contact, update_data)
     else:
         # Create new contact in Stage 2
         contact_id = str(uuid.uuid4())
@@ -1537,6 +1493,7 @@ async def register_for_event(slug: str, data: EventRegistrationRequest):
             "updated_at": now.isoformat()
         }
         await db.unified_contacts.insert_one(new_contact)
+        await track_change("unified_contacts", None, new_contact)
     
     logger.info(f"New registration for event {event.get('name')}: {data.email}")
     
@@ -1646,6 +1603,7 @@ async def register_team_for_event(slug: str, data: TeamRegistrationRequest):
                     "updated_at": now.isoformat()
                 }}
             )
+            await track_change("unified_contacts", existing_contact, {"stage": new_stage})
         else:
             # Create new contact in Stage 2
             contact_id = str(uuid.uuid4())
@@ -1666,6 +1624,7 @@ async def register_team_for_event(slug: str, data: TeamRegistrationRequest):
                 "updated_at": now.isoformat()
             }
             await db.unified_contacts.insert_one(new_contact)
+            await track_change("unified_contacts", None, new_contact)
         
         # Send E06 confirmation email to team member
         try:
@@ -1785,6 +1744,7 @@ async def regenerate_event_image(
             {"id": event_id},
             {"$set": {"banner_image": banner_url, "updated_at": datetime.now(timezone.utc).isoformat()}}
         )
+        response_cache.invalidate("events")
         return {"success": True, "banner_image": banner_url}
     
     raise HTTPException(status_code=500, detail="Error al generar imagen")
@@ -2482,6 +2442,7 @@ async def create_webinar_from_content_item(
     
     logger.info(f"Created webinar from content item: {event_name}")
     
+    response_cache.invalidate("events")
     return {
         "success": True,
         "event": event,
@@ -2672,6 +2633,7 @@ async def import_contacts_to_webinar(
                     "$push": {"webinar_history": webinar_entry}
                 }
             )
+            await track_change("unified_contacts", existing, update_data)
             
             # Auto-enroll in LMS course if enabled
             if auto_enroll and course_id:
@@ -2712,6 +2674,7 @@ async def import_contacts_to_webinar(
             }
             
             await db.unified_contacts.insert_one(new_contact)
+            await track_change("unified_contacts", None, new_contact)
             
             # Auto-enroll in LMS course if enabled
             if auto_enroll and course_id:
@@ -2778,8 +2741,6 @@ async def import_hubspot_with_progress(event_id: str, event_name: str, list_url:
     Import contacts from HubSpot with progress tracking.
     Updates hubspot_import_progress dict in real-time.
     """
-    import httpx
-    
     # Initialize progress
     hubspot_import_progress[event_id] = {
         "status": "starting",
@@ -2820,12 +2781,9 @@ async def import_hubspot_with_progress(event_id: str, event_name: str, list_url:
             "total": total
         })
         
-        # Fetch contact details in batches
+        # Fetch contact details in batches (concurrent batch reads, consumed in order)
         all_contacts = []
-        batch_size = 100
-        for i in range(0, len(contact_ids), batch_size):
-            batch = contact_ids[i:i + batch_size]
-            contacts = await get_hubspot_contacts_batch(batch)
+        async for contacts in hubspot.iter_batch_read("contacts", contact_ids, HUBSPOT_IMPORT_CONTACT_PROPERTIES):
             all_contacts.extend(contacts)
             hubspot_import_progress[event_id].update({
                 "phase": f"Descargando contactos... ({len(all_contacts)}/{total})",
@@ -0,0 +1,369 @@
+"""
+Exports Router - Streaming CSV / XLSX exports of contacts, companies and queues
+
+GET /exports/<dataset> streams the rows straight from a MongoDB cursor
+(services/exports.py), with the same filters as the dataset's list endpoint:
+
+- format: csv (default) or xlsx (needs openpyxl)
+- columns: comma-separated fields (dotted paths allowed); defaults per dataset
+- gzip: gzip-compress the CSV stream
+
+Exports over EXPORT_STREAM_MAX_ROWS rows run as background jobs instead:
+POST /exports/jobs, then poll GET /exports/jobs/{job_id} and download the
+file from GET /exports/jobs/{job_id}/download.
+"""
+import inspect
+import os
+from typing import Any, Dict, List, Optional
+
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query
+from fastapi.responses import FileResponse, StreamingResponse
+from pydantic import BaseModel
+
+from config import EXPORT_STREAM_MAX_ROWS
+from database import db
+from routers.auth import get_current_user
+from routers.contacts import build_contacts_query
+from routers.unified_companies import build_companies_query
+from services.exports import (
+    ExportError, check_format, create_export_job, export_chunks, export_filename,
+    export_media_type, parse_columns, run_export_job
+)
+from utils.timestamps import parse_timestamp, timestamp_query
+
+router = APIRouter(prefix="/exports", tags=["Exports"])
+
+
+# =============================================================================
+# DATASETS
+# =============================================================================
+
+def _time_range(field: str, since: Optional[str], until: Optional[str]) -> List[Dict[str, Any]]:
+    bounds = {}
+    for name, value in (("gte", since), ("lt", until)):
+        if value:
+            parsed = parse_timestamp(value)
+            if parsed is None:
+                raise ExportError(f"Invalid date: {value}")
+            bounds[name] = parsed
+    return [timestamp_query(field, **bounds)] if bounds else []
+
+
+def _queue_query(time_field, rule, status, contact_id, since, until) -> Dict[str, Any]:
+    query = {}
+    if rule:
+        query["rule"] = rule.upper()
+    if status:
+        query["status"] = status
+    if contact_id:
+        query["contact_id"] = contact_id
+    ranges = _time_range(time_field, since, until)
+    if ranges:
+        query["$and"] = ranges
+    return query
+
+
+def build_email_queue_query(
+    rule: Optional[str] = None,
+    status: Optional[str] = None,
+    contact_id: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None
+) -> Dict[str, Any]:
+    """Email queue filter (since / until apply to scheduled_at)"""
+    return _queue_query("scheduled_at", rule, status, contact_id, since, until)
+
+
+def build_whatsapp_queue_query(
+    rule: Optional[str] = None,
+    status: Optional[str] = None,
+    contact_id: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None
+) -> Dict[str, Any]:
+    """WhatsApp queue filter (since / until apply to created_at)"""
+    return _queue_query("created_at", rule, status, contact_id, since, until)
+
+
+def build_tracking_events_query(
+    email_id: Optional[str] = None,
+    event_type: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None
+) -> Dict[str, Any]:
+    """Tracking event filter (since / until apply to timestamp)"""
+    query = {}
+    if email_id:
+        query["email_id"] = email_id
+    if event_type:
+        query["event_type"] = event_type
+    ranges = _time_range("timestamp", since, until)
+    if ranges:
+        query["$and"] = ranges
+    return query
+
+
+EXPORT_DATASETS = {
+    "contacts": {
+        "collection": "unified_contacts",
+        "build_query": build_contacts_query,
+        "sort": [("created_at", -1), ("_id", -1)],
+        "columns": [
+            "id", "name", "first_name", "last_name", "email", "phone", "company", "job_title",
+            "stage", "buyer_persona", "classification", "source", "roles", "created_at", "updated_at"
+        ],
+    },
+    "companies": {
+        "collection": "unified_companies",
+        "build_query": build_companies_query,
+        "sort": [("name", 1), ("_id", 1)],
+        "columns": [
+            "id", "name", "domain", "aliases", "industry", "industry_code", "classification",
+            "website", "city", "country", "created_at", "updated_at"
+        ],
+    },
+    "email_queue": {
+        "collection": "email_queue",
+        "build_query": build_email_queue_query,
+        "sort": [("scheduled_at", -1), ("_id", -1)],
+        "columns": [
+            "id", "rule", "contact_id", "contact_email", "contact_name", "subject", "status",
+            "scheduled_at", "sent_at", "attempts", "error", "created_at"
+        ],
+    },
+    "whatsapp_queue": {
+        "collection": "whatsapp_queue",
+        "build_query": build_whatsapp_queue_query,
+        "sort": [("created_at", -1), ("_id", -1)],
+        "columns": [
+            "id", "rule", "contact_id", "contact_name", "contact_phone", "contact_type", "status",
+            "generated_date", "sent_at", "sent_by", "created_at"
+        ],
+    },
+    "tracking_events": {
+        "collection": "tracking_events",
+        "build_query": build_tracking_events_query,
+        "sort": [("timestamp", -1), ("_id", -1)],
+        "columns": [
+            "id", "email_id", "event_type", "link_id", "clicked_url", "user_agent", "ip_address", "timestamp"
+        ],
+    },
+}
+
+
+async def _build_query(dataset: str, filters: Dict[str, Any]) -> Dict[str, Any]:
+    """Dataset filter from list-endpoint style parameters"""
+    builder = EXPORT_DATASETS[dataset]["build_query"]
+    allowed = set(inspect.signature(builder).parameters)
+    unknown = sorted(set(filters) - allowed)
+    if unknown:
+        raise ExportError(f"Unknown filter(s) for {dataset}: {', '.join(unknown)}")
+    query = builder(**{k: v for k, v in filters.items() if v is not None})
+    return await query if inspect.isawaitable(query) else query
+
+
+async def stream_export(
+    dataset: str,
+    filters: Dict[str, Any],
+    file_format: str,
+    columns: Optional[str],
+    compress: bool
+) -> StreamingResponse:
+    """StreamingResponse of a dataset export (400 on bad input, 413 if it should be a job)"""
+    config = EXPORT_DATASETS[dataset]
+    try:
+        check_format(file_format)
+        selected = parse_columns(columns, config["columns"])
+        query = await _build_query(dataset, filters)
+    except ExportError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    collection = db[config["collection"]]
+    rows = await collection.count_documents(query, limit=EXPORT_STREAM_MAX_ROWS + 1)
+    if rows > EXPORT_STREAM_MAX_ROWS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Export has more than {EXPORT_STREAM_MAX_ROWS} rows; run it as a background job (POST /exports/jobs)"
+        )
+
+    filename = export_filename(dataset, file_format, compress)
+    return StreamingResponse(
+        export_chunks(collection, query, selected, config["sort"], file_format, compress),
+        media_type=export_media_type(file_format, compress),
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    )
+
+
+# =============================================================================
+# STREAMING EXPORTS
+# =============================================================================
+
+@router.get("/contacts")
+async def export_contacts(
+    file_format: str = Query("csv", alias="format"),
+    columns: Optional[str] = None,
+    gzip: bool = False,
+    stage: Optional[int] = None,
+    buyer_persona: Optional[str] = None,
+    status: Optional[str] = None,
+    search: Optional[str] = None,
+    tag: Optional[str] = None,
+    source: Optional[str] = None,
+    company: Optional[str] = None,
+    companies: Optional[str] = None,
+    role: Optional[str] = None,
+    current_user: dict = Depends(get_current_user)
+):
+    """Export contacts (filters as in GET /contacts)"""
+    filters = {
+        "stage": stage, "buyer_persona": buyer_persona, "status": status, "search": search, "tag": tag,
+        "source": source, "company": company, "companies": companies, "role": role
+    }
+    return await stream_export("contacts", filters, file_format, columns, gzip)
+
+
+@router.get("/companies")
+async def export_companies(
+    file_format: str = Query("csv", alias="format"),
+    columns: Optional[str] = None,
+    gzip: bool = False,
+    classification: Optional[str] = None,
+    search: Optional[str] = None,
+    industry: Optional[str] = None,
+    industry_code: Optional[str] = None,
+    current_user: dict = Depends(get_current_user)
+):
+    """Export unified companies (filters as in GET /unified-companies)"""
+    filters = {"classification": classification, "search": search, "industry": industry, "industry_code": industry_code}
+    return await stream_export("companies", filters, file_format, columns, gzip)
+
+
+@router.get("/email-queue")
+async def export_email_queue(
+    file_format: str = Query("csv", alias="format"),
+    columns: Optional[str] = None,
+    gzip: bool = False,
+    rule: Optional[str] = None,
+    status: Optional[str] = None,
+    contact_id: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    current_user: dict = Depends(get_current_user)
+):
+    """Export the email queue (since / until: scheduled_at range)"""
+    filters = {"rule": rule, "status": status, "contact_id": contact_id, "since": since, "until": until}
+    return await stream_export("email_queue", filters, file_format, columns, gzip)
+
+
+@router.get("/whatsapp-queue")
+async def export_whatsapp_queue(
+    file_format: str = Query("csv", alias="format"),
+    columns: Optional[str] = None,
+    gzip: bool = False,
+    rule: Optional[str] = None,
+    status: Optional[str] = None,
+    contact_id: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    current_user: dict = Depends(get_current_user)
+):
+    """Export the WhatsApp queue (since / until: created_at range)"""
+    filters = {"rule": rule, "status": status, "contact_id": contact_id, "since": since, "until": until}
+    return await stream_export("whatsapp_queue", filters, file_format, columns, gzip)
+
+
+@router.get("/tracking-events")
+async def export_tracking_events(
+    file_format: str = Query("csv", alias="format"),
+    columns: Optional[str] = None,
+    gzip: bool = False,
+    email_id: Optional[str] = None,
+    event_type: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    current_user: dict = Depends(get_current_user)
+):
+    """Export email tracking events (since / until: timestamp range)"""
+    filters = {"email_id": email_id, "event_type": event_type, "since": since, "until": until}
+    return await stream_export("tracking_events", filters, file_format, columns, gzip)
+
+
+# =============================================================================
+# BACKGROUND JOBS
+# =============================================================================
+
+class ExportJobRequest(BaseModel):
+    """Background export request"""
+    dataset: str  # contacts, companies, email_queue, whatsapp_queue, tracking_events
+    format: str = "csv"
+    columns: Optional[List[str]] = None
+    gzip: bool = False
+    filters: Dict[str, Any] = {}  # Same parameters as the dataset's GET export
+
+
+@router.post("/jobs")
+async def create_export(
+    request: ExportJobRequest,
+    background_tasks: BackgroundTasks,
+    current_user: dict = Depends(get_current_user)
+):
+    """Start a background export; the file is written to disk for later download"""
+    if request.dataset not in EXPORT_DATASETS:
+        raise HTTPException(status_code=400, detail=f"Dataset must be one of: {', '.join(EXPORT_DATASETS)}")
+    config = EXPORT_DATASETS[request.dataset]
+    try:
+        check_format(request.format)
+        columns = parse_columns(request.columns, config["columns"])
+        query = await _build_query(request.dataset, request.filters)
+    except ExportError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    job = await create_export_job(
+        db, request.dataset, request.format, columns, request.gzip, request.filters, current_user
+    )
+    background_tasks.add_task(run_export_job, db, job["job_id"], config["collection"], query, config["sort"])
+    return job
+
+
+@router.get("/jobs")
+async def list_exports(
+    limit: int = Query(20, le=100),
+    current_user: dict = Depends(get_current_user)
+):
+    """Recent export jobs, newest first"""
+    jobs = await db.export_jobs.find(
+        {}, {"_id": 0, "file_path": 0}
+    ).sort("created_at", -1).limit(limit).to_list(limit)
+    return {"jobs": jobs, "count": len(jobs)}
+
+
+@router.get("/jobs/{job_id}")
+async def get_export(
+    job_id: str,
+    current_user: dict = Depends(get_current_user)
+):
+    """Status of an export job"""
+    job = await db.export_jobs.find_one({"job_id": job_id}, {"_id": 0, "file_path": 0})
+    if not job:
+        raise HTTPException(status_code=404, detail="Export job not found")
+    return job
+
+
+@router.get("/jobs/{job_id}/download")
+async def download_export(
+    job_id: str,
+    current_user: dict = Depends(get_current_user)
+):
+    """Download the file of a completed export job"""
+    job = await db.export_jobs.find_one({"job_id": job_id}, {"_id": 0})
+    if not job:
+        raise HTTPException(status_code=404, detail="Export job not found")
+    if job["status"] != "completed":
+        raise HTTPException(status_code=409, detail=f"Export is {job['status']}")
+    if not job.get("file_path") or not os.path.exists(job["file_path"]):
+        raise HTTPException(status_code=410, detail="Export file is no longer available")
+    return FileResponse(
+        job["file_path"],
+        media_type=export_media_type(job["format"], job.get("gzip", False)),
+        filename=job["filename"]
+    )
@@ -11,6 +11,7 @@ from pydantic import BaseModel
 from typing import Optional, Dict
 from datetime import datetime, timedelta, timezone
 from database import db
+from utils.timestamps import timestamp_query
 from bson import ObjectId
 
 router = APIRouter(prefix="/focus", tags=["Focus"])
@@ -647,7 +648,7 @@ async def calculate_role_assignment_status() -> str:
     assignments_this_week = await db.unified_contacts.count_documents({
         "current_stage": {"$in": [3, 4, 5]},
         "assigned_role": {"$ne": None, "$exists": True},
-        "updated_at": {"$gte": monday, "$lte": sunday}
+        **timestamp_query("updated_at", gte=monday, lte=sunday)
     })
     
     if assignments_this_week > 0:
@@ -678,7 +679,7 @@ async def calculate_whatsapp_status() -> str:
     # Get sent messages today from whatsapp_logs
     sent_today = await db.whatsapp_logs.count_documents({
         "status": "sent",
-        "sent_at": {"$gte": today_start.isoformat(), "$lte": today_end.isoformat()}
+        **timestamp_query("sent_at", gte=today_start, lte=today_end)
     })
     
     # Traffic light rules
@@ -708,7 +709,7 @@ async def calculate_email_status() -> str:
     pending_count = await db.email_queue.count_documents({
         "status": "pending",
         "$or": [
-            {"scheduled_at": {"$lte": today_end.isoformat()}},
+            *timestamp_query("scheduled_at", lte=today_end)["$or"],
             {"scheduled_at": {"$exists": False}},
             {"scheduled_at": None}
         ]
@@ -717,7 +718,7 @@ async def calculate_email_status() -> str:
     # Get sent emails today from email_logs
     sent_today = await db.email_logs.count_documents({
         "status": "sent",
-        "sent_at": {"$gte": today_start.isoformat(), "$lte": today_end.isoformat()}
+        **timestamp_query("sent_at", gte=today_start, lte=today_end)
     })
     
     # Traffic light rules:
@@ -14,6 +14,7 @@ from datetime import datetime, timezone
 import uuid
 
 from database import db
+from services import blog_classification
 from routers.auth import get_current_user
 
 router = APIRouter(prefix="/foundations", tags=["foundations"])
@@ -384,6 +385,9 @@ async def update_competency(
     if result.modified_count == 0:
         raise HTTPException(status_code=404, detail="Competency not found")
     
+    if "name" in update_data:
+        await blog_classification.propagate_competency_name(competency_id)
+    
     return {"success": True}
 
 
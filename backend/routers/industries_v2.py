@@ -5,9 +5,9 @@ This router provides:
 - CRUD operations for normalized industries (using stable IDs)
 - Classification support (inbound/outbound)
 - Industry merging capability
-- Propagation of classification to companies
+- Propagation of classification to companies and their contacts
 """
-from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi import APIRouter, HTTPException, Depends, Query, BackgroundTasks
 from pydantic import BaseModel
 from typing import Optional, List
 from datetime import datetime, timezone
@@ -16,6 +16,11 @@ import re
 
 from .auth import get_current_user
 from .legacy import db
+from config import CLASSIFICATION_PROPAGATION_BACKGROUND_COMPANIES
+from services.classification_propagation import (
+    apply_industry_propagation, log_industry_propagation, plan_industry_propagation,
+    run_industry_propagation, should_run_in_background, start_industry_propagation
+)
 
 router = APIRouter(prefix="/industries-v2", tags=["Industries V2"])
 
@@ -312,78 +317,25 @@ async def update_industry_classification(
     old_classification = industry.get("classification", "inbound")
     now = datetime.now(timezone.utc).isoformat()
     
-    # Update industry
-    await db.industries.update_one(
-        {"id": industry_id},
-        {"$set": {
-            "classification": request.classification,
-            "updated_at": now
-        }}
-    )
-    
-    # Also update in active_sectors
-    await db.active_sectors.update_one(
-        {"id": industry_id},
-        {"$set": {
-            "classification": request.classification,
-            "updated_at": now
-        }}
-    )
-    
-    # Propagate to all companies with this industry_code
+    # Propagate to the industry's companies and their contacts
     companies_updated = 0
     contacts_updated = 0
     industry_code = industry.get("code")
-    if industry_code and old_classification != request.classification:
-        # Get company IDs before updating
-        company_ids = []
-        async for comp in db.unified_companies.find(
-            {"industry_code": industry_code, "is_merged": {"$ne": True}},
-            {"id": 1}
-        ):
-            company_ids.append(comp["id"])
-        
-        # Update companies
-        result = await db.unified_companies.update_many(
-            {"industry_code": industry_code, "is_merged": {"$ne": True}},
-            {"$set": {
-                "classification": request.classification,
-                "updated_at": now
-            }}
-        )
-        companies_updated = result.modified_count
-        
-        # Note: active_companies is deprecated, unified_companies is the single source
-        # Classification is already updated above in unified_companies
-        
-        # Propagate to contacts of these companies
-        if company_ids:
-            # Get company names for matching contacts that only have company_name
-            company_names = []
-            async for comp in db.unified_companies.find(
-                {"id": {"$in": company_ids}},
-                {"name": 1, "aliases": 1}
-            ):
-                if comp.get("name"):
-                    company_names.append(comp["name"])
-                    # Also add aliases
-                    for alias in comp.get("aliases", []):
-                        if alias:
-                            company_names.append(alias)
-            
-            # Update contacts by company_id OR company_name
-            result_contacts = await db.unified_contacts.update_many(
-                {"$or": [
-                    {"company_id": {"$in": company_ids}},
-                    {"companies.company_id": {"$in": company_ids}},
-                    {"companies.company_name": {"$in": company_names}}
-                ]},
+    if old_classification != request.classification:
+        plan = await plan_industry_propagation(db, industry, request.classification)
+        result = await apply_industry_propagation(db, industry, request.classification, plan)
+        companies_updated = result["companies_updated"]
+        contacts_updated = result["contacts_updated"]
+    else:
+        # Update industry (and active_sectors) only
+        for collection in (db.industries, db.active_sectors):
+            await collection.update_one(
+                {"id": industry_id},
                 {"$set": {
                     "classification": request.classification,
                     "updated_at": now
                 }}
             )
-            contacts_updated = result_contacts.modified_count
     
     # Audit log
     await db.audit_logs.insert_one({
@@ -428,31 +380,17 @@ async def get_industry_propagation_preview(
     if not industry:
         raise HTTPException(status_code=404, detail="Industry not found")
     
-    industry_name = industry.get("name", "")
-    
-    # Find companies that would be affected
-    query = {
-        "$or": [
-            {"industry_id": industry_id},
-            {"industry": {"$regex": f"^{re.escape(industry_name)}$", "$options": "i"}}
-        ],
-        "classification": {"$ne": target_classification},
-        "is_merged": {"$ne": True}
-    }
-    
-    affected = []
-    async for company in db.unified_companies.find(query, {"_id": 0, "id": 1, "name": 1}):
-        affected.append({
-            "id": company["id"],
-            "name": company.get("name", "Unknown")
-        })
+    plan = await plan_industry_propagation(db, industry, target_classification)
     
     return {
         "industry_id": industry_id,
-        "industry_name": industry_name,
+        "industry_name": industry.get("name", ""),
         "target_classification": target_classification,
-        "affected_count": len(affected),
-        "affected_companies": affected[:100]  # Limit preview
+        "affected_count": len(plan["company_ids"]),
+        "affected_companies": plan["company_sample"],  # Limit preview
+        "affected_contacts_count": len(plan["contacts"]["contact_ids"]),
+        "affected_contacts": plan["contacts"]["sample"],
+        "runs_in_background": plan["companies_total"] > CLASSIFICATION_PROPAGATION_BACKGROUND_COMPANIES
     }
 
 
@@ -460,10 +398,16 @@ async def get_industry_propagation_preview(
 async def propagate_industry_classification(
     industry_id: str,
     request: ClassificationUpdate,
+    background_tasks: BackgroundTasks,
+    background: Optional[bool] = Query(None, description="Run as a background job (default: only for large industries)"),
     current_user: dict = Depends(get_current_user)
 ):
     """
-    Propagate industry classification to all associated companies.
+    Propagate industry classification to all associated companies and their contacts.
+    
+    Industries with more than CLASSIFICATION_PROPAGATION_BACKGROUND_COMPANIES
+    companies run in the background; follow them with
+    GET /propagation-operations/{operation_id}.
     """
     if request.classification not in ["inbound", "outbound"]:
         raise HTTPException(status_code=400, detail="Classification must be 'inbound' or 'outbound'")
@@ -472,60 +416,54 @@ async def propagate_industry_classification(
     if not industry:
         raise HTTPException(status_code=404, detail="Industry not found")
     
-    industry_name = industry.get("name", "")
-    now = datetime.now(timezone.utc).isoformat()
-    
-    # First update the industry itself
-    old_classification = industry.get("classification", "inbound")
-    await db.industries.update_one(
-        {"id": industry_id},
-        {"$set": {
-            "classification": request.classification,
-            "updated_at": now
-        }}
-    )
-    
-    # Find and update associated companies
-    query = {
-        "$or": [
-            {"industry_id": industry_id},
-            {"industry": {"$regex": f"^{re.escape(industry_name)}$", "$options": "i"}}
-        ],
-        "is_merged": {"$ne": True}
-    }
-    
-    result = await db.unified_companies.update_many(
-        query,
-        {"$set": {
+    if background is None:
+        background = await should_run_in_background(db, industry)
+    
+    if background:
+        operation_id = await start_industry_propagation(db, industry_id, request.classification, current_user)
+        background_tasks.add_task(
+            run_industry_propagation,
+            db,
+            industry_id,
+            request.classification,
+            operation_id,
+            current_user
+        )
+        return {
+            "success": True,
+            "status": "started",
+            "industry_id": industry_id,
             "classification": request.classification,
-            "updated_at": now
-        }}
-    )
+            "operation_id": operation_id
+        }
     
-    companies_updated = result.modified_count
-    
-    # Audit log
-    await db.audit_logs.insert_one({
-        "id": str(uuid.uuid4()),
-        "type": "propagation",
-        "source_type": "industry",
-        "source_id": industry_id,
-        "target_type": "company",
-        "target_classification": request.classification,
-        "affected_count": companies_updated,
-        "user_id": current_user.get("id"),
-        "user_email": current_user.get("email"),
-        "timestamp": now
-    })
+    plan = await plan_industry_propagation(db, industry, request.classification)
+    result = await apply_industry_propagation(db, industry, request.classification, plan)
+    await log_industry_propagation(db, industry_id, request.classification, result, current_user)
     
     return {
         "success": True,
         "industry_id": industry_id,
         "classification": request.classification,
-        "companies_updated": companies_updated
+        **result
     }
 
 
+@router.get("/propagation-operations/{operation_id}")
+async def get_propagation_operation(
+    operation_id: str,
+    current_user: dict = Depends(get_current_user)
+):
+    """Status of a background classification propagation"""
+    operation = await db.admin_operations.find_one(
+        {"operation_id": operation_id, "operation_type": "classification_propagation"},
+        {"_id": 0}
+    )
+    if not operation:
+        raise HTTPException(status_code=404, detail="Operation not found")
+    return operation
+
+
 # =============================================================================
 # MERGE ENDPOINTS
 # =============================================================================
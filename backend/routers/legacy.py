@@ -26,6 +26,8 @@ from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 
 from database import db
+from services.hubspot_client import hubspot, HubSpotError
+from services.stats_counters import count_email_event, ensure_counters, get_counters
 from config import (
     EMERGENT_LLM_KEY, HUBSPOT_TOKEN, HUBSPOT_LIST_ID, HUBSPOT_ACCOUNT_ID,
     PIPELINE_COHORTES_ID, PIPELINE_PROYECTOS_ID,
@@ -2116,10 +2118,12 @@ async def track_open(email_id: str, request: Request):
         })
         
         # Update email log
-        await db.email_logs.update_one(
+        result = await db.email_logs.update_one(
             {"id": email_id, "opened_at": None},
             {"$set": {"opened_at": datetime.now(timezone.utc).isoformat()}}
         )
+        if result.modified_count:
+            await count_email_event("opened")
         
         # Update campaign stats
         email_log = await db.email_logs.find_one({"id": email_id}, {"_id": 0})
@@ -2154,10 +2158,12 @@ async def track_click(email_id: str, link_id: str, url: str, request: Request):
         # Update email log
         email_log = await db.email_logs.find_one({"id": email_id}, {"_id": 0})
         if email_log:
-            await db.email_logs.update_one(
+            result = await db.email_logs.update_one(
                 {"id": email_id, "clicked_at": None},
                 {"$set": {"clicked_at": datetime.now(timezone.utc).isoformat()}}
             )
+            if result.modified_count:
+                await count_email_event("clicked")
             
             # Update campaign stats
             await db.campaigns.update_one(
@@ -2177,62 +2183,48 @@ async def track_click(email_id: str, link_id: str, url: str, request: Request):
 
 async def move_deal_on_click(contact_id: str):
     """Move associated deal from 'DM Identificado' to 'Interés en Caso' when contact clicks"""
-    headers = await get_hubspot_headers()
-    
     try:
-        async with httpx.AsyncClient(timeout=30.0) as http_client:
-            # Get deals associated with contact
-            assoc_url = f"https://api.hubapi.com/crm/v4/objects/contacts/{contact_id}/associations/deals"
-            response = await http_client.get(assoc_url, headers=headers)
+        # Get deals associated with contact
+        data = await hubspot.get(f"/crm/v4/objects/contacts/{contact_id}/associations/deals")
+        deal_ids = [r.get("toObjectId") for r in data.get("results", [])]
+    except HubSpotError as e:
+        logger.error(f"Could not get contact associations: {e}")
+        return
+    
+    for deal_id in deal_ids:
+        try:
+            # Get deal details
+            deal = await hubspot.get(
+                f"/crm/v3/objects/deals/{deal_id}",
+                params={"properties": "dealname,pipeline,dealstage"}
+            )
+            props = deal.get("properties", {})
             
-            if response.status_code != 200:
-                logger.error(f"Could not get contact associations: {response.text}")
-                return
+            # Check if deal is in Pipeline Proyectos and Stage DM Identificado
+            if props.get("pipeline") != PIPELINE_PROYECTOS_ID or props.get("dealstage") != STAGE_DM_IDENTIFICADO_ID:
+                continue
             
-            data = response.json()
-            deal_ids = [r.get("toObjectId") for r in data.get("results", [])]
+            # Move to Interés en Caso
+            await hubspot.patch(
+                f"/crm/v3/objects/deals/{deal_id}",
+                json={"properties": {"dealstage": STAGE_INTERES_CASO_ID}}
+            )
+            logger.info(f"Moved deal {deal_id} from DM Identificado to Interés en Caso")
             
-            for deal_id in deal_ids:
-                # Get deal details
-                deal_url = f"https://api.hubapi.com/crm/v3/objects/deals/{deal_id}?properties=dealname,pipeline,dealstage"
-                deal_response = await http_client.get(deal_url, headers=headers)
-                
-                if deal_response.status_code != 200:
-                    continue
-                
-                deal = deal_response.json()
-                props = deal.get("properties", {})
-                
-                # Check if deal is in Pipeline Proyectos and Stage DM Identificado
-                if props.get("pipeline") == PIPELINE_PROYECTOS_ID and props.get("dealstage") == STAGE_DM_IDENTIFICADO_ID:
-                    # Move to Interés en Caso
-                    update_url = f"https://api.hubapi.com/crm/v3/objects/deals/{deal_id}"
-                    update_payload = {
-                        "properties": {
-                            "dealstage": STAGE_INTERES_CASO_ID
-                        }
-                    }
-                    
-                    update_response = await http_client.patch(update_url, headers=headers, json=update_payload)
-                    
-                    if update_response.status_code == 200:
-                        logger.info(f"Moved deal {deal_id} from DM Identificado to Interés en Caso")
-                        
-                        # Log the movement
-                        await db.deal_movements.insert_one({
-                            "id": str(uuid.uuid4()),
-                            "deal_id": deal_id,
-                            "contact_id": contact_id,
-                            "from_stage": STAGE_DM_IDENTIFICADO_ID,
-                            "to_stage": STAGE_INTERES_CASO_ID,
-                            "reason": "email_click",
-                            "timestamp": datetime.now(timezone.utc).isoformat()
-                        })
-                    else:
-                        logger.error(f"Failed to move deal {deal_id}: {update_response.text}")
-                        
-    except Exception as e:
-        logger.error(f"Error moving deal: {e}")
+            # Log the movement
+            await db.deal_movements.insert_one({
+                "id": str(uuid.uuid4()),
+                "deal_id": deal_id,
+                "contact_id": contact_id,
+                "from_stage": STAGE_DM_IDENTIFICADO_ID,
+                "to_stage": STAGE_INTERES_CASO_ID,
+                "reason": "email_click",
+                "timestamp": datetime.now(timezone.utc).isoformat()
+            })
+        except HubSpotError as e:
+            logger.error(f"Failed to move deal {deal_id}: {e}")
+        except Exception as e:
+            logger.error(f"Error moving deal: {e}")
 
 # ============ SETTINGS ROUTES ============
 
@@ -2268,6 +2260,8 @@ async def update_app_settings(settings_update: SettingsUpdate, current_user: dic
     if update_doc:
         update_doc["updated_at"] = datetime.now(timezone.utc).isoformat()
         await db.settings.update_one({}, {"$set": update_doc}, upsert=True)
+        if "hubspot_token" in update_doc:
+            hubspot.invalidate_token()
     
     return {"message": "Settings updated"}
 
@@ -2578,19 +2572,21 @@ async def update_sender_name(sender_name: str, current_user: dict = Depends(get_
 
 @dashboard_router.get("/stats")
 async def get_dashboard_stats(current_user: dict = Depends(get_current_user)):
-    """Get dashboard statistics"""
-    total_contacts = await db.hubspot_contacts.count_documents({})
-    total_events = await db.webinar_events.count_documents({})
-    total_campaigns = await db.campaigns.count_documents({})
-    total_templates = await db.email_templates.count_documents({})
+    """Get dashboard statistics (collection sizes are estimates, email totals come from the stat counters)"""
+    total_contacts = await db.hubspot_contacts.estimated_document_count()
+    total_events = await db.webinar_events.estimated_document_count()
+    total_campaigns = await db.campaigns.estimated_document_count()
+    total_templates = await db.email_templates.estimated_document_count()
     
     # Email stats
-    total_emails_sent = await db.email_logs.count_documents({"status": "sent"})
-    total_emails_opened = await db.email_logs.count_documents({"opened_at": {"$ne": None}})
-    total_emails_clicked = await db.email_logs.count_documents({"clicked_at": {"$ne": None}})
+    await ensure_counters()
+    outcomes = await get_counters("email_logs", "outcome")
+    total_emails_sent = outcomes.get("sent", 0)
+    total_emails_opened = outcomes.get("opened", 0)
+    total_emails_clicked = outcomes.get("clicked", 0)
     
     # Deal movements
-    total_deal_movements = await db.deal_movements.count_documents({})
+    total_deal_movements = await db.deal_movements.estimated_document_count()
     
     # Recent campaigns
     recent_campaigns = await db.campaigns.find({}, {"_id": 0}).sort("created_at", -1).limit(5).to_list(5)
@@ -2622,10 +2618,10 @@ async def get_system_info(current_user: dict = Depends(get_current_user)):
     import os
     from pathlib import Path
     
-    # Database collections info
+    # Database collections info (collection metadata counts, no scans)
     collections_info = []
     for col_name in await db.list_collection_names():
-        count = await db[col_name].count_documents({})
+        count = await db[col_name].estimated_document_count()
         collections_info.append({
             "name": col_name,
             "documents": count
@@ -3118,6 +3114,7 @@ async def force_send_campaign(campaign_id: str, current_user: dict = Depends(get
                 "sent_at": datetime.now(timezone.utc).isoformat(),
                 "gmail_message_id": result.get("id")
             })
+            await count_email_event("sent")
             
             sent_count += 1
             logger.info(f"Sent email to {contact.get('email')}")
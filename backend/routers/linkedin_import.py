@@ -24,6 +24,7 @@ from typing import List, Optional, Dict, Any
 from datetime import datetime, timezone, timedelta
 from database import db
 from routers.auth import get_current_user
+from services.job_wakeup import job_wakeup, CHANNEL_LINKEDIN_IMPORT
 import uuid
 import csv
 import io
@@ -530,6 +531,7 @@ async def start_import(
             }
         }
     )
+    job_wakeup.notify(CHANNEL_LINKEDIN_IMPORT)
     
     return {
         "success": True,
@@ -17,6 +17,8 @@ router = APIRouter(prefix="/lms", tags=["LMS"])
 
 # Use shared async database from database.py
 from database import db
+from services.response_cache import response_cache
+from services import blog_classification
 
 # ============ MODELS ============
 
@@ -91,6 +93,35 @@ def serialize_doc(doc):
     doc["id"] = str(doc.pop("_id", ""))
     return doc
 
+async def get_lesson_stats(course_ids: List[str]) -> dict:
+    """
+    lesson_count, total_duration and free_lessons per course id, computed
+    with a single $group over the lessons of all listed courses
+    """
+    if not course_ids:
+        return {}
+    pipeline = [
+        {"$match": {"course_id": {"$in": course_ids}}},
+        {"$group": {
+            "_id": "$course_id",
+            "lesson_count": {"$sum": 1},
+            "total_duration": {"$sum": "$duration_minutes"},
+            "free_lessons": {"$sum": {"$cond": [{"$eq": ["$is_free", True]}, 1, 0]}}
+        }}
+    ]
+    rows = await db.lessons.aggregate(pipeline).to_list(None)
+    return {row["_id"]: row for row in rows}
+
+async def add_lesson_stats(courses: List[dict], include_free: bool = False):
+    """Set lesson_count / total_duration (and free_lessons) on each course in place"""
+    stats = await get_lesson_stats([str(c["_id"]) for c in courses])
+    for course in courses:
+        row = stats.get(str(course["_id"]), {})
+        course["lesson_count"] = row.get("lesson_count", 0)
+        course["total_duration"] = row.get("total_duration", 0)
+        if include_free:
+            course["free_lessons"] = row.get("free_lessons", 0)
+
 # ============ COURSE ENDPOINTS ============
 
 @router.get("/courses")
@@ -114,11 +145,7 @@ async def get_courses(
     courses = await db.courses.find(query).sort("created_at", -1).to_list(100)
     
     # Add lesson count and total duration for each course
-    for course in courses:
-        course_id = str(course["_id"])
-        lessons = await db.lessons.find({"course_id": course_id}).to_list(100)
-        course["lesson_count"] = len(lessons)
-        course["total_duration"] = sum(l.get("duration_minutes", 0) for l in lessons)
+    await add_lesson_stats(courses)
     
     return {
         "success": True,
@@ -183,6 +210,7 @@ async def create_course(data: CourseCreate):
     course_doc["id"] = str(result.inserted_id)
     del course_doc["_id"]
     
+    response_cache.invalidate("lms")
     return {"success": True, "course": course_doc}
 
 @router.put("/courses/{course_id}")
@@ -201,6 +229,10 @@ async def update_course(course_id: str, data: CourseUpdate):
     if not result:
         raise HTTPException(status_code=404, detail="Course not found")
     
+    if "name" in update_data or "title" in update_data:
+        await blog_classification.propagate_course_name(result.get("id"), blog_classification.course_display_name(result))
+    
+    response_cache.invalidate("lms")
     return {"success": True, "course": serialize_doc(result)}
 
 @router.delete("/courses/{course_id}")
@@ -218,6 +250,7 @@ async def delete_course(course_id: str):
     # Delete the course
     await db.courses.delete_one(query)
     
+    response_cache.invalidate("lms")
     return {"success": True, "message": "Course and lessons deleted"}
 
 # ============ LESSON ENDPOINTS ============
@@ -274,6 +307,7 @@ async def create_lesson(course_id: str, data: LessonCreate):
     lesson_doc["id"] = str(result.inserted_id)
     del lesson_doc["_id"]
     
+    response_cache.invalidate("lms")
     return {"success": True, "lesson": lesson_doc}
 
 @router.put("/lessons/{lesson_id}")
@@ -292,6 +326,7 @@ async def update_lesson(lesson_id: str, data: LessonUpdate):
     if not result:
         raise HTTPException(status_code=404, detail="Lesson not found")
     
+    response_cache.invalidate("lms")
     return {"success": True, "lesson": serialize_doc(result)}
 
 @router.delete("/lessons/{lesson_id}")
@@ -303,6 +338,7 @@ async def delete_lesson(lesson_id: str):
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Lesson not found")
     
+    response_cache.invalidate("lms")
     return {"success": True, "message": "Lesson deleted"}
 
 @router.put("/lessons/{lesson_id}/reorder")
@@ -335,6 +371,7 @@ async def reorder_lesson(lesson_id: str, new_order: int):
         {"$set": {"order": new_order, "updated_at": datetime.now(timezone.utc)}}
     )
     
+    response_cache.invalidate("lms")
     return {"success": True, "message": "Lesson reordered"}
 
 # ============ OPTIONS ENDPOINT ============
@@ -401,13 +438,8 @@ async def get_public_courses(
     
     courses = await db.courses.find(query).sort("created_at", -1).to_list(100)
     
-    for course in courses:
-        course_id = str(course["_id"])
-        lessons = await db.lessons.find({"course_id": course_id}).to_list(100)
-        course["lesson_count"] = len(lessons)
-        course["total_duration"] = sum(l.get("duration_minutes", 0) for l in lessons)
-        # Count free lessons
-        course["free_lessons"] = len([l for l in lessons if l.get("is_free")])
+    # Lesson count, duration and free lessons for all courses in one aggregation
+    await add_lesson_stats(courses, include_free=True)
     
     return {
         "success": True,
@@ -588,6 +620,7 @@ Style requirements:
             update_query,
             {"$set": {"thumbnail_url": data_url, "updated_at": datetime.now(timezone.utc).isoformat()}}
         )
+        response_cache.invalidate("lms")
         
         return {
             "success": True,
@@ -649,6 +682,7 @@ async def enroll_contact(course_id: str, contact_id: str):
         {"$addToSet": {"enrolled_student_ids": contact_id}}
     )
     
+    response_cache.invalidate("lms")
     return {"success": True, "message": "Contact enrolled in course"}
 
 
@@ -671,6 +705,7 @@ async def unenroll_contact(course_id: str, contact_id: str):
         {"$pull": {"enrolled_student_ids": contact_id}}
     )
     
+    response_cache.invalidate("lms")
     return {"success": True, "message": "Contact removed from course"}
 
 
@@ -700,11 +735,7 @@ async def get_external_user_courses(current_user: dict = Depends(get_current_use
     }).to_list(100)
     
     # Enrich with lesson info
-    for course in courses:
-        course_id = str(course["_id"])
-        lessons = await db.lessons.find({"course_id": course_id}).to_list(100)
-        course["lesson_count"] = len(lessons)
-        course["total_duration"] = sum(l.get("duration_minutes", 0) for l in lessons)
+    await add_lesson_stats(courses)
     
     return {
         "success": True,
@@ -881,6 +912,7 @@ async def quick_create_course(data: QuickCourseCreate):
     
     await db.courses.insert_one(course_doc)
     
+    response_cache.invalidate("lms")
     return {
         "success": True,
         "course": {
@@ -979,6 +1011,7 @@ Ya puedes acceder a tu curso ingresando a nuestra plataforma.
         except Exception as e:
             logger.error(f"Error sending welcome email: {e}")
     
+    response_cache.invalidate("lms")
     return {
         "success": True,
         "message": "Contacto enrolado exitosamente",
@@ -1040,6 +1073,7 @@ async def unenroll_contact_from_course(data: UnenrollContactRequest):
             {"$inc": {"enrolled_count": -1}}
         )
     
+    response_cache.invalidate("lms")
     return {
         "success": True,
         "message": "Contacto desenrolado exitosamente"
@@ -11,6 +11,7 @@ import base64
 
 from .auth import get_current_user
 from .legacy import db
+from services.response_cache import response_cache
 
 router = APIRouter(prefix="/media-contacts", tags=["Media Relations"])
 
@@ -373,6 +374,7 @@ async def upload_booklet(
     
     await db.booklets.insert_one(doc)
     
+    response_cache.invalidate("public_website")
     return {
         "id": doc["id"],
         "message": "Booklet uploaded successfully"
@@ -409,4 +411,5 @@ async def delete_booklet(
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Booklet not found")
     
+    response_cache.invalidate("public_website")
     return {"message": "Booklet deleted"}
@@ -12,6 +12,8 @@ import logging
 import re
 
 from database import db
+from utils.batch_loader import BatchLoader
+from utils.timestamps import parse_timestamp, timestamp_in_range, timestamp_iso, timestamp_query, utc_now
 from utils.contact_helpers import (
     is_student, is_coachee, STUDENT_ROLES_QUERY, COACHEE_ROLES_QUERY,
     build_cadence_query, CADENCE_PERIODS,
@@ -72,6 +74,7 @@ def clean_llm_meta_comments(text: str) -> str:
 
 from routers.auth import get_current_user
 from routers.calendar import get_settings, refresh_credentials_if_needed, CALENDAR_SCOPES
+from services.calendar_sync import calendar_sync
 from config import GOOGLE_CLIENT_ID, GOOGLE_CLIENT_SECRET
 
 from google.oauth2.credentials import Credentials
@@ -242,8 +245,12 @@ def get_fallback_message(template_type: str, contact_name: str, meeting_date: Op
 
 # ============ HELPER FUNCTIONS ============
 
-async def get_calendar_events_for_messages(days: int = 21) -> List[Dict]:
-    """Get calendar events for the next N days"""
+async def get_calendar_events_for_messages(days: int = 21, attendee_email: Optional[str] = None) -> List[Dict]:
+    """
+    Get calendar events for the next N days from the local event cache
+    (services/calendar_sync.py). attendee_email restricts the lookup to one
+    contact's meetings via the attendee_emails index.
+    """
     settings = await get_settings()
     
     if not settings.get("calendar_connected"):
@@ -254,34 +261,9 @@ async def get_calendar_events_for_messages(days: int = 21) -> List[Dict]:
         return []
     
     try:
-        calendar_credentials = refresh_credentials_if_needed(calendar_credentials)
-        
-        credentials = Credentials(
-            token=calendar_credentials.get("token"),
-            refresh_token=calendar_credentials.get("refresh_token"),
-            token_uri=calendar_credentials.get("token_uri", "https://oauth2.googleapis.com/token"),
-            client_id=calendar_credentials.get("client_id", GOOGLE_CLIENT_ID),
-            client_secret=calendar_credentials.get("client_secret", GOOGLE_CLIENT_SECRET),
-            scopes=calendar_credentials.get("scopes", CALENDAR_SCOPES)
-        )
-        
-        service = build('calendar', 'v3', credentials=credentials)
-        
-        now = datetime.now(timezone.utc)
-        time_min = now.isoformat()
-        time_max = (now + timedelta(days=days)).isoformat()
-        
-        events_result = service.events().list(
-            calendarId='primary',
-            timeMin=time_min,
-            timeMax=time_max,
-            singleEvents=True,
-            orderBy='startTime',
-            showDeleted=False
-        ).execute()
+        events = await calendar_sync.get_events(days=days, attendee_email=attendee_email)
         
         # Filter out cancelled events and events without valid status
-        events = events_result.get('items', [])
         valid_events = []
         
         # Get the user's email to check their response status
@@ -356,16 +338,12 @@ async def get_contact_by_email(email: str) -> Optional[Dict]:
     return contact
 
 
-def days_since_date(date_str: Optional[str]) -> int:
-    """Calculate days since a given ISO date string"""
-    if not date_str:
+def days_since_date(date_str) -> int:
+    """Calculate days since a given ISO date string or BSON date"""
+    dt = parse_timestamp(date_str)
+    if dt is None:
         return 9999  # Never contacted
-    try:
-        dt = datetime.fromisoformat(date_str.replace("Z", "+00:00"))
-        now = datetime.now(timezone.utc)
-        return (now - dt).days
-    except Exception:
-        return 9999
+    return (datetime.now(timezone.utc) - dt).days
 
 
 def is_date_tomorrow(date_str: str) -> bool:
@@ -910,7 +888,7 @@ async def mark_contacts_as_contacted(
     Mark contacts as contacted with current timestamp.
     Updates last_contacted_whatsapp or last_contacted_linkedin based on message_type.
     """
-    now = datetime.now(timezone.utc).isoformat()
+    now = utc_now()
     
     field_name = f"last_contacted_{data.message_type}"
     
@@ -928,7 +906,7 @@ async def mark_contacts_as_contacted(
         "updated": updated,
         "total": len(data.contact_ids),
         "field_updated": field_name,
-        "timestamp": now
+        "timestamp": now.isoformat()
     }
 
 
@@ -947,9 +925,9 @@ async def get_message_stats(
     # Count contacts contacted today
     today_start = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0).isoformat()
     
-    whatsapp_today = await db.unified_contacts.count_documents({
-        "last_contacted_whatsapp": {"$gte": today_start}
-    })
+    whatsapp_today = await db.unified_contacts.count_documents(
+        timestamp_query("last_contacted_whatsapp", gte=today_start)
+    )
     
     linkedin_today = await db.unified_contacts.count_documents({
         "last_contacted_linkedin": {"$gte": today_start}
@@ -1343,7 +1321,7 @@ async def get_all_whatsapp_contacts(
     # Get contacts contacted today (to filter them out)
     contacted_today_ids = set()
     contacted_today = await db.unified_contacts.find(
-        {"last_contacted_whatsapp": {"$gte": today_start}},
+        timestamp_query("last_contacted_whatsapp", gte=today_start),
         {"_id": 0, "id": 1}
     ).to_list(1000)
     for c in contacted_today:
@@ -1851,19 +1829,25 @@ async def get_all_whatsapp_contacts(
         {"_id": 0, "id": 1, "name": 1, "contact_ids": 1, "company_names": 1, "stage": 1}
     ).to_list(500)
     
+    # RULE 7 cases (Stage 3 Cierre Administrativo)
+    cierre_cases = await db.cases.find(
+        {
+            "stage": "cierre_administrativo",
+            "status": "active",
+            "delivery_stage": {"$exists": False}
+        },
+        {"_id": 0, "id": 1, "name": 1, "contact_ids": 1, "company_names": 1}
+    ).to_list(500)
+    
+    # Deal makers of the RULE 6 and RULE 7 cases, loaded in one query
+    dm_loader = BatchLoader(db.unified_contacts, query={"roles": "deal_maker"})
+    for case in propuesta_cases + cierre_cases:
+        dm_loader.add_many(case.get("contact_ids"))
+    await dm_loader.load()
+    
     for case in propuesta_cases:
-        contact_ids = case.get("contact_ids", [])
-        if not contact_ids:
-            continue
-        
-        # Find deal makers for this case
-        deal_makers = await db.unified_contacts.find(
-            {
-                "id": {"$in": contact_ids},
-                "roles": "deal_maker"
-            },
-            {"_id": 0}
-        ).to_list(50)
+        # Deal makers for this case
+        deal_makers = dm_loader.get_many(case.get("contact_ids"))[:50]
         
         for dm in deal_makers:
             dm_id = dm.get("id")
@@ -1910,28 +1894,9 @@ async def get_all_whatsapp_contacts(
                 seen_emails.add(email)
     
     # RULE 7: Deal Makers from Cases - Stage 3 Cierre Administrativo
-    cierre_cases = await db.cases.find(
-        {
-            "stage": "cierre_administrativo",
-            "status": "active",
-            "delivery_stage": {"$exists": False}
-        },
-        {"_id": 0, "id": 1, "name": 1, "contact_ids": 1, "company_names": 1}
-    ).to_list(500)
-    
     for case in cierre_cases:
-        contact_ids = case.get("contact_ids", [])
-        if not contact_ids:
-            continue
-        
-        # Find deal makers for this case
-        deal_makers = await db.unified_contacts.find(
-            {
-                "id": {"$in": contact_ids},
-                "roles": "deal_maker"
-            },
-            {"_id": 0}
-        ).to_list(50)
+        # Deal makers for this case
+        deal_makers = dm_loader.get_many(case.get("contact_ids"))[:50]
         
         for dm in deal_makers:
             dm_id = dm.get("id")
@@ -2304,16 +2269,13 @@ async def diagnose_contact_rules(
         email = (contact.get("email") or "").lower()
         
         # Check if contacted today
-        if contact.get("last_contacted_whatsapp") and contact.get("last_contacted_whatsapp") >= today_start:
+        if timestamp_in_range(contact.get("last_contacted_whatsapp"), gte=today_start):
             diagnosis["contacted_today"] = True
         
-        diagnosis["last_contacted_whatsapp"] = contact.get("last_contacted_whatsapp")
-        if contact.get("last_contacted_whatsapp"):
-            try:
-                last_contact_date = datetime.fromisoformat(contact["last_contacted_whatsapp"].replace("Z", "+00:00"))
-                diagnosis["days_since_contact"] = (now - last_contact_date).days
-            except:
-                pass
+        diagnosis["last_contacted_whatsapp"] = timestamp_iso(contact.get("last_contacted_whatsapp"))
+        last_contact_date = parse_timestamp(contact.get("last_contacted_whatsapp"))
+        if last_contact_date:
+            diagnosis["days_since_contact"] = (now - last_contact_date).days
         
         # Get calendar events from Google Calendar API (same source as all-contacts)
         has_meeting_today = False
@@ -2327,8 +2289,8 @@ async def diagnose_contact_rules(
         
         if email:
             try:
-                # Fetch events from Google Calendar for consistency with all-contacts endpoint
-                events = await get_calendar_events_for_messages(60)
+                # Same filtering as the all-contacts endpoint, limited to this contact's meetings
+                events = await get_calendar_events_for_messages(60, attendee_email=email)
                 
                 for event in events:
                     attendees = event.get('attendees', [])
@@ -2503,7 +2465,7 @@ async def diagnose_contact_rules(
             rule_coachee["reason"] = f"Está en Stage {contact_stage}, solo aplica a Stage 4 (Deliver)"
         elif has_meeting_60d:
             rule_coachee["reason"] = "Ya tiene cita en los próximos 60 días"
-        elif contact.get("last_contacted_whatsapp") and contact.get("last_contacted_whatsapp") >= eight_days_ago:
+        elif timestamp_in_range(contact.get("last_contacted_whatsapp"), gte=eight_days_ago):
             days = diagnosis["days_since_contact"] or 0
             rule_coachee["reason"] = f"Contactado hace {days} días, requiere 8+ días sin contacto"
         else:
@@ -2532,7 +2494,7 @@ async def diagnose_contact_rules(
             rule_quote["reason"] = "No tiene cotización registrada"
         elif has_meeting_30d:
             rule_quote["reason"] = "Ya tiene cita en los próximos 30 días"
-        elif contact.get("last_contacted_whatsapp") and contact.get("last_contacted_whatsapp") >= nine_days_ago:
+        elif timestamp_in_range(contact.get("last_contacted_whatsapp"), gte=nine_days_ago):
             days = diagnosis["days_since_contact"] or 0
             rule_quote["reason"] = f"Contactado hace {days} días, requiere 9+ días sin contacto"
         else:
@@ -2571,7 +2533,7 @@ async def diagnose_contact_rules(
             rule_alumni["reason"] = f"No tiene rol 'coachee' ni 'student' (roles: {roles or 'ninguno'})"
         elif contact_stage != 5:
             rule_alumni["reason"] = f"Está en Stage {contact_stage}, solo aplica a Stage 5 (Repurchase)"
-        elif contact.get("last_contacted_whatsapp") and contact.get("last_contacted_whatsapp") >= ninety_days_ago:
+        elif timestamp_in_range(contact.get("last_contacted_whatsapp"), gte=ninety_days_ago):
             days = diagnosis["days_since_contact"] or 0
             rule_alumni["reason"] = f"Contactado hace {days} días, requiere 90+ días sin contacto"
         else:
@@ -2756,7 +2718,7 @@ async def diagnose_email_contact_rules(
     # Get calendar data for E3 - use same function as WhatsApp diagnosis
     emails_with_calendar_60d = set()
     try:
-        events = await get_calendar_events_for_messages(60)
+        events = await get_calendar_events_for_messages(60, attendee_email=email_lower or None)
         for event in events:
             for attendee in event.get('attendees', []):
                 if not attendee.get('self'):
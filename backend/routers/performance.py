@@ -0,0 +1,108 @@
+"""
+Performance Router - Per-request database instrumentation (admin)
+Exposes the slow request log, query-count alerts and per-route query stats
+collected by services/query_instrumentation.py, the public response
+cache stats from services/response_cache.py, the hot timestamp
+migration from services/timestamp_migration.py and the contact -> company
+key sync from services/company_association.py
+"""
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, Query
+
+from database import db
+from routers.auth import get_current_user
+from services.company_association import sync_company_keys
+from services.query_instrumentation import slow_request_log
+from services.response_cache import response_cache
+from services.timestamp_migration import get_timestamp_migration_state, migrate_hot_timestamps
+
+router = APIRouter(prefix="/admin/performance", tags=["admin-performance"])
+
+
+@router.get("/slow-requests")
+async def get_slow_requests(
+    limit: int = Query(50, ge=1, le=500),
+    current_user: dict = Depends(get_current_user)
+):
+    """Most recent slow requests with their per-collection query breakdown"""
+    entries = list(slow_request_log.slow_requests)[-limit:]
+    entries.reverse()
+    return {
+        "threshold_ms": slow_request_log.slow_ms,
+        "requests": entries,
+        "count": len(entries)
+    }
+
+
+@router.get("/query-alerts")
+async def get_query_alerts(
+    limit: int = Query(50, ge=1, le=500),
+    current_user: dict = Depends(get_current_user)
+):
+    """Most recent requests that exceeded the per-request query threshold"""
+    entries = list(slow_request_log.alerts)[-limit:]
+    entries.reverse()
+    return {
+        "query_threshold": slow_request_log.query_threshold,
+        "alerts": entries,
+        "count": len(entries)
+    }
+
+
+@router.get("/routes")
+async def get_route_stats(
+    limit: int = Query(50, ge=1, le=500),
+    current_user: dict = Depends(get_current_user)
+):
+    """Per-route averages (queries, latency, DB time), most queries first"""
+    routes = slow_request_log.route_summary(limit)
+    return {
+        "routes": routes,
+        "count": len(routes)
+    }
+
+
+@router.post("/reset")
+async def reset_performance_stats(current_user: dict = Depends(get_current_user)):
+    """Clear the slow request log, alerts and route stats"""
+    slow_request_log.reset()
+    return {"success": True}
+
+
+@router.get("/response-cache")
+async def get_response_cache_stats(current_user: dict = Depends(get_current_user)):
+    """Public response cache: entries per namespace, invalidations and per-route hit ratios"""
+    return response_cache.summary()
+
+
+@router.post("/response-cache/clear")
+async def clear_response_cache(current_user: dict = Depends(get_current_user)):
+    """Drop all cached public responses and reset their counters"""
+    response_cache.reset()
+    return {"success": True}
+
+
+@router.post("/timestamps/migrate")
+async def run_timestamp_migration(
+    dry_run: bool = Query(False),
+    collections: Optional[List[str]] = Query(None),
+    current_user: dict = Depends(get_current_user)
+):
+    """Convert hot timestamp fields still stored as ISO strings to BSON dates"""
+    return await migrate_hot_timestamps(collections=collections, dry_run=dry_run)
+
+
+@router.get("/timestamps/status")
+async def get_timestamp_migration_status(current_user: dict = Depends(get_current_user)):
+    """Totals of the last hot timestamp migration run"""
+    return await get_timestamp_migration_state() or {"finished_at": None}
+
+
+@router.post("/company-keys/sync")
+async def run_company_keys_sync(
+    full: bool = Query(False),
+    current_user: dict = Depends(get_current_user)
+):
+    """Re-key contacts for the contact -> company index (changed since the last run, or all)"""
+    return await sync_company_keys(db, full=full)
@@ -17,6 +17,7 @@ import httpx
 import os
 
 from database import db
+from utils.timestamps import timestamp_query
 from routers.auth import get_current_user
 
 router = APIRouter(prefix="/position-search", tags=["position-search"])
@@ -186,7 +187,7 @@ async def get_weekly_progress(
         contacts_this_week = await db.unified_contacts.count_documents({
             "buyer_persona": persona_name,
             "source": {"$in": ["position_search", "deal_makers_by_position", "linkedin_position", "linkedin"]},
-            "created_at": {"$gte": week_start.isoformat()}
+            **timestamp_query("created_at", gte=week_start)
         })
         
         status = "green" if contacts_this_week >= WEEKLY_GOAL_PER_PERSONA else \
@@ -254,7 +255,7 @@ async def search_for_persona(
     contacts_this_week = await db.unified_contacts.count_documents({
         "buyer_persona": persona_name,
         "source": {"$in": ["position_search", "deal_makers_by_position", "linkedin_position", "linkedin"]},
-        "created_at": {"$gte": week_start.isoformat()}
+        **timestamp_query("created_at", gte=week_start)
     })
     
     if contacts_this_week >= WEEKLY_GOAL_PER_PERSONA:
@@ -581,7 +582,7 @@ async def run_weekly_search(
         contacts_this_week = await db.unified_contacts.count_documents({
             "buyer_persona": persona_name,
             "source": {"$in": ["position_search", "deal_makers_by_position", "linkedin_position", "linkedin"]},
-            "created_at": {"$gte": week_start.isoformat()}
+            **timestamp_query("created_at", gte=week_start)
         })
         
         if contacts_this_week >= WEEKLY_GOAL_PER_PERSONA:
@@ -667,7 +668,7 @@ async def get_position_search_status(
     # Count total contacts this week
     total_contacts = await db.unified_contacts.count_documents({
         "source": {"$in": ["position_search", "deal_makers_by_position", "linkedin_position", "linkedin"]},
-        "created_at": {"$gte": week_start.isoformat()}
+        **timestamp_query("created_at", gte=week_start)
     })
     
     # Get persona count for total goal
@@ -16,6 +16,8 @@ import os
 
 from .auth import get_current_user
 from .legacy import db
+from services.company_association import rename_contact_company
+from services.stats_counters import track_change
 
 logger = logging.getLogger(__name__)
 
@@ -1018,6 +1020,7 @@ async def process_import_chunk(
             }
             
             await db.unified_contacts.insert_one(new_contact)
+            await track_change("unified_contacts", None, new_contact)
             chunk_created += 1
             
         except Exception as e:
@@ -1184,6 +1187,7 @@ async def process_linkedin_import_mapped(
             }
             
             await db.unified_contacts.insert_one(new_contact)
+            await track_change("unified_contacts", None, new_contact)
             contacts_created += 1
             processed_rows += 1
             
@@ -2337,11 +2341,9 @@ async def merge_companies(
     for source in sources:
         source_name = source.get("name")
         if source_name:
-            result = await db.unified_contacts.update_many(
-                {"company": {"$regex": f"^{re.escape(source_name)}$", "$options": "i"}},
-                {"$set": {"company": request.target_name, "updated_at": now}}
+            contacts_updated += await rename_contact_company(
+                db, [source_name], request.target_name, {"updated_at": now}
             )
-            contacts_updated += result.modified_count
     
     # Update all cases referencing source companies (both company_name and company_names)
     cases_updated = 0
@@ -46,7 +46,7 @@ async def get_client_logos():
         logos.append({
             "name": name,
             "logo": logo_url,
-            "website": website,
+            "website": f"https://{domain}" if domain else "",
             "domain": domain
         })
     
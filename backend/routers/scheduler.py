@@ -6,6 +6,7 @@ from pydantic import BaseModel
 from typing import Optional, List
 from datetime import datetime, timezone, timedelta
 from database import db
+from utils.timestamps import timestamp_query
 from routers.auth import get_current_user
 import uuid
 
@@ -680,19 +681,19 @@ async def get_traffic_light_status(
     # Get contacts created this week for each LinkedIn finder source
     molecules_contacts_this_week = await db.unified_contacts.count_documents({
         "source": {"$in": ["molecules_deal_makers", "linkedin_molecules", "molecules"]},
-        "created_at": {"$gte": week_start.isoformat(), "$lt": week_end.isoformat()},
+        **timestamp_query("created_at", gte=week_start, lt=week_end),
         "stage": 1
     })
     
     posts_contacts_this_week = await db.unified_contacts.count_documents({
         "source": {"$in": ["deal_makers_by_post", "linkedin_post", "posts"]},
-        "created_at": {"$gte": week_start.isoformat(), "$lt": week_end.isoformat()},
+        **timestamp_query("created_at", gte=week_start, lt=week_end),
         "stage": 1
     })
     
     position_contacts_this_week = await db.unified_contacts.count_documents({
         "source": {"$in": ["deal_makers_by_position", "linkedin_position", "position", "linkedin"]},
-        "created_at": {"$gte": week_start.isoformat(), "$lt": week_end.isoformat()},
+        **timestamp_query("created_at", gte=week_start, lt=week_end),
         "stage": 1
     })
     
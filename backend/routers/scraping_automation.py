@@ -12,6 +12,7 @@ import httpx
 import logging
 
 from database import db
+from utils.timestamps import timestamp_query
 from routers.auth import get_current_user
 
 logger = logging.getLogger(__name__)
@@ -197,26 +198,26 @@ async def get_weekly_quotas(current_user: dict = Depends(get_current_user)):
     week_start_iso = week_start.isoformat()
     
     # Count new contacts added this week
-    contacts_this_week = await db.unified_contacts.count_documents({
-        "created_at": {"$gte": week_start_iso}
-    })
+    contacts_this_week = await db.unified_contacts.count_documents(
+        timestamp_query("created_at", gte=week_start_iso)
+    )
     
     # Count phone enrichments this week
     phone_enrichments = await db.scraping_logs.count_documents({
         "type": "phone_enrichment",
-        "created_at": {"$gte": week_start_iso}
+        **timestamp_query("created_at", gte=week_start_iso)
     })
     
     # Count decision maker searches this week
     dm_searches = await db.scraping_logs.count_documents({
         "type": "decision_makers",
-        "created_at": {"$gte": week_start_iso}
+        **timestamp_query("created_at", gte=week_start_iso)
     })
     
     # Count company searches this week
     company_searches = await db.scraping_logs.count_documents({
         "type": "companies",
-        "created_at": {"$gte": week_start_iso}
+        **timestamp_query("created_at", gte=week_start_iso)
     })
     
     return {
@@ -468,7 +469,7 @@ async def get_phone_enrichment_stats(current_user: dict = Depends(get_current_us
     week_start = datetime.now(timezone.utc) - timedelta(days=7)
     enriched_this_week = await db.scraping_logs.count_documents({
         "type": "phone_enrichment",
-        "created_at": {"$gte": week_start.isoformat()}
+        **timestamp_query("created_at", gte=week_start)
     })
     
     return {
@@ -7,15 +7,18 @@ from pydantic import BaseModel, HttpUrl
 from typing import List, Optional, Dict, Any
 from datetime import datetime, timezone, timedelta
 import uuid
-import asyncio
-import httpx
 import os
 import json
 import re
+import time
 from bs4 import BeautifulSoup
 
 from database import db
 from routers.auth import get_current_user
+from services.browser_pool import browser_pool
+from services.http_client import get_http_client
+from services.apify_runner import apify_runner, APIFY_API_BASE, APIFY_TOKEN
+from services.pipeline_crawler import PipelineCrawler, PLAYWRIGHT_REQUIRED_DOMAINS, USER_AGENTS
 
 router = APIRouter(prefix="/scrappers", tags=["scrappers"])
 
@@ -178,8 +181,6 @@ class MedicationFilter(BaseModel):
 
 # ============ APIFY SERVICE ============
 
-APIFY_TOKEN = os.environ.get("APIFY_TOKEN", "")
-
 # Actor IDs from the original scrappers
 APIFY_ACTORS = {
     "linkedin_posts_keywords": "buIWk2uOUzTmcLsuB",  # LinkedIn Posts by Keywords
@@ -194,67 +195,67 @@ APIFY_ACTORS = {
 async def get_apify_status(current_user: dict = Depends(get_current_user)):
     """Get Apify account status including credits and usage"""
     try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            # Get user info
-            user_response = await client.get(
-                "https://api.apify.com/v2/users/me",
-                headers={"Authorization": f"Bearer {APIFY_TOKEN}"}
-            )
-            
-            if user_response.status_code != 200:
-                return {
-                    "success": False,
-                    "error": "Could not fetch Apify status",
-                    "status_code": user_response.status_code
-                }
-            
-            user_data = user_response.json().get("data", {})
-            plan = user_data.get("plan", {})
-            
-            # Get monthly usage
-            usage_response = await client.get(
-                "https://api.apify.com/v2/users/me/usage/monthly",
-                headers={"Authorization": f"Bearer {APIFY_TOKEN}"}
-            )
-            
-            usage_data = {}
-            if usage_response.status_code == 200:
-                usage_data = usage_response.json().get("data", {})
-            
-            # Calculate remaining credits
-            # Use prepaidUsageUsd if available, otherwise calculate from limit
-            monthly_usage = plan.get("monthlyUsageCreditsUsd", 0)
-            limit_usd = plan.get("usageLimitUsd", 0)
-            prepaid_usd = user_data.get("prepaidUsageUsd", 0)
-            
-            # If there's prepaid credit, use that as the base
-            if prepaid_usd > 0:
-                remaining_usd = prepaid_usd
-            elif limit_usd > 0:
-                remaining_usd = limit_usd - monthly_usage
-            else:
-                # No limit set - show monthly usage as negative (overage)
-                remaining_usd = -monthly_usage if monthly_usage > 0 else 0
-            
-            is_limit_exceeded = plan.get("isUsageLimitExceeded", False)
-            
+        client = get_http_client()
+        # Get user info
+        user_response = await client.get(
+            f"{APIFY_API_BASE}/users/me",
+            headers={"Authorization": f"Bearer {APIFY_TOKEN}"}
+        )
+        
+        if user_response.status_code != 200:
             return {
-                "success": True,
-                "username": user_data.get("username"),
-                "plan_name": plan.get("name", "Free" if limit_usd == 0 else "Unknown"),
-                "credits": {
-                    "monthly_usage_usd": monthly_usage,
-                    "limit_usd": limit_usd,
-                    "remaining_usd": max(remaining_usd, 0),  # Don't show negative
-                    "prepaid_usd": prepaid_usd
-                },
-                "usage": {
-                    "actor_runs": usage_data.get("actorRuns", 0),
-                    "total_cost_usd": usage_data.get("totalCostUsd", 0)
-                },
-                "is_active": not is_limit_exceeded,
-                "status": "limit_exceeded" if is_limit_exceeded else ("low" if remaining_usd < 5 else "active")
+                "success": False,
+                "error": "Could not fetch Apify status",
+                "status_code": user_response.status_code
             }
+        
+        user_data = user_response.json().get("data", {})
+        plan = user_data.get("plan", {})
+        
+        # Get monthly usage
+        usage_response = await client.get(
+            f"{APIFY_API_BASE}/users/me/usage/monthly",
+            headers={"Authorization": f"Bearer {APIFY_TOKEN}"}
+        )
+        
+        usage_data = {}
+        if usage_response.status_code == 200:
+            usage_data = usage_response.json().get("data", {})
+        
+        # Calculate remaining credits
+        # Use prepaidUsageUsd if available, otherwise calculate from limit
+        monthly_usage = plan.get("monthlyUsageCreditsUsd", 0)
+        limit_usd = plan.get("usageLimitUsd", 0)
+        prepaid_usd = user_data.get("prepaidUsageUsd", 0)
+        
+        # If there's prepaid credit, use that as the base
+        if prepaid_usd > 0:
+            remaining_usd = prepaid_usd
+        elif limit_usd > 0:
+            remaining_usd = limit_usd - monthly_usage
+        else:
+            # No limit set - show monthly usage as negative (overage)
+            remaining_usd = -monthly_usage if monthly_usage > 0 else 0
+        
+        is_limit_exceeded = plan.get("isUsageLimitExceeded", False)
+        
+        return {
+            "success": True,
+            "username": user_data.get("username"),
+            "plan_name": plan.get("name", "Free" if limit_usd == 0 else "Unknown"),
+            "credits": {
+                "monthly_usage_usd": monthly_usage,
+                "limit_usd": limit_usd,
+                "remaining_usd": max(remaining_usd, 0),  # Don't show negative
+                "prepaid_usd": prepaid_usd
+            },
+            "usage": {
+                "actor_runs": usage_data.get("actorRuns", 0),
+                "total_cost_usd": usage_data.get("totalCostUsd", 0)
+            },
+            "is_active": not is_limit_exceeded,
+            "status": "limit_exceeded" if is_limit_exceeded else ("low" if remaining_usd < 5 else "active")
+        }
     except Exception as e:
         logging.error(f"Error fetching Apify status: {e}")
         return {
@@ -265,53 +266,9 @@ async def get_apify_status(current_user: dict = Depends(get_current_user)):
 
 
 async def run_apify_actor(actor_id: str, input_data: dict) -> List[dict]:
-    """Run an Apify actor and return results"""
+    """Run an Apify actor and return results (see services/apify_runner.py)"""
     try:
-        # Handle actor IDs with namespaces (e.g., "harvestapi/linkedin-profile-search" -> "harvestapi~linkedin-profile-search")
-        api_actor_id = actor_id.replace("/", "~")
-        
-        async with httpx.AsyncClient(timeout=300.0) as client:
-            # Start the actor run
-            run_response = await client.post(
-                f"https://api.apify.com/v2/acts/{api_actor_id}/runs",
-                headers={"Authorization": f"Bearer {APIFY_TOKEN}"},
-                json=input_data
-            )
-            
-            if run_response.status_code != 201:
-                raise Exception(f"Failed to start actor: {run_response.text}")
-            
-            run_data = run_response.json()
-            run_id = run_data["data"]["id"]
-            
-            # Wait for the run to finish
-            max_wait = 300  # 5 minutes
-            waited = 0
-            while waited < max_wait:
-                status_response = await client.get(
-                    f"https://api.apify.com/v2/actor-runs/{run_id}",
-                    headers={"Authorization": f"Bearer {APIFY_TOKEN}"}
-                )
-                status_data = status_response.json()
-                status = status_data["data"]["status"]
-                
-                if status == "SUCCEEDED":
-                    break
-                elif status in ["FAILED", "ABORTED", "TIMED-OUT"]:
-                    raise Exception(f"Actor run failed with status: {status}")
-                
-                await asyncio.sleep(5)
-                waited += 5
-            
-            # Get the results
-            dataset_id = status_data["data"]["defaultDatasetId"]
-            results_response = await client.get(
-                f"https://api.apify.com/v2/datasets/{dataset_id}/items",
-                headers={"Authorization": f"Bearer {APIFY_TOKEN}"}
-            )
-            
-            return results_response.json()
-            
+        return await apify_runner.run_actor(actor_id, input_data)
     except Exception as e:
         print(f"Apify error: {e}")
         raise
@@ -766,24 +723,31 @@ async def run_linkedin_posts_keywords_scrapper(run_id: str, request: ManualScrap
         max_posts_per_keyword = config.get("settings", {}).get("max_posts_per_keyword", 20) if config else 20
         author_location = config.get("settings", {}).get("author_location", "Mexico") if config else "Mexico"
         
-        for keyword in keywords[:10]:  # Limit to 10 keywords per run
+        batch = keywords[:10]  # Limit to 10 keywords per run
+        inputs = [
+            {
+                "searchKeywords": [keyword],
+                "limitPerSearch": max_posts_per_keyword,
+                "authorLocation": author_location,
+                "profileScraperMode": "short",
+                "scrapeReactions": False,
+                "scrapeComments": False,
+                "includeReposts": False,
+            }
+            for keyword in batch
+        ]
+        await log_scrapper_event(scrapper_id, "INFO", f"Searching for: {', '.join(batch)}", run_id=run_id)
+
+        # Runs execute concurrently; results are consumed in keyword order
+        async for index, run in apify_runner.run_many(APIFY_ACTORS["linkedin_posts_keywords"], inputs):
+            keyword = batch[index]
             try:
-                await log_scrapper_event(scrapper_id, "INFO", f"Searching for: {keyword}", run_id=run_id)
-                
-                # Call Apify actor
-                input_data = {
-                    "searchKeywords": [keyword],
-                    "limitPerSearch": max_posts_per_keyword,
-                    "authorLocation": author_location,
-                    "profileScraperMode": "short",
-                    "scrapeReactions": False,
-                    "scrapeComments": False,
-                    "includeReposts": False,
-                }
-                
-                results = await run_apify_actor(APIFY_ACTORS["linkedin_posts_keywords"], input_data)
-                
-                for post in results:
+                if isinstance(run, Exception):
+                    raise run
+
+                posts_found = 0
+                async for post in apify_runner.iter_dataset(run["defaultDatasetId"]):
+                    posts_found += 1
                     # Check for duplicates
                     post_url = post.get("url") or post.get("postUrl")
                     if post_url:
@@ -814,11 +778,11 @@ async def run_linkedin_posts_keywords_scrapper(run_id: str, request: ManualScrap
                     await db.scraper_opportunities.insert_one(opp_doc)
                     total_opportunities += 1
                 
-                total_posts += len(results)
+                total_posts += posts_found
                 await log_scrapper_event(
                     scrapper_id, "SUCCESS",
-                    f"Keyword '{keyword}': Found {len(results)} posts",
-                    {"keyword": keyword, "posts_found": len(results)},
+                    f"Keyword '{keyword}': Found {posts_found} posts",
+                    {"keyword": keyword, "posts_found": posts_found},
                     run_id=run_id
                 )
                 
@@ -836,7 +800,7 @@ async def run_linkedin_posts_keywords_scrapper(run_id: str, request: ManualScrap
                 "status": "completed",
                 "completed_at": datetime.now(timezone.utc).isoformat(),
                 "results": {
-                    "keywords_processed": len(keywords[:10]),
+                    "keywords_processed": len(batch),
                     "total_posts_found": total_posts,
                     "opportunities_created": total_opportunities
                 }
@@ -1065,68 +1029,62 @@ async def run_pharma_pipelines_scrapper(run_id: str, request: ManualScrapeReques
         
         await log_scrapper_event(scrapper_id, "INFO", f"Processing {len(companies)} pharma companies", run_id=run_id)
         
+        started = time.perf_counter()
         total_medications = 0
         total_phase_changes = 0
         processed_companies = 0
+        unchanged_companies = 0
+        url_timings = []
         
+        # Resolve URLs up front; companies without URLs are reported, not crawled
+        crawl_targets = []
         for company in companies:
             company_name = company.get("name", "Unknown")
-            try:
-                await log_scrapper_event(scrapper_id, "INFO", f"Processing: {company_name}", run_id=run_id)
-                
-                # Find pipeline URLs for the company (pass company data for configured URLs)
-                urls = await find_pharma_pipeline_urls(company_name, company)
-                
-                if not urls:
-                    await log_scrapper_event(scrapper_id, "WARN", f"No URLs found for {company_name}", run_id=run_id)
-                    continue
-                
-                await log_scrapper_event(scrapper_id, "INFO", f"Found {len(urls)} URLs for {company_name}: {urls[0]}", run_id=run_id)
-                
-                company_medications = []
-                
-                # Scrape each URL until we get content
-                for url in urls[:3]:  # Limit to 3 URLs per company
-                    try:
-                        await log_scrapper_event(scrapper_id, "INFO", f"Scraping: {url}", run_id=run_id)
-                        
-                        # Scrape the webpage
-                        content = await scrape_pharma_website(url)
-                        
-                        if not content or len(content) < 500:
-                            await log_scrapper_event(scrapper_id, "WARN", f"Content too short ({len(content) if content else 0} chars) for {url}", run_id=run_id)
-                            continue
-                        
-                        await log_scrapper_event(scrapper_id, "INFO", f"Got {len(content)} chars from {url}", run_id=run_id)
-                        
-                        # Extract medications using LLM
-                        medications = await extract_medications_with_llm(content, url, company_name)
-                        
-                        if medications:
-                            company_medications.extend(medications)
-                            await log_scrapper_event(
-                                scrapper_id, "SUCCESS", 
-                                f"Extracted {len(medications)} medications from {url}",
-                                run_id=run_id
-                            )
-                            # Once we get medications, we can stop trying more URLs for this company
-                            break
-                        
-                    except Exception as url_error:
-                        await log_scrapper_event(scrapper_id, "WARN", f"Error scraping {url}: {str(url_error)}", run_id=run_id)
-                        continue
-                
-                # Process and save medications, detect phase changes
-                if company_medications:
-                    phase_changes = await process_pharma_medications(company_medications, company_name, scrapper_id, run_id)
-                    total_medications += len(company_medications)
-                    total_phase_changes += phase_changes
-                    
-                processed_companies += 1
-                
-            except Exception as company_error:
-                await log_scrapper_event(scrapper_id, "ERROR", f"Error processing {company_name}: {str(company_error)}", run_id=run_id)
+            urls = await find_pharma_pipeline_urls(company_name, company)
+            if not urls:
+                await log_scrapper_event(scrapper_id, "WARN", f"No URLs found for {company_name}", run_id=run_id)
                 continue
+            crawl_targets.append({"name": company_name, "urls": urls})
+        
+        async def on_company_done(result):
+            """Store medications as soon as each company finishes"""
+            nonlocal total_medications, total_phase_changes, processed_companies, unchanged_companies
+            
+            for page in result.pages:
+                url_timings.append({"company": result.company_name, **page.timing()})
+            
+            if result.error:
+                await log_scrapper_event(scrapper_id, "ERROR", f"Error processing {result.company_name}: {result.error}", run_id=run_id)
+                return
+            
+            processed_companies += 1
+            if result.skipped_unchanged:
+                unchanged_companies += 1
+                await log_scrapper_event(scrapper_id, "INFO", f"Pipeline unchanged since last run: {result.company_name}", run_id=run_id)
+                return
+            
+            if result.medications:
+                phase_changes = await process_pharma_medications(result.medications, result.company_name, scrapper_id, run_id)
+                total_medications += len(result.medications)
+                total_phase_changes += phase_changes
+                await log_scrapper_event(
+                    scrapper_id, "SUCCESS",
+                    f"Extracted {len(result.medications)} medications for {result.company_name}",
+                    run_id=run_id
+                )
+            else:
+                await log_scrapper_event(scrapper_id, "WARN", f"No medications found for {result.company_name}", run_id=run_id)
+        
+        crawler = PipelineCrawler(
+            extract_text=extract_text_from_html,
+            extract_medications=extract_medications_with_llm,
+            render_page=scrape_with_playwright
+        )
+        await crawler.crawl(crawl_targets, on_company_done=on_company_done)
+        
+        outcomes = {}
+        for timing in url_timings:
+            outcomes[timing["outcome"]] = outcomes.get(timing["outcome"], 0) + 1
         
         # Update run status
         await db.scraper_runs.update_one(
@@ -1136,16 +1094,23 @@ async def run_pharma_pipelines_scrapper(run_id: str, request: ManualScrapeReques
                 "completed_at": datetime.now(timezone.utc).isoformat(),
                 "results": {
                     "companies_processed": processed_companies,
+                    "companies_unchanged": unchanged_companies,
                     "medications_found": total_medications,
                     "phase_changes_detected": total_phase_changes,
-                    "opportunities_created": total_phase_changes
+                    "opportunities_created": total_phase_changes,
+                    "llm_calls": crawler.llm_calls,
+                    "url_outcomes": outcomes,
+                    "url_timings": url_timings,
+                    "duration_seconds": round(time.perf_counter() - started, 1)
                 }
             }}
         )
         
         await log_scrapper_event(
             scrapper_id, "SUCCESS",
-            f"Completed. Processed {processed_companies} companies, found {total_medications} medications, {total_phase_changes} phase changes",
+            f"Completed. Processed {processed_companies} companies ({unchanged_companies} unchanged), "
+            f"found {total_medications} medications, {total_phase_changes} phase changes, "
+            f"{crawler.llm_calls} LLM calls in {time.perf_counter() - started:.0f}s",
             run_id=run_id
         )
         
@@ -1221,6 +1186,16 @@ async def run_single_company_scrape(company_id: str, company_name: str, pipeline
         # Extract medications using LLM
         medications = await extract_medications_with_llm(content, pipeline_url, company_name)
         
+        if medications is None:
+            await db.companies.update_one(
+                {"$or": [{"hubspot_id": company_id}, {"name": company_id}]},
+                {"$set": {
+                    "pharma_scrape_status": "failed",
+                    "pharma_scrape_error": "Medication extraction failed"
+                }}
+            )
+            return
+        
         if not medications:
             await db.companies.update_one(
                 {"$or": [{"hubspot_id": company_id}, {"name": company_id}]},
@@ -1434,22 +1409,8 @@ async def find_pharma_pipeline_urls(company_name: str, company_data: dict = None
 
 async def scrape_pharma_website(url: str) -> str:
     """Scrape a pharma pipeline webpage and extract text content.
-    Uses Playwright for JavaScript-heavy sites that block simple requests."""
-    
-    # List of user agents for rotation
-    USER_AGENTS = [
-        'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-        'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-        'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:121.0) Gecko/20100101 Firefox/121.0',
-        'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.2 Safari/605.1.15',
-        'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-    ]
-    
-    # Sites known to block simple requests - use Playwright
-    PLAYWRIGHT_REQUIRED_DOMAINS = [
-        'abbvie.com', 'bayer.com', 'lilly.com', 'biogen.com',
-        'regeneron.com', 'investor.jnj.com', 'amgenpipeline.com'
-    ]
+    Uses Playwright for JavaScript-heavy sites that block simple requests.
+    Single-page path (manual scrape); batch runs go through PipelineCrawler."""
     
     # Check if Playwright is needed for this domain
     use_playwright = any(domain in url.lower() for domain in PLAYWRIGHT_REQUIRED_DOMAINS)
@@ -1465,7 +1426,6 @@ async def scrape_pharma_website(url: str) -> str:
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8',
             'Accept-Language': 'en-US,en;q=0.9',
             'Accept-Encoding': 'gzip, deflate',
-            'Connection': 'keep-alive',
             'Upgrade-Insecure-Requests': '1',
             'Cache-Control': 'max-age=0',
             'Sec-Fetch-Dest': 'document',
@@ -1474,36 +1434,33 @@ async def scrape_pharma_website(url: str) -> str:
             'Sec-Fetch-User': '?1',
         }
         
-        # Add random delay to avoid rate limiting
-        await asyncio.sleep(random.uniform(1.0, 3.0))
+        client = get_http_client()
+        response = await client.get(url, headers=headers)
         
-        async with httpx.AsyncClient(timeout=30.0, follow_redirects=True) as client:
-            response = await client.get(url, headers=headers)
-            
-            # If blocked, try with Playwright
-            if response.status_code == 403:
-                print(f"Blocked (403) for {url} - trying Playwright")
-                return await scrape_with_playwright(url)
-            
-            if response.status_code != 200:
-                print(f"HTTP {response.status_code} for {url}")
-                return ""
-            
-            html = response.text
-            
-            # Check if content looks like compressed/binary data
-            if html and (html[0] in ['\x1f', '\x8b', ''] or not html.strip().startswith('<')):
-                try:
-                    headers_no_compress = {**headers, 'Accept-Encoding': 'identity'}
-                    response = await client.get(url, headers=headers_no_compress)
-                    html = response.text
-                except Exception:
-                    pass
-            
-            if not html or (not html.strip().startswith('<!') and not html.strip().startswith('<')):
-                return ""
-            
-            return extract_text_from_html(html)
+        # If blocked, try with Playwright
+        if response.status_code == 403:
+            print(f"Blocked (403) for {url} - trying Playwright")
+            return await scrape_with_playwright(url)
+        
+        if response.status_code != 200:
+            print(f"HTTP {response.status_code} for {url}")
+            return ""
+        
+        html = response.text
+        
+        # Check if content looks like compressed/binary data
+        if html and (html[0] in ['\x1f', '\x8b', ''] or not html.strip().startswith('<')):
+            try:
+                headers_no_compress = {**headers, 'Accept-Encoding': 'identity'}
+                response = await client.get(url, headers=headers_no_compress)
+                html = response.text
+            except Exception:
+                pass
+        
+        if not html or (not html.strip().startswith('<!') and not html.strip().startswith('<')):
+            return ""
+        
+        return extract_text_from_html(html)
             
     except Exception as e:
         print(f"Error scraping {url} with httpx: {e} - trying Playwright")
@@ -1511,59 +1468,28 @@ async def scrape_pharma_website(url: str) -> str:
 
 
 async def scrape_with_playwright(url: str) -> str:
-    """Use Playwright to scrape JavaScript-heavy pages that block simple requests"""
+    """Use Playwright to scrape JavaScript-heavy pages that block simple requests.
+    Pages come from the shared browser pool (no browser launch per URL)."""
     try:
-        from playwright.async_api import async_playwright
         import random
         
-        USER_AGENTS = [
-            'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-        ]
-        
-        async with async_playwright() as p:
-            browser = await p.chromium.launch(
-                headless=True,
-                args=['--no-sandbox', '--disable-setuid-sandbox', '--disable-dev-shm-usage']
-            )
-            
-            context = await browser.new_context(
-                user_agent=random.choice(USER_AGENTS),
-                viewport={'width': 1920, 'height': 1080},
-                locale='en-US',
-            )
+        async with browser_pool.page(user_agent=random.choice(USER_AGENTS[:2])) as page:
+            await page.goto(url, wait_until='networkidle', timeout=45000)
+            await page.wait_for_timeout(2000)  # Wait for dynamic content
             
-            page = await context.new_page()
+            # Scroll to load lazy content
+            await page.evaluate("window.scrollTo(0, document.body.scrollHeight / 2)")
+            await page.wait_for_timeout(1000)
             
-            # Add stealth modifications
-            await page.add_init_script("""
-                Object.defineProperty(navigator, 'webdriver', {get: () => undefined});
-                Object.defineProperty(navigator, 'plugins', {get: () => [1, 2, 3, 4, 5]});
-            """)
-            
-            try:
-                await page.goto(url, wait_until='networkidle', timeout=45000)
-                await page.wait_for_timeout(2000)  # Wait for dynamic content
-                
-                # Scroll to load lazy content
-                await page.evaluate("window.scrollTo(0, document.body.scrollHeight / 2)")
-                await page.wait_for_timeout(1000)
-                
-                html = await page.content()
-                await browser.close()
-                
-                if html:
-                    print(f"Successfully scraped {url} with Playwright")
-                    return extract_text_from_html(html)
-                return ""
-                
-            except Exception as e:
-                print(f"Playwright error for {url}: {e}")
-                await browser.close()
-                return ""
+            html = await page.content()
+        
+        if html:
+            print(f"Successfully scraped {url} with Playwright")
+            return extract_text_from_html(html)
+        return ""
                 
     except Exception as e:
-        print(f"Playwright setup error for {url}: {e}")
+        print(f"Playwright error for {url}: {e}")
         return ""
 
 
@@ -1584,8 +1510,13 @@ def extract_text_from_html(html: str) -> str:
     return text[:30000]  # Limit content length
 
 
-async def extract_medications_with_llm(content: str, url: str, company_name: str) -> List[Dict]:
-    """Use LLM to extract medication data from scraped content"""
+async def extract_medications_with_llm(content: str, url: str, company_name: str) -> Optional[List[Dict]]:
+    """
+    Use LLM to extract medication data from scraped content.
+    Returns None when the extraction itself failed (no key, LLM error,
+    unparseable response), so callers can tell it apart from a page
+    with no medications ([]).
+    """
     try:
         from emergentintegrations.llm.chat import LlmChat, UserMessage
         from dotenv import load_dotenv
@@ -1594,7 +1525,7 @@ async def extract_medications_with_llm(content: str, url: str, company_name: str
         api_key = os.environ.get("EMERGENT_LLM_KEY")
         if not api_key:
             print("EMERGENT_LLM_KEY not found")
-            return []
+            return None
         
         # Get registered therapeutic areas from database
         db_areas = await db.therapeutic_areas.find({"active": True}, {"_id": 0, "name": 1}).to_list(50)
@@ -1667,11 +1598,11 @@ If no medications found, respond: {{"productos": []}}"""
         except json.JSONDecodeError:
             print(f"Failed to parse LLM response as JSON: {response[:200]}")
         
-        return []
+        return None
         
     except Exception as e:
         print(f"Error extracting medications with LLM: {e}")
-        return []
+        return None
 
 
 async def process_pharma_medications(medications: List[Dict], company_name: str, scrapper_id: str, run_id: str) -> int:
@@ -3505,33 +3436,39 @@ async def run_linkedin_profile_search(run_id: str, company: str, keywords: List[
     try:
         await log_scrapper_event(source, "INFO", f"Starting multi-keyword search for {company} with {len(keywords)} keywords in {location}", run_id=run_id)
         
-        all_search_queries = []
         total_profiles_found = 0
         profiles_added = 0
         profiles_filtered = 0
         profiles_duplicated = 0
         seen_urls = set()  # Track URLs within this run to avoid duplicates
         
-        # Make one search per keyword
-        for keyword in keywords:
-            # Build search query: company + single keyword + location
-            search_query = f"{company} {keyword} {location}"
-            all_search_queries.append(search_query)
-            
-            input_data = {
+        # Make one search per keyword: company + single keyword + location
+        all_search_queries = [f"{company} {keyword} {location}" for keyword in keywords]
+        inputs = [
+            {
                 "searchQuery": search_query,
                 "profileScraperMode": "Short",
                 "takePages": 1,  # 1 page per keyword to avoid too many API calls
             }
-            
-            await log_scrapper_event(source, "INFO", f"Searching: {search_query}", run_id=run_id)
-            
+            for search_query in all_search_queries
+        ]
+        await log_scrapper_event(source, "INFO", f"Searching: {', '.join(all_search_queries)}", run_id=run_id)
+
+        # Searches run concurrently; results are consumed in keyword order so
+        # cross-keyword dedup (seen_urls) behaves as before
+        async for index, run in apify_runner.run_many(APIFY_ACTORS["linkedin_profile_search"], inputs):
+            keyword = keywords[index]
+            search_query = all_search_queries[index]
+
             try:
-                results = await run_apify_actor(APIFY_ACTORS["linkedin_profile_search"], input_data)
+                if isinstance(run, Exception):
+                    raise run
+
+                results = [p async for p in apify_runner.iter_dataset(run["defaultDatasetId"])]
                 total_profiles_found += len(results)
-                
+
                 await log_scrapper_event(source, "INFO", f"Query '{keyword}' returned {len(results)} results", run_id=run_id)
-                
+
                 for profile in results:
                     # Handle the actual field names from harvestapi/linkedin-profile-search
                     first_name = profile.get("firstName", "")
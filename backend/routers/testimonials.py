@@ -7,6 +7,7 @@ from typing import Optional, List
 from datetime import datetime, timezone
 from database import db
 from routers.auth import get_current_user
+from services.response_cache import response_cache
 import uuid
 import pandas as pd
 import io
@@ -328,6 +329,7 @@ async def create_testimonial(data: TestimonialCreate, current_user: dict = Depen
     
     await db.testimonials.insert_one(testimonial)
     
+    response_cache.invalidate("public_website")
     return {"success": True, "testimonial": {k: v for k, v in testimonial.items() if k != "_id"}}
 
 
@@ -357,6 +359,7 @@ async def update_testimonial(
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Testimonial not found")
     
+    response_cache.invalidate("public_website")
     return {"success": True, "message": "Testimonial updated"}
 
 
@@ -368,6 +371,7 @@ async def delete_testimonial(testimonial_id: str, current_user: dict = Depends(g
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Testimonial not found")
     
+    response_cache.invalidate("public_website")
     return {"success": True, "message": "Testimonial deleted"}
 
 
@@ -386,6 +390,7 @@ async def bulk_delete_testimonials(request: BulkDeleteRequest, current_user: dic
     
     result = await db.testimonials.delete_many({"id": {"$in": request.ids}})
     
+    response_cache.invalidate("public_website")
     return {
         "success": True,
         "deleted_count": result.deleted_count,
@@ -409,6 +414,7 @@ async def bulk_update_testimonials(request: BulkUpdateRequest, current_user: dic
         {"$set": update_data}
     )
     
+    response_cache.invalidate("public_website")
     return {
         "success": True,
         "modified_count": result.modified_count,
@@ -589,6 +595,7 @@ async def import_testimonials(
             except Exception as e:
                 errors.append(f"Row {idx + 2}: {str(e)}")
         
+        response_cache.invalidate("public_website")
         return {
             "success": True,
             "message": f"Imported {created} testimonials",
@@ -14,6 +14,7 @@ load_dotenv()
 
 from database import db
 from routers.auth import get_current_user
+from utils.batch_loader import BatchLoader
 
 logger = logging.getLogger(__name__)
 
@@ -374,20 +375,20 @@ async def get_cases_without_dealmaker(
     
     cases_for_dm = []
     
+    # Load the contacts of every case in one query
+    contact_loader = BatchLoader(
+        db.unified_contacts,
+        projection={"_id": 0, "id": 1, "name": 1, "email": 1, "phone": 1, "roles": 1, "job_title": 1}
+    )
+    for case in all_cases:
+        contact_loader.add_many(case.get("contact_ids"))
+    await contact_loader.load()
+    
     for case in all_cases:
-        contact_ids = case.get("contact_ids", [])
+        contacts = contact_loader.get_many(case.get("contact_ids"))
         
-        # Get contacts for this case
-        contacts = []
-        deal_makers = []
-        if contact_ids:
-            contacts = await db.unified_contacts.find(
-                {"id": {"$in": contact_ids}},
-                {"_id": 0, "id": 1, "name": 1, "email": 1, "phone": 1, "roles": 1, "job_title": 1}
-            ).to_list(None)
-            
-            # Identify which contacts are already deal makers
-            deal_makers = [c for c in contacts if "deal_maker" in (c.get("roles") or [])]
+        # Identify which contacts are already deal makers
+        deal_makers = [c for c in contacts if "deal_maker" in (c.get("roles") or [])]
         
         case["current_stage"] = "Stage 4" if case.get("delivery_stage") else "Stage 3"
         case["stage_detail"] = case.get("delivery_stage") or case.get("stage", "")
@@ -757,22 +758,22 @@ async def get_cases_solicited(
         {"_id": 0}
     ).sort("created_at", -1).to_list(None)
     
-    # Enrich with contact info
+    # Enrich with contact info (one query for all cases)
+    contact_loader = BatchLoader(
+        db.unified_contacts,
+        projection={"_id": 0, "id": 1, "name": 1, "email": 1, "phone": 1, "roles": 1}
+    )
     for case in cases:
-        contact_ids = case.get("contact_ids", [])
-        if contact_ids:
-            contacts = await db.unified_contacts.find(
-                {"id": {"$in": contact_ids}},
-                {"_id": 0, "id": 1, "name": 1, "email": 1, "phone": 1, "roles": 1}
-            ).to_list(None)
-            case["contacts"] = contacts
-            
-            # Find deal maker if exists
-            deal_makers = [c for c in contacts if "deal_maker" in (c.get("roles") or [])]
-            case["deal_maker"] = deal_makers[0] if deal_makers else None
-        else:
-            case["contacts"] = []
-            case["deal_maker"] = None
+        contact_loader.add_many(case.get("contact_ids"))
+    await contact_loader.load()
+    
+    for case in cases:
+        contacts = contact_loader.get_many(case.get("contact_ids"))
+        case["contacts"] = contacts
+        
+        # Find deal maker if exists
+        deal_makers = [c for c in contacts if "deal_maker" in (c.get("roles") or [])]
+        case["deal_maker"] = deal_makers[0] if deal_makers else None
     
     return {
         "cases": cases,
@@ -809,21 +810,18 @@ async def get_dealmaker_followup(
     seen_contacts_propuesta = set()
     seen_contacts_proyecto = set()
     
+    # Load the deal makers of every case in one query
+    dm_loader = BatchLoader(
+        db.unified_contacts,
+        projection={"_id": 0, "id": 1, "name": 1, "email": 1, "phone": 1, "company": 1},
+        query={"roles": "deal_maker"}
+    )
+    for case in cases:
+        dm_loader.add_many(case.get("contact_ids"))
+    await dm_loader.load()
+    
     for case in cases:
-        contact_ids = case.get("contact_ids", [])
-        if not contact_ids:
-            continue
-        
-        # Find deal makers for this case
-        deal_makers = await db.unified_contacts.find(
-            {
-                "id": {"$in": contact_ids},
-                "roles": "deal_maker"
-            },
-            {"_id": 0, "id": 1, "name": 1, "email": 1, "phone": 1, "company": 1}
-        ).to_list(None)
-        
-        for dm in deal_makers:
+        for dm in dm_loader.get_many(case.get("contact_ids")):
             dm_data = {
                 **dm,
                 "case_id": case["id"],
@@ -1482,26 +1480,36 @@ async def get_quotes_cases(
         {"_id": 0}
     ).sort("created_at", -1).to_list(100)
     
+    # Deal makers and quotes of every case, one query each
+    dm_loader = BatchLoader(
+        db.unified_contacts,
+        projection={"_id": 0, "id": 1, "name": 1, "email": 1, "phone": 1, "company": 1}
+    )
+    quote_loader = BatchLoader(
+        db.quotes,
+        key="case_id",
+        projection={"_id": 0, "id": 1, "quote_number": 1, "total": 1, "currency": 1, "created_at": 1, "pdf_url": 1},
+        sort=[("created_at", -1)],
+        many=True
+    )
+    for case in cases:
+        dm_loader.add(case.get("deal_maker_id"))
+        quote_loader.add(case.get("id"))
+    await dm_loader.load()
+    await quote_loader.load()
+    
     enriched_cases = []
     for case in cases:
         case_id = case.get("id")
         
         # Get deal maker info
-        deal_maker = None
-        deal_maker_id = case.get("deal_maker_id")
-        if deal_maker_id:
-            dm_contact = await db.unified_contacts.find_one(
-                {"id": deal_maker_id},
-                {"_id": 0, "id": 1, "name": 1, "email": 1, "phone": 1, "company": 1}
-            )
-            if dm_contact:
-                deal_maker = dm_contact
+        deal_maker = dm_loader.get(case.get("deal_maker_id"))
         
-        # Get quotes for this case
-        quotes = await db.quotes.find(
-            {"case_id": case_id},
-            {"_id": 0, "id": 1, "quote_number": 1, "total": 1, "currency": 1, "created_at": 1, "pdf_url": 1}
-        ).sort("created_at", -1).to_list(10)
+        # Get quotes for this case (latest 10)
+        quotes = [
+            {k: v for k, v in quote.items() if k != "case_id"}
+            for quote in quote_loader.get(case_id)[:10]
+        ]
         
         # Also check case-level quotes array
         case_quotes = case.get("quotes", [])
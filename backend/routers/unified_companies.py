@@ -13,6 +13,12 @@ import re
 
 from .auth import get_current_user
 from .legacy import db
+from services.company_association import (
+    company_keys_for, ensure_company_keys, refresh_contact_company_keys, rename_contact_company
+)
+from services.classification_propagation import apply_contact_classification, plan_contact_propagation
+from utils.pagination import InvalidCursor, cached_total, keyset_page
+from services.response_cache import response_cache
 
 router = APIRouter(prefix="/unified-companies", tags=["Unified Companies"])
 
@@ -62,24 +68,13 @@ class CreateCompanyRequest(BaseModel):
 # ENDPOINTS
 # =============================================================================
 
-@router.get("")
-async def list_unified_companies(
+def build_companies_query(
     classification: Optional[str] = None,
     search: Optional[str] = None,
     industry: Optional[str] = None,
-    industry_code: Optional[str] = None,
-    limit: int = Query(default=100, le=5000),
-    skip: int = 0,
-    current_user: dict = Depends(get_current_user)
-):
-    """
-    List unified companies with optional filters.
-    
-    - classification: "inbound" or "outbound"
-    - search: Search in name, domain, aliases
-    - industry: Filter by industry string (legacy)
-    - industry_code: Filter by exact industry code
-    """
+    industry_code: Optional[str] = None
+) -> dict:
+    """Company filter of GET /unified-companies (shared with the company export)"""
     query = {"is_merged": {"$ne": True}}
     
     if classification:
@@ -115,26 +110,55 @@ async def list_unified_companies(
             {"industries": {"$regex": re.escape(industry), "$options": "i"}}
         ]
     
-    # Get total count
-    total = await db.unified_companies.count_documents(query)
+    return query
+
+
+@router.get("")
+async def list_unified_companies(
+    classification: Optional[str] = None,
+    search: Optional[str] = None,
+    industry: Optional[str] = None,
+    industry_code: Optional[str] = None,
+    limit: int = Query(default=100, le=5000),
+    skip: int = 0,
+    cursor: Optional[str] = None,
+    include_total: bool = True,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    List unified companies with optional filters.
+    
+    - classification: "inbound" or "outbound"
+    - search: Search in name, domain, aliases
+    - industry: Filter by industry string (legacy)
+    - industry_code: Filter by exact industry code
+    - cursor: next_cursor of the previous page (skip is ignored)
+    - include_total: false skips the (cached) total
+    """
+    query = build_companies_query(
+        classification=classification, search=search, industry=industry, industry_code=industry_code
+    )
     
     # Get companies
-    companies = []
-    cursor = db.unified_companies.find(
-        query,
-        {"_id": 0, "_legacy_ids": 0, "_legacy_sources": 0}
-    ).sort("name", 1).skip(skip).limit(limit)
+    try:
+        companies, next_cursor = await keyset_page(
+            db.unified_companies, query, {"_id": 0, "_legacy_ids": 0, "_legacy_sources": 0},
+            "name", 1, limit, cursor=cursor, skip=skip
+        )
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
-    async for doc in cursor:
-        companies.append(doc)
+    # Get total count (cached per filter)
+    total = await cached_total(db.unified_companies, query) if include_total else None
     
     return {
         "companies": companies,
         "total": total,
+        "next_cursor": next_cursor,
         "limit": limit,
         "skip": skip,
         "page": (skip // limit) + 1 if limit > 0 else 1,
-        "pages": (total + limit - 1) // limit if limit > 0 else 1
+        "pages": (total + limit - 1) // limit if limit > 0 and total is not None else None
     }
 
 
@@ -353,20 +377,11 @@ async def get_unified_company(
             {"companies.company_id": hubspot_id}
         ])
     
-    # Search by company name (exact match, case insensitive)
-    if company_name:
-        contact_query["$or"].extend([
-            {"company": {"$regex": f"^{re.escape(company_name)}$", "$options": "i"}},
-            {"companies.company_name": {"$regex": f"^{re.escape(company_name)}$", "$options": "i"}}
-        ])
-    
-    # Search by aliases (exact match, case insensitive)
-    for alias in aliases:
-        if alias and alias.strip():
-            contact_query["$or"].extend([
-                {"company": {"$regex": f"^{re.escape(alias.strip())}$", "$options": "i"}},
-                {"companies.company_name": {"$regex": f"^{re.escape(alias.strip())}$", "$options": "i"}}
-            ])
+    # Search by company name and aliases (case insensitive, indexed company keys)
+    name_keys = company_keys_for([company_name, *aliases])
+    if name_keys:
+        await ensure_company_keys(db)
+        contact_query["$or"].append({"company_keys": {"$in": name_keys}})
     
     # Get total count first (before limiting)
     total_contacts = await db.unified_contacts.count_documents(contact_query)
@@ -555,16 +570,16 @@ async def update_unified_company(
             for alias in new_aliases:
                 if alias and alias.lower() != company_principal_name.lower():
                     # Update contacts where company field matches this alias
-                    await db.unified_contacts.update_many(
-                        {"company": {"$regex": f"^{re.escape(alias)}$", "$options": "i"}},
-                        {"$set": {"company": company_principal_name}}
-                    )
+                    await rename_contact_company(db, [alias], company_principal_name)
                     # Also update in companies array
-                    await db.unified_contacts.update_many(
-                        {"companies.company_name": {"$regex": f"^{re.escape(alias)}$", "$options": "i"}},
+                    alias_keys = company_keys_for([alias])
+                    result = await db.unified_contacts.update_many(
+                        {"company_keys": {"$in": alias_keys}},
                         {"$set": {"companies.$[elem].company_name": company_principal_name}},
                         array_filters=[{"elem.company_name": {"$regex": f"^{re.escape(alias)}$", "$options": "i"}}]
                     )
+                    if result.modified_count:
+                        await refresh_contact_company_keys(db, {"company_keys": {"$in": alias_keys}})
     
     await db.unified_companies.update_one(
         {"id": actual_id},
@@ -616,6 +631,7 @@ async def update_unified_company(
     if contacts_updated:
         response["contacts_updated"] = contacts_updated
     
+    response_cache.invalidate("public_website")
     return response
 
 
@@ -664,6 +680,7 @@ async def update_company_classification(
         "timestamp": datetime.now(timezone.utc).isoformat()
     })
     
+    response_cache.invalidate("public_website")
     return {
         "success": True,
         "company_id": company_id,
@@ -690,33 +707,14 @@ async def get_company_propagation_preview(
         raise HTTPException(status_code=404, detail="Company not found")
     
     company_name = company.get("name", "")
-    
-    # Find contacts associated with this company
-    # They can be linked by company_id, company name, or companies array
-    query = {
-        "$or": [
-            {"company_id": company_id},
-            {"company": {"$regex": f"^{re.escape(company_name)}$", "$options": "i"}},
-            {"companies.company_id": company_id},
-            {"companies.company_name": {"$regex": f"^{re.escape(company_name)}$", "$options": "i"}}
-        ],
-        "classification": {"$ne": target_classification}  # Only those that would change
-    }
-    
-    affected = []
-    async for contact in db.unified_contacts.find(query, {"_id": 0, "id": 1, "name": 1, "first_name": 1, "last_name": 1}):
-        name = contact.get("name") or f"{contact.get('first_name', '')} {contact.get('last_name', '')}".strip()
-        affected.append({
-            "id": contact["id"],
-            "name": name
-        })
+    plan = await plan_contact_propagation(db, [company_id], [company_name], target_classification)
     
     return {
         "company_id": company_id,
         "company_name": company_name,
         "target_classification": target_classification,
-        "affected_count": len(affected),
-        "affected_contacts": affected[:100]  # Limit to first 100 for preview
+        "affected_count": len(plan["contact_ids"]),
+        "affected_contacts": plan["sample"]  # First 100 for preview
     }
 
 
@@ -750,53 +748,10 @@ async def propagate_company_classification(
         }}
     )
     
-    # Find associated contacts
-    query = {
-        "$or": [
-            {"company_id": company_id},
-            {"company": {"$regex": f"^{re.escape(company_name)}$", "$options": "i"}},
-            {"companies.company_id": company_id},
-            {"companies.company_name": {"$regex": f"^{re.escape(company_name)}$", "$options": "i"}}
-        ]
-    }
-    
-    affected_ids = []
-    async for contact in db.unified_contacts.find(query, {"_id": 0, "id": 1, "companies": 1}):
-        contact_id = contact["id"]
-        
-        if request.classification == "outbound":
-            # Always propagate outbound
-            await db.unified_contacts.update_one(
-                {"id": contact_id},
-                {"$set": {
-                    "classification": "outbound",
-                    "updated_at": datetime.now(timezone.utc).isoformat()
-                }}
-            )
-            affected_ids.append(contact_id)
-        else:
-            # For inbound: only if ALL companies are inbound
-            # Check other companies
-            other_companies = contact.get("companies", [])
-            all_inbound = True
-            
-            for comp in other_companies:
-                other_id = comp.get("company_id")
-                if other_id and other_id != company_id:
-                    other = await db.unified_companies.find_one({"id": other_id}, {"classification": 1})
-                    if other and other.get("classification") == "outbound":
-                        all_inbound = False
-                        break
-            
-            if all_inbound:
-                await db.unified_contacts.update_one(
-                    {"id": contact_id},
-                    {"$set": {
-                        "classification": "inbound",
-                        "updated_at": datetime.now(timezone.utc).isoformat()
-                    }}
-                )
-                affected_ids.append(contact_id)
+    # Contacts that change, computed as a set, written in one bulk write
+    plan = await plan_contact_propagation(db, [company_id], [company_name], request.classification)
+    affected_ids = plan["contact_ids"]
+    await apply_contact_classification(db, affected_ids, request.classification)
     
     # Create audit log
     await db.audit_logs.insert_one({
@@ -813,6 +768,7 @@ async def propagate_company_classification(
         "timestamp": datetime.now(timezone.utc).isoformat()
     })
     
+    response_cache.invalidate("public_website")
     return {
         "success": True,
         "company_id": company_id,
@@ -902,6 +858,7 @@ async def create_unified_company(
         "timestamp": now
     })
     
+    response_cache.invalidate("public_website")
     return {"success": True, "company": {k: v for k, v in company.items() if not k.startswith("_")}}
 
 
@@ -6,6 +6,8 @@ from pydantic import BaseModel
 from typing import Optional, List
 from datetime import datetime, timezone
 from database import db
+from services.response_cache import response_cache
+from services import blog_classification
 from routers.auth import get_current_user
 import uuid
 
@@ -97,6 +99,7 @@ async def create_formato(data: FormatoCreate, current_user: dict = Depends(get_c
     }
     
     await db.formatos.insert_one(formato)
+    response_cache.invalidate("website_config")
     return {"success": True, "formato": {k: v for k, v in formato.items() if k != "_id"}}
 
 
@@ -117,6 +120,7 @@ async def update_formato(formato_id: str, data: FormatoUpdate, current_user: dic
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Formato not found")
     
+    response_cache.invalidate("website_config")
     return {"success": True, "message": "Formato updated"}
 
 
@@ -128,6 +132,7 @@ async def delete_formato(formato_id: str, current_user: dict = Depends(get_curre
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Formato not found")
     
+    response_cache.invalidate("website_config")
     return {"success": True, "message": "Formato deleted"}
 
 
@@ -157,6 +162,7 @@ async def seed_formatos(current_user: dict = Depends(get_current_user)):
             })
             created += 1
     
+    response_cache.invalidate("website_config")
     return {"success": True, "message": f"Created {created} formatos"}
 
 
@@ -194,6 +200,7 @@ async def create_programa(data: ProgramaCreate, current_user: dict = Depends(get
     }
     
     await db.programas.insert_one(programa)
+    response_cache.invalidate("website_config")
     return {"success": True, "programa": {k: v for k, v in programa.items() if k != "_id"}}
 
 
@@ -212,6 +219,7 @@ async def update_programa(programa_id: str, data: ProgramaUpdate, current_user:
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Programa not found")
     
+    response_cache.invalidate("website_config")
     return {"success": True, "message": "Programa updated"}
 
 
@@ -223,6 +231,7 @@ async def delete_programa(programa_id: str, current_user: dict = Depends(get_cur
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Programa not found")
     
+    response_cache.invalidate("website_config")
     return {"success": True, "message": "Programa deleted"}
 
 
@@ -266,6 +275,8 @@ async def create_nivel(data: NivelCreate, current_user: dict = Depends(get_curre
     }
     
     await db.niveles_certificacion.insert_one(nivel)
+    await blog_classification.propagate_level_names()
+    response_cache.invalidate("website_config")
     return {"success": True, "nivel": {k: v for k, v in nivel.items() if k != "_id"}}
 
 
@@ -289,6 +300,8 @@ async def update_nivel(nivel_id: str, data: NivelUpdate, current_user: dict = De
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Nivel not found")
     
+    await blog_classification.propagate_level_names()
+    response_cache.invalidate("website_config")
     return {"success": True, "message": "Nivel updated"}
 
 
@@ -300,6 +313,8 @@ async def delete_nivel(nivel_id: str, current_user: dict = Depends(get_current_u
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Nivel not found")
     
+    await blog_classification.propagate_level_names()
+    response_cache.invalidate("website_config")
     return {"success": True, "message": "Nivel deleted"}
 
 
@@ -327,6 +342,8 @@ async def seed_niveles(current_user: dict = Depends(get_current_user)):
             })
             created += 1
     
+    await blog_classification.propagate_level_names()
+    response_cache.invalidate("website_config")
     return {"success": True, "message": f"Created {created} niveles"}
 
 
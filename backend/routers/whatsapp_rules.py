@@ -3,6 +3,7 @@ WhatsApp Rules Router - Template-based WhatsApp messaging system
 Handles rules, templates, and message generation for WhatsApp follow-ups
 """
 import os
+import re
 import uuid
 from pathlib import Path
 from dotenv import load_dotenv
@@ -15,6 +16,13 @@ from typing import Optional, List, Dict, Any
 from datetime import datetime, timezone, timedelta
 from database import db
 from routers.auth import get_current_user
+from services.queue_grouping import (
+    MEMBERS_DEFAULT_PAGE_SIZE, pending_buckets, page_members, normalized_key, normalized_key_filter,
+    value_filter, cases_for_contacts, case_members_filter, case_group_id, build_case_groups,
+    CASE_STAGES_EN_CURSO, CASE_STAGES_CERRADOS
+)
+from services.rule_context import RuleEvaluationContext, iter_contacts, has_any
+from utils.timestamps import parse_timestamp, timestamp_query, utc_now
 import pytz
 
 router = APIRouter(prefix="/whatsapp-rules", tags=["WhatsApp Rules"])
@@ -302,21 +310,106 @@ async def update_whatsapp_rule(
     return {"success": True, "updated": rule_id}
 
 
+# Trigger types and how their pending messages are grouped
+WA_MEETING_TRIGGERS = ["meeting_today", "meeting_tomorrow", "meeting_21_days_new", "meeting_21_days_followup"]
+WA_NEW_BUSINESS_TRIGGERS = ["new_business_first", "new_business_followup"]
+WA_WEBINAR_TRIGGERS = ["webinar_7_days", "webinar_24_hours"]
+
+WA_MEMBER_PROJECTION = {"_id": 0, "id": 1, "contact_id": 1, "contact_name": 1, "contact_phone": 1, "metadata": 1}
+
+
+WA_NO_PERSONA = "sin clasificar"
+WA_PERSONA_KEY = normalized_key("metadata.buyer_persona", WA_NO_PERSONA)
+
+
+async def _wa_pending_buckets(rule_id: str, trigger_type: str):
+    """
+    Pending messages of a rule counted per grouping key, each bucket tagged
+    with its group_id (and subgroup_id for webinar / case rules).
+    """
+    match = {"rule": rule_id, "status": "pending"}
+
+    if trigger_type in WA_MEETING_TRIGGERS:
+        buckets = await pending_buckets(db.whatsapp_queue, match, {"date": "metadata.meeting_date"})
+        for b in buckets:
+            b["group_id"] = b["keys"]["date"] or "Sin fecha"
+
+    elif trigger_type in WA_NEW_BUSINESS_TRIGGERS:
+        buckets = await pending_buckets(db.whatsapp_queue, match, {"type": "metadata.business_type"})
+        for b in buckets:
+            b["group_id"] = b["keys"]["type"] or "Otros"
+
+    elif trigger_type in WA_WEBINAR_TRIGGERS:
+        buckets = await pending_buckets(
+            db.whatsapp_queue, match, {"webinar": "metadata.webinar_id", "bp": WA_PERSONA_KEY},
+            first={
+                "webinar_name": "metadata.webinar_name",
+                "webinar_date": "metadata.webinar_date",
+                "webinar_time": "metadata.webinar_time",
+                "webinar_link": "metadata.webinar_link",
+                "bp": "metadata.buyer_persona",
+            }
+        )
+        for b in buckets:
+            b["group_id"] = b["keys"]["webinar"] or "unknown"
+            b["subgroup_id"] = b["keys"]["bp"]
+
+    elif trigger_type == "student_coaching":
+        match = {"rule": "W12", "status": "pending"}
+        buckets = await pending_buckets(db.whatsapp_queue, match, {"contact": "contact_id"})
+        cases = await cases_for_contacts([b["keys"]["contact"] for b in buckets if b["keys"]["contact"]])
+        # Contacts without a valid case are not shown
+        buckets = [b for b in buckets if b["keys"]["contact"] in cases]
+        for b in buckets:
+            b["case"] = cases[b["keys"]["contact"]]
+            b["group_id"] = case_group_id(b["case"])
+            b["subgroup_id"] = b["case"]["id"]
+
+    else:
+        buckets = await pending_buckets(
+            db.whatsapp_queue, match, {"bp": WA_PERSONA_KEY}, first={"bp": "metadata.buyer_persona"}
+        )
+        for b in buckets:
+            b["group_id"] = b["keys"]["bp"]
+
+    return buckets
+
+
+async def _wa_group_filter(rule_id: str, trigger_type: str, group_id: str, subgroup_id: Optional[str]):
+    """Filter selecting the pending messages of one group (or subgroup) of _wa_pending_buckets"""
+    if trigger_type in WA_MEETING_TRIGGERS:
+        group = value_filter("metadata.meeting_date", group_id, "Sin fecha")
+    elif trigger_type in WA_NEW_BUSINESS_TRIGGERS:
+        group = value_filter("metadata.business_type", group_id, "Otros")
+    elif trigger_type in WA_WEBINAR_TRIGGERS:
+        group = value_filter("metadata.webinar_id", group_id, "unknown")
+        if subgroup_id:
+            group = {"$and": [group, normalized_key_filter("metadata.buyer_persona", subgroup_id, WA_NO_PERSONA)]}
+    elif trigger_type == "student_coaching":
+        rule_id = "W12"
+        group = await case_members_filter(group_id, subgroup_id)
+        if group is None:
+            return None
+    else:
+        group = normalized_key_filter("metadata.buyer_persona", group_id, WA_NO_PERSONA)
+    return {"$and": [{"rule": rule_id, "status": "pending"}, group]}
+
+
 @router.get("/rule/{rule_id}/pending-grouped")
 async def get_whatsapp_pending_grouped(
     rule_id: str,
     current_user: dict = Depends(get_current_user)
 ):
     """
-    Get pending WhatsApp messages for a rule, grouped appropriately.
+    Get pending WhatsApp message groups for a rule (keys and counts only).
     - Meeting rules (W01-W04): grouped by date
     - New Business (W05-W06): grouped by business_type
     - Webinar rules (W08-W09): grouped by webinar, then buyer_persona
+    - W12: grouped by case stage, then case
     - Other rules: grouped by buyer_persona
+    Members are loaded per group from /rule/{rule_id}/pending-grouped/members.
     """
     rule_id = rule_id.upper()
-    now = datetime.now(timezone.utc)
-    today = now.date()
     
     # Get rule info
     rule = await db.whatsapp_rules.find_one({"id": rule_id}, {"_id": 0})
@@ -324,268 +417,76 @@ async def get_whatsapp_pending_grouped(
         raise HTTPException(status_code=404, detail=f"Rule {rule_id} not found")
     
     trigger_type = rule.get("trigger_type", "")
+    buckets = await _wa_pending_buckets(rule_id, trigger_type)
     groups = []
     has_subgroups = False
     
     # Get buyer personas for display names
-    buyer_personas_list = await db.buyer_personas_db.find({}, {"_id": 0}).to_list(100)
+    buyer_personas_list = await db.buyer_personas_db.find({}, {"_id": 0, "id": 1, "name": 1}).to_list(100)
     buyer_personas_db = {bp.get("id", "").lower(): bp.get("name", bp.get("id", "")) for bp in buyer_personas_list}
     
-    # ============ MEETING RULES (W01-W04) ============
-    if trigger_type in ["meeting_today", "meeting_tomorrow", "meeting_21_days_new", "meeting_21_days_followup"]:
-        # Get from whatsapp_queue
-        pending = await db.whatsapp_queue.find(
-            {"rule": rule_id, "status": "pending"},
-            {"_id": 0}
-        ).to_list(5000)
-        
-        # Group by meeting date
-        date_groups = {}
-        for msg in pending:
-            metadata = msg.get("metadata", {})
-            meeting_date = metadata.get("meeting_date", "Sin fecha")
-            
-            if meeting_date not in date_groups:
-                date_groups[meeting_date] = {
-                    "group_id": meeting_date,
-                    "group_type": "date",
-                    "group_name": meeting_date,
-                    "emails": [],
-                    "count": 0,
-                    "has_error": False
-                }
-            
-            date_groups[meeting_date]["emails"].append({
-                "id": msg.get("id"),
-                "contact_id": msg.get("contact_id"),
-                "contact_name": msg.get("contact_name", ""),
-                "contact_phone": msg.get("contact_phone", ""),
-                "metadata": metadata
-            })
-            date_groups[meeting_date]["count"] += 1
-        
-        groups = list(date_groups.values())
-    
-    # ============ NEW BUSINESS RULES (W05-W06) ============
-    elif trigger_type in ["new_business_first", "new_business_followup"]:
-        pending = await db.whatsapp_queue.find(
-            {"rule": rule_id, "status": "pending"},
-            {"_id": 0}
-        ).to_list(5000)
-        
-        # Group by business_type
-        type_groups = {}
-        for msg in pending:
-            metadata = msg.get("metadata", {})
-            biz_type = metadata.get("business_type", "Otros")
-            
-            if biz_type not in type_groups:
-                type_groups[biz_type] = {
-                    "group_id": biz_type,
-                    "group_type": "business_type",
-                    "group_name": biz_type,
-                    "emails": [],
-                    "count": 0,
-                    "has_error": False
-                }
-            
-            type_groups[biz_type]["emails"].append({
-                "id": msg.get("id"),
-                "contact_id": msg.get("contact_id"),
-                "contact_name": msg.get("contact_name", ""),
-                "contact_phone": msg.get("contact_phone", ""),
-                "metadata": metadata
+    # ============ MEETING / NEW BUSINESS RULES (W01-W06) ============
+    if trigger_type in WA_MEETING_TRIGGERS + WA_NEW_BUSINESS_TRIGGERS:
+        group_type = "date" if trigger_type in WA_MEETING_TRIGGERS else "business_type"
+        flat_groups = {}
+        for b in buckets:
+            group = flat_groups.setdefault(b["group_id"], {
+                "group_id": b["group_id"],
+                "group_type": group_type,
+                "group_name": b["group_id"],
+                "count": 0,
+                "has_error": False
             })
-            type_groups[biz_type]["count"] += 1
-        
-        groups = list(type_groups.values())
+            group["count"] += b["count"]
+        groups = list(flat_groups.values())
     
     # ============ WEBINAR RULES (W08-W09) ============
-    elif trigger_type in ["webinar_7_days", "webinar_24_hours"]:
+    elif trigger_type in WA_WEBINAR_TRIGGERS:
         has_subgroups = True
-        pending = await db.whatsapp_queue.find(
-            {"rule": rule_id, "status": "pending"},
-            {"_id": 0}
-        ).to_list(5000)
-        
-        # Group by webinar, then by buyer_persona
         webinar_groups = {}
-        for msg in pending:
-            metadata = msg.get("metadata", {})
-            webinar_id = metadata.get("webinar_id", "unknown")
-            webinar_name = metadata.get("webinar_name", "Sin webinar")
-            bp = metadata.get("buyer_persona", "Sin clasificar")
-            bp_lower = bp.lower().strip() if bp else "sin clasificar"
-            bp_display = buyer_personas_db.get(bp_lower, bp or "Sin clasificar")
-            
-            if webinar_id not in webinar_groups:
-                webinar_groups[webinar_id] = {
-                    "group_id": webinar_id,
-                    "group_type": "webinar",
-                    "group_name": webinar_name,
-                    "group_date": metadata.get("webinar_date", ""),
-                    "group_time": metadata.get("webinar_time", ""),
-                    "group_link": metadata.get("webinar_link", ""),
-                    "subgroups": {},
-                    "count": 0,
-                    "has_error": False
-                }
-            
-            if bp_lower not in webinar_groups[webinar_id]["subgroups"]:
-                webinar_groups[webinar_id]["subgroups"][bp_lower] = {
-                    "subgroup_id": bp_lower,
-                    "subgroup_name": bp_display,
-                    "emails": [],
-                    "count": 0,
-                    "has_error": not bp or bp_lower == "sin clasificar"
-                }
-            
-            webinar_groups[webinar_id]["subgroups"][bp_lower]["emails"].append({
-                "id": msg.get("id"),
-                "contact_id": msg.get("contact_id"),
-                "contact_name": msg.get("contact_name", ""),
-                "contact_phone": msg.get("contact_phone", ""),
-                "metadata": metadata
+        for b in buckets:
+            info = b["first"]
+            webinar = webinar_groups.setdefault(b["group_id"], {
+                "group_id": b["group_id"],
+                "group_type": "webinar",
+                "group_name": info.get("webinar_name") or "Sin webinar",
+                "group_date": info.get("webinar_date") or "",
+                "group_time": info.get("webinar_time") or "",
+                "group_link": info.get("webinar_link") or "",
+                "subgroups": {},
+                "count": 0,
+                "has_error": False
             })
-            webinar_groups[webinar_id]["subgroups"][bp_lower]["count"] += 1
-            webinar_groups[webinar_id]["count"] += 1
-        
-        # Convert subgroups dict to list
-        for webinar_id, webinar_data in webinar_groups.items():
-            webinar_data["subgroups"] = list(webinar_data["subgroups"].values())
+            subgroup = webinar["subgroups"].setdefault(b["subgroup_id"], {
+                "subgroup_id": b["subgroup_id"],
+                "subgroup_name": buyer_personas_db.get(b["subgroup_id"], info.get("bp") or "Sin clasificar"),
+                "count": 0,
+                "has_error": b["subgroup_id"] == WA_NO_PERSONA
+            })
+            subgroup["count"] += b["count"]
+            webinar["count"] += b["count"]
         
+        for webinar in webinar_groups.values():
+            webinar["subgroups"] = list(webinar["subgroups"].values())
         groups = list(webinar_groups.values())
     
     # ============ W12: COACHEE - Group by Case Stage, then by Case ============
     elif trigger_type == "student_coaching":
-        pending = await db.whatsapp_queue.find(
-            {"rule": "W12", "status": "pending"},
-            {"_id": 0}
-        ).to_list(5000)
-        
-        # Define the two main groups
-        # Group 1: Casos en curso (ganados)
-        # Group 2: Casos cerrados con alumnos activos (concluidos, contenidos_transcritos, reporte_presentado, caso_publicado)
-        
-        casos_en_curso_stages = ["ganados"]
-        casos_cerrados_stages = ["concluidos", "contenidos_transcritos", "reporte_presentado", "caso_publicado"]
-        
-        # Structure: { "en_curso": { case_id: {...} }, "cerrados": { case_id: {...} } }
-        main_groups = {
-            "en_curso": {},
-            "cerrados": {}
-        }
-        
-        for msg in pending:
-            contact_id = msg.get("contact_id")
-            metadata = msg.get("metadata", {})
-            
-            # Find the Stage 4 case where this contact is associated
-            case = await db.cases.find_one({
-                "status": "active",
-                "stage": {"$in": casos_en_curso_stages + casos_cerrados_stages},
-                "contact_ids": contact_id
-            }, {"_id": 0, "id": 1, "name": 1, "company_names": 1, "stage": 1})
-            
-            if not case:
-                continue  # Skip if no valid case found
-            
-            case_id = case.get("id")
-            case_name = case.get("name", "Sin nombre")
-            case_stage = case.get("stage", "")
-            company = case.get("company_names", [""])[0] if case.get("company_names") else ""
-            display_name = f"{case_name}" + (f" ({company})" if company else "")
-            
-            # Determine which main group
-            if case_stage in casos_en_curso_stages:
-                main_group_key = "en_curso"
-            else:
-                main_group_key = "cerrados"
-            
-            # Add to appropriate group (use subgroup_id/subgroup_name for frontend compatibility)
-            if case_id not in main_groups[main_group_key]:
-                main_groups[main_group_key][case_id] = {
-                    "subgroup_id": case_id,
-                    "subgroup_name": display_name,
-                    "case_stage": case_stage,
-                    "emails": [],
-                    "count": 0
-                }
-            
-            main_groups[main_group_key][case_id]["emails"].append({
-                "id": msg.get("id"),
-                "contact_id": contact_id,
-                "contact_name": msg.get("contact_name", ""),
-                "contact_phone": msg.get("contact_phone", ""),
-                "metadata": metadata
-            })
-            main_groups[main_group_key][case_id]["count"] += 1
-        
-        # Build final groups structure with main groups containing subgroups
-        groups = []
-        
-        # Group 1: Casos en curso
-        en_curso_cases = list(main_groups["en_curso"].values())
-        if en_curso_cases:
-            groups.append({
-                "group_id": "casos_en_curso",
-                "group_type": "main_category",
-                "group_name": "Casos en curso",
-                "description": "Estado: Ganados",
-                "subgroups": en_curso_cases,
-                "count": sum(c["count"] for c in en_curso_cases),
-                "has_error": False
-            })
-        
-        # Group 2: Casos cerrados con alumnos activos
-        cerrados_cases = list(main_groups["cerrados"].values())
-        if cerrados_cases:
-            groups.append({
-                "group_id": "casos_cerrados",
-                "group_type": "main_category", 
-                "group_name": "Casos cerrados con alumnos activos",
-                "description": "Estados: Concluidos, Transcritos, Reporte Presentado, Publicado",
-                "subgroups": cerrados_cases,
-                "count": sum(c["count"] for c in cerrados_cases),
-                "has_error": False
-            })
-        
-        has_subgroups = True  # W12 now has subgroups
+        groups = build_case_groups(buckets)
+        has_subgroups = True
     
     # ============ OTHER RULES (W10, W11, W13) ============
     else:
-        pending = await db.whatsapp_queue.find(
-            {"rule": rule_id, "status": "pending"},
-            {"_id": 0}
-        ).to_list(5000)
-        
-        # Group by buyer_persona
         bp_groups = {}
-        for msg in pending:
-            metadata = msg.get("metadata", {})
-            bp = metadata.get("buyer_persona", "Sin clasificar")
-            bp_lower = bp.lower().strip() if bp else "sin clasificar"
-            bp_display = buyer_personas_db.get(bp_lower, bp or "Sin clasificar")
-            
-            if bp_lower not in bp_groups:
-                bp_groups[bp_lower] = {
-                    "group_id": bp_lower,
-                    "group_type": "buyer_persona",
-                    "group_name": bp_display,
-                    "emails": [],
-                    "count": 0,
-                    "has_error": not bp or bp_lower == "sin clasificar"
-                }
-            
-            bp_groups[bp_lower]["emails"].append({
-                "id": msg.get("id"),
-                "contact_id": msg.get("contact_id"),
-                "contact_name": msg.get("contact_name", ""),
-                "contact_phone": msg.get("contact_phone", ""),
-                "metadata": metadata
+        for b in buckets:
+            group = bp_groups.setdefault(b["group_id"], {
+                "group_id": b["group_id"],
+                "group_type": "buyer_persona",
+                "group_name": buyer_personas_db.get(b["group_id"], b["first"]["bp"] or "Sin clasificar"),
+                "count": 0,
+                "has_error": b["group_id"] == WA_NO_PERSONA
             })
-            bp_groups[bp_lower]["count"] += 1
-        
+            group["count"] += b["count"]
         groups = list(bp_groups.values())
     
     return {
@@ -596,6 +497,31 @@ async def get_whatsapp_pending_grouped(
     }
 
 
+@router.get("/rule/{rule_id}/pending-grouped/members")
+async def get_whatsapp_pending_group_members(
+    rule_id: str,
+    group_id: str,
+    subgroup_id: Optional[str] = None,
+    page: int = 1,
+    page_size: int = MEMBERS_DEFAULT_PAGE_SIZE,
+    current_user: dict = Depends(get_current_user)
+):
+    """Paginated pending messages of one group (or subgroup) from pending-grouped"""
+    rule_id = rule_id.upper()
+    
+    rule = await db.whatsapp_rules.find_one({"id": rule_id}, {"_id": 0, "trigger_type": 1})
+    if not rule:
+        raise HTTPException(status_code=404, detail=f"Rule {rule_id} not found")
+    
+    query = await _wa_group_filter(rule_id, rule.get("trigger_type", ""), group_id, subgroup_id)
+    
+    result = await page_members(
+        db.whatsapp_queue, query, WA_MEMBER_PROJECTION,
+        page=page, page_size=page_size, sort=[("created_at", 1), ("id", 1)]
+    )
+    return {"rule_id": rule_id, "group_id": group_id, "subgroup_id": subgroup_id, **result}
+
+
 class GenerateUrlsRequest(BaseModel):
     rule_id: str
     group_key: str
@@ -697,7 +623,7 @@ async def generate_whatsapp_urls(
             {"id": item.get("id")},
             {"$set": {
                 "status": "sent",
-                "sent_at": datetime.now(timezone.utc).isoformat(),
+                "sent_at": utc_now(),
                 "sent_by": current_user.get("email")
             }}
         )
@@ -710,7 +636,7 @@ async def generate_whatsapp_urls(
             "rule": rule_id,
             "message": message,
             "status": "sent",
-            "sent_at": datetime.now(timezone.utc).isoformat(),
+            "sent_at": utc_now(),
             "sent_by": current_user.get("email"),
             "group_key": request.group_key,
             "subgroup_key": request.subgroup_key
@@ -720,8 +646,8 @@ async def generate_whatsapp_urls(
         await db.unified_contacts.update_one(
             {"id": contact_id},
             {"$set": {
-                "last_contacted_whatsapp": datetime.now(timezone.utc).isoformat(),
-                f"last_whatsapp_{rule_id.lower()}_sent": datetime.now(timezone.utc).isoformat()
+                "last_contacted_whatsapp": utc_now(),
+                f"last_whatsapp_{rule_id.lower()}_sent": utc_now()
             }}
         )
         
@@ -999,7 +925,7 @@ async def generate_varied_whatsapp_urls(
             {"id": item.get("id")},
             {"$set": {
                 "status": "sent",
-                "sent_at": datetime.now(timezone.utc).isoformat(),
+                "sent_at": utc_now(),
                 "sent_by": current_user.get("email"),
                 "varied_message": True
             }}
@@ -1014,7 +940,7 @@ async def generate_varied_whatsapp_urls(
             "message": message,
             "varied": True,
             "status": "sent",
-            "sent_at": datetime.now(timezone.utc).isoformat(),
+            "sent_at": utc_now(),
             "sent_by": current_user.get("email"),
             "group_key": request.group_key,
             "subgroup_key": request.subgroup_key
@@ -1024,8 +950,8 @@ async def generate_varied_whatsapp_urls(
         await db.unified_contacts.update_one(
             {"id": contact_id},
             {"$set": {
-                "last_contacted_whatsapp": datetime.now(timezone.utc).isoformat(),
-                f"last_whatsapp_{rule_id.lower()}_sent": datetime.now(timezone.utc).isoformat()
+                "last_contacted_whatsapp": utc_now(),
+                f"last_whatsapp_{rule_id.lower()}_sent": utc_now()
             }}
         )
         
@@ -1144,7 +1070,7 @@ async def get_whatsapp_traffic_light(current_user: dict = Depends(get_current_us
     # Count sent today
     sent_today = await db.whatsapp_logs.count_documents({
         "status": "sent",
-        "sent_at": {"$gte": today_start.isoformat(), "$lte": today_end.isoformat()}
+        **timestamp_query("sent_at", gte=today_start, lte=today_end)
     })
     
     if pending_count == 0:
@@ -1175,537 +1101,334 @@ async def get_all_pending_counts(current_user: dict = Depends(get_current_user))
     return {"counts": counts}
 
 
+# Contact fields read by the generation rules (plus snooze fields, read separately)
+WA_GENERATION_CONTACT_PROJECTION = {
+    "_id": 0, "id": 1, "name": 1, "phone": 1, "email": 1, "buyer_persona": 1, "company": 1, "webinar_history": 1,
+    "stage": 1, "roles": 1, "last_contacted_whatsapp": 1,
+    "last_whatsapp_w10_sent": 1, "last_whatsapp_w11_sent": 1, "last_whatsapp_w14_sent": 1
+}
+
+WA_STUDENT_CASE_STAGES = CASE_STAGES_EN_CURSO + CASE_STAGES_CERRADOS
+
+# Stage 3 and 4 case stages (active cases excluded from post-webinar nurturing)
+WA_ACTIVE_CASE_STAGES = [
+    "caso_solicitado", "caso_presentado", "interes_en_caso",
+    "cierre_administrativo", "ganados"
+]
+
+WA_INTERNAL_EMAIL = re.compile(r"@leaderlix\.com$", re.IGNORECASE)
+WA_NOT_INTERNAL_EMAIL = {"email": {"$not": WA_INTERNAL_EMAIL}}
+
+# Dealmaker rules: case stages (with quotes) and the rule-specific cadence field
+WA_DEALMAKER_RULES = {
+    "dealmaker_propuesta": (["caso_presentado", "interes_en_caso"], "last_whatsapp_w10_sent"),
+    "dealmaker_cierre": (["cierre_administrativo"], "last_whatsapp_w11_sent"),
+}
+
+
+def _wa_contact_entry(c: dict, **metadata) -> dict:
+    return {
+        "contact_id": c.get("id"),
+        "contact_name": c.get("name", ""),
+        "contact_phone": c.get("phone", ""),
+        "email": c.get("email", ""),
+        "metadata": {
+            "buyer_persona": c.get("buyer_persona", ""),
+            "company": c.get("company", ""),
+            **metadata
+        }
+    }
+
+
+def _wa_case_metadata(case: Optional[dict], contact: dict, with_stage: bool = False) -> dict:
+    case = case or {}
+    metadata = {
+        "company": (case.get("company_names") or [""])[0] if case else contact.get("company", ""),
+        "case_name": case.get("name", "")
+    }
+    if with_stage:
+        metadata["case_stage"] = case.get("stage", "")
+    return metadata
+
+
+async def _cleanup_w12_queue(ctx: RuleEvaluationContext):
+    """Remove pending W12 items whose contact is no longer a Stage 4 coachee in a Stage 4 case"""
+    pending_ids = [
+        item.get("contact_id") async for item in db.whatsapp_queue.find(
+            {"rule": "W12", "status": "pending"},
+            {"_id": 0, "contact_id": 1}
+        )
+    ]
+    if not pending_ids:
+        return
+    
+    valid_contact_ids = ctx.contacts_in_cases(WA_STUDENT_CASE_STAGES)
+    candidates = list({cid for cid in pending_ids if cid in valid_contact_ids})
+    
+    # One query for the remaining candidates instead of a find_one per item
+    still_valid = set()
+    if candidates:
+        async for contact in db.unified_contacts.find(
+            {"id": {"$in": candidates}},
+            {"_id": 0, "id": 1, "roles": 1, "stage": 1}
+        ):
+            if "coachee" in (contact.get("roles") or []) and contact.get("stage") == 4:
+                still_valid.add(contact["id"])
+    
+    items_to_remove = [cid for cid in pending_ids if cid not in still_valid]
+    if items_to_remove:
+        await db.whatsapp_queue.delete_many({
+            "rule": "W12",
+            "status": "pending",
+            "contact_id": {"$in": items_to_remove}
+        })
+
+
+def _wa_rule_query(trigger_type: str, ctx: RuleEvaluationContext) -> Optional[Dict[str, Any]]:
+    """MongoDB prefilter for a contact rule; None when nothing can match"""
+    if trigger_type == "alumni_checkin":
+        # Stage 5: Alumni check-in every 90 days
+        return {"stage": 5, **WA_NOT_INTERNAL_EMAIL, **ctx.cadence_query("last_contacted_whatsapp", 90)}
+
+    if trigger_type == "student_coaching":
+        # W12: Coachees (stage 4, not 5) in Stage 4 cases without contact in 8 days
+        contact_ids = ctx.contacts_in_cases(WA_STUDENT_CASE_STAGES)
+        if not contact_ids:
+            return None
+        return {
+            "id": {"$in": sorted(contact_ids)},
+            "roles": "coachee",
+            "stage": 4,
+            **WA_NOT_INTERNAL_EMAIL,
+            **ctx.cadence_query("last_contacted_whatsapp", 8)
+        }
+
+    if trigger_type in WA_DEALMAKER_RULES:
+        # W10: cases with quotes in "caso_presentado" / "interes_en_caso"
+        # W11: cases with quotes in "cierre_administrativo"
+        # Only contact every 15 days (rule-specific field)
+        stages, sent_field = WA_DEALMAKER_RULES[trigger_type]
+        contact_ids = ctx.contacts_in_cases(stages, with_quotes=True)
+        if not contact_ids:
+            return None
+        return {"id": {"$in": sorted(contact_ids)}, **WA_NOT_INTERNAL_EMAIL, **ctx.cadence_query(sent_field, 15)}
+
+    if trigger_type == "nurturing_post_webinar":
+        # W14: Stage 2 contacts with webinar history and phone, every 14 days
+        return {
+            "stage": 2,
+            "phone": {"$exists": True, "$nin": [None, ""]},
+            "webinar_history": {"$exists": True, "$nin": [[], None]},
+            **WA_NOT_INTERNAL_EMAIL,
+            **ctx.cadence_query("last_whatsapp_w14_sent", 14)
+        }
+
+    return None
+
+
+def evaluate_whatsapp_rule(trigger_type: str, c: dict, ctx: RuleEvaluationContext) -> Optional[dict]:
+    """Queue entry for one contact and rule (the full criteria, in memory), or None"""
+    email = c.get("email")
+    if isinstance(email, str) and WA_INTERNAL_EMAIL.search(email):
+        return None
+    stage = c.get("stage")
+
+    if trigger_type == "alumni_checkin":
+        if stage != 5 or not ctx.cadence_ok(c, "last_contacted_whatsapp", 90):
+            return None
+        return _wa_contact_entry(c)
+
+    if trigger_type == "student_coaching":
+        cases = ctx.contact_cases(c.get("id"), WA_STUDENT_CASE_STAGES)
+        if not cases or stage != 4 or not has_any(c.get("roles"), ["coachee"]):
+            return None
+        if not ctx.cadence_ok(c, "last_contacted_whatsapp", 8):
+            return None
+        # Keep the first case if the contact is in several
+        return _wa_contact_entry(c, **_wa_case_metadata(cases[0], c, with_stage=True))
+
+    if trigger_type in WA_DEALMAKER_RULES:
+        stages, sent_field = WA_DEALMAKER_RULES[trigger_type]
+        cases = ctx.contact_cases(c.get("id"), stages, with_quotes=True)
+        if not cases or not ctx.cadence_ok(c, sent_field, 15):
+            return None
+        # Keep the last case if the contact is in several
+        return _wa_contact_entry(c, **_wa_case_metadata(cases[-1], c))
+
+    if trigger_type == "nurturing_post_webinar":
+        if stage != 2 or c.get("phone") in (None, "") or c.get("webinar_history") in (None, []):
+            return None
+        if not ctx.cadence_ok(c, "last_whatsapp_w14_sent", 14):
+            return None
+        # Not associated to active cases in stage 3 or 4
+        if ctx.contact_cases(c.get("id"), WA_ACTIVE_CASE_STAGES):
+            return None
+        # First webinar in their history that has already passed
+        last_webinar = next(
+            (ctx.past_webinars_by_id[wh.get("event_id")] for wh in c.get("webinar_history") or []
+             if isinstance(wh, dict) and wh.get("event_id") in ctx.past_webinars_by_id),
+            None
+        )
+        if last_webinar is None:
+            return None
+        return _wa_contact_entry(
+            c,
+            last_webinar=last_webinar.get("name", ""),
+            last_webinar_date=last_webinar.get("webinar_date", "")
+        )
+
+    return None
+
+
+async def _wa_business_candidates(trigger_type: str, now: datetime) -> List[dict]:
+    """New businesses (small_businesses) for W05 / W06"""
+    if trigger_type == "new_business_first":
+        # New businesses never contacted
+        query = {
+            "contact_count": {"$in": [0, None]},
+            "$or": [
+                {"whatsapp_contacted": {"$ne": True}},
+                {"whatsapp_contacted": {"$exists": False}}
+            ]
+        }
+    else:
+        # Businesses contacted once, 10+ days ago
+        query = {
+            "contact_count": 1,
+            "last_contacted_at": {"$lt": (now - timedelta(days=10)).isoformat()}
+        }
+    businesses = await db.small_businesses.find(query, {"_id": 0}).to_list(500)
+
+    candidates = []
+    for b in businesses:
+        phone = b.get("phone") or b.get("formatted_phone_number")
+        if phone:
+            candidates.append({
+                "contact_id": b.get("id"),
+                "contact_name": b.get("name", ""),
+                "contact_phone": phone,
+                "contact_type": "business",
+                "metadata": {
+                    "business_type": b.get("business_type", "negocio"),
+                    "city": b.get("city", "")
+                }
+            })
+    return candidates
+
+
+async def _wa_rule_candidates(rules: List[dict], ctx: RuleEvaluationContext) -> Dict[str, List[dict]]:
+    """
+    Contacts (or businesses) each rule would queue today, before queue/snooze
+    checks, keyed by rule id. The contact rules share one streamed scan of
+    unified_contacts (the $or of their prefilters), like the email rules.
+    """
+    results: Dict[str, List[dict]] = {rule["id"]: [] for rule in rules}
+    queries = {}
+    for rule in rules:
+        trigger_type = rule.get("trigger_type")
+        if trigger_type in WA_NEW_BUSINESS_TRIGGERS:
+            results[rule["id"]] = await _wa_business_candidates(trigger_type, ctx.now)
+            continue
+        query = _wa_rule_query(trigger_type, ctx)
+        if query is not None:
+            queries[rule["id"]] = (trigger_type, query)
+    if not queries:
+        return results
+
+    prefilters = [query for _, query in queries.values()]
+    query = prefilters[0] if len(prefilters) == 1 else {"$or": prefilters}
+    async for c in iter_contacts(query, WA_GENERATION_CONTACT_PROJECTION):
+        for rule_id, (trigger_type, _) in queries.items():
+            entry = evaluate_whatsapp_rule(trigger_type, c, ctx)
+            if entry:
+                results[rule_id].append(entry)
+    return results
+
+
+def _wa_is_snoozed(snoozed_until, now: datetime) -> bool:
+    if not snoozed_until:
+        return False
+    try:
+        return datetime.fromisoformat(snoozed_until.replace('Z', '+00:00')) > now
+    except (AttributeError, TypeError, ValueError):
+        return False
+
+
 @router.post("/generate-queue")
 async def generate_whatsapp_queue(current_user: dict = Depends(get_current_user)):
     """
     Generate WhatsApp queue based on current contacts and rules.
     This populates the whatsapp_queue collection with pending messages.
+    
+    Cases, webinars and quotes are loaded once into a RuleEvaluationContext
+    shared by every rule, the contact rules share one scan of
+    unified_contacts, and queue and snooze checks are batched per rule.
     """
     now = datetime.now(timezone.utc)
     today = now.date()
+    today_str = today.isoformat()
     generated_count = 0
     
     # Get all enabled rules
     rules = await db.whatsapp_rules.find({"enabled": True}, {"_id": 0}).to_list(100)
+    ctx = await RuleEvaluationContext.load(now)
+    
+    # ============ CLEANUP W12: Always run cleanup regardless of generation date ============
+    if any(rule.get("trigger_type") == "student_coaching" for rule in rules):
+        await _cleanup_w12_queue(ctx)
+    
+    # Skip generation for rules already generated today
+    generated_today = set(await db.whatsapp_queue.distinct(
+        "rule", {"rule": {"$in": [rule.get("id") for rule in rules]}, "generated_date": today_str}
+    ))
+    rules = [rule for rule in rules if rule.get("id") not in generated_today]
+    
+    # ============ GENERATE BASED ON TRIGGER TYPE ============
+    candidates = await _wa_rule_candidates(rules, ctx)
     
     for rule in rules:
         rule_id = rule.get("id")
-        trigger_type = rule.get("trigger_type")
         
-        # ============ CLEANUP W12: Always run cleanup regardless of generation date ============
-        if trigger_type == "student_coaching":
-            stage_4_case_stages = ["ganados", "concluidos", "contenidos_transcritos", "reporte_presentado", "caso_publicado"]
-            
-            existing_w12_items = await db.whatsapp_queue.find(
-                {"rule": "W12", "status": "pending"},
-                {"_id": 0, "contact_id": 1}
-            ).to_list(5000)
-            
-            if existing_w12_items:
-                # Get all Stage 4 cases
-                valid_cases = await db.cases.find({
-                    "status": "active",
-                    "stage": {"$in": stage_4_case_stages},
-                    "contact_ids": {"$exists": True, "$ne": []}
-                }, {"_id": 0, "contact_ids": 1}).to_list(1000)
-                
-                valid_contact_ids = set()
-                for case in valid_cases:
-                    for cid in case.get("contact_ids", []):
-                        valid_contact_ids.add(cid)
-                
-                items_to_remove = []
-                for item in existing_w12_items:
-                    contact_id = item.get("contact_id")
-                    
-                    # Check if contact still meets criteria
-                    if contact_id not in valid_contact_ids:
-                        items_to_remove.append(contact_id)
-                        continue
-                    
-                    # Check if contact still has role coachee and is in stage 4
-                    contact = await db.unified_contacts.find_one(
-                        {"id": contact_id},
-                        {"_id": 0, "roles": 1, "stage": 1}
-                    )
-                    
-                    if not contact:
-                        items_to_remove.append(contact_id)
-                        continue
-                    
-                    has_coachee = "coachee" in (contact.get("roles") or [])
-                    is_stage_4 = contact.get("stage") == 4
-                    
-                    if not has_coachee or not is_stage_4:
-                        items_to_remove.append(contact_id)
-                
-                # Remove invalid items
-                if items_to_remove:
-                    await db.whatsapp_queue.delete_many({
-                        "rule": "W12",
-                        "status": "pending",
-                        "contact_id": {"$in": items_to_remove}
-                    })
-        
-        # Skip generation if already generated today for this rule
-        existing_today = await db.whatsapp_queue.count_documents({
-            "rule": rule_id,
-            "generated_date": today.isoformat()
-        })
-        
-        if existing_today > 0:
+        contacts_to_add = [
+            contact for contact in candidates[rule_id]
+            # FILTER: Skip @leaderlix.com emails
+            if not (contact.get("email") or "").lower().endswith('@leaderlix.com')
+        ]
+        if not contacts_to_add:
             continue
         
-        contacts_to_add = []
+        candidate_ids = list({contact["contact_id"] for contact in contacts_to_add})
         
-        # ============ GENERATE BASED ON TRIGGER TYPE ============
-        
-        if trigger_type == "alumni_checkin":
-            # Stage 5: Alumni check-in every 90 days
-            ninety_days_ago = (now - timedelta(days=90)).isoformat()
-            contacts = await db.unified_contacts.find({
-                "stage": 5,
-                "email": {"$not": {"$regex": "@leaderlix\\.com$", "$options": "i"}},
-                "$or": [
-                    {"last_contacted_whatsapp": {"$lt": ninety_days_ago}},
-                    {"last_contacted_whatsapp": {"$exists": False}},
-                    {"last_contacted_whatsapp": None}
-                ]
-            }, {"_id": 0}).to_list(1000)
-            
-            for c in contacts:
-                contacts_to_add.append({
-                    "contact_id": c.get("id"),
-                    "contact_name": c.get("name", ""),
-                    "contact_phone": c.get("phone", ""),
-                    "email": c.get("email", ""),
-                    "metadata": {
-                        "buyer_persona": c.get("buyer_persona", ""),
-                        "company": c.get("company", "")
-                    }
-                })
-        
-        elif trigger_type == "student_coaching":
-            # W12: Coachees in Stage 4 cases without contact in 8 days
-            # Cleanup is done above, before the "existing_today" check
-            eight_days_ago = (now - timedelta(days=8)).isoformat()
-            
-            stage_4_case_stages = ["ganados", "concluidos", "contenidos_transcritos", "reporte_presentado", "caso_publicado"]
-            
-            # Get all cases in Stage 4
-            cases = await db.cases.find({
-                "status": "active",
-                "stage": {"$in": stage_4_case_stages},
-                "contact_ids": {"$exists": True, "$ne": []}
-            }, {"_id": 0, "contact_ids": 1, "name": 1, "company_names": 1, "stage": 1}).to_list(1000)
-            
-            # Collect contact IDs from these cases
-            contact_ids_in_stage4 = set()
-            case_info = {}
-            for case in cases:
-                for contact_id in case.get("contact_ids", []):
-                    contact_ids_in_stage4.add(contact_id)
-                    # Store case info (keep the one with earliest stage if multiple)
-                    if contact_id not in case_info:
-                        case_info[contact_id] = {
-                            "case_name": case.get("name", ""),
-                            "case_stage": case.get("stage", ""),
-                            "company": case.get("company_names", [""])[0] if case.get("company_names") else ""
-                        }
-            
-            if contact_ids_in_stage4:
-                # Get contacts with role "coachee", stage 4 (exclude stage 5), not contacted in 8 days
-                contacts = await db.unified_contacts.find({
-                    "id": {"$in": list(contact_ids_in_stage4)},
-                    "roles": "coachee",
-                    "stage": 4,  # Only contact stage 4, exclude stage 5
-                    "email": {"$not": {"$regex": "@leaderlix\\.com$", "$options": "i"}},
-                    "$or": [
-                        {"last_contacted_whatsapp": {"$lt": eight_days_ago}},
-                        {"last_contacted_whatsapp": {"$exists": False}},
-                        {"last_contacted_whatsapp": None}
-                    ]
-                }, {"_id": 0}).to_list(1000)
-                
-                for c in contacts:
-                    contact_id = c.get("id")
-                    info = case_info.get(contact_id, {})
-                    contacts_to_add.append({
-                        "contact_id": contact_id,
-                        "contact_name": c.get("name", ""),
-                        "contact_phone": c.get("phone", ""),
-                        "email": c.get("email", ""),
-                        "metadata": {
-                            "buyer_persona": c.get("buyer_persona", ""),
-                            "company": info.get("company", c.get("company", "")),
-                            "case_name": info.get("case_name", ""),
-                            "case_stage": info.get("case_stage", "")
-                        }
-                    })
-        
-        elif trigger_type == "dealmaker_propuesta":
-            # W10: Contacts in cases with quotes, stage "caso_presentado" or "interes_en_caso"
-            # Only contact every 15 days
-            fifteen_days_ago = (now - timedelta(days=15)).isoformat()
-            
-            # Get active cases with quotes in the target stages
-            cases = await db.cases.find({
-                "status": "active",
-                "stage": {"$in": ["caso_presentado", "interes_en_caso"]},
-                "quotes": {"$exists": True, "$ne": []},
-                "contact_ids": {"$exists": True, "$ne": []}
-            }, {"_id": 0, "contact_ids": 1, "name": 1, "company_names": 1}).to_list(1000)
-            
-            # Collect all contact IDs from these cases
-            contact_ids_with_quotes = set()
-            case_info = {}  # Store case info for metadata
-            for case in cases:
-                for contact_id in case.get("contact_ids", []):
-                    contact_ids_with_quotes.add(contact_id)
-                    case_info[contact_id] = {
-                        "case_name": case.get("name", ""),
-                        "company": case.get("company_names", [""])[0] if case.get("company_names") else ""
-                    }
-            
-            if contact_ids_with_quotes:
-                # Get contacts that haven't been contacted in 15 days
-                # Using the rule-specific field: last_whatsapp_w10_sent
-                contacts = await db.unified_contacts.find({
-                    "id": {"$in": list(contact_ids_with_quotes)},
-                    "email": {"$not": {"$regex": "@leaderlix\\.com$", "$options": "i"}},
-                    "$or": [
-                        {"last_whatsapp_w10_sent": {"$lt": fifteen_days_ago}},
-                        {"last_whatsapp_w10_sent": {"$exists": False}},
-                        {"last_whatsapp_w10_sent": None}
-                    ]
-                }, {"_id": 0}).to_list(1000)
-                
-                for c in contacts:
-                    contact_id = c.get("id")
-                    info = case_info.get(contact_id, {})
-                    contacts_to_add.append({
-                        "contact_id": contact_id,
-                        "contact_name": c.get("name", ""),
-                        "contact_phone": c.get("phone", ""),
-                        "email": c.get("email", ""),
-                        "metadata": {
-                            "buyer_persona": c.get("buyer_persona", ""),
-                            "company": info.get("company", c.get("company", "")),
-                            "case_name": info.get("case_name", "")
-                        }
-                    })
-        
-        elif trigger_type == "dealmaker_cierre":
-            # W11: Contacts in cases with quotes, stage "cierre_administrativo"
-            # Only contact every 15 days
-            fifteen_days_ago = (now - timedelta(days=15)).isoformat()
-            
-            # Get active cases with quotes in cierre_administrativo stage
-            cases = await db.cases.find({
-                "status": "active",
-                "stage": "cierre_administrativo",
-                "quotes": {"$exists": True, "$ne": []},
-                "contact_ids": {"$exists": True, "$ne": []}
-            }, {"_id": 0, "contact_ids": 1, "name": 1, "company_names": 1}).to_list(1000)
-            
-            # Collect all contact IDs from these cases
-            contact_ids_with_quotes = set()
-            case_info = {}  # Store case info for metadata
-            for case in cases:
-                for contact_id in case.get("contact_ids", []):
-                    contact_ids_with_quotes.add(contact_id)
-                    case_info[contact_id] = {
-                        "case_name": case.get("name", ""),
-                        "company": case.get("company_names", [""])[0] if case.get("company_names") else ""
-                    }
-            
-            if contact_ids_with_quotes:
-                # Get contacts that haven't been contacted in 15 days
-                # Using the rule-specific field: last_whatsapp_w11_sent
-                contacts = await db.unified_contacts.find({
-                    "id": {"$in": list(contact_ids_with_quotes)},
-                    "email": {"$not": {"$regex": "@leaderlix\\.com$", "$options": "i"}},
-                    "$or": [
-                        {"last_whatsapp_w11_sent": {"$lt": fifteen_days_ago}},
-                        {"last_whatsapp_w11_sent": {"$exists": False}},
-                        {"last_whatsapp_w11_sent": None}
-                    ]
-                }, {"_id": 0}).to_list(1000)
-                
-                for c in contacts:
-                    contact_id = c.get("id")
-                    info = case_info.get(contact_id, {})
-                    contacts_to_add.append({
-                        "contact_id": contact_id,
-                        "contact_name": c.get("name", ""),
-                        "contact_phone": c.get("phone", ""),
-                        "email": c.get("email", ""),
-                        "metadata": {
-                            "buyer_persona": c.get("buyer_persona", ""),
-                            "company": info.get("company", c.get("company", "")),
-                            "case_name": info.get("case_name", "")
-                        }
-                    })
-        
-        elif trigger_type == "nurturing_post_webinar":
-            # W14: Stage 2 contacts with webinar history, webinar already passed,
-            # not associated to active cases in stage 3 or 4, with phone
-            # Recurrence: every 14 days
-            fourteen_days_ago = (now - timedelta(days=14)).isoformat()
-            today_str_date = today.strftime("%Y-%m-%d")
-            
-            # Stage 3 and 4 case stages (active cases to exclude)
-            active_case_stages = [
-                "caso_solicitado", "caso_presentado", "interes_en_caso", 
-                "cierre_administrativo", "ganados"
-            ]
-            
-            # Get all contact IDs that are in active cases (stage 3 or 4)
-            active_cases = await db.cases.find({
-                "status": "active",
-                "stage": {"$in": active_case_stages},
-                "contact_ids": {"$exists": True, "$ne": []}
-            }, {"_id": 0, "contact_ids": 1}).to_list(10000)
-            
-            contacts_in_active_cases = set()
-            for case in active_cases:
-                for cid in case.get("contact_ids", []):
-                    contacts_in_active_cases.add(cid)
-            
-            # Get webinars that have already passed
-            past_webinars = await db.webinar_events_v2.find({
-                "webinar_date": {"$lt": today_str_date}
-            }, {"_id": 0, "id": 1, "name": 1, "webinar_date": 1}).to_list(1000)
-            
-            past_webinar_ids = {w["id"] for w in past_webinars}
-            past_webinar_info = {w["id"]: {"name": w.get("name", ""), "date": w.get("webinar_date", "")} for w in past_webinars}
-            
-            # Get stage 2 contacts with phone and webinar_history
-            contacts = await db.unified_contacts.find({
-                "stage": 2,
-                "phone": {"$exists": True, "$nin": [None, ""]},
-                "webinar_history": {"$exists": True, "$nin": [[], None]},
-                "email": {"$not": {"$regex": "@leaderlix\\.com$", "$options": "i"}},
+        # Already in queue (pending) or already SENT today
+        skip_ids = {
+            item.get("contact_id") async for item in db.whatsapp_queue.find({
+                "rule": rule_id,
+                "contact_id": {"$in": candidate_ids},
                 "$or": [
-                    {"last_whatsapp_w14_sent": {"$lt": fourteen_days_ago}},
-                    {"last_whatsapp_w14_sent": {"$exists": False}},
-                    {"last_whatsapp_w14_sent": None}
+                    {"status": "pending"},
+                    {"status": "sent", "generated_date": today_str}
                 ]
-            }, {"_id": 0}).to_list(5000)
-            
-            for c in contacts:
-                contact_id = c.get("id")
-                
-                # Skip if contact is in an active case
-                if contact_id in contacts_in_active_cases:
-                    continue
-                
-                # Check if any webinar in their history has already passed
-                webinar_history = c.get("webinar_history", [])
-                has_past_webinar = False
-                last_webinar_info = None
-                
-                for wh in webinar_history:
-                    event_id = wh.get("event_id")
-                    if event_id in past_webinar_ids:
-                        has_past_webinar = True
-                        last_webinar_info = past_webinar_info.get(event_id, {})
-                        break
-                
-                if not has_past_webinar:
-                    continue
-                
-                contacts_to_add.append({
-                    "contact_id": contact_id,
-                    "contact_name": c.get("name", ""),
-                    "contact_phone": c.get("phone", ""),
-                    "email": c.get("email", ""),
-                    "metadata": {
-                        "buyer_persona": c.get("buyer_persona", ""),
-                        "company": c.get("company", ""),
-                        "last_webinar": last_webinar_info.get("name", "") if last_webinar_info else "",
-                        "last_webinar_date": last_webinar_info.get("date", "") if last_webinar_info else ""
-                    }
-                })
+            }, {"_id": 0, "contact_id": 1})
+        }
         
-        elif trigger_type == "new_business_first":
-            # New businesses never contacted
-            businesses = await db.small_businesses.find({
-                "contact_count": {"$in": [0, None]},
-                "$or": [
-                    {"whatsapp_contacted": {"$ne": True}},
-                    {"whatsapp_contacted": {"$exists": False}}
-                ]
-            }, {"_id": 0}).to_list(500)
-            
-            for b in businesses:
-                phone = b.get("phone") or b.get("formatted_phone_number")
-                if phone:
-                    contacts_to_add.append({
-                        "contact_id": b.get("id"),
-                        "contact_name": b.get("name", ""),
-                        "contact_phone": phone,
-                        "contact_type": "business",
-                        "metadata": {
-                            "business_type": b.get("business_type", "negocio"),
-                            "city": b.get("city", "")
-                        }
-                    })
-        
-        elif trigger_type == "new_business_followup":
-            # Businesses contacted once, 10+ days ago
-            ten_days_ago = (now - timedelta(days=10)).isoformat()
-            businesses = await db.small_businesses.find({
-                "contact_count": 1,
-                "last_contacted_at": {"$lt": ten_days_ago}
-            }, {"_id": 0}).to_list(500)
-            
-            for b in businesses:
-                phone = b.get("phone") or b.get("formatted_phone_number")
-                if phone:
-                    contacts_to_add.append({
-                        "contact_id": b.get("id"),
-                        "contact_name": b.get("name", ""),
-                        "contact_phone": phone,
-                        "contact_type": "business",
-                        "metadata": {
-                            "business_type": b.get("business_type", "negocio"),
-                            "city": b.get("city", "")
-                        }
-                    })
-        
-        elif trigger_type == "nurturing_post_webinar":
-            # W14: Stage 2 contacts with webinar history, webinar already passed,
-            # not associated to active cases in stage 3 or 4, with phone
-            # Recurrence: every 14 days
-            fourteen_days_ago = (now - timedelta(days=14)).isoformat()
-            today_str_date = today.strftime("%Y-%m-%d")
-            
-            # Stage 3 and 4 case stages (active cases to exclude)
-            active_case_stages = [
-                "caso_solicitado", "caso_presentado", "interes_en_caso", 
-                "cierre_administrativo", "ganados"
-            ]
-            
-            # Get all contact IDs that are in active cases (stage 3 or 4)
-            active_cases = await db.cases.find({
-                "status": "active",
-                "stage": {"$in": active_case_stages},
-                "contact_ids": {"$exists": True, "$ne": []}
-            }, {"_id": 0, "contact_ids": 1}).to_list(10000)
-            
-            contacts_in_active_cases = set()
-            for case in active_cases:
-                for cid in case.get("contact_ids", []):
-                    contacts_in_active_cases.add(cid)
-            
-            # Get webinars that have already passed
-            past_webinars = await db.webinar_events_v2.find({
-                "webinar_date": {"$lt": today_str_date}
-            }, {"_id": 0, "id": 1, "name": 1, "webinar_date": 1}).to_list(1000)
-            
-            past_webinar_ids = {w["id"] for w in past_webinars}
-            past_webinar_info = {w["id"]: {"name": w.get("name", ""), "date": w.get("webinar_date", "")} for w in past_webinars}
-            
-            # Get stage 2 contacts with phone and webinar_history
-            contacts = await db.unified_contacts.find({
-                "stage": 2,
-                "phone": {"$exists": True, "$nin": [None, ""]},
-                "webinar_history": {"$exists": True, "$nin": [[], None]},
-                "email": {"$not": {"$regex": "@leaderlix\\.com$", "$options": "i"}},
-                "$or": [
-                    {"last_whatsapp_w14_sent": {"$lt": fourteen_days_ago}},
-                    {"last_whatsapp_w14_sent": {"$exists": False}},
-                    {"last_whatsapp_w14_sent": None}
-                ]
-            }, {"_id": 0}).to_list(5000)
-            
-            for c in contacts:
-                contact_id = c.get("id")
-                
-                # Skip if contact is in an active case
-                if contact_id in contacts_in_active_cases:
-                    continue
-                
-                # Check if any webinar in their history has already passed
-                webinar_history = c.get("webinar_history", [])
-                has_past_webinar = False
-                last_webinar_info = None
-                
-                for wh in webinar_history:
-                    event_id = wh.get("event_id")
-                    if event_id in past_webinar_ids:
-                        has_past_webinar = True
-                        last_webinar_info = past_webinar_info.get(event_id, {})
-                        break
-                
-                if not has_past_webinar:
-                    continue
-                
-                contacts_to_add.append({
-                    "contact_id": contact_id,
-                    "contact_name": c.get("name", ""),
-                    "contact_phone": c.get("phone", ""),
-                    "email": c.get("email", ""),
-                    "metadata": {
-                        "buyer_persona": c.get("buyer_persona", ""),
-                        "company": c.get("company", ""),
-                        "last_webinar": last_webinar_info.get("name", "") if last_webinar_info else "",
-                        "last_webinar_date": last_webinar_info.get("date", "") if last_webinar_info else ""
-                    }
-                })
+        # Snooze field
+        snooze_field = f"whatsapp_snoozed_{rule_id.lower()}"
+        snoozed_ids = {
+            doc.get("id") async for doc in db.unified_contacts.find(
+                {"id": {"$in": candidate_ids}, snooze_field: {"$exists": True, "$nin": [None, ""]}},
+                {"_id": 0, "id": 1, snooze_field: 1}
+            )
+            if _wa_is_snoozed(doc.get(snooze_field), now)
+        }
         
-        # Add contacts to queue
-        today_str = today.isoformat()
+        queue_items = []
         for contact in contacts_to_add:
-            # FILTER: Skip @leaderlix.com emails
-            contact_email = contact.get("email") or ""
-            contact_email = contact_email.lower() if contact_email else ""
-            if contact_email.endswith('@leaderlix.com'):
-                continue
-            
             contact_id = contact["contact_id"]
-            
-            # Check if already in queue (pending)
-            existing = await db.whatsapp_queue.find_one({
-                "rule": rule_id,
-                "contact_id": contact_id,
-                "status": "pending"
-            })
-            
-            if existing:
-                continue
-            
-            # Check if already SENT today
-            already_sent = await db.whatsapp_queue.find_one({
-                "rule": rule_id,
-                "contact_id": contact_id,
-                "status": "sent",
-                "generated_date": today_str
-            })
-            
-            if already_sent:
+            if contact_id in skip_ids or contact_id in snoozed_ids:
                 continue
+            skip_ids.add(contact_id)
             
-            # Check snooze field
-            snooze_field = f"whatsapp_snoozed_{rule_id.lower()}"
-            contact_doc = await db.unified_contacts.find_one(
-                {"id": contact_id},
-                {"_id": 0, snooze_field: 1}
-            )
-            if contact_doc:
-                snoozed_until = contact_doc.get(snooze_field)
-                if snoozed_until:
-                    try:
-                        snooze_dt = datetime.fromisoformat(snoozed_until.replace('Z', '+00:00'))
-                        if snooze_dt > now:
-                            # Still snoozed, skip
-                            continue
-                    except:
-                        pass
-            
-            # Add to queue
-            await db.whatsapp_queue.insert_one({
+            queue_items.append({
                 "id": str(uuid.uuid4()),
                 "rule": rule_id,
                 "contact_id": contact_id,
@@ -1715,9 +1438,12 @@ async def generate_whatsapp_queue(current_user: dict = Depends(get_current_user)
                 "status": "pending",
                 "metadata": contact.get("metadata", {}),
                 "generated_date": today_str,
-                "created_at": now.isoformat()
+                "created_at": now
             })
-            generated_count += 1
+        
+        if queue_items:
+            await db.whatsapp_queue.insert_many(queue_items)
+            generated_count += len(queue_items)
     
     # Get cleanup stats for W12
     w12_pending = await db.whatsapp_queue.count_documents({"rule": "W12", "status": "pending"})
@@ -1895,7 +1621,7 @@ async def generate_calendar_queue(current_user: dict = Depends(get_current_user)
                     if last_contacted:
                         # Check if contacted within last 6 days - skip if too recent
                         try:
-                            last_contacted_dt = datetime.fromisoformat(last_contacted.replace('Z', '+00:00'))
+                            last_contacted_dt = parse_timestamp(last_contacted)
                             days_since_contact = (now - last_contacted_dt).days
                             if days_since_contact < 6:
                                 # Skip - contacted too recently for W04 followup
@@ -1998,7 +1724,7 @@ async def generate_calendar_queue(current_user: dict = Depends(get_current_user)
                     "days_until": data["days_until"]
                 },
                 "generated_date": today.isoformat(),
-                "created_at": now.isoformat()
+                "created_at": now
             })
             generated_count += 1
         
@@ -2169,7 +1895,7 @@ async def generate_webinar_queue(current_user: dict = Depends(get_current_user))
                     "days_until": days_until
                 },
                 "generated_date": today.isoformat(),
-                "created_at": now.isoformat()
+                "created_at": now
             })
             generated_count += 1
     
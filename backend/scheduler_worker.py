@@ -25,9 +25,19 @@ FREQUENCY_DAYS = {
     "annual": 365
 }
 
+# Event-driven workers: fallback poll when no wakeup arrives (seconds)
+LINKEDIN_FALLBACK_POLL_SECONDS = 120
+RECLASSIFICATION_FALLBACK_POLL_SECONDS = 300
+LINKEDIN_MAINTENANCE_INTERVAL_MINUTES = 5
+
 # Global scheduler instance
 scheduler = AsyncIOScheduler()
 
+# Long-running worker loop tasks (name -> asyncio.Task)
+worker_tasks = {}
+
+_linkedin_indexes_ready = False
+
 
 async def execute_business_unit_search(schedule: dict):
     """Execute a business unit search (1.1.1 Molecules)"""
@@ -523,7 +533,52 @@ async def refresh_merge_candidates_cache_job():
         logger.error(f"Error refreshing merge candidates cache: {e}")
 
 
-async def process_linkedin_import_jobs():
+async def refresh_contact_candidates_cache_job():
+    """Rebuild the contact duplicate candidates cache from all active contacts"""
+    from services.contact_dedup import refresh_contact_candidates_cache
+    
+    result = await refresh_contact_candidates_cache()
+    if result.get("success"):
+        logger.info(f"Contact duplicate candidates refreshed: {result.get('groups', 0)} groups")
+    else:
+        logger.error(f"Contact duplicate candidates refresh failed: {result.get('error')}")
+
+
+async def migrate_hot_timestamps_job():
+    """Convert hot timestamp fields written as ISO strings since the last run to BSON dates"""
+    from services.timestamp_migration import migrate_hot_timestamps
+    
+    try:
+        result = await migrate_hot_timestamps()
+        logger.info(f"Timestamp migration: {result['converted']} converted, {result['unparseable']} unparseable")
+    except Exception as e:
+        logger.error(f"Error migrating hot timestamps: {e}")
+
+
+async def linkedin_import_maintenance():
+    """
+    LinkedIn import housekeeping: index creation and orphaned job recovery.
+
+    Runs once at startup and then every LINKEDIN_MAINTENANCE_INTERVAL_MINUTES,
+    instead of on every worker poll. Orphans are only detectable after
+    ORPHAN_TIMEOUT (5 min) of missing heartbeats, so a 5-minute cadence
+    does not delay recovery in practice.
+    """
+    from linkedin_import_worker import recover_orphaned_jobs, ensure_indexes
+    
+    global _linkedin_indexes_ready
+    
+    try:
+        if not _linkedin_indexes_ready:
+            await ensure_indexes()
+            _linkedin_indexes_ready = True
+        
+        await recover_orphaned_jobs()
+    except Exception as e:
+        logger.error(f"LinkedIn import maintenance error: {e}")
+
+
+async def process_linkedin_import_jobs() -> bool:
     """
     Process LinkedIn import jobs - V2 robust worker.
     
@@ -531,23 +586,18 @@ async def process_linkedin_import_jobs():
     - Streaming file processing (not loading all in memory)
     - Bulk database operations
     - Heartbeat for liveness detection
-    - Orphaned job recovery
+    - Orphaned job recovery (see linkedin_import_maintenance)
     - Automatic retries
     - Profile locking to prevent concurrent imports
     
-    Called every 10 seconds to check for pending jobs.
+    Called by the LinkedIn worker loop whenever a job is enqueued
+    (change stream / in-process notify) or on the fallback poll.
+    
+    Returns True if a job was processed.
     """
-    from linkedin_import_worker import (
-        find_next_job, process_job, recover_orphaned_jobs, ensure_indexes, WORKER_ID
-    )
+    from linkedin_import_worker import find_next_job, process_job
     
     try:
-        # Ensure indexes exist (idempotent - safe to call multiple times)
-        await ensure_indexes()
-        
-        # First, recover any orphaned jobs
-        await recover_orphaned_jobs()
-        
         # Find and process next job
         job = await find_next_job()
         
@@ -555,11 +605,47 @@ async def process_linkedin_import_jobs():
             logger.info(f"LinkedIn Import Worker: Processing job {job['job_id']}")
             await process_job(job)
             logger.info(f"LinkedIn Import Worker: Completed job {job['job_id']}")
+            return True
         
     except Exception as e:
         logger.error(f"LinkedIn Import Worker error: {e}")
         import traceback
         logger.error(traceback.format_exc())
+    
+    return False
+
+
+def start_worker_loops():
+    """Start the event-driven job worker loops (LinkedIn import, reclassification)"""
+    from services.job_wakeup import (
+        run_worker_loop, CHANNEL_LINKEDIN_IMPORT, CHANNEL_RECLASSIFICATION
+    )
+    from services.persona_reclassification_worker import process_reclassification_jobs
+    
+    loops = {
+        "linkedin_import_worker": (
+            CHANNEL_LINKEDIN_IMPORT, process_linkedin_import_jobs, LINKEDIN_FALLBACK_POLL_SECONDS
+        ),
+        "persona_reclassification_worker": (
+            CHANNEL_RECLASSIFICATION, process_reclassification_jobs, RECLASSIFICATION_FALLBACK_POLL_SECONDS
+        ),
+    }
+    
+    for name, (channel, handler, fallback) in loops.items():
+        task = worker_tasks.get(name)
+        if task and not task.done():
+            continue
+        worker_tasks[name] = asyncio.create_task(
+            run_worker_loop(channel, handler, fallback_interval=fallback)
+        )
+        logger.info(f"Started worker loop {name} (fallback poll every {fallback}s)")
+
+
+def stop_worker_loops():
+    """Cancel the job worker loops"""
+    for task in worker_tasks.values():
+        task.cancel()
+    worker_tasks.clear()
 
 
 def start_scheduler():
@@ -615,27 +701,109 @@ def start_scheduler():
         replace_existing=True
     )
     
-    # Add LinkedIn Import Worker - runs every 10 seconds to process pending imports
+    # Contact duplicate candidates - full build on first run, then contacts changed since the watermark
+    from services.contact_dedup import sync_contact_candidates_job
+    from config import CONTACT_DEDUP_INTERVAL_MINUTES
     scheduler.add_job(
-        process_linkedin_import_jobs,
-        trigger=IntervalTrigger(seconds=10),
-        id="linkedin_import_worker",
-        name="LinkedIn Import Worker V2",
+        sync_contact_candidates_job,
+        trigger=IntervalTrigger(minutes=CONTACT_DEDUP_INTERVAL_MINUTES),
+        id="contact_duplicate_candidates",
+        name="Contact duplicate candidates incremental update",
         replace_existing=True,
-        max_instances=1  # Ensure only one instance runs at a time
+        max_instances=1
     )
     
-    # Add Persona Reclassification Worker - runs every 30 seconds
-    from services.persona_reclassification_worker import process_reclassification_jobs
+    # Rebuild contact duplicate candidates nightly (catches hard deletes and key drift)
+    scheduler.add_job(
+        refresh_contact_candidates_cache_job,
+        trigger=CronTrigger(hour=3, minute=30),
+        id="refresh_contact_candidates_cache",
+        name="Refresh contact duplicate candidates daily",
+        replace_existing=True
+    )
+    
+    # Dashboard stat counters - recomputed from the collections (catches writers that don't maintain them)
+    from services.stats_counters import reconcile_counters_job
+    from config import STATS_RECONCILE_INTERVAL_MINUTES
+    scheduler.add_job(
+        reconcile_counters_job,
+        trigger=IntervalTrigger(minutes=STATS_RECONCILE_INTERVAL_MINUTES),
+        id="reconcile_stat_counters",
+        name="Reconcile dashboard stat counters",
+        replace_existing=True,
+        max_instances=1
+    )
+    
+    # Contact -> company keys: contacts changed since the watermark, full re-key nightly
+    from services.company_association import sync_company_keys_job
+    from config import COMPANY_KEYS_SYNC_INTERVAL_MINUTES
     scheduler.add_job(
-        process_reclassification_jobs,
-        trigger=IntervalTrigger(seconds=30),
-        id="persona_reclassification_worker",
-        name="Persona Reclassification Worker",
+        sync_company_keys_job,
+        trigger=IntervalTrigger(minutes=COMPANY_KEYS_SYNC_INTERVAL_MINUTES),
+        id="sync_company_keys",
+        name="Contact company keys incremental update",
+        replace_existing=True,
+        max_instances=1
+    )
+    scheduler.add_job(
+        sync_company_keys_job,
+        trigger=CronTrigger(hour=4, minute=30),
+        kwargs={"full": True},
+        id="rebuild_company_keys",
+        name="Rebuild contact company keys daily",
+        replace_existing=True,
+        max_instances=1
+    )
+    
+    # Background export files past their retention
+    from services.exports import cleanup_export_files_job
+    scheduler.add_job(
+        cleanup_export_files_job,
+        trigger=IntervalTrigger(hours=1),
+        id="cleanup_export_files",
+        name="Remove expired export files",
         replace_existing=True,
         max_instances=1
     )
     
+    # Hot timestamp fields: ISO strings -> BSON dates, plus queue/log TTL indexes
+    scheduler.add_job(
+        migrate_hot_timestamps_job,
+        trigger=CronTrigger(hour=4, minute=0),
+        id="migrate_hot_timestamps",
+        name="Migrate hot timestamp fields to BSON dates",
+        replace_existing=True,
+        max_instances=1
+    )
+    
+    # LinkedIn import maintenance (indexes + orphan recovery) - at startup, then every 5 minutes
+    scheduler.add_job(
+        linkedin_import_maintenance,
+        trigger=IntervalTrigger(minutes=LINKEDIN_MAINTENANCE_INTERVAL_MINUTES),
+        next_run_time=datetime.now(),
+        id="linkedin_import_maintenance",
+        name="LinkedIn Import maintenance",
+        replace_existing=True,
+        max_instances=1
+    )
+    
+    # Google Calendar -> local event cache (incremental syncToken sync)
+    from services.calendar_sync import sync_calendar_events_job
+    from config import CALENDAR_SYNC_INTERVAL_MINUTES
+    scheduler.add_job(
+        sync_calendar_events_job,
+        trigger=IntervalTrigger(minutes=CALENDAR_SYNC_INTERVAL_MINUTES),
+        next_run_time=datetime.now(),
+        id="calendar_sync",
+        name="Google Calendar incremental sync",
+        replace_existing=True,
+        max_instances=1
+    )
+    
+    # LinkedIn Import and Persona Reclassification workers block until work
+    # is enqueued (change streams / in-process notify) with a slow fallback poll
+    start_worker_loops()
+    
     # Add Persona Classifier Metrics Worker - runs every 6 hours
     from services.persona_classifier_metrics import process_metrics_job
     scheduler.add_job(
@@ -662,6 +830,8 @@ def start_scheduler():
 
 def stop_scheduler():
     """Stop the background scheduler"""
+    stop_worker_loops()
+    
     if scheduler.running:
         scheduler.shutdown()
         logger.info("Background scheduler stopped")
@@ -669,6 +839,8 @@ def stop_scheduler():
 
 async def get_scheduler_info():
     """Get info about the scheduler for debugging"""
+    from services.job_wakeup import job_wakeup
+    
     jobs = scheduler.get_jobs()
     return {
         "running": scheduler.running,
@@ -679,5 +851,10 @@ async def get_scheduler_info():
                 "next_run": str(job.next_run_time) if job.next_run_time else None
             }
             for job in jobs
-        ]
+        ],
+        "worker_loops": {
+            name: ("running" if not task.done() else "stopped")
+            for name, task in worker_tasks.items()
+        },
+        "change_streams": job_wakeup.get_status()
     }
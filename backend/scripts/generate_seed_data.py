@@ -5,11 +5,18 @@ Generates minimal dataset to validate:
 - Industry inheritance
 - Propagation logic (industry→company, company→contact)
 - Multi-relationship handling (1 contact with 2 companies, 1 company with 2 industries)
+
+Also builds a scalable synthetic dataset (default 28k contacts) used by the
+offline benchmark suite in tests/benchmarks:
+    python scripts/generate_seed_data.py --synthetic 28000
 """
+import argparse
 import asyncio
 import os
+import random
 import sys
 from datetime import datetime, timezone, timedelta
+from typing import Dict, List, Optional
 import uuid
 
 # Add parent to path for imports
@@ -404,5 +411,337 @@ async def generate_seed_data():
     return counts
 
 
+# ============================================================================
+# SYNTHETIC DATASET (benchmarks)
+# ============================================================================
+
+SYNTHETIC_FIRST_NAMES = [
+    "Juan", "María", "Carlos", "Ana", "Pedro", "Laura", "Roberto", "Diego",
+    "Sofía", "Miguel", "Lucía", "Jorge", "Fernanda", "Ricardo", "Daniela",
+    "Alejandro", "Gabriela", "Luis", "Valeria", "Andrés"
+]
+SYNTHETIC_LAST_NAMES = [
+    "García", "López", "Rodríguez", "Martínez", "Sánchez", "Fernández", "Díaz",
+    "Hernández", "Ramírez", "Torres", "Flores", "Gómez", "Vargas", "Castillo",
+    "Morales", "Ortiz", "Reyes", "Cruz", "Mendoza", "Ruiz"
+]
+SYNTHETIC_JOB_TITLES = [
+    "Director Médico", "Gerente de Marketing", "Brand Manager", "Director Comercial",
+    "Gerente de Ventas", "KAM", "Director de Recursos Humanos", "Gerente de Capacitación",
+    "CEO", "Director General", "Medical Science Liaison", "Gerente de Producto",
+    "Coordinador de Eventos", "Analista de Inteligencia de Mercado", ""
+]
+SYNTHETIC_INDUSTRIES = [
+    ("pharma", "Farmacéutica", "outbound"),
+    ("medical_devices", "Dispositivos Médicos", "outbound"),
+    ("biotech", "Biotecnología", "outbound"),
+    ("hospitals", "Hospitales", "outbound"),
+    ("tech", "Tecnología", "inbound"),
+    ("finance", "Servicios Financieros", "inbound"),
+    ("retail", "Retail", "inbound"),
+    ("education", "Educación", "inbound"),
+]
+SYNTHETIC_BUYER_PERSONAS = [
+    ("direccion_medica", "Dirección Médica"),
+    ("marketing", "Marketing"),
+    ("comercial", "Comercial"),
+    ("rrhh", "Recursos Humanos"),
+    ("direccion_general", "Dirección General"),
+    ("mateo", "Mateo"),
+]
+# Stage distribution of a mature CRM: most contacts sit in stages 1-2
+SYNTHETIC_STAGE_WEIGHTS = [(1, 45), (2, 35), (3, 10), (4, 7), (5, 3)]
+SYNTHETIC_CASE_STAGES = [
+    "caso_solicitado", "caso_presentado", "interes_en_caso",
+    "cierre_administrativo", "ganados", "perdidos"
+]
+SYNTHETIC_EMAIL_RULES = ["E01", "E02", "E03", "E04", "E05", "E06", "E07", "E08", "E09", "E10"]
+
+
+def _synthetic_id(rng: random.Random) -> str:
+    """uuid4-shaped id drawn from the seeded RNG (reproducible across runs)"""
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+
+def build_synthetic_dataset(
+    n_contacts: int = 28000,
+    seed: int = 42,
+    now: Optional[datetime] = None
+) -> Dict[str, List[dict]]:
+    """
+    Build a realistic, reproducible dataset scaled to n_contacts.
+
+    Returns {collection_name: [documents]} with contacts (webinar_history,
+    multi-company, roles, phones), companies, industries, buyer personas,
+    webinar events, cases, email/WhatsApp queues and import batches.
+    Nothing is written to the database; see seed_synthetic_dataset().
+    """
+    rng = random.Random(seed)
+    now = now or datetime.now(timezone.utc)
+
+    def days_ago(max_days: int) -> str:
+        return (now - timedelta(days=rng.randint(0, max_days), minutes=rng.randint(0, 1439))).isoformat()
+
+    n_companies = max(5, n_contacts // 10)
+    n_events = max(3, n_contacts // 1400)
+    n_cases = max(3, n_contacts // 35)
+
+    industries = [
+        {
+            "id": _synthetic_id(rng),
+            "code": code,
+            "name": name,
+            "classification": classification,
+            "is_merged": False,
+            "created_at": days_ago(900),
+            "updated_at": days_ago(30)
+        }
+        for code, name, classification in SYNTHETIC_INDUSTRIES
+    ]
+
+    buyer_personas = [
+        {"id": code, "code": code, "name": name, "active": True}
+        for code, name in SYNTHETIC_BUYER_PERSONAS
+    ]
+
+    companies = []
+    for i in range(n_companies):
+        industry = rng.choice(industries)
+        name = f"{rng.choice(['Laboratorios', 'Grupo', 'Corporativo', 'Farma', 'Servicios', 'Tech'])} {rng.choice(SYNTHETIC_LAST_NAMES)} {i}"
+        companies.append({
+            "id": _synthetic_id(rng),
+            "name": name,
+            "normalized_name": name.lower(),
+            "classification": industry["classification"],
+            "industry": industry["name"],
+            "industry_id": industry["id"],
+            "domain": f"empresa{i}.com.mx",
+            "domains": [f"empresa{i}.com.mx"],
+            "aliases": [],
+            "searches": [],
+            "is_merged": False,
+            "created_at": days_ago(900),
+            "updated_at": days_ago(60)
+        })
+
+    events = []
+    for i in range(n_events):
+        webinar_date = (now + timedelta(days=rng.randint(-180, 45))).strftime("%Y-%m-%d")
+        events.append({
+            "id": _synthetic_id(rng),
+            "name": f"Webinar {i + 1}: {rng.choice(['Liderazgo', 'Innovación', 'Ventas', 'Comunicación médica'])}",
+            "webinar_date": webinar_date,
+            "webinar_time": f"{rng.randint(9, 18):02d}:00",
+            "status": "published",
+            "landing_page_url": f"/evento/webinar-{i + 1}",
+            "created_at": days_ago(240)
+        })
+
+    stages, weights = zip(*SYNTHETIC_STAGE_WEIGHTS)
+    contacts = []
+    for i in range(n_contacts):
+        first = rng.choice(SYNTHETIC_FIRST_NAMES)
+        last = rng.choice(SYNTHETIC_LAST_NAMES)
+        company = rng.choice(companies) if rng.random() < 0.85 else None
+        stage = rng.choices(stages, weights)[0]
+        email = f"{first.lower()}.{last.lower()}.{i}@" + (company["domain"] if company else "gmail.com")
+        phone = f"+52155{rng.randint(10000000, 99999999)}" if rng.random() < 0.6 else ""
+
+        companies_list = []
+        if company:
+            companies_list.append({"company_id": company["id"], "company_name": company["name"], "is_primary": True})
+            if rng.random() < 0.05:
+                other = rng.choice(companies)
+                companies_list.append({"company_id": other["id"], "company_name": other["name"], "is_primary": False})
+
+        webinar_history = []
+        for event in rng.sample(events, k=min(len(events), rng.choice([0, 0, 0, 1, 1, 2, 3]))):
+            webinar_history.append({
+                "event_id": event["id"],
+                "event_name": event["name"],
+                "status": rng.choice(["registered", "attended", "attended", "no_show"]),
+                "registered_at": days_ago(200)
+            })
+
+        roles = []
+        if stage == 4 and rng.random() < 0.4:
+            roles.append("coachee")
+        if stage >= 3 and rng.random() < 0.15:
+            roles.append("deal_maker")
+
+        contact = {
+            "id": _synthetic_id(rng),
+            "name": f"{first} {last}",
+            "first_name": first,
+            "last_name": last,
+            "email": email,
+            "emails": [{"email": email, "is_primary": True}],
+            "phone": phone,
+            "phones": [{"e164": phone, "is_primary": True}] if phone else [],
+            "company": company["name"] if company else None,
+            "company_id": company["id"] if company else None,
+            "companies": companies_list,
+            "job_title": rng.choice(SYNTHETIC_JOB_TITLES),
+            "buyer_persona": rng.choice(SYNTHETIC_BUYER_PERSONAS)[0],
+            "classification": company["classification"] if company else "inbound",
+            "stage": stage,
+            "status": "active",
+            "roles": roles,
+            "contact_types": list(roles),
+            "source": rng.choice(["linkedin", "hubspot", "csv_import", "webinar", "manual"]),
+            "linkedin_url": f"https://www.linkedin.com/in/{first.lower()}-{last.lower()}-{i}" if rng.random() < 0.7 else "",
+            "webinar_history": webinar_history,
+            "created_at": days_ago(720),
+            "updated_at": days_ago(90)
+        }
+        if rng.random() < 0.3:
+            contact["last_contacted_whatsapp"] = days_ago(40)
+        if rng.random() < 0.4:
+            contact["last_email_sent"] = days_ago(40)
+        contacts.append(contact)
+
+    cases = []
+    for i in range(n_cases):
+        company = rng.choice(companies)
+        members = rng.sample(contacts, k=rng.randint(1, 6))
+        cases.append({
+            "id": _synthetic_id(rng),
+            "name": f"[{company['name']}] Proyecto {i + 1}",
+            "company_name": company["name"],
+            "company_names": [company["name"]],
+            "company_ids": [company["id"]],
+            "contact_ids": [c["id"] for c in members],
+            "stage": rng.choice(SYNTHETIC_CASE_STAGES),
+            "delivery_stage": rng.choice([None, "in_progress", "concluidos"]),
+            "status": "active",
+            "created_at": days_ago(400),
+            "updated_at": days_ago(30)
+        })
+
+    email_queue = []
+    for contact in rng.sample(contacts, k=n_contacts // 5):
+        rule = rng.choice(SYNTHETIC_EMAIL_RULES)
+        event = rng.choice(events)
+        email_queue.append({
+            "id": _synthetic_id(rng),
+            "rule": rule,
+            "contact_id": contact["id"],
+            "contact_email": contact["email"],
+            "contact_name": contact["name"],
+            "subject": f"{rule} - {event['name']}",
+            "body_html": "<p>" + ("Lorem ipsum dolor sit amet. " * 20) + "</p>",
+            "metadata": {
+                "webinar_id": event["id"],
+                "webinar_name": event["name"],
+                "buyer_persona": contact["buyer_persona"],
+                "company": contact["company"] or ""
+            },
+            "scheduled_at": (now + timedelta(hours=rng.randint(-72, 72))).isoformat(),
+            "status": rng.choices(["pending", "sent", "failed", "cancelled"], [50, 40, 5, 5])[0],
+            "attempts": 0,
+            "created_at": days_ago(10)
+        })
+
+    whatsapp_queue = []
+    with_phone = [c for c in contacts if c["phone"]]
+    for contact in rng.sample(with_phone, k=min(len(with_phone), n_contacts // 20)):
+        event = rng.choice(events)
+        whatsapp_queue.append({
+            "id": _synthetic_id(rng),
+            "rule": rng.choice(["W01", "W02", "W08", "W09", "W14"]),
+            "contact_id": contact["id"],
+            "contact_name": contact["name"],
+            "contact_phone": contact["phone"],
+            "status": rng.choices(["pending", "sent"], [70, 30])[0],
+            "metadata": {
+                "meeting_date": (now + timedelta(days=rng.randint(0, 1))).strftime("%Y-%m-%d"),
+                "webinar_id": event["id"],
+                "webinar_name": event["name"],
+                "buyer_persona": contact["buyer_persona"],
+                "company": contact["company"] or ""
+            },
+            "created_at": days_ago(3)
+        })
+
+    import_batches = []
+    for i in range(max(5, n_contacts // 1000)):
+        rows = rng.randint(50, 500)
+        import_batches.append({
+            "batch_id": _synthetic_id(rng),
+            "status": rng.choice(["completed", "completed", "failed", "validated"]),
+            "original_filename": f"import_{i}.csv",
+            # Raw CSV is stored on the batch; list endpoints must not load it
+            "raw_content": "firstname,lastname,email\n" + "Nombre,Apellido,correo@example.com\n" * rows,
+            "total_rows": rows,
+            "headers": ["firstname", "lastname", "email"],
+            "results": {"created": rows // 2, "updated": rows // 3, "skipped": 0, "errors": 0, "warnings": 0},
+            "created_at": days_ago(120)
+        })
+
+    linkedin_import_jobs = [
+        {
+            "job_id": _synthetic_id(rng),
+            "profile": rng.choice(["GB", "MG"]),
+            "file_name": f"Connections_{i}.csv",
+            "status": "completed",
+            "total_rows": 1000,
+            "processed_rows": 1000,
+            "contacts_created": rng.randint(0, 200),
+            "contacts_updated": rng.randint(0, 800),
+            "progress_percent": 100,
+            "created_at": days_ago(60)
+        }
+        for i in range(10)
+    ]
+
+    return {
+        "industries": industries,
+        "buyer_personas_db": buyer_personas,
+        "unified_companies": companies,
+        "unified_contacts": contacts,
+        "webinar_events_v2": events,
+        "cases": cases,
+        "email_queue": email_queue,
+        "whatsapp_queue": whatsapp_queue,
+        "import_batches": import_batches,
+        "linkedin_import_jobs": linkedin_import_jobs,
+    }
+
+
+async def seed_synthetic_dataset(db, dataset: Dict[str, List[dict]], batch_size: int = 5000) -> Dict[str, int]:
+    """Replace each collection in the dataset with its synthetic documents"""
+    counts = {}
+    for collection, docs in dataset.items():
+        await db[collection].delete_many({})
+        for start in range(0, len(docs), batch_size):
+            # insert_many adds _id in place; insert copies so the dataset stays reusable
+            await db[collection].insert_many([dict(d) for d in docs[start:start + batch_size]])
+        counts[collection] = len(docs)
+    return counts
+
+
+async def generate_synthetic_data(n_contacts: int, seed: int):
+    """Seed MONGO_URL/DB_NAME with the synthetic benchmark dataset"""
+    client = AsyncIOMotorClient(MONGO_URL)
+    db = client[DB_NAME]
+
+    print(f"Generating synthetic dataset ({n_contacts} contacts, seed {seed})...")
+    counts = await seed_synthetic_dataset(db, build_synthetic_dataset(n_contacts, seed))
+    for collection, count in counts.items():
+        print(f"   • {collection}: {count}")
+
+    client.close()
+    return counts
+
+
 if __name__ == "__main__":
-    asyncio.run(generate_seed_data())
+    parser = argparse.ArgumentParser(description="Seed data generator")
+    parser.add_argument("--synthetic", type=int, metavar="N_CONTACTS",
+                        help="Seed the scalable synthetic dataset instead of the classification fixtures")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    if args.synthetic:
+        asyncio.run(generate_synthetic_data(args.synthetic, args.seed))
+    else:
+        asyncio.run(generate_seed_data())
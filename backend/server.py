@@ -8,7 +8,7 @@ from starlette.middleware.cors import CORSMiddleware
 import logging
 
 # Configuration and Database
-from config import CORS_ORIGINS
+from config import CORS_ORIGINS, QUERY_INSTRUMENTATION_ENABLED, RESPONSE_CACHE_ENABLED
 from database import db, close_db
 
 # Rate Limiting
@@ -61,6 +61,7 @@ from routers.tasks import router as tasks_router
 from routers.focus import router as focus_router
 from routers.webinar_emails import router as webinar_emails_router
 from routers.admin_sync import router as admin_sync_router
+from routers.performance import router as performance_router
 
 # For backwards compatibility, import everything else from legacy module
 from routers.legacy import (
@@ -95,6 +96,7 @@ from routers.industries_v2 import router as industries_v2_router
 from routers.linkedin_import import router as linkedin_import_router
 from routers.persona_classifier import router as persona_classifier_router
 from routers.youtube_ideas import router as youtube_ideas_router
+from routers.exports import router as exports_router
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -107,6 +109,12 @@ app = FastAPI(title="Leaderlix Automation API")
 app.state.limiter = limiter
 app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
 
+# Cached public responses with ETag / 304. Added before CORS so it runs
+# inside it and CORS headers are never stored in the cache.
+if RESPONSE_CACHE_ENABLED:
+    from services.response_cache import ResponseCacheMiddleware
+    app.add_middleware(ResponseCacheMiddleware)
+
 # CORS Middleware - MUST be added before routers
 app.add_middleware(
     CORSMiddleware,
@@ -114,8 +122,14 @@ app.add_middleware(
     allow_origins=CORS_ORIGINS,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing", "ETag", "X-Cache"],
 )
 
+# Per-request MongoDB query stats (Server-Timing header + slow request log)
+if QUERY_INSTRUMENTATION_ENABLED:
+    from services.query_instrumentation import QueryInstrumentationMiddleware
+    app.add_middleware(QueryInstrumentationMiddleware)
+
 # Create main API router
 api_router = APIRouter(prefix="/api")
 
@@ -222,9 +236,11 @@ api_router.include_router(webinar_emails_router)
 api_router.include_router(unified_companies_router)
 api_router.include_router(industries_v2_router)
 api_router.include_router(admin_sync_router)
+api_router.include_router(performance_router)
 api_router.include_router(linkedin_import_router)
 api_router.include_router(persona_classifier_router)
 api_router.include_router(youtube_ideas_router)
+api_router.include_router(exports_router)
 
 app.include_router(api_router)
 
@@ -238,14 +254,25 @@ async def startup_event():
     # Create database indexes for performance
     await ensure_indexes()
 
+    # Backfill denormalized blog classification once (services/blog_classification.py)
+    try:
+        from services.blog_classification import ensure_classification
+        await ensure_classification()
+    except Exception as e:
+        logger.warning(f"Could not backfill blog classification: {e}")
+
     # Initialize PostgreSQL pool
     from services.pg_pool import init_pg_pool
     await init_pg_pool()
 
+    # Change stream watchers wake the job workers as soon as work is enqueued
+    from services.job_wakeup import job_wakeup
+    job_wakeup.start_watchers(db)
+
     # Start the main scheduler
     start_scheduler()
 
-    # Start email queue processor (processes queue every 60 seconds)
+    # Start email queue processor (wakes on enqueue, next due email, or fallback poll)
     try:
         from services.email_scheduler import email_scheduler
         email_scheduler.start_background_task()
@@ -257,6 +284,9 @@ async def shutdown_db_client():
     """Stop schedulers and close DB on shutdown"""
     stop_scheduler()
 
+    from services.job_wakeup import job_wakeup
+    job_wakeup.stop_watchers()
+
     # Stop email scheduler
     try:
         from services.email_scheduler import email_scheduler
@@ -268,6 +298,16 @@ async def shutdown_db_client():
     from services.pg_pool import close_pg_pool
     await close_pg_pool()
 
+    # Close shared outbound HTTP client and headless browsers
+    from services.http_client import close_http_client
+    await close_http_client()
+    from services.hubspot_client import close_hubspot_client
+    await close_hubspot_client()
+    from services.contact_dedup import shutdown_dedup_worker
+    shutdown_dedup_worker()
+    from services.browser_pool import browser_pool
+    await browser_pool.close()
+
     await close_db()
 
 # Endpoint to check scheduler status
@@ -0,0 +1,255 @@
+"""
+Apify Runner - Execution layer for Apify actors
+
+- One pooled HTTP client (services/http_client.py) for every call
+- Run completion via Apify's waitForFinish long-poll (the server holds the
+  request open up to 60s and answers as soon as the run finishes) instead
+  of sleeping 5s between status polls
+- Dataset items streamed page by page (offset/limit) as an async generator,
+  so callers process items while later pages are still downloading and
+  never hold a whole large dataset in memory
+- Multi-input fan-out: run_many() starts runs concurrently under
+  APIFY_MAX_CONCURRENT_RUNS and hands them back in input order
+- Input-hash cache (apify_run_cache): an identical actor + input within
+  APIFY_CACHE_TTL_HOURS reuses the previous run's dataset instead of paying
+  for a new run. Apify keeps default datasets of finished runs for 7 days,
+  so the TTL must stay below that.
+
+APIFY_API_BASE can point at tests/apify_mock_server.py for local runs.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+from datetime import datetime, timezone, timedelta
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple, Union
+
+import httpx
+
+from database import db
+from services.http_client import get_http_client
+
+logger = logging.getLogger('apify_runner')
+
+APIFY_TOKEN = os.environ.get("APIFY_TOKEN", "")
+APIFY_API_BASE = os.environ.get("APIFY_API_BASE", "https://api.apify.com/v2").rstrip("/")
+
+APIFY_WAIT_FOR_FINISH_SECONDS = 60  # Apify's maximum for waitForFinish
+APIFY_RUN_TIMEOUT_SECONDS = 300  # Give up on a run after this long
+APIFY_DATASET_PAGE_SIZE = 1000
+APIFY_MAX_CONCURRENT_RUNS = int(os.environ.get("APIFY_MAX_CONCURRENT_RUNS", "4"))
+APIFY_CACHE_TTL_HOURS = int(os.environ.get("APIFY_CACHE_TTL_HOURS", "24"))
+
+RUN_SUCCEEDED = "SUCCEEDED"
+RUN_FAILED_STATUSES = {"FAILED", "ABORTED", "TIMED-OUT"}
+
+
+class ApifyRunError(Exception):
+    """An actor run could not be started or did not succeed."""
+
+
+def input_hash(actor_id: str, input_data: Dict[str, Any]) -> str:
+    """Stable hash of actor + input (key order independent)."""
+    payload = json.dumps({"actor": actor_id, "input": input_data}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ApifyRunner:
+    """Starts actor runs, waits for them and streams their datasets."""
+
+    def __init__(
+        self,
+        token: Optional[str] = None,
+        base_url: Optional[str] = None,
+        client: Optional[httpx.AsyncClient] = None,
+        max_concurrent_runs: int = APIFY_MAX_CONCURRENT_RUNS,
+        cache_collection=None,
+        cache_ttl_hours: int = APIFY_CACHE_TTL_HOURS,
+        wait_for_finish: int = APIFY_WAIT_FOR_FINISH_SECONDS,
+        run_timeout: float = APIFY_RUN_TIMEOUT_SECONDS,
+        page_size: int = APIFY_DATASET_PAGE_SIZE,
+    ):
+        self.token = token if token is not None else APIFY_TOKEN
+        self.base_url = (base_url or APIFY_API_BASE).rstrip("/")
+        self.client = client
+        self.cache = cache_collection if cache_collection is not None else db.apify_run_cache
+        self.cache_ttl = timedelta(hours=cache_ttl_hours)
+        self.wait_for_finish = wait_for_finish
+        self.run_timeout = run_timeout
+        self.page_size = page_size
+        self.max_concurrent_runs = max_concurrent_runs
+        self._run_slots: Optional[asyncio.Semaphore] = None
+        self.stats = {"runs_started": 0, "cache_hits": 0, "status_polls": 0, "dataset_pages": 0}
+
+    # -------------------------------------------------------------------------
+    # HTTP helpers
+    # -------------------------------------------------------------------------
+
+    def _http(self) -> httpx.AsyncClient:
+        return self.client or get_http_client()
+
+    def _headers(self) -> Dict[str, str]:
+        return {"Authorization": f"Bearer {self.token}"}
+
+    def _long_poll_timeout(self) -> httpx.Timeout:
+        # The server may hold the request for the whole waitForFinish window
+        return httpx.Timeout(30.0, read=self.wait_for_finish + 30.0)
+
+    def _slots(self) -> asyncio.Semaphore:
+        if self._run_slots is None:
+            self._run_slots = asyncio.Semaphore(self.max_concurrent_runs)
+        return self._run_slots
+
+    # -------------------------------------------------------------------------
+    # Runs
+    # -------------------------------------------------------------------------
+
+    async def _cached_run(self, actor_id: str, key: str) -> Optional[Dict[str, Any]]:
+        cutoff = (datetime.now(timezone.utc) - self.cache_ttl).isoformat()
+        entry = await self.cache.find_one(
+            {"input_hash": key, "created_at": {"$gte": cutoff}},
+            {"_id": 0}
+        )
+        if not entry:
+            return None
+        self.stats["cache_hits"] += 1
+        logger.info(f"Apify cache hit for {actor_id} (run {entry['run_id']})")
+        return {
+            "id": entry["run_id"],
+            "status": RUN_SUCCEEDED,
+            "defaultDatasetId": entry["dataset_id"],
+            "cached": True,
+        }
+
+    async def _store_run(self, actor_id: str, key: str, input_data: Dict[str, Any], run: Dict[str, Any]):
+        await self.cache.update_one(
+            {"input_hash": key},
+            {"$set": {
+                "input_hash": key,
+                "actor_id": actor_id,
+                "input": input_data,
+                "run_id": run["id"],
+                "dataset_id": run["defaultDatasetId"],
+                "created_at": datetime.now(timezone.utc).isoformat(),
+            }},
+            upsert=True
+        )
+
+    async def start_run(self, actor_id: str, input_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Start a run; the response already waits up to waitForFinish seconds."""
+        # Namespaced IDs: "harvestapi/linkedin-profile-search" -> "harvestapi~linkedin-profile-search"
+        api_actor_id = actor_id.replace("/", "~")
+        response = await self._http().post(
+            f"{self.base_url}/acts/{api_actor_id}/runs",
+            params={"waitForFinish": self.wait_for_finish},
+            headers=self._headers(),
+            json=input_data,
+            timeout=self._long_poll_timeout()
+        )
+        if response.status_code != 201:
+            raise ApifyRunError(f"Failed to start actor {actor_id}: {response.text[:500]}")
+        self.stats["runs_started"] += 1
+        return response.json()["data"]
+
+    async def wait_for_run(self, run: Dict[str, Any]) -> Dict[str, Any]:
+        """Long-poll the run until it reaches a terminal status."""
+        started = time.monotonic()
+        while run.get("status") != RUN_SUCCEEDED:
+            if run.get("status") in RUN_FAILED_STATUSES:
+                raise ApifyRunError(f"Actor run {run.get('id')} failed with status: {run.get('status')}")
+            if time.monotonic() - started > self.run_timeout:
+                raise ApifyRunError(f"Actor run {run.get('id')} did not finish within {self.run_timeout}s")
+
+            response = await self._http().get(
+                f"{self.base_url}/actor-runs/{run['id']}",
+                params={"waitForFinish": self.wait_for_finish},
+                headers=self._headers(),
+                timeout=self._long_poll_timeout()
+            )
+            response.raise_for_status()
+            self.stats["status_polls"] += 1
+            run = response.json()["data"]
+        return run
+
+    async def run(self, actor_id: str, input_data: Dict[str, Any], use_cache: bool = True) -> Dict[str, Any]:
+        """Run an actor to completion (or reuse a cached identical run)."""
+        key = input_hash(actor_id, input_data)
+        if use_cache:
+            cached = await self._cached_run(actor_id, key)
+            if cached:
+                return cached
+
+        async with self._slots():
+            run = await self.start_run(actor_id, input_data)
+            run = await self.wait_for_run(run)
+
+        if use_cache:
+            await self._store_run(actor_id, key, input_data, run)
+        return run
+
+    # -------------------------------------------------------------------------
+    # Datasets
+    # -------------------------------------------------------------------------
+
+    async def iter_dataset(self, dataset_id: str) -> AsyncIterator[Dict[str, Any]]:
+        """Yield dataset items, fetching one page at a time."""
+        offset = 0
+        while True:
+            response = await self._http().get(
+                f"{self.base_url}/datasets/{dataset_id}/items",
+                params={"offset": offset, "limit": self.page_size, "format": "json"},
+                headers=self._headers()
+            )
+            response.raise_for_status()
+            self.stats["dataset_pages"] += 1
+            items = response.json()
+            for item in items:
+                yield item
+            if len(items) < self.page_size:
+                return
+            offset += len(items)
+
+    async def iter_items(
+        self, actor_id: str, input_data: Dict[str, Any], use_cache: bool = True
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Run an actor and stream its dataset."""
+        run = await self.run(actor_id, input_data, use_cache=use_cache)
+        async for item in self.iter_dataset(run["defaultDatasetId"]):
+            yield item
+
+    async def run_actor(self, actor_id: str, input_data: Dict[str, Any], use_cache: bool = True) -> List[Dict[str, Any]]:
+        """Run an actor and return all items (for small result sets)."""
+        return [item async for item in self.iter_items(actor_id, input_data, use_cache=use_cache)]
+
+    async def run_many(
+        self, actor_id: str, inputs: List[Dict[str, Any]], use_cache: bool = True
+    ) -> AsyncIterator[Tuple[int, Union[Dict[str, Any], Exception]]]:
+        """
+        Start one run per input concurrently (bounded by max_concurrent_runs)
+        and yield (index, run) in input order; a failed run yields its
+        exception instead. Callers stream each run's dataset with
+        iter_dataset() while the remaining runs keep executing.
+        """
+        tasks = [
+            asyncio.create_task(self.run(actor_id, input_data, use_cache=use_cache))
+            for input_data in inputs
+        ]
+        try:
+            for index, task in enumerate(tasks):
+                try:
+                    yield index, await task
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    yield index, e
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+
+# Singleton instance
+apify_runner = ApifyRunner()
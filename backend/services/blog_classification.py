@@ -0,0 +1,164 @@
+"""
+Blog Classification - Denormalized program / competency / level on blog posts
+
+Blog posts generated from a content item inherit its classification. The
+public blog filters and sidebar need the display names (course name,
+competency name, level label), so they are copied onto each post:
+
+    course_id, program_name, competency_id, competency_name, level, level_name
+
+They are written when a post is generated or synced, refreshed when the
+content item is (re)classified, and propagated when a course, competency
+or certification level is renamed. Filtering then is a single indexed
+query on blog_posts instead of up to four lookups per post. Posts created
+before the fields existed are backfilled once at startup (ensure_classification).
+"""
+
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from database import db
+from services.response_cache import response_cache
+
+logger = logging.getLogger('blog_classification')
+
+CLASSIFICATION_FIELDS = ["course_id", "program_name", "competency_id", "competency_name", "level", "level_name"]
+
+CONTENT_ITEM_PROJECTION = {"_id": 0, "id": 1, "course_id": 1, "competency_id": 1, "level": 1}
+
+
+def _posts_changed(modified: int) -> int:
+    if modified:
+        response_cache.invalidate("blog")
+    return modified
+
+
+def course_display_name(course: Optional[Dict[str, Any]]) -> Optional[str]:
+    if not course:
+        return None
+    return course.get("name") or course.get("title")
+
+
+async def classifications_for_items(items: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """
+    content_item_id -> classification fields, resolved with one query per
+    source collection for all items.
+    """
+    course_ids = {i["course_id"] for i in items if i.get("course_id")}
+    competency_ids = {i["competency_id"] for i in items if i.get("competency_id")}
+    levels = {i["level"] for i in items if i.get("level")}
+
+    courses = {}
+    if course_ids:
+        async for course in db.courses.find({"id": {"$in": list(course_ids)}}, {"_id": 0, "id": 1, "name": 1, "title": 1}):
+            courses[course["id"]] = course_display_name(course)
+
+    competencies = {}
+    if competency_ids:
+        async for comp in db.competencies.find({"id": {"$in": list(competency_ids)}}, {"_id": 0, "id": 1, "name": 1}):
+            competencies[comp["id"]] = comp.get("name")
+
+    level_names = {}
+    if levels:
+        async for nivel in db.niveles_certificacion.find({"order": {"$in": list(levels)}}, {"_id": 0, "order": 1, "advancement_es": 1}):
+            level_names.setdefault(nivel["order"], nivel.get("advancement_es"))
+
+    result = {}
+    for item in items:
+        course_id = item.get("course_id")
+        competency_id = item.get("competency_id")
+        level = item.get("level")
+        result[item["id"]] = {
+            "course_id": course_id,
+            "program_name": courses.get(course_id) if course_id else None,
+            "competency_id": competency_id,
+            "competency_name": competencies.get(competency_id) if competency_id else None,
+            "level": level,
+            "level_name": level_names.get(level) if level else None,
+        }
+    return result
+
+
+async def classification_for_item(content_item: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Classification fields for a new blog post generated from content_item."""
+    if not content_item or not content_item.get("id"):
+        return {field: None for field in CLASSIFICATION_FIELDS}
+    return (await classifications_for_items([content_item]))[content_item["id"]]
+
+
+async def sync_content_item(content_item_id: str) -> int:
+    """Refresh the classification on every blog post of one content item."""
+    item = await db.content_items.find_one({"id": content_item_id}, CONTENT_ITEM_PROJECTION)
+    if not item:
+        return 0
+    fields = await classification_for_item(item)
+    result = await db.blog_posts.update_many({"content_item_id": content_item_id}, {"$set": fields})
+    return _posts_changed(result.modified_count)
+
+
+async def sync_all() -> Dict[str, int]:
+    """Backfill / repair: recompute the classification of every post with a content item."""
+    item_ids = await db.blog_posts.distinct("content_item_id", {"content_item_id": {"$nin": [None, ""]}})
+    items = await db.content_items.find({"id": {"$in": item_ids}}, CONTENT_ITEM_PROJECTION).to_list(None)
+    classifications = await classifications_for_items(items)
+
+    updated = 0
+    for item_id, fields in classifications.items():
+        result = await db.blog_posts.update_many({"content_item_id": item_id}, {"$set": fields})
+        updated += result.modified_count
+
+    _posts_changed(updated)
+    logger.info(f"Blog classification synced for {len(classifications)} content items ({updated} posts updated)")
+    result = {"content_items": len(classifications), "posts_updated": updated}
+    await db.blog_classification_state.update_one(
+        {"_type": "main"}, {"$set": {**result, "synced_at": datetime.now(timezone.utc)}}, upsert=True
+    )
+    return result
+
+
+async def ensure_classification() -> Optional[Dict[str, int]]:
+    """Backfill once if the denormalized fields were never synced (first startup after deploy)"""
+    if await db.blog_classification_state.find_one({"_type": "main"}, {"_id": 1}):
+        return None
+    return await sync_all()
+
+
+# =============================================================================
+# RENAME PROPAGATION
+# =============================================================================
+
+async def propagate_course_name(course_id: Optional[str], name: Optional[str]) -> int:
+    if not course_id:
+        return 0
+    result = await db.blog_posts.update_many({"course_id": course_id}, {"$set": {"program_name": name}})
+    return _posts_changed(result.modified_count)
+
+
+async def propagate_competency_name(competency_id: str) -> int:
+    comp = await db.competencies.find_one({"id": competency_id}, {"_id": 0, "name": 1})
+    if not comp:
+        return 0
+    result = await db.blog_posts.update_many({"competency_id": competency_id}, {"$set": {"competency_name": comp.get("name")}})
+    return _posts_changed(result.modified_count)
+
+
+async def propagate_level_names() -> int:
+    """Level labels are looked up by order, so any nivel change refreshes all of them."""
+    niveles = await db.niveles_certificacion.find({}, {"_id": 0, "order": 1, "advancement_es": 1}).to_list(None)
+    level_names: Dict[Any, Any] = {}
+    for nivel in niveles:
+        level_names.setdefault(nivel.get("order"), nivel.get("advancement_es"))
+
+    updated = 0
+    for order, name in level_names.items():
+        if order is None:
+            continue
+        result = await db.blog_posts.update_many({"level": order}, {"$set": {"level_name": name}})
+        updated += result.modified_count
+    # Levels whose nivel no longer exists lose their label
+    result = await db.blog_posts.update_many(
+        {"level": {"$nin": [None] + [o for o in level_names if o is not None]}},
+        {"$set": {"level_name": None}}
+    )
+    return _posts_changed(updated + result.modified_count)
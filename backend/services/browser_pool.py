@@ -0,0 +1,211 @@
+"""
+Browser Pool - Shared headless Chromium for Playwright fallbacks
+
+Launching Chromium costs seconds and ~100MB per process, and the scrapers
+used to launch one per URL. The pool keeps a few long-lived browsers and
+hands out isolated browser contexts (own cookies/storage) per page:
+
+    async with browser_pool.page(user_agent=ua) as page:
+        await page.goto(url)
+        html = await page.content()
+
+- At most BROWSER_POOL_SIZE browsers, each with at most
+  BROWSER_CONTEXTS_PER_BROWSER open contexts: that product is the global
+  concurrency cap; extra callers wait
+- Health check before each use: disconnected (crashed) browsers are dropped
+  and relaunched
+- Browsers are recycled after BROWSER_MAX_PAGES pages to bound memory
+  growth from long-lived Chromium processes
+- Playwright is started lazily on first use and stopped on app shutdown
+"""
+
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger('browser_pool')
+
+BROWSER_POOL_SIZE = 2
+BROWSER_CONTEXTS_PER_BROWSER = 3
+BROWSER_MAX_PAGES = 50  # Recycle a browser after serving this many pages
+BROWSER_ACQUIRE_TIMEOUT = 120  # Seconds to wait for a free slot
+
+BROWSER_LAUNCH_ARGS = ['--no-sandbox', '--disable-setuid-sandbox', '--disable-dev-shm-usage']
+DEFAULT_VIEWPORT = {'width': 1920, 'height': 1080}
+
+# Hides the most common headless fingerprints
+STEALTH_INIT_SCRIPT = """
+    Object.defineProperty(navigator, 'webdriver', {get: () => undefined});
+    Object.defineProperty(navigator, 'plugins', {get: () => [1, 2, 3, 4, 5]});
+"""
+
+
+class _PooledBrowser:
+    """A launched browser plus its usage counters."""
+
+    def __init__(self, browser, browser_id: int):
+        self.browser = browser
+        self.id = browser_id
+        self.active_contexts = 0
+        self.pages_served = 0
+        self.retiring = False
+
+    def is_healthy(self) -> bool:
+        try:
+            return self.browser.is_connected()
+        except Exception:
+            return False
+
+
+class BrowserPool:
+    """Bounded pool of long-lived browsers handing out isolated contexts."""
+
+    def __init__(
+        self,
+        size: int = BROWSER_POOL_SIZE,
+        contexts_per_browser: int = BROWSER_CONTEXTS_PER_BROWSER,
+        max_pages_per_browser: int = BROWSER_MAX_PAGES,
+        launcher: Optional[Callable[[], Awaitable[Any]]] = None
+    ):
+        self.size = size
+        self.contexts_per_browser = contexts_per_browser
+        self.max_pages_per_browser = max_pages_per_browser
+        self._launcher = launcher
+        self._playwright = None
+        self._browsers: List[_PooledBrowser] = []
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._lock: Optional[asyncio.Lock] = None
+        self._next_id = 1
+        self.stats = {"launched": 0, "recycled": 0, "unhealthy": 0, "pages": 0}
+
+    def _ensure_primitives(self):
+        # Created lazily so the singleton can be built at import time
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.size * self.contexts_per_browser)
+            self._lock = asyncio.Lock()
+
+    async def _launch(self):
+        if self._launcher:
+            return await self._launcher()
+        if self._playwright is None:
+            from playwright.async_api import async_playwright
+            self._playwright = await async_playwright().start()
+        return await self._playwright.chromium.launch(headless=True, args=BROWSER_LAUNCH_ARGS)
+
+    async def _close_browser(self, pooled: _PooledBrowser):
+        try:
+            await pooled.browser.close()
+        except Exception as e:
+            logger.debug(f"Error closing browser {pooled.id}: {e}")
+
+    async def _checkout(self) -> _PooledBrowser:
+        """Pick a healthy browser with a free context slot (launching if needed)."""
+        async with self._lock:
+            for pooled in list(self._browsers):
+                if not pooled.is_healthy():
+                    logger.warning(f"Browser {pooled.id} disconnected; replacing it")
+                    self.stats["unhealthy"] += 1
+                    self._browsers.remove(pooled)
+                    asyncio.create_task(self._close_browser(pooled))
+
+            candidates = [
+                b for b in self._browsers
+                if not b.retiring and b.active_contexts < self.contexts_per_browser
+            ]
+            if candidates:
+                pooled = min(candidates, key=lambda b: b.active_contexts)
+            else:
+                # No free context on a live browser. While a retiring browser
+                # drains, the pool may briefly hold one browser over `size`
+                browser = await self._launch()
+                pooled = _PooledBrowser(browser, self._next_id)
+                self._next_id += 1
+                self._browsers.append(pooled)
+                self.stats["launched"] += 1
+                logger.info(f"Launched browser {pooled.id} ({len(self._browsers)} in pool)")
+
+            pooled.active_contexts += 1
+            return pooled
+
+    async def _checkin(self, pooled: _PooledBrowser):
+        async with self._lock:
+            pooled.active_contexts -= 1
+            pooled.pages_served += 1
+            self.stats["pages"] += 1
+            if pooled.pages_served >= self.max_pages_per_browser:
+                pooled.retiring = True
+            close_now = pooled.retiring and pooled.active_contexts == 0
+            if close_now and pooled in self._browsers:
+                self._browsers.remove(pooled)
+                self.stats["recycled"] += 1
+        if close_now:
+            logger.info(f"Recycling browser {pooled.id} after {pooled.pages_served} pages")
+            await self._close_browser(pooled)
+
+    @asynccontextmanager
+    async def page(
+        self,
+        user_agent: Optional[str] = None,
+        viewport: Optional[Dict[str, int]] = None,
+        locale: str = 'en-US',
+        stealth: bool = True
+    ):
+        """Acquire a fresh page in an isolated context; released on exit."""
+        self._ensure_primitives()
+        await asyncio.wait_for(self._slots.acquire(), BROWSER_ACQUIRE_TIMEOUT)
+        try:
+            pooled = await self._checkout()
+            context = None
+            try:
+                context = await pooled.browser.new_context(
+                    user_agent=user_agent,
+                    viewport=viewport or DEFAULT_VIEWPORT,
+                    locale=locale,
+                )
+                page = await context.new_page()
+                if stealth:
+                    await page.add_init_script(STEALTH_INIT_SCRIPT)
+                yield page
+            finally:
+                if context is not None:
+                    try:
+                        await context.close()
+                    except Exception as e:
+                        logger.debug(f"Error closing context: {e}")
+                await self._checkin(pooled)
+        finally:
+            self._slots.release()
+
+    async def close(self):
+        """Close every browser and stop Playwright (app shutdown)."""
+        browsers, self._browsers = self._browsers, []
+        for pooled in browsers:
+            await self._close_browser(pooled)
+        if self._playwright is not None:
+            try:
+                await self._playwright.stop()
+            except Exception as e:
+                logger.debug(f"Error stopping Playwright: {e}")
+            self._playwright = None
+
+    def get_status(self) -> Dict[str, Any]:
+        return {
+            "browsers": [
+                {
+                    "id": b.id,
+                    "active_contexts": b.active_contexts,
+                    "pages_served": b.pages_served,
+                    "retiring": b.retiring,
+                    "healthy": b.is_healthy(),
+                }
+                for b in self._browsers
+            ],
+            "max_browsers": self.size,
+            "contexts_per_browser": self.contexts_per_browser,
+            **self.stats,
+        }
+
+
+# Singleton instance
+browser_pool = BrowserPool()
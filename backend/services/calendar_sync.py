@@ -0,0 +1,359 @@
+"""
+Calendar Sync Service - Local cache of Google Calendar events
+
+The WhatsApp / email message pages used to build a Calendar client and
+re-download 21-60 days of events on every load, with the blocking
+googleapiclient call running inside the async handler. Instead:
+
+- A scheduler job (every CALENDAR_SYNC_INTERVAL_MINUTES) syncs the primary
+  calendar into db.calendar_events. The first run is a full sync (events
+  that end after now - CALENDAR_SYNC_PAST_DAYS); later runs send the stored
+  syncToken and only receive changed / cancelled events. A 410 response
+  (token expired) falls back to a full sync.
+- Every Google API call (credential refresh, service build, list pages)
+  runs in a worker thread via asyncio.to_thread.
+- Each cached event keeps its Google fields plus start_at / end_at (UTC ISO)
+  and attendee_emails (lowercase, multikey index), so "events in the next
+  N days" and "meetings with this contact" are indexed queries.
+
+Readers call ensure_fresh() first, which only syncs inline when the cache
+is older than CALENDAR_SYNC_MAX_STALENESS_MINUTES (e.g. scheduler not
+running yet); if that sync fails they keep serving the cached events.
+"""
+
+import asyncio
+import logging
+import uuid
+from datetime import datetime, timezone, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+from pymongo import DeleteOne, ReplaceOne
+
+from database import db
+from config import (
+    GOOGLE_CLIENT_ID,
+    GOOGLE_CLIENT_SECRET,
+    CALENDAR_SYNC_MAX_STALENESS_MINUTES,
+    CALENDAR_SYNC_PAST_DAYS
+)
+
+logger = logging.getLogger('calendar_sync')
+
+CALENDAR_SCOPES = [
+    "https://www.googleapis.com/auth/calendar.readonly",
+    "https://www.googleapis.com/auth/calendar.events",
+]
+LIST_PAGE_SIZE = 2500  # Calendar API maximum
+
+# Cache bookkeeping fields, hidden from readers (events come back in Google's format)
+INTERNAL_FIELDS = ["calendar_id", "start_at", "end_at", "attendee_emails", "synced_at", "sync_run"]
+EVENT_PROJECTION = {"_id": 0, **{field: 0 for field in INTERNAL_FIELDS}}
+
+
+class SyncTokenExpired(Exception):
+    """The stored syncToken is no longer valid (HTTP 410); a full sync is required."""
+
+
+def _iso(dt: datetime) -> str:
+    return dt.astimezone(timezone.utc).isoformat(timespec="seconds")
+
+
+def event_time(value: Optional[Dict[str, Any]]) -> Optional[str]:
+    """UTC ISO string for a Google start/end object (all-day dates at 00:00 UTC)."""
+    if not value:
+        return None
+    try:
+        if value.get("dateTime"):
+            return _iso(datetime.fromisoformat(value["dateTime"].replace("Z", "+00:00")))
+        if value.get("date"):
+            return _iso(datetime.fromisoformat(value["date"]).replace(tzinfo=timezone.utc))
+    except (ValueError, TypeError):
+        pass
+    return None
+
+
+def event_document(event: Dict[str, Any], calendar_id: str, sync_run: str, synced_at: str) -> Dict[str, Any]:
+    """Cached form of a Google event: the event itself plus indexed fields."""
+    start_at = event_time(event.get("start"))
+    emails = {
+        (attendee.get("email") or "").lower()
+        for attendee in event.get("attendees") or []
+    }
+    emails.discard("")
+    return {
+        **event,
+        "calendar_id": calendar_id,
+        "start_at": start_at,
+        "end_at": event_time(event.get("end")) or start_at,
+        "attendee_emails": sorted(emails),
+        "synced_at": synced_at,
+        "sync_run": sync_run,
+    }
+
+
+def _is_gone(error: Exception) -> bool:
+    status = getattr(getattr(error, "resp", None), "status", None)
+    return str(status) == "410"
+
+
+# =============================================================================
+# GOOGLE API (blocking - always called through asyncio.to_thread)
+# =============================================================================
+
+def _google_credentials(credentials_dict: Dict[str, Any]):
+    from google.oauth2.credentials import Credentials
+
+    return Credentials(
+        token=credentials_dict.get("token"),
+        refresh_token=credentials_dict.get("refresh_token"),
+        token_uri=credentials_dict.get("token_uri", "https://oauth2.googleapis.com/token"),
+        client_id=credentials_dict.get("client_id", GOOGLE_CLIENT_ID),
+        client_secret=credentials_dict.get("client_secret", GOOGLE_CLIENT_SECRET),
+        scopes=credentials_dict.get("scopes", CALENDAR_SCOPES)
+    )
+
+
+def _refresh_credentials(credentials_dict: Dict[str, Any]) -> Dict[str, Any]:
+    """Stored credentials with a fresh access token (unchanged if still valid)."""
+    from google.auth.transport.requests import Request as GoogleRequest
+
+    credentials = _google_credentials(credentials_dict)
+    if credentials.expired and credentials.refresh_token:
+        credentials.refresh(GoogleRequest())
+        return {
+            **credentials_dict,
+            "token": credentials.token,
+            "expiry": credentials.expiry.isoformat() if credentials.expiry else None
+        }
+    return credentials_dict
+
+
+def build_calendar_service(credentials_dict: Dict[str, Any]):
+    """Calendar v3 client for already refreshed credentials."""
+    from googleapiclient.discovery import build
+
+    return build('calendar', 'v3', credentials=_google_credentials(credentials_dict), cache_discovery=False)
+
+
+class CalendarSync:
+    """Syncs one Google calendar into db.calendar_events and answers queries from it."""
+
+    def __init__(
+        self,
+        calendar_id: str = "primary",
+        service_factory: Optional[Callable[[Dict[str, Any]], Any]] = None,
+        credentials_refresher: Optional[Callable[[Dict[str, Any]], Dict[str, Any]]] = None,
+        past_days: int = CALENDAR_SYNC_PAST_DAYS,
+        max_staleness_minutes: int = CALENDAR_SYNC_MAX_STALENESS_MINUTES
+    ):
+        self.calendar_id = calendar_id
+        self.service_factory = service_factory or build_calendar_service
+        self.credentials_refresher = credentials_refresher or _refresh_credentials
+        self.past_days = past_days
+        self.max_staleness = timedelta(minutes=max_staleness_minutes)
+        self._lock = asyncio.Lock()
+        self.stats = {
+            "full_syncs": 0,
+            "incremental_syncs": 0,
+            "api_pages": 0,
+            "events_upserted": 0,
+            "events_deleted": 0,
+        }
+
+    # ------------------------------------------------------------------ sync
+
+    async def _get_state(self) -> Dict[str, Any]:
+        return await db.calendar_sync_state.find_one({"calendar_id": self.calendar_id}, {"_id": 0}) or {}
+
+    async def _save_state(self, fields: Dict[str, Any]):
+        await db.calendar_sync_state.update_one(
+            {"calendar_id": self.calendar_id},
+            {"$set": fields},
+            upsert=True
+        )
+
+    async def _credentials(self, settings: Dict[str, Any]) -> Dict[str, Any]:
+        stored = settings.get("calendar_credentials") or {}
+        credentials = await asyncio.to_thread(self.credentials_refresher, stored)
+        if credentials.get("token") != stored.get("token"):
+            await db.settings.update_one({}, {"$set": {"calendar_credentials": credentials}})
+        return credentials
+
+    async def _list_pages(self, service, params: Dict[str, Any]):
+        """Yield (items, next_sync_token) for each page of events().list."""
+        page_token = None
+        while True:
+            request = {**params, "maxResults": LIST_PAGE_SIZE}
+            if page_token:
+                request["pageToken"] = page_token
+            try:
+                response = await asyncio.to_thread(lambda: service.events().list(**request).execute())
+            except Exception as e:
+                if _is_gone(e):
+                    raise SyncTokenExpired() from e
+                raise
+            self.stats["api_pages"] += 1
+            page_token = response.get("nextPageToken")
+            yield response.get("items", []), response.get("nextSyncToken")
+            if not page_token:
+                return
+
+    async def _apply(self, items: List[Dict[str, Any]], sync_run: str, synced_at: str):
+        ops = []
+        for event in items:
+            key = {"calendar_id": self.calendar_id, "id": event.get("id")}
+            if event.get("status") == "cancelled":
+                ops.append(DeleteOne(key))
+            else:
+                ops.append(ReplaceOne(key, event_document(event, self.calendar_id, sync_run, synced_at), upsert=True))
+        if ops:
+            result = await db.calendar_events.bulk_write(ops, ordered=False)
+            self.stats["events_upserted"] += result.upserted_count + result.modified_count
+            self.stats["events_deleted"] += result.deleted_count
+
+    async def _run(self, service, params: Dict[str, Any], sync_run: str) -> Optional[str]:
+        synced_at = _iso(datetime.now(timezone.utc))
+        next_sync_token = None
+        async for items, token in self._list_pages(service, params):
+            await self._apply(items, sync_run, synced_at)
+            next_sync_token = token or next_sync_token
+        return next_sync_token
+
+    async def sync(self, force_full: bool = False) -> Dict[str, Any]:
+        """Full or incremental sync. Safe to call concurrently (runs one at a time)."""
+        async with self._lock:
+            settings = await db.settings.find_one({}, {"_id": 0}) or {}
+            if not settings.get("calendar_connected") or not settings.get("calendar_credentials"):
+                return {"success": False, "skipped": "calendar_not_connected"}
+
+            try:
+                credentials = await self._credentials(settings)
+                service = await asyncio.to_thread(self.service_factory, credentials)
+
+                state = await self._get_state()
+                account_email = (credentials.get("email") or "").lower()
+                full = force_full or not state.get("sync_token") or state.get("account_email") != account_email
+
+                result = None
+                if not full:
+                    try:
+                        result = await self._incremental(service, state["sync_token"])
+                    except SyncTokenExpired:
+                        logger.info("Calendar syncToken expired, running full sync")
+                if result is None:
+                    result = await self._full(service)
+
+                await self._prune()
+                await self._save_state({
+                    "account_email": account_email,
+                    "last_sync_at": _iso(datetime.now(timezone.utc)),
+                    "last_error": None
+                })
+                return {"success": True, **result}
+            except Exception as e:
+                logger.error(f"Calendar sync failed: {e}")
+                await self._save_state({"last_error": str(e), "last_error_at": _iso(datetime.now(timezone.utc))})
+                raise
+
+    async def _incremental(self, service, sync_token: str) -> Dict[str, Any]:
+        params = {"calendarId": self.calendar_id, "singleEvents": True, "syncToken": sync_token}
+        next_token = await self._run(service, params, sync_run="incremental")
+        await self._save_state({"sync_token": next_token or sync_token})
+        self.stats["incremental_syncs"] += 1
+        return {"mode": "incremental"}
+
+    async def _full(self, service) -> Dict[str, Any]:
+        sync_run = str(uuid.uuid4())
+        time_min = datetime.now(timezone.utc) - timedelta(days=self.past_days)
+        params = {"calendarId": self.calendar_id, "singleEvents": True, "timeMin": _iso(time_min)}
+        next_token = await self._run(service, params, sync_run)
+
+        # Anything not returned by the full listing no longer exists
+        await db.calendar_events.delete_many({"calendar_id": self.calendar_id, "sync_run": {"$ne": sync_run}})
+
+        time_zone = None
+        try:
+            calendar_info = await asyncio.to_thread(lambda: service.calendars().get(calendarId=self.calendar_id).execute())
+            time_zone = calendar_info.get("timeZone")
+        except Exception as e:
+            logger.warning(f"Could not read calendar time zone: {e}")
+
+        await self._save_state({
+            "sync_token": next_token,
+            "time_zone": time_zone,
+            "last_full_sync_at": _iso(datetime.now(timezone.utc))
+        })
+        self.stats["full_syncs"] += 1
+        return {"mode": "full"}
+
+    async def _prune(self):
+        cutoff = _iso(datetime.now(timezone.utc) - timedelta(days=self.past_days))
+        await db.calendar_events.delete_many({"calendar_id": self.calendar_id, "end_at": {"$lt": cutoff}})
+
+    async def ensure_fresh(self):
+        """Sync inline only when the scheduled sync has not run recently."""
+        state = await self._get_state()
+        last_sync = state.get("last_sync_at")
+        if last_sync:
+            try:
+                if datetime.now(timezone.utc) - datetime.fromisoformat(last_sync) < self.max_staleness:
+                    return
+            except ValueError:
+                pass
+        try:
+            await self.sync()
+        except Exception as e:
+            logger.warning(f"Serving cached calendar events, sync failed: {e}")
+
+    async def clear(self):
+        """Forget cached events and the sync token (calendar disconnected)."""
+        await db.calendar_events.delete_many({"calendar_id": self.calendar_id})
+        await db.calendar_sync_state.delete_one({"calendar_id": self.calendar_id})
+
+    async def status(self) -> Dict[str, Any]:
+        state = await self._get_state()
+        state.pop("sync_token", None)
+        return {
+            **state,
+            "cached_events": await db.calendar_events.count_documents({"calendar_id": self.calendar_id}),
+            "stats": dict(self.stats)
+        }
+
+    # --------------------------------------------------------------- readers
+
+    def _window_query(self, days: Optional[int], attendee_email: Optional[str] = None) -> Dict[str, Any]:
+        now = datetime.now(timezone.utc)
+        # Same window as events().list(timeMin=now, timeMax=now+days): still running or starting before the end
+        query: Dict[str, Any] = {
+            "calendar_id": self.calendar_id,
+            "end_at": {"$gt": _iso(now)},
+            "status": {"$ne": "cancelled"},
+        }
+        if days is not None:
+            query["start_at"] = {"$lt": _iso(now + timedelta(days=days))}
+        if attendee_email:
+            query["attendee_emails"] = attendee_email.strip().lower()
+        return query
+
+    async def get_events(self, days: int = 21, attendee_email: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Events in the next N days (Google format, by start time), optionally for one attendee."""
+        await self.ensure_fresh()
+        return await db.calendar_events.find(
+            self._window_query(days, attendee_email), EVENT_PROJECTION
+        ).sort("start_at", 1).to_list(None)
+
+    async def time_zone(self) -> Optional[str]:
+        return (await self._get_state()).get("time_zone")
+
+
+calendar_sync = CalendarSync()
+
+
+async def sync_calendar_events_job():
+    """Scheduler entry point (scheduler_worker.py)."""
+    try:
+        result = await calendar_sync.sync()
+        if result.get("success"):
+            logger.info(f"Calendar sync ({result.get('mode')}) completed")
+    except Exception as e:
+        logger.error(f"Calendar sync job error: {e}")
@@ -0,0 +1,257 @@
+"""
+Classification Propagation Service - Set-based company / industry -> contact propagation
+
+Propagating a classification used to walk the matching contacts one by one
+(an update_one per contact and, for inbound, a unified_companies.find_one per
+related company per contact). Propagation is now planned and applied as sets:
+
+1. plan_*(): one query for the source companies, one streamed query for
+   their contacts (indexed company ids / company keys), and, for inbound,
+   one query for the classifications of every other company those contacts
+   reference. The plan lists the companies and contacts whose classification
+   would change.
+2. apply_*(): one update_many for the companies and one bulk_write of
+   UpdateMany batches for the contacts.
+
+Previews return the same plan without applying it. Industries with more than
+CLASSIFICATION_PROPAGATION_BACKGROUND_COMPANIES companies are propagated by
+run_industry_propagation() in the background, tracked in admin_operations.
+
+Rules:
+- outbound: every associated contact becomes outbound
+- inbound: a contact becomes inbound only if none of its other companies
+  (companies[].company_id outside the propagated set) is outbound
+"""
+import re
+import uuid
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional
+
+from pymongo import UpdateMany
+
+from config import CLASSIFICATION_PROPAGATION_BACKGROUND_COMPANIES, CLASSIFICATION_PROPAGATION_BATCH_SIZE
+from services.company_association import company_keys_for, ensure_company_keys
+
+logger = logging.getLogger(__name__)
+
+# Affected contacts / companies listed in previews
+PREVIEW_SAMPLE_SIZE = 100
+
+CONTACT_PLAN_PROJECTION = {
+    "_id": 0, "id": 1, "name": 1, "first_name": 1, "last_name": 1, "classification": 1, "companies.company_id": 1
+}
+
+
+def _contact_name(contact: Dict[str, Any]) -> str:
+    return contact.get("name") or f"{contact.get('first_name', '')} {contact.get('last_name', '')}".strip()
+
+
+def _chunks(items: List[Any], size: int) -> Iterable[List[Any]]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+# ============ PLAN ============
+
+async def plan_contact_propagation(
+    db,
+    company_ids: Iterable[str],
+    company_names: Iterable[str],
+    classification: str
+) -> Dict[str, Any]:
+    """
+    Contacts of the given companies (by company id, or by name through the
+    company key index) whose classification would change.
+    """
+    company_ids = sorted({cid for cid in company_ids if cid})
+    name_keys = company_keys_for(company_names)
+    conditions = []
+    if company_ids:
+        conditions += [{"company_id": {"$in": company_ids}}, {"companies.company_id": {"$in": company_ids}}]
+    if name_keys:
+        await ensure_company_keys(db)
+        conditions.append({"company_keys": {"$in": name_keys}})
+    if not conditions:
+        return {"matched": 0, "contact_ids": [], "sample": []}
+
+    source_ids = set(company_ids)
+    matched = 0
+    candidates = []  # (contact, other company ids)
+    async for contact in db.unified_contacts.find({"$or": conditions}, CONTACT_PLAN_PROJECTION):
+        matched += 1
+        if contact.get("classification") == classification:
+            continue
+        others = {
+            entry.get("company_id") for entry in contact.get("companies") or []
+            if isinstance(entry, dict) and entry.get("company_id") and entry.get("company_id") not in source_ids
+        }
+        candidates.append((contact, others))
+
+    if classification == "inbound":
+        referenced = sorted(set().union(*(others for _, others in candidates)))
+        outbound = set()
+        for chunk in _chunks(referenced, CLASSIFICATION_PROPAGATION_BATCH_SIZE):
+            async for company in db.unified_companies.find(
+                {"id": {"$in": chunk}, "classification": "outbound"}, {"_id": 0, "id": 1}
+            ):
+                outbound.add(company["id"])
+        candidates = [(contact, others) for contact, others in candidates if not others & outbound]
+
+    return {
+        "matched": matched,
+        "contact_ids": [contact["id"] for contact, _ in candidates],
+        "sample": [{"id": contact["id"], "name": _contact_name(contact)} for contact, _ in candidates[:PREVIEW_SAMPLE_SIZE]],
+    }
+
+
+def industry_companies_query(industry: Dict[str, Any]) -> Dict[str, Any]:
+    """Companies of an industry: by industry id, industry code or (case-insensitive) industry name"""
+    conditions = [{"industry_id": industry["id"]}]
+    if industry.get("code"):
+        conditions.append({"industry_code": industry["code"]})
+    if industry.get("name"):
+        conditions.append({"industry": {"$regex": f"^{re.escape(industry['name'])}$", "$options": "i"}})
+    return {"$or": conditions, "is_merged": {"$ne": True}}
+
+
+async def should_run_in_background(db, industry: Dict[str, Any]) -> bool:
+    """Industries with more than CLASSIFICATION_PROPAGATION_BACKGROUND_COMPANIES companies"""
+    companies = await db.unified_companies.count_documents(
+        industry_companies_query(industry), limit=CLASSIFICATION_PROPAGATION_BACKGROUND_COMPANIES + 1
+    )
+    return companies > CLASSIFICATION_PROPAGATION_BACKGROUND_COMPANIES
+
+
+async def plan_industry_propagation(db, industry: Dict[str, Any], classification: str) -> Dict[str, Any]:
+    """Companies of the industry whose classification would change, and the contacts of all its companies"""
+    companies = await db.unified_companies.find(
+        industry_companies_query(industry),
+        {"_id": 0, "id": 1, "name": 1, "aliases": 1, "classification": 1}
+    ).to_list(None)
+    changing = [c for c in companies if c.get("classification") != classification and c.get("id")]
+    names = [name for c in companies for name in [c.get("name"), *(c.get("aliases") or [])]]
+    contacts = await plan_contact_propagation(db, [c.get("id") for c in companies], names, classification)
+    return {
+        "companies_total": len(companies),
+        "company_ids": [c["id"] for c in changing],
+        "company_sample": [{"id": c["id"], "name": c.get("name", "Unknown")} for c in changing[:PREVIEW_SAMPLE_SIZE]],
+        "contacts": contacts,
+    }
+
+
+# ============ APPLY ============
+
+async def apply_contact_classification(db, contact_ids: List[str], classification: str, now: Optional[str] = None) -> int:
+    """Set the classification of the given contacts with one bulk write; returns the number changed"""
+    if not contact_ids:
+        return 0
+    now = now or datetime.now(timezone.utc).isoformat()
+    operations = [
+        UpdateMany({"id": {"$in": chunk}}, {"$set": {"classification": classification, "updated_at": now}})
+        for chunk in _chunks(contact_ids, CLASSIFICATION_PROPAGATION_BATCH_SIZE)
+    ]
+    result = await db.unified_contacts.bulk_write(operations, ordered=False)
+    return result.modified_count
+
+
+async def apply_industry_propagation(
+    db,
+    industry: Dict[str, Any],
+    classification: str,
+    plan: Dict[str, Any]
+) -> Dict[str, int]:
+    """Apply an industry plan: the industry, its companies and their contacts"""
+    now = datetime.now(timezone.utc).isoformat()
+    await db.industries.update_one({"id": industry["id"]}, {"$set": {"classification": classification, "updated_at": now}})
+    await db.active_sectors.update_one({"id": industry["id"]}, {"$set": {"classification": classification, "updated_at": now}})
+
+    companies_updated = 0
+    for chunk in _chunks(plan["company_ids"], CLASSIFICATION_PROPAGATION_BATCH_SIZE):
+        result = await db.unified_companies.update_many(
+            {"id": {"$in": chunk}},
+            {"$set": {"classification": classification, "updated_at": now}}
+        )
+        companies_updated += result.modified_count
+
+    contacts_updated = await apply_contact_classification(db, plan["contacts"]["contact_ids"], classification, now)
+    return {"companies_updated": companies_updated, "contacts_updated": contacts_updated}
+
+
+async def log_industry_propagation(
+    db,
+    industry_id: str,
+    classification: str,
+    result: Dict[str, int],
+    user: Optional[Dict[str, Any]] = None
+):
+    """Audit log entry of an applied industry propagation"""
+    user = user or {}
+    await db.audit_logs.insert_one({
+        "id": str(uuid.uuid4()),
+        "type": "propagation",
+        "source_type": "industry",
+        "source_id": industry_id,
+        "target_type": "company",
+        "target_classification": classification,
+        "affected_count": result["companies_updated"],
+        "contacts_updated": result["contacts_updated"],
+        "user_id": user.get("id"),
+        "user_email": user.get("email"),
+        "timestamp": datetime.now(timezone.utc).isoformat()
+    })
+
+
+# ============ BACKGROUND ============
+
+async def start_industry_propagation(
+    db,
+    industry_id: str,
+    classification: str,
+    user: Optional[Dict[str, Any]] = None
+) -> str:
+    """Record a running background propagation in admin_operations; returns its operation_id"""
+    user = user or {}
+    operation_id = str(uuid.uuid4())
+    await db.admin_operations.insert_one({
+        "operation_id": operation_id,
+        "operation_type": "classification_propagation",
+        "source_type": "industry",
+        "source_id": industry_id,
+        "target_classification": classification,
+        "initiated_by_user_id": user.get("id"),
+        "initiated_by_email": user.get("email"),
+        "run_at": datetime.now(timezone.utc).isoformat(),
+        "status": "running"
+    })
+    return operation_id
+
+
+async def run_industry_propagation(
+    db,
+    industry_id: str,
+    classification: str,
+    operation_id: str,
+    user: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """Plan and apply an industry propagation started by start_industry_propagation()"""
+    try:
+        industry = await db.industries.find_one({"id": industry_id}, {"_id": 0})
+        if not industry:
+            raise ValueError(f"Industry {industry_id} not found")
+        plan = await plan_industry_propagation(db, industry, classification)
+        result = await apply_industry_propagation(db, industry, classification, plan)
+        await log_industry_propagation(db, industry_id, classification, result, user)
+        await db.admin_operations.update_one(
+            {"operation_id": operation_id},
+            {"$set": {"status": "completed", "completed_at": datetime.now(timezone.utc).isoformat(), **result}}
+        )
+        logger.info(f"Industry {industry_id} propagated to {classification}: {result}")
+        return result
+    except Exception as e:
+        logger.error(f"Error propagating industry {industry_id} classification: {e}")
+        await db.admin_operations.update_one(
+            {"operation_id": operation_id},
+            {"$set": {"status": "failed", "error_details": [str(e)], "completed_at": datetime.now(timezone.utc).isoformat()}}
+        )
+        return {"error": str(e)}
@@ -5,12 +5,28 @@ This service provides functionality to:
 1. Find existing companies by name, alias, or normalized domain
 2. Create new (inactive) companies when no match is found
 3. Associate contacts with companies automatically
+4. Maintain the contact -> company key index
+
+Company key index: contacts are linked to companies by free-text names
+(`company`, `companies[].company_name`). Joins on those used anchored
+case-insensitive regexes, which can't use an index. Each contact now carries
+  company_key   key of `company`
+  company_keys  keys of `company` and every `companies[].company_name`
+(company_key(): lowercase, collapsed whitespace), so "contacts of company X"
+is an indexed equality lookup. Contact create/update, company renames and
+merges keep the keys in step; sync_company_keys() re-keys contacts written
+elsewhere (imports, scripts) from the updated_at watermark.
 """
 import re
 import uuid
 import logging
 from datetime import datetime, timezone
-from typing import Optional, Tuple
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from pymongo import UpdateOne
+
+from config import COMPANY_KEYS_BATCH_SIZE
+from utils.timestamps import timestamp_query, utc_now
 
 logger = logging.getLogger(__name__)
 
@@ -256,3 +272,119 @@ async def find_company_by_email_domain(db, contact_email: str) -> Optional[dict]
         }
     
     return None
+
+
+# ============ COMPANY KEY INDEX ============
+
+def company_key(name: Any) -> Optional[str]:
+    """Case-insensitive key of a company name ("  ACME  Corp" -> "acme corp"), None if empty"""
+    if not isinstance(name, str):
+        return None
+    key = " ".join(name.split()).lower()
+    return key or None
+
+
+def company_keys_for(names: Iterable[Any]) -> List[str]:
+    """Distinct keys of several names (a company and its aliases)"""
+    return sorted({key for key in (company_key(name) for name in names) if key})
+
+
+def company_key_fields(contact: Dict[str, Any]) -> Dict[str, Any]:
+    """company_key / company_keys of a contact document (set them together with company / companies)"""
+    names = [contact.get("company")]
+    for entry in contact.get("companies") or []:
+        if isinstance(entry, dict):
+            names.append(entry.get("company_name"))
+    return {"company_key": company_key(contact.get("company")), "company_keys": company_keys_for(names)}
+
+
+async def refresh_contact_company_keys(
+    db,
+    query: Optional[Dict[str, Any]] = None,
+    batch_size: int = COMPANY_KEYS_BATCH_SIZE
+) -> int:
+    """Recompute the keys of the matching contacts, writing only those that changed"""
+    projection = {"_id": 1, "company": 1, "companies": 1, "company_key": 1, "company_keys": 1}
+    ops = []
+    updated = 0
+    async for contact in db.unified_contacts.find(query or {}, projection):
+        fields = company_key_fields(contact)
+        if all(field in contact and contact[field] == value for field, value in fields.items()):
+            continue
+        ops.append(UpdateOne({"_id": contact["_id"]}, {"$set": fields}))
+        if len(ops) >= batch_size:
+            await db.unified_contacts.bulk_write(ops, ordered=False)
+            updated += len(ops)
+            ops = []
+    if ops:
+        await db.unified_contacts.bulk_write(ops, ordered=False)
+        updated += len(ops)
+    return updated
+
+
+async def rename_contact_company(
+    db,
+    old_names: Iterable[Any],
+    new_name: str,
+    extra_set: Optional[Dict[str, Any]] = None
+) -> int:
+    """
+    Point contacts whose `company` is one of old_names (case-insensitive) at
+    new_name, keeping the keys in step. Returns the number of contacts changed.
+    """
+    old_names = [name for name in old_names if isinstance(name, str)]
+    old_keys = company_keys_for(old_names)
+    if not old_keys:
+        return 0
+    await ensure_company_keys(db)
+    # Writers that set `company` without the keys leave them stale until the
+    # next sync; re-key the name matches (any case) so the rename doesn't skip them
+    await refresh_contact_company_keys(db, {"$or": [
+        {"company": {"$regex": f"^{re.escape(name)}$", "$options": "i"}} for name in old_names
+    ]})
+    result = await db.unified_contacts.update_many(
+        {"company_key": {"$in": old_keys}},
+        {"$set": {"company": new_name, "company_key": company_key(new_name), **(extra_set or {})}}
+    )
+    if result.modified_count:
+        # company_keys still holds the old keys until refreshed
+        await refresh_contact_company_keys(db, {"company_keys": {"$in": old_keys}})
+    return result.modified_count
+
+
+async def sync_company_keys(db, full: bool = False) -> Dict[str, Any]:
+    """
+    Key contacts that have no keys yet or whose updated_at moved past the
+    watermark (every contact when full=True).
+    """
+    started = utc_now()
+    state = await db.company_keys_state.find_one({"_type": "main"}, {"_id": 0})
+    if full or not state or not state.get("watermark"):
+        query = {}
+    else:
+        query = {"$or": [
+            {"company_keys": {"$exists": False}},
+            timestamp_query("updated_at", gt=state["watermark"]),
+        ]}
+    updated = await refresh_contact_company_keys(db, query)
+    summary = {"full": not query, "updated": updated, "watermark": started, "finished_at": utc_now()}
+    await db.company_keys_state.update_one({"_type": "main"}, {"$set": summary}, upsert=True)
+    return {"success": True, **summary}
+
+
+async def ensure_company_keys(db) -> Optional[Dict[str, Any]]:
+    """Key every contact once if the index was never built (first lookup after deploy)"""
+    if await db.company_keys_state.find_one({"_type": "main"}, {"_id": 1}):
+        return None
+    return await sync_company_keys(db, full=True)
+
+
+async def sync_company_keys_job(full: bool = False):
+    """Scheduler entry point"""
+    from database import db
+    
+    try:
+        result = await sync_company_keys(db, full=full)
+        logger.info(f"Company keys synced: {result['updated']} contacts re-keyed")
+    except Exception as e:
+        logger.error(f"Error syncing contact company keys: {e}")
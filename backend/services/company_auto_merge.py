@@ -16,6 +16,8 @@ from datetime import datetime, timezone
 from typing import List, Dict, Optional, Tuple
 from collections import defaultdict
 
+from services.company_association import rename_contact_company
+
 try:
     from rapidfuzz import fuzz, process
     FUZZY_AVAILABLE = True
@@ -436,11 +438,9 @@ async def merge_company_into_primary(
     
     # 5. Update contacts
     if secondary_name:
-        contacts_result = await db.unified_contacts.update_many(
-            {"company": {"$regex": f"^{re.escape(secondary_name)}$", "$options": "i"}},
-            {"$set": {"company": primary_name, "company_id": primary_id, "updated_at": now}}
+        result['contacts_updated'] = await rename_contact_company(
+            db, [secondary_name], primary_name, {"company_id": primary_id, "updated_at": now}
         )
-        result['contacts_updated'] = contacts_result.modified_count
     
     # 6. Update cases
     if secondary_name:
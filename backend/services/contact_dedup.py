@@ -0,0 +1,537 @@
+"""
+Contact Dedup Engine - Duplicate contact candidates, cached
+
+The find-duplicates endpoint used to load at most 20,000 contacts, run
+pairwise difflib comparisons per company on the event loop, and treat the
+email and phone methods as separate passes. This engine:
+
+1. Blocks contacts on keys:
+       email:<normalized email>        (email + emails[])
+       phone:<last 10 digits>          (phone + phones[])
+       linkedin:in/<profile slug>
+       company:<normalized company>    (names are scored inside the block)
+2. Joins candidates with union-find across all key types, so a contact
+   sharing a phone with one record and an email with another ends up in a
+   single group.
+3. Scores name similarity with rapidfuzz inside company blocks (difflib when
+   rapidfuzz is not installed, like company_auto_merge).
+4. Runs the grouping in a worker process, off the event loop.
+
+Results are persisted one group per document in `contact_duplicate_candidates`
+(the contact counterpart of `merge_candidates_cache` for companies), and each
+contact's keys in `contact_dedup_keys`. When contacts change, only their
+neighbourhood is regrouped: contacts they can link to (exact keys whose block
+is within CONTACT_DEDUP_MAX_KEY_BLOCK, similar names in their company blocks)
+plus the current groups of all of those.
+"""
+import asyncio
+import logging
+import re
+import unicodedata
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timezone
+from difflib import SequenceMatcher
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from pymongo import DeleteOne, ReplaceOne
+
+from config import (
+    CONTACT_DEDUP_NAME_THRESHOLD,
+    CONTACT_DEDUP_MAX_KEY_BLOCK,
+    CONTACT_DEDUP_INCREMENTAL_MAX_CONTACTS,
+)
+from database import db
+from utils.timestamps import timestamp_query
+
+try:
+    from rapidfuzz import fuzz, process
+    FUZZY_AVAILABLE = True
+except ImportError:
+    FUZZY_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+DEDUP_CONTACT_PROJECTION = {
+    "_id": 0, "id": 1, "name": 1, "first_name": 1, "last_name": 1,
+    "email": 1, "emails.email": 1, "phone": 1, "phones.raw_input": 1, "phones.e164": 1,
+    "company": 1, "linkedin_url": 1,
+}
+
+# Confidence of a match through each exact key (name matches use their score)
+KEY_CONFIDENCE = {"email": 100, "linkedin": 100, "phone": 95}
+
+WRITE_BATCH_SIZE = 1000
+
+_LINKEDIN_PROFILE = re.compile(r"linkedin\.com/(in|pub)/([^/?#\s]+)", re.IGNORECASE)
+
+
+# ============ KEYS ============
+
+def normalize_name(name) -> str:
+    """Lowercase alphanumerics with accents folded ("José Núñez" -> "josenunez")"""
+    if not name or not isinstance(name, str):
+        return ""
+    folded = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode("ascii")
+    return re.sub(r'[^a-z0-9]', '', folded.lower())
+
+
+def contact_name(contact: Dict[str, Any]) -> str:
+    return contact.get("name") or f"{contact.get('first_name') or ''} {contact.get('last_name') or ''}".strip()
+
+
+def contact_emails(contact: Dict[str, Any]) -> List[str]:
+    emails = set()
+    if isinstance(contact.get("email"), str) and contact["email"].strip():
+        emails.add(contact["email"].lower().strip())
+    for e in contact.get("emails") or []:
+        if isinstance(e, dict) and isinstance(e.get("email"), str) and e["email"].strip():
+            emails.add(e["email"].lower().strip())
+    return sorted(emails)
+
+
+def _last_10_digits(raw) -> Optional[str]:
+    digits = re.sub(r'[^0-9]', '', raw) if isinstance(raw, str) else ""
+    return digits[-10:] if len(digits) >= 10 else None
+
+
+def contact_phones(contact: Dict[str, Any]) -> List[str]:
+    phones = {_last_10_digits(contact.get("phone"))}
+    for p in contact.get("phones") or []:
+        if isinstance(p, dict):
+            phones.add(_last_10_digits(p.get("raw_input") or p.get("e164")))
+    phones.discard(None)
+    return sorted(phones)
+
+
+def normalize_linkedin(url) -> Optional[str]:
+    """linkedin.com/in/<slug> profile key, ignoring scheme, subdomain, query and trailing slash"""
+    match = _LINKEDIN_PROFILE.search(url) if isinstance(url, str) else None
+    return f"{match.group(1).lower()}/{match.group(2).lower()}" if match else None
+
+
+def contact_keys(contact: Dict[str, Any]) -> List[str]:
+    """Blocking keys of a contact"""
+    keys = [f"email:{e}" for e in contact_emails(contact)]
+    keys += [f"phone:{p}" for p in contact_phones(contact)]
+    linkedin = normalize_linkedin(contact.get("linkedin_url"))
+    if linkedin:
+        keys.append(f"linkedin:{linkedin}")
+    company = normalize_name(contact.get("company"))
+    if company:
+        keys.append(f"company:{company}")
+    return keys
+
+
+# ============ GROUPING (runs in the worker process) ============
+
+class UnionFind:
+    """Disjoint sets over contact ids (path halving, union by size)"""
+
+    def __init__(self):
+        self.parent: Dict[str, str] = {}
+        self.size: Dict[str, int] = {}
+
+    def find(self, item: str) -> str:
+        if item not in self.parent:
+            self.parent[item] = item
+            self.size[item] = 1
+            return item
+        while self.parent[item] != item:
+            self.parent[item] = self.parent[self.parent[item]]
+            item = self.parent[item]
+        return item
+
+    def union(self, a: str, b: str) -> str:
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a == root_b:
+            return root_a
+        if self.size[root_a] < self.size[root_b]:
+            root_a, root_b = root_b, root_a
+        self.parent[root_b] = root_a
+        self.size[root_a] += self.size[root_b]
+        return root_a
+
+
+def _similar_names(named: List[Tuple[str, str]], threshold: int) -> Iterable[Tuple[str, str, float]]:
+    """Pairs (id, id, score 0-100) of a company block whose names score >= threshold"""
+    names = [name for _, name in named]
+    for i, (contact_id, name) in enumerate(named[:-1]):
+        if FUZZY_AVAILABLE:
+            matches = process.extract(name, names[i + 1:], scorer=fuzz.ratio, score_cutoff=threshold, limit=None)
+            for _, score, j in matches:
+                yield contact_id, named[i + 1 + j][0], score
+        else:
+            for j, other in enumerate(names[i + 1:]):
+                score = SequenceMatcher(None, name, other).ratio() * 100
+                if score >= threshold:
+                    yield contact_id, named[i + 1 + j][0], score
+
+
+def _name_matches(name: str, named: List[Tuple[str, str]], threshold: int) -> List[str]:
+    """Ids of (id, name) pairs whose name scores >= threshold against name"""
+    if FUZZY_AVAILABLE:
+        names = [other for _, other in named]
+        return [named[j][0] for _, _, j in process.extract(name, names, scorer=fuzz.ratio, score_cutoff=threshold, limit=None)]
+    return [
+        contact_id for contact_id, other in named
+        if SequenceMatcher(None, name, other).ratio() * 100 >= threshold
+    ]
+
+
+def find_duplicate_groups(
+    contacts: List[Dict[str, Any]],
+    threshold: int = CONTACT_DEDUP_NAME_THRESHOLD,
+    max_key_block: int = CONTACT_DEDUP_MAX_KEY_BLOCK,
+    oversized_keys: Iterable[str] = ()
+) -> Tuple[List[Dict[str, Any]], Dict[str, List[str]]]:
+    """
+    Group duplicate contacts. Pure function (no I/O) so it can run in a worker process.
+    oversized_keys are exact keys whose full block (beyond `contacts`) is
+    larger than max_key_block; they never link.
+
+    Returns (groups, keys_by_contact). Each group:
+        {contact_ids, size, match_type, match_key, match_types, confidence, name_score}
+    where match_type / match_key describe the strongest link in the group.
+    """
+    keys_by_contact: Dict[str, List[str]] = {}
+    names: Dict[str, str] = {}
+    company_label: Dict[str, str] = {}
+    blocks: Dict[str, List[str]] = defaultdict(list)
+
+    for contact in contacts:
+        contact_id = contact.get("id")
+        if not contact_id:
+            continue
+        keys = contact_keys(contact)
+        keys_by_contact[contact_id] = keys
+        names[contact_id] = normalize_name(contact_name(contact))
+        for key in keys:
+            blocks[key].append(contact_id)
+            if key.startswith("company:"):
+                company_label.setdefault(key, contact.get("company"))
+
+    oversized = set(oversized_keys)
+
+    # Links: (a, b, match_type, match_key, confidence, name_score)
+    links = []
+    for key, ids in blocks.items():
+        if len(ids) < 2:
+            continue
+        kind, value = key.split(":", 1)
+        if kind == "company":
+            named = [(contact_id, names[contact_id]) for contact_id in ids if names[contact_id]]
+            for a, b, score in _similar_names(named, threshold):
+                links.append((a, b, "name_company", company_label[key], round(score), score))
+        elif len(ids) <= max_key_block and key not in oversized:
+            for other in ids[1:]:
+                links.append((ids[0], other, kind, value, KEY_CONFIDENCE[kind], None))
+
+    uf = UnionFind()
+    for a, b, *_ in links:
+        uf.union(a, b)
+
+    by_root: Dict[str, Dict[str, Any]] = {}
+    for a, b, match_type, match_key, confidence, name_score in links:
+        group = by_root.setdefault(uf.find(a), {
+            "ids": set(), "types": set(), "best": None, "name_score": None
+        })
+        group["ids"].update((a, b))
+        group["types"].add(match_type)
+        if group["best"] is None or confidence > group["best"][0]:
+            group["best"] = (confidence, match_type, match_key)
+        if name_score is not None and (group["name_score"] is None or name_score > group["name_score"]):
+            group["name_score"] = name_score
+
+    groups = []
+    for group in by_root.values():
+        confidence, match_type, match_key = group["best"]
+        groups.append({
+            "contact_ids": sorted(group["ids"]),
+            "size": len(group["ids"]),
+            "match_type": match_type,
+            "match_key": match_key,
+            "match_types": sorted(group["types"]),
+            "confidence": confidence,
+            "name_score": round(group["name_score"], 1) if group["name_score"] is not None else None,
+        })
+    groups.sort(key=lambda g: (-g["confidence"], -g["size"], g["contact_ids"][0]))
+    return groups, keys_by_contact
+
+
+# ============ WORKER PROCESS ============
+
+_executor: Optional[ProcessPoolExecutor] = None
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=1)
+    return _executor
+
+
+def shutdown_dedup_worker():
+    """Stop the worker process (called on shutdown)"""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+async def group_in_worker(
+    contacts: List[Dict[str, Any]], oversized_keys: Iterable[str] = ()
+) -> Tuple[List[Dict[str, Any]], Dict[str, List[str]]]:
+    """Run find_duplicate_groups in the worker process (a thread if the pool broke)"""
+    args = (contacts, CONTACT_DEDUP_NAME_THRESHOLD, CONTACT_DEDUP_MAX_KEY_BLOCK, list(oversized_keys))
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(_get_executor(), find_duplicate_groups, *args)
+    except BrokenProcessPool:
+        logger.warning("Contact dedup worker process died, grouping in a thread")
+        shutdown_dedup_worker()
+        return await asyncio.to_thread(find_duplicate_groups, *args)
+
+
+# ============ CACHE ============
+
+async def _load_contacts(contact_ids: Optional[Iterable[str]] = None) -> List[Dict[str, Any]]:
+    query: Dict[str, Any] = {"is_merged": {"$ne": True}}
+    if contact_ids is not None:
+        query["id"] = {"$in": list(contact_ids)}
+    return [
+        c async for c in db.unified_contacts.find(query, DEDUP_CONTACT_PROJECTION).batch_size(WRITE_BATCH_SIZE)
+    ]
+
+
+async def _insert_in_batches(collection, docs: List[Dict[str, Any]]):
+    for start in range(0, len(docs), WRITE_BATCH_SIZE):
+        await collection.insert_many(docs[start:start + WRITE_BATCH_SIZE], ordered=False)
+
+
+def _group_docs(groups: List[Dict[str, Any]], now: str) -> List[Dict[str, Any]]:
+    return [{"key": g["contact_ids"][0], **g, "updated_at": now} for g in groups]
+
+
+async def refresh_contact_candidates_cache() -> Dict[str, Any]:
+    """Regroup every active contact and replace the cache"""
+    started = datetime.now(timezone.utc).isoformat()
+    logger.info("Starting contact duplicate candidates refresh...")
+
+    try:
+        contacts = await _load_contacts()
+        groups, keys_by_contact = await group_in_worker(contacts)
+
+        await db.contact_duplicate_candidates.delete_many({})
+        await _insert_in_batches(db.contact_duplicate_candidates, _group_docs(groups, started))
+        await db.contact_dedup_keys.delete_many({})
+        await _insert_in_batches(db.contact_dedup_keys, [
+            {"contact_id": contact_id, "keys": keys} for contact_id, keys in keys_by_contact.items() if keys
+        ])
+
+        summary = {
+            "contacts_scanned": len(contacts),
+            "groups": len(groups),
+            "duplicates": sum(g["size"] for g in groups),
+        }
+        # Changes made while the scan ran are picked up by the next incremental run
+        await db.contact_dedup_state.update_one(
+            {"_type": "main"},
+            {"$set": {"watermark": started, "last_full_refresh": started, **summary}},
+            upsert=True
+        )
+        logger.info(f"Contact duplicate candidates refreshed: {summary}")
+        return {"success": True, "mode": "full", **summary}
+
+    except Exception as e:
+        logger.error(f"Error refreshing contact duplicate candidates: {e}")
+        return {"success": False, "error": str(e)}
+
+
+async def _block_sizes(keys: Iterable[str], contact_ids: List[str], changed: Dict[str, List[str]]) -> Dict[str, int]:
+    """
+    Contacts per exact key once the changes land: stored keys of the other
+    contacts plus the current keys of the changed ones (contact_ids; merged
+    or deleted ones are missing from `changed`).
+    """
+    wanted = {key for key in keys if not key.startswith("company:")}
+    sizes: Dict[str, int] = defaultdict(int)
+    if wanted:
+        async for row in db.contact_dedup_keys.aggregate([
+            {"$match": {"keys": {"$in": list(wanted)}, "contact_id": {"$nin": contact_ids}}},
+            {"$unwind": "$keys"},
+            {"$match": {"keys": {"$in": list(wanted)}}},
+            {"$group": {"_id": "$keys", "count": {"$sum": 1}}},
+        ]):
+            sizes[row["_id"]] = row["count"]
+    for current_keys in changed.values():
+        for key in current_keys:
+            if key in wanted:
+                sizes[key] += 1
+    return dict(sizes)
+
+
+async def _neighbourhood(contacts: List[Dict[str, Any]], contact_ids: List[str], keys: set) -> Optional[set]:
+    """
+    Contacts the changed ones (`contacts`, current state) can link to, plus
+    the members of every current group among them. Only what can form a link
+    in find_duplicate_groups is followed: exact keys (old and new) whose
+    block stays within CONTACT_DEDUP_MAX_KEY_BLOCK, and similar names in the
+    new company blocks. Links between other contacts already sit in their
+    groups. None when it outgrows the incremental limit.
+    """
+    affected = set(contact_ids)
+    changed = {c["id"]: contact_keys(c) for c in contacts}
+
+    sizes = await _block_sizes(keys, contact_ids, changed)
+    small = [key for key, size in sizes.items() if 1 < size <= CONTACT_DEDUP_MAX_KEY_BLOCK]
+    if small:
+        async for doc in db.contact_dedup_keys.find(
+            {"keys": {"$in": small}, "contact_id": {"$nin": contact_ids}}, {"_id": 0, "contact_id": 1}
+        ):
+            affected.add(doc["contact_id"])
+
+    names_by_block: Dict[str, List[str]] = defaultdict(list)
+    for contact in contacts:
+        name = normalize_name(contact_name(contact))
+        for key in changed[contact["id"]]:
+            if name and key.startswith("company:"):
+                names_by_block[key].append(name)
+    for key, names in names_by_block.items():
+        block = [
+            doc["contact_id"] async for doc in db.contact_dedup_keys.find(
+                {"keys": key, "contact_id": {"$nin": contact_ids}}, {"_id": 0, "contact_id": 1}
+            )
+        ]
+        named = [
+            (c["id"], normalize_name(contact_name(c)))
+            for c in await _load_contacts(block)
+        ]
+        named = [(contact_id, name) for contact_id, name in named if name]
+        for name in names:
+            affected.update(_name_matches(name, named, CONTACT_DEDUP_NAME_THRESHOLD))
+
+    async for group in db.contact_duplicate_candidates.find(
+        {"contact_ids": {"$in": list(affected)}}, {"_id": 0, "contact_ids": 1}
+    ):
+        affected.update(group["contact_ids"])
+    if len(affected) > CONTACT_DEDUP_INCREMENTAL_MAX_CONTACTS:
+        return None
+    return affected
+
+
+async def update_contact_candidates(contact_ids: Iterable[str]) -> Dict[str, Any]:
+    """
+    Regroup the contacts that changed and everything linked to them.
+
+    A change can only split the groups the changed contacts were in and join
+    them with contacts they now link to, so regrouping that neighbourhood
+    (_neighbourhood) replaces exactly the groups that could have changed.
+    Merged or deleted contacts drop out of the cache.
+    """
+    contact_ids = list(dict.fromkeys(c for c in contact_ids if c))
+    if not contact_ids:
+        return {"success": True, "mode": "incremental", "contacts_changed": 0}
+
+    now = datetime.now(timezone.utc).isoformat()
+    try:
+        keys = set()
+        async for doc in db.contact_dedup_keys.find({"contact_id": {"$in": contact_ids}}, {"_id": 0, "keys": 1}):
+            keys.update(doc["keys"])
+        changed = await _load_contacts(contact_ids)
+        for contact in changed:
+            keys.update(contact_keys(contact))
+
+        affected = await _neighbourhood(changed, contact_ids, keys)
+        if affected is None:
+            logger.info(f"Contact dedup neighbourhood of {len(contact_ids)} changes is too large, running a full refresh")
+            return await refresh_contact_candidates_cache()
+
+        contacts = await _load_contacts(affected)
+        # Blocks only partly loaded here still link only if small enough in full
+        sizes = await _block_sizes(
+            (key for contact in contacts for key in contact_keys(contact)),
+            contact_ids, {c["id"]: contact_keys(c) for c in changed}
+        )
+        oversized = [key for key, size in sizes.items() if size > CONTACT_DEDUP_MAX_KEY_BLOCK]
+        groups, keys_by_contact = await group_in_worker(contacts, oversized)
+
+        affected_list = list(affected)
+        await db.contact_duplicate_candidates.delete_many({"contact_ids": {"$in": affected_list}})
+        await _insert_in_batches(db.contact_duplicate_candidates, _group_docs(groups, now))
+
+        key_ops = [
+            ReplaceOne({"contact_id": contact_id}, {"contact_id": contact_id, "keys": keys_by_contact[contact_id]}, upsert=True)
+            if keys_by_contact.get(contact_id) else DeleteOne({"contact_id": contact_id})
+            for contact_id in affected_list
+        ]
+        for start in range(0, len(key_ops), WRITE_BATCH_SIZE):
+            await db.contact_dedup_keys.bulk_write(key_ops[start:start + WRITE_BATCH_SIZE], ordered=False)
+
+        return {
+            "success": True,
+            "mode": "incremental",
+            "contacts_changed": len(contact_ids),
+            "contacts_regrouped": len(affected),
+            "groups": len(groups),
+        }
+
+    except Exception as e:
+        logger.error(f"Error updating contact duplicate candidates: {e}")
+        return {"success": False, "error": str(e)}
+
+
+async def sync_contact_candidates_job() -> Dict[str, Any]:
+    """
+    Scheduler entry point: full refresh when the cache was never built,
+    otherwise regroup contacts whose updated_at moved past the watermark.
+    """
+    state = await db.contact_dedup_state.find_one({"_type": "main"}, {"_id": 0})
+    if not state or not state.get("watermark"):
+        return await refresh_contact_candidates_cache()
+
+    started = datetime.now(timezone.utc).isoformat()
+    changed = [
+        c["id"] async for c in db.unified_contacts.find(
+            timestamp_query("updated_at", gt=state["watermark"]), {"_id": 0, "id": 1}
+        ) if c.get("id")
+    ]
+    result = await update_contact_candidates(changed)
+    if result.get("success"):
+        await db.contact_dedup_state.update_one({"_type": "main"}, {"$set": {"watermark": started}})
+    return result
+
+
+async def get_contact_candidates(
+    match_type: Optional[str] = None,
+    min_name_score: Optional[float] = None,
+    limit: int = 50
+) -> Dict[str, Any]:
+    """
+    Cached groups, strongest first, optionally restricted to groups linked by
+    match_type ("email", "phone", "linkedin", "name_company").
+    """
+    query: Dict[str, Any] = {}
+    if match_type:
+        query["match_types"] = match_type
+    if min_name_score is not None:
+        query["name_score"] = {"$gte": min_name_score}
+
+    totals = await db.contact_duplicate_candidates.aggregate([
+        {"$match": query},
+        {"$group": {"_id": None, "groups": {"$sum": 1}, "duplicates": {"$sum": "$size"}}}
+    ]).to_list(1)
+    groups = await db.contact_duplicate_candidates.find(query, {"_id": 0}).sort(
+        [("confidence", -1), ("size", -1), ("key", 1)]
+    ).to_list(limit)
+
+    return {
+        "total_groups": totals[0]["groups"] if totals else 0,
+        "total_duplicates": totals[0]["duplicates"] if totals else 0,
+        "groups": groups,
+    }
+
+
+async def get_dedup_state() -> Optional[Dict[str, Any]]:
+    return await db.contact_dedup_state.find_one({"_type": "main"}, {"_id": 0})
@@ -15,7 +15,11 @@ import logging
 from datetime import datetime, timezone, timedelta
 from typing import List, Optional, Dict, Any
 from database import db
+from utils.timestamps import parse_timestamp, timestamp_query, utc_now
 from services.email_service import email_service
+from services.email_templates import render_queue_items
+from services.job_wakeup import job_wakeup, CHANNEL_EMAIL_QUEUE
+from services.stats_counters import count_email_event, ensure_counters, get_counters, increment, track_change
 
 logger = logging.getLogger(__name__)
 
@@ -38,10 +42,13 @@ class EmailQueueService:
         contact_email: str,
         contact_name: str,
         subject: str,
-        body_html: str,
+        body_html: str = None,
         body_text: str = None,
         scheduled_at: datetime = None,
-        metadata: Dict[str, Any] = None
+        metadata: Dict[str, Any] = None,
+        template_id: str = None,
+        template_version: str = None,
+        template_vars: Dict[str, Any] = None
     ) -> str:
         """
         Add an email to the queue
@@ -52,10 +59,12 @@ class EmailQueueService:
             contact_email: Recipient email
             contact_name: Recipient name
             subject: Email subject
-            body_html: HTML body content
-            body_text: Plain text body (optional)
+            body_html: HTML body content (omit when using a template)
+            body_text: Plain text body (optional, derived from the HTML at send time)
             scheduled_at: When to send (default: now)
             metadata: Additional data (webinar_id, etc.)
+            template_id / template_version / template_vars: Template reference
+                (services/email_templates.py), rendered lazily at send time
         
         Returns:
             Queue item ID
@@ -70,20 +79,21 @@ class EmailQueueService:
             "contact_email": contact_email,
             "contact_name": contact_name,
             "subject": subject,
-            "body_html": body_html,
-            "body_text": body_text or self._html_to_text(body_html),
-            "scheduled_at": (scheduled_at or now).isoformat(),
+            **self._content_fields(body_html, body_text, template_id, template_version, template_vars),
+            "scheduled_at": scheduled_at or now,
             "status": "pending",
             "attempts": 0,
             "sent_at": None,
             "error": None,
             "message_id": None,
             "metadata": metadata or {},
-            "created_at": now.isoformat(),
-            "updated_at": now.isoformat()
+            "created_at": now,
+            "updated_at": now
         }
         
         await db.email_queue.insert_one(queue_item)
+        await track_change("email_queue", None, queue_item)
+        job_wakeup.notify(CHANNEL_EMAIL_QUEUE)
         logger.info(f"Email queued: {email_id} for {contact_email} (rule: {rule})")
         
         return email_id
@@ -105,21 +115,26 @@ class EmailQueueService:
                 "contact_email": email_data.get("contact_email"),
                 "contact_name": email_data.get("contact_name", ""),
                 "subject": email_data.get("subject"),
-                "body_html": email_data.get("body_html"),
-                "body_text": email_data.get("body_text") or self._html_to_text(email_data.get("body_html", "")),
-                "scheduled_at": email_data.get("scheduled_at", now).isoformat() if isinstance(email_data.get("scheduled_at"), datetime) else email_data.get("scheduled_at", now.isoformat()),
+                **self._content_fields(
+                    email_data.get("body_html"), email_data.get("body_text"),
+                    email_data.get("template_id"), email_data.get("template_version"), email_data.get("template_vars")
+                ),
+                "scheduled_at": parse_timestamp(email_data.get("scheduled_at")) or now,
                 "status": "pending",
                 "attempts": 0,
                 "sent_at": None,
                 "error": None,
                 "message_id": None,
                 "metadata": email_data.get("metadata", {}),
-                "created_at": now.isoformat(),
-                "updated_at": now.isoformat()
+                "created_at": now,
+                "updated_at": now
             }
             email_ids.append(email_id)
             await db.email_queue.insert_one(queue_item)
         
+        if email_ids:
+            await increment("email_queue", "status", "pending", len(email_ids))
+            job_wakeup.notify(CHANNEL_EMAIL_QUEUE)
         logger.info(f"Batch queued: {len(email_ids)} emails")
         return email_ids
     
@@ -135,42 +150,52 @@ class EmailQueueService:
         # Find pending emails that are due
         pending_emails = await db.email_queue.find({
             "status": "pending",
-            "scheduled_at": {"$lte": now.isoformat()},
-            "attempts": {"$lt": 3}  # Max 3 attempts
+            "attempts": {"$lt": 3},  # Max 3 attempts
+            **timestamp_query("scheduled_at", lte=now)
         }).sort("scheduled_at", 1).to_list(max_emails)
         
         results = {"sent": 0, "failed": 0, "remaining": 0}
         
+        # Template-referenced items are rendered here, one template query per batch
+        await render_queue_items(pending_emails)
+        
         for i, email_item in enumerate(pending_emails):
             try:
                 # Rate limiting: sleep between emails
                 if i > 0 and i % MAX_EMAILS_PER_SECOND == 0:
                     await asyncio.sleep(1)
                 
+                body_html = email_item.get("body_html")
+                if body_html is None:
+                    raise ValueError(f"Email template {email_item.get('template_id')} not found")
+                
                 # Send email via SES
                 result = await email_service.send_email(
                     to_email=email_item["contact_email"],
                     subject=email_item["subject"],
                     html_content=self._wrap_html_template(
-                        email_item["body_html"],
+                        body_html,
                         email_item["id"]
                     ),
-                    plain_content=email_item["body_text"],
+                    plain_content=email_item.get("body_text") or self._html_to_text(body_html),
                     from_email=SENDER_EMAIL,
                     from_name=SENDER_NAME
                 )
                 
                 if result.get("success"):
                     # Update as sent
+                    sent_at = utc_now()
                     await db.email_queue.update_one(
                         {"id": email_item["id"]},
                         {"$set": {
                             "status": "sent",
-                            "sent_at": datetime.now(timezone.utc).isoformat(),
+                            "sent_at": sent_at,
                             "message_id": result.get("message_id"),
-                            "updated_at": datetime.now(timezone.utc).isoformat()
+                            "updated_at": sent_at
                         }}
                     )
+                    await track_change("email_queue", email_item, {"status": "sent"})
+                    await increment("email_queue", "sent_by_rule", email_item["rule"], day=sent_at.date().isoformat())
                     
                     # Log to email_logs
                     await self._log_sent_email(email_item, result)
@@ -217,32 +242,34 @@ class EmailQueueService:
         
         return results
     
+    async def get_next_due_at(self) -> Optional[datetime]:
+        """Earliest scheduled_at among sendable pending emails (None if queue is empty)"""
+        next_item = await db.email_queue.find_one(
+            {"status": "pending", "attempts": {"$lt": 3}},
+            {"_id": 0, "scheduled_at": 1},
+            sort=[("scheduled_at", 1)]
+        )
+        if not next_item or not next_item.get("scheduled_at"):
+            return None
+        return parse_timestamp(next_item["scheduled_at"])
+    
     async def get_queue_stats(self) -> Dict[str, Any]:
-        """Get current queue statistics"""
-        now = datetime.now(timezone.utc)
+        """Get current queue statistics (pending and sent today from the stat counters)"""
+        await ensure_counters()
+        today = utc_now().date().isoformat()
         
-        pending = await db.email_queue.count_documents({"status": "pending"})
-        sent_today = await db.email_queue.count_documents({
-            "status": "sent",
-            "sent_at": {"$gte": now.replace(hour=0, minute=0, second=0).isoformat()}
-        })
+        pending = (await get_counters("email_queue", "status")).get("pending", 0)
+        by_rule = await get_counters("email_queue", "sent_by_rule", day=today)
         failed = await db.email_queue.count_documents({
             "status": "pending",
             "attempts": {"$gte": 3}
         })
         
-        # Stats by rule
-        pipeline = [
-            {"$match": {"status": "sent", "sent_at": {"$gte": now.replace(hour=0, minute=0, second=0).isoformat()}}},
-            {"$group": {"_id": "$rule", "count": {"$sum": 1}}}
-        ]
-        by_rule = await db.email_queue.aggregate(pipeline).to_list(20)
-        
         return {
             "pending": pending,
-            "sent_today": sent_today,
+            "sent_today": sum(by_rule.values()),
             "failed": failed,
-            "by_rule": {item["_id"]: item["count"] for item in by_rule}
+            "by_rule": by_rule
         }
     
     async def cancel_email(self, email_id: str) -> bool:
@@ -251,6 +278,8 @@ class EmailQueueService:
             {"id": email_id, "status": "pending"},
             {"$set": {"status": "cancelled", "updated_at": datetime.now(timezone.utc).isoformat()}}
         )
+        if result.modified_count > 0:
+            await track_change("email_queue", {"status": "pending"}, {"status": "cancelled"})
         return result.modified_count > 0
     
     async def retry_failed(self, email_id: str) -> bool:
@@ -259,8 +288,30 @@ class EmailQueueService:
             {"id": email_id, "attempts": {"$gte": 3}},
             {"$set": {"attempts": 0, "status": "pending", "updated_at": datetime.now(timezone.utc).isoformat()}}
         )
+        if result.modified_count > 0:
+            job_wakeup.notify(CHANNEL_EMAIL_QUEUE)
         return result.modified_count > 0
     
+    def _content_fields(
+        self,
+        body_html: Optional[str],
+        body_text: Optional[str],
+        template_id: Optional[str],
+        template_version: Optional[str],
+        template_vars: Optional[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """Body fields of a queue item: a template reference, or the given HTML"""
+        if template_id:
+            return {
+                "template_id": template_id,
+                "template_version": template_version,
+                "template_vars": template_vars or {}
+            }
+        fields = {"body_html": body_html or ""}
+        if body_text:
+            fields["body_text"] = body_text
+        return fields
+    
     def _html_to_text(self, html: str) -> str:
         """Convert HTML to plain text"""
         import re
@@ -313,19 +364,20 @@ class EmailQueueService:
             "contact_email": email_item["contact_email"],
             "subject": email_item["subject"],
             "message_id": result.get("message_id"),
-            "sent_at": datetime.now(timezone.utc).isoformat(),
+            "sent_at": utc_now(),
             "metadata": email_item.get("metadata", {}),
             "opened": False,
             "clicked": False,
             "replied": False
         }
         await db.email_logs.insert_one(log_entry)
+        await count_email_event("sent", log_entry["sent_at"])
     
     async def _update_contact_tracking(self, email_item: Dict):
         """Update contact's email tracking fields"""
         rule = email_item["rule"]
         contact_id = email_item["contact_id"]
-        now = datetime.now(timezone.utc).isoformat()
+        now = utc_now()
         metadata = email_item.get("metadata", {})
         
         update_data = {"updated_at": now}
@@ -7,9 +7,20 @@ import logging
 from datetime import datetime, timezone, timedelta
 from typing import List, Dict, Any
 from database import db
+from utils.timestamps import timestamp_in_range, timestamp_query
 
 logger = logging.getLogger(__name__)
 
+# Queue processor wakeups: enqueues notify immediately; otherwise it sleeps
+# until the next scheduled email is due, never longer than the fallback poll
+QUEUE_FALLBACK_POLL_SECONDS = 300
+# While auto-send is off nothing is sent; keep the old 60s poll so a settings
+# change made outside the toggle endpoint is still picked up promptly
+QUEUE_DISABLED_POLL_SECONDS = 60
+QUEUE_MIN_WAIT_SECONDS = 1
+# Failed sends stay due; back off before retrying them (matches the old 60s cadence)
+QUEUE_RETRY_DELAY_SECONDS = 60
+
 
 def subtract_business_hours(target_datetime: datetime, hours: int) -> datetime:
     """
@@ -185,7 +196,7 @@ class EmailSchedulerService:
         contacts = await db.unified_contacts.find({
             "webinar_history": {
                 "$elemMatch": {
-                    "registered_at": {"$gte": week_start.isoformat(), "$lte": week_end.isoformat()},
+                    **timestamp_query("registered_at", gte=week_start, lte=week_end),
                     "source": "csv_import"
                 }
             }
@@ -214,11 +225,7 @@ class EmailSchedulerService:
                     continue
                 
                 # Check if registered in last week
-                try:
-                    reg_date = datetime.fromisoformat(reg_date_str.replace('Z', '+00:00'))
-                    if not (week_start <= reg_date <= week_end):
-                        continue
-                except (ValueError, TypeError):
+                if not timestamp_in_range(reg_date_str, gte=week_start, lte=week_end):
                     continue
                 
                 # Check if E6 already sent for this webinar
@@ -340,12 +347,43 @@ class EmailSchedulerService:
         <p>¡Gracias por tu interés!</p>
         """
     
-    async def process_queue_task(self):
-        """Background task that processes email queue every minute"""
+    async def _seconds_until_next_run(self, auto_send_enabled: bool, had_failures: bool = False) -> float:
+        """
+        How long the queue processor may block before it must look again:
+        until the next scheduled email becomes due, capped by the fallback poll.
+        New enqueues wake it earlier via the email_queue channel.
+        """
         from services.email_queue import email_queue
+        
+        if not auto_send_enabled:
+            return QUEUE_DISABLED_POLL_SECONDS
+        
+        next_due = await email_queue.get_next_due_at()
+        if next_due is None:
+            return QUEUE_FALLBACK_POLL_SECONDS
+        if next_due.tzinfo is None:
+            next_due = next_due.replace(tzinfo=timezone.utc)
+        
+        delay = (next_due - datetime.now(timezone.utc)).total_seconds()
+        min_wait = QUEUE_RETRY_DELAY_SECONDS if had_failures else QUEUE_MIN_WAIT_SECONDS
+        return max(min_wait, min(delay, QUEUE_FALLBACK_POLL_SECONDS))
+    
+    async def process_queue_task(self):
+        """
+        Background task that drains the email queue.
+        
+        Instead of sleeping a fixed 60 seconds, it blocks until an email is
+        enqueued (in-process notify / change stream on email_queue), the next
+        scheduled email becomes due, or the fallback poll interval elapses.
+        """
+        from services.email_queue import email_queue, MAX_EMAILS_PER_BATCH
+        from services.job_wakeup import job_wakeup, CHANNEL_EMAIL_QUEUE
         from database import db
         
         while self._running:
+            auto_send_enabled = False
+            drain_again = False
+            had_failures = False
             try:
                 # Check if auto-send is enabled
                 settings = await db.email_settings.find_one({"id": "global"}, {"_id": 0})
@@ -355,14 +393,22 @@ class EmailSchedulerService:
                     results = await email_queue.process_queue()
                     if results["sent"] > 0 or results["failed"] > 0:
                         logger.info(f"Queue processed: {results}")
+                    # A full batch means more due emails are likely waiting
+                    drain_again = results["sent"] + results["failed"] >= MAX_EMAILS_PER_BATCH
+                    had_failures = results["failed"] > 0
+                
+                if drain_again:
+                    wait_seconds = 0
                 else:
-                    # Just log that auto-send is disabled
-                    pass
+                    wait_seconds = await self._seconds_until_next_run(auto_send_enabled, had_failures)
             except Exception as e:
                 logger.error(f"Error processing queue: {e}")
+                wait_seconds = QUEUE_FALLBACK_POLL_SECONDS
             
-            # Wait 60 seconds before next iteration
-            await asyncio.sleep(60)
+            if wait_seconds > 0:
+                await job_wakeup.wait(CHANNEL_EMAIL_QUEUE, wait_seconds)
+            else:
+                await asyncio.sleep(0)
     
     def start_background_task(self):
         """Start the background queue processor"""
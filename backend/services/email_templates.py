@@ -0,0 +1,190 @@
+"""
+Email Templates - Template-referenced email queue items
+
+Rule-generated emails (E01-E10) used to be rendered at generation time and
+stored as full body_html on every email_queue item, so one rule run wrote
+thousands of near-identical HTML bodies. Instead a queue item stores:
+
+    template_id, template_version, template_vars (per-recipient values)
+
+The template itself is an immutable snapshot in db.email_rule_templates,
+keyed by a content hash, so editing a rule never changes emails already
+queued. (It is separate from db.email_templates, the user-facing
+templates of the /templates CRUD.)
+Bodies are rendered lazily when the email is sent or previewed, through an
+in-process cache of compiled templates.
+
+Items that still carry body_html (manual / legacy items) are returned as-is.
+"""
+
+import hashlib
+import logging
+import string
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from database import db
+
+logger = logging.getLogger('email_templates')
+
+TEMPLATE_CACHE_MAX_ENTRIES = 256
+
+_formatter = string.Formatter()
+
+
+def template_version(subject: str, body: str) -> str:
+    return hashlib.sha1(f"{subject}\0{body}".encode("utf-8")).hexdigest()[:12]
+
+
+def render_text(template: str, variables: Dict[str, Any]) -> str:
+    """
+    str.format with the same fallback the rule generator always used:
+    if a placeholder has no value, substitute the known ones and leave
+    the rest untouched.
+    """
+    try:
+        return template.format(**variables)
+    except (KeyError, IndexError, ValueError):
+        text = template
+        for key, value in variables.items():
+            text = text.replace("{" + key + "}", str(value))
+        return text
+
+
+class CompiledTemplate:
+    """Template body pre-parsed into literal text and placeholder fields"""
+
+    def __init__(self, doc: Dict[str, Any]):
+        self.id = doc["id"]
+        self.version = doc.get("version")
+        self.subject = doc.get("template_subject", "")
+        self.body = doc.get("template_body", "")
+        self._parts: Optional[List[Tuple[str, Optional[str], str, Optional[str]]]] = None
+        self._fields: set = set()
+        try:
+            self._parts = list(_formatter.parse(self.body))
+            self._fields = {field for _, field, _, _ in self._parts if field is not None}
+        except ValueError:
+            self._parts = None  # Unbalanced braces: only the replace fallback applies
+
+    def render(self, variables: Dict[str, Any]) -> str:
+        if self._parts is None or not self._fields.issubset(variables):
+            return render_text(self.body, variables)
+        try:
+            chunks = []
+            for literal, field, spec, conversion in self._parts:
+                chunks.append(literal)
+                if field is not None:
+                    value = _formatter.convert_field(variables[field], conversion)
+                    chunks.append(format(value, spec or ""))
+            return "".join(chunks)
+        except (KeyError, ValueError, TypeError):
+            return render_text(self.body, variables)
+
+
+class TemplateCache:
+    """LRU cache of compiled templates (templates are immutable, no invalidation needed)"""
+
+    def __init__(self, max_entries: int = TEMPLATE_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, CompiledTemplate]" = OrderedDict()
+        self._registered: set = set()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, template_id: str) -> Optional[CompiledTemplate]:
+        compiled = self._entries.get(template_id)
+        if compiled is not None:
+            self._entries.move_to_end(template_id)
+            self.hits += 1
+        return compiled
+
+    def put(self, doc: Dict[str, Any]) -> CompiledTemplate:
+        compiled = CompiledTemplate(doc)
+        self._entries[compiled.id] = compiled
+        self._entries.move_to_end(compiled.id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return compiled
+
+    def reset(self):
+        self._entries.clear()
+        self._registered.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+template_cache = TemplateCache()
+
+
+# =============================================================================
+# REGISTRY
+# =============================================================================
+
+async def register_template(rule: str, subject: str, body: str) -> Tuple[str, str]:
+    """Store (once) an immutable template snapshot; returns (template_id, version)."""
+    version = template_version(subject, body)
+    template_id = f"{rule}:{version}"
+    if template_id not in template_cache._registered:
+        doc = {
+            "id": template_id,
+            "rule": rule,
+            "version": version,
+            "template_subject": subject,
+            "template_body": body,
+        }
+        await db.email_rule_templates.update_one(
+            {"id": template_id},
+            {"$setOnInsert": {**doc, "created_at": datetime.now(timezone.utc).isoformat()}},
+            upsert=True
+        )
+        template_cache._registered.add(template_id)
+        template_cache.put(doc)
+    return template_id, version
+
+
+async def get_templates(template_ids: Iterable[str]) -> Dict[str, CompiledTemplate]:
+    """Compiled templates by id; cache misses are loaded with a single query."""
+    result = {}
+    missing = []
+    for template_id in set(template_ids):
+        compiled = template_cache.get(template_id)
+        if compiled is not None:
+            result[template_id] = compiled
+        else:
+            missing.append(template_id)
+    if missing:
+        template_cache.misses += len(missing)
+        async for doc in db.email_rule_templates.find({"id": {"$in": missing}}, {"_id": 0}):
+            result[doc["id"]] = template_cache.put(doc)
+    return result
+
+
+# =============================================================================
+# RENDERING
+# =============================================================================
+
+async def render_queue_items(items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Fill body_html on template-referenced queue items (in place, for send and
+    preview). Items whose template is missing get body_html None and are logged.
+    """
+    template_ids = [item["template_id"] for item in items if not item.get("body_html") and item.get("template_id")]
+    templates = await get_templates(template_ids) if template_ids else {}
+    for item in items:
+        if item.get("body_html") or not item.get("template_id"):
+            continue
+        compiled = templates.get(item["template_id"])
+        if compiled is None:
+            logger.error(f"Email template {item['template_id']} not found for queue item {item.get('id')}")
+            item["body_html"] = None
+            continue
+        item["body_html"] = compiled.render(item.get("template_vars") or {})
+    return items
+
+
+async def render_queue_item(item: Dict[str, Any]) -> Optional[str]:
+    """Rendered HTML body of one queue item"""
+    await render_queue_items([item])
+    return item.get("body_html")
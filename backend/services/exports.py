@@ -0,0 +1,350 @@
+"""
+Export Service - Streaming CSV / XLSX exports of large collections
+
+List endpoints return JSON pages capped by to_list(); exports instead walk
+a Motor cursor and write rows as they arrive, so memory stays constant
+whatever the size of the result:
+
+- iter_rows(): server-side projection of the requested columns, cursor
+  batches of EXPORT_BATCH_SIZE, one flat row per document (dotted columns
+  reach into nested documents and arrays).
+- export_chunks(): CSV written and flushed every EXPORT_BATCH_SIZE rows,
+  optionally gzip-compressed on the fly; XLSX through openpyxl's
+  write-only workbook (spooled to a temp file, then streamed).
+- Background jobs (export_jobs collection) write the same chunks to
+  EXPORT_DIR for a later download; files are removed after
+  EXPORT_FILE_RETENTION_HOURS.
+
+XLSX needs openpyxl (optional): without it only CSV is offered.
+"""
+import asyncio
+import csv
+import io
+import json
+import logging
+import os
+import re
+import tempfile
+import uuid
+import zlib
+from datetime import datetime, timedelta
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from config import EXPORT_BATCH_SIZE, EXPORT_DIR, EXPORT_FILE_RETENTION_HOURS
+from utils.timestamps import timestamp_iso, utc_now
+
+try:
+    from openpyxl import Workbook
+    from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+    XLSX_AVAILABLE = True
+except ImportError:
+    XLSX_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FORMATS = {
+    "csv": "text/csv",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+MAX_EXPORT_COLUMNS = 100
+
+# Bytes per read when streaming a finished file
+FILE_CHUNK_SIZE = 1024 * 1024
+
+# Spreadsheet apps evaluate cells starting with these as formulas
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+_COLUMN_RE = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*(\.[A-Za-z_][A-Za-z0-9_]*)*$")
+
+
+class ExportError(ValueError):
+    """Invalid export request (format, columns or filters)"""
+
+
+# ============ COLUMNS ============
+
+def check_format(file_format: str):
+    """Raise ExportError for unknown formats, or XLSX without openpyxl"""
+    if file_format not in EXPORT_FORMATS:
+        raise ExportError(f"Format must be one of: {', '.join(EXPORT_FORMATS)}")
+    if file_format == "xlsx" and not XLSX_AVAILABLE:
+        raise ExportError("XLSX export is not available (openpyxl is not installed); use format=csv")
+
+
+def parse_columns(columns: Any, default: List[str]) -> List[str]:
+    """Requested columns (comma-separated string or list) or the dataset defaults"""
+    if isinstance(columns, str):
+        columns = columns.split(",")
+    columns = [c.strip() for c in columns or [] if c and c.strip()]
+    if not columns:
+        return list(default)
+    if len(columns) > MAX_EXPORT_COLUMNS:
+        raise ExportError(f"At most {MAX_EXPORT_COLUMNS} columns can be exported")
+    invalid = [c for c in columns if not _COLUMN_RE.match(c)]
+    if invalid:
+        raise ExportError(f"Invalid column(s): {', '.join(invalid)}")
+    return list(dict.fromkeys(columns))
+
+
+def export_projection(columns: List[str]) -> Dict[str, int]:
+    """Projection of the columns (a field and one of its sub-fields would collide: keep the field)"""
+    projection = {"_id": 0}
+    for column in sorted(columns, key=len):
+        parts = column.split(".")
+        if not any(".".join(parts[:n]) in projection for n in range(1, len(parts))):
+            projection[column] = 1
+    return projection
+
+
+def resolve_column(doc: Dict[str, Any], column: str) -> Any:
+    """Value of a dotted column; arrays of sub-documents yield the list of their values"""
+    value: Any = doc
+    parts = column.split(".")
+    for index, part in enumerate(parts):
+        if isinstance(value, list):
+            rest = ".".join(parts[index:])
+            values = [resolve_column(item, rest) for item in value if isinstance(item, dict)]
+            return [v for item in values for v in (item if isinstance(item, list) else [item]) if v is not None]
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return value
+
+
+def neutralize_formula(text: str) -> str:
+    """Prefix text that a spreadsheet would run as a formula with a quote (CSV / formula injection)"""
+    return f"'{text}" if text.startswith(FORMULA_PREFIXES) else text
+
+
+def format_cell(value: Any) -> Any:
+    """Flat cell value: numbers stay numbers, dates become ISO strings, nested data is joined or JSON"""
+    if value is None:
+        return ""
+    if isinstance(value, (bool, int, float)):
+        return value
+    if isinstance(value, str):
+        return neutralize_formula(value)
+    if isinstance(value, datetime):
+        return timestamp_iso(value)
+    if isinstance(value, list):
+        if all(isinstance(item, (str, int, float, bool, datetime)) for item in value):
+            return neutralize_formula("; ".join(str(_plain_cell(item)) for item in value))
+        return json.dumps(value, default=str, ensure_ascii=False)
+    if isinstance(value, dict):
+        return json.dumps(value, default=str, ensure_ascii=False)
+    return neutralize_formula(str(value))
+
+
+def _plain_cell(value: Any) -> Any:
+    return timestamp_iso(value) if isinstance(value, datetime) else value
+
+
+# ============ STREAMING ============
+
+async def iter_rows(
+    collection,
+    query: Dict[str, Any],
+    columns: List[str],
+    sort: List[tuple],
+    stats: Optional[Dict[str, int]] = None
+) -> AsyncIterator[List[Any]]:
+    """One row per matching document, read in cursor batches"""
+    cursor = collection.find(query, export_projection(columns)).sort(sort).batch_size(EXPORT_BATCH_SIZE)
+    async for doc in cursor:
+        if stats is not None:
+            stats["rows"] = stats.get("rows", 0) + 1
+        yield [format_cell(resolve_column(doc, column)) for column in columns]
+
+
+async def csv_chunks(rows: AsyncIterator[List[Any]], columns: List[str]) -> AsyncIterator[bytes]:
+    """UTF-8 CSV (with BOM, for Excel), flushed every EXPORT_BATCH_SIZE rows"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    buffer.write("\ufeff")
+    writer.writerow(columns)
+    pending = 0
+    async for row in rows:
+        writer.writerow(row)
+        pending += 1
+        if pending >= EXPORT_BATCH_SIZE:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    yield buffer.getvalue().encode("utf-8")
+
+
+async def gzip_chunks(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """gzip-compress a byte stream on the fly"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+    async for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def _append_rows(sheet, rows: List[List[Any]]):
+    for row in rows:
+        sheet.append([ILLEGAL_CHARACTERS_RE.sub("", v) if isinstance(v, str) else v for v in row])
+
+
+async def xlsx_chunks(rows: AsyncIterator[List[Any]], columns: List[str]) -> AsyncIterator[bytes]:
+    """XLSX from openpyxl's write-only workbook (rows go to disk as they are appended)"""
+    check_format("xlsx")
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("export")
+    sheet.append(columns)
+    batch = []
+    async for row in rows:
+        batch.append(row)
+        if len(batch) >= EXPORT_BATCH_SIZE:
+            await asyncio.to_thread(_append_rows, sheet, batch)
+            batch = []
+    if batch:
+        await asyncio.to_thread(_append_rows, sheet, batch)
+
+    fd, path = tempfile.mkstemp(suffix=".xlsx")
+    os.close(fd)
+    try:
+        await asyncio.to_thread(workbook.save, path)
+        with open(path, "rb") as f:
+            while chunk := f.read(FILE_CHUNK_SIZE):
+                yield chunk
+    finally:
+        os.remove(path)
+
+
+def export_chunks(
+    collection,
+    query: Dict[str, Any],
+    columns: List[str],
+    sort: List[tuple],
+    file_format: str = "csv",
+    compress: bool = False,
+    stats: Optional[Dict[str, int]] = None
+) -> AsyncIterator[bytes]:
+    """Byte stream of the export (gzip applies to CSV; XLSX is already compressed)"""
+    rows = iter_rows(collection, query, columns, sort, stats)
+    if file_format == "xlsx":
+        return xlsx_chunks(rows, columns)
+    chunks = csv_chunks(rows, columns)
+    return gzip_chunks(chunks) if compress else chunks
+
+
+def export_filename(name: str, file_format: str, compress: bool = False) -> str:
+    extension = ".csv.gz" if file_format == "csv" and compress else f".{file_format}"
+    return f"{name}_{utc_now().strftime('%Y%m%d_%H%M%S')}{extension}"
+
+
+def export_media_type(file_format: str, compress: bool = False) -> str:
+    return "application/gzip" if file_format == "csv" and compress else EXPORT_FORMATS[file_format]
+
+
+# ============ BACKGROUND JOBS ============
+
+async def create_export_job(
+    db,
+    dataset: str,
+    file_format: str,
+    columns: List[str],
+    compress: bool,
+    filters: Dict[str, Any],
+    user: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """Record a pending export job; run it with run_export_job()"""
+    user = user or {}
+    job = {
+        "job_id": str(uuid.uuid4()),
+        "dataset": dataset,
+        "format": file_format,
+        "gzip": compress and file_format == "csv",
+        "columns": columns,
+        "filters": filters,
+        "status": "pending",
+        "rows": 0,
+        "filename": export_filename(dataset, file_format, compress),
+        "created_by": user.get("email"),
+        "created_at": utc_now(),
+    }
+    await db.export_jobs.insert_one(dict(job))
+    return job
+
+
+async def run_export_job(
+    db,
+    job_id: str,
+    collection_name: str,
+    query: Dict[str, Any],
+    sort: List[tuple]
+) -> Dict[str, Any]:
+    """Write an export job's file to EXPORT_DIR, tracking progress in export_jobs"""
+    job = await db.export_jobs.find_one({"job_id": job_id}, {"_id": 0})
+    if not job:
+        return {"error": f"Export job {job_id} not found"}
+
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    path = os.path.join(EXPORT_DIR, f"{job_id}_{job['filename']}")
+    stats = {"rows": 0}
+    await db.export_jobs.update_one({"job_id": job_id}, {"$set": {"status": "running", "started_at": utc_now()}})
+    try:
+        with open(path, "wb") as f:
+            async for chunk in export_chunks(
+                db[collection_name], query, job["columns"], sort, job["format"], job["gzip"], stats
+            ):
+                f.write(chunk)
+        completed_at = utc_now()
+        result = {
+            "status": "completed",
+            "rows": stats["rows"],
+            "size_bytes": os.path.getsize(path),
+            "file_path": path,
+            "completed_at": completed_at,
+            "expires_at": completed_at + timedelta(hours=EXPORT_FILE_RETENTION_HOURS),
+        }
+        await db.export_jobs.update_one({"job_id": job_id}, {"$set": result})
+        logger.info(f"Export {job_id} ({job['dataset']}) completed: {stats['rows']} rows")
+        return result
+    except Exception as e:
+        logger.error(f"Export {job_id} failed: {e}")
+        if os.path.exists(path):
+            os.remove(path)
+        await db.export_jobs.update_one(
+            {"job_id": job_id},
+            {"$set": {"status": "failed", "error": str(e), "rows": stats["rows"], "completed_at": utc_now()}}
+        )
+        return {"status": "failed", "error": str(e)}
+
+
+async def cleanup_export_files(db) -> Dict[str, int]:
+    """Delete expired export files; jobs left running by a restart are marked failed"""
+    now = utc_now()
+    expired = 0
+    async for job in db.export_jobs.find(
+        {"status": "completed", "expires_at": {"$lte": now}}, {"_id": 0, "job_id": 1, "file_path": 1}
+    ):
+        if job.get("file_path") and os.path.exists(job["file_path"]):
+            os.remove(job["file_path"])
+        await db.export_jobs.update_one(
+            {"job_id": job["job_id"]}, {"$set": {"status": "expired"}, "$unset": {"file_path": ""}}
+        )
+        expired += 1
+
+    stale = await db.export_jobs.update_many(
+        {"status": {"$in": ["pending", "running"]},
+         "created_at": {"$lte": now - timedelta(hours=EXPORT_FILE_RETENTION_HOURS)}},
+        {"$set": {"status": "failed", "error": "Interrupted", "completed_at": now}}
+    )
+    return {"expired": expired, "interrupted": stale.modified_count}
+
+
+async def cleanup_export_files_job():
+    """Scheduler entry point"""
+    from database import db
+
+    try:
+        result = await cleanup_export_files(db)
+        logger.info(f"Export cleanup: {result['expired']} files removed, {result['interrupted']} jobs interrupted")
+    except Exception as e:
+        logger.error(f"Error cleaning up export files: {e}")
@@ -0,0 +1,39 @@
+"""
+Shared outbound HTTP client for scrapers and external APIs.
+One pooled httpx.AsyncClient per process, so repeated requests to the same
+host reuse TCP/TLS connections instead of opening a new client per call.
+"""
+import httpx
+import logging
+
+logger = logging.getLogger(__name__)
+
+HTTP_TIMEOUT_SECONDS = 30.0
+HTTP_MAX_CONNECTIONS = 20
+HTTP_MAX_KEEPALIVE_CONNECTIONS = 10
+
+_client: httpx.AsyncClient | None = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Return the shared client, creating it on first use."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            timeout=HTTP_TIMEOUT_SECONDS,
+            follow_redirects=True,
+            limits=httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS
+            )
+        )
+    return _client
+
+
+async def close_http_client():
+    """Close the shared client (app shutdown)."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+        logger.info("Shared HTTP client closed")
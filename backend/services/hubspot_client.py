@@ -0,0 +1,424 @@
+"""
+HubSpot Client - Shared access layer for the HubSpot CRM API
+
+- One pooled httpx.AsyncClient for every HubSpot call (HTTP/2 when the
+  optional `h2` package is installed), instead of a client per function
+- The access token (settings.hubspot_token, falling back to HUBSPOT_TOKEN)
+  is cached for HUBSPOT_TOKEN_TTL_SECONDS instead of read from Mongo on
+  every call; a 401 re-reads it once
+- Requests go through a token bucket sized from HubSpot's rate-limit headers
+  (X-HubSpot-RateLimit-Max / -Remaining / -Interval-Milliseconds); 429 and
+  5xx responses are retried honouring Retry-After
+- paginate() is an async iterator over any `paging.next.after` endpoint
+- batch_read() / batch_upsert() / batch_associations() use the CRM batch
+  endpoints in chunks of 100, HUBSPOT_MAX_CONCURRENCY chunks at a time
+- sync_pipeline() runs fetch -> diff -> bulk_write as overlapping stages
+
+HUBSPOT_API_BASE can point at tests/hubspot_mock_server.py for local runs.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+import httpx
+from pymongo.errors import BulkWriteError
+
+from utils.hubspot_helpers import get_hubspot_token
+
+logger = logging.getLogger('hubspot_client')
+
+HUBSPOT_API_BASE = os.environ.get("HUBSPOT_API_BASE", "https://api.hubapi.com").rstrip("/")
+
+HUBSPOT_BATCH_SIZE = 100  # CRM batch endpoints accept at most 100 inputs
+HUBSPOT_MAX_CONCURRENCY = int(os.environ.get("HUBSPOT_MAX_CONCURRENCY", "4"))
+HUBSPOT_TOKEN_TTL_SECONDS = 300
+HUBSPOT_MAX_RETRIES = 4
+HUBSPOT_TIMEOUT_SECONDS = 60.0
+
+# Private app default: 100 requests per 10 seconds (headers override it)
+HUBSPOT_RATE_LIMIT_MAX = 100
+HUBSPOT_RATE_LIMIT_INTERVAL_SECONDS = 10.0
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+class HubSpotError(Exception):
+    """HubSpot answered with a non-success status."""
+
+    def __init__(self, status_code: int, message: str):
+        super().__init__(f"HubSpot API error {status_code}: {message[:300]}")
+        self.status_code = status_code
+        self.message = message
+
+
+class TokenBucket:
+    """Token bucket that follows HubSpot's advertised rolling-window limit."""
+
+    def __init__(self, capacity: int = HUBSPOT_RATE_LIMIT_MAX, interval: float = HUBSPOT_RATE_LIMIT_INTERVAL_SECONDS):
+        self.capacity = float(capacity)
+        self.interval = interval
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    @property
+    def rate(self) -> float:
+        return self.capacity / self.interval
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self):
+        async with self._lock:
+            self._refill()
+            if self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= 1
+
+    def update_from_headers(self, headers: httpx.Headers):
+        """Adopt the server's view of the window (never grants more than it reports)."""
+        try:
+            max_requests = headers.get("x-hubspot-ratelimit-max")
+            interval_ms = headers.get("x-hubspot-ratelimit-interval-milliseconds")
+            remaining = headers.get("x-hubspot-ratelimit-remaining")
+            if max_requests and interval_ms:
+                self.capacity = float(max_requests)
+                self.interval = max(float(interval_ms) / 1000.0, 0.001)
+            if remaining is not None:
+                self._refill()
+                self.tokens = min(self.tokens, float(remaining))
+        except ValueError:
+            pass
+
+    def drain(self):
+        self.tokens = 0
+        self.updated = time.monotonic()
+
+
+class HubSpotClient:
+    """Pooled, rate-limited HubSpot API client."""
+
+    def __init__(
+        self,
+        token: Optional[str] = None,
+        base_url: Optional[str] = None,
+        client: Optional[httpx.AsyncClient] = None,
+        max_concurrency: int = HUBSPOT_MAX_CONCURRENCY,
+        token_ttl: float = HUBSPOT_TOKEN_TTL_SECONDS,
+        max_retries: int = HUBSPOT_MAX_RETRIES,
+        bucket: Optional[TokenBucket] = None,
+    ):
+        self._static_token = token
+        self.base_url = (base_url or HUBSPOT_API_BASE).rstrip("/")
+        self.client = client
+        self._owns_client = client is None
+        self.max_concurrency = max_concurrency
+        self.token_ttl = token_ttl
+        self.max_retries = max_retries
+        self.bucket = bucket or TokenBucket()
+        self._token: Optional[str] = None
+        self._token_loaded_at = 0.0
+        self._slots: Optional[asyncio.Semaphore] = None
+        self.stats = {"requests": 0, "retries": 0, "rate_limited": 0, "token_loads": 0}
+
+    # -------------------------------------------------------------------------
+    # Plumbing
+    # -------------------------------------------------------------------------
+
+    def _http(self) -> httpx.AsyncClient:
+        if self.client is None or self.client.is_closed:
+            self.client = httpx.AsyncClient(
+                base_url=self.base_url,
+                http2=HTTP2_AVAILABLE,
+                timeout=HUBSPOT_TIMEOUT_SECONDS,
+                limits=httpx.Limits(max_connections=20, max_keepalive_connections=10)
+            )
+            self._owns_client = True
+        return self.client
+
+    def _concurrency(self) -> asyncio.Semaphore:
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_concurrency)
+        return self._slots
+
+    async def get_token(self) -> str:
+        if self._static_token is not None:
+            return self._static_token
+        if self._token is None or time.monotonic() - self._token_loaded_at > self.token_ttl:
+            self._token = await get_hubspot_token()
+            self._token_loaded_at = time.monotonic()
+            self.stats["token_loads"] += 1
+        return self._token
+
+    def invalidate_token(self):
+        """Forget the cached token (call after the token is changed in settings)."""
+        self._token = None
+
+    async def close(self):
+        if self.client is not None and self._owns_client:
+            await self.client.aclose()
+        self.client = None
+
+    def _url(self, path: str) -> str:
+        return path if path.startswith("http") else f"{self.base_url}{path}"
+
+    async def request(self, method: str, path: str, **kwargs) -> Dict[str, Any]:
+        """Rate-limited request with retries; returns the JSON body ({} when empty)."""
+        extra_headers = kwargs.pop("headers", {})
+        attempt = 0
+        token_refreshed = False
+        while True:
+            await self.bucket.acquire()
+            headers = {"Authorization": f"Bearer {await self.get_token()}", **extra_headers}
+            self.stats["requests"] += 1
+            try:
+                response = await self._http().request(method, self._url(path), headers=headers, **kwargs)
+            except httpx.TransportError as e:
+                if attempt >= self.max_retries:
+                    raise HubSpotError(0, str(e)) from e
+                attempt += 1
+                self.stats["retries"] += 1
+                await asyncio.sleep(min(2 ** attempt, 30))
+                continue
+
+            self.bucket.update_from_headers(response.headers)
+
+            if response.status_code == 401 and not token_refreshed and self._static_token is None:
+                token_refreshed = True
+                self.invalidate_token()
+                continue
+
+            if response.status_code == 429 or response.status_code >= 500:
+                if attempt >= self.max_retries:
+                    raise HubSpotError(response.status_code, response.text)
+                attempt += 1
+                self.stats["retries"] += 1
+                if response.status_code == 429:
+                    self.stats["rate_limited"] += 1
+                    self.bucket.drain()
+                await asyncio.sleep(self._retry_delay(response, attempt))
+                continue
+
+            if response.status_code >= 400:
+                raise HubSpotError(response.status_code, response.text)
+
+            if response.status_code == 204 or not response.content:
+                return {}
+            return response.json()
+
+    def _retry_delay(self, response: httpx.Response, attempt: int) -> float:
+        retry_after = response.headers.get("retry-after")
+        if retry_after:
+            try:
+                return max(float(retry_after), 0.0)
+            except ValueError:
+                pass
+        if response.status_code == 429:
+            return self.bucket.interval / max(self.bucket.capacity, 1.0)
+        return min(2 ** attempt, 30)
+
+    async def get(self, path: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        return await self.request("GET", path, params=params)
+
+    async def post(self, path: str, json: Any = None) -> Dict[str, Any]:
+        return await self.request("POST", path, json=json)
+
+    async def patch(self, path: str, json: Any = None) -> Dict[str, Any]:
+        return await self.request("PATCH", path, json=json)
+
+    # -------------------------------------------------------------------------
+    # Pagination
+    # -------------------------------------------------------------------------
+
+    async def pages(
+        self,
+        path: str,
+        params: Optional[Dict[str, Any]] = None,
+        method: str = "GET",
+        body: Optional[Dict[str, Any]] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Yield each page of `results` following paging.next.after (up to `limit` items)."""
+        params = dict(params or {})
+        body = dict(body) if body is not None else None
+        after = None
+        yielded = 0
+        while True:
+            if method == "GET":
+                page_params = {**params, **({"after": after} if after else {})}
+                data = await self.request("GET", path, params=page_params)
+            else:
+                page_body = {**(body or {}), **({"after": after} if after else {})}
+                data = await self.request(method, path, params=params or None, json=page_body)
+
+            results = data.get("results", [])
+            if limit is not None:
+                results = results[:max(limit - yielded, 0)]
+            if results:
+                yielded += len(results)
+                yield results
+
+            after = (data.get("paging") or {}).get("next", {}).get("after")
+            if not after or (limit is not None and yielded >= limit):
+                return
+
+    async def paginate(self, path: str, **kwargs) -> AsyncIterator[Dict[str, Any]]:
+        """Async iterator over every item of a paged endpoint."""
+        async for page in self.pages(path, **kwargs):
+            for item in page:
+                yield item
+
+    async def list_memberships(self, list_id: str) -> List[str]:
+        """Record ids of a HubSpot list (ILS lists API)."""
+        return [
+            str(member["recordId"])
+            async for member in self.paginate(f"/crm/v3/lists/{list_id}/memberships", params={"limit": 500})
+        ]
+
+    # -------------------------------------------------------------------------
+    # Batch endpoints
+    # -------------------------------------------------------------------------
+
+    async def _chunked(self, items: List[Any], call: Callable[[List[Any]], Awaitable[List[Any]]]) -> AsyncIterator[List[Any]]:
+        """Run `call` per chunk of HUBSPOT_BATCH_SIZE concurrently; yield results in input order."""
+        async def run(chunk):
+            async with self._concurrency():
+                return await call(chunk)
+
+        chunks = [items[i:i + HUBSPOT_BATCH_SIZE] for i in range(0, len(items), HUBSPOT_BATCH_SIZE)]
+        tasks = [asyncio.ensure_future(run(chunk)) for chunk in chunks]
+        try:
+            for task in tasks:
+                yield await task
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def iter_batch_read(
+        self,
+        object_type: str,
+        ids: List[Any],
+        properties: Optional[List[str]] = None,
+        id_property: Optional[str] = None,
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Yield batch/read results chunk by chunk (for progress reporting)."""
+        async def read(chunk):
+            body: Dict[str, Any] = {"inputs": [{"id": str(i)} for i in chunk], "properties": properties or []}
+            if id_property:
+                body["idProperty"] = id_property
+            data = await self.post(f"/crm/v3/objects/{object_type}/batch/read", json=body)
+            return data.get("results", [])
+
+        async for results in self._chunked(list(ids), read):
+            yield results
+
+    async def batch_read(self, object_type: str, ids: List[Any], properties: Optional[List[str]] = None, id_property: Optional[str] = None) -> List[Dict[str, Any]]:
+        results = []
+        async for chunk in self.iter_batch_read(object_type, ids, properties, id_property):
+            results.extend(chunk)
+        return results
+
+    async def batch_upsert(self, object_type: str, inputs: List[Dict[str, Any]], id_property: str) -> List[Dict[str, Any]]:
+        """
+        Create-or-update by a unique property. Each input is
+        {"id": <value of id_property>, "properties": {...}}.
+        """
+        async def upsert(chunk):
+            data = await self.post(
+                f"/crm/v3/objects/{object_type}/batch/upsert",
+                json={"inputs": [{**item, "idProperty": id_property} for item in chunk]}
+            )
+            return data.get("results", [])
+
+        results = []
+        async for chunk in self._chunked(list(inputs), upsert):
+            results.extend(chunk)
+        return results
+
+    async def batch_associations(self, from_type: str, ids: List[Any], to_type: str) -> Dict[str, List[Dict[str, Any]]]:
+        """from id -> [{"toObjectId", "associationTypes"}] via the v4 batch associations API."""
+        async def read(chunk):
+            data = await self.post(
+                f"/crm/v4/associations/{from_type}/{to_type}/batch/read",
+                json={"inputs": [{"id": str(i)} for i in chunk]}
+            )
+            return data.get("results", [])
+
+        associations: Dict[str, List[Dict[str, Any]]] = {str(i): [] for i in ids}
+        async for results in self._chunked(list(ids), read):
+            for result in results:
+                associations[str(result["from"]["id"])] = result.get("to", [])
+        return associations
+
+
+# =============================================================================
+# SYNC PIPELINE
+# =============================================================================
+
+async def sync_pipeline(
+    pages: AsyncIterator[List[Dict[str, Any]]],
+    diff: Callable[[List[Dict[str, Any]]], Awaitable[List[Any]]],
+    collection=None,
+    dry_run: bool = False,
+    queue_size: int = 2,
+) -> Dict[str, int]:
+    """
+    fetch -> diff -> bulk_write as overlapping stages: the next HubSpot page
+    downloads while the previous one is diffed and written. `diff` turns a
+    page into pymongo write operations; they are applied with one unordered
+    bulk_write per page (skipped when dry_run). Failed operations (e.g.
+    duplicate keys) are counted in write_errors; the rest of the page is kept.
+    """
+    queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+    done = object()
+    stats = {"pages": 0, "fetched": 0, "operations": 0, "written": 0, "write_errors": 0}
+
+    async def fetch():
+        try:
+            async for page in pages:
+                await queue.put(page)
+        finally:
+            await queue.put(done)
+
+    fetcher = asyncio.ensure_future(fetch())
+    try:
+        while True:
+            page = await queue.get()
+            if page is done:
+                break
+            stats["pages"] += 1
+            stats["fetched"] += len(page)
+            operations = await diff(page)
+            stats["operations"] += len(operations)
+            if operations and not dry_run and collection is not None:
+                try:
+                    result = await collection.bulk_write(operations, ordered=False)
+                    stats["written"] += result.inserted_count + result.upserted_count + result.modified_count + result.deleted_count
+                except BulkWriteError as e:
+                    details = e.details
+                    stats["written"] += details["nInserted"] + details["nUpserted"] + details["nModified"] + details["nRemoved"]
+                    stats["write_errors"] += len(details["writeErrors"])
+                    logger.warning(f"sync_pipeline: {len(details['writeErrors'])} write errors, first: {details['writeErrors'][0].get('errmsg')}")
+        await fetcher  # Surface fetch errors
+    finally:
+        if not fetcher.done():
+            fetcher.cancel()
+    return stats
+
+
+hubspot = HubSpotClient()
+
+
+async def close_hubspot_client():
+    """Close the pooled HubSpot client (app shutdown)."""
+    await hubspot.close()
@@ -0,0 +1,208 @@
+"""
+Job Wakeup Service - Event-driven wakeups for background workers
+
+Replaces fixed-interval polling with a block-until-work model:
+- In-process notify() when work is enqueued by this same process
+- MongoDB change streams on the job/queue collections, so work enqueued by
+  other processes (or directly in the DB) wakes the worker immediately
+- A slow fallback poll that still runs if neither signal fires, e.g. when
+  MongoDB is a standalone server and change streams are unavailable
+
+Usage:
+    # Producer side (router / service that enqueues work)
+    job_wakeup.notify(CHANNEL_RECLASSIFICATION)
+
+    # Consumer side (worker loop)
+    await run_worker_loop(CHANNEL_RECLASSIFICATION, process_once, fallback_interval=300)
+"""
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from pymongo.errors import OperationFailure, PyMongoError
+
+logger = logging.getLogger('job_wakeup')
+
+# Channels (named after the collection that carries the work)
+CHANNEL_LINKEDIN_IMPORT = "linkedin_import_jobs"
+CHANNEL_RECLASSIFICATION = "persona_reclassification_jobs"
+CHANNEL_EMAIL_QUEUE = "email_queue"
+
+# MongoDB error codes meaning "change streams are not supported here"
+# 40573: $changeStream only supported on replica sets
+# 40324: unrecognized pipeline stage (very old servers)
+# 136:   change streams disabled (e.g. majority read concern off)
+CHANGE_STREAM_UNSUPPORTED_CODES = {40573, 40324, 136}
+
+# Reconnect backoff for transient change stream errors (seconds)
+WATCH_RETRY_INITIAL = 1
+WATCH_RETRY_MAX = 60
+
+# Change stream filters: only events that can make new work available.
+# The worker's own progress/heartbeat writes must NOT match, otherwise
+# every heartbeat would wake the loop again.
+CHANGE_STREAM_PIPELINES: Dict[str, List[Dict[str, Any]]] = {
+    CHANNEL_LINKEDIN_IMPORT: [
+        {"$match": {"$or": [
+            {"operationType": "insert"},
+            {"updateDescription.updatedFields.column_mapping": {"$exists": True}},
+            {"updateDescription.updatedFields.status": {"$in": ["uploaded", "pending_retry"]}}
+        ]}}
+    ],
+    CHANNEL_RECLASSIFICATION: [
+        {"$match": {"$or": [
+            {"operationType": "insert"},
+            {"updateDescription.updatedFields.status": "pending"}
+        ]}}
+    ],
+    CHANNEL_EMAIL_QUEUE: [
+        {"$match": {"$or": [
+            {"operationType": "insert"},
+            {"updateDescription.updatedFields.status": "pending"},
+            {"updateDescription.updatedFields.scheduled_at": {"$exists": True}}
+        ]}}
+    ],
+}
+
+
+class JobWakeup:
+    """
+    Registry of wakeup signals, one per channel.
+
+    A signal is "sticky": a notify() that arrives while the worker is busy
+    is remembered, so the next wait() returns immediately instead of
+    sleeping through work that was enqueued mid-job.
+    """
+
+    def __init__(self):
+        self._events: Dict[str, asyncio.Event] = {}
+        self._watch_tasks: Dict[str, asyncio.Task] = {}
+        # channel -> "active" | "unavailable" | "reconnecting"
+        self.stream_status: Dict[str, str] = {}
+
+    def _event(self, channel: str) -> asyncio.Event:
+        event = self._events.get(channel)
+        if event is None:
+            event = asyncio.Event()
+            self._events[channel] = event
+        return event
+
+    def notify(self, channel: str):
+        """Signal that new work is available on a channel (in-process)."""
+        self._event(channel).set()
+
+    async def wait(self, channel: str, timeout: float) -> bool:
+        """
+        Block until the channel is notified or the timeout expires.
+
+        Returns True if woken by a notification, False on fallback timeout.
+        """
+        event = self._event(channel)
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+            woken = True
+        except asyncio.TimeoutError:
+            woken = False
+        event.clear()
+        return woken
+
+    # -------------------------------------------------------------------------
+    # Change streams
+    # -------------------------------------------------------------------------
+
+    async def _watch(self, channel: str, collection, pipeline: List[Dict[str, Any]]):
+        """Forward change stream events on a collection to a channel."""
+        retry_delay = WATCH_RETRY_INITIAL
+
+        while True:
+            try:
+                async with collection.watch(pipeline=pipeline) as stream:
+                    if self.stream_status.get(channel) == "reconnecting":
+                        # Events may have been missed while disconnected
+                        self.notify(channel)
+                    self.stream_status[channel] = "active"
+                    retry_delay = WATCH_RETRY_INITIAL
+                    logger.info(f"Change stream active for channel '{channel}'")
+
+                    async for _change in stream:
+                        self.notify(channel)
+
+            except asyncio.CancelledError:
+                raise
+            except OperationFailure as e:
+                if e.code in CHANGE_STREAM_UNSUPPORTED_CODES:
+                    self.stream_status[channel] = "unavailable"
+                    logger.info(
+                        f"Change streams unavailable for '{channel}' ({e.code}); "
+                        f"relying on in-process notify and fallback poll"
+                    )
+                    return
+                self.stream_status[channel] = "reconnecting"
+                logger.warning(f"Change stream error on '{channel}': {e}")
+            except PyMongoError as e:
+                self.stream_status[channel] = "reconnecting"
+                logger.warning(f"Change stream error on '{channel}': {e}")
+
+            await asyncio.sleep(retry_delay)
+            retry_delay = min(retry_delay * 2, WATCH_RETRY_MAX)
+
+    def start_watchers(self, database, channels: Optional[List[str]] = None):
+        """Start change stream watchers for the given channels (default: all)."""
+        for channel in channels or list(CHANGE_STREAM_PIPELINES.keys()):
+            task = self._watch_tasks.get(channel)
+            if task and not task.done():
+                continue
+            self._watch_tasks[channel] = asyncio.create_task(
+                self._watch(channel, database[channel], CHANGE_STREAM_PIPELINES[channel])
+            )
+
+    def stop_watchers(self):
+        """Cancel all change stream watchers."""
+        for task in self._watch_tasks.values():
+            task.cancel()
+        self._watch_tasks.clear()
+
+    def get_status(self) -> Dict[str, Any]:
+        """Watcher status for diagnostics."""
+        return {
+            channel: self.stream_status.get(channel, "stopped")
+            for channel in CHANGE_STREAM_PIPELINES
+        }
+
+
+async def run_worker_loop(
+    channel: str,
+    process_once: Callable[[], Awaitable[bool]],
+    fallback_interval: float,
+    wakeup: Optional[JobWakeup] = None
+):
+    """
+    Run a worker until cancelled.
+
+    process_once() handles at most one unit of work and returns True if it
+    found something to do. While there is work the loop drains it back to
+    back; when idle it blocks on the channel until notified or until the
+    fallback interval elapses.
+    """
+    wakeup = wakeup or job_wakeup
+
+    while True:
+        try:
+            found_work = await process_once()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Worker loop '{channel}' error: {e}")
+            found_work = False
+
+        if found_work:
+            # Yield to the event loop between jobs
+            await asyncio.sleep(0)
+            continue
+
+        await wakeup.wait(channel, fallback_interval)
+
+
+# Singleton instance
+job_wakeup = JobWakeup()
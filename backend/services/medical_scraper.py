@@ -10,6 +10,9 @@ from datetime import datetime, timezone
 from typing import Optional, List, Dict, Any
 from dotenv import load_dotenv
 
+from services.browser_pool import browser_pool
+from services.http_client import get_http_client
+
 load_dotenv()
 
 # Try to import emergent integrations
@@ -22,6 +25,9 @@ except ImportError:
 
 EMERGENT_LLM_KEY = os.environ.get("EMERGENT_LLM_KEY")
 
+# Society sites behind bot protection answer plain requests with these
+BROWSER_FALLBACK_STATUS_CODES = {403, 429}
+
 # System prompts for different tasks
 EVENT_EXTRACTION_PROMPT = """You are an expert at extracting event information from medical society websites.
 Analyze the provided content and extract ALL events you can find.
@@ -74,28 +80,50 @@ Return JSON in this format:
 
 
 async def fetch_website_content(url: str) -> Optional[str]:
-    """Fetch website content for analysis"""
+    """Fetch website content for analysis.
+    Falls back to a pooled headless browser when the site blocks plain requests."""
+    html = None
     try:
-        async with httpx.AsyncClient(timeout=30.0, follow_redirects=True) as client:
-            headers = {
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
-            }
-            response = await client.get(url, headers=headers)
+        headers = {
+            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
+        }
+        response = await get_http_client().get(url, headers=headers)
+        if response.status_code in BROWSER_FALLBACK_STATUS_CODES:
+            html = await render_with_browser(url)
+        else:
             response.raise_for_status()
-            
-            # Get text content, limit size
-            content = response.text[:50000]  # Limit to ~50KB
-            
-            # Clean HTML - remove scripts, styles, etc.
-            content = re.sub(r'<script[^>]*>.*?</script>', '', content, flags=re.DOTALL | re.IGNORECASE)
-            content = re.sub(r'<style[^>]*>.*?</style>', '', content, flags=re.DOTALL | re.IGNORECASE)
-            content = re.sub(r'<[^>]+>', ' ', content)  # Remove HTML tags
-            content = re.sub(r'\s+', ' ', content)  # Normalize whitespace
-            
-            return content.strip()
-    except Exception as e:
+            html = response.text
+    except httpx.HTTPStatusError as e:
         print(f"Error fetching {url}: {e}")
         return None
+    except Exception as e:
+        print(f"Error fetching {url}: {e} - trying headless browser")
+        html = await render_with_browser(url)
+    
+    if not html:
+        return None
+    
+    # Get text content, limit size
+    content = html[:50000]  # Limit to ~50KB
+    
+    # Clean HTML - remove scripts, styles, etc.
+    content = re.sub(r'<script[^>]*>.*?</script>', '', content, flags=re.DOTALL | re.IGNORECASE)
+    content = re.sub(r'<style[^>]*>.*?</style>', '', content, flags=re.DOTALL | re.IGNORECASE)
+    content = re.sub(r'<[^>]+>', ' ', content)  # Remove HTML tags
+    content = re.sub(r'\s+', ' ', content)  # Normalize whitespace
+    
+    return content.strip()
+
+
+async def render_with_browser(url: str) -> Optional[str]:
+    """Render a page in the shared browser pool and return its HTML"""
+    try:
+        async with browser_pool.page() as page:
+            await page.goto(url, wait_until='networkidle', timeout=45000)
+            return await page.content()
+    except Exception as e:
+        print(f"Headless browser error for {url}: {e}")
+        return None
 
 
 async def extract_events_from_website(url: str, society_name: str) -> Dict[str, Any]:
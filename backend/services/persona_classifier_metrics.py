@@ -17,6 +17,7 @@ from datetime import datetime, timezone, timedelta
 from typing import Dict, Any, List, Optional
 
 from database import db
+from services.persona_classifier_service import normalize_job_title
 
 # Configure logging
 logger = logging.getLogger('persona_classifier_metrics')
@@ -26,6 +27,81 @@ METRICS_INTERVAL_HOURS = 6
 METRICS_RETENTION_DAYS = 90  # Keep 90 days of historical metrics
 
 
+# One pass over unified_contacts for every contact distribution metric
+CONTACT_DISTRIBUTION_PIPELINE = [
+    {"$project": {
+        "_id": 0,
+        "buyer_persona": 1,
+        "buyer_persona_locked": 1,
+        "buyer_persona_assigned_manually": 1,
+        "job_title": 1,
+        "job_title_normalized": 1
+    }},
+    {"$facet": {
+        "by_persona": [
+            {"$group": {"_id": "$buyer_persona", "count": {"$sum": 1}}}
+        ],
+        "flags": [
+            {"$group": {
+                "_id": None,
+                "total": {"$sum": 1},
+                "locked": {"$sum": {"$cond": [{"$eq": ["$buyer_persona_locked", True]}, 1, 0]}},
+                "manually_assigned": {"$sum": {"$cond": [
+                    {"$eq": ["$buyer_persona_assigned_manually", True]}, 1, 0
+                ]}},
+                "with_job_title": {"$sum": {"$cond": [
+                    {"$in": [{"$ifNull": ["$job_title", None]}, [None, ""]]}, 0, 1
+                ]}},
+                "with_normalized_job_title": {"$sum": {"$cond": [
+                    {"$in": [{"$ifNull": ["$job_title_normalized", None]}, [None, ""]]}, 0, 1
+                ]}},
+                "default_persona": {"$sum": {"$cond": [
+                    {"$in": [{"$ifNull": ["$buyer_persona", None]}, ["mateo", "Mateo", None]]}, 1, 0
+                ]}}
+            }}
+        ]
+    }}
+]
+
+# Distinct normalized job titles with their contact counts
+TITLE_HISTOGRAM_PIPELINE = [
+    {"$match": {"job_title_normalized": {"$exists": True, "$nin": [None, ""]}}},
+    {"$group": {"_id": "$job_title_normalized", "count": {"$sum": 1}}}
+]
+
+
+def compute_keyword_matches(
+    keywords: List[Dict[str, Any]],
+    title_histogram: List[Dict[str, Any]]
+) -> List[Dict[str, Any]]:
+    """
+    Count contacts matched by every keyword.
+    
+    Joins the distinct-title histogram ({_id: normalized_title, count}) with a
+    hash map of normalized keyword -> keywords. A keyword matches a contact
+    when it equals the contact's normalized job title, which is the rule
+    classify_job_title() applies.
+    """
+    title_counts: Dict[str, int] = {}
+    for row in title_histogram:
+        title = normalize_job_title(row.get("_id"))
+        if title:
+            title_counts[title] = title_counts.get(title, 0) + row.get("count", 0)
+    
+    results = []
+    for kw in keywords:
+        keyword_text = (kw.get("keyword") or "").lower()
+        if not keyword_text:
+            continue
+        results.append({
+            "keyword": keyword_text,
+            "buyer_persona_id": kw.get("buyer_persona_id"),
+            "matches": title_counts.get(normalize_job_title(keyword_text), 0)
+        })
+    
+    return results
+
+
 async def compute_classifier_metrics() -> Dict[str, Any]:
     """
     Compute all classifier metrics.
@@ -52,100 +128,71 @@ async def compute_classifier_metrics() -> Dict[str, Any]:
     
     try:
         # =================================================================
-        # CONTACTS METRICS
+        # CONTACTS METRICS (single $facet pass over unified_contacts)
         # =================================================================
         
-        # Total contacts
-        total_contacts = await db.unified_contacts.count_documents({})
-        metrics["contacts"]["total"] = total_contacts
+        facet_result = await db.unified_contacts.aggregate(
+            CONTACT_DISTRIBUTION_PIPELINE, allowDiskUse=True
+        ).to_list(1)
+        facet = facet_result[0] if facet_result else {}
+        flags = (facet.get("flags") or [{}])[0]
         
-        # Contacts by buyer persona
-        persona_pipeline = [
-            {"$group": {"_id": "$buyer_persona", "count": {"$sum": 1}}}
-        ]
-        persona_counts = await db.unified_contacts.aggregate(persona_pipeline).to_list(None)
+        total_contacts = flags.get("total", 0)
+        with_job_title = flags.get("with_job_title", 0)
+        with_normalized = flags.get("with_normalized_job_title", 0)
+        default_persona_count = flags.get("default_persona", 0)
+        
+        metrics["contacts"]["total"] = total_contacts
         metrics["contacts"]["by_persona"] = {
             pc["_id"]: pc["count"] 
-            for pc in persona_counts 
+            for pc in facet.get("by_persona", []) 
             if pc["_id"] and pc["_id"] not in ["null", "undefined", None]
         }
-        
-        # Locked contacts
-        locked_count = await db.unified_contacts.count_documents({"buyer_persona_locked": True})
-        metrics["contacts"]["locked"] = locked_count
-        
-        # Manually assigned contacts
-        manual_count = await db.unified_contacts.count_documents({"buyer_persona_assigned_manually": True})
-        metrics["contacts"]["manually_assigned"] = manual_count
-        
-        # Contacts with job_title
-        with_job_title = await db.unified_contacts.count_documents({
-            "job_title": {"$exists": True, "$nin": [None, ""]}
-        })
+        metrics["contacts"]["locked"] = flags.get("locked", 0)
+        metrics["contacts"]["manually_assigned"] = flags.get("manually_assigned", 0)
         metrics["contacts"]["with_job_title"] = with_job_title
-        
-        # Contacts with normalized job title
-        with_normalized = await db.unified_contacts.count_documents({
-            "job_title_normalized": {"$exists": True, "$nin": [None, ""]}
-        })
         metrics["contacts"]["with_normalized_job_title"] = with_normalized
-        
-        # Contacts with default persona (Mateo)
-        default_persona_count = await db.unified_contacts.count_documents({
-            "$or": [
-                {"buyer_persona": "mateo"},
-                {"buyer_persona": "Mateo"},
-                {"buyer_persona": None},
-                {"buyer_persona": {"$exists": False}}
-            ]
-        })
         metrics["contacts"]["default_persona"] = default_persona_count
         
         # =================================================================
         # KEYWORDS METRICS
         # =================================================================
         
-        # Total keywords
-        total_keywords = await db.job_keywords.count_documents({})
+        all_keywords = await db.job_keywords.find(
+            {}, {"_id": 0, "keyword": 1, "buyer_persona_id": 1}
+        ).to_list(None)
+        
+        total_keywords = len(all_keywords)
         metrics["keywords"]["total"] = total_keywords
         
         # Keywords by buyer persona
-        keyword_pipeline = [
-            {"$group": {"_id": "$buyer_persona_id", "count": {"$sum": 1}}}
-        ]
-        keyword_counts = await db.job_keywords.aggregate(keyword_pipeline).to_list(None)
-        metrics["keywords"]["by_persona"] = {
-            kc["_id"]: kc["count"] 
-            for kc in keyword_counts 
-            if kc["_id"] and kc["_id"] not in ["null", "undefined", None]
-        }
+        keywords_by_persona: Dict[str, int] = {}
+        for kw in all_keywords:
+            bp_id = kw.get("buyer_persona_id")
+            if bp_id and bp_id not in ["null", "undefined"]:
+                keywords_by_persona[bp_id] = keywords_by_persona.get(bp_id, 0) + 1
+        metrics["keywords"]["by_persona"] = keywords_by_persona
         
-        # Top keywords by matches (approximate using job_title_normalized search)
-        all_keywords = await db.job_keywords.find({}, {"_id": 0, "keyword": 1, "buyer_persona_id": 1}).to_list(None)
+        # Keyword matches: one $group by normalized title, joined in memory
+        # against the keyword map (same EXACT-match rule as the classifier)
+        title_histogram = await db.unified_contacts.aggregate(
+            TITLE_HISTOGRAM_PIPELINE, allowDiskUse=True
+        ).to_list(None)
         
-        keyword_match_counts = []
-        for kw in all_keywords[:50]:  # Limit to first 50 to avoid long computation
-            keyword_text = kw.get("keyword", "").lower()
-            if keyword_text:
-                # Count contacts with this keyword in normalized job title
-                match_count = await db.unified_contacts.count_documents({
-                    "job_title_normalized": {"$regex": keyword_text, "$options": "i"}
-                })
-                keyword_match_counts.append({
-                    "keyword": keyword_text,
-                    "buyer_persona_id": kw.get("buyer_persona_id"),
-                    "matches": match_count
-                })
+        keyword_match_counts = compute_keyword_matches(all_keywords, title_histogram)
         
         # Sort by matches descending
         keyword_match_counts.sort(key=lambda x: x["matches"], reverse=True)
         metrics["top_keywords"] = keyword_match_counts[:20]  # Top 20
         
-        # Unused keywords (0 matches)
+        # Unused keywords (0 matches) - complete list
         metrics["unused_keywords"] = [
             kw for kw in keyword_match_counts 
             if kw["matches"] == 0
-        ][:20]  # First 20 unused
+        ]
+        metrics["keywords"]["used"] = total_keywords - len(metrics["unused_keywords"])
+        metrics["keywords"]["unused"] = len(metrics["unused_keywords"])
+        metrics["keywords"]["distinct_job_titles"] = len(title_histogram)
         
         # =================================================================
         # COVERAGE METRICS
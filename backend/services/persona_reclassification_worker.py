@@ -8,13 +8,15 @@ This worker handles:
 - Respects buyer_persona_locked flag
 
 Architecture:
-- Called every 30 seconds by APScheduler
+- Worker loop wakes on new jobs (change stream / in-process notify),
+  with a slow fallback poll (see scheduler_worker.start_worker_loops)
 - Uses MongoDB for job queue (persistent)
 - Processes in batches for performance
 - Logs all changes for auditing
 """
 
-import asyncio
+import os
+import time
 import uuid
 import logging
 import traceback
@@ -23,6 +25,8 @@ from typing import Optional, Dict, List, Any
 from pymongo import UpdateOne
 
 from database import db
+from services.job_wakeup import job_wakeup, CHANNEL_RECLASSIFICATION
+from services.stats_counters import track_changes
 from services.persona_classifier_service import (
     classify_job_title_simple,
     normalize_job_title,
@@ -37,7 +41,18 @@ BATCH_SIZE = 500
 HEARTBEAT_INTERVAL = 30  # seconds
 ORPHAN_TIMEOUT = 300  # 5 minutes
 MAX_ATTEMPTS = 3
-WORKER_ID = f"reclassify_worker_{id(asyncio.get_event_loop())}"
+WORKER_ID = f"reclassify_worker_{os.getpid()}_{uuid.uuid4().hex[:8]}"
+
+# Job control cadence: the cancellation flag is cached in memory and only
+# re-read from MongoDB every N contacts or T seconds (whichever comes first).
+# Cancels issued in this process are seen immediately (in-process signal).
+CANCEL_CHECK_EVERY = 1000  # contacts
+CANCEL_CHECK_INTERVAL = 5  # seconds
+
+# Progress reporting cadence (also acts as heartbeat).
+# Can be overridden per job with params["progress_every"] / params["progress_interval"].
+PROGRESS_EVERY = 1000  # contacts
+PROGRESS_INTERVAL = 5  # seconds
 
 # Job statuses
 STATUS_PENDING = "pending"
@@ -47,6 +62,66 @@ STATUS_FAILED = "failed"
 STATUS_CANCELLED = "cancelled"
 
 
+# =============================================================================
+# JOB CONTROL
+# =============================================================================
+
+class JobControl:
+    """
+    Cheap cancellation checks for a running job.
+    
+    should_stop() is called once per contact. It answers from a cached flag
+    and only hits MongoDB every `check_every` contacts or `check_interval`
+    seconds. cancel_job() flips the flag directly when the job runs in this
+    process, and progress writes refresh it for free (see update_progress).
+    """
+    
+    def __init__(
+        self,
+        job_id: str,
+        check_every: int = CANCEL_CHECK_EVERY,
+        check_interval: float = CANCEL_CHECK_INTERVAL
+    ):
+        self.job_id = job_id
+        self.check_every = check_every
+        self.check_interval = check_interval
+        self.cancelled = False
+        self.db_checks = 0
+        self._since_check = 0
+        self._last_check = time.monotonic()
+    
+    def mark_cancelled(self):
+        self.cancelled = True
+    
+    def mark_checked(self):
+        """Record that the job status was just confirmed (e.g. by a progress write)."""
+        self._since_check = 0
+        self._last_check = time.monotonic()
+    
+    async def should_stop(self) -> bool:
+        if self.cancelled:
+            return True
+        
+        self._since_check += 1
+        if (self._since_check < self.check_every and
+                time.monotonic() - self._last_check < self.check_interval):
+            return False
+        
+        self.db_checks += 1
+        current_job = await db.persona_reclassification_jobs.find_one(
+            {"job_id": self.job_id},
+            {"_id": 0, "status": 1}
+        )
+        self.mark_checked()
+        if current_job and current_job.get("status") == STATUS_CANCELLED:
+            self.cancelled = True
+        return self.cancelled
+
+
+# Controls for jobs running in this process (job_id -> JobControl)
+_active_controls: Dict[str, JobControl] = {}
+
+
 # =============================================================================
 # JOB MANAGEMENT
 # =============================================================================
@@ -103,6 +178,7 @@ async def create_reclassification_job(
     }
     
     await db.persona_reclassification_jobs.insert_one(job)
+    job_wakeup.notify(CHANNEL_RECLASSIFICATION)
     
     logger.info(f"Created reclassification job {job_id} (type={job_type}, dry_run={dry_run})")
     
@@ -138,6 +214,10 @@ async def cancel_job(job_id: str) -> bool:
     )
     
     if result.modified_count > 0:
+        # In-process signal: a job running in this worker stops at the next contact
+        control = _active_controls.get(job_id)
+        if control:
+            control.mark_cancelled()
         logger.info(f"Cancelled reclassification job {job_id}")
         return True
     
@@ -221,56 +301,83 @@ async def update_heartbeat(job_id: str):
     )
 
 
-async def update_progress(job_id: str, progress: Dict[str, int]):
-    """Update job progress."""
+async def update_progress(
+    job_id: str,
+    progress: Dict[str, int],
+    stats: Optional[Dict[str, Any]] = None
+) -> bool:
+    """
+    Update job progress (and heartbeat).
+    
+    Only matches while the job is still processing, so the write doubles as
+    a cancellation check: returns False if the job was cancelled meanwhile.
+    """
     # Calculate percentage
     total = progress.get("total_contacts", 0)
     processed = progress.get("processed", 0)
     percent = round((processed / total * 100) if total > 0 else 0, 1)
     progress["percent"] = percent
     
-    await db.persona_reclassification_jobs.update_one(
-        {"job_id": job_id},
-        {
-            "$set": {
-                "progress": progress,
-                "heartbeat_at": datetime.now(timezone.utc).isoformat()
-            }
-        }
+    update = {
+        "progress": progress,
+        "heartbeat_at": datetime.now(timezone.utc).isoformat()
+    }
+    if stats is not None:
+        update["stats"] = stats
+    
+    result = await db.persona_reclassification_jobs.update_one(
+        {"job_id": job_id, "status": STATUS_PROCESSING},
+        {"$set": update}
     )
+    
+    return result.matched_count > 0
 
 
-async def complete_job(job_id: str, progress: Dict[str, int], result: Dict[str, Any]):
+async def complete_job(
+    job_id: str,
+    progress: Dict[str, int],
+    result: Dict[str, Any],
+    stats: Optional[Dict[str, Any]] = None
+):
     """Mark job as completed with final results."""
     progress["percent"] = 100
     
+    update = {
+        "status": STATUS_COMPLETED,
+        "completed_at": datetime.now(timezone.utc).isoformat(),
+        "progress": progress,
+        "result": result
+    }
+    if stats is not None:
+        update["stats"] = stats
+    
     await db.persona_reclassification_jobs.update_one(
         {"job_id": job_id},
-        {
-            "$set": {
-                "status": STATUS_COMPLETED,
-                "completed_at": datetime.now(timezone.utc).isoformat(),
-                "progress": progress,
-                "result": result
-            }
-        }
+        {"$set": update}
     )
     
     logger.info(f"Reclassification job {job_id} completed: {progress}")
 
 
-async def fail_job(job_id: str, error: str, progress: Dict[str, int]):
+async def fail_job(
+    job_id: str,
+    error: str,
+    progress: Dict[str, int],
+    stats: Optional[Dict[str, Any]] = None
+):
     """Mark job as failed with error details."""
+    update = {
+        "status": STATUS_FAILED,
+        "completed_at": datetime.now(timezone.utc).isoformat(),
+        "error": error,
+        "progress": progress
+    }
+    if stats is not None:
+        update["stats"] = stats
+    
     await db.persona_reclassification_jobs.update_one(
         {"job_id": job_id},
-        {
-            "$set": {
-                "status": STATUS_FAILED,
-                "completed_at": datetime.now(timezone.utc).isoformat(),
-                "error": error,
-                "progress": progress
-            }
-        }
+        {"$set": update}
     )
     
     logger.error(f"Reclassification job {job_id} failed: {error}")
@@ -361,14 +468,49 @@ async def build_contact_query(job_type: str, params: Dict[str, Any]) -> Dict[str
     return query
 
 
+def _new_job_stats() -> Dict[str, Any]:
+    """Per-job timing breakdown (seconds)."""
+    return {
+        "count_seconds": 0.0,
+        "read_seconds": 0.0,
+        "classify_seconds": 0.0,
+        "write_seconds": 0.0,
+        "total_seconds": 0.0,
+        "bulk_writes": 0,
+        "progress_updates": 0,
+        "cancel_checks": 0,
+        "contacts_per_second": 0.0
+    }
+
+
+def _finalize_stats(stats: Dict[str, Any], started: float, processed: int, control: JobControl):
+    elapsed = time.perf_counter() - started
+    stats["total_seconds"] = round(elapsed, 3)
+    stats["cancel_checks"] = control.db_checks
+    stats["contacts_per_second"] = round(processed / elapsed, 1) if elapsed > 0 else 0.0
+    # Reading from the cursor is whatever is not accounted for elsewhere
+    accounted = stats["count_seconds"] + stats["classify_seconds"] + stats["write_seconds"]
+    stats["read_seconds"] = round(max(elapsed - accounted, 0.0), 3)
+    for key in ("count_seconds", "classify_seconds", "write_seconds"):
+        stats[key] = round(stats[key], 3)
+    return stats
+
+
 async def process_reclassification_job(job: Dict[str, Any]):
     """
     Process a single reclassification job.
+    
+    Cancellation is checked through a cached JobControl (no per-contact
+    round-trip), progress is written every `progress_every` contacts or
+    `progress_interval` seconds, and a classify/write timing breakdown is
+    stored in the job's `stats`.
     """
     job_id = job["job_id"]
     job_type = job["job_type"]
     params = job.get("params", {})
     dry_run = job.get("dry_run", False)
+    progress_every = params.get("progress_every") or PROGRESS_EVERY
+    progress_interval = params.get("progress_interval") or PROGRESS_INTERVAL
     
     logger.info(f"Processing reclassification job {job_id} (type={job_type}, dry_run={dry_run})")
     
@@ -382,39 +524,70 @@ async def process_reclassification_job(job: Dict[str, Any]):
         "percent": 0
     }
     
+    stats = _new_job_stats()
+    started = time.perf_counter()
+    control = JobControl(job_id)
+    _active_controls[job_id] = control
+    
     changes = []  # Track individual changes for result
     
+    async def flush(batch: List[UpdateOne], batch_changes: List[Dict[str, Any]]):
+        if dry_run or not batch:
+            return
+        write_started = time.perf_counter()
+        await db.unified_contacts.bulk_write(batch, ordered=False)
+        await track_changes("unified_contacts", [
+            ({"buyer_persona": change["old_persona"]}, {"buyer_persona": change["new_persona"]})
+            for change in batch_changes
+        ])
+        stats["write_seconds"] += time.perf_counter() - write_started
+        stats["bulk_writes"] += 1
+    
+    async def report_progress() -> bool:
+        stats["progress_updates"] += 1
+        still_processing = await update_progress(job_id, progress)
+        control.mark_checked()
+        if not still_processing:
+            control.mark_cancelled()
+        return still_processing
+    
     try:
         # Build query for contacts to reclassify
         query = await build_contact_query(job_type, params)
         
         # Count total contacts
+        count_started = time.perf_counter()
         total = await db.unified_contacts.count_documents(query)
+        stats["count_seconds"] += time.perf_counter() - count_started
         progress["total_contacts"] = total
         
         if total == 0:
             await complete_job(job_id, progress, {
                 "message": "No contacts match the criteria",
                 "changes": []
-            })
+            }, _finalize_stats(stats, started, 0, control))
             return
         
         # Process in batches
         batch = []
         batch_changes = []
+        # One timestamp per write batch instead of two isoformat() calls per contact
+        batch_timestamp = datetime.now(timezone.utc).isoformat()
+        since_progress = 0
+        last_progress = time.monotonic()
         cursor = db.unified_contacts.find(
             query,
             {"_id": 0, "id": 1, "job_title": 1, "job_title_normalized": 1, "buyer_persona": 1}
-        )
+        ).batch_size(BATCH_SIZE)
         
         async for contact in cursor:
-            # Check if job was cancelled
-            current_job = await db.persona_reclassification_jobs.find_one(
-                {"job_id": job_id},
-                {"status": 1}
-            )
-            if current_job and current_job.get("status") == STATUS_CANCELLED:
+            # Check if job was cancelled (cached flag, periodic DB refresh)
+            if await control.should_stop():
                 logger.info(f"Job {job_id} was cancelled, stopping")
+                await db.persona_reclassification_jobs.update_one(
+                    {"job_id": job_id},
+                    {"$set": {"progress": progress, "stats": _finalize_stats(stats, started, progress["processed"], control)}}
+                )
                 return
             
             job_title = contact.get("job_title", "")
@@ -423,12 +596,15 @@ async def process_reclassification_job(job: Dict[str, Any]):
             
             try:
                 # Classify using centralized service
+                classify_started = time.perf_counter()
                 new_persona = await classify_job_title_simple(db, job_title, use_cache=True)
                 
                 # Normalize job title
                 normalized = contact.get("job_title_normalized") or normalize_job_title(job_title)
+                stats["classify_seconds"] += time.perf_counter() - classify_started
                 
                 progress["processed"] += 1
+                since_progress += 1
                 
                 # Check if persona changed
                 if new_persona != current_persona:
@@ -448,33 +624,35 @@ async def process_reclassification_job(job: Dict[str, Any]):
                             {"$set": {
                                 "buyer_persona": new_persona,
                                 "job_title_normalized": normalized,
-                                "reclassified_at": datetime.now(timezone.utc).isoformat(),
+                                "reclassified_at": batch_timestamp,
                                 "reclassified_by_job": job_id,
-                                "updated_at": datetime.now(timezone.utc).isoformat()
+                                "updated_at": batch_timestamp
                             }}
                         ))
                 else:
                     progress["skipped_same"] += 1
                 
-                # Execute batch and update progress
-                if len(batch) >= BATCH_SIZE:
-                    if not dry_run and batch:
-                        await db.unified_contacts.bulk_write(batch, ordered=False)
-                    
+                # Execute batch
+                if len(batch) >= BATCH_SIZE or len(batch_changes) >= BATCH_SIZE:
+                    await flush(batch, batch_changes)
                     changes.extend(batch_changes)
                     batch = []
                     batch_changes = []
-                    
-                    # Update progress and heartbeat
-                    await update_progress(job_id, progress)
+                    batch_timestamp = datetime.now(timezone.utc).isoformat()
+                
+                # Update progress and heartbeat on the configured cadence
+                if (since_progress >= progress_every or
+                        time.monotonic() - last_progress >= progress_interval):
+                    since_progress = 0
+                    last_progress = time.monotonic()
+                    await report_progress()
                     
             except Exception as e:
                 progress["errors"] += 1
                 logger.error(f"Error processing contact {contact_id}: {e}")
         
         # Process remaining batch
-        if not dry_run and batch:
-            await db.unified_contacts.bulk_write(batch, ordered=False)
+        await flush(batch, batch_changes)
         
         changes.extend(batch_changes)
         
@@ -494,19 +672,27 @@ async def process_reclassification_job(job: Dict[str, Any]):
             persona_counts[new_p] = persona_counts.get(new_p, 0) + 1
         result["persona_breakdown"] = persona_counts
         
-        await complete_job(job_id, progress, result)
+        final_stats = _finalize_stats(stats, started, progress["processed"], control)
+        await complete_job(job_id, progress, result, final_stats)
+        logger.info(f"Reclassification job {job_id} stats: {final_stats}")
         
     except Exception as e:
         error_msg = f"{type(e).__name__}: {str(e)}"
         logger.error(f"Reclassification job {job_id} error: {error_msg}")
         logger.error(traceback.format_exc())
-        await fail_job(job_id, error_msg, progress)
+        await fail_job(job_id, error_msg, progress, _finalize_stats(stats, started, progress["processed"], control))
+    
+    finally:
+        _active_controls.pop(job_id, None)
 
 
-async def process_reclassification_jobs():
+async def process_reclassification_jobs() -> bool:
     """
-    Main worker loop - called periodically by APScheduler.
-    Finds and processes pending reclassification jobs.
+    Worker step - called by the reclassification worker loop when a job is
+    enqueued (change stream / in-process notify) or on the fallback poll.
+    Finds and processes the next pending reclassification job.
+    
+    Returns True if a job was processed.
     """
     try:
         job = await find_next_job()
@@ -515,10 +701,13 @@ async def process_reclassification_jobs():
             logger.info(f"Reclassification Worker: Processing job {job['job_id']}")
             await process_reclassification_job(job)
             logger.info(f"Reclassification Worker: Completed job {job['job_id']}")
+            return True
         
     except Exception as e:
         logger.error(f"Reclassification Worker error: {e}")
         logger.error(traceback.format_exc())
+    
+    return False
 
 
 # =============================================================================
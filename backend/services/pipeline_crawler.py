@@ -0,0 +1,371 @@
+"""
+Pipeline Crawler - Concurrent pharma pipeline scraping with change detection
+
+Replaces the one-company-at-a-time loop in run_pharma_pipelines_scrapper:
+- Companies are crawled concurrently under a global limit; requests to the
+  same host are additionally limited (concurrency + minimum delay) so we
+  stay polite to each pharma site
+- One pooled httpx.AsyncClient for every request (services/http_client.py)
+- Per-URL cache in `scraper_url_cache`: ETag / Last-Modified are sent back
+  as conditional headers (304 skips the download) and a hash of the
+  extracted text detects unchanged pages that don't honour validators.
+  Unchanged pages skip LLM extraction entirely.
+- Per-URL timings (fetch / extract) are returned with the results
+
+Cache document (scraper_url_cache):
+    {url, etag, last_modified, content_hash, content_chars, medications_count,
+     last_status, last_outcome, last_fetched_at, last_changed_at,
+     fetch_ms, extract_ms}
+"""
+
+import asyncio
+import hashlib
+import logging
+import random
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from urllib.parse import urlparse
+
+import httpx
+
+from database import db
+from services.http_client import get_http_client
+
+logger = logging.getLogger('pipeline_crawler')
+
+# Concurrency limits
+CRAWL_GLOBAL_CONCURRENCY = 8  # Companies crawled at the same time
+CRAWL_PER_HOST_CONCURRENCY = 2  # In-flight requests per host
+CRAWL_HOST_DELAY_SECONDS = 1.0  # Minimum gap between request starts on one host
+
+MAX_URLS_PER_COMPANY = 3
+MIN_CONTENT_CHARS = 500
+
+# URL outcomes
+OUTCOME_CHANGED = "changed"  # New or modified content, sent to the LLM
+OUTCOME_NOT_MODIFIED = "not_modified"  # 304 from the server, nothing downloaded
+OUTCOME_UNCHANGED = "unchanged"  # Downloaded, but same content hash as last run
+OUTCOME_TOO_SHORT = "too_short"
+OUTCOME_ERROR = "error"
+
+USER_AGENTS = [
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:121.0) Gecko/20100101 Firefox/121.0',
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.2 Safari/605.1.15',
+    'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+]
+
+# Sites known to block simple requests - rendered with the browser fallback
+PLAYWRIGHT_REQUIRED_DOMAINS = [
+    'abbvie.com', 'bayer.com', 'lilly.com', 'biogen.com',
+    'regeneron.com', 'investor.jnj.com', 'amgenpipeline.com'
+]
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _elapsed_ms(started: float) -> float:
+    return round((time.perf_counter() - started) * 1000, 1)
+
+
+class HostLimiter:
+    """
+    Per-host politeness: at most `concurrency` in-flight requests per host
+    and at least `delay` seconds between request starts on the same host.
+    """
+
+    def __init__(self, concurrency: int = CRAWL_PER_HOST_CONCURRENCY, delay: float = CRAWL_HOST_DELAY_SECONDS):
+        self.concurrency = concurrency
+        self.delay = delay
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._next_start: Dict[str, float] = {}
+
+    def _host(self, url: str) -> str:
+        return (urlparse(url).hostname or "").lower()
+
+    async def _wait_turn(self, host: str):
+        lock = self._locks.setdefault(host, asyncio.Lock())
+        async with lock:
+            now = time.monotonic()
+            start_at = max(now, self._next_start.get(host, 0.0))
+            self._next_start[host] = start_at + self.delay
+        if start_at > now:
+            await asyncio.sleep(start_at - now)
+
+    def slot(self, url: str) -> "_HostSlot":
+        host = self._host(url)
+        semaphore = self._semaphores.setdefault(host, asyncio.Semaphore(self.concurrency))
+        return _HostSlot(self, host, semaphore)
+
+
+class _HostSlot:
+    def __init__(self, limiter: HostLimiter, host: str, semaphore: asyncio.Semaphore):
+        self._limiter = limiter
+        self._host = host
+        self._semaphore = semaphore
+
+    async def __aenter__(self):
+        await self._semaphore.acquire()
+        try:
+            await self._limiter._wait_turn(self._host)
+        except BaseException:
+            self._semaphore.release()
+            raise
+        return self
+
+    async def __aexit__(self, *exc):
+        self._semaphore.release()
+        return False
+
+
+@dataclass
+class PageResult:
+    """Outcome of crawling one URL."""
+    url: str
+    outcome: str
+    status_code: Optional[int] = None
+    text: str = ""
+    fetch_ms: float = 0.0
+    extract_ms: float = 0.0
+    medications: List[Dict] = field(default_factory=list)
+    cached_medications_count: int = 0
+    rendered: bool = False
+    error: Optional[str] = None
+    response_headers: Dict[str, str] = field(default_factory=dict, repr=False)
+
+    def timing(self) -> Dict[str, Any]:
+        return {
+            "url": self.url,
+            "outcome": self.outcome,
+            "status_code": self.status_code,
+            "chars": len(self.text),
+            "fetch_ms": self.fetch_ms,
+            "extract_ms": self.extract_ms,
+            "rendered": self.rendered,
+            "medications": len(self.medications),
+            "error": self.error,
+        }
+
+
+@dataclass
+class CompanyResult:
+    company_name: str
+    medications: List[Dict] = field(default_factory=list)
+    pages: List[PageResult] = field(default_factory=list)
+    skipped_unchanged: bool = False
+    error: Optional[str] = None
+
+
+class PipelineCrawler:
+    """
+    Crawls pharma pipeline pages for many companies concurrently.
+
+    The text extraction, browser fallback and LLM extraction are injected
+    (they live in routers/scrappers.py), which also keeps this class easy
+    to drive from tests. The LLM extraction returns None when it failed,
+    [] when the page has no medications.
+    """
+
+    def __init__(
+        self,
+        extract_text: Callable[[str], str],
+        extract_medications: Callable[[str, str, str], Awaitable[Optional[List[Dict]]]],
+        render_page: Optional[Callable[[str], Awaitable[str]]] = None,
+        client: Optional[httpx.AsyncClient] = None,
+        cache_collection=None,
+        global_concurrency: int = CRAWL_GLOBAL_CONCURRENCY,
+        host_limiter: Optional[HostLimiter] = None,
+        max_urls_per_company: int = MAX_URLS_PER_COMPANY,
+    ):
+        self.extract_text = extract_text
+        self.extract_medications = extract_medications
+        self.render_page = render_page
+        self.client = client
+        self.cache = cache_collection if cache_collection is not None else db.scraper_url_cache
+        self.global_concurrency = global_concurrency
+        self.host_limiter = host_limiter or HostLimiter()
+        self.max_urls_per_company = max_urls_per_company
+        self.llm_calls = 0
+
+    # -------------------------------------------------------------------------
+    # Fetching
+    # -------------------------------------------------------------------------
+
+    def _headers(self, cached: Optional[Dict]) -> Dict[str, str]:
+        headers = {
+            'User-Agent': random.choice(USER_AGENTS),
+            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+            'Accept-Language': 'en-US,en;q=0.9',
+        }
+        if cached:
+            if cached.get("etag"):
+                headers['If-None-Match'] = cached["etag"]
+            if cached.get("last_modified"):
+                headers['If-Modified-Since'] = cached["last_modified"]
+        return headers
+
+    async def _render(self, url: str, page: PageResult):
+        """Browser fallback for blocked / JS-only pages."""
+        if not self.render_page:
+            page.outcome = OUTCOME_ERROR
+            page.error = page.error or "no browser fallback configured"
+            return
+        page.rendered = True
+        page.text = await self.render_page(url) or ""
+
+    async def fetch_page(self, url: str, cached: Optional[Dict]) -> PageResult:
+        """Download (or conditionally skip) a page and extract its text."""
+        page = PageResult(url=url, outcome=OUTCOME_CHANGED)
+        started = time.perf_counter()
+        client = self.client or get_http_client()
+        response = None
+
+        async with self.host_limiter.slot(url):
+            if any(domain in url.lower() for domain in PLAYWRIGHT_REQUIRED_DOMAINS):
+                await self._render(url, page)
+            else:
+                try:
+                    response = await client.get(url, headers=self._headers(cached))
+                    page.status_code = response.status_code
+                except httpx.HTTPError as e:
+                    page.error = str(e)
+                    await self._render(url, page)
+
+        if response is not None:
+            if response.status_code == 304:
+                page.outcome = OUTCOME_NOT_MODIFIED
+            elif response.status_code == 403:
+                async with self.host_limiter.slot(url):
+                    await self._render(url, page)
+            elif response.status_code != 200:
+                page.outcome = OUTCOME_ERROR
+                page.error = f"HTTP {response.status_code}"
+            else:
+                html = response.text
+                if html and html.strip().startswith('<'):
+                    page.text = self.extract_text(html)
+
+        page.fetch_ms = _elapsed_ms(started)
+
+        if page.outcome == OUTCOME_CHANGED and len(page.text) < MIN_CONTENT_CHARS:
+            page.outcome = OUTCOME_TOO_SHORT
+        elif page.outcome == OUTCOME_CHANGED and cached and cached.get("content_hash") == content_hash(page.text):
+            page.outcome = OUTCOME_UNCHANGED
+
+        if page.outcome in (OUTCOME_NOT_MODIFIED, OUTCOME_UNCHANGED) and cached:
+            page.cached_medications_count = cached.get("medications_count", 0)
+
+        if response is not None:
+            page.response_headers = dict(response.headers)
+        return page
+
+    async def _save_cache(self, page: PageResult, cached: Optional[Dict]):
+        now = datetime.now(timezone.utc).isoformat()
+        update: Dict[str, Any] = {
+            "url": page.url,
+            "last_status": page.status_code,
+            "last_outcome": page.outcome,
+            "last_fetched_at": now,
+            "fetch_ms": page.fetch_ms,
+            "extract_ms": page.extract_ms,
+        }
+        headers = page.response_headers
+        if page.outcome == OUTCOME_CHANGED:
+            update.update({
+                "etag": headers.get("etag"),
+                "last_modified": headers.get("last-modified"),
+                "content_hash": content_hash(page.text),
+                "content_chars": len(page.text),
+                "medications_count": len(page.medications),
+                "last_changed_at": now,
+            })
+        elif page.outcome == OUTCOME_UNCHANGED:
+            # Server ignored our validators but may have sent fresh ones
+            if headers.get("etag"):
+                update["etag"] = headers.get("etag")
+            if headers.get("last-modified"):
+                update["last_modified"] = headers.get("last-modified")
+        await self.cache.update_one({"url": page.url}, {"$set": update}, upsert=True)
+
+    # -------------------------------------------------------------------------
+    # Crawling
+    # -------------------------------------------------------------------------
+
+    async def crawl_company(self, company_name: str, urls: List[str]) -> CompanyResult:
+        """
+        Try the company's URLs in order until one yields medications.
+        An unchanged page that yielded medications last time ends the
+        company: its medications are already stored.
+        """
+        result = CompanyResult(company_name=company_name)
+        for url in urls[:self.max_urls_per_company]:
+            cached = await self.cache.find_one({"url": url}, {"_id": 0})
+            try:
+                page = await self.fetch_page(url, cached)
+            except Exception as e:
+                page = PageResult(url=url, outcome=OUTCOME_ERROR, error=str(e))
+                result.pages.append(page)
+                continue
+            result.pages.append(page)
+
+            if page.outcome in (OUTCOME_NOT_MODIFIED, OUTCOME_UNCHANGED):
+                await self._save_cache(page, cached)
+                if page.cached_medications_count:
+                    result.skipped_unchanged = True
+                    break
+                continue
+
+            if page.outcome == OUTCOME_CHANGED:
+                started = time.perf_counter()
+                self.llm_calls += 1
+                medications = await self.extract_medications(page.text, url, company_name)
+                page.extract_ms = _elapsed_ms(started)
+                if medications is None:
+                    # Not cached: keeping the hash / validators would skip this page next run
+                    page.outcome = OUTCOME_ERROR
+                    page.error = "medication extraction failed"
+                else:
+                    page.medications = medications
+
+            if page.outcome != OUTCOME_ERROR:
+                await self._save_cache(page, cached)
+
+            if page.medications:
+                result.medications.extend(page.medications)
+                break
+        return result
+
+    async def crawl(
+        self,
+        companies: List[Dict[str, Any]],
+        on_company_done: Optional[Callable[[CompanyResult], Awaitable[None]]] = None
+    ) -> List[CompanyResult]:
+        """
+        Crawl companies concurrently. Each item: {"name": str, "urls": [str]}.
+        on_company_done runs as soon as a company finishes (e.g. to store its
+        medications) so results are persisted while the crawl continues.
+        """
+        semaphore = asyncio.Semaphore(self.global_concurrency)
+
+        async def run_one(company: Dict[str, Any]) -> CompanyResult:
+            async with semaphore:
+                try:
+                    result = await self.crawl_company(company["name"], company.get("urls", []))
+                except Exception as e:
+                    logger.error(f"Crawl failed for {company['name']}: {e}")
+                    result = CompanyResult(company_name=company["name"], error=str(e))
+                if on_company_done:
+                    try:
+                        await on_company_done(result)
+                    except Exception as e:
+                        logger.error(f"Post-processing failed for {company['name']}: {e}")
+                        result.error = str(e)
+                return result
+
+        return await asyncio.gather(*(run_one(c) for c in companies))
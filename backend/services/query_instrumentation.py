@@ -0,0 +1,297 @@
+"""
+Query Instrumentation Service - Per-request MongoDB command accounting
+
+Attributes every MongoDB command to the HTTP request that issued it:
+- A pymongo CommandListener (registered on the Motor client) records count,
+  duration and collection of each command
+- The current request's stats object lives in a contextvar; Motor copies the
+  context into its executor threads, so the listener sees it
+- QueryInstrumentationMiddleware opens the stats object, emits a
+  Server-Timing header and files slow / query-heavy requests into a ring
+  buffer exposed at /api/admin/performance
+
+Commands issued outside a request (scheduler jobs, workers) are ignored.
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any, Deque, Dict, List, Optional
+
+from pymongo import monitoring
+
+from config import (
+    SLOW_REQUEST_MS,
+    QUERY_COUNT_ALERT_THRESHOLD,
+    SLOW_REQUEST_BUFFER_SIZE
+)
+
+logger = logging.getLogger('query_instrumentation')
+
+# Commands that are driver housekeeping, not application queries
+IGNORED_COMMANDS = {
+    "hello", "ismaster", "isMaster", "ping", "saslStart", "saslContinue",
+    "endSessions", "killCursors", "buildInfo", "getLastError"
+}
+
+
+class RequestQueryStats:
+    """MongoDB command stats for a single request."""
+
+    def __init__(self):
+        self.query_count = 0
+        self.db_time_ms = 0.0
+        self.by_collection: Dict[str, Dict[str, Any]] = {}
+        self._pending: Dict[int, str] = {}  # request_id -> collection
+        self._lock = threading.Lock()
+
+    def command_started(self, request_id: int, command_name: str, collection: str):
+        with self._lock:
+            self.query_count += 1
+            self._pending[request_id] = collection
+            entry = self.by_collection.setdefault(
+                collection, {"count": 0, "time_ms": 0.0, "commands": {}}
+            )
+            entry["count"] += 1
+            entry["commands"][command_name] = entry["commands"].get(command_name, 0) + 1
+
+    def command_finished(self, request_id: int, duration_micros: int):
+        duration_ms = duration_micros / 1000
+        with self._lock:
+            collection = self._pending.pop(request_id, None)
+            self.db_time_ms += duration_ms
+            if collection in self.by_collection:
+                self.by_collection[collection]["time_ms"] += duration_ms
+
+    def breakdown(self) -> List[Dict[str, Any]]:
+        """Per-collection breakdown, heaviest first."""
+        with self._lock:
+            rows = [
+                {
+                    "collection": name,
+                    "count": data["count"],
+                    "time_ms": round(data["time_ms"], 2),
+                    "commands": dict(data["commands"])
+                }
+                for name, data in self.by_collection.items()
+            ]
+        rows.sort(key=lambda r: (r["count"], r["time_ms"]), reverse=True)
+        return rows
+
+
+_current_stats: ContextVar[Optional[RequestQueryStats]] = ContextVar(
+    "request_query_stats", default=None
+)
+
+
+def get_current_stats() -> Optional[RequestQueryStats]:
+    """Stats object of the request being served (None outside requests)."""
+    return _current_stats.get()
+
+
+def _command_collection(event: monitoring.CommandStartedEvent) -> str:
+    command = event.command
+    if event.command_name == "getMore":
+        return command.get("collection", "?")
+    target = command.get(event.command_name)
+    if isinstance(target, str):
+        return target
+    return f"{event.database_name}.(db)"
+
+
+class QueryCommandListener(monitoring.CommandListener):
+    """Routes command events to the current request's stats."""
+
+    def started(self, event: monitoring.CommandStartedEvent):
+        if event.command_name in IGNORED_COMMANDS:
+            return
+        stats = _current_stats.get()
+        if stats is not None:
+            stats.command_started(event.request_id, event.command_name, _command_collection(event))
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent):
+        stats = _current_stats.get()
+        if stats is not None and event.command_name not in IGNORED_COMMANDS:
+            stats.command_finished(event.request_id, event.duration_micros)
+
+    def failed(self, event: monitoring.CommandFailedEvent):
+        stats = _current_stats.get()
+        if stats is not None and event.command_name not in IGNORED_COMMANDS:
+            stats.command_finished(event.request_id, event.duration_micros)
+
+
+# Registered on the Motor client in database.py
+query_listener = QueryCommandListener()
+
+
+# =============================================================================
+# SLOW REQUEST LOG
+# =============================================================================
+
+class SlowRequestLog:
+    """
+    In-memory ring buffers of slow and query-heavy requests, plus per-route
+    aggregates. Bounded, process-local, reset on restart.
+    """
+
+    def __init__(
+        self,
+        slow_ms: int = SLOW_REQUEST_MS,
+        query_threshold: int = QUERY_COUNT_ALERT_THRESHOLD,
+        size: int = SLOW_REQUEST_BUFFER_SIZE
+    ):
+        self.slow_ms = slow_ms
+        self.query_threshold = query_threshold
+        self.slow_requests: Deque[Dict[str, Any]] = deque(maxlen=size)
+        self.alerts: Deque[Dict[str, Any]] = deque(maxlen=size)
+        self.routes: Dict[str, Dict[str, Any]] = {}
+
+    def record(
+        self,
+        method: str,
+        route: str,
+        path: str,
+        status_code: int,
+        duration_ms: float,
+        stats: RequestQueryStats
+    ):
+        key = f"{method} {route}"
+        agg = self.routes.setdefault(key, {
+            "route": key,
+            "requests": 0,
+            "total_queries": 0,
+            "max_queries": 0,
+            "total_ms": 0.0,
+            "max_ms": 0.0,
+            "total_db_ms": 0.0,
+            "alerts": 0
+        })
+        agg["requests"] += 1
+        agg["total_queries"] += stats.query_count
+        agg["max_queries"] = max(agg["max_queries"], stats.query_count)
+        agg["total_ms"] += duration_ms
+        agg["max_ms"] = max(agg["max_ms"], duration_ms)
+        agg["total_db_ms"] += stats.db_time_ms
+
+        is_slow = duration_ms >= self.slow_ms
+        too_many_queries = stats.query_count > self.query_threshold
+        if not (is_slow or too_many_queries):
+            return
+
+        entry = {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "method": method,
+            "route": route,
+            "path": path,
+            "status_code": status_code,
+            "duration_ms": round(duration_ms, 2),
+            "db_time_ms": round(stats.db_time_ms, 2),
+            "query_count": stats.query_count,
+            "queries": stats.breakdown()
+        }
+
+        if is_slow:
+            self.slow_requests.append(entry)
+
+        if too_many_queries:
+            agg["alerts"] += 1
+            self.alerts.append(entry)
+            logger.warning(
+                f"Query count alert: {method} {route} issued {stats.query_count} queries "
+                f"(threshold {self.query_threshold}) in {duration_ms:.0f}ms"
+            )
+
+    def route_summary(self, limit: int = 50) -> List[Dict[str, Any]]:
+        rows = []
+        for agg in self.routes.values():
+            requests = agg["requests"] or 1
+            rows.append({
+                "route": agg["route"],
+                "requests": agg["requests"],
+                "avg_queries": round(agg["total_queries"] / requests, 1),
+                "max_queries": agg["max_queries"],
+                "avg_ms": round(agg["total_ms"] / requests, 1),
+                "max_ms": round(agg["max_ms"], 1),
+                "avg_db_ms": round(agg["total_db_ms"] / requests, 1),
+                "alerts": agg["alerts"]
+            })
+        rows.sort(key=lambda r: r["avg_queries"], reverse=True)
+        return rows[:limit]
+
+    def reset(self):
+        self.slow_requests.clear()
+        self.alerts.clear()
+        self.routes.clear()
+
+
+slow_request_log = SlowRequestLog()
+
+
+# =============================================================================
+# MIDDLEWARE
+# =============================================================================
+
+def _route_template(scope: Dict[str, Any]) -> Optional[str]:
+    """Path template of the matched route ("/api/cases/{case_id}"); None when nothing matched."""
+    route = scope.get("route")
+    return getattr(route, "path", None)
+
+
+class QueryInstrumentationMiddleware:
+    """
+    Pure ASGI middleware: binds a RequestQueryStats to the request context,
+    adds a Server-Timing header and records slow / query-heavy requests.
+    """
+
+    def __init__(self, app, log: Optional[SlowRequestLog] = None):
+        self.app = app
+        self.log = log or slow_request_log
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestQueryStats()
+        token = _current_stats.set(stats)
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_with_timing(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                elapsed_ms = (time.perf_counter() - started) * 1000
+                headers = list(message.get("headers", []))
+                headers.append((
+                    b"server-timing",
+                    (
+                        f'db;dur={stats.db_time_ms:.1f};desc="{stats.query_count} queries", '
+                        f'app;dur={elapsed_ms:.1f}'
+                    ).encode("latin-1")
+                ))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current_stats.reset(token)
+            duration_ms = (time.perf_counter() - started) * 1000
+            # Per-route aggregates are keyed by template: unmatched paths would grow them without bound
+            route = _route_template(scope)
+            if route is not None:
+                try:
+                    self.log.record(
+                        scope.get("method", ""),
+                        route,
+                        scope.get("path", ""),
+                        status_code,
+                        duration_ms,
+                        stats
+                    )
+                except Exception as e:
+                    logger.debug(f"Could not record request stats: {e}")
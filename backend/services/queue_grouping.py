@@ -0,0 +1,214 @@
+"""
+Queue Grouping - Server-side grouping for the "pending-grouped" rule views
+
+The WhatsApp and email rule tabs show pending queue items grouped by date,
+business type, webinar, buyer persona or case. Instead of loading every
+queue document (email bodies included) and grouping in Python, the views:
+
+1. Count pending items per grouping key with a $group stage
+   (pending_buckets). Persona keys are normalised in the pipeline
+   (normalized_key). Only keys and counts leave MongoDB.
+2. Map each bucket to its display group in Python (defaults, webinar data,
+   case lookups). There are few distinct keys, so this is cheap and keeps
+   the exact grouping rules of the routers.
+3. Load the members of one group on demand, one page at a time, with a
+   filter built from the group id alone (value_filter, normalized_key_filter,
+   case_members_filter / page_members), without recounting the groups.
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+
+from database import db
+
+MEMBERS_DEFAULT_PAGE_SIZE = 20
+MEMBERS_MAX_PAGE_SIZE = 500
+
+# Case stages for the coachee rules (W12 / E03)
+CASE_STAGES_EN_CURSO = ["ganados"]
+CASE_STAGES_CERRADOS = ["concluidos", "contenidos_transcritos", "reporte_presentado", "caso_publicado"]
+
+
+def normalized_key(path: str, default: str) -> Dict[str, Any]:
+    """Expression: lower-cased, trimmed value of path; default when missing or blank."""
+    key = {"$toLower": {"$trim": {"input": {"$ifNull": [f"${path}", ""]}}}}
+    return {"$cond": [{"$eq": [key, ""]}, default, key]}
+
+
+def normalized_key_filter(path: str, key: str, default: str) -> Dict[str, Any]:
+    """Filter selecting the documents whose normalized_key(path, default) is key."""
+    return {"$expr": {"$eq": [normalized_key(path, default), key]}}
+
+
+def value_filter(path: str, value: str, default: str) -> Dict[str, Any]:
+    """Filter for a group keyed by the raw value of path (default: missing or empty)."""
+    if value == default:
+        return {path: {"$in": [None, "", default]}}
+    return {path: value}
+
+
+async def pending_buckets(
+    collection,
+    match: Dict[str, Any],
+    fields: Dict[str, Any],
+    first: Optional[Dict[str, str]] = None,
+    sort: Optional[List[Tuple[str, int]]] = None
+) -> List[Dict[str, Any]]:
+    """
+    Count documents per distinct combination of raw field values.
+
+    fields maps a short name to a document path, e.g. {"bp": "metadata.buyer_persona"},
+    or to an expression such as normalized_key(...).
+    first maps a name to a path whose first value per bucket is kept for display.
+    Returns [{"keys": {name: raw_value}, "count": n, "first": {name: value}}].
+    Missing and null values both come back as None.
+    """
+    group: Dict[str, Any] = {
+        "_id": {name: f"${path}" if isinstance(path, str) else path for name, path in fields.items()},
+        "count": {"$sum": 1},
+    }
+    for name, path in (first or {}).items():
+        group[name] = {"$first": f"${path}"}
+
+    pipeline: List[Dict[str, Any]] = [{"$match": match}]
+    if sort:
+        pipeline.append({"$sort": dict(sort)})
+    pipeline.append({"$group": group})
+
+    rows = await collection.aggregate(pipeline).to_list(None)
+    return [
+        {
+            "keys": {name: (row["_id"] or {}).get(name) for name in fields},
+            "count": row["count"],
+            "first": {name: row.get(name) for name in (first or {})},
+        }
+        for row in rows
+    ]
+
+
+async def page_members(
+    collection,
+    query: Optional[Dict[str, Any]],
+    projection: Dict[str, Any],
+    page: int = 1,
+    page_size: int = MEMBERS_DEFAULT_PAGE_SIZE,
+    sort: Optional[List[Tuple[str, int]]] = None
+) -> Dict[str, Any]:
+    """One page of group members plus pagination info."""
+    page = max(page, 1)
+    page_size = max(1, min(page_size, MEMBERS_MAX_PAGE_SIZE))
+
+    items: List[Dict[str, Any]] = []
+    total_count = 0
+    if query is not None:
+        total_count = await collection.count_documents(query)
+        cursor = collection.find(query, projection)
+        if sort:
+            cursor = cursor.sort(sort)
+        items = await cursor.skip((page - 1) * page_size).limit(page_size).to_list(page_size)
+
+    return {
+        "emails": items,
+        "total_count": total_count,
+        "page": page,
+        "page_size": page_size,
+        "total_pages": (total_count + page_size - 1) // page_size,
+    }
+
+
+async def cases_for_contacts(contact_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Map contact_id -> the active Stage 4 case the contact belongs to.
+    One query for all contacts; when a contact is in several cases the
+    first one in natural order wins (same as the former per-contact find_one).
+    """
+    if not contact_ids:
+        return {}
+
+    cases = await db.cases.find(
+        {
+            "status": "active",
+            "stage": {"$in": CASE_STAGES_EN_CURSO + CASE_STAGES_CERRADOS},
+            "contact_ids": {"$in": contact_ids}
+        },
+        {"_id": 0, "id": 1, "name": 1, "company_names": 1, "stage": 1, "contact_ids": 1}
+    ).to_list(None)
+
+    wanted = set(contact_ids)
+    by_contact: Dict[str, Dict[str, Any]] = {}
+    for case in cases:
+        for contact_id in case.get("contact_ids") or []:
+            if contact_id in wanted and contact_id not in by_contact:
+                by_contact[contact_id] = case
+    return by_contact
+
+
+async def case_members_filter(group_id: str, subgroup_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """
+    contact_id filter for one case group or case (W12 / E03), from the cases
+    alone. A contact in several cases stays under the case cases_for_contacts
+    picks for the grouped view. None when the group has no contacts.
+    """
+    stages = {"casos_en_curso": CASE_STAGES_EN_CURSO, "casos_cerrados": CASE_STAGES_CERRADOS}.get(group_id)
+    if not stages:
+        return None
+    query: Dict[str, Any] = {"status": "active", "stage": {"$in": stages}}
+    if subgroup_id:
+        query["id"] = subgroup_id
+    cases = await db.cases.find(query, {"_id": 0, "id": 1, "contact_ids": 1}).to_list(None)
+    case_ids = {case["id"] for case in cases}
+    candidates = list({contact_id for case in cases for contact_id in case.get("contact_ids") or []})
+
+    assigned = await cases_for_contacts(candidates)
+    contact_ids = sorted(contact_id for contact_id, case in assigned.items() if case["id"] in case_ids)
+    return {"contact_id": {"$in": contact_ids}} if contact_ids else None
+
+
+def case_group_id(case: Dict[str, Any]) -> str:
+    """Main group for a coachee case: in progress vs closed with active students."""
+    return "casos_en_curso" if case.get("stage") in CASE_STAGES_EN_CURSO else "casos_cerrados"
+
+
+def case_display_name(case: Dict[str, Any]) -> str:
+    case_name = case.get("name", "Sin nombre")
+    company = case.get("company_names", [""])[0] if case.get("company_names") else ""
+    return f"{case_name}" + (f" ({company})" if company else "")
+
+
+def build_case_groups(buckets: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Main category groups with one subgroup per case (buckets carry "case")."""
+    subgroups: Dict[str, Dict[str, Dict[str, Any]]] = {"casos_en_curso": {}, "casos_cerrados": {}}
+    for bucket in buckets:
+        case = bucket["case"]
+        subgroup = subgroups[bucket["group_id"]].setdefault(case["id"], {
+            "subgroup_id": case["id"],
+            "subgroup_name": case_display_name(case),
+            "case_stage": case.get("stage", ""),
+            "count": 0
+        })
+        subgroup["count"] += bucket["count"]
+
+    groups = []
+    en_curso_cases = list(subgroups["casos_en_curso"].values())
+    if en_curso_cases:
+        groups.append({
+            "group_id": "casos_en_curso",
+            "group_type": "main_category",
+            "group_name": "Casos en curso",
+            "description": "Estado: Ganados",
+            "subgroups": en_curso_cases,
+            "count": sum(c["count"] for c in en_curso_cases),
+            "has_error": False
+        })
+
+    cerrados_cases = list(subgroups["casos_cerrados"].values())
+    if cerrados_cases:
+        groups.append({
+            "group_id": "casos_cerrados",
+            "group_type": "main_category",
+            "group_name": "Casos cerrados con alumnos activos",
+            "description": "Estados: Concluidos, Transcritos, Reporte Presentado, Publicado",
+            "subgroups": cerrados_cases,
+            "count": sum(c["count"] for c in cerrados_cases),
+            "has_error": False
+        })
+    return groups
@@ -0,0 +1,289 @@
+"""
+Response Cache Service - Cached public GET responses with ETag / 304 support
+
+The unauthenticated endpoints behind the public website (blog, client logos,
+case studies, LMS catalogue, website config dropdowns, upcoming events) are
+read far more often than they change. ResponseCacheMiddleware:
+
+- Matches the request path against PUBLIC_CACHE_RULES (path prefix ->
+  namespace + TTL); anything else passes straight through
+- Keys entries by path + sorted query string and keeps them in a bounded
+  in-memory LRU, per process
+- Only stores 200 responses without Set-Cookie
+- Adds a strong ETag (sha256 of the body) and Cache-Control so browsers and
+  CDNs can revalidate; If-None-Match hits are answered with 304
+- Expires entries after the rule's TTL, or earlier when a write endpoint
+  calls response_cache.invalidate(namespace)
+
+Per-route hit ratios are exposed at /api/admin/performance/response-cache.
+"""
+
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode
+
+from config import RESPONSE_CACHE_MAX_ENTRIES
+
+logger = logging.getLogger('response_cache')
+
+# (path prefix, namespace, ttl seconds). First match wins; an entry ending
+# in "/" matches the prefix, otherwise the path must match exactly.
+PUBLIC_CACHE_RULES: List[Tuple[str, str, int]] = [
+    ("/api/blog/public/posts", "blog", 300),
+    ("/api/public/client-logos", "public_website", 600),
+    ("/api/public/case-studies", "public_website", 600),
+    ("/api/public/testimonials", "public_website", 600),
+    ("/api/lms/public/", "lms", 300),
+    ("/api/website-config/formatos/public", "website_config", 600),
+    ("/api/website-config/programas/public", "website_config", 600),
+    ("/api/website-config/niveles/public", "website_config", 600),
+    ("/api/events-v2/public/upcoming", "events", 120),
+]
+
+# Browsers / CDNs may reuse a response this long before revalidating
+CLIENT_MAX_AGE_SECONDS = 60
+
+
+def match_rule(path: str) -> Optional[Tuple[str, str, int]]:
+    """(route, namespace, ttl) of the cache rule for a path, or None if not cacheable."""
+    for prefix, namespace, ttl in PUBLIC_CACHE_RULES:
+        if path == prefix or (prefix.endswith("/") and path.startswith(prefix)):
+            return prefix, namespace, ttl
+    return None
+
+
+def cache_key(path: str, query_string: bytes) -> str:
+    """Path plus query params in a stable order (?b=2&a=1 == ?a=1&b=2)."""
+    params = parse_qsl(query_string.decode("latin-1"), keep_blank_values=True)
+    if not params:
+        return path
+    return f"{path}?{urlencode(sorted(params))}"
+
+
+def make_etag(body: bytes) -> str:
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [c.strip() for c in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+class CachedResponse:
+    """A stored 200 response."""
+
+    __slots__ = ("namespace", "route", "body", "headers", "etag", "expires_at")
+
+    def __init__(self, namespace: str, route: str, body: bytes, headers: List[Tuple[bytes, bytes]], etag: str, expires_at: float):
+        self.namespace = namespace
+        self.route = route
+        self.body = body
+        self.headers = headers
+        self.etag = etag
+        self.expires_at = expires_at
+
+
+class ResponseCache:
+    """
+    Bounded LRU of public responses plus per-route hit / miss counters.
+    Process-local and reset on restart, like the slow request log.
+    """
+
+    def __init__(self, max_entries: int = RESPONSE_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        self.routes: Dict[str, Dict[str, int]] = {}
+        self.invalidations: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def _route_stats(self, route: str) -> Dict[str, int]:
+        return self.routes.setdefault(route, {"hits": 0, "misses": 0, "not_modified": 0})
+
+    def get(self, key: str, route: str) -> Optional[CachedResponse]:
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry.expires_at <= time.monotonic():
+                del self.entries[key]
+                entry = None
+            stats = self._route_stats(route)
+            if entry is None:
+                stats["misses"] += 1
+                return None
+            self.entries.move_to_end(key)
+            stats["hits"] += 1
+            return entry
+
+    def record_not_modified(self, route: str):
+        with self._lock:
+            self._route_stats(route)["not_modified"] += 1
+
+    def generation(self, namespace: str) -> int:
+        """Invalidation count of a namespace; put() skips responses computed before the latest one."""
+        with self._lock:
+            return self.invalidations.get(namespace, 0)
+
+    def put(self, key: str, entry: CachedResponse, generation: Optional[int] = None):
+        with self._lock:
+            if generation is not None and generation != self.invalidations.get(entry.namespace, 0):
+                return
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def invalidate(self, namespace: str) -> int:
+        """Drop every entry of a namespace. Called by the write endpoints."""
+        with self._lock:
+            keys = [k for k, e in self.entries.items() if e.namespace == namespace]
+            for key in keys:
+                del self.entries[key]
+            self.invalidations[namespace] = self.invalidations.get(namespace, 0) + 1
+        if keys:
+            logger.info(f"Response cache: invalidated {len(keys)} '{namespace}' entries")
+        return len(keys)
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            routes = []
+            for route, stats in self.routes.items():
+                lookups = stats["hits"] + stats["misses"]
+                routes.append({
+                    "route": route,
+                    "hits": stats["hits"],
+                    "misses": stats["misses"],
+                    "not_modified": stats["not_modified"],
+                    "hit_ratio": round(stats["hits"] / lookups, 3) if lookups else 0.0
+                })
+            namespaces: Dict[str, int] = {}
+            for entry in self.entries.values():
+                namespaces[entry.namespace] = namespaces.get(entry.namespace, 0) + 1
+            result = {
+                "entries": len(self.entries),
+                "max_entries": self.max_entries,
+                "entries_by_namespace": namespaces,
+                "invalidations": dict(self.invalidations),
+            }
+        routes.sort(key=lambda r: r["hits"] + r["misses"], reverse=True)
+        result["routes"] = routes
+        return result
+
+    def reset(self):
+        with self._lock:
+            self.entries.clear()
+            self.routes.clear()
+            self.invalidations.clear()
+
+
+response_cache = ResponseCache()
+
+
+# =============================================================================
+# MIDDLEWARE
+# =============================================================================
+
+def _header(scope: Dict[str, Any], name: bytes) -> str:
+    for key, value in scope.get("headers") or []:
+        if key == name:
+            return value.decode("latin-1")
+    return ""
+
+
+def _cache_headers(etag: str, status: str) -> List[Tuple[bytes, bytes]]:
+    return [
+        (b"etag", etag.encode("latin-1")),
+        (b"cache-control", f"public, max-age={CLIENT_MAX_AGE_SECONDS}".encode("latin-1")),
+        (b"x-cache", status.encode("latin-1")),
+    ]
+
+
+class ResponseCacheMiddleware:
+    """
+    Pure ASGI middleware serving public GET/HEAD routes from response_cache.
+    Must sit inside CORSMiddleware so CORS headers are computed per request
+    and never stored.
+    """
+
+    def __init__(self, app, cache: Optional[ResponseCache] = None):
+        self.app = app
+        self.cache = cache or response_cache
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope.get("method") not in ("GET", "HEAD"):
+            await self.app(scope, receive, send)
+            return
+
+        path = scope.get("path", "")
+        rule = match_rule(path)
+        if rule is None:
+            await self.app(scope, receive, send)
+            return
+
+        route, namespace, ttl = rule
+        key = cache_key(path, scope.get("query_string", b""))
+        if_none_match = _header(scope, b"if-none-match")
+
+        entry = self.cache.get(key, route)
+        if entry is not None:
+            await self._send_cached(scope, send, entry, if_none_match, "HIT")
+            return
+
+        # Miss: run the endpoint and buffer its response
+        generation = self.cache.generation(namespace)
+        start_message: Dict[str, Any] = {}
+        chunks: List[bytes] = []
+
+        async def buffer_send(message):
+            if message["type"] == "http.response.start":
+                start_message.update(message)
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+
+        await self.app(scope, receive, buffer_send)
+
+        body = b"".join(chunks)
+        status = start_message.get("status", 500)
+        headers = [
+            (k, v) for k, v in start_message.get("headers", [])
+            if k.lower() != b"content-length"
+        ]
+        has_cookie = any(k.lower() == b"set-cookie" for k, _ in headers)
+
+        if status != 200 or has_cookie or scope["method"] == "HEAD":
+            await send({**start_message, "headers": headers + [(b"content-length", str(len(body)).encode())]})
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        entry = CachedResponse(
+            namespace=namespace,
+            route=route,
+            body=body,
+            headers=[(k, v) for k, v in headers if k.lower() not in (b"etag", b"cache-control")],
+            etag=make_etag(body),
+            expires_at=time.monotonic() + ttl
+        )
+        self.cache.put(key, entry, generation)
+        await self._send_cached(scope, send, entry, if_none_match, "MISS")
+
+    async def _send_cached(self, scope, send, entry: CachedResponse, if_none_match: str, status: str):
+        if etag_matches(if_none_match, entry.etag):
+            self.cache.record_not_modified(entry.route)
+            await send({
+                "type": "http.response.start",
+                "status": 304,
+                "headers": _cache_headers(entry.etag, status)
+            })
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        headers = entry.headers + _cache_headers(entry.etag, status) + [
+            (b"content-length", str(len(entry.body)).encode())
+        ]
+        await send({"type": "http.response.start", "status": 200, "headers": headers})
+        body = b"" if scope["method"] == "HEAD" else entry.body
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,196 @@
+"""
+Rule Evaluation Context - Shared snapshot for queue generation
+
+Email (E01-E10) and WhatsApp (W01-W14) queue generation evaluate many rules
+against the same supporting data: future webinars and who registered,
+quotes by email, active cases by stage and contact. Each rule used to load
+that data itself (full webinar `registrants` arrays included), and each rule
+scanned unified_contacts with its own to_list().
+
+A RuleEvaluationContext is loaded once per generation run, with the
+supporting queries running concurrently, and exposes indexed lookups:
+
+    ctx.registered_emails              emails registered to any future webinar
+    ctx.webinars_for_persona(bp)       future webinars for a buyer persona, by date
+    ctx.quote_by_email[email]          latest quote date for an email
+    ctx.contact_cases(id, stages)      active cases of a contact
+    ctx.contacts_in_cases(stages)      contact ids in active cases
+
+Rule evaluators read from it while contacts stream through a cursor
+(iter_contacts), so a full run scans unified_contacts once.
+"""
+
+import asyncio
+import logging
+from datetime import datetime, timezone, timedelta
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Set
+
+from database import db
+from utils.timestamps import timestamp_in_range, timestamp_query
+
+logger = logging.getLogger('rule_context')
+
+CONTACT_CURSOR_BATCH_SIZE = 1000
+
+
+def normalize_email(email_value) -> str:
+    """Normalize email field that could be string or list to lowercase string"""
+    if email_value is None:
+        return ""
+    if isinstance(email_value, list):
+        for e in email_value:
+            if isinstance(e, str) and "@" in e:
+                return e.lower().strip()
+        return ""
+    if isinstance(email_value, str):
+        return email_value.lower().strip() if "@" in email_value else ""
+    return ""
+
+
+def persona_key(buyer_persona) -> str:
+    return (buyer_persona or "").lower().strip() if isinstance(buyer_persona, str) else ""
+
+
+def has_any(value, options: Iterable[Any]) -> bool:
+    """Python equivalent of {field: {"$in": options}} (scalar or array field)"""
+    options = set(options)
+    if isinstance(value, list):
+        return any(v in options for v in value if isinstance(v, (str, int, float)))
+    return isinstance(value, (str, int, float)) and value in options
+
+
+class RuleEvaluationContext:
+    """Supporting data for one generation run, loaded once and indexed in memory."""
+
+    def __init__(self, now: Optional[datetime] = None):
+        self.now = now or datetime.now(timezone.utc)
+        self.today = self.now.strftime("%Y-%m-%d")
+        self.future_webinars: List[Dict[str, Any]] = []
+        self.future_webinars_by_id: Dict[str, Dict[str, Any]] = {}
+        self.registered_by_webinar: Dict[str, Set[str]] = {}
+        self.registered_emails: Set[str] = set()
+        self.past_webinars_by_id: Dict[str, Dict[str, Any]] = {}
+        self.quote_by_email: Dict[str, str] = {}
+        self.cases_by_contact: Dict[str, List[Dict[str, Any]]] = {}
+        self._webinars_by_persona: Dict[str, List[Dict[str, Any]]] = {}
+
+    @classmethod
+    async def load(cls, now: Optional[datetime] = None) -> "RuleEvaluationContext":
+        ctx = cls(now)
+        await asyncio.gather(
+            ctx._load_future_webinars(),
+            ctx._load_past_webinars(),
+            ctx._load_quotes(),
+            ctx._load_cases(),
+        )
+        logger.info(
+            f"Rule context: {len(ctx.future_webinars)} future webinars, "
+            f"{len(ctx.quote_by_email)} quoted emails, {len(ctx.cases_by_contact)} contacts in cases"
+        )
+        return ctx
+
+    # -------------------------------------------------------------------------
+    # Loaders
+    # -------------------------------------------------------------------------
+
+    async def _load_future_webinars(self):
+        # Only registrant emails are read, not the full embedded registrants
+        cursor = db.webinar_events_v2.find(
+            {"webinar_date": {"$gte": self.today}},
+            {"_id": 0, "id": 1, "name": 1, "webinar_date": 1, "webinar_time": 1,
+             "buyer_personas": 1, "watching_room_url": 1, "registrants.email": 1}
+        ).sort("webinar_date", 1)
+        async for webinar in cursor:
+            registrants = webinar.pop("registrants", None) or []
+            emails = {normalize_email(r.get("email")) for r in registrants if isinstance(r, dict)}
+            emails.discard("")
+            self.future_webinars.append(webinar)
+            self.future_webinars_by_id[webinar["id"]] = webinar
+            self.registered_by_webinar[webinar["id"]] = emails
+            self.registered_emails.update(emails)
+            for bp in webinar.get("buyer_personas") or []:
+                key = persona_key(bp)
+                if key:
+                    self._webinars_by_persona.setdefault(key, []).append(webinar)
+
+    async def _load_past_webinars(self):
+        async for webinar in db.webinar_events_v2.find(
+            {"webinar_date": {"$lt": self.today}},
+            {"_id": 0, "id": 1, "name": 1, "webinar_date": 1}
+        ):
+            self.past_webinars_by_id[webinar["id"]] = webinar
+
+    async def _load_quotes(self):
+        async for quote in db.quotes.find(
+            {"status": {"$ne": "cancelled"}},
+            {"_id": 0, "client_email": 1, "created_at": 1}
+        ):
+            email = normalize_email(quote.get("client_email"))
+            if email:
+                created = quote.get("created_at") or ""
+                if email not in self.quote_by_email or created > self.quote_by_email[email]:
+                    self.quote_by_email[email] = created
+
+    async def _load_cases(self):
+        # quotes.source keeps the payload small while telling whether a case has quotes
+        async for case in db.cases.find(
+            {"status": "active", "contact_ids": {"$exists": True, "$ne": []}},
+            {"_id": 0, "id": 1, "name": 1, "stage": 1, "company_names": 1, "contact_ids": 1, "quotes.source": 1}
+        ):
+            case["has_quotes"] = bool(case.pop("quotes", None))
+            for contact_id in case.get("contact_ids") or []:
+                self.cases_by_contact.setdefault(contact_id, []).append(case)
+
+    # -------------------------------------------------------------------------
+    # Lookups
+    # -------------------------------------------------------------------------
+
+    def webinars_for_persona(self, buyer_persona) -> List[Dict[str, Any]]:
+        """Future webinars targeting a buyer persona, closest first"""
+        return self._webinars_by_persona.get(persona_key(buyer_persona), [])
+
+    def contact_cases(self, contact_id: str, stages: Optional[Iterable[str]] = None, with_quotes: bool = False) -> List[Dict[str, Any]]:
+        cases = self.cases_by_contact.get(contact_id, [])
+        if stages is not None:
+            stages = set(stages)
+            cases = [c for c in cases if c.get("stage") in stages]
+        if with_quotes:
+            cases = [c for c in cases if c["has_quotes"]]
+        return cases
+
+    def contacts_in_cases(self, stages: Optional[Iterable[str]] = None, with_quotes: bool = False) -> Set[str]:
+        stages = set(stages) if stages is not None else None
+        return {
+            contact_id for contact_id, cases in self.cases_by_contact.items()
+            if any((stages is None or c.get("stage") in stages) and (c["has_quotes"] or not with_quotes) for c in cases)
+        }
+
+    # -------------------------------------------------------------------------
+    # Cadence
+    # -------------------------------------------------------------------------
+
+    def cadence_threshold(self, days: int) -> datetime:
+        return self.now - timedelta(days=days)
+
+    def cadence_query(self, field: str, days: int) -> Dict[str, Any]:
+        """Same shape as utils.contact_helpers.build_cadence_query, at the context's clock"""
+        return {"$or": [
+            {field: {"$exists": False}},
+            {field: None},
+            *timestamp_query(field, lt=self.cadence_threshold(days))["$or"]
+        ]}
+
+    def cadence_ok(self, contact: Dict[str, Any], field: str, days: int) -> bool:
+        """In-memory check matching cadence_query (BSON dates or ISO strings)"""
+        value = contact.get(field)
+        return value is None or timestamp_in_range(value, lt=self.cadence_threshold(days))
+
+
+async def iter_contacts(
+    query: Dict[str, Any],
+    projection: Dict[str, Any],
+    batch_size: int = CONTACT_CURSOR_BATCH_SIZE
+) -> AsyncIterator[Dict[str, Any]]:
+    """Stream unified_contacts through a cursor instead of materialising a list"""
+    async for contact in db.unified_contacts.find(query, projection).batch_size(batch_size):
+        yield contact
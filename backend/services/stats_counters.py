@@ -0,0 +1,324 @@
+"""
+Counter-backed dashboard statistics
+
+Dashboards used to recount from scratch on every page view (one
+count_documents per stage / source, count_documents({}) over every
+collection). They now read small counter documents instead:
+
+    stat_counters  {scope, dimension, day, key, count}
+
+- Field counters: documents per value of a field (unified_contacts stage,
+  status, source, buyer_persona; email_queue status). Single-document write
+  paths call track_change(scope, before, after); batch writers (LinkedIn
+  import, persona reclassification) call track_changes() once per batch.
+- Email outcomes: email_logs sent / opened / clicked, all-time (day None) and
+  per day. Send and tracking endpoints call count_email_event(). email_logs
+  expire after MESSAGE_LOG_RETENTION_DAYS, so the all-time totals are only
+  seeded from them on the first reconciliation and then kept by the
+  increments alone.
+- Queue sends per rule and day (email_queue sent_by_rule), counted by the
+  queue processor.
+- reconcile_counters() recomputes the rest from the collections. It runs
+  every STATS_RECONCILE_INTERVAL_MINUTES, which also picks up the writers
+  that don't maintain counters (migrations, scripts, field edits outside the
+  hooked paths); get_counters_state() tells readers how old that is. It
+  applies the difference to a snapshot taken before recounting as $inc:
+  increments after the recount are kept, while a write landing between the
+  snapshot and the recount is counted twice until the next reconciliation.
+
+Counter updates are best effort: a failure is logged and never fails the
+write path; the next reconciliation corrects it (except for the all-time
+email totals).
+"""
+import logging
+from collections import defaultdict
+from datetime import timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from pymongo import UpdateOne
+
+from config import STATS_DAILY_WINDOW_DAYS, STATS_RECONCILE_INTERVAL_MINUTES
+from database import db
+from utils.timestamps import parse_timestamp, timestamp_query, utc_now
+
+logger = logging.getLogger(__name__)
+
+# Collection -> fields with a per-value counter
+FIELD_COUNTERS: Dict[str, List[str]] = {
+    "unified_contacts": ["stage", "status", "source", "buyer_persona"],
+    "email_queue": ["status"],
+}
+
+# email_logs query per outcome (logs are only written for sent emails)
+EMAIL_OUTCOME_QUERIES = {
+    "sent": {},
+    "opened": {"$or": [{"opened": True}, {"opened_at": {"$nin": [None, ""]}}]},
+    "clicked": {"$or": [{"clicked": True}, {"clicked_at": {"$nin": [None, ""]}}]},
+}
+
+# email_logs field holding the time of each outcome
+EMAIL_OUTCOME_FIELDS = {"sent": "sent_at", "opened": "opened_at", "clicked": "clicked_at"}
+
+
+# ============ KEYS ============
+
+def counter_key(value: Any) -> str:
+    """Counter key for a field value (missing / None / "" share the "" key)"""
+    if value is None:
+        return ""
+    return str(value)
+
+
+def _counter_id(scope: str, dimension: str, key: str, day: Optional[str] = None) -> str:
+    return f"{scope}|{dimension}|{day or ''}|{key}"
+
+
+def counter_projection(scope: str) -> Dict[str, int]:
+    """Projection of the counted fields of a scope (before-image for track_change)"""
+    return {"_id": 0, **{field: 1 for field in FIELD_COUNTERS.get(scope, [])}}
+
+
+def _day(value: Any) -> Optional[str]:
+    dt = parse_timestamp(value)
+    return dt.date().isoformat() if dt else None
+
+
+# ============ WRITE PATHS ============
+
+async def increment(scope: str, dimension: str, key: Any, amount: int = 1, day: Optional[str] = None):
+    """Add amount to one counter (best effort)"""
+    key = counter_key(key)
+    try:
+        await db.stat_counters.update_one(
+            {"_id": _counter_id(scope, dimension, key, day)},
+            {
+                "$inc": {"count": amount},
+                "$set": {"scope": scope, "dimension": dimension, "key": key, "day": day, "updated_at": utc_now()},
+            },
+            upsert=True
+        )
+    except Exception as e:
+        logger.warning(f"Counter {scope}.{dimension}={key} not updated: {e}")
+
+
+def _counter_update(scope: str, dimension: str, key: str, amount: int, now, day: Optional[str] = None) -> UpdateOne:
+    return UpdateOne(
+        {"_id": _counter_id(scope, dimension, key, day)},
+        {
+            "$inc": {"count": amount},
+            "$set": {"scope": scope, "dimension": dimension, "key": key, "day": day, "updated_at": now},
+        },
+        upsert=True
+    )
+
+
+async def track_changes(scope: str, changes: Iterable[Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]]):
+    """
+    Move the field counters for a batch of (before, after) pairs in one
+    bulk_write: before=None for an insert, after=None for a delete. `after`
+    may be a partial $set doc; fields it doesn't contain keep their `before`
+    value.
+    """
+    deltas: Dict[Tuple[str, str], int] = defaultdict(int)
+    fields = FIELD_COUNTERS.get(scope, [])
+    for before, after in changes:
+        for field in fields:
+            old = counter_key(before.get(field)) if before is not None else None
+            if after is None:
+                new = None
+            elif field in after or before is None:
+                new = counter_key(after.get(field))
+            else:
+                new = old
+            if old == new:
+                continue
+            if old is not None:
+                deltas[(field, old)] -= 1
+            if new is not None:
+                deltas[(field, new)] += 1
+    now = utc_now()
+    operations = [
+        _counter_update(scope, field, key, amount, now)
+        for (field, key), amount in deltas.items() if amount
+    ]
+    if not operations:
+        return
+    try:
+        await db.stat_counters.bulk_write(operations, ordered=False)
+    except Exception as e:
+        logger.warning(f"Counters for {scope} not updated: {e}")
+
+
+async def track_change(scope: str, before: Optional[Dict[str, Any]], after: Optional[Dict[str, Any]]):
+    """Move the field counters of one document (see track_changes)"""
+    await track_changes(scope, [(before, after)])
+
+
+async def count_email_event(outcome: str, at: Any = None, amount: int = 1):
+    """Count an email outcome (sent / opened / clicked) in the all-time and daily counters"""
+    day = _day(at) or utc_now().date().isoformat()
+    await increment("email_logs", "outcome", outcome, amount)
+    await increment("email_logs", "outcome", outcome, amount, day=day)
+
+
+# ============ READ ============
+
+async def get_counters(scope: str, dimension: str, day: Optional[str] = None) -> Dict[str, int]:
+    """key -> count for one dimension (all-time when day is None)"""
+    cursor = db.stat_counters.find(
+        {"scope": scope, "dimension": dimension, "day": day},
+        {"_id": 0, "key": 1, "count": 1}
+    )
+    return {doc["key"]: doc["count"] async for doc in cursor if doc["count"]}
+
+
+async def get_daily_counters(scope: str, dimension: str, since: str) -> Dict[str, Dict[str, int]]:
+    """day -> {key: count} for days >= since (YYYY-MM-DD)"""
+    result: Dict[str, Dict[str, int]] = defaultdict(dict)
+    cursor = db.stat_counters.find(
+        {"scope": scope, "dimension": dimension, "day": {"$gte": since}},
+        {"_id": 0, "day": 1, "key": 1, "count": 1}
+    )
+    async for doc in cursor:
+        if doc["count"]:
+            result[doc["day"]][doc["key"]] = doc["count"]
+    return dict(result)
+
+
+async def get_counters_state() -> Dict[str, Any]:
+    """
+    Freshness of the counters for API responses: when the last reconciliation
+    finished and how often it runs. Writes outside the hooked paths show up
+    only after the next one.
+    """
+    state = await db.stat_counters_state.find_one({"_type": "main"}, {"_id": 0, "finished_at": 1}) or {}
+    return {
+        "reconciled_at": state.get("finished_at"),
+        "reconcile_interval_minutes": STATS_RECONCILE_INTERVAL_MINUTES,
+    }
+
+
+async def ensure_counters() -> Optional[Dict[str, Any]]:
+    """Reconcile once if counters were never built (first dashboard view after deploy)"""
+    if await db.stat_counters_state.find_one({"_type": "main"}, {"_id": 1}):
+        return None
+    return await reconcile_counters()
+
+
+# ============ RECONCILIATION ============
+
+async def _current_counts(scope: str, dimension: str, days: Optional[List[str]] = None) -> Dict[str, int]:
+    """Stored counters of one dimension, keyed like the recomputed counts ('day|key' for days)"""
+    query = {"scope": scope, "dimension": dimension, "day": None if days is None else {"$in": days}}
+    counts: Dict[str, int] = {}
+    async for doc in db.stat_counters.find(query, {"_id": 0, "day": 1, "key": 1, "count": 1}):
+        name = doc["key"] if days is None else f"{doc['day']}|{doc['key']}"
+        counts[name] = doc.get("count") or 0
+    return counts
+
+
+async def _apply_counts(scope: str, dimension: str, counts: Dict[str, int], snapshot: Dict[str, int], days: bool = False):
+    """
+    Bring the counters of one dimension to the recomputed counts by $inc of
+    (recomputed - snapshot), so increments made after the recount are added
+    on top instead of overwritten. Keys that disappeared go to 0 (hidden by
+    the readers).
+    """
+    now = utc_now()
+    operations = []
+    for name in set(counts) | set(snapshot):
+        delta = counts.get(name, 0) - snapshot.get(name, 0)
+        if not delta:
+            continue
+        day, key = name.split("|", 1) if days else (None, name)
+        operations.append(_counter_update(scope, dimension, key, delta, now, day))
+    if operations:
+        await db.stat_counters.bulk_write(operations, ordered=False)
+
+
+async def _field_counts(scope: str, field: str) -> Dict[str, int]:
+    counts: Dict[str, int] = defaultdict(int)
+    pipeline = [{"$group": {"_id": f"${field}", "count": {"$sum": 1}}}]
+    async for item in db[scope].aggregate(pipeline):
+        counts[counter_key(item["_id"])] += item["count"]
+    return dict(counts)
+
+
+async def _queue_daily_counts(since) -> Dict[str, int]:
+    """'day|rule' -> count of email_queue items sent at or after since"""
+    counts: Dict[str, int] = defaultdict(int)
+    query = {"status": "sent", **timestamp_query("sent_at", gte=since)}
+    async for item in db.email_queue.find(query, {"_id": 0, "sent_at": 1, "rule": 1}):
+        day = _day(item.get("sent_at"))
+        if day:
+            counts[f"{day}|{counter_key(item.get('rule'))}"] += 1
+    return dict(counts)
+
+
+async def _email_daily_counts(since) -> Dict[str, int]:
+    """'day|outcome' -> count for email_logs outcomes at or after since"""
+    counts: Dict[str, int] = defaultdict(int)
+    query = {"$or": [timestamp_query(field, gte=since) for field in EMAIL_OUTCOME_FIELDS.values()]}
+    projection = {"_id": 0, "sent_at": 1, "opened": 1, "opened_at": 1, "clicked": 1, "clicked_at": 1}
+    async for log in db.email_logs.find(query, projection):
+        for outcome, field in EMAIL_OUTCOME_FIELDS.items():
+            at = parse_timestamp(log.get(field))
+            if at and at >= since:
+                counts[f"{at.date().isoformat()}|{outcome}"] += 1
+    return dict(counts)
+
+
+async def reconcile_counters(scopes: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    Recompute the counters from the collections: one $group per field counter
+    and one scan of the last STATS_DAILY_WINDOW_DAYS of email_logs / sent
+    queue items for the daily counters. Each dimension is snapshotted before
+    its recount (_apply_counts). The all-time email outcomes are counted
+    only on the first run (no state yet); later runs leave them to
+    count_email_event since expired logs would lower them.
+    """
+    started = utc_now()
+    initial = not await db.stat_counters_state.find_one({"_type": "main"}, {"_id": 1})
+    reconciled = []
+    for scope, fields in FIELD_COUNTERS.items():
+        if scopes and scope not in scopes:
+            continue
+        for field in fields:
+            snapshot = await _current_counts(scope, field)
+            await _apply_counts(scope, field, await _field_counts(scope, field), snapshot)
+            reconciled.append(f"{scope}.{field}")
+
+    since = (started - timedelta(days=STATS_DAILY_WINDOW_DAYS)).replace(hour=0, minute=0, second=0, microsecond=0)
+    days = [(since + timedelta(days=n)).date().isoformat() for n in range(STATS_DAILY_WINDOW_DAYS + 2)]
+
+    if not scopes or "email_queue" in scopes:
+        snapshot = await _current_counts("email_queue", "sent_by_rule", days)
+        await _apply_counts("email_queue", "sent_by_rule", await _queue_daily_counts(since), snapshot, days=True)
+        reconciled.append("email_queue.sent_by_rule")
+
+    if not scopes or "email_logs" in scopes:
+        if initial:
+            snapshot = await _current_counts("email_logs", "outcome")
+            totals = {outcome: await db.email_logs.count_documents(query) for outcome, query in EMAIL_OUTCOME_QUERIES.items()}
+            await _apply_counts("email_logs", "outcome", totals, snapshot)
+        snapshot = await _current_counts("email_logs", "outcome", days)
+        await _apply_counts("email_logs", "outcome", await _email_daily_counts(since), snapshot, days=True)
+        reconciled.append("email_logs.outcome")
+
+    result = {
+        "success": True,
+        "reconciled": reconciled,
+        "started_at": started,
+        "finished_at": utc_now(),
+    }
+    await db.stat_counters_state.update_one({"_type": "main"}, {"$set": result}, upsert=True)
+    return result
+
+
+async def reconcile_counters_job():
+    """Scheduler entry point"""
+    try:
+        result = await reconcile_counters()
+        logger.info(f"Stat counters reconciled: {len(result['reconciled'])} dimensions")
+    except Exception as e:
+        logger.error(f"Error reconciling stat counters: {e}")
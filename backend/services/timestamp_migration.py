@@ -0,0 +1,206 @@
+"""
+Hot timestamp fields: ISO string -> BSON Date migration and TTL indexes
+
+Cadence filters, queue scheduling and activity stats range-query a handful of
+timestamp fields. Historically they were written as ISO strings, so range
+queries compared strings (only correct while every writer used the same
+offset format), sorting mixed "Z" and "+00:00" values, and TTL indexes could
+not be used (MongoDB only expires BSON dates).
+
+The hot writers now store datetimes. This module converts the documents that
+still hold strings, in batches, and creates the TTL indexes for queue and log
+data. Readers use utils/timestamps.py, which matches both representations
+until the migration has caught up.
+
+Run it from the nightly scheduler job or POST /api/admin/performance/timestamps/migrate.
+"""
+import logging
+from datetime import timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from pymongo import UpdateOne
+
+from config import (
+    EMAIL_QUEUE_SENT_RETENTION_DAYS,
+    MESSAGE_LOG_RETENTION_DAYS,
+    SCRAPING_LOG_RETENTION_DAYS,
+    TIMESTAMP_MIGRATION_BATCH_SIZE,
+)
+from database import db
+from utils.timestamps import parse_timestamp, utc_now
+
+logger = logging.getLogger(__name__)
+
+
+# ============ REGISTRY ============
+
+# Collection -> hot timestamp fields. "array.field" entries are fields of the
+# documents inside an array (webinar_history[].registered_at).
+# last_email_e6..e10 are per-webinar dicts ({webinar_id: timestamp}) and stay
+# as they are: they are only read per key, never range-queried.
+# unified_contacts.created_at / updated_at are not converted: most contact
+# writers still store ISO strings, and a half-migrated field would sort new
+# contacts (strings) after the converted ones (MongoDB orders by BSON type
+# first) in every list sorted by those fields.
+HOT_TIMESTAMP_FIELDS: Dict[str, List[str]] = {
+    "unified_contacts": [
+        "last_contacted_whatsapp",
+        "first_connected_on_linkedin",
+        *[f"last_email_e{n}_sent" for n in range(1, 6)],
+        *[f"last_email_e{n:02d}_sent" for n in range(1, 6)],
+        *[f"last_whatsapp_w{n:02d}_sent" for n in range(1, 15)],
+        "webinar_history.registered_at",
+        "webinar_history.attended_at",
+    ],
+    "email_queue": ["created_at", "updated_at", "scheduled_at", "sent_at"],
+    "whatsapp_queue": ["created_at", "sent_at"],
+    "email_logs": ["sent_at"],
+    "whatsapp_logs": ["sent_at"],
+    "scraping_logs": ["created_at"],
+}
+
+# (collection, field, retention, partial filter). Only BSON dates expire, so
+# documents still holding strings are kept until the migration converts them.
+TTL_INDEXES: List[Tuple[str, str, timedelta, Optional[Dict[str, Any]]]] = [
+    ("email_queue", "sent_at", timedelta(days=EMAIL_QUEUE_SENT_RETENTION_DAYS), {"status": "sent"}),
+    ("whatsapp_queue", "sent_at", timedelta(days=EMAIL_QUEUE_SENT_RETENTION_DAYS), {"status": "sent"}),
+    ("email_logs", "sent_at", timedelta(days=MESSAGE_LOG_RETENTION_DAYS), None),
+    ("whatsapp_logs", "sent_at", timedelta(days=MESSAGE_LOG_RETENTION_DAYS), None),
+    ("scraping_logs", "created_at", timedelta(days=SCRAPING_LOG_RETENTION_DAYS), None),
+]
+
+
+# ============ INDEXES ============
+
+async def ensure_timestamp_indexes() -> List[str]:
+    """
+    Create the TTL indexes. Each index is created on its own so that one
+    conflict (e.g. an existing non-TTL index on the same key) doesn't skip the
+    rest. Returns the names of the indexes that could not be created.
+    """
+    failed = []
+    for collection, field, retention, partial in TTL_INDEXES:
+        kwargs = {"expireAfterSeconds": int(retention.total_seconds()), "name": f"{field}_ttl"}
+        if partial:
+            kwargs["partialFilterExpression"] = partial
+        try:
+            await db[collection].create_index([(field, 1)], **kwargs)
+        except Exception as e:
+            logger.warning(f"⚠️ TTL index {collection}.{field} not created: {e}")
+            failed.append(f"{collection}.{field}")
+    return failed
+
+
+# ============ CONVERSION ============
+
+def _convert_array(items: Any, subfield: str) -> Tuple[Any, int, int]:
+    """Convert subfield in each dict of items. Returns (items, converted, unparseable)"""
+    converted = unparseable = 0
+    if not isinstance(items, list):
+        return items, 0, 0
+    result = []
+    for item in items:
+        if isinstance(item, dict) and isinstance(item.get(subfield), str):
+            dt = parse_timestamp(item[subfield])
+            if dt:
+                item = {**item, subfield: dt}
+                converted += 1
+            elif item[subfield]:
+                unparseable += 1
+        result.append(item)
+    return result, converted, unparseable
+
+
+async def migrate_field(
+    collection: str,
+    field: str,
+    batch_size: int = TIMESTAMP_MIGRATION_BATCH_SIZE,
+    dry_run: bool = False
+) -> Dict[str, int]:
+    """
+    Convert string values of one field to BSON dates, batch_size documents per
+    bulk write. Empty strings become null; values that can't be parsed are
+    counted and left untouched.
+    """
+    array, _, subfield = field.partition(".")
+    if subfield:
+        query = {array: {"$elemMatch": {subfield: {"$type": "string"}}}}
+        projection = {array: 1}
+    else:
+        query = {field: {"$type": "string"}}
+        projection = {field: 1}
+
+    stats = {"scanned": 0, "converted": 0, "unparseable": 0}
+    ops = []
+
+    async def flush():
+        if ops and not dry_run:
+            await db[collection].bulk_write(ops, ordered=False)
+        ops.clear()
+
+    async for doc in db[collection].find(query, projection):
+        stats["scanned"] += 1
+        if subfield:
+            items, converted, unparseable = _convert_array(doc.get(array), subfield)
+            stats["unparseable"] += unparseable
+            if not converted:
+                continue
+            stats["converted"] += converted
+            ops.append(UpdateOne({"_id": doc["_id"]}, {"$set": {array: items}}))
+        else:
+            value = doc.get(field)
+            dt = parse_timestamp(value)
+            if dt is None and value.strip():
+                stats["unparseable"] += 1
+                continue
+            stats["converted"] += 1
+            ops.append(UpdateOne({"_id": doc["_id"]}, {"$set": {field: dt}}))
+        if len(ops) >= batch_size:
+            await flush()
+    await flush()
+    return stats
+
+
+async def migrate_hot_timestamps(
+    collections: Optional[List[str]] = None,
+    batch_size: int = TIMESTAMP_MIGRATION_BATCH_SIZE,
+    dry_run: bool = False
+) -> Dict[str, Any]:
+    """
+    Convert every registered field (or those of the given collections) and
+    ensure the TTL indexes. Safe to re-run: only string values are touched, so
+    each run picks up what legacy writers stored since the last one.
+    """
+    started = utc_now()
+    results: Dict[str, Dict[str, Dict[str, int]]] = {}
+    for collection, fields in HOT_TIMESTAMP_FIELDS.items():
+        if collections and collection not in collections:
+            continue
+        for field in fields:
+            stats = await migrate_field(collection, field, batch_size=batch_size, dry_run=dry_run)
+            if stats["scanned"]:
+                results.setdefault(collection, {})[field] = stats
+                logger.info(f"Timestamp migration {collection}.{field}: {stats}")
+
+    summary = {
+        "success": True,
+        "dry_run": dry_run,
+        "converted": sum(s["converted"] for fields in results.values() for s in fields.values()),
+        "unparseable": sum(s["unparseable"] for fields in results.values() for s in fields.values()),
+        "fields": results,
+        "ttl_index_failures": [] if dry_run else await ensure_timestamp_indexes(),
+        "started_at": started,
+        "finished_at": utc_now(),
+    }
+    if not dry_run:
+        await db.timestamp_migration_state.update_one(
+            {"_type": "main"},
+            {"$set": {k: v for k, v in summary.items() if k != "fields"}},
+            upsert=True
+        )
+    return summary
+
+
+async def get_timestamp_migration_state() -> Optional[Dict[str, Any]]:
+    """Totals and time of the last migration run"""
+    return await db.timestamp_migration_state.find_one({"_type": "main"}, {"_id": 0})
@@ -4,6 +4,7 @@ Colors: green (ok), yellow (attention), red (critical), gray (not implemented)
 """
 from datetime import datetime, timezone, timedelta
 from database import db
+from utils.timestamps import parse_timestamp, timestamp_in_range
 
 
 async def calculate_all_traffic_lights():
@@ -76,15 +77,10 @@ async def calculate_all_traffic_lights():
     if weekly_task:
         last_checked = weekly_task.get("last_checked")
         if last_checked:
-            try:
-                if isinstance(last_checked, str):
-                    last_checked = datetime.fromisoformat(last_checked.replace("Z", "+00:00"))
-                # Task is valid if checked within current week
-                week_start = now - timedelta(days=now.weekday())
-                week_start = week_start.replace(hour=0, minute=0, second=0, microsecond=0)
-                weekly_task_checked = last_checked >= week_start
-            except:
-                pass
+            # Task is valid if checked within current week
+            week_start = now - timedelta(days=now.weekday())
+            week_start = week_start.replace(hour=0, minute=0, second=0, microsecond=0)
+            weekly_task_checked = timestamp_in_range(last_checked, gte=week_start)
     
     whatsapp_pending = await db.whatsapp_messages.count_documents({"status": "pending"})
     status["1.3.3"] = "green" if weekly_task_checked or whatsapp_pending == 0 else "red"
@@ -103,7 +99,7 @@ async def calculate_all_traffic_lights():
     # 2.1.1 Import LinkedIn Event Contacts
     last_import = await db.linkedin_imports.find_one({}, sort=[("created_at", -1)])
     if last_import:
-        import_date = datetime.fromisoformat(last_import.get("created_at", "2000-01-01").replace("Z", "+00:00"))
+        import_date = parse_timestamp(last_import.get("created_at")) or parse_timestamp("2000-01-01")
         days_since = (now - import_date).days
         status["2.1.1"] = "green" if days_since < 7 else "yellow" if days_since < 30 else "red"
     else:
@@ -195,7 +191,7 @@ async def calculate_all_traffic_lights():
                 due_date_str = task.get("due_date")
                 if due_date_str:
                     try:
-                        due_date = datetime.fromisoformat(due_date_str.replace("Z", "+00:00"))
+                        due_date = parse_timestamp(due_date_str)
                         if due_date < now:
                             has_overdue = True
                         elif due_date < now + timedelta(days=7):
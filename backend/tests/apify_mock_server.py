@@ -0,0 +1,126 @@
+"""
+Local Apify API mock
+
+Implements the subset of the Apify v2 API that services/apify_runner.py uses:
+
+- POST /v2/acts/{actor_id}/runs           start a run (honours waitForFinish)
+- GET  /v2/actor-runs/{run_id}            run status (honours waitForFinish)
+- GET  /v2/datasets/{dataset_id}/items    dataset items (offset / limit)
+
+Runs finish after `run_duration` seconds and produce items from
+`items_factory(actor_id, input)`. Inputs containing "fail": true end FAILED.
+
+In tests, mount it with httpx.ASGITransport. For manual runs:
+
+    uvicorn tests.apify_mock_server:app --port 8765
+    APIFY_API_BASE=http://localhost:8765/v2 uvicorn server:app
+"""
+
+import asyncio
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse
+
+
+def default_items(actor_id: str, input_data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    keyword = input_data.get("searchQuery") or input_data.get("keyword") or "item"
+    return [
+        {
+            "linkedinUrl": f"https://www.linkedin.com/in/{keyword.replace(' ', '-')}-{i}",
+            "firstName": keyword.title(),
+            "lastName": f"Person {i}",
+            "headline": f"{keyword} professional",
+        }
+        for i in range(5)
+    ]
+
+
+class ApifyMockState:
+    """Runs and datasets held in memory, plus counters for assertions."""
+
+    def __init__(
+        self,
+        run_duration: float = 0.0,
+        items_factory: Optional[Callable[[str, Dict[str, Any]], List[Dict[str, Any]]]] = None,
+        max_wait_seconds: float = 60.0,
+    ):
+        self.run_duration = run_duration
+        self.items_factory = items_factory or default_items
+        self.max_wait_seconds = max_wait_seconds
+        self.runs: Dict[str, Dict[str, Any]] = {}
+        self.datasets: Dict[str, List[Dict[str, Any]]] = {}
+        self.requests: List[str] = []
+        self.active_runs = 0
+        self.peak_active_runs = 0
+
+    def start(self, actor_id: str, input_data: Dict[str, Any]) -> Dict[str, Any]:
+        run_id = uuid.uuid4().hex[:12]
+        dataset_id = f"ds-{run_id}"
+        run = {
+            "id": run_id,
+            "actId": actor_id,
+            "status": "RUNNING",
+            "defaultDatasetId": dataset_id,
+            "_finishes_at": time.monotonic() + self.run_duration,
+            "_fail": bool(input_data.get("fail")),
+        }
+        self.runs[run_id] = run
+        self.datasets[dataset_id] = self.items_factory(actor_id, input_data)
+        self.active_runs += 1
+        self.peak_active_runs = max(self.peak_active_runs, self.active_runs)
+        return run
+
+    def refresh(self, run: Dict[str, Any]):
+        if run["status"] == "RUNNING" and time.monotonic() >= run["_finishes_at"]:
+            run["status"] = "FAILED" if run["_fail"] else "SUCCEEDED"
+            self.active_runs -= 1
+
+    async def wait(self, run: Dict[str, Any], wait_for_finish: float):
+        deadline = time.monotonic() + min(wait_for_finish, self.max_wait_seconds)
+        while True:
+            self.refresh(run)
+            if run["status"] != "RUNNING" or time.monotonic() >= deadline:
+                return
+            await asyncio.sleep(min(0.01, max(deadline - time.monotonic(), 0)))
+
+    @staticmethod
+    def public(run: Dict[str, Any]) -> Dict[str, Any]:
+        return {k: v for k, v in run.items() if not k.startswith("_")}
+
+
+def create_app(state: Optional[ApifyMockState] = None) -> FastAPI:
+    state = state or ApifyMockState()
+    mock = FastAPI(title="Apify API mock")
+    mock.state.apify = state
+
+    @mock.post("/v2/acts/{actor_id}/runs")
+    async def start_run(actor_id: str, request: Request, waitForFinish: float = 0):
+        state.requests.append(f"POST /acts/{actor_id}/runs")
+        run = state.start(actor_id.replace("~", "/"), await request.json())
+        await state.wait(run, waitForFinish)
+        return JSONResponse({"data": state.public(run)}, status_code=201)
+
+    @mock.get("/v2/actor-runs/{run_id}")
+    async def get_run(run_id: str, waitForFinish: float = 0):
+        state.requests.append(f"GET /actor-runs/{run_id}")
+        run = state.runs.get(run_id)
+        if not run:
+            raise HTTPException(status_code=404, detail="Run not found")
+        await state.wait(run, waitForFinish)
+        return {"data": state.public(run)}
+
+    @mock.get("/v2/datasets/{dataset_id}/items")
+    async def get_items(dataset_id: str, offset: int = 0, limit: int = 1000):
+        state.requests.append(f"GET /datasets/{dataset_id}/items?offset={offset}")
+        items = state.datasets.get(dataset_id)
+        if items is None:
+            raise HTTPException(status_code=404, detail="Dataset not found")
+        return items[offset:offset + limit]
+
+    return mock
+
+
+app = create_app()
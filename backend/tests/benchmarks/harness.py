@@ -0,0 +1,356 @@
+"""
+Offline Benchmark Harness - Hot endpoints against an in-memory MongoDB
+
+Runs the FastAPI app in-process (httpx ASGITransport, no network, no live
+preview URL) against mongomock-motor seeded with the synthetic dataset from
+scripts/generate_seed_data.py, and records per endpoint:
+- p50 / p95 / mean latency
+- MongoDB query count and time (per request, via RequestQueryStats)
+- Peak Python memory allocated while serving one request (tracemalloc)
+- Response size
+
+Results are compared against tests/benchmarks/baseline.json. Query counts
+are deterministic for a given dataset and are compared exactly; latency and
+memory are compared with a tolerance because they depend on the machine.
+
+The in-memory stand-in executes queries in Python, so absolute latencies are
+not production numbers. What they are good for is relative comparison:
+N+1 loops, full collection scans and unbounded to_list() calls show up as
+query count, latency and memory growth with dataset size.
+
+IMPORTANT: install_mongo_stand_in() must run before anything imports
+database.py; run_benchmarks.py is the entry point that guarantees that.
+"""
+
+import itertools
+import json
+import math
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import Any, Dict, List, Optional, Tuple
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.join(BACKEND_DIR, "scripts"))
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+# Dataset profiles: "smoke" is small enough for the test suite,
+# "full" matches the production contact count
+PROFILES = {
+    "smoke": {"contacts": 500, "iterations": 3},
+    "full": {"contacts": 28000, "iterations": 10},
+}
+DATASET_SEED = 42
+
+# (name, path) of the endpoints the UI hits on every page load
+SCENARIOS: List[Tuple[str, str]] = [
+    ("focus_traffic_lights", "/api/focus/traffic-light-status"),
+    ("email_traffic_light", "/api/email-rules/traffic-light-status"),
+    ("whatsapp_traffic_light", "/api/whatsapp-rules/traffic-light-status"),
+    ("global_search", "/api/search/global?q=garcia"),
+    ("contacts_list", "/api/contacts?limit=50"),
+    ("contacts_list_stage", "/api/contacts?stage=2&limit=50"),
+    ("mensajes_hoy_whatsapp", "/api/mensajes-hoy/whatsapp/all-contacts"),
+    ("email_pending_grouped", "/api/email-rules/rule/E01/pending-grouped"),
+    ("whatsapp_pending_grouped", "/api/whatsapp-rules/rule/W08/pending-grouped"),
+    ("contact_imports", "/api/contacts/imports"),
+    ("linkedin_import_jobs", "/api/linkedin-import/jobs"),
+]
+
+# Regression tolerances (relative, plus an absolute floor so that
+# sub-millisecond endpoints don't flag on scheduler noise)
+LATENCY_TOLERANCE = 0.5
+LATENCY_FLOOR_MS = 5.0
+MEMORY_TOLERANCE = 0.25
+MEMORY_FLOOR_KIB = 64.0
+
+BENCHMARK_USER = {"id": "benchmark-user", "email": "benchmark@leaderlix.com", "name": "Benchmark", "role": "admin"}
+
+# Collection methods counted as one query each
+COUNTED_ASYNC_METHODS = [
+    "find_one", "count_documents", "estimated_document_count", "distinct",
+    "insert_one", "insert_many", "update_one", "update_many", "replace_one",
+    "delete_one", "delete_many", "bulk_write",
+    "find_one_and_update", "find_one_and_replace", "find_one_and_delete",
+]
+COUNTED_CURSOR_METHODS = ["find", "aggregate"]
+
+_installed = False
+_active_stats = None
+
+
+# =============================================================================
+# MONGO STAND-IN
+# =============================================================================
+
+_command_ids = itertools.count(1)
+
+
+def _record(stats, command_name: str, collection: str, started: float):
+    request_id = next(_command_ids)
+    stats.command_started(request_id, command_name, collection)
+    stats.command_finished(request_id, int((time.perf_counter() - started) * 1_000_000))
+
+
+def _targets():
+    """Stats objects a command should be recorded into"""
+    from services.query_instrumentation import get_current_stats
+
+    targets = []
+    if _active_stats is not None:
+        targets.append(_active_stats)
+    request_stats = get_current_stats()
+    if request_stats is not None and request_stats is not _active_stats:
+        # Feeds the app's own middleware (Server-Timing, slow request log)
+        targets.append(request_stats)
+    return targets
+
+
+def _count_async(method_name: str, original):
+    async def wrapper(self, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return await original(self, *args, **kwargs)
+        finally:
+            for stats in _targets():
+                _record(stats, method_name, self.name, started)
+    return wrapper
+
+
+def _count_cursor(method_name: str, original):
+    # Cursors are lazy: the command is counted when issued, the iteration
+    # time is part of the request latency
+    def wrapper(self, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return original(self, *args, **kwargs)
+        finally:
+            for stats in _targets():
+                _record(stats, method_name, self.name, started)
+    return wrapper
+
+
+def install_mongo_stand_in():
+    """
+    Route database.py's AsyncIOMotorClient to mongomock-motor and count
+    every collection call. Must run before database.py is imported.
+    """
+    global _installed
+    if _installed:
+        return
+    if "database" in sys.modules:
+        raise RuntimeError("install_mongo_stand_in() must run before database.py is imported")
+
+    import motor.motor_asyncio
+    from mongomock_motor import AsyncMongoMockClient, AsyncMongoMockCollection
+
+    class BenchmarkMongoClient(AsyncMongoMockClient):
+        def __init__(self, *args, **kwargs):
+            # pymongo monitoring hooks are not supported by the stand-in
+            kwargs.pop("event_listeners", None)
+            super().__init__(*args, **kwargs)
+
+    # mongomock implements every string operator the routers use except $trim
+    from mongomock.aggregate import _Parser
+    handle_string_operator = _Parser._handle_string_operator
+
+    def handle_string_operator_with_trim(self, operator, values):
+        if operator == "$trim":
+            value = self.parse(values["input"])
+            return value.strip() if isinstance(value, str) else None
+        return handle_string_operator(self, operator, values)
+
+    _Parser._handle_string_operator = handle_string_operator_with_trim
+
+    for name in COUNTED_ASYNC_METHODS:
+        setattr(AsyncMongoMockCollection, name, _count_async(name, getattr(AsyncMongoMockCollection, name)))
+    for name in COUNTED_CURSOR_METHODS:
+        setattr(AsyncMongoMockCollection, name, _count_cursor(name, getattr(AsyncMongoMockCollection, name)))
+
+    motor.motor_asyncio.AsyncIOMotorClient = BenchmarkMongoClient
+    os.environ.setdefault("MONGO_URL", "mongodb://benchmark.invalid:27017")
+    os.environ.setdefault("DB_NAME", "leaderlix_benchmark")
+    _installed = True
+
+
+async def seed_dataset(n_contacts: int, seed: int = DATASET_SEED) -> Dict[str, int]:
+    """Seed the stand-in with the synthetic dataset plus rule configuration"""
+    from database import db
+    from generate_seed_data import build_synthetic_dataset, seed_synthetic_dataset
+    from routers.whatsapp_rules import DEFAULT_WHATSAPP_RULES
+
+    counts = await seed_synthetic_dataset(db, build_synthetic_dataset(n_contacts, seed))
+    await db.whatsapp_rules.delete_many({})
+    await db.whatsapp_rules.insert_many([dict(rule) for rule in DEFAULT_WHATSAPP_RULES])
+    counts["whatsapp_rules"] = len(DEFAULT_WHATSAPP_RULES)
+    return counts
+
+
+# =============================================================================
+# MEASUREMENT
+# =============================================================================
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+async def _request(client, path: str) -> Dict[str, Any]:
+    global _active_stats
+    from services.query_instrumentation import RequestQueryStats
+
+    stats = RequestQueryStats()
+    _active_stats = stats
+    started = time.perf_counter()
+    try:
+        response = await client.get(path)
+    finally:
+        _active_stats = None
+    return {
+        "status": response.status_code,
+        "ms": (time.perf_counter() - started) * 1000,
+        "queries": stats.query_count,
+        "db_ms": stats.db_time_ms,
+        "bytes": len(response.content),
+        "breakdown": stats.breakdown(),
+    }
+
+
+async def run_scenarios(
+    iterations: int,
+    scenarios: Optional[List[Tuple[str, str]]] = None
+) -> Dict[str, Dict[str, Any]]:
+    """Drive each scenario through the ASGI app and summarize the samples"""
+    import httpx
+    import server
+    from routers.auth import get_current_user
+
+    server.app.dependency_overrides[get_current_user] = lambda: BENCHMARK_USER
+    transport = httpx.ASGITransport(app=server.app)
+    results = {}
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+        for name, path in scenarios or SCENARIOS:
+            # Warm-up request: also the one whose query breakdown is reported
+            first = await _request(client, path)
+
+            samples = [await _request(client, path) for _ in range(iterations)]
+            latencies = [s["ms"] for s in samples]
+
+            # Memory is measured on a separate request: tracemalloc slows
+            # allocation-heavy code down and would skew the latencies
+            tracemalloc.start()
+            try:
+                await _request(client, path)
+                _, peak = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+
+            results[name] = {
+                "path": path,
+                "status": first["status"],
+                "iterations": iterations,
+                "p50_ms": round(percentile(latencies, 50), 2),
+                "p95_ms": round(percentile(latencies, 95), 2),
+                "mean_ms": round(statistics.mean(latencies), 2),
+                "queries": max(s["queries"] for s in samples),
+                "db_ms_p50": round(percentile([s["db_ms"] for s in samples], 50), 2),
+                "peak_kib": round(peak / 1024, 1),
+                "response_kib": round(first["bytes"] / 1024, 1),
+                "query_breakdown": first["breakdown"],
+            }
+
+    server.app.dependency_overrides.pop(get_current_user, None)
+    return results
+
+
+# =============================================================================
+# BASELINE
+# =============================================================================
+
+def load_baseline(path: str = BASELINE_PATH) -> Dict[str, Any]:
+    if not os.path.exists(path):
+        return {"profiles": {}}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_baseline(profile: str, dataset: Dict[str, int], results: Dict[str, Dict[str, Any]], path: str = BASELINE_PATH):
+    baseline = load_baseline(path)
+    baseline.setdefault("profiles", {})[profile] = {
+        "dataset": dataset,
+        "scenarios": {
+            name: {k: v for k, v in result.items() if k != "query_breakdown"}
+            for name, result in results.items()
+        },
+    }
+    with open(path, "w") as f:
+        json.dump(baseline, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def compare_to_baseline(
+    results: Dict[str, Dict[str, Any]],
+    baseline_scenarios: Dict[str, Dict[str, Any]],
+    check_latency: bool = True,
+    latency_tolerance: float = LATENCY_TOLERANCE,
+    memory_tolerance: float = MEMORY_TOLERANCE
+) -> List[str]:
+    """Human-readable regressions (empty list = no regressions)"""
+    regressions = []
+    for name, result in results.items():
+        base = baseline_scenarios.get(name)
+        if not base:
+            continue
+
+        if result["status"] != base["status"]:
+            regressions.append(f"{name}: status {result['status']} (baseline {base['status']})")
+
+        if result["queries"] > base["queries"]:
+            regressions.append(f"{name}: {result['queries']} queries (baseline {base['queries']})")
+
+        if not check_latency:
+            continue
+
+        allowed_ms = max(base["p95_ms"] * (1 + latency_tolerance), base["p95_ms"] + LATENCY_FLOOR_MS)
+        if result["p95_ms"] > allowed_ms:
+            regressions.append(f"{name}: p95 {result['p95_ms']}ms (baseline {base['p95_ms']}ms)")
+
+        allowed_kib = max(base["peak_kib"] * (1 + memory_tolerance), base["peak_kib"] + MEMORY_FLOOR_KIB)
+        if result["peak_kib"] > allowed_kib:
+            regressions.append(f"{name}: peak memory {result['peak_kib']}KiB (baseline {base['peak_kib']}KiB)")
+
+    return regressions
+
+
+def format_report(results: Dict[str, Dict[str, Any]], baseline_scenarios: Optional[Dict[str, Dict[str, Any]]] = None) -> str:
+    baseline_scenarios = baseline_scenarios or {}
+    lines = [
+        f"{'scenario':<26}{'status':>7}{'p50 ms':>10}{'p95 ms':>10}{'queries':>9}{'db ms':>9}{'peak KiB':>11}{'resp KiB':>10}   vs baseline p95 / queries"
+    ]
+    for name, r in results.items():
+        base = baseline_scenarios.get(name)
+        delta = ""
+        if base:
+            delta = f"   {base['p95_ms']:.1f}ms / {base['queries']}"
+        lines.append(
+            f"{name:<26}{r['status']:>7}{r['p50_ms']:>10.1f}{r['p95_ms']:>10.1f}{r['queries']:>9}"
+            f"{r['db_ms_p50']:>9.1f}{r['peak_kib']:>11.1f}{r['response_kib']:>10.1f}{delta}"
+        )
+    return "\n".join(lines)
+
+
+async def run_profile(profile: str, iterations: Optional[int] = None) -> Tuple[Dict[str, int], Dict[str, Dict[str, Any]]]:
+    """Seed the profile's dataset and run every scenario"""
+    settings = PROFILES[profile]
+    dataset = await seed_dataset(settings["contacts"])
+    results = await run_scenarios(iterations or settings["iterations"])
+    return dataset, results
@@ -0,0 +1,74 @@
+"""
+Offline benchmark runner
+
+Usage (from backend/):
+    python tests/benchmarks/run_benchmarks.py                    # full profile (28k contacts)
+    python tests/benchmarks/run_benchmarks.py --profile smoke    # 500 contacts, a few seconds
+    python tests/benchmarks/run_benchmarks.py --update-baseline  # record a new baseline
+    python tests/benchmarks/run_benchmarks.py --json out.json    # raw results incl. query breakdown
+
+Exit code is 1 when a scenario regresses against baseline.json
+(--queries-only ignores latency and memory, for noisy CI machines).
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import harness  # noqa: E402  (sets up sys.path for backend imports)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Offline benchmarks for hot endpoints")
+    parser.add_argument("--profile", choices=sorted(harness.PROFILES), default="full")
+    parser.add_argument("--iterations", type=int, help="Samples per scenario (default per profile)")
+    parser.add_argument("--update-baseline", action="store_true", help="Write results to baseline.json")
+    parser.add_argument("--queries-only", action="store_true", help="Only compare status and query counts")
+    parser.add_argument("--json", metavar="PATH", help="Write raw results to a JSON file")
+    args = parser.parse_args()
+
+    # App modules log every request / query warning; keep the report readable
+    logging.disable(logging.WARNING)
+
+    harness.install_mongo_stand_in()
+    dataset, results = asyncio.run(harness.run_profile(args.profile, args.iterations))
+
+    baseline = harness.load_baseline().get("profiles", {}).get(args.profile, {})
+    baseline_scenarios = baseline.get("scenarios", {})
+
+    print(f"Profile '{args.profile}': " + ", ".join(f"{k}={v}" for k, v in dataset.items()))
+    print(harness.format_report(results, baseline_scenarios))
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"profile": args.profile, "dataset": dataset, "results": results}, f, indent=2)
+
+    if args.update_baseline:
+        harness.save_baseline(args.profile, dataset, results)
+        print(f"\nBaseline updated: {harness.BASELINE_PATH}")
+        return 0
+
+    if not baseline_scenarios:
+        print(f"\nNo baseline for profile '{args.profile}' (run with --update-baseline)")
+        return 0
+
+    regressions = harness.compare_to_baseline(
+        results, baseline_scenarios, check_latency=not args.queries_only
+    )
+    if regressions:
+        print("\nREGRESSIONS:")
+        for line in regressions:
+            print(f"  - {line}")
+        return 1
+
+    print("\nNo regressions against baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,189 @@
+"""
+Local HubSpot API mock
+
+Implements the subset of the HubSpot CRM API that services/hubspot_client.py
+uses, over in-memory objects:
+
+- GET   /crm/v3/objects/{type}                      list (limit / after paging)
+- GET   /crm/v3/objects/{type}/{id}                 single object
+- PATCH /crm/v3/objects/{type}/{id}                 update properties
+- POST  /crm/v3/objects/{type}/batch/read           batch read (max 100)
+- POST  /crm/v3/objects/{type}/batch/upsert         batch upsert by idProperty
+- POST  /crm/v4/associations/{from}/{to}/batch/read batch associations
+- GET   /crm/v3/lists/{list_id}/memberships         list members (paging)
+
+Every response carries X-HubSpot-RateLimit-* headers for a window of
+`rate_limit` requests per `interval_ms`; requests over the window get a 429
+with Retry-After. `fail_next` forces the next N requests to answer 429.
+
+In tests, mount it with httpx.ASGITransport. For manual runs:
+
+    uvicorn tests.hubspot_mock_server:app --port 8766
+    HUBSPOT_API_BASE=http://localhost:8766 uvicorn server:app
+"""
+
+import time
+from typing import Any, Dict, List, Optional
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse
+
+
+class HubSpotMockState:
+    """Objects, associations and lists held in memory, plus counters for assertions."""
+
+    def __init__(self, rate_limit: int = 1000, interval_ms: int = 10000, token: str = "test-token"):
+        self.objects: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self.associations: Dict[tuple, Dict[str, List[Dict[str, Any]]]] = {}
+        self.lists: Dict[str, List[str]] = {}
+        self.rate_limit = rate_limit
+        self.interval_ms = interval_ms
+        self.token = token
+        self.fail_next = 0
+        self.requests: List[str] = []
+        self._window: List[float] = []
+
+    def add(self, object_type: str, object_id: str, **properties) -> Dict[str, Any]:
+        obj = {"id": str(object_id), "properties": {"hs_object_id": str(object_id), **properties}}
+        self.objects.setdefault(object_type, {})[str(object_id)] = obj
+        return obj
+
+    def associate(self, from_type: str, from_id: str, to_type: str, to_id: str, label: Optional[str] = None):
+        types = [{"category": "USER_DEFINED", "typeId": 1, "label": label}] if label else []
+        self.associations.setdefault((from_type, to_type), {}).setdefault(str(from_id), []).append(
+            {"toObjectId": str(to_id), "associationTypes": types}
+        )
+
+    def admit(self) -> Optional[float]:
+        """None when the request fits the window, else seconds to wait."""
+        now = time.monotonic()
+        window = self.interval_ms / 1000.0
+        self._window = [t for t in self._window if now - t < window]
+        if self.fail_next > 0:
+            self.fail_next -= 1
+            return 0.0
+        if len(self._window) >= self.rate_limit:
+            return window - (now - self._window[0])
+        self._window.append(now)
+        return None
+
+    def headers(self) -> Dict[str, str]:
+        return {
+            "X-HubSpot-RateLimit-Max": str(self.rate_limit),
+            "X-HubSpot-RateLimit-Remaining": str(max(self.rate_limit - len(self._window), 0)),
+            "X-HubSpot-RateLimit-Interval-Milliseconds": str(self.interval_ms),
+        }
+
+
+def _page(items: List[Any], limit: int, after: Optional[str]) -> Dict[str, Any]:
+    start = int(after or 0)
+    page = {"results": items[start:start + limit]}
+    if start + limit < len(items):
+        page["paging"] = {"next": {"after": str(start + limit)}}
+    return page
+
+
+def _with_properties(obj: Dict[str, Any], properties: Optional[List[str]]) -> Dict[str, Any]:
+    if not properties:
+        return obj
+    return {**obj, "properties": {k: v for k, v in obj["properties"].items() if k in properties or k == "hs_object_id"}}
+
+
+def create_app(state: Optional[HubSpotMockState] = None) -> FastAPI:
+    state = state or HubSpotMockState()
+    mock = FastAPI(title="HubSpot API mock")
+    mock.state.hubspot = state
+
+    @mock.middleware("http")
+    async def rate_limit(request: Request, call_next):
+        state.requests.append(f"{request.method} {request.url.path}")
+        if request.headers.get("authorization") != f"Bearer {state.token}":
+            return JSONResponse({"message": "Authentication credentials not found"}, status_code=401)
+        wait = state.admit()
+        if wait is not None:
+            return JSONResponse(
+                {"status": "error", "category": "RATE_LIMITS"},
+                status_code=429,
+                headers={**state.headers(), "Retry-After": f"{wait:.3f}"}
+            )
+        response = await call_next(request)
+        for key, value in state.headers().items():
+            response.headers[key] = value
+        return response
+
+    @mock.get("/crm/v3/objects/{object_type}")
+    async def list_objects(object_type: str, limit: int = 10, after: Optional[str] = None, properties: Optional[str] = None):
+        props = properties.split(",") if properties else None
+        items = [_with_properties(o, props) for o in state.objects.get(object_type, {}).values()]
+        return _page(items, min(limit, 100), after)
+
+    @mock.get("/crm/v3/objects/{object_type}/{object_id}")
+    async def get_object(object_type: str, object_id: str, properties: Optional[str] = None):
+        obj = state.objects.get(object_type, {}).get(object_id)
+        if not obj:
+            raise HTTPException(status_code=404, detail="Object not found")
+        return _with_properties(obj, properties.split(",") if properties else None)
+
+    @mock.patch("/crm/v3/objects/{object_type}/{object_id}")
+    async def update_object(object_type: str, object_id: str, request: Request):
+        obj = state.objects.get(object_type, {}).get(object_id)
+        if not obj:
+            raise HTTPException(status_code=404, detail="Object not found")
+        obj["properties"].update((await request.json()).get("properties", {}))
+        return obj
+
+    @mock.post("/crm/v3/objects/{object_type}/batch/read")
+    async def batch_read(object_type: str, request: Request):
+        body = await request.json()
+        if len(body.get("inputs", [])) > 100:
+            raise HTTPException(status_code=400, detail="Too many inputs")
+        objects = state.objects.get(object_type, {})
+        id_property = body.get("idProperty")
+        results = []
+        for item in body.get("inputs", []):
+            if id_property:
+                match = next((o for o in objects.values() if o["properties"].get(id_property) == item["id"]), None)
+            else:
+                match = objects.get(str(item["id"]))
+            if match:
+                results.append(_with_properties(match, body.get("properties")))
+        return {"status": "COMPLETE", "results": results}
+
+    @mock.post("/crm/v3/objects/{object_type}/batch/upsert")
+    async def batch_upsert(object_type: str, request: Request):
+        body = await request.json()
+        if len(body.get("inputs", [])) > 100:
+            raise HTTPException(status_code=400, detail="Too many inputs")
+        objects = state.objects.setdefault(object_type, {})
+        results = []
+        for item in body.get("inputs", []):
+            id_property = item["idProperty"]
+            match = next((o for o in objects.values() if o["properties"].get(id_property) == item["id"]), None)
+            if match:
+                match["properties"].update(item.get("properties", {}))
+                results.append({**match, "new": False})
+            else:
+                new_id = str(len(objects) + 1000)
+                created = state.add(object_type, new_id, **{id_property: item["id"], **item.get("properties", {})})
+                results.append({**created, "new": True})
+        return {"status": "COMPLETE", "results": results}
+
+    @mock.post("/crm/v4/associations/{from_type}/{to_type}/batch/read")
+    async def batch_associations(from_type: str, to_type: str, request: Request):
+        body = await request.json()
+        known = state.associations.get((from_type, to_type), {})
+        results = [
+            {"from": {"id": str(item["id"])}, "to": known[str(item["id"])]}
+            for item in body.get("inputs", []) if str(item["id"]) in known
+        ]
+        return {"status": "COMPLETE", "results": results}
+
+    @mock.get("/crm/v3/lists/{list_id}/memberships")
+    async def list_memberships(list_id: str, limit: int = 100, after: Optional[str] = None):
+        members = [{"recordId": record_id} for record_id in state.lists.get(list_id, [])]
+        return _page(members, min(limit, 250), after)
+
+    return mock
+
+
+app = create_app()
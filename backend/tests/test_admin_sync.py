@@ -0,0 +1,130 @@
+"""
+Tests for the HubSpot contacts sync (routers/admin_sync.py)
+
+Runs the sync against tests/hubspot_mock_server.py and an in-memory MongoDB
+(mongomock-motor). Validates:
+- Contacts are matched by hubspot id, then email, from a compact index
+- Unchanged HubSpot contacts (same snapshot hash) are not written again
+- Local edits are preserved; base fields are filled only when unedited
+- Rollback snapshots live in hubspot_sync_snapshots, not in the audit record
+- Rollback restores the pre-sync state
+"""
+
+import pytest
+import sys
+import os
+
+import httpx
+
+# Configure pytest-asyncio
+pytestmark = pytest.mark.asyncio(loop_scope="function")
+
+# Add backend to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tests.hubspot_mock_server import HubSpotMockState, create_app
+
+USER = {"email": "admin@leaderlix.com"}
+
+
+@pytest.fixture
+def state():
+    return HubSpotMockState()
+
+
+@pytest.fixture
+def mock_db(monkeypatch, state):
+    from mongomock_motor import AsyncMongoMockClient
+    from services.hubspot_client import HubSpotClient
+    import routers.admin_sync as admin_sync
+
+    database = AsyncMongoMockClient()["leaderlix_test"]
+    transport = httpx.ASGITransport(app=create_app(state))
+    client = HubSpotClient(
+        token=state.token,
+        base_url="http://hubspot.mock",
+        client=httpx.AsyncClient(transport=transport, base_url="http://hubspot.mock"),
+    )
+    monkeypatch.setattr(admin_sync, "db", database)
+    monkeypatch.setattr(admin_sync, "hubspot", client)
+    return database
+
+
+async def seed(state, database):
+    state.add("contacts", "1", email="Nuevo@cliente.com", firstname="Nuevo", lastname="Uno")
+    state.add("contacts", "2", email="limpio@cliente.com", firstname="Limpio", phone="555")
+    state.add("contacts", "3", email="editado@cliente.com", firstname="Otro", company="Acme")
+    state.add("contacts", "4", firstname="Sin correo")
+    await database.unified_contacts.insert_many([
+        {"id": "clean", "email": "LIMPIO@cliente.com", "name": "", "source": "hubspot"},
+        {"id": "edited", "email": "editado@cliente.com", "name": "Editado", "hubspot_contact_id": "3",
+         "tags": ["vip"], "company": "Local"},
+        {"id": "unrelated", "email": "otro@cliente.com"},
+    ])
+
+
+class TestContactsSync:
+    """Tests for /admin/hubspot-sync/contacts"""
+
+    async def test_preview(self, state, mock_db):
+        from routers.admin_sync import preview_contacts_sync
+
+        await seed(state, mock_db)
+
+        preview = await preview_contacts_sync(limit=1000, current_user=USER)
+
+        assert preview.total_in_hubspot == 4
+        assert preview.would_insert == 2  # includes contact 4, which the run skips (no email)
+        assert preview.would_update_base_fields == 1 and preview.would_update_snapshot_only == 1
+        assert preview.samples["would_update_snapshot"][0]["local_edits_preserved"] == ["id", "tags"]
+        assert await mock_db.unified_contacts.count_documents({}) == 3
+
+    async def test_run_and_unchanged_rerun(self, state, mock_db):
+        from routers.admin_sync import run_contacts_sync
+
+        await seed(state, mock_db)
+
+        result = await run_contacts_sync(dry_run=False, batch_size=2, limit=1000, current_user=USER)
+
+        stats = result["stats"]
+        assert (stats["inserted"], stats["updated_base"], stats["updated_snapshot"]) == (1, 1, 1)
+        assert stats["skipped_no_email"] == 1 and stats["snapshots"] == 3
+        clean = await mock_db.unified_contacts.find_one({"id": "clean"})
+        assert clean["name"] == "Limpio" and clean["phone"] == "555" and clean["hubspot_contact_id"] == "2"
+        edited = await mock_db.unified_contacts.find_one({"id": "edited"})
+        assert edited["name"] == "Editado" and edited["company"] == "Local"
+        assert edited["hubspot_snapshot"]["company"] == "Acme"
+        audit = await mock_db.migration_audit.find_one({"operation_id": result["operation_id"]})
+        assert "snapshots" not in audit and audit["status"] == "completed"
+        assert await mock_db.hubspot_sync_snapshots.count_documents({"operation_id": result["operation_id"]}) == 3
+
+        # Nothing changed in HubSpot: nothing is written
+        again = await run_contacts_sync(dry_run=False, batch_size=100, limit=1000, current_user=USER)
+        assert again["stats"]["unchanged"] == 3 and again["stats"]["snapshots"] == 0
+
+        state.objects["contacts"]["3"]["properties"]["jobtitle"] = "CEO"
+        third = await run_contacts_sync(dry_run=False, batch_size=100, limit=1000, current_user=USER)
+        assert third["stats"]["updated_snapshot"] == 1 and third["stats"]["unchanged"] == 2
+
+    async def test_rollback(self, state, mock_db):
+        from routers.admin_sync import run_contacts_sync, rollback_contacts_sync
+
+        await seed(state, mock_db)
+
+        dry = await run_contacts_sync(dry_run=True, batch_size=100, limit=1000, current_user=USER)
+        assert dry["stats"]["inserted"] == 1
+        assert await mock_db.hubspot_sync_snapshots.count_documents({}) == 0
+
+        result = await run_contacts_sync(dry_run=False, batch_size=100, limit=1000, current_user=USER)
+        rollback = await rollback_contacts_sync(result["operation_id"], current_user=USER)
+
+        assert rollback["rolled_back"] == 3 and rollback["errors"] == []
+        assert await mock_db.unified_contacts.count_documents({}) == 3
+        clean = await mock_db.unified_contacts.find_one({"id": "clean"}, {"_id": 0})
+        assert clean == {"id": "clean", "email": "LIMPIO@cliente.com", "name": "", "source": "hubspot"}
+        edited = await mock_db.unified_contacts.find_one({"id": "edited"})
+        assert "hubspot_snapshot" not in edited and edited["hubspot_contact_id"] == "3"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,201 @@
+"""
+Tests for Apify Runner
+
+Runs against the local Apify mock (tests/apify_mock_server.py) through
+httpx.ASGITransport. Validates:
+- waitForFinish long-poll instead of fixed sleeps
+- Dataset pagination as an async generator
+- Concurrent fan-out under the run cap, consumed in input order
+- Input-hash cache skips identical runs
+- Failed runs raise ApifyRunError
+"""
+
+import time
+import pytest
+import sys
+import os
+import httpx
+
+# Configure pytest-asyncio
+pytestmark = pytest.mark.asyncio(loop_scope="function")
+
+# Add backend to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class FakeCacheCollection:
+    """In-memory stand-in for apify_run_cache"""
+
+    def __init__(self):
+        self.docs = {}
+
+    async def find_one(self, query, projection=None):
+        doc = self.docs.get(query["input_hash"])
+        if doc and doc["created_at"] >= query["created_at"]["$gte"]:
+            return dict(doc)
+        return None
+
+    async def update_one(self, query, update, upsert=False):
+        doc = self.docs.setdefault(query["input_hash"], {})
+        doc.update(update["$set"])
+
+
+def make_runner(state=None, cache=None, **kwargs):
+    from services.apify_runner import ApifyRunner
+    from tests.apify_mock_server import ApifyMockState, create_app
+
+    state = state or ApifyMockState()
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=create_app(state)))
+    runner = ApifyRunner(
+        token="test-token",
+        base_url="http://apify.mock/v2",
+        client=client,
+        cache_collection=cache if cache is not None else FakeCacheCollection(),
+        **kwargs
+    )
+    return runner, state
+
+
+class TestRunLifecycle:
+    """Tests for starting and waiting on runs"""
+
+    async def test_fast_run_finishes_inside_start_request(self):
+        runner, state = make_runner()
+
+        items = await runner.run_actor("harvestapi/linkedin-profile-search", {"searchQuery": "pfizer"})
+
+        assert len(items) == 5
+        assert runner.stats["runs_started"] == 1
+        assert runner.stats["status_polls"] == 0
+        assert state.requests[0] == "POST /acts/harvestapi~linkedin-profile-search/runs"
+
+    async def test_long_poll_returns_as_soon_as_run_finishes(self):
+        from tests.apify_mock_server import ApifyMockState
+
+        # Run outlasts the start request's wait window; one status long-poll
+        # picks it up without any client-side sleep interval
+        runner, state = make_runner(ApifyMockState(run_duration=0.3), wait_for_finish=0.1)
+
+        started = time.perf_counter()
+        run = await runner.run("actor", {"searchQuery": "bayer"}, use_cache=False)
+        elapsed = time.perf_counter() - started
+
+        assert run["status"] == "SUCCEEDED"
+        assert runner.stats["status_polls"] >= 1
+        assert elapsed < 1.0
+
+    async def test_failed_run_raises(self):
+        from services.apify_runner import ApifyRunError
+
+        runner, _ = make_runner()
+
+        with pytest.raises(ApifyRunError, match="FAILED"):
+            await runner.run("actor", {"fail": True})
+
+    async def test_run_timeout_raises(self):
+        from services.apify_runner import ApifyRunError
+        from tests.apify_mock_server import ApifyMockState
+
+        runner, _ = make_runner(ApifyMockState(run_duration=5), wait_for_finish=0.05, run_timeout=0.1)
+
+        with pytest.raises(ApifyRunError, match="did not finish"):
+            await runner.run("actor", {"searchQuery": "slow"}, use_cache=False)
+
+
+class TestDatasetStreaming:
+    """Tests for paginated dataset reads"""
+
+    async def test_iter_dataset_pages_through_items(self):
+        from tests.apify_mock_server import ApifyMockState
+
+        state = ApifyMockState(items_factory=lambda actor, data: [{"n": i} for i in range(25)])
+        runner, _ = make_runner(state, page_size=10)
+
+        run = await runner.run("actor", {"searchQuery": "x"})
+        items = [item async for item in runner.iter_dataset(run["defaultDatasetId"])]
+
+        assert [i["n"] for i in items] == list(range(25))
+        assert runner.stats["dataset_pages"] == 3
+
+    async def test_consumer_can_stop_early(self):
+        from tests.apify_mock_server import ApifyMockState
+
+        state = ApifyMockState(items_factory=lambda actor, data: [{"n": i} for i in range(50)])
+        runner, _ = make_runner(state, page_size=10)
+
+        async for item in runner.iter_items("actor", {"searchQuery": "x"}):
+            if item["n"] == 3:
+                break
+
+        assert runner.stats["dataset_pages"] == 1
+
+
+class TestFanOut:
+    """Tests for concurrent multi-input runs"""
+
+    async def test_runs_concurrently_under_cap_in_input_order(self):
+        from tests.apify_mock_server import ApifyMockState
+
+        state = ApifyMockState(run_duration=0.1)
+        runner, _ = make_runner(state, max_concurrent_runs=3, wait_for_finish=1)
+        inputs = [{"searchQuery": f"kw{i}"} for i in range(6)]
+
+        started = time.perf_counter()
+        order = [index async for index, run in runner.run_many("actor", inputs, use_cache=False)]
+        elapsed = time.perf_counter() - started
+
+        assert order == list(range(6))
+        assert state.peak_active_runs == 3
+        # Two waves of 0.1s instead of six sequential runs
+        assert elapsed < 0.45
+
+    async def test_failed_input_does_not_abort_others(self):
+        from services.apify_runner import ApifyRunError
+
+        runner, _ = make_runner()
+        inputs = [{"searchQuery": "a"}, {"fail": True}, {"searchQuery": "c"}]
+
+        results = [run async for _, run in runner.run_many("actor", inputs)]
+
+        assert isinstance(results[1], ApifyRunError)
+        assert results[0]["status"] == "SUCCEEDED"
+        assert results[2]["status"] == "SUCCEEDED"
+
+
+class TestCache:
+    """Tests for the input-hash cache"""
+
+    async def test_identical_input_reuses_dataset(self):
+        cache = FakeCacheCollection()
+        runner, state = make_runner(cache=cache)
+
+        first = await runner.run_actor("actor", {"searchQuery": "roche", "takePages": 1})
+        # Same input, different key order
+        second = await runner.run_actor("actor", {"takePages": 1, "searchQuery": "roche"})
+
+        assert first == second
+        assert runner.stats["runs_started"] == 1
+        assert runner.stats["cache_hits"] == 1
+        assert sum(r.startswith("POST") for r in state.requests) == 1
+
+    async def test_expired_entry_starts_new_run(self):
+        cache = FakeCacheCollection()
+        runner, _ = make_runner(cache=cache)
+
+        await runner.run("actor", {"searchQuery": "roche"})
+        for doc in cache.docs.values():
+            doc["created_at"] = "2000-01-01T00:00:00+00:00"
+        await runner.run("actor", {"searchQuery": "roche"})
+
+        assert runner.stats["runs_started"] == 2
+
+    async def test_different_input_is_not_cached(self):
+        from services.apify_runner import input_hash
+
+        assert input_hash("actor", {"a": 1, "b": 2}) == input_hash("actor", {"b": 2, "a": 1})
+        assert input_hash("actor", {"a": 1}) != input_hash("actor", {"a": 2})
+        assert input_hash("actor1", {"a": 1}) != input_hash("actor2", {"a": 1})
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,158 @@
+"""
+Tests for batched case enrichment (utils/batch_loader.py)
+
+Runs the loader and the Today's Focus case endpoints against an in-memory
+MongoDB (mongomock-motor). Validates:
+- Keys collected across parents are fetched with one $in, in chunks
+- Missing keys, duplicates and one-to-many keys fan out correctly
+- The case endpoints make the same number of queries for 1 or 30 cases
+"""
+
+import pytest
+import sys
+import os
+
+# Configure pytest-asyncio
+pytestmark = pytest.mark.asyncio(loop_scope="function")
+
+# Add backend to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+USER = {"email": "admin@leaderlix.com"}
+
+
+class CountingCollection:
+    """Collection wrapper counting find / find_one calls"""
+
+    def __init__(self, collection, counts):
+        self._collection = collection
+        self._counts = counts
+
+    def __getattr__(self, name):
+        attr = getattr(self._collection, name)
+        if name in ("find", "find_one"):
+            def counted(*args, **kwargs):
+                self._counts[self._collection.name] = self._counts.get(self._collection.name, 0) + 1
+                return attr(*args, **kwargs)
+            return counted
+        return attr
+
+
+class CountingDatabase:
+    """Database wrapper whose collections count their queries"""
+
+    def __init__(self, database):
+        self._database = database
+        self.counts = {}
+
+    def __getattr__(self, name):
+        return CountingCollection(self._database[name], self.counts)
+
+    def __getitem__(self, name):
+        return CountingCollection(self._database[name], self.counts)
+
+
+@pytest.fixture
+def mock_db(monkeypatch):
+    from mongomock_motor import AsyncMongoMockClient
+    import routers.todays_focus as todays_focus
+
+    database = CountingDatabase(AsyncMongoMockClient()["leaderlix_test"])
+    monkeypatch.setattr(todays_focus, "db", database)
+    return database
+
+
+async def seed(database, cases):
+    contacts = []
+    case_docs = []
+    quotes = []
+    for n in range(cases):
+        contacts.append({"id": f"dm{n}", "name": f"DM {n}", "roles": ["deal_maker"], "phone": "55"})
+        contacts.append({"id": f"c{n}", "name": f"Contact {n}", "roles": ["student"]})
+        case_docs.append({
+            "id": f"case{n}", "name": f"Case {n}", "stage": "caso_solicitado", "status": "active",
+            "contact_ids": [f"dm{n}", f"c{n}", "missing"], "deal_maker_id": f"dm{n}",
+            "created_at": f"2026-01-{n + 1:02d}",
+        })
+        quotes.append({"id": f"q{n}a", "case_id": f"case{n}", "created_at": "2026-01-01"})
+        quotes.append({"id": f"q{n}b", "case_id": f"case{n}", "created_at": "2026-02-01"})
+    await database.unified_contacts.insert_many(contacts)
+    await database.cases.insert_many(case_docs)
+    await database.quotes.insert_many(quotes)
+    database.counts.clear()
+
+
+class TestBatchLoader:
+    """Tests for BatchLoader"""
+
+    async def test_collects_and_fans_out(self, mock_db):
+        from utils.batch_loader import BatchLoader
+
+        await seed(mock_db, 5)
+        loader = BatchLoader(mock_db.unified_contacts, projection={"_id": 0, "name": 1}, chunk_size=3)
+        loader.add_many(["dm0", "c0", "missing", None])
+        loader.add_many(["dm0", "dm1", "c4"])
+
+        await loader.load()
+
+        assert loader.queries == 2  # 5 distinct keys, chunks of 3
+        assert loader.get("dm1") == {"id": "dm1", "name": "DM 1"}
+        assert loader.get("missing") is None
+        assert [c["id"] for c in loader.get_many(["c4", "dm0", "missing", "c4"])] == ["c4", "dm0"]
+
+        # Loaded keys (found or missing) are not fetched again
+        loader.add_many(["dm0", "missing"])
+        await loader.load()
+        assert loader.queries == 2
+
+    async def test_many_and_query(self, mock_db):
+        from utils.batch_loader import BatchLoader
+
+        await seed(mock_db, 2)
+        quotes = BatchLoader(mock_db.quotes, key="case_id", sort=[("created_at", -1)], many=True)
+        assert [q["id"] for q in await quotes.load_many(["case1", "nope"])] == ["q1b", "q1a"]
+        assert quotes.get("nope") == []
+
+        deal_makers = BatchLoader(mock_db.unified_contacts, query={"roles": "deal_maker"})
+        assert [c["id"] for c in await deal_makers.load_many(["dm0", "c0", "dm1"])] == ["dm0", "dm1"]
+
+
+class TestCaseEndpoints:
+    """Query count of the Today's Focus case endpoints"""
+
+    @pytest.mark.parametrize("cases", [1, 30])
+    async def test_constant_queries(self, mock_db, cases):
+        from routers.todays_focus import (
+            get_cases_solicited, get_cases_without_dealmaker, get_quotes_cases, get_dealmaker_followup
+        )
+
+        await seed(mock_db, cases)
+
+        solicited = await get_cases_solicited(current_user=USER)
+        assert solicited["total"] == cases
+        first = solicited["cases"][-1]
+        assert [c["id"] for c in first["contacts"]] == ["dm0", "c0"]
+        assert first["deal_maker"]["id"] == "dm0"
+        assert mock_db.counts == {"cases": 1, "unified_contacts": 1}
+
+        mock_db.counts.clear()
+        without_dm = await get_cases_without_dealmaker(current_user=USER)
+        assert [c["id"] for c in without_dm["cases"][0]["deal_makers"]] == ["dm0"]
+        assert mock_db.counts == {"cases": 1, "unified_contacts": 1}
+
+        mock_db.counts.clear()
+        quotes = await get_quotes_cases(current_user=USER)
+        first = quotes["cases"][-1]
+        assert first["deal_maker"]["id"] == "dm0"
+        assert [q["id"] for q in first["quotes"]] == ["q0b", "q0a"] and "case_id" not in first["quotes"][0]
+        assert mock_db.counts == {"cases": 1, "unified_contacts": 1, "quotes": 1}
+
+        await mock_db.cases.update_many({}, {"$set": {"stage": "caso_presentado"}})
+        mock_db.counts.clear()
+        followup = await get_dealmaker_followup(current_user=USER)
+        assert followup["propuesta"]["total"] == cases
+        assert mock_db.counts == {"cases": 1, "unified_contacts": 1}
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,123 @@
+"""
+Tests for the Offline Benchmark Harness
+
+Validates:
+- Synthetic dataset is reproducible and internally consistent
+- Percentile and baseline comparison logic
+- Smoke profile runs end-to-end against the in-memory MongoDB stand-in
+  without query-count regressions (latency is not asserted: machine-dependent)
+"""
+
+import importlib.util
+import pytest
+import subprocess
+import sys
+import os
+
+# Add backend, scripts and benchmarks to path
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.join(BACKEND_DIR, "scripts"))
+sys.path.insert(0, os.path.join(BACKEND_DIR, "tests", "benchmarks"))
+
+
+class TestSyntheticDataset:
+    """Tests for build_synthetic_dataset"""
+
+    def test_same_seed_same_dataset(self):
+        from datetime import datetime, timezone
+        from generate_seed_data import build_synthetic_dataset
+
+        now = datetime(2026, 1, 15, 12, 0, tzinfo=timezone.utc)
+        first = build_synthetic_dataset(200, seed=7, now=now)
+        second = build_synthetic_dataset(200, seed=7, now=now)
+
+        assert first == second
+
+    def test_references_are_consistent(self):
+        from generate_seed_data import build_synthetic_dataset
+
+        data = build_synthetic_dataset(300)
+        contact_ids = {c["id"] for c in data["unified_contacts"]}
+        company_ids = {c["id"] for c in data["unified_companies"]}
+        event_ids = {e["id"] for e in data["webinar_events_v2"]}
+
+        assert len(contact_ids) == 300
+        for contact in data["unified_contacts"]:
+            for entry in contact["companies"]:
+                assert entry["company_id"] in company_ids
+            for entry in contact["webinar_history"]:
+                assert entry["event_id"] in event_ids
+        for item in data["email_queue"]:
+            assert item["contact_id"] in contact_ids
+        for case in data["cases"]:
+            assert set(case["contact_ids"]) <= contact_ids
+
+
+class TestBaselineComparison:
+    """Tests for percentile / compare_to_baseline"""
+
+    def _result(self, **overrides):
+        result = {"status": 200, "queries": 5, "p95_ms": 100.0, "peak_kib": 1000.0}
+        result.update(overrides)
+        return result
+
+    def test_percentile_nearest_rank(self):
+        from harness import percentile
+
+        values = [float(v) for v in range(1, 21)]
+        assert percentile(values, 50) == 10.0
+        assert percentile(values, 95) == 19.0
+        assert percentile([], 95) == 0.0
+
+    def test_extra_query_is_a_regression(self):
+        from harness import compare_to_baseline
+
+        regressions = compare_to_baseline(
+            {"contacts": self._result(queries=6)}, {"contacts": self._result()}
+        )
+        assert regressions == ["contacts: 6 queries (baseline 5)"]
+
+    def test_latency_within_tolerance_is_not_a_regression(self):
+        from harness import compare_to_baseline
+
+        regressions = compare_to_baseline(
+            {"contacts": self._result(p95_ms=140.0)}, {"contacts": self._result()}
+        )
+        assert regressions == []
+
+    def test_latency_and_memory_regressions(self):
+        from harness import compare_to_baseline
+
+        results = {"contacts": self._result(p95_ms=300.0, peak_kib=5000.0)}
+        baseline = {"contacts": self._result()}
+
+        assert len(compare_to_baseline(results, baseline)) == 2
+        assert compare_to_baseline(results, baseline, check_latency=False) == []
+
+    def test_scenarios_missing_from_baseline_are_skipped(self):
+        from harness import compare_to_baseline
+
+        assert compare_to_baseline({"new_endpoint": self._result()}, {}) == []
+
+
+@pytest.mark.skipif(
+    importlib.util.find_spec("mongomock_motor") is None,
+    reason="mongomock-motor not installed"
+)
+def test_smoke_profile_has_no_query_regressions():
+    """Runs in a subprocess: the stand-in must be installed before database.py is imported"""
+    result = subprocess.run(
+        [sys.executable, os.path.join("tests", "benchmarks", "run_benchmarks.py"),
+         "--profile", "smoke", "--queries-only", "--iterations", "1"],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True,
+        timeout=300
+    )
+    assert result.returncode == 0, result.stdout[-3000:] + result.stderr[-3000:]
+    assert "No regressions against baseline" in result.stdout
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
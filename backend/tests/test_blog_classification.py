@@ -0,0 +1,197 @@
+"""
+Tests for denormalized blog classification
+
+Runs against an in-memory MongoDB (mongomock-motor). Validates:
+- Public blog filters by program / competency / level with one query on
+  blog_posts and always fill the page
+- Scheduled posts are skipped without shrinking the page
+- Backfill from content items (once, on startup) and rename propagation
+"""
+
+import pytest
+import sys
+import os
+from datetime import datetime, timezone, timedelta
+
+# Configure pytest-asyncio
+pytestmark = pytest.mark.asyncio(loop_scope="function")
+
+# Add backend to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def mock_db(monkeypatch):
+    from mongomock_motor import AsyncMongoMockClient
+    import services.blog_classification as blog_classification
+    import routers.blog as blog
+
+    database = AsyncMongoMockClient()["leaderlix_test"]
+    for module in (blog_classification, blog):
+        monkeypatch.setattr(module, "db", database)
+    return database
+
+
+def post(i, content_item_id=None, **fields):
+    return {
+        "id": f"post-{i}",
+        "title": f"Post {i}",
+        "slug": f"post-{i}",
+        "content": "texto",
+        "excerpt": "texto",
+        "is_published": True,
+        "language": "es",
+        "tags": ["liderazgo"],
+        "content_item_id": content_item_id,
+        "created_at": datetime(2026, 1, 1, tzinfo=timezone.utc) + timedelta(minutes=i),
+        **fields
+    }
+
+
+async def seed_sources(database):
+    await database.courses.insert_many([
+        {"id": "course1", "name": "Liderazgo Ejecutivo"},
+        {"id": "course2", "title": "Ventas"},
+    ])
+    await database.competencies.insert_many([
+        {"id": "comp1", "name": "Comunicación"},
+        {"id": "comp2", "name": "Negociación"},
+    ])
+    await database.niveles_certificacion.insert_many([
+        {"id": "n1", "order": 1, "advancement_es": "Aprendiz"},
+        {"id": "n2", "order": 2, "advancement_es": "Practicante"},
+    ])
+    await database.content_items.insert_many([
+        {"id": "ci1", "course_id": "course1", "competency_id": "comp1", "level": 1},
+        {"id": "ci2", "course_id": "course2", "competency_id": "comp2", "level": 2},
+    ])
+
+
+class TestSync:
+    """Tests for writing the denormalized fields"""
+
+    async def test_sync_all_backfills_names(self, mock_db):
+        from services.blog_classification import sync_all
+
+        await seed_sources(mock_db)
+        await mock_db.blog_posts.insert_many([post(0, "ci1"), post(1, "ci2"), post(2)])
+
+        result = await sync_all()
+
+        assert result == {"content_items": 2, "posts_updated": 2}
+        p0 = await mock_db.blog_posts.find_one({"id": "post-0"})
+        assert (p0["program_name"], p0["competency_name"], p0["level_name"]) == ("Liderazgo Ejecutivo", "Comunicación", "Aprendiz")
+        p1 = await mock_db.blog_posts.find_one({"id": "post-1"})
+        assert p1["program_name"] == "Ventas"
+        assert "program_name" not in await mock_db.blog_posts.find_one({"id": "post-2"})
+
+    async def test_backfill_runs_once(self, mock_db):
+        from services.blog_classification import ensure_classification
+
+        await seed_sources(mock_db)
+        await mock_db.blog_posts.insert_many([post(0, "ci1"), post(1, "ci2")])
+
+        assert await ensure_classification() == {"content_items": 2, "posts_updated": 2}
+        assert (await mock_db.blog_posts.find_one({"id": "post-1"}))["program_name"] == "Ventas"
+
+        await mock_db.blog_posts.insert_one(post(2, "ci1"))
+        assert await ensure_classification() is None
+        assert "program_name" not in await mock_db.blog_posts.find_one({"id": "post-2"})
+
+    async def test_classification_for_unclassified_item(self, mock_db):
+        from services.blog_classification import classification_for_item
+
+        fields = await classification_for_item({"id": "ci9"})
+
+        assert fields["program_name"] is None
+        assert fields["level_name"] is None
+
+    async def test_renames_propagate(self, mock_db):
+        from services import blog_classification
+
+        await seed_sources(mock_db)
+        await mock_db.blog_posts.insert_many([post(0, "ci1"), post(1, "ci2")])
+        await blog_classification.sync_all()
+
+        await mock_db.courses.update_one({"id": "course1"}, {"$set": {"name": "Liderazgo 2.0"}})
+        await blog_classification.propagate_course_name("course1", "Liderazgo 2.0")
+        await mock_db.competencies.update_one({"id": "comp2"}, {"$set": {"name": "Negociación avanzada"}})
+        await blog_classification.propagate_competency_name("comp2")
+        await mock_db.niveles_certificacion.update_one({"id": "n1"}, {"$set": {"advancement_es": "Inicial"}})
+        await mock_db.niveles_certificacion.delete_one({"id": "n2"})
+        await blog_classification.propagate_level_names()
+
+        p0 = await mock_db.blog_posts.find_one({"id": "post-0"})
+        p1 = await mock_db.blog_posts.find_one({"id": "post-1"})
+        assert p0["program_name"] == "Liderazgo 2.0"
+        assert p0["level_name"] == "Inicial"
+        assert p1["program_name"] == "Ventas"
+        assert p1["competency_name"] == "Negociación avanzada"
+        assert p1["level_name"] is None
+
+    async def test_reclassified_item_updates_its_posts(self, mock_db):
+        from services.blog_classification import sync_all, sync_content_item
+
+        await seed_sources(mock_db)
+        await mock_db.blog_posts.insert_many([post(0, "ci1"), post(1, "ci1", language="en")])
+        await sync_all()
+
+        await mock_db.content_items.update_one({"id": "ci1"}, {"$set": {"competency_id": "comp2", "level": 2}})
+        modified = await sync_content_item("ci1")
+
+        assert modified == 2
+        async for p in mock_db.blog_posts.find({"content_item_id": "ci1"}):
+            assert (p["competency_name"], p["level_name"]) == ("Negociación", "Practicante")
+
+
+class TestPublicFilters:
+    """Tests for /blog/public/posts with classification filters"""
+
+    async def test_filter_fills_the_page(self, mock_db):
+        from routers.blog import get_public_posts
+
+        # 30 newer non-matching posts would have starved the old limit*3 over-fetch
+        docs = [post(i, program_name="Liderazgo") for i in range(5)]
+        docs += [post(i, program_name="Ventas") for i in range(5, 35)]
+        await mock_db.blog_posts.insert_many(docs)
+
+        result = await get_public_posts(program="Liderazgo", limit=4)
+
+        assert [p["slug"] for p in result["posts"]] == ["post-4", "post-3", "post-2", "post-1"]
+
+    async def test_combined_filters_and_sidebar(self, mock_db):
+        from routers.blog import get_public_posts
+
+        await mock_db.blog_posts.insert_many([
+            post(0, program_name="Liderazgo", competency_name="Comunicación", level_name="Aprendiz"),
+            post(1, program_name="Liderazgo", competency_name="Comunicación", level_name="Practicante"),
+            post(2, program_name="Ventas", competency_name="Negociación", level_name="Aprendiz", tags=["ventas"]),
+            post(3, program_name="Otro", language="en"),
+        ])
+
+        result = await get_public_posts(program="Liderazgo", competency="Comunicación", level="Aprendiz")
+
+        assert [p["slug"] for p in result["posts"]] == ["post-0"]
+        assert result["filters"] == {
+            "programs": ["Liderazgo", "Ventas"],
+            "competencies": ["Comunicación", "Negociación"],
+            "levels": ["Aprendiz", "Practicante"],
+        }
+        assert result["tags"] == ["liderazgo", "ventas"]
+
+    async def test_scheduled_posts_do_not_shrink_the_page(self, mock_db):
+        from routers.blog import get_public_posts
+
+        future = (datetime.now(timezone.utc) + timedelta(days=3)).isoformat()
+        await mock_db.blog_posts.insert_many(
+            [post(i) for i in range(3)]
+            + [post(i, publish_date=future) for i in range(3, 6)]
+        )
+
+        result = await get_public_posts(limit=3)
+
+        assert [p["slug"] for p in result["posts"]] == ["post-2", "post-1", "post-0"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,170 @@
+"""
+Tests for Browser Pool
+
+Validates:
+- Browsers are reused across pages (no launch per URL)
+- Concurrency cap: size x contexts_per_browser pages at once
+- Recycling after N pages and replacement of disconnected browsers
+- Contexts are closed even when the caller raises
+"""
+
+import asyncio
+import pytest
+import sys
+import os
+
+# Configure pytest-asyncio
+pytestmark = pytest.mark.asyncio(loop_scope="function")
+
+# Add backend to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class FakePage:
+    async def add_init_script(self, script):
+        pass
+
+
+class FakeContext:
+    def __init__(self, browser):
+        self.browser = browser
+        self.closed = False
+
+    async def new_page(self):
+        return FakePage()
+
+    async def close(self):
+        self.closed = True
+        self.browser.open_contexts -= 1
+
+
+class FakeBrowser:
+    def __init__(self):
+        self.connected = True
+        self.closed = False
+        self.open_contexts = 0
+        self.contexts = []
+
+    def is_connected(self):
+        return self.connected
+
+    async def new_context(self, **kwargs):
+        self.open_contexts += 1
+        context = FakeContext(self)
+        self.contexts.append(context)
+        return context
+
+    async def close(self):
+        self.closed = True
+        self.connected = False
+
+
+class FakeLauncher:
+    def __init__(self):
+        self.browsers = []
+
+    async def __call__(self):
+        browser = FakeBrowser()
+        self.browsers.append(browser)
+        return browser
+
+
+def make_pool(**kwargs):
+    from services.browser_pool import BrowserPool
+
+    launcher = FakeLauncher()
+    return BrowserPool(launcher=launcher, **kwargs), launcher
+
+
+class TestReuse:
+    """Tests for browser reuse"""
+
+    async def test_sequential_pages_share_one_browser(self):
+        pool, launcher = make_pool(size=2, contexts_per_browser=3)
+
+        for _ in range(5):
+            async with pool.page() as page:
+                assert isinstance(page, FakePage)
+
+        assert len(launcher.browsers) == 1
+        assert all(c.closed for c in launcher.browsers[0].contexts)
+        assert pool.get_status()["pages"] == 5
+
+    async def test_context_closed_when_caller_raises(self):
+        pool, launcher = make_pool()
+
+        with pytest.raises(RuntimeError):
+            async with pool.page():
+                raise RuntimeError("navigation failed")
+
+        assert launcher.browsers[0].contexts[0].closed is True
+        assert pool.get_status()["browsers"][0]["active_contexts"] == 0
+
+
+class TestConcurrency:
+    """Tests for the concurrency cap"""
+
+    async def test_cap_is_size_times_contexts(self):
+        pool, launcher = make_pool(size=2, contexts_per_browser=2)
+        active = 0
+        peak = 0
+
+        async def use():
+            nonlocal active, peak
+            async with pool.page():
+                active += 1
+                peak = max(peak, active)
+                await asyncio.sleep(0.02)
+                active -= 1
+
+        await asyncio.gather(*(use() for _ in range(10)))
+
+        assert peak == 4
+        assert len(launcher.browsers) == 2
+        assert max(b.open_contexts for b in launcher.browsers) == 0
+
+
+class TestLifecycle:
+    """Tests for recycling and health checks"""
+
+    async def test_browser_recycled_after_max_pages(self):
+        pool, launcher = make_pool(size=1, contexts_per_browser=1, max_pages_per_browser=3)
+
+        for _ in range(4):
+            async with pool.page():
+                pass
+
+        assert len(launcher.browsers) == 2
+        assert launcher.browsers[0].closed is True
+        assert pool.get_status()["recycled"] == 1
+
+    async def test_disconnected_browser_is_replaced(self):
+        pool, launcher = make_pool(size=1, contexts_per_browser=2)
+
+        async with pool.page():
+            pass
+        launcher.browsers[0].connected = False  # Chromium crashed
+
+        async with pool.page():
+            pass
+
+        assert len(launcher.browsers) == 2
+        assert pool.get_status()["unhealthy"] == 1
+        assert [b["id"] for b in pool.get_status()["browsers"]] == [2]
+
+    async def test_close_shuts_every_browser(self):
+        pool, launcher = make_pool(size=2, contexts_per_browser=1)
+
+        async def use():
+            async with pool.page():
+                await asyncio.sleep(0.01)
+
+        await asyncio.gather(use(), use())
+        await pool.close()
+
+        assert all(b.closed for b in launcher.browsers)
+        assert pool.get_status()["browsers"] == []
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
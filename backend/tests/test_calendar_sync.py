@@ -0,0 +1,228 @@
+"""
+Tests for the Google Calendar local event cache
+
+Runs CalendarSync against an in-memory MongoDB (mongomock-motor) and a fake
+Calendar service. Validates:
+- Full sync stores events with indexed start/end/attendee fields
+- Incremental sync sends the syncToken and applies changes / cancellations
+- An expired syncToken (410) falls back to a full sync
+- Contact lookups and the message-page reader use the cache
+"""
+
+import pytest
+import sys
+import os
+from datetime import datetime, timezone, timedelta
+
+# Configure pytest-asyncio
+pytestmark = pytest.mark.asyncio(loop_scope="function")
+
+# Add backend to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def at(days=0, hours=0):
+    return (datetime.now(timezone.utc) + timedelta(days=days, hours=hours)).isoformat()
+
+
+def event(event_id, days, attendees=(), status="confirmed", **fields):
+    return {
+        "id": event_id,
+        "status": status,
+        "summary": f"Reunión {event_id}",
+        "start": {"dateTime": at(days)},
+        "end": {"dateTime": at(days, hours=1)},
+        "attendees": [{"email": email} for email in attendees],
+        **fields
+    }
+
+
+class FakeGone(Exception):
+    class resp:
+        status = 410
+
+
+class FakeRequest:
+    def __init__(self, fn):
+        self.fn = fn
+
+    def execute(self):
+        return self.fn()
+
+
+class FakeCalendarService:
+    """events().list(**params).execute() / calendars().get(...).execute()"""
+
+    def __init__(self):
+        self.items = []
+        self.changes = []
+        self.token_expired = False
+        self.calls = []
+
+    def events(self):
+        return self
+
+    def calendars(self):
+        return self
+
+    def get(self, calendarId):
+        return FakeRequest(lambda: {"id": calendarId, "timeZone": "America/Mexico_City"})
+
+    def list(self, **params):
+        self.calls.append(params)
+
+        def run():
+            if "syncToken" in params:
+                if self.token_expired:
+                    raise FakeGone()
+                return {"items": self.changes, "nextSyncToken": "token-2"}
+            # Two pages so pagination is exercised
+            if params.get("pageToken"):
+                return {"items": self.items[1:], "nextSyncToken": "token-1"}
+            return {"items": self.items[:1], "nextPageToken": "page-2"}
+
+        return FakeRequest(run)
+
+
+@pytest.fixture
+def mock_db(monkeypatch):
+    from mongomock_motor import AsyncMongoMockClient
+    import services.calendar_sync as calendar_sync
+
+    database = AsyncMongoMockClient()["leaderlix_test"]
+    monkeypatch.setattr(calendar_sync, "db", database)
+    return database
+
+
+async def connect(database):
+    await database.settings.insert_one({
+        "calendar_connected": True,
+        "calendar_credentials": {"token": "t", "email": "me@leaderlix.com"}
+    })
+    return database
+
+
+@pytest.fixture
+def fake_service():
+    return FakeCalendarService()
+
+
+@pytest.fixture
+def sync(fake_service):
+    from services.calendar_sync import CalendarSync
+
+    return CalendarSync(
+        service_factory=lambda credentials: fake_service,
+        credentials_refresher=lambda credentials: credentials
+    )
+
+
+class TestSync:
+    """Tests for full / incremental sync"""
+
+    async def test_full_sync_stores_indexed_fields(self, mock_db, sync, fake_service):
+        connected = await connect(mock_db)
+        fake_service.items = [
+            event("e1", 1, ["Ana@Cliente.com", "me@leaderlix.com"]),
+            event("e2", 3, ["luis@cliente.com"]),
+        ]
+
+        result = await sync.sync()
+
+        assert result == {"success": True, "mode": "full"}
+        assert len(fake_service.calls) == 2
+        doc = await connected.calendar_events.find_one({"id": "e1"})
+        assert doc["attendee_emails"] == ["ana@cliente.com", "me@leaderlix.com"]
+        assert doc["start_at"] < doc["end_at"]
+        state = await connected.calendar_sync_state.find_one({"calendar_id": "primary"})
+        assert state["sync_token"] == "token-1"
+        assert state["time_zone"] == "America/Mexico_City"
+
+    async def test_incremental_sync_applies_changes(self, mock_db, sync, fake_service):
+        connected = await connect(mock_db)
+        fake_service.items = [event("e1", 1, ["ana@cliente.com"]), event("e2", 3, ["luis@cliente.com"])]
+        await sync.sync()
+        fake_service.changes = [
+            event("e1", 2, ["ana@cliente.com"], summary="Movida"),
+            {"id": "e2", "status": "cancelled"},
+            event("e3", 5, ["eva@cliente.com"]),
+        ]
+
+        result = await sync.sync()
+
+        assert result["mode"] == "incremental"
+        assert fake_service.calls[-1]["syncToken"] == "token-1"
+        ids = sorted(e["id"] for e in await sync.get_events(days=30))
+        assert ids == ["e1", "e3"]
+        assert (await connected.calendar_events.find_one({"id": "e1"}))["summary"] == "Movida"
+        assert sync.stats["incremental_syncs"] == 1
+
+    async def test_expired_token_falls_back_to_full_sync(self, mock_db, sync, fake_service):
+        connected = await connect(mock_db)
+        fake_service.items = [event("e1", 1), event("e2", 2)]
+        await sync.sync()
+        fake_service.items = [event("e2", 2)]
+        fake_service.token_expired = True
+
+        result = await sync.sync()
+
+        assert result["mode"] == "full"
+        assert [e["id"] async for e in connected.calendar_events.find({})] == ["e2"]
+
+    async def test_not_connected_is_skipped(self, mock_db, sync, fake_service):
+        result = await sync.sync()
+
+        assert result["success"] is False
+        assert fake_service.calls == []
+
+
+class TestReaders:
+    """Tests for cache queries"""
+
+    async def test_window_and_contact_lookups(self, mock_db, sync, fake_service):
+        await connect(mock_db)
+        fake_service.items = [
+            event("past", -3, ["ana@cliente.com"]),
+            event("soon", 2, ["ana@cliente.com"]),
+            event("later", 40, ["ana@cliente.com", "luis@cliente.com"]),
+        ]
+        await sync.sync()
+
+        assert [e["id"] for e in await sync.get_events(days=21)] == ["soon"]
+        assert "attendee_emails" not in (await sync.get_events(days=21))[0]
+        assert [e["id"] for e in await sync.get_events(days=60, attendee_email="LUIS@cliente.com")] == ["later"]
+
+    async def test_stale_cache_syncs_inline_once(self, mock_db, sync, fake_service):
+        await connect(mock_db)
+        fake_service.items = [event("e1", 1)]
+
+        await sync.get_events(days=7)
+        await sync.get_events(days=7)
+
+        assert sync.stats["full_syncs"] == 1
+        assert sync.stats["incremental_syncs"] == 0
+
+    async def test_message_page_filters_cached_events(self, mock_db, fake_service, monkeypatch):
+        import services.calendar_sync as calendar_sync
+        import routers.calendar as calendar_router
+        import routers.mensajes_hoy as mensajes_hoy
+
+        connected = await connect(mock_db)
+
+        monkeypatch.setattr(calendar_router, "db", connected)
+        monkeypatch.setattr(calendar_sync.calendar_sync, "service_factory", lambda credentials: fake_service)
+        monkeypatch.setattr(calendar_sync.calendar_sync, "credentials_refresher", lambda credentials: credentials)
+        fake_service.items = [
+            event("client", 1, ["me@leaderlix.com", "ana@cliente.com"]),
+            event("internal", 1, ["me@leaderlix.com", "otro@leaderlix.com"]),
+            event("personal", 1),
+        ]
+
+        events = await mensajes_hoy.get_calendar_events_for_messages(21)
+
+        assert [e["id"] for e in events] == ["client"]
+        assert await mensajes_hoy.get_calendar_events_for_messages(21, attendee_email="luis@cliente.com") == []
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,179 @@
+"""
+Tests for set-based classification propagation (services/classification_propagation.py)
+
+Runs company and industry propagation against an in-memory MongoDB
+(mongomock-motor). Validates:
+- outbound reaches every associated contact; inbound skips contacts with
+  another outbound company
+- Contacts are written with one bulk write and related companies are read
+  with one query, whatever the number of contacts
+- Previews report exactly what propagation then changes
+- Large industries propagate as a background job tracked in admin_operations
+"""
+
+import pytest
+import sys
+import os
+
+from fastapi import BackgroundTasks
+
+# Configure pytest-asyncio
+pytestmark = pytest.mark.asyncio(loop_scope="function")
+
+# Add backend to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+USER = {"id": "u1", "email": "admin@leaderlix.com"}
+
+
+@pytest.fixture
+def mock_db(monkeypatch):
+    from mongomock_motor import AsyncMongoMockClient
+    import routers.unified_companies as unified_companies
+    import routers.industries_v2 as industries_v2
+
+    database = AsyncMongoMockClient()["leaderlix_test"]
+    for module in (unified_companies, industries_v2):
+        monkeypatch.setattr(module, "db", database)
+    return database
+
+
+def count_calls(monkeypatch, collection, method):
+    """Count calls to a collection method (patched on the collection's class)"""
+    calls = []
+    original = getattr(type(collection), method)
+
+    def counting(self, *args, **kwargs):
+        if self.name == collection.name:
+            calls.append(args)
+        return original(self, *args, **kwargs)
+
+    monkeypatch.setattr(type(collection), method, counting)
+    return calls
+
+
+async def seed(database, extra_contacts=0):
+    await database.industries.insert_one({"id": "ind1", "name": "Pharma", "code": "pharma", "classification": "inbound"})
+    await database.unified_companies.insert_many([
+        {"id": "acme", "name": "Acme", "industry_id": "ind1", "classification": "outbound"},
+        {"id": "beta", "name": "Beta", "industry": "PHARMA", "classification": "outbound"},
+        {"id": "gamma", "name": "Gamma", "industry_code": "pharma", "classification": "inbound"},
+        {"id": "other", "name": "Other", "classification": "outbound"},
+        {"id": "calm", "name": "Calm", "classification": "inbound"},
+    ])
+    await database.unified_contacts.insert_many([
+        {"id": "c1", "name": "Solo", "classification": "outbound", "companies": [{"company_id": "acme"}]},
+        {"id": "c2", "name": "Shared", "classification": "outbound",
+         "companies": [{"company_id": "acme"}, {"company_id": "other"}]},
+        {"id": "c3", "name": "Calm", "classification": "outbound",
+         "companies": [{"company_id": "acme"}, {"company_id": "calm"}]},
+        {"id": "c4", "name": "By name", "company": "acme", "classification": "outbound"},
+        {"id": "c5", "name": "Beta", "classification": "outbound", "companies": [{"company_id": "beta"}]},
+        {"id": "c6", "name": "Unrelated", "classification": "outbound", "companies": [{"company_id": "other"}]},
+    ] + [
+        {"id": f"x{n}", "name": f"Extra {n}", "classification": "outbound",
+         "companies": [{"company_id": "acme"}, {"company_id": f"extra{n}"}]}
+        for n in range(extra_contacts)
+    ])
+
+
+async def classifications(database):
+    return {c["id"]: c.get("classification") async for c in database.unified_contacts.find({}, {"_id": 0})}
+
+
+class TestCompanyPropagation:
+    """unified_companies propagate-classification / propagation-preview"""
+
+    @pytest.mark.parametrize("extra_contacts", [0, 25])
+    async def test_inbound(self, mock_db, monkeypatch, extra_contacts):
+        from routers.unified_companies import (
+            propagate_company_classification, get_company_propagation_preview, CompanyClassification
+        )
+
+        from services.company_association import ensure_company_keys
+
+        await seed(mock_db, extra_contacts)
+        await ensure_company_keys(mock_db)
+        company_finds = count_calls(monkeypatch, mock_db.unified_companies, "find")
+        company_find_ones = count_calls(monkeypatch, mock_db.unified_companies, "find_one")
+        contact_writes = count_calls(monkeypatch, mock_db.unified_contacts, "bulk_write")
+        contact_updates = count_calls(monkeypatch, mock_db.unified_contacts, "update_one")
+
+        preview = await get_company_propagation_preview("acme", "inbound", current_user=USER)
+        result = await propagate_company_classification("acme", CompanyClassification(classification="inbound"), current_user=USER)
+
+        expected = sorted(["c1", "c3", "c4"] + [f"x{n}" for n in range(extra_contacts)])
+        assert sorted(c["id"] for c in preview["affected_contacts"]) == expected
+        assert preview["affected_count"] == result["contacts_updated"] == len(expected)
+
+        states = await classifications(mock_db)
+        assert sorted(cid for cid, value in states.items() if value == "inbound") == expected
+        assert states["c2"] == "outbound"  # still works at "other" (outbound)
+
+        # Per call: one find_one for the company, one find for the related companies
+        assert len(company_find_ones) == 2 and len(company_finds) == 2
+        assert len(contact_writes) == 1 and not contact_updates
+
+    async def test_outbound(self, mock_db):
+        from routers.unified_companies import propagate_company_classification, CompanyClassification
+
+        await seed(mock_db)
+        await mock_db.unified_contacts.update_many({}, {"$set": {"classification": "inbound"}})
+
+        result = await propagate_company_classification("acme", CompanyClassification(classification="outbound"), current_user=USER)
+        assert result["contacts_updated"] == 4
+        states = await classifications(mock_db)
+        assert sorted(cid for cid, value in states.items() if value == "outbound") == ["c1", "c2", "c3", "c4"]
+        log = await mock_db.audit_logs.find_one({"type": "propagation"})
+        assert sorted(log["affected_ids"]) == ["c1", "c2", "c3", "c4"]
+
+
+class TestIndustryPropagation:
+    """industries_v2 propagate-classification / propagation-preview"""
+
+    async def test_preview_matches_propagation(self, mock_db):
+        from routers.industries_v2 import (
+            get_industry_propagation_preview, propagate_industry_classification, ClassificationUpdate
+        )
+
+        await seed(mock_db)
+
+        preview = await get_industry_propagation_preview("ind1", "inbound", current_user=USER)
+        assert sorted(c["id"] for c in preview["affected_companies"]) == ["acme", "beta"]
+        assert sorted(c["id"] for c in preview["affected_contacts"]) == ["c1", "c3", "c4", "c5"]
+        assert not preview["runs_in_background"]
+
+        result = await propagate_industry_classification(
+            "ind1", ClassificationUpdate(classification="inbound"), BackgroundTasks(), background=None, current_user=USER
+        )
+        assert result["companies_updated"] == preview["affected_count"] == 2
+        assert result["contacts_updated"] == preview["affected_contacts_count"] == 4
+        assert (await mock_db.industries.find_one({"id": "ind1"}))["classification"] == "inbound"
+        assert (await classifications(mock_db))["c2"] == "outbound"
+
+    async def test_background(self, mock_db, monkeypatch):
+        import services.classification_propagation as propagation
+        from routers.industries_v2 import (
+            propagate_industry_classification, get_propagation_operation, ClassificationUpdate
+        )
+
+        await seed(mock_db)
+        monkeypatch.setattr(propagation, "CLASSIFICATION_PROPAGATION_BACKGROUND_COMPANIES", 2)
+
+        tasks = BackgroundTasks()
+        started = await propagate_industry_classification(
+            "ind1", ClassificationUpdate(classification="inbound"), tasks, background=None, current_user=USER
+        )
+        assert started["status"] == "started"
+        assert (await get_propagation_operation(started["operation_id"], current_user=USER))["status"] == "running"
+        assert (await classifications(mock_db))["c1"] == "outbound"
+
+        await tasks()
+        operation = await get_propagation_operation(started["operation_id"], current_user=USER)
+        assert operation["status"] == "completed"
+        assert operation["companies_updated"] == 2 and operation["contacts_updated"] == 4
+        assert (await classifications(mock_db))["c1"] == "inbound"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,154 @@
+"""
+Tests for the contact -> company key index (services/company_association.py)
+
+Runs the key maintenance and the company joins against an in-memory MongoDB
+(mongomock-motor). Validates:
+- Keys are case-insensitive and cover `company` and `companies[].company_name`
+- The first lookup builds the index; the sync job re-keys changed contacts
+- Company renames keep contact names and keys in step
+- Contact filters, org chart and company detail match through the keys
+"""
+
+import pytest
+import sys
+import os
+from datetime import datetime, timezone, timedelta
+
+# Add backend to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+USER = {"email": "admin@leaderlix.com"}
+PAST = (datetime.now(timezone.utc) - timedelta(days=1)).isoformat()
+
+
+@pytest.fixture
+def mock_db(monkeypatch):
+    from mongomock_motor import AsyncMongoMockClient
+    import services.stats_counters as stats_counters
+    import routers.contacts as contacts
+    import routers.companies as companies
+    import routers.unified_companies as unified_companies
+
+    database = AsyncMongoMockClient()["leaderlix_test"]
+    for module in (stats_counters, contacts, companies, unified_companies):
+        monkeypatch.setattr(module, "db", database)
+    return database
+
+
+async def seed(database):
+    await database.unified_companies.insert_many([
+        {"id": "acme", "name": "Acme Corp", "aliases": ["ACME México"], "classification": "inbound"},
+        {"id": "beta", "name": "Beta", "classification": "inbound"},
+    ])
+    await database.unified_contacts.insert_many([
+        {"id": "a1", "name": "Ana", "company": "ACME corp", "updated_at": PAST},
+        {"id": "a2", "name": "Alberto", "company": "Otra", "updated_at": PAST,
+         "companies": [{"company_name": "acme  méxico"}]},
+        {"id": "b1", "name": "Bea", "company": "Beta", "updated_at": PAST},
+        {"id": "x1", "name": "Xavi", "company": "Acme Corp (old)", "updated_at": PAST},
+    ])
+
+
+class TestKeys:
+    """Key computation and maintenance"""
+
+    def test_key_fields(self):
+        from services.company_association import company_key, company_key_fields
+
+        assert company_key("  ACME   Corp ") == "acme corp"
+        assert company_key("") is None and company_key(None) is None
+        assert company_key_fields({"company": "Beta", "companies": [{"company_name": "ACME"}, {"company_name": "beta"}]}) == {
+            "company_key": "beta", "company_keys": ["acme", "beta"]
+        }
+        assert company_key_fields({}) == {"company_key": None, "company_keys": []}
+
+    @pytest.mark.asyncio(loop_scope="function")
+    async def test_sync(self, mock_db):
+        from services.company_association import ensure_company_keys, sync_company_keys
+
+        await seed(mock_db)
+
+        assert (await ensure_company_keys(mock_db))["updated"] == 4
+        assert await ensure_company_keys(mock_db) is None
+        a2 = await mock_db.unified_contacts.find_one({"id": "a2"})
+        assert a2["company_key"] == "otra" and a2["company_keys"] == ["acme méxico", "otra"]
+
+        # Written elsewhere without keys / after the watermark
+        await mock_db.unified_contacts.insert_one({"id": "n1", "company": "Beta"})
+        await mock_db.unified_contacts.update_one(
+            {"id": "b1"}, {"$set": {"company": "Acme Corp", "updated_at": datetime.now(timezone.utc) + timedelta(seconds=1)}}
+        )
+        result = await sync_company_keys(mock_db)
+        assert result["updated"] == 2 and not result["full"]
+        assert (await mock_db.unified_contacts.find_one({"id": "b1"}))["company_keys"] == ["acme corp"]
+
+    @pytest.mark.asyncio(loop_scope="function")
+    async def test_rename(self, mock_db):
+        from services.company_association import rename_contact_company
+
+        await seed(mock_db)
+
+        assert await rename_contact_company(mock_db, ["acme CORP"], "Acme Global", {"updated_at": "now"}) == 1
+        a1 = await mock_db.unified_contacts.find_one({"id": "a1"})
+        assert a1["company"] == "Acme Global" and a1["company_keys"] == ["acme global"] and a1["updated_at"] == "now"
+        x1 = await mock_db.unified_contacts.find_one({"id": "x1"})
+        assert x1["company"] == "Acme Corp (old)"
+
+    @pytest.mark.asyncio(loop_scope="function")
+    async def test_rename_rekeys_stale_contacts(self, mock_db):
+        from services.company_association import rename_contact_company, ensure_company_keys
+
+        await seed(mock_db)
+        await ensure_company_keys(mock_db)
+        # Written after the key sync by a writer that doesn't maintain the keys
+        await mock_db.unified_contacts.insert_many([
+            {"id": "s1", "company": "Acme Corp"},
+            {"id": "s2", "company": "Acme Corp", "company_key": "beta", "company_keys": ["beta"]},
+            {"id": "s3", "company": "ACME CORP", "company_key": "beta", "company_keys": ["beta"]},
+        ])
+
+        assert await rename_contact_company(mock_db, (n for n in ["Acme Corp"]), "Acme Global") == 4
+        for contact_id in ("a1", "s1", "s2", "s3"):
+            contact = await mock_db.unified_contacts.find_one({"id": contact_id})
+            assert contact["company"] == "Acme Global" and contact["company_key"] == "acme global"
+
+
+class TestJoins:
+    """Company joins through the keys"""
+
+    pytestmark = pytest.mark.asyncio(loop_scope="function")
+
+    async def test_contact_filters(self, mock_db):
+        from routers.contacts import get_contacts, get_company_orgchart, create_contact, ContactCreate
+
+        await seed(mock_db)
+
+        found = await get_contacts(companies="acme corp, BETA", current_user=USER)
+        assert sorted(c["id"] for c in found["contacts"]) == ["a1", "b1"]
+        chart = await get_company_orgchart("Acme Corp (old)", current_user=USER)
+        assert [c["id"] for c in chart["contacts"]] == ["x1"]
+
+        created = await create_contact(ContactCreate(name="Nuevo", companies=[{"company_name": "Beta", "is_primary": True}]), current_user=USER)
+        assert created["company_key"] == "beta"
+        found = await get_contacts(companies="beta", current_user=USER)
+        assert sorted(c["id"] for c in found["contacts"]) == sorted(["b1", created["id"]])
+
+    async def test_company_detail_and_rename(self, mock_db):
+        from routers.unified_companies import get_unified_company, get_company_propagation_preview
+        from routers.companies import update_company, get_company_detail, UpdateCompanyRequest
+
+        await seed(mock_db)
+
+        detail = await get_unified_company("acme", current_user=USER)
+        assert sorted(c["id"] for c in detail["contacts"]) == ["a1", "a2"]
+        preview = await get_company_propagation_preview("acme", "outbound", current_user=USER)
+        assert [c["id"] for c in preview["affected_contacts"]] == ["a1"]
+
+        renamed = await update_company("beta", UpdateCompanyRequest(name="Beta Labs"), current_user=USER)
+        assert renamed["contacts_updated"] == 1
+        detail = await get_company_detail("beta", current_user=USER)
+        assert [c["id"] for c in detail["contacts"]] == ["b1"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,209 @@
+"""
+Tests for the contact dedup engine
+
+Runs services/contact_dedup.py against an in-memory MongoDB
+(mongomock-motor). Validates:
+- Blocking keys (email, last-10-digit phone, LinkedIn, company)
+- Union-find joins groups across key types
+- Names are scored inside company blocks; oversized exact-key blocks are ignored
+- Grouping runs in the worker process and the cache is persisted
+- Incremental updates regroup only what changed, following only keys that link
+- find-duplicates reads the cache
+"""
+
+import pytest
+import sys
+import os
+
+# Add backend to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def mock_db(monkeypatch):
+    from mongomock_motor import AsyncMongoMockClient
+    import services.contact_dedup as contact_dedup
+    import routers.contacts as contacts
+
+    database = AsyncMongoMockClient()["leaderlix_test"]
+    for module in (contact_dedup, contacts):
+        monkeypatch.setattr(module, "db", database)
+    return database
+
+
+CONTACTS = [
+    {"id": "a", "name": "Ana López", "email": "ana@acme.com", "company": "Acme"},
+    {"id": "b", "name": "Ana Lopez", "emails": [{"email": "ana.l@gmail.com"}], "company": "ACME ",
+     "phones": [{"raw_input": "+52 55 1234 5678"}]},
+    {"id": "c", "name": "A. L.", "phone": "(55) 1234-5678", "company": "Otra"},
+    {"id": "d", "name": "Luis Pérez", "linkedin_url": "https://mx.linkedin.com/in/luisperez/?trk=x", "company": "Beta"},
+    {"id": "e", "name": "Luis P", "linkedin_url": "http://www.linkedin.com/in/LuisPerez", "company": "Gamma"},
+    {"id": "f", "name": "Marta Ruiz", "email": "MARTA@beta.com", "company": "Beta"},
+    {"id": "g", "name": "Otro Nombre", "company": "Beta"},
+    {"id": "merged", "name": "Ana López", "email": "ana@acme.com", "is_merged": True},
+]
+
+
+def groups_by_ids(groups):
+    return {tuple(g["contact_ids"]): g for g in groups}
+
+
+class TestKeys:
+    """Tests for blocking keys"""
+
+    def test_contact_keys(self):
+        from services.contact_dedup import contact_keys
+
+        assert contact_keys(CONTACTS[1]) == ["email:ana.l@gmail.com", "phone:5512345678", "company:acme"]
+        assert contact_keys(CONTACTS[2]) == ["phone:5512345678", "company:otra"]
+        assert contact_keys(CONTACTS[3]) == contact_keys({**CONTACTS[4], "company": "Beta"})
+        assert contact_keys({"id": "x", "phone": "12345"}) == []
+
+
+class TestGrouping:
+    """Tests for the pure grouping function"""
+
+    def test_union_across_key_types(self):
+        from services.contact_dedup import find_duplicate_groups
+
+        groups, keys = find_duplicate_groups(CONTACTS[:7])
+
+        by_ids = groups_by_ids(groups)
+        # a~b by name in Acme, b~c by phone: one group
+        assert set(by_ids) == {("a", "b", "c"), ("d", "e")}
+        assert by_ids[("a", "b", "c")]["match_types"] == ["name_company", "phone"]
+        assert by_ids[("a", "b", "c")]["match_type"] == "name_company"
+        assert by_ids[("a", "b", "c")]["confidence"] == 100
+        assert by_ids[("d", "e")]["match_type"] == "linkedin"
+        assert keys["g"] == ["company:beta"]
+
+    def test_name_threshold_and_key_block_limit(self):
+        from services.contact_dedup import find_duplicate_groups
+
+        contacts = [{"id": f"s{i}", "name": f"Persona {i}", "phone": "5500000000"} for i in range(4)]
+        contacts += [
+            {"id": "n1", "name": "Roberto Gómez", "company": "Delta"},
+            {"id": "n2", "name": "Roberta Gomez", "company": "Delta"},
+        ]
+
+        strict, _ = find_duplicate_groups(contacts, threshold=95, max_key_block=3)
+        loose, _ = find_duplicate_groups(contacts, threshold=80, max_key_block=4)
+
+        # A phone shared by more contacts than the block limit is a switchboard
+        assert strict == []
+        assert set(groups_by_ids(loose)) == {("s0", "s1", "s2", "s3"), ("n1", "n2")}
+        assert groups_by_ids(loose)[("n1", "n2")]["name_score"] >= 80
+
+
+class TestCache:
+    """Tests for the persisted candidates cache"""
+
+    pytestmark = pytest.mark.asyncio(loop_scope="function")
+
+    async def test_full_refresh_in_worker(self, mock_db):
+        from services.contact_dedup import refresh_contact_candidates_cache, get_contact_candidates, shutdown_dedup_worker
+
+        await mock_db.unified_contacts.insert_many([dict(c) for c in CONTACTS])
+
+        try:
+            result = await refresh_contact_candidates_cache()
+        finally:
+            shutdown_dedup_worker()
+
+        assert result["success"] and result["contacts_scanned"] == 7 and result["groups"] == 2
+        assert await mock_db.contact_dedup_keys.count_documents({}) == 7
+        phone = await get_contact_candidates(match_type="phone")
+        assert [g["contact_ids"] for g in phone["groups"]] == [["a", "b", "c"]]
+        assert phone["total_duplicates"] == 3
+        state = await mock_db.contact_dedup_state.find_one({"_type": "main"})
+        assert state["watermark"] == state["last_full_refresh"]
+
+    async def test_incremental_update(self, mock_db, monkeypatch):
+        import services.contact_dedup as contact_dedup
+
+        async def in_process(contacts, oversized_keys=()):
+            return contact_dedup.find_duplicate_groups(contacts, oversized_keys=oversized_keys)
+
+        monkeypatch.setattr(contact_dedup, "group_in_worker", in_process)
+        await mock_db.unified_contacts.insert_many([dict(c) for c in CONTACTS] + [
+            {"id": "x", "name": "X", "email": "x@zeta.com"},
+            {"id": "y", "name": "Y", "email": "X@zeta.com"},
+        ])
+        await contact_dedup.refresh_contact_candidates_cache()
+
+        # g gets Marta's email: joins f; c loses its phone: leaves a/b
+        await mock_db.unified_contacts.update_one({"id": "g"}, {"$set": {"email": "marta@beta.com", "updated_at": "9999"}})
+        await mock_db.unified_contacts.update_one({"id": "c"}, {"$set": {"phone": None, "updated_at": "9999"}})
+        result = await contact_dedup.sync_contact_candidates_job()
+
+        assert result["mode"] == "incremental" and result["contacts_changed"] == 2
+        cached = await contact_dedup.get_contact_candidates()
+        assert sorted(g["contact_ids"] for g in cached["groups"]) == [["a", "b"], ["d", "e"], ["f", "g"], ["x", "y"]]
+        # Marta (new email) and c's old group; the rest of Beta and x / y are left alone
+        assert result["contacts_regrouped"] == 5
+
+        await mock_db.unified_contacts.update_one({"id": "b"}, {"$set": {"is_merged": True}})
+        await contact_dedup.update_contact_candidates(["b"])
+
+        cached = await contact_dedup.get_contact_candidates()
+        assert sorted(g["contact_ids"] for g in cached["groups"]) == [["d", "e"], ["f", "g"], ["x", "y"]]
+        assert await mock_db.contact_dedup_keys.count_documents({"contact_id": "b"}) == 0
+
+    async def test_incremental_update_skips_blocks_that_never_link(self, mock_db, monkeypatch):
+        import services.contact_dedup as contact_dedup
+
+        async def in_process(contacts, oversized_keys=()):
+            return contact_dedup.find_duplicate_groups(contacts, max_key_block=3, oversized_keys=oversized_keys)
+
+        monkeypatch.setattr(contact_dedup, "group_in_worker", in_process)
+        monkeypatch.setattr(contact_dedup, "CONTACT_DEDUP_MAX_KEY_BLOCK", 3)
+        monkeypatch.setattr(contact_dedup, "CONTACT_DEDUP_INCREMENTAL_MAX_CONTACTS", 5)
+        # A big company with unrelated names, behind a switchboard phone
+        await mock_db.unified_contacts.insert_many([
+            {"id": f"p{i}", "name": f"Empleado {chr(97 + i) * 6}", "company": "Pfizer", "phone": "5500000000"}
+            for i in range(10)
+        ] + [{"id": "q", "name": "Laura Díaz", "company": "Pfizer"}, {"id": "r", "name": "Laura Diaz", "email": "laura@x.com"}])
+        await contact_dedup.refresh_contact_candidates_cache()
+
+        await mock_db.unified_contacts.update_one(
+            {"id": "p0"}, {"$set": {"name": "Laura Díaz", "email": "laura@x.com", "updated_at": "9999"}}
+        )
+        result = await contact_dedup.sync_contact_candidates_job()
+
+        assert result["mode"] == "incremental" and result["contacts_regrouped"] == 3
+        cached = await contact_dedup.get_contact_candidates()
+        assert [g["contact_ids"] for g in cached["groups"]] == [["p0", "q", "r"]]
+
+
+class TestEndpoint:
+    """Tests for /contacts/admin/find-duplicates"""
+
+    pytestmark = pytest.mark.asyncio(loop_scope="function")
+
+    async def test_find_duplicates_reads_cache(self, mock_db, monkeypatch):
+        import services.contact_dedup as contact_dedup
+        from routers.contacts import admin_find_duplicate_contacts
+
+        async def in_process(contacts, oversized_keys=()):
+            return contact_dedup.find_duplicate_groups(contacts, oversized_keys=oversized_keys)
+
+        monkeypatch.setattr(contact_dedup, "group_in_worker", in_process)
+        await mock_db.unified_contacts.insert_many([dict(c) for c in CONTACTS])
+
+        # First call builds the cache
+        result = await admin_find_duplicate_contacts(method="name_company", threshold=0.8, current_user={})
+        assert [[c["id"] for c in g["contacts"]] for g in result["groups"]] == [["a", "b", "c"]]
+        assert result["groups"][0]["match_key"] in ("Acme", "ACME ")
+
+        assert (await admin_find_duplicate_contacts(method="email", current_user={}))["total_groups"] == 0
+        everything = await admin_find_duplicate_contacts(method="all", current_user={})
+        assert everything["total_groups"] == 2 and everything["total_duplicates"] == 5
+
+        # Contacts merged after the last update are dropped at read time
+        await mock_db.unified_contacts.update_one({"id": "e"}, {"$set": {"is_merged": True}})
+        linkedin = await admin_find_duplicate_contacts(method="linkedin", current_user={})
+        assert linkedin["groups"] == []
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
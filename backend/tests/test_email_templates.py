@@ -0,0 +1,172 @@
+"""
+Tests for template-referenced email queue items
+
+Runs against an in-memory MongoDB (mongomock-motor). Validates:
+- Rule generation stores a template reference and variables, not HTML
+- Queue processing renders the body at send time (one template query)
+- Compiled rendering matches str.format and its missing-variable fallback
+- The compaction migration converts only reproducible legacy items
+"""
+
+import pytest
+import sys
+import os
+
+# Add backend to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def mock_db(monkeypatch):
+    from mongomock_motor import AsyncMongoMockClient
+    import services.email_templates as email_templates
+    import services.email_queue as email_queue
+    import routers.email_rules as email_rules
+    import services.stats_counters as stats_counters
+
+    database = AsyncMongoMockClient()["leaderlix_test"]
+    for module in (email_templates, email_queue, email_rules, stats_counters):
+        monkeypatch.setattr(module, "db", database)
+    email_templates.template_cache.reset()
+    return database
+
+
+CONTACT = {
+    "contact_id": "c1",
+    "email": "ana@cliente.com",
+    "name": "Ana López",
+    "company": "Acme",
+    "webinar_name": "Liderazgo",
+    "webinar_date": "10 de marzo",
+    "webinar_time": "10:00",
+    "webinar_id": "w1",
+}
+
+
+class TestRendering:
+    """Tests for compiled template rendering"""
+
+    def test_compiled_matches_format(self):
+        from services.email_templates import CompiledTemplate
+
+        body = "<p>Hola {contact_name}</p><style>a {{ color: red }}</style><p>{company!r:>8}</p>"
+        variables = {"contact_name": "Ana", "company": "Acme"}
+
+        assert CompiledTemplate({"id": "t", "template_body": body}).render(variables) == body.format(**variables)
+
+    def test_missing_variable_uses_replace_fallback(self):
+        from services.email_templates import CompiledTemplate, render_text
+
+        body = "<p>Hola {contact_name}, {unknown}</p>"
+        variables = {"contact_name": "Ana"}
+
+        assert CompiledTemplate({"id": "t", "template_body": body}).render(variables) == "<p>Hola Ana, {unknown}</p>"
+        assert render_text(body, variables) == "<p>Hola Ana, {unknown}</p>"
+
+
+class TestQueue:
+    """Tests for generation and sending"""
+
+    pytestmark = pytest.mark.asyncio(loop_scope="function")
+
+    async def test_generation_stores_template_reference(self, mock_db):
+        from routers.email_rules import queued_email_content, generate_email_for_contact
+
+        content = await queued_email_content("E01", CONTACT)
+        again = await queued_email_content("E01", {**CONTACT, "name": "Luis"})
+
+        assert content["template_id"] == again["template_id"]
+        assert content["template_vars"]["contact_name"] == "Ana"
+        assert "body_html" not in content
+        assert await mock_db.email_rule_templates.count_documents({}) == 1
+        assert await mock_db.email_templates.count_documents({}) == 0
+        assert content["subject"] == (await generate_email_for_contact("E01", CONTACT))["subject"]
+
+    async def test_edited_rule_gets_new_version(self, mock_db):
+        from routers.email_rules import queued_email_content
+
+        before = await queued_email_content("E01", CONTACT)
+        after = await queued_email_content("E01", CONTACT, {"template_subject": "Hola {contact_name}", "template_body": "<p>Nuevo</p>"})
+
+        assert before["template_id"] != after["template_id"]
+        assert await mock_db.email_rule_templates.count_documents({}) == 2
+
+    async def test_process_queue_renders_at_send(self, mock_db, monkeypatch):
+        from routers.email_rules import queued_email_content, generate_email_for_contact
+        from services.email_queue import email_queue
+        import services.email_queue as email_queue_module
+        from services.email_templates import template_cache
+
+        sent = []
+
+        async def fake_send_email(**kwargs):
+            sent.append(kwargs)
+            return {"success": True, "message_id": "m1"}
+
+        monkeypatch.setattr(email_queue_module.email_service, "send_email", fake_send_email)
+
+        content = await queued_email_content("E01", CONTACT)
+        await email_queue.add_to_queue(
+            rule="E01", contact_id="c1", contact_email=CONTACT["email"], contact_name=CONTACT["name"],
+            **content
+        )
+        stored = await mock_db.email_queue.find_one({})
+        assert "body_html" not in stored and "body_text" not in stored
+
+        template_cache.reset()
+        result = await email_queue.process_queue()
+
+        expected = (await generate_email_for_contact("E01", CONTACT))["body"]
+        assert result["sent"] == 1
+        assert expected in sent[0]["html_content"]
+        assert "Ana" in sent[0]["plain_content"]
+        assert template_cache.misses == 1
+
+    async def test_missing_template_fails_the_attempt(self, mock_db, monkeypatch):
+        from services.email_queue import email_queue
+
+        await email_queue.add_to_queue(
+            rule="E01", contact_id="c1", contact_email="a@b.com", contact_name="A",
+            subject="Hola", template_id="E01:gone", template_vars={}
+        )
+
+        result = await email_queue.process_queue()
+
+        assert result["failed"] == 1
+        assert (await mock_db.email_queue.find_one({}))["attempts"] == 1
+
+
+class TestCompaction:
+    """Tests for the pending queue migration"""
+
+    pytestmark = pytest.mark.asyncio(loop_scope="function")
+
+    async def test_compacts_reproducible_items_only(self, mock_db):
+        from routers.email_rules import generate_email_for_contact, compact_pending_queue_items, get_rule_pending_emails
+
+        metadata = {"company": "Acme", "buyer_persona": None, "webinar_name": "Liderazgo", "webinar_date": "10 de marzo", "webinar_id": "w1"}
+        # The old generator rendered without webinar_time (not kept in metadata)
+        rendered = await generate_email_for_contact("E02", {**CONTACT, "webinar_time": ""})
+        await mock_db.email_queue.insert_many([
+            {"id": "q1", "rule": "E02", "status": "pending", "contact_name": "Ana López", "subject": rendered["subject"],
+             "body_html": rendered["body"], "body_text": "", "metadata": metadata, "scheduled_at": "2026-01-01"},
+            {"id": "q2", "rule": "E02", "status": "pending", "contact_name": "Ana López", "subject": rendered["subject"],
+             "body_html": rendered["body"] + "<p>editado a mano</p>", "body_text": "texto", "metadata": metadata, "scheduled_at": "2026-01-02"},
+            {"id": "q3", "rule": "E02", "status": "sent", "contact_name": "Ana López", "subject": "x",
+             "body_html": rendered["body"], "metadata": metadata},
+        ])
+
+        stats = await compact_pending_queue_items()
+
+        assert stats == {"scanned": 2, "templated": 1, "body_text_removed": 1}
+        q1 = await mock_db.email_queue.find_one({"id": "q1"})
+        assert "body_html" not in q1 and q1["template_id"].startswith("E02:")
+        assert "body_text" not in await mock_db.email_queue.find_one({"id": "q2"})
+        assert "body_html" in await mock_db.email_queue.find_one({"id": "q3"})
+
+        preview = await get_rule_pending_emails("E02")
+        assert [e["body_html"] for e in preview["pending_emails"]] == [rendered["body"], rendered["body"] + "<p>editado a mano</p>"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
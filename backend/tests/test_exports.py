@@ -0,0 +1,195 @@
+"""
+Tests for streaming CSV / XLSX exports (services/exports.py, routers/exports.py)
+
+Runs the exports against an in-memory MongoDB (mongomock-motor). Validates:
+- CSV streams in batches with the list endpoints' filters and projected columns
+- Dotted columns flatten nested documents and arrays; gzip round-trips
+- Invalid formats / columns / filters are rejected before streaming starts
+- Exports over the streaming limit are refused; background jobs write a
+  downloadable file and expire it after the retention window
+"""
+
+import pytest
+import sys
+import os
+import csv
+import io
+import gzip as gzip_module
+from datetime import datetime, timezone, timedelta
+
+from fastapi import BackgroundTasks, HTTPException
+
+# Configure pytest-asyncio
+pytestmark = pytest.mark.asyncio(loop_scope="function")
+
+# Add backend to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+USER = {"email": "admin@leaderlix.com"}
+NOW = datetime(2026, 3, 1, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def mock_db(monkeypatch, tmp_path):
+    from mongomock_motor import AsyncMongoMockClient
+    import routers.exports as exports_router
+    import routers.contacts as contacts
+    import services.exports as exports
+
+    database = AsyncMongoMockClient()["leaderlix_test"]
+    for module in (exports_router, contacts):
+        monkeypatch.setattr(module, "db", database)
+    monkeypatch.setattr(exports, "EXPORT_DIR", str(tmp_path))
+    monkeypatch.setattr(exports, "EXPORT_BATCH_SIZE", 2)
+    return database
+
+
+async def body(response):
+    return b"".join([chunk async for chunk in response.body_iterator])
+
+
+def read_csv(data: bytes):
+    return list(csv.reader(io.StringIO(data.decode("utf-8-sig"))))
+
+
+async def seed(database):
+    await database.unified_contacts.insert_many([
+        {"id": f"c{n}", "name": f"Contact {n}", "email": f"c{n}@acme.com", "stage": 1 + n % 2,
+         "created_at": NOW - timedelta(hours=n), "roles": ["deal_maker", "student"],
+         "companies": [{"company_name": "Acme", "is_primary": True}, {"company_name": "Beta"}]}
+        for n in range(5)
+    ])
+
+
+class TestStreaming:
+    """GET /exports/<dataset>"""
+
+    async def test_contacts_csv(self, mock_db):
+        from routers.exports import export_contacts
+
+        await seed(mock_db)
+
+        response = await export_contacts(
+            file_format="csv", columns="id,roles,companies.company_name,created_at", stage=1, current_user=USER
+        )
+        assert response.media_type == "text/csv"
+        assert "attachment; filename=contacts_" in response.headers["content-disposition"]
+        rows = read_csv(await body(response))
+        assert rows[0] == ["id", "roles", "companies.company_name", "created_at"]
+        assert [r[0] for r in rows[1:]] == ["c0", "c2", "c4"]
+        assert rows[1][1:] == ["deal_maker; student", "Acme; Beta", NOW.isoformat()]
+
+    async def test_gzip_and_default_columns(self, mock_db):
+        from routers.exports import export_contacts, EXPORT_DATASETS
+
+        await seed(mock_db)
+
+        response = await export_contacts(file_format="csv", gzip=True, search="contact 3", current_user=USER)
+        assert response.media_type == "application/gzip"
+        rows = read_csv(gzip_module.decompress(await body(response)))
+        assert rows[0] == EXPORT_DATASETS["contacts"]["columns"]
+        assert len(rows) == 2 and rows[1][0] == "c3"
+
+    async def test_formula_cells_neutralized(self, mock_db):
+        from routers.exports import export_contacts
+        from services.exports import format_cell
+
+        await mock_db.unified_contacts.insert_one({
+            "id": "evil", "name": '=HYPERLINK("http://x","y")', "phone": "+5215555", "company": "@SUM(A1)",
+            "tags": ["-1+1", "ok"], "stage": -3, "created_at": NOW
+        })
+
+        response = await export_contacts(file_format="csv", columns="name,phone,company,tags,stage", current_user=USER)
+        row = read_csv(await body(response))[1]
+        assert row == ["'=HYPERLINK(\"http://x\",\"y\")", "'+5215555", "'@SUM(A1)", "'-1+1; ok", "-3"]
+        assert format_cell(-3) == -3 and format_cell("Acme") == "Acme"
+
+    async def test_queue_time_range(self, mock_db):
+        from routers.exports import export_email_queue
+
+        await mock_db.email_queue.insert_many([
+            {"id": "e1", "rule": "E1", "status": "pending", "scheduled_at": NOW},
+            {"id": "e2", "rule": "E1", "status": "pending", "scheduled_at": (NOW - timedelta(days=3)).isoformat()},
+            {"id": "e3", "rule": "E2", "status": "pending", "scheduled_at": NOW},
+        ])
+
+        response = await export_email_queue(
+            file_format="csv", columns="id", rule="e1", since=(NOW - timedelta(days=5)).isoformat(), current_user=USER
+        )
+        assert [r[0] for r in read_csv(await body(response))[1:]] == ["e1", "e2"]
+
+    async def test_rejections(self, mock_db, monkeypatch):
+        import routers.exports as exports_router
+        import services.exports as exports
+        from routers.exports import export_contacts, export_tracking_events
+
+        await seed(mock_db)
+
+        for kwargs in ({"file_format": "pdf"}, {"file_format": "csv", "columns": "name,$where"}):
+            with pytest.raises(HTTPException) as error:
+                await export_contacts(current_user=USER, **kwargs)
+            assert error.value.status_code == 400
+        with pytest.raises(HTTPException) as error:
+            await export_tracking_events(file_format="csv", since="yesterday", current_user=USER)
+        assert error.value.status_code == 400
+
+        monkeypatch.setattr(exports, "XLSX_AVAILABLE", False)
+        with pytest.raises(HTTPException) as error:
+            await export_contacts(file_format="xlsx", current_user=USER)
+        assert "openpyxl" in error.value.detail
+
+        monkeypatch.setattr(exports_router, "EXPORT_STREAM_MAX_ROWS", 4)
+        with pytest.raises(HTTPException) as error:
+            await export_contacts(file_format="csv", current_user=USER)
+        assert error.value.status_code == 413
+
+
+class TestJobs:
+    """POST /exports/jobs"""
+
+    async def test_job_lifecycle(self, mock_db):
+        from routers.exports import create_export, get_export, download_export, ExportJobRequest
+        from services.exports import cleanup_export_files
+
+        await seed(mock_db)
+
+        tasks = BackgroundTasks()
+        job = await create_export(
+            ExportJobRequest(dataset="contacts", columns=["id", "email"], gzip=True, filters={"stage": 2}),
+            tasks, current_user=USER
+        )
+        assert job["status"] == "pending" and job["filename"].endswith(".csv.gz")
+        with pytest.raises(HTTPException) as error:
+            await download_export(job["job_id"], current_user=USER)
+        assert error.value.status_code == 409
+
+        await tasks()
+        status = await get_export(job["job_id"], current_user=USER)
+        assert status["status"] == "completed" and status["rows"] == 2 and "file_path" not in status
+
+        response = await download_export(job["job_id"], current_user=USER)
+        with open(response.path, "rb") as f:
+            assert read_csv(gzip_module.decompress(f.read())) == [["id", "email"], ["c1", "c1@acme.com"], ["c3", "c3@acme.com"]]
+
+        # Past its retention the file is removed
+        await mock_db.export_jobs.update_one({"job_id": job["job_id"]}, {"$set": {"expires_at": NOW}})
+        assert (await cleanup_export_files(mock_db))["expired"] == 1
+        assert not os.path.exists(response.path)
+        with pytest.raises(HTTPException) as error:
+            await download_export(job["job_id"], current_user=USER)
+        assert error.value.status_code == 409
+
+    async def test_invalid_job(self, mock_db):
+        from routers.exports import create_export, ExportJobRequest
+
+        for request in (
+            ExportJobRequest(dataset="users"),
+            ExportJobRequest(dataset="contacts", filters={"password": "x"}),
+        ):
+            with pytest.raises(HTTPException) as error:
+                await create_export(request, BackgroundTasks(), current_user=USER)
+            assert error.value.status_code == 400
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,203 @@
+"""
+Tests for the shared HubSpot client
+
+Runs HubSpotClient against tests/hubspot_mock_server.py (mounted with
+httpx.ASGITransport, no network). Validates:
+- Pagination follows paging.next.after and honours limit
+- Batch read / upsert / associations are chunked at 100 inputs
+- 429 responses are retried and the token bucket adopts the rate-limit headers
+- sync_pipeline diffs pages into bulk writes (mongomock-motor)
+- Router helpers use the client
+"""
+
+import pytest
+import sys
+import os
+
+import httpx
+
+# Configure pytest-asyncio
+pytestmark = pytest.mark.asyncio(loop_scope="function")
+
+# Add backend to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tests.hubspot_mock_server import HubSpotMockState, create_app
+
+
+@pytest.fixture
+def state():
+    return HubSpotMockState()
+
+
+def make_client(state, **kwargs):
+    from services.hubspot_client import HubSpotClient
+
+    transport = httpx.ASGITransport(app=create_app(state))
+    return HubSpotClient(
+        token=state.token,
+        base_url="http://hubspot.mock",
+        client=httpx.AsyncClient(transport=transport, base_url="http://hubspot.mock"),
+        **kwargs
+    )
+
+
+def add_contacts(state, count):
+    for i in range(count):
+        state.add("contacts", str(i + 1), email=f"c{i + 1}@cliente.com", firstname=f"C{i + 1}")
+
+
+class TestRequests:
+    """Tests for pagination, retries and rate limiting"""
+
+    async def test_pages_follow_cursor_and_limit(self, state):
+        add_contacts(state, 250)
+        hubspot = make_client(state)
+
+        pages = [page async for page in hubspot.pages("/crm/v3/objects/contacts", params={"limit": 100})]
+        limited = [c async for c in hubspot.paginate("/crm/v3/objects/contacts", params={"limit": 100}, limit=150)]
+
+        assert [len(p) for p in pages] == [100, 100, 50]
+        assert len(limited) == 150
+        assert limited[-1]["id"] == "150"
+
+    async def test_rate_limited_request_is_retried(self, state):
+        state.add("deals", "7", dealname="Proyecto")
+        state.fail_next = 1
+        hubspot = make_client(state)
+
+        deal = await hubspot.get("/crm/v3/objects/deals/7")
+
+        assert deal["properties"]["dealname"] == "Proyecto"
+        assert hubspot.stats["rate_limited"] == 1
+        assert len(state.requests) == 2
+
+    async def test_bucket_adopts_rate_limit_headers(self):
+        state = HubSpotMockState(rate_limit=5, interval_ms=1000)
+        hubspot = make_client(state)
+
+        await hubspot.get("/crm/v3/objects/contacts")
+
+        assert hubspot.bucket.capacity == 5
+        assert hubspot.bucket.interval == 1.0
+        assert hubspot.bucket.tokens <= 4
+
+    async def test_errors_raise_hubspot_error(self, state):
+        from services.hubspot_client import HubSpotError
+
+        hubspot = make_client(state)
+
+        with pytest.raises(HubSpotError) as error:
+            await hubspot.get("/crm/v3/objects/deals/404")
+        assert error.value.status_code == 404
+
+
+class TestBatch:
+    """Tests for batch endpoints"""
+
+    async def test_batch_read_chunks_over_100_ids(self, state):
+        add_contacts(state, 230)
+        hubspot = make_client(state)
+
+        contacts = await hubspot.batch_read("contacts", [str(i) for i in range(1, 231)], ["email"])
+
+        assert [c["id"] for c in contacts] == [str(i) for i in range(1, 231)]
+        assert state.requests.count("POST /crm/v3/objects/contacts/batch/read") == 3
+
+    async def test_batch_read_by_id_property(self, state):
+        add_contacts(state, 3)
+        hubspot = make_client(state)
+
+        contacts = await hubspot.batch_read("contacts", ["c2@cliente.com"], ["email"], id_property="email")
+
+        assert [c["id"] for c in contacts] == ["2"]
+
+    async def test_batch_upsert(self, state):
+        add_contacts(state, 1)
+        hubspot = make_client(state)
+
+        results = await hubspot.batch_upsert("contacts", [
+            {"id": "c1@cliente.com", "properties": {"firstname": "Ana"}},
+            {"id": "nuevo@cliente.com", "properties": {"firstname": "Luis"}},
+        ], id_property="email")
+
+        assert [r["new"] for r in results] == [False, True]
+        assert state.objects["contacts"]["1"]["properties"]["firstname"] == "Ana"
+        assert len(state.objects["contacts"]) == 2
+
+    async def test_batch_associations(self, state):
+        state.associate("deals", "d1", "contacts", "1", label="Decisor")
+        state.associate("deals", "d1", "contacts", "2")
+        hubspot = make_client(state)
+
+        associations = await hubspot.batch_associations("deals", ["d1", "d2"], "contacts")
+
+        assert [a["toObjectId"] for a in associations["d1"]] == ["1", "2"]
+        assert associations["d2"] == []
+
+
+class TestSyncPipeline:
+    """Tests for fetch -> diff -> bulk_write"""
+
+    async def test_pipeline_writes_each_page(self, state):
+        from mongomock_motor import AsyncMongoMockClient
+        from pymongo import InsertOne
+        from services.hubspot_client import sync_pipeline
+
+        add_contacts(state, 120)
+        hubspot = make_client(state)
+        database = AsyncMongoMockClient()["leaderlix_test"]
+
+        async def diff(page):
+            return [InsertOne({"hubspot_id": c["id"], "email": c["properties"]["email"]}) for c in page]
+
+        stats = await sync_pipeline(
+            hubspot.pages("/crm/v3/objects/contacts", params={"limit": 50}),
+            diff,
+            collection=database.contacts
+        )
+
+        assert stats == {"pages": 3, "fetched": 120, "operations": 120, "written": 120, "write_errors": 0}
+        assert await database.contacts.count_documents({}) == 120
+
+    async def test_dry_run_does_not_write(self, state):
+        from mongomock_motor import AsyncMongoMockClient
+        from pymongo import InsertOne
+        from services.hubspot_client import sync_pipeline
+
+        add_contacts(state, 10)
+        hubspot = make_client(state)
+        database = AsyncMongoMockClient()["leaderlix_test"]
+
+        async def diff(page):
+            return [InsertOne({"hubspot_id": c["id"]}) for c in page]
+
+        stats = await sync_pipeline(hubspot.pages("/crm/v3/objects/contacts"), diff, collection=database.contacts, dry_run=True)
+
+        assert stats["operations"] == 10 and stats["written"] == 0
+        assert await database.contacts.count_documents({}) == 0
+
+
+class TestRouterHelpers:
+    """Tests for router helpers built on the client"""
+
+    async def test_deal_helpers(self, state, monkeypatch):
+        import routers.cases as cases
+
+        monkeypatch.setattr(cases, "hubspot", make_client(state))
+        state.lists["42"] = ["d1", "d2"]
+        state.add("deals", "d1", dealname="Proyecto 1")
+        state.add("quotes", "q1", hs_title="Cotización", hs_public_url_key="k")
+        state.associate("deals", "d1", "quotes", "q1")
+        state.associate("deals", "d1", "contacts", "5", label="Decisor")
+
+        assert await cases.get_hubspot_list_deals("42") == ["d1", "d2"]
+        assert [d["id"] for d in await cases.get_hubspot_deals_batch(["d1", "d2"])] == ["d1"]
+        assert await cases.get_deal_associated_contacts("d1") == [{"hubspot_id": "5", "labels": ["Decisor"]}]
+        quotes = await cases.get_deal_associated_quotes("d1")
+        assert quotes[0]["title"] == "Cotización"
+        assert quotes[0]["public_url"] == "https://app.hubspot.com/quotes/q1"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,237 @@
+"""
+Tests for Job Wakeup Service
+
+Validates:
+- In-process notify / wait semantics (sticky signal, fallback timeout)
+- Change stream forwarding using an in-memory replica-set stand-in
+- Graceful fallback when change streams are unsupported (standalone mongod)
+- Worker loop drains work back to back and blocks when idle
+"""
+
+import asyncio
+import pytest
+import sys
+import os
+from pymongo.errors import OperationFailure
+
+# Add backend to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class FakeChangeStream:
+    """Async iterator over events pushed into a FakeReplicaSetCollection."""
+
+    def __init__(self, queue: asyncio.Queue):
+        self._queue = queue
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        return await self._queue.get()
+
+
+class FakeReplicaSetCollection:
+    """
+    Minimal stand-in for a collection on a replica set: watch() yields every
+    event passed to emit(). With standalone=True, watch() fails the way a
+    standalone mongod does.
+    """
+
+    def __init__(self, standalone: bool = False):
+        self.standalone = standalone
+        self.pipelines = []
+        self._queue = asyncio.Queue()
+
+    def watch(self, pipeline=None):
+        self.pipelines.append(pipeline)
+        if self.standalone:
+            raise OperationFailure(
+                "The $changeStream stage is only supported on replica sets", code=40573
+            )
+        return FakeChangeStream(self._queue)
+
+    def emit(self, change: dict):
+        self._queue.put_nowait(change)
+
+
+class TestNotifyWait:
+    """Tests for in-process wakeups"""
+
+    pytestmark = pytest.mark.asyncio(loop_scope="function")
+
+    async def test_wait_times_out_without_notify(self):
+        from services.job_wakeup import JobWakeup
+
+        wakeup = JobWakeup()
+        assert await wakeup.wait("jobs", 0.01) is False
+
+    async def test_notify_before_wait_is_sticky(self):
+        """A notify that arrives while the worker is busy must not be lost"""
+        from services.job_wakeup import JobWakeup
+
+        wakeup = JobWakeup()
+        wakeup.notify("jobs")
+        assert await wakeup.wait("jobs", 1) is True
+        # Signal is consumed by the wait
+        assert await wakeup.wait("jobs", 0.01) is False
+
+    async def test_notify_wakes_blocked_waiter(self):
+        from services.job_wakeup import JobWakeup
+
+        wakeup = JobWakeup()
+        waiter = asyncio.create_task(wakeup.wait("jobs", 5))
+        await asyncio.sleep(0)
+        wakeup.notify("jobs")
+        assert await asyncio.wait_for(waiter, 1) is True
+
+    async def test_channels_are_independent(self):
+        from services.job_wakeup import JobWakeup
+
+        wakeup = JobWakeup()
+        wakeup.notify("a")
+        assert await wakeup.wait("b", 0.01) is False
+        assert await wakeup.wait("a", 0.01) is True
+
+
+class TestChangeStreams:
+    """Tests for change stream forwarding"""
+
+    @pytest.mark.asyncio(loop_scope="function")
+    async def test_change_event_wakes_channel(self):
+        from services.job_wakeup import JobWakeup, CHANNEL_RECLASSIFICATION
+
+        wakeup = JobWakeup()
+        collection = FakeReplicaSetCollection()
+        wakeup.start_watchers({CHANNEL_RECLASSIFICATION: collection}, [CHANNEL_RECLASSIFICATION])
+        try:
+            await asyncio.sleep(0)
+            assert wakeup.stream_status[CHANNEL_RECLASSIFICATION] == "active"
+
+            collection.emit({"operationType": "insert"})
+            assert await wakeup.wait(CHANNEL_RECLASSIFICATION, 1) is True
+        finally:
+            wakeup.stop_watchers()
+
+    @pytest.mark.asyncio(loop_scope="function")
+    async def test_watch_uses_channel_filter(self):
+        from services.job_wakeup import JobWakeup, CHANNEL_EMAIL_QUEUE, CHANGE_STREAM_PIPELINES
+
+        wakeup = JobWakeup()
+        collection = FakeReplicaSetCollection()
+        wakeup.start_watchers({CHANNEL_EMAIL_QUEUE: collection}, [CHANNEL_EMAIL_QUEUE])
+        try:
+            await asyncio.sleep(0)
+            assert collection.pipelines == [CHANGE_STREAM_PIPELINES[CHANNEL_EMAIL_QUEUE]]
+        finally:
+            wakeup.stop_watchers()
+
+    @pytest.mark.asyncio(loop_scope="function")
+    async def test_standalone_server_falls_back_to_polling(self):
+        from services.job_wakeup import JobWakeup, CHANNEL_LINKEDIN_IMPORT
+
+        wakeup = JobWakeup()
+        collection = FakeReplicaSetCollection(standalone=True)
+        wakeup.start_watchers({CHANNEL_LINKEDIN_IMPORT: collection}, [CHANNEL_LINKEDIN_IMPORT])
+        await asyncio.sleep(0.01)
+
+        assert wakeup.stream_status[CHANNEL_LINKEDIN_IMPORT] == "unavailable"
+        # In-process notify still works
+        wakeup.notify(CHANNEL_LINKEDIN_IMPORT)
+        assert await wakeup.wait(CHANNEL_LINKEDIN_IMPORT, 1) is True
+        wakeup.stop_watchers()
+
+    def test_heartbeat_updates_do_not_match_filters(self):
+        """Worker progress writes must not re-wake the worker"""
+        from services.job_wakeup import CHANGE_STREAM_PIPELINES
+
+        for channel, pipeline in CHANGE_STREAM_PIPELINES.items():
+            match = pipeline[0]["$match"]["$or"]
+            fields = [list(cond.keys())[0] for cond in match]
+            assert "updateDescription.updatedFields.heartbeat_at" not in fields
+            assert "updateDescription.updatedFields.progress" not in fields
+
+
+class TestWorkerLoop:
+    """Tests for run_worker_loop"""
+
+    pytestmark = pytest.mark.asyncio(loop_scope="function")
+
+    async def test_drains_then_blocks_until_notified(self):
+        from services.job_wakeup import JobWakeup, run_worker_loop
+
+        wakeup = JobWakeup()
+        pending = [1, 2, 3]
+        calls = []
+
+        async def process_once():
+            calls.append(len(pending))
+            if pending:
+                pending.pop()
+                return True
+            return False
+
+        task = asyncio.create_task(
+            run_worker_loop("jobs", process_once, fallback_interval=60, wakeup=wakeup)
+        )
+        try:
+            await asyncio.sleep(0.05)
+            # 3 jobs drained back to back + 1 empty check, then blocked
+            assert calls == [3, 2, 1, 0]
+
+            pending.append(4)
+            wakeup.notify("jobs")
+            await asyncio.sleep(0.05)
+            assert calls == [3, 2, 1, 0, 1, 0]
+        finally:
+            task.cancel()
+
+    async def test_fallback_poll_runs_without_notify(self):
+        from services.job_wakeup import JobWakeup, run_worker_loop
+
+        wakeup = JobWakeup()
+        calls = []
+
+        async def process_once():
+            calls.append(1)
+            return False
+
+        task = asyncio.create_task(
+            run_worker_loop("jobs", process_once, fallback_interval=0.01, wakeup=wakeup)
+        )
+        try:
+            await asyncio.sleep(0.1)
+            assert len(calls) >= 3
+        finally:
+            task.cancel()
+
+    async def test_handler_errors_do_not_kill_loop(self):
+        from services.job_wakeup import JobWakeup, run_worker_loop
+
+        wakeup = JobWakeup()
+        calls = []
+
+        async def process_once():
+            calls.append(1)
+            if len(calls) == 1:
+                raise RuntimeError("boom")
+            return False
+
+        task = asyncio.create_task(
+            run_worker_loop("jobs", process_once, fallback_interval=0.01, wakeup=wakeup)
+        )
+        try:
+            await asyncio.sleep(0.05)
+            assert len(calls) >= 2
+        finally:
+            task.cancel()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,110 @@
+"""
+Tests for aggregated LMS lesson stats
+
+Runs the course listing endpoints against an in-memory MongoDB
+(mongomock-motor). Validates:
+- lesson_count / total_duration / free_lessons come from one $group
+- Courses without lessons report zeros
+- Listings no longer query lessons once per course
+"""
+
+import pytest
+import sys
+import os
+
+# Configure pytest-asyncio
+pytestmark = pytest.mark.asyncio(loop_scope="function")
+
+# Add backend to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def mock_db(monkeypatch):
+    from mongomock_motor import AsyncMongoMockClient
+    import routers.lms as lms
+
+    database = AsyncMongoMockClient()["leaderlix_test"]
+    monkeypatch.setattr(lms, "db", database)
+    return database
+
+
+async def seed_courses(database):
+    result = await database.courses.insert_many([
+        {"title": "Liderazgo", "is_published": True, "created_at": "2026-01-02", "enrolled_student_ids": ["u1"]},
+        {"title": "Ventas", "is_published": True, "created_at": "2026-01-01", "enrolled_student_ids": ["u1"]},
+        {"title": "Borrador", "is_published": False, "created_at": "2026-01-03"},
+    ])
+    leadership, sales, draft = [str(i) for i in result.inserted_ids]
+    await database.lessons.insert_many([
+        {"course_id": leadership, "title": "L1", "duration_minutes": 10, "is_free": True, "content": "x" * 1000},
+        {"course_id": leadership, "title": "L2", "duration_minutes": 25, "is_free": False},
+        {"course_id": leadership, "title": "L3", "duration_minutes": None},
+        {"course_id": sales, "title": "V1", "duration_minutes": 40},
+    ])
+    return leadership, sales, draft
+
+
+class TestLessonStats:
+    """Tests for the per-course lesson aggregation"""
+
+    async def test_admin_listing(self, mock_db):
+        from routers.lms import get_courses
+
+        leadership, sales, draft = await seed_courses(mock_db)
+
+        result = await get_courses()
+
+        stats = {c["id"]: (c["lesson_count"], c["total_duration"]) for c in result["courses"]}
+        assert stats == {leadership: (3, 35), sales: (1, 40), draft: (0, 0)}
+
+    async def test_public_listing_counts_free_lessons(self, mock_db):
+        from routers.lms import get_public_courses
+
+        leadership, sales, _ = await seed_courses(mock_db)
+
+        result = await get_public_courses()
+
+        courses = {c["id"]: c for c in result["courses"]}
+        assert set(courses) == {leadership, sales}
+        assert courses[leadership]["free_lessons"] == 1
+        assert courses[sales]["free_lessons"] == 0
+
+    async def test_my_courses(self, mock_db):
+        from routers.lms import get_external_user_courses
+
+        leadership, sales, _ = await seed_courses(mock_db)
+
+        result = await get_external_user_courses({"id": "u1"})
+
+        stats = {c["id"]: c["lesson_count"] for c in result["courses"]}
+        assert stats == {leadership: 3, sales: 1}
+
+    async def test_one_lessons_query_per_listing(self, mock_db, monkeypatch):
+        import routers.lms as lms
+
+        await seed_courses(mock_db)
+        calls = {"find": 0, "aggregate": 0}
+
+        class CountingLessons:
+            def find(self, *args, **kwargs):
+                calls["find"] += 1
+                return mock_db.lessons.find(*args, **kwargs)
+
+            def aggregate(self, *args, **kwargs):
+                calls["aggregate"] += 1
+                return mock_db.lessons.aggregate(*args, **kwargs)
+
+        class CountingDb:
+            courses = mock_db.courses
+            lessons = CountingLessons()
+
+        monkeypatch.setattr(lms, "db", CountingDb())
+
+        await lms.get_courses()
+
+        assert calls == {"find": 0, "aggregate": 1}
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
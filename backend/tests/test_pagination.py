@@ -0,0 +1,140 @@
+"""
+Tests for keyset (cursor) pagination (utils/pagination.py)
+
+Runs the pagination helpers and the list endpoints against an in-memory
+MongoDB (mongomock-motor). Validates:
+- Walking next_cursor visits every document once, in (sort field, _id) order
+- Mixed BSON date / ISO string / missing sort values page across type boundaries
+- Projections that hide _id or the sort field still produce cursors
+- Totals are cached per filter; invalid cursors are rejected with 400
+"""
+
+import pytest
+import sys
+import os
+from datetime import datetime, timezone, timedelta
+
+from fastapi import HTTPException
+
+# Configure pytest-asyncio
+pytestmark = pytest.mark.asyncio(loop_scope="function")
+
+# Add backend to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+USER = {"email": "admin@leaderlix.com"}
+NOW = datetime(2026, 3, 1, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def mock_db(monkeypatch):
+    from mongomock_motor import AsyncMongoMockClient
+    import services.stats_counters as stats_counters
+    import routers.contacts as contacts
+    import routers.unified_companies as unified_companies
+    from utils.pagination import clear_cached_totals
+
+    database = AsyncMongoMockClient()["leaderlix_test"]
+    for module in (stats_counters, contacts, unified_companies):
+        monkeypatch.setattr(module, "db", database)
+    clear_cached_totals()
+    return database
+
+
+async def walk(fetch, limit):
+    """Follow next_cursor from the first page; returns the pages"""
+    pages = []
+    cursor = None
+    while True:
+        docs, cursor = await fetch(limit, cursor)
+        pages.append(docs)
+        if not cursor:
+            return pages
+
+
+class TestKeysetPage:
+    """Tests for keyset_page"""
+
+    async def test_mixed_types_and_ties(self, mock_db):
+        from utils.pagination import keyset_page
+
+        docs = []
+        for n in range(4):
+            docs.append({"id": f"date{n}", "created_at": NOW - timedelta(days=n % 2)})  # ties
+            docs.append({"id": f"string{n}", "created_at": (NOW - timedelta(days=10 + n)).isoformat()})
+        docs += [{"id": "null", "created_at": None}, {"id": "missing"}]
+        await mock_db.unified_contacts.insert_many(docs)
+        expected = [d["id"] async for d in mock_db.unified_contacts.find({}).sort([("created_at", -1), ("_id", -1)])]
+
+        async def fetch(limit, cursor):
+            return await keyset_page(mock_db.unified_contacts, {}, {"_id": 0}, "created_at", -1, limit, cursor=cursor)
+
+        for limit in (1, 3, 10):
+            pages = await walk(fetch, limit)
+            assert [d["id"] for page in pages for d in page] == expected
+            assert "_id" not in pages[0][0]
+        assert expected[:4] == ["date2", "date0", "date3", "date1"] and expected[-2:] == ["missing", "null"]
+
+    async def test_inclusion_projection_and_filter(self, mock_db):
+        from utils.pagination import keyset_page
+
+        await mock_db.unified_companies.insert_many(
+            [{"id": f"c{n}", "name": f"Company {n % 5}", "kind": n % 2} for n in range(12)]
+        )
+
+        async def fetch(limit, cursor):
+            return await keyset_page(mock_db.unified_companies, {"kind": 1}, {"_id": 0, "id": 1}, "name", 1, limit, cursor=cursor)
+
+        pages = await walk(fetch, 2)
+        ids = [d["id"] for page in pages for d in page]
+        assert len(ids) == len(set(ids)) == 6
+        assert all(set(d) == {"id"} for page in pages for d in page)
+
+
+class TestEndpoints:
+    """List endpoints"""
+
+    async def test_contacts_cursor(self, mock_db):
+        from routers.contacts import get_contacts, get_contacts_by_stage
+
+        await mock_db.unified_contacts.insert_many(
+            [{"id": f"c{n}", "stage": 1 + n % 2, "created_at": NOW - timedelta(hours=n)} for n in range(7)]
+        )
+
+        first = await get_contacts(limit=3, current_user=USER)
+        assert [c["id"] for c in first["contacts"]] == ["c0", "c1", "c2"]
+        assert first["total"] == 7 and first["stage_counts"][1]["count"] == 4
+        second = await get_contacts(limit=3, cursor=first["next_cursor"], current_user=USER)
+        assert [c["id"] for c in second["contacts"]] == ["c3", "c4", "c5"]
+
+        # Total is cached for the filter; include_total=false skips it
+        await mock_db.unified_contacts.insert_one({"id": "new", "stage": 1, "created_at": NOW})
+        assert (await get_contacts(limit=3, current_user=USER))["total"] == 7
+        assert (await get_contacts(limit=3, include_total=False, current_user=USER))["total"] is None
+
+        by_stage = await get_contacts_by_stage(2, limit=2, current_user=USER)
+        rest = await get_contacts_by_stage(2, limit=2, cursor=by_stage["next_cursor"], current_user=USER)
+        assert [c["id"] for c in by_stage["contacts"] + rest["contacts"]] == ["c1", "c3", "c5"]
+        assert rest["next_cursor"] is None
+
+        with pytest.raises(HTTPException) as error:
+            await get_contacts(cursor="not-a-cursor", current_user=USER)
+        assert error.value.status_code == 400
+
+    async def test_unified_companies_cursor(self, mock_db):
+        from routers.unified_companies import list_unified_companies
+
+        await mock_db.unified_companies.insert_many(
+            [{"id": f"u{n}", "name": name, "_legacy_ids": ["x"]} for n, name in enumerate(["Beta", "Alfa", "Gamma"])]
+            + [{"id": "merged", "name": "Aaa", "is_merged": True}]
+        )
+
+        page = await list_unified_companies(limit=2, current_user=USER)
+        assert [c["name"] for c in page["companies"]] == ["Alfa", "Beta"] and page["pages"] == 2
+        assert "_legacy_ids" not in page["companies"][0]
+        rest = await list_unified_companies(limit=2, cursor=page["next_cursor"], current_user=USER)
+        assert [c["name"] for c in rest["companies"]] == ["Gamma"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
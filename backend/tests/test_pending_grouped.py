@@ -0,0 +1,289 @@
+"""
+Tests for the server-side "pending-grouped" views
+
+Runs the WhatsApp and email rule endpoints against an in-memory MongoDB
+(mongomock-motor). Validates:
+- Groups carry keys and counts only (no member documents, no bodies)
+- Grouping rules: persona normalisation, webinar subgroups, E06 past
+  webinar filtering, case groups
+- Members endpoint pages through exactly one group / subgroup, filtered
+  from the group id (persona key, case contacts) without regrouping
+"""
+
+import pytest
+import sys
+import os
+from datetime import datetime, timezone, timedelta
+
+# Configure pytest-asyncio
+pytestmark = pytest.mark.asyncio(loop_scope="function")
+
+# Add backend to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+USER = {"email": "test@leaderlix.com"}
+
+
+def _string_operator_with_trim(original):
+    """mongomock implements every string operator the grouping uses except $trim"""
+    def handle(self, operator, values):
+        if operator == "$trim":
+            value = self.parse(values["input"])
+            return value.strip() if isinstance(value, str) else None
+        return original(self, operator, values)
+    return handle
+
+
+@pytest.fixture
+def mock_db(monkeypatch):
+    from mongomock_motor import AsyncMongoMockClient
+    from mongomock.aggregate import _Parser
+    import services.queue_grouping as queue_grouping
+    import routers.whatsapp_rules as whatsapp_rules
+    import routers.email_rules as email_rules
+    import services.stats_counters as stats_counters
+
+    monkeypatch.setattr(_Parser, "_handle_string_operator", _string_operator_with_trim(_Parser._handle_string_operator))
+    database = AsyncMongoMockClient()["leaderlix_test"]
+    for module in (queue_grouping, whatsapp_rules, email_rules, stats_counters):
+        monkeypatch.setattr(module, "db", database)
+    return database
+
+
+def wa_item(i, rule="W10", **metadata):
+    return {
+        "id": f"wa-{rule}-{i}",
+        "rule": rule,
+        "status": "pending",
+        "contact_id": f"c{i}",
+        "contact_name": f"Contact {i}",
+        "contact_phone": "+5215500000000",
+        "metadata": metadata,
+        "created_at": f"2026-01-01T00:00:{i:02d}+00:00",
+    }
+
+
+def email_item(i, rule="E02", scheduled_at=None, **metadata):
+    return {
+        "id": f"em-{rule}-{i}",
+        "rule": rule,
+        "status": "pending",
+        "contact_id": f"c{i}",
+        "contact_name": f"Contact {i}",
+        "contact_email": f"c{i}@example.com",
+        "subject": "Hola",
+        "body_html": "<p>" + "x" * 5000 + "</p>",
+        "body_text": "",
+        "scheduled_at": scheduled_at or f"2026-01-01T00:00:{i:02d}+00:00",
+        "metadata": metadata,
+    }
+
+
+class TestWhatsAppGrouped:
+    """Tests for /whatsapp-rules/rule/{id}/pending-grouped"""
+
+    async def test_persona_groups_are_normalised_and_counted(self, mock_db):
+        from routers.whatsapp_rules import get_whatsapp_pending_grouped
+
+        await mock_db.whatsapp_rules.insert_one({"id": "W10", "trigger_type": "student_followup"})
+        await mock_db.buyer_personas_db.insert_one({"id": "mateo", "name": "Mateo"})
+        await mock_db.whatsapp_queue.insert_many(
+            [wa_item(i, buyer_persona="Mateo") for i in range(3)]
+            + [wa_item(3, buyer_persona=" mateo "), wa_item(4, buyer_persona=None), wa_item(5)]
+        )
+
+        result = await get_whatsapp_pending_grouped("w10", USER)
+
+        groups = {g["group_id"]: g for g in result["groups"]}
+        assert groups["mateo"]["count"] == 4
+        assert groups["mateo"]["group_name"] == "Mateo"
+        assert groups["sin clasificar"]["count"] == 2
+        assert groups["sin clasificar"]["has_error"] is True
+        assert result["total_count"] == 6
+        assert all("emails" not in g for g in result["groups"])
+
+    async def test_webinar_subgroups(self, mock_db):
+        from routers.whatsapp_rules import get_whatsapp_pending_grouped
+
+        await mock_db.whatsapp_rules.insert_one({"id": "W08", "trigger_type": "webinar_7_days"})
+        await mock_db.whatsapp_queue.insert_many([
+            wa_item(0, "W08", webinar_id="w1", webinar_name="Liderazgo", buyer_persona="mateo"),
+            wa_item(1, "W08", webinar_id="w1", webinar_name="Liderazgo", buyer_persona="Mateo"),
+            wa_item(2, "W08", webinar_id="w1", webinar_name="Liderazgo"),
+            wa_item(3, "W08", webinar_id="w2", webinar_name="Ventas", buyer_persona="ana"),
+        ])
+
+        result = await get_whatsapp_pending_grouped("W08", USER)
+
+        assert result["has_subgroups"] is True
+        webinars = {g["group_id"]: g for g in result["groups"]}
+        assert webinars["w1"]["group_name"] == "Liderazgo"
+        assert webinars["w1"]["count"] == 3
+        subgroups = {s["subgroup_id"]: s["count"] for s in webinars["w1"]["subgroups"]}
+        assert subgroups == {"mateo": 2, "sin clasificar": 1}
+
+    async def test_case_groups_use_one_lookup(self, mock_db):
+        from routers.whatsapp_rules import get_whatsapp_pending_grouped
+
+        await mock_db.whatsapp_rules.insert_one({"id": "W12", "trigger_type": "student_coaching"})
+        await mock_db.cases.insert_many([
+            {"id": "case1", "name": "Caso 1", "company_names": ["Acme"], "stage": "ganados",
+             "status": "active", "contact_ids": ["c0", "c1"]},
+            {"id": "case2", "name": "Caso 2", "stage": "concluidos", "status": "active", "contact_ids": ["c2"]},
+        ])
+        await mock_db.whatsapp_queue.insert_many([wa_item(i, "W12") for i in range(4)])
+
+        result = await get_whatsapp_pending_grouped("W12", USER)
+
+        groups = {g["group_id"]: g for g in result["groups"]}
+        assert groups["casos_en_curso"]["subgroups"][0]["subgroup_name"] == "Caso 1 (Acme)"
+        assert groups["casos_en_curso"]["count"] == 2
+        assert groups["casos_cerrados"]["count"] == 1
+        # c3 has no case and is not shown
+        assert result["total_count"] == 3
+
+    async def test_members_are_paginated_per_group(self, mock_db):
+        from routers.whatsapp_rules import get_whatsapp_pending_group_members
+
+        await mock_db.whatsapp_rules.insert_one({"id": "W10", "trigger_type": "student_followup"})
+        await mock_db.whatsapp_queue.insert_many(
+            [wa_item(i, buyer_persona="Mateo") for i in range(7)]
+            + [wa_item(i, buyer_persona="Ana") for i in range(7, 10)]
+        )
+
+        page1 = await get_whatsapp_pending_group_members("W10", "mateo", None, 1, 5, USER)
+        page2 = await get_whatsapp_pending_group_members("W10", "mateo", None, 2, 5, USER)
+
+        assert page1["total_count"] == 7
+        assert page1["total_pages"] == 2
+        assert [m["id"] for m in page1["emails"]] == [f"wa-W10-{i}" for i in range(5)]
+        assert [m["id"] for m in page2["emails"]] == ["wa-W10-5", "wa-W10-6"]
+        assert set(page1["emails"][0]) == {"id", "contact_id", "contact_name", "contact_phone", "metadata"}
+
+    async def test_members_match_normalised_persona(self, mock_db):
+        from routers.whatsapp_rules import get_whatsapp_pending_group_members
+
+        await mock_db.whatsapp_rules.insert_one({"id": "W10", "trigger_type": "student_followup"})
+        await mock_db.whatsapp_queue.insert_many([
+            wa_item(0, buyer_persona="Mateo"), wa_item(1, buyer_persona=" mateo "),
+            wa_item(2, buyer_persona=""), wa_item(3), wa_item(4, buyer_persona="Ana"),
+        ])
+
+        mateo = await get_whatsapp_pending_group_members("W10", "mateo", None, 1, 20, USER)
+        unclassified = await get_whatsapp_pending_group_members("W10", "sin clasificar", None, 1, 20, USER)
+
+        assert [m["id"] for m in mateo["emails"]] == ["wa-W10-0", "wa-W10-1"]
+        assert [m["id"] for m in unclassified["emails"]] == ["wa-W10-2", "wa-W10-3"]
+
+    async def test_case_members_come_from_the_case(self, mock_db):
+        from routers.whatsapp_rules import get_whatsapp_pending_group_members
+
+        await mock_db.whatsapp_rules.insert_one({"id": "W12", "trigger_type": "student_coaching"})
+        await mock_db.cases.insert_many([
+            {"id": "case1", "name": "Caso 1", "stage": "ganados", "status": "active", "contact_ids": ["c0", "c1"]},
+            {"id": "case2", "name": "Caso 2", "stage": "ganados", "status": "active", "contact_ids": ["c1", "c2"]},
+        ])
+        await mock_db.whatsapp_queue.insert_many([wa_item(i, "W12") for i in range(4)])
+
+        case1 = await get_whatsapp_pending_group_members("W12", "casos_en_curso", "case1", 1, 20, USER)
+        case2 = await get_whatsapp_pending_group_members("W12", "casos_en_curso", "case2", 1, 20, USER)
+        closed = await get_whatsapp_pending_group_members("W12", "casos_cerrados", None, 1, 20, USER)
+
+        assert [m["contact_id"] for m in case1["emails"]] == ["c0", "c1"]
+        # c1 is listed under the first case, as in the grouped view
+        assert [m["contact_id"] for m in case2["emails"]] == ["c2"]
+        assert closed["total_count"] == 0
+
+    async def test_unknown_group_has_no_members(self, mock_db):
+        from routers.whatsapp_rules import get_whatsapp_pending_group_members
+
+        await mock_db.whatsapp_rules.insert_one({"id": "W10", "trigger_type": "student_followup"})
+        await mock_db.whatsapp_queue.insert_one(wa_item(0, buyer_persona="Mateo"))
+
+        result = await get_whatsapp_pending_group_members("W10", "nobody", None, 1, 20, USER)
+
+        assert result["emails"] == []
+        assert result["total_count"] == 0
+
+
+class TestEmailGrouped:
+    """Tests for /email-rules/rule/{id}/pending-grouped"""
+
+    async def test_persona_rule_groups_and_error_group(self, mock_db):
+        from routers.email_rules import get_rule_pending_emails_grouped
+
+        await mock_db.email_queue.insert_many([
+            email_item(0, buyer_persona="Mateo"),
+            email_item(1, buyer_persona="Ana"),
+            email_item(2, buyer_persona=""),
+            email_item(3, scheduled_at="2999-01-01T00:00:00+00:00", buyer_persona="ana"),
+        ])
+
+        result = await get_rule_pending_emails_grouped("E02", USER)
+
+        assert [g["group_id"] for g in result["groups"]] == ["ana", "mateo", "no_persona"]
+        assert result["groups"][-1]["has_error"] is True
+        # Future email is not due today
+        assert result["total_count"] == 3
+
+    async def test_e06_skips_past_webinars(self, mock_db):
+        from routers.email_rules import get_rule_pending_emails_grouped
+
+        tomorrow = (datetime.now(timezone.utc) + timedelta(days=1)).strftime("%Y-%m-%d")
+        await mock_db.webinar_events_v2.insert_many([
+            {"id": "past", "name": "Pasado", "webinar_date": "2020-01-01"},
+            {"id": "next", "name": "Próximo", "webinar_date": tomorrow, "landing_page_url": "https://x"},
+        ])
+        await mock_db.email_queue.insert_many([
+            email_item(0, "E06", webinar_id="past", buyer_persona="mateo"),
+            email_item(1, "E06", webinar_id="next", buyer_persona="mateo"),
+            email_item(2, "E06", webinar_id="next"),
+            email_item(3, "E06", buyer_persona="ana"),
+        ])
+
+        result = await get_rule_pending_emails_grouped("E06", USER)
+
+        assert [g["group_id"] for g in result["groups"]] == ["next", "no_webinar"]
+        upcoming = result["groups"][0]
+        assert upcoming["group_name"] == "Próximo"
+        assert upcoming["group_date"] == tomorrow
+        assert upcoming["group_link"] == "https://x"
+        assert [s["subgroup_id"] for s in upcoming["subgroups"]] == ["mateo", "no_persona"]
+        assert result["total_count"] == 3
+
+    async def test_e06_members_skip_past_webinars(self, mock_db):
+        from routers.email_rules import get_rule_pending_group_members
+
+        tomorrow = (datetime.now(timezone.utc) + timedelta(days=1)).strftime("%Y-%m-%d")
+        await mock_db.webinar_events_v2.insert_many([
+            {"id": "past", "name": "Pasado", "webinar_date": "2020-01-01"},
+            {"id": "next", "name": "Próximo", "webinar_date": tomorrow},
+        ])
+        await mock_db.email_queue.insert_many([
+            email_item(0, "E06", webinar_id="past", buyer_persona="mateo"),
+            email_item(1, "E06", webinar_id="next", buyer_persona="Mateo"),
+            email_item(2, "E06", webinar_id="next", webinar_date="2020-01-01", buyer_persona="mateo"),
+            email_item(3, "E06", webinar_id="next"),
+        ])
+
+        upcoming = await get_rule_pending_group_members("E06", "next", "mateo", 1, 20, USER)
+        past = await get_rule_pending_group_members("E06", "past", "mateo", 1, 20, USER)
+
+        assert [m["id"] for m in upcoming["emails"]] == ["em-E06-1"]
+        assert past["total_count"] == 0
+
+    async def test_members_exclude_bodies(self, mock_db):
+        from routers.email_rules import get_rule_pending_group_members
+
+        await mock_db.email_queue.insert_many([email_item(i, "E01", webinar_id="w1", buyer_persona="Mateo") for i in range(3)])
+
+        result = await get_rule_pending_group_members("E01", "w1", "mateo", 1, 2, USER)
+
+        assert result["total_count"] == 3
+        assert len(result["emails"]) == 2
+        assert "body_html" not in result["emails"][0]
+        assert result["emails"][0]["contact_email"] == "c0@example.com"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -12,9 +12,6 @@ from unittest.mock import AsyncMock, MagicMock
 import sys
 import os
 
-# Configure pytest-asyncio
-pytestmark = pytest.mark.asyncio(loop_scope="function")
-
 # Add backend to path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
@@ -129,5 +126,110 @@ class TestAPIEndpoints:
         assert "/persona-classifier/metrics/compute" in routes
 
 
+class TestKeywordMatches:
+    """Tests for the in-memory keyword/title join"""
+    
+    def test_exact_match_counts(self):
+        """Keywords match normalized titles exactly, like the classifier"""
+        from services.persona_classifier_metrics import compute_keyword_matches
+        
+        keywords = [
+            {"keyword": "director de marketing", "buyer_persona_id": "dc_marketing"},
+            {"keyword": "Gerente Médico", "buyer_persona_id": "medico"},
+            {"keyword": "marketing", "buyer_persona_id": "dc_marketing"},
+            {"keyword": "ventas", "buyer_persona_id": "dc_comerciales"}
+        ]
+        histogram = [
+            {"_id": "director de marketing", "count": 40},
+            {"_id": "gerente medico", "count": 7},
+            {"_id": "marketing", "count": 3}
+        ]
+        
+        counts = {r["keyword"]: r["matches"] for r in compute_keyword_matches(keywords, histogram)}
+        
+        assert counts["director de marketing"] == 40
+        assert counts["gerente médico"] == 7
+        # No substring matching: "marketing" only matches the exact title
+        assert counts["marketing"] == 3
+        assert counts["ventas"] == 0
+    
+    def test_covers_all_keywords(self):
+        """Every keyword gets a count (no 50-keyword cap)"""
+        from services.persona_classifier_metrics import compute_keyword_matches
+        
+        keywords = [{"keyword": f"kw {i}", "buyer_persona_id": "x"} for i in range(300)]
+        results = compute_keyword_matches(keywords, [{"_id": "kw 250", "count": 2}])
+        
+        assert len(results) == 300
+        assert sum(r["matches"] for r in results) == 2
+    
+    def test_skips_empty_keywords(self):
+        from services.persona_classifier_metrics import compute_keyword_matches
+        
+        results = compute_keyword_matches([{"keyword": ""}, {"keyword": None}], [])
+        assert results == []
+
+
+class TestComputeMetricsQueries:
+    """compute_classifier_metrics should use two aggregations, no per-keyword scans"""
+
+    pytestmark = pytest.mark.asyncio(loop_scope="function")
+    
+    @pytest.fixture
+    def mock_db(self):
+        db = MagicMock()
+        
+        facet_cursor = MagicMock()
+        facet_cursor.to_list = AsyncMock(return_value=[{
+            "by_persona": [
+                {"_id": "dc_marketing", "count": 40},
+                {"_id": "mateo", "count": 60},
+                {"_id": None, "count": 5}
+            ],
+            "flags": [{
+                "_id": None, "total": 105, "locked": 3, "manually_assigned": 2,
+                "with_job_title": 90, "with_normalized_job_title": 80, "default_persona": 65
+            }]
+        }])
+        histogram_cursor = MagicMock()
+        histogram_cursor.to_list = AsyncMock(return_value=[
+            {"_id": "director de marketing", "count": 40}
+        ])
+        db.unified_contacts.aggregate = MagicMock(side_effect=[facet_cursor, histogram_cursor])
+        db.unified_contacts.count_documents = AsyncMock(return_value=0)
+        
+        keywords_cursor = MagicMock()
+        keywords_cursor.to_list = AsyncMock(return_value=[
+            {"keyword": "director de marketing", "buyer_persona_id": "dc_marketing"},
+            {"keyword": "ventas", "buyer_persona_id": "dc_comerciales"}
+        ])
+        db.job_keywords.find = MagicMock(return_value=keywords_cursor)
+        db.persona_classifier_metrics.find_one = AsyncMock(return_value=None)
+        return db
+    
+    async def test_single_pass_metrics(self, mock_db):
+        from unittest.mock import patch
+        from services import persona_classifier_metrics as metrics_module
+        
+        with patch.object(metrics_module, "db", mock_db):
+            metrics = await metrics_module.compute_classifier_metrics()
+        
+        assert "error" not in metrics
+        assert mock_db.unified_contacts.aggregate.call_count == 2
+        mock_db.unified_contacts.count_documents.assert_not_awaited()
+        
+        assert metrics["contacts"]["total"] == 105
+        assert metrics["contacts"]["by_persona"] == {"dc_marketing": 40, "mateo": 60}
+        assert metrics["contacts"]["locked"] == 3
+        assert metrics["contacts"]["default_persona"] == 65
+        assert metrics["keywords"]["total"] == 2
+        assert metrics["keywords"]["by_persona"] == {"dc_marketing": 1, "dc_comerciales": 1}
+        assert metrics["top_keywords"][0] == {
+            "keyword": "director de marketing", "buyer_persona_id": "dc_marketing", "matches": 40
+        }
+        assert [k["keyword"] for k in metrics["unused_keywords"]] == ["ventas"]
+        assert metrics["coverage"]["classification_percent"] == round(40 / 105 * 100, 2)
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
@@ -14,9 +14,6 @@ from unittest.mock import AsyncMock, MagicMock, patch
 import sys
 import os
 
-# Configure pytest-asyncio
-pytestmark = pytest.mark.asyncio(loop_scope="function")
-
 # Add backend to path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
@@ -146,5 +143,166 @@ class TestAPIEndpoints:
         assert request.locked == True  # Default should lock
 
 
+class FakeCursor:
+    """Async cursor over a list of contacts"""
+    
+    def __init__(self, docs):
+        self._docs = list(docs)
+    
+    def batch_size(self, n):
+        return self
+    
+    def __aiter__(self):
+        self._iter = iter(self._docs)
+        return self
+    
+    async def __anext__(self):
+        try:
+            return next(self._iter)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+class TestJobControl:
+    """Tests for cached cancellation checks"""
+
+    pytestmark = pytest.mark.asyncio(loop_scope="function")
+    
+    @pytest.fixture
+    def mock_db(self):
+        db = MagicMock()
+        db.persona_reclassification_jobs.find_one = AsyncMock(return_value={"status": "processing"})
+        return db
+    
+    async def test_cancel_check_is_cached(self, mock_db):
+        """Status should be read once per N contacts, not per contact"""
+        from services import persona_reclassification_worker as worker
+        
+        with patch.object(worker, "db", mock_db):
+            control = worker.JobControl("job-1", check_every=100, check_interval=3600)
+            for _ in range(250):
+                assert await control.should_stop() is False
+        
+        assert mock_db.persona_reclassification_jobs.find_one.await_count == 2
+        assert control.db_checks == 2
+    
+    async def test_cancel_detected_on_refresh(self, mock_db):
+        from services import persona_reclassification_worker as worker
+        
+        mock_db.persona_reclassification_jobs.find_one = AsyncMock(return_value={"status": "cancelled"})
+        with patch.object(worker, "db", mock_db):
+            control = worker.JobControl("job-1", check_every=10, check_interval=3600)
+            results = [await control.should_stop() for _ in range(10)]
+        
+        assert results[:9] == [False] * 9
+        assert results[9] is True
+    
+    async def test_in_process_cancel_is_immediate(self, mock_db):
+        """cancel_job should flip the flag of a job running in this process"""
+        from services import persona_reclassification_worker as worker
+        
+        mock_db.persona_reclassification_jobs.update_one = AsyncMock(
+            return_value=MagicMock(modified_count=1)
+        )
+        with patch.object(worker, "db", mock_db):
+            control = worker.JobControl("job-1", check_every=10000, check_interval=3600)
+            worker._active_controls["job-1"] = control
+            try:
+                assert await worker.cancel_job("job-1") is True
+                assert await control.should_stop() is True
+            finally:
+                worker._active_controls.pop("job-1", None)
+        
+        mock_db.persona_reclassification_jobs.find_one.assert_not_awaited()
+
+
+class TestProcessJob:
+    """Tests for the reclassification loop"""
+
+    pytestmark = pytest.mark.asyncio(loop_scope="function")
+    
+    @pytest.fixture
+    def mock_db(self):
+        db = MagicMock()
+        contacts = [
+            {"id": f"c{i}", "job_title": "Director de Marketing", "buyer_persona": "mateo"}
+            for i in range(1200)
+        ]
+        db.unified_contacts.count_documents = AsyncMock(return_value=len(contacts))
+        db.unified_contacts.find = MagicMock(return_value=FakeCursor(contacts))
+        db.unified_contacts.bulk_write = AsyncMock()
+        db.persona_reclassification_jobs.find_one = AsyncMock(return_value={"status": "processing"})
+        db.persona_reclassification_jobs.update_one = AsyncMock(
+            return_value=MagicMock(matched_count=1, modified_count=1)
+        )
+        return db
+    
+    async def test_no_per_contact_status_lookups(self, mock_db):
+        from services import persona_reclassification_worker as worker
+        
+        job = {"job_id": "job-1", "job_type": "all", "params": {}, "dry_run": False}
+        track_changes = AsyncMock()
+        with patch.object(worker, "db", mock_db), \
+                patch.object(worker, "track_changes", track_changes), \
+                patch.object(worker, "classify_job_title_simple", AsyncMock(return_value="dc_marketing")):
+            await worker.process_reclassification_job(job)
+        
+        # 1200 contacts: far fewer status reads than contacts
+        assert mock_db.persona_reclassification_jobs.find_one.await_count <= 2
+        # 1200 changes in 500-sized batches
+        assert mock_db.unified_contacts.bulk_write.await_count == 3
+        # Persona counters move once per written batch
+        assert track_changes.await_count == 3
+        assert track_changes.await_args_list[0].args[1][0] == ({"buyer_persona": "mateo"}, {"buyer_persona": "dc_marketing"})
+        
+        final_update = mock_db.persona_reclassification_jobs.update_one.await_args_list[-1]
+        final_set = final_update.args[1]["$set"]
+        assert final_set["status"] == "completed"
+        assert final_set["progress"]["processed"] == 1200
+        assert set(final_set["stats"]) >= {"classify_seconds", "write_seconds", "bulk_writes"}
+        assert final_set["stats"]["bulk_writes"] == 3
+    
+    async def test_progress_cadence_is_configurable(self, mock_db):
+        from services import persona_reclassification_worker as worker
+        
+        job = {
+            "job_id": "job-1", "job_type": "all", "dry_run": True,
+            "params": {"progress_every": 100, "progress_interval": 3600}
+        }
+        with patch.object(worker, "db", mock_db), \
+                patch.object(worker, "classify_job_title_simple", AsyncMock(return_value="mateo")):
+            await worker.process_reclassification_job(job)
+        
+        progress_writes = [
+            c for c in mock_db.persona_reclassification_jobs.update_one.await_args_list
+            if c.args[0].get("status") == "processing"
+        ]
+        assert len(progress_writes) == 12
+        mock_db.unified_contacts.bulk_write.assert_not_awaited()
+    
+    async def test_progress_write_detects_cancellation(self, mock_db):
+        """A progress write that no longer matches means the job was cancelled"""
+        from services import persona_reclassification_worker as worker
+        
+        mock_db.persona_reclassification_jobs.update_one = AsyncMock(
+            return_value=MagicMock(matched_count=0, modified_count=0)
+        )
+        job = {
+            "job_id": "job-1", "job_type": "all", "dry_run": True,
+            "params": {"progress_every": 100, "progress_interval": 3600}
+        }
+        classify = AsyncMock(return_value="mateo")
+        with patch.object(worker, "db", mock_db), \
+                patch.object(worker, "classify_job_title_simple", classify):
+            await worker.process_reclassification_job(job)
+        
+        assert classify.await_count == 100
+        statuses = [
+            c.args[1]["$set"].get("status")
+            for c in mock_db.persona_reclassification_jobs.update_one.await_args_list
+        ]
+        assert "completed" not in statuses
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
@@ -0,0 +1,281 @@
+"""
+Tests for Pipeline Crawler
+
+Validates:
+- Conditional requests (ETag / Last-Modified) and 304 handling
+- Content-hash change detection skips LLM extraction
+- Failed LLM extractions are not cached
+- Per-host politeness (concurrency + delay) and global concurrency
+- Browser fallback on 403
+"""
+
+import asyncio
+import time
+import pytest
+import sys
+import os
+import httpx
+
+# Configure pytest-asyncio
+pytestmark = pytest.mark.asyncio(loop_scope="function")
+
+# Add backend to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+PAGE_HTML = "<html><body>" + "Pembrolizumab Phase 3 oncology. " * 40 + "</body></html>"
+
+
+class FakeCacheCollection:
+    """In-memory stand-in for scraper_url_cache"""
+
+    def __init__(self):
+        self.docs = {}
+
+    async def find_one(self, query, projection=None):
+        doc = self.docs.get(query["url"])
+        return dict(doc) if doc else None
+
+    async def update_one(self, query, update, upsert=False):
+        doc = self.docs.setdefault(query["url"], {})
+        doc.update(update["$set"])
+
+
+class FakeExtractor:
+    """Records LLM calls; returns one medication per page"""
+
+    def __init__(self):
+        self.calls = []
+
+    async def __call__(self, text, url, company_name):
+        self.calls.append(url)
+        return [{"molecula": "Pembrolizumab", "fase": "Phase 3", "empresa": company_name, "source_url": url}]
+
+
+def make_crawler(handler, cache=None, extractor=None, render=None, **kwargs):
+    from services.pipeline_crawler import PipelineCrawler, HostLimiter
+
+    kwargs.setdefault("host_limiter", HostLimiter(concurrency=2, delay=0))
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return PipelineCrawler(
+        extract_text=lambda html: html.replace("<html><body>", "").replace("</body></html>", ""),
+        extract_medications=extractor or FakeExtractor(),
+        render_page=render,
+        client=client,
+        cache_collection=cache if cache is not None else FakeCacheCollection(),
+        **kwargs
+    )
+
+
+class TestChangeDetection:
+    """Tests for ETag / hash based skipping"""
+
+    async def test_first_crawl_extracts_and_stores_validators(self):
+        from services.pipeline_crawler import OUTCOME_CHANGED
+
+        def handler(request):
+            return httpx.Response(200, text=PAGE_HTML, headers={"ETag": '"v1"', "Last-Modified": "Wed, 01 Jan 2025 00:00:00 GMT"})
+
+        cache = FakeCacheCollection()
+        extractor = FakeExtractor()
+        crawler = make_crawler(handler, cache, extractor)
+
+        result = await crawler.crawl_company("Merck", ["https://merck.example/pipeline"])
+
+        assert result.pages[0].outcome == OUTCOME_CHANGED
+        assert len(result.medications) == 1
+        assert crawler.llm_calls == 1
+        cached = cache.docs["https://merck.example/pipeline"]
+        assert cached["etag"] == '"v1"'
+        assert cached["last_modified"] == "Wed, 01 Jan 2025 00:00:00 GMT"
+        assert cached["medications_count"] == 1
+        assert cached["content_hash"]
+
+    async def test_not_modified_skips_download_and_llm(self):
+        from services.pipeline_crawler import OUTCOME_NOT_MODIFIED
+
+        seen_headers = []
+
+        def handler(request):
+            seen_headers.append(dict(request.headers))
+            if request.headers.get("if-none-match") == '"v1"':
+                return httpx.Response(304)
+            return httpx.Response(200, text=PAGE_HTML, headers={"ETag": '"v1"'})
+
+        cache = FakeCacheCollection()
+        extractor = FakeExtractor()
+        await make_crawler(handler, cache, extractor).crawl_company("Merck", ["https://merck.example/p"])
+
+        crawler = make_crawler(handler, cache, extractor)
+        result = await crawler.crawl_company("Merck", ["https://merck.example/p", "https://merck.example/other"])
+
+        assert seen_headers[-1]["if-none-match"] == '"v1"'
+        assert result.pages[0].outcome == OUTCOME_NOT_MODIFIED
+        assert result.skipped_unchanged is True
+        assert result.medications == []
+        assert crawler.llm_calls == 0
+        # Company ended at the unchanged page: second URL never fetched
+        assert len(seen_headers) == 2
+
+    async def test_same_content_hash_skips_llm(self):
+        """Servers that ignore validators still don't trigger re-extraction"""
+        from services.pipeline_crawler import OUTCOME_UNCHANGED
+
+        def handler(request):
+            return httpx.Response(200, text=PAGE_HTML)
+
+        cache = FakeCacheCollection()
+        extractor = FakeExtractor()
+        await make_crawler(handler, cache, extractor).crawl_company("Merck", ["https://merck.example/p"])
+        result = await make_crawler(handler, cache, extractor).crawl_company("Merck", ["https://merck.example/p"])
+
+        assert result.pages[0].outcome == OUTCOME_UNCHANGED
+        assert len(extractor.calls) == 1
+
+    async def test_changed_content_is_extracted_again(self):
+        pages = iter([PAGE_HTML, PAGE_HTML.replace("Phase 3", "Approved")])
+
+        def handler(request):
+            return httpx.Response(200, text=next(pages))
+
+        cache = FakeCacheCollection()
+        extractor = FakeExtractor()
+        await make_crawler(handler, cache, extractor).crawl_company("Merck", ["https://merck.example/p"])
+        result = await make_crawler(handler, cache, extractor).crawl_company("Merck", ["https://merck.example/p"])
+
+        assert len(extractor.calls) == 2
+        assert len(result.medications) == 1
+
+    async def test_failed_extraction_is_retried(self):
+        """An LLM failure is not cached as an empty page"""
+        from services.pipeline_crawler import OUTCOME_ERROR
+
+        def handler(request):
+            return httpx.Response(200, text=PAGE_HTML, headers={"ETag": '"v1"'})
+
+        class FailingExtractor(FakeExtractor):
+            async def __call__(self, text, url, company_name):
+                self.calls.append(url)
+                return None
+
+        cache = FakeCacheCollection()
+        failing = FailingExtractor()
+        result = await make_crawler(handler, cache, failing).crawl_company("Merck", ["https://merck.example/p"])
+
+        assert result.pages[0].outcome == OUTCOME_ERROR
+        assert "https://merck.example/p" not in cache.docs
+
+        extractor = FakeExtractor()
+        result = await make_crawler(handler, cache, extractor).crawl_company("Merck", ["https://merck.example/p"])
+        assert len(extractor.calls) == 1
+        assert len(result.medications) == 1
+
+    async def test_short_page_tries_next_url(self):
+        from services.pipeline_crawler import OUTCOME_TOO_SHORT
+
+        def handler(request):
+            if request.url.path == "/short":
+                return httpx.Response(200, text="<html><body>tiny</body></html>")
+            return httpx.Response(200, text=PAGE_HTML)
+
+        crawler = make_crawler(handler)
+        result = await crawler.crawl_company("Merck", ["https://merck.example/short", "https://merck.example/long"])
+
+        assert [p.outcome for p in result.pages][0] == OUTCOME_TOO_SHORT
+        assert len(result.medications) == 1
+        assert crawler.llm_calls == 1
+
+
+class TestFallback:
+    """Tests for the browser fallback"""
+
+    async def test_403_uses_render_page(self):
+        rendered = []
+
+        async def render(url):
+            rendered.append(url)
+            return "Rendered pipeline " * 50
+
+        def handler(request):
+            return httpx.Response(403)
+
+        crawler = make_crawler(handler, render=render)
+        result = await crawler.crawl_company("Bayer", ["https://blocked.example/p"])
+
+        assert rendered == ["https://blocked.example/p"]
+        assert result.pages[0].rendered is True
+        assert len(result.medications) == 1
+
+
+class TestConcurrency:
+    """Tests for global and per-host limits"""
+
+    async def test_companies_run_concurrently_with_per_host_cap(self):
+        from services.pipeline_crawler import HostLimiter
+
+        in_flight = {}
+        peak = {}
+
+        async def handler(request):
+            host = request.url.host
+            in_flight[host] = in_flight.get(host, 0) + 1
+            peak[host] = max(peak.get(host, 0), in_flight[host])
+            await asyncio.sleep(0.05)
+            in_flight[host] -= 1
+            return httpx.Response(200, text=PAGE_HTML)
+
+        crawler = make_crawler(
+            handler,
+            global_concurrency=8,
+            host_limiter=HostLimiter(concurrency=2, delay=0)
+        )
+        companies = [
+            {"name": f"Company {i}", "urls": [f"https://host{i % 2}.example/p{i}"]}
+            for i in range(8)
+        ]
+
+        started = time.perf_counter()
+        results = await crawler.crawl(companies)
+        elapsed = time.perf_counter() - started
+
+        assert len(results) == 8
+        assert all(len(r.medications) == 1 for r in results)
+        assert peak == {"host0.example": 2, "host1.example": 2}
+        # 4 requests per host, 2 at a time -> ~2 rounds, not 8 sequential
+        assert elapsed < 0.35
+
+    async def test_host_delay_spaces_requests(self):
+        from services.pipeline_crawler import HostLimiter
+
+        limiter = HostLimiter(concurrency=5, delay=0.05)
+        starts = []
+
+        async def hit():
+            async with limiter.slot("https://same.example/x"):
+                starts.append(time.monotonic())
+
+        await asyncio.gather(*(hit() for _ in range(3)))
+
+        gaps = [b - a for a, b in zip(starts, starts[1:])]
+        assert all(gap >= 0.04 for gap in gaps)
+
+    async def test_on_company_done_errors_are_isolated(self):
+        def handler(request):
+            return httpx.Response(200, text=PAGE_HTML)
+
+        async def on_done(result):
+            if result.company_name == "Bad":
+                raise RuntimeError("db down")
+
+        crawler = make_crawler(handler)
+        results = await crawler.crawl(
+            [{"name": "Bad", "urls": ["https://a.example/p"]}, {"name": "Good", "urls": ["https://b.example/p"]}],
+            on_company_done=on_done
+        )
+
+        assert results[0].error == "db down"
+        assert results[1].error is None
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
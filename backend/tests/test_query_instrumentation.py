@@ -0,0 +1,221 @@
+"""
+Tests for Query Instrumentation
+
+Validates:
+- Command events are attributed to the current request via contextvar
+- Commands outside a request are ignored
+- Slow / query-heavy requests land in the ring buffers
+- Middleware emits Server-Timing and records matched route templates only
+"""
+
+import asyncio
+import pytest
+from types import SimpleNamespace
+import sys
+import os
+from unittest.mock import MagicMock
+
+# Add backend to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def make_started(request_id, command_name, command):
+    event = MagicMock()
+    event.request_id = request_id
+    event.command_name = command_name
+    event.command = command
+    event.database_name = "leaderlix"
+    return event
+
+
+def make_finished(request_id, command_name, duration_micros):
+    event = MagicMock()
+    event.request_id = request_id
+    event.command_name = command_name
+    event.duration_micros = duration_micros
+    return event
+
+
+class TestCommandListener:
+    """Tests for command attribution"""
+
+    def test_attributes_commands_to_current_request(self):
+        from services.query_instrumentation import (
+            QueryCommandListener, RequestQueryStats, _current_stats
+        )
+
+        listener = QueryCommandListener()
+        stats = RequestQueryStats()
+        token = _current_stats.set(stats)
+        try:
+            listener.started(make_started(1, "find", {"find": "unified_contacts"}))
+            listener.succeeded(make_finished(1, "find", 2000))
+            listener.started(make_started(2, "find", {"find": "unified_contacts"}))
+            listener.succeeded(make_finished(2, "find", 1000))
+            listener.started(make_started(3, "getMore", {"getMore": 99, "collection": "cases"}))
+            listener.failed(make_finished(3, "getMore", 500))
+        finally:
+            _current_stats.reset(token)
+
+        assert stats.query_count == 3
+        assert stats.db_time_ms == pytest.approx(3.5)
+        breakdown = {row["collection"]: row for row in stats.breakdown()}
+        assert breakdown["unified_contacts"]["count"] == 2
+        assert breakdown["unified_contacts"]["time_ms"] == pytest.approx(3.0)
+        assert breakdown["unified_contacts"]["commands"] == {"find": 2}
+        assert breakdown["cases"]["commands"] == {"getMore": 1}
+
+    def test_ignores_commands_outside_requests(self):
+        from services.query_instrumentation import QueryCommandListener, get_current_stats
+
+        listener = QueryCommandListener()
+        assert get_current_stats() is None
+        # Should not raise
+        listener.started(make_started(1, "find", {"find": "unified_contacts"}))
+        listener.succeeded(make_finished(1, "find", 2000))
+
+    def test_ignores_driver_housekeeping(self):
+        from services.query_instrumentation import (
+            QueryCommandListener, RequestQueryStats, _current_stats
+        )
+
+        listener = QueryCommandListener()
+        stats = RequestQueryStats()
+        token = _current_stats.set(stats)
+        try:
+            listener.started(make_started(1, "hello", {"hello": 1}))
+            listener.started(make_started(2, "ping", {"ping": 1}))
+        finally:
+            _current_stats.reset(token)
+
+        assert stats.query_count == 0
+
+
+class TestSlowRequestLog:
+    """Tests for ring buffers and alerts"""
+
+    def _stats(self, queries):
+        from services.query_instrumentation import RequestQueryStats
+
+        stats = RequestQueryStats()
+        for i in range(queries):
+            stats.command_started(i, "find", "unified_contacts")
+            stats.command_finished(i, 100)
+        return stats
+
+    def test_fast_cheap_requests_are_not_logged(self):
+        from services.query_instrumentation import SlowRequestLog
+
+        log = SlowRequestLog(slow_ms=500, query_threshold=10, size=5)
+        log.record("GET", "/api/contacts", "/api/contacts", 200, 20, self._stats(3))
+
+        assert len(log.slow_requests) == 0
+        assert len(log.alerts) == 0
+        assert log.route_summary()[0]["requests"] == 1
+
+    def test_query_threshold_alert(self):
+        from services.query_instrumentation import SlowRequestLog
+
+        log = SlowRequestLog(slow_ms=500, query_threshold=10, size=5)
+        log.record("GET", "/api/todays-focus/x", "/api/todays-focus/x", 200, 20, self._stats(11))
+
+        assert len(log.alerts) == 1
+        assert log.alerts[0]["query_count"] == 11
+        assert log.alerts[0]["queries"][0]["collection"] == "unified_contacts"
+        assert log.route_summary()[0]["alerts"] == 1
+
+    def test_ring_buffer_is_bounded(self):
+        from services.query_instrumentation import SlowRequestLog
+
+        log = SlowRequestLog(slow_ms=10, query_threshold=1000, size=3)
+        for i in range(10):
+            log.record("GET", f"/r{i}", f"/r{i}", 200, 50, self._stats(1))
+
+        assert len(log.slow_requests) == 3
+        assert log.slow_requests[-1]["route"] == "/r9"
+
+
+class TestMiddleware:
+    """Tests for the ASGI middleware"""
+
+    pytestmark = pytest.mark.asyncio(loop_scope="function")
+
+    async def test_server_timing_and_route_template(self):
+        from services.query_instrumentation import (
+            QueryInstrumentationMiddleware, SlowRequestLog, get_current_stats
+        )
+
+        async def app(scope, receive, send):
+            # Simulate the router matching a route and a query
+            scope["path_params"] = {"case_id": "abc-123"}
+            scope["route"] = SimpleNamespace(path="/api/cases/{case_id}")
+            stats = get_current_stats()
+            stats.command_started(1, "find", "cases")
+            stats.command_finished(1, 1500)
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+            await send({"type": "http.response.body", "body": b"{}"})
+
+        log = SlowRequestLog(slow_ms=0, query_threshold=100, size=10)
+        middleware = QueryInstrumentationMiddleware(app, log=log)
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {"type": "http", "method": "GET", "path": "/api/cases/abc-123"}
+        await middleware(scope, None, send)
+
+        headers = dict(sent[0]["headers"])
+        assert headers[b"server-timing"].startswith(b'db;dur=1.5;desc="1 queries"')
+        assert log.slow_requests[0]["route"] == "/api/cases/{case_id}"
+        assert log.slow_requests[0]["status_code"] == 200
+        # Context is cleared after the request
+        assert get_current_stats() is None
+
+    async def test_unmatched_paths_are_not_recorded(self):
+        from services.query_instrumentation import QueryInstrumentationMiddleware, SlowRequestLog
+
+        async def not_found(scope, receive, send):
+            await send({"type": "http.response.start", "status": 404, "headers": []})
+            await send({"type": "http.response.body", "body": b""})
+
+        async def send(message):
+            pass
+
+        log = SlowRequestLog(slow_ms=0, query_threshold=100, size=10)
+        middleware = QueryInstrumentationMiddleware(not_found, log=log)
+        for n in range(5):
+            await middleware({"type": "http", "method": "GET", "path": f"/api/scan/{n}"}, None, send)
+        assert not log.routes and not log.slow_requests
+
+    async def test_concurrent_requests_are_isolated(self):
+        from services.query_instrumentation import (
+            QueryInstrumentationMiddleware, SlowRequestLog, get_current_stats
+        )
+
+        async def app(scope, receive, send):
+            n = int(scope["path"].rsplit("/", 1)[1])
+            scope["route"] = SimpleNamespace(path="/n/{n}")
+            for i in range(n):
+                get_current_stats().command_started(i, "find", "x")
+                await asyncio.sleep(0)
+                get_current_stats().command_finished(i, 10)
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+
+        log = SlowRequestLog(slow_ms=0, query_threshold=100, size=10)
+        middleware = QueryInstrumentationMiddleware(app, log=log)
+
+        async def send(message):
+            pass
+
+        await asyncio.gather(
+            middleware({"type": "http", "method": "GET", "path": "/n/3"}, None, send),
+            middleware({"type": "http", "method": "GET", "path": "/n/7"}, None, send),
+        )
+
+        counts = sorted(entry["query_count"] for entry in log.slow_requests)
+        assert counts == [3, 7]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,224 @@
+"""
+Tests for the public response cache
+
+Runs a small FastAPI app behind ResponseCacheMiddleware through
+httpx.ASGITransport. Validates:
+- Public GETs are served from the cache, keyed by path + sorted query
+- Strong ETag + Cache-Control, 304 on If-None-Match
+- Namespace invalidation from write endpoints and TTL expiry
+- Non-public routes, errors and Set-Cookie responses are never stored
+- Per-route hit ratios
+"""
+
+import pytest
+import sys
+import os
+import httpx
+from fastapi import FastAPI, Response
+
+# Configure pytest-asyncio
+pytestmark = pytest.mark.asyncio(loop_scope="function")
+
+# Add backend to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def make_client(max_entries=100):
+    from services.response_cache import ResponseCache, ResponseCacheMiddleware
+
+    cache = ResponseCache(max_entries=max_entries)
+    calls = {"posts": 0, "private": 0, "courses": 0}
+    state = {"title": "Hola"}
+    app = FastAPI()
+
+    @app.get("/api/blog/public/posts")
+    async def public_posts(lang: str = "es", limit: int = 12):
+        calls["posts"] += 1
+        return {"posts": [state["title"]], "lang": lang, "limit": limit}
+
+    @app.put("/api/blog/posts/{post_id}")
+    async def update_post(post_id: str):
+        state["title"] = "Adiós"
+        cache.invalidate("blog")
+        return {"success": True}
+
+    @app.get("/api/lms/public/courses/{course_id}")
+    async def public_course(course_id: str):
+        calls["courses"] += 1
+        if course_id == "missing":
+            return Response(status_code=404)
+        return {"id": course_id}
+
+    @app.get("/api/blog/posts")
+    async def private_posts():
+        calls["private"] += 1
+        return {"posts": []}
+
+    @app.get("/api/public/testimonials")
+    async def testimonials(response: Response):
+        response.set_cookie("session", "x")
+        return {"testimonials": []}
+
+    app.add_middleware(ResponseCacheMiddleware, cache=cache)
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+    return client, cache, calls
+
+
+class TestCaching:
+    """Tests for cache hits, keys and headers"""
+
+    async def test_second_request_is_served_from_cache(self):
+        client, _, calls = make_client()
+
+        first = await client.get("/api/blog/public/posts?lang=es")
+        second = await client.get("/api/blog/public/posts?lang=es")
+
+        assert calls["posts"] == 1
+        assert first.headers["x-cache"] == "MISS"
+        assert second.headers["x-cache"] == "HIT"
+        assert second.json() == first.json()
+        assert second.headers["etag"] == first.headers["etag"]
+        assert second.headers["cache-control"] == "public, max-age=60"
+        assert int(second.headers["content-length"]) == len(second.content)
+
+    async def test_query_order_does_not_matter_but_values_do(self):
+        client, _, calls = make_client()
+
+        await client.get("/api/blog/public/posts?lang=en&limit=5")
+        await client.get("/api/blog/public/posts?limit=5&lang=en")
+        assert calls["posts"] == 1
+
+        await client.get("/api/blog/public/posts?lang=es&limit=5")
+        assert calls["posts"] == 2
+
+    async def test_if_none_match_returns_304(self):
+        client, cache, _ = make_client()
+
+        first = await client.get("/api/blog/public/posts")
+        revalidated = await client.get("/api/blog/public/posts", headers={"If-None-Match": first.headers["etag"]})
+        stale = await client.get("/api/blog/public/posts", headers={"If-None-Match": '"other"'})
+
+        assert revalidated.status_code == 304
+        assert revalidated.content == b""
+        assert revalidated.headers["etag"] == first.headers["etag"]
+        assert stale.status_code == 200
+        assert cache.summary()["routes"][0]["not_modified"] == 1
+
+    async def test_head_uses_cached_entry_without_body(self):
+        client, _, calls = make_client()
+
+        get = await client.get("/api/blog/public/posts")
+        head = await client.head("/api/blog/public/posts")
+
+        assert calls["posts"] == 1
+        assert head.status_code == 200
+        assert head.content == b""
+        assert head.headers["etag"] == get.headers["etag"]
+
+
+class TestInvalidation:
+    """Tests for write invalidation and expiry"""
+
+    async def test_write_endpoint_invalidates_namespace(self):
+        client, cache, calls = make_client()
+
+        before = await client.get("/api/blog/public/posts")
+        await client.put("/api/blog/posts/p1")
+        after = await client.get("/api/blog/public/posts")
+
+        assert calls["posts"] == 2
+        assert after.json()["posts"] == ["Adiós"]
+        assert after.headers["etag"] != before.headers["etag"]
+        assert cache.summary()["invalidations"] == {"blog": 1}
+
+    async def test_invalidation_keeps_other_namespaces(self):
+        client, cache, calls = make_client()
+
+        await client.get("/api/lms/public/courses/c1")
+        cache.invalidate("blog")
+        await client.get("/api/lms/public/courses/c1")
+
+        assert calls["courses"] == 1
+
+    async def test_expired_entry_is_recomputed(self):
+        client, cache, calls = make_client()
+
+        await client.get("/api/blog/public/posts")
+        for entry in cache.entries.values():
+            entry.expires_at = 0
+        await client.get("/api/blog/public/posts")
+
+        assert calls["posts"] == 2
+
+    async def test_response_computed_before_invalidation_is_not_stored(self):
+        from services.response_cache import CachedResponse
+
+        _, cache, _ = make_client()
+        generation = cache.generation("blog")
+        cache.invalidate("blog")
+        cache.put("/api/blog/public/posts", CachedResponse("blog", "/api/blog/public/posts", b"{}", [], '"x"', 1e12), generation)
+
+        assert cache.entries == {}
+
+    async def test_lru_bound(self):
+        client, cache, _ = make_client(max_entries=2)
+
+        for course_id in ("a", "b", "c"):
+            await client.get(f"/api/lms/public/courses/{course_id}")
+
+        assert list(cache.entries) == ["/api/lms/public/courses/b", "/api/lms/public/courses/c"]
+
+
+class TestBypass:
+    """Tests for responses that must not be cached"""
+
+    async def test_non_public_route_passes_through(self):
+        client, cache, calls = make_client()
+
+        response = await client.get("/api/blog/posts")
+        await client.get("/api/blog/posts")
+
+        assert calls["private"] == 2
+        assert "etag" not in response.headers
+        assert cache.summary()["routes"] == []
+
+    async def test_errors_are_not_cached(self):
+        client, _, calls = make_client()
+
+        first = await client.get("/api/lms/public/courses/missing")
+        await client.get("/api/lms/public/courses/missing")
+
+        assert first.status_code == 404
+        assert calls["courses"] == 2
+
+    async def test_set_cookie_responses_are_not_cached(self):
+        client, cache, _ = make_client()
+
+        response = await client.get("/api/public/testimonials")
+
+        assert response.status_code == 200
+        assert "set-cookie" in response.headers
+        assert cache.entries == {}
+
+
+class TestStats:
+    """Tests for per-route hit ratios"""
+
+    async def test_hit_ratio_per_route(self):
+        client, cache, _ = make_client()
+
+        for _ in range(4):
+            await client.get("/api/blog/public/posts")
+        await client.get("/api/lms/public/courses/a")
+        await client.get("/api/lms/public/courses/b")
+
+        routes = {r["route"]: r for r in cache.summary()["routes"]}
+        assert routes["/api/blog/public/posts"]["hits"] == 3
+        assert routes["/api/blog/public/posts"]["hit_ratio"] == 0.75
+        # Path params fold into the rule's route
+        assert routes["/api/lms/public/"]["misses"] == 2
+        assert routes["/api/lms/public/"]["hit_ratio"] == 0.0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,261 @@
+"""
+Tests for the shared rule evaluation context
+
+Runs email and WhatsApp queue generation against an in-memory MongoDB
+(mongomock-motor). Validates:
+- The context indexes registrants, personas, quotes and cases once
+- Email rule evaluation matches the per-rule criteria
+- Several email rules share one scan of unified_contacts
+- WhatsApp generation uses the context, one contact scan for all rules
+  and batched queue / snooze checks
+"""
+
+import pytest
+import sys
+import os
+from datetime import datetime, timezone, timedelta
+
+# Configure pytest-asyncio
+pytestmark = pytest.mark.asyncio(loop_scope="function")
+
+# Add backend to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def day(offset):
+    return (datetime.now(timezone.utc) + timedelta(days=offset)).strftime("%Y-%m-%d")
+
+
+def ago(days):
+    return (datetime.now(timezone.utc) - timedelta(days=days)).isoformat()
+
+
+@pytest.fixture
+def mock_db(monkeypatch):
+    from mongomock_motor import AsyncMongoMockClient
+    import services.rule_context as rule_context
+    import routers.email_rules as email_rules
+    import routers.whatsapp_rules as whatsapp_rules
+    import services.stats_counters as stats_counters
+
+    database = AsyncMongoMockClient()["leaderlix_test"]
+    for module in (rule_context, email_rules, whatsapp_rules, stats_counters):
+        monkeypatch.setattr(module, "db", database)
+    return database
+
+
+@pytest.fixture
+def scans(monkeypatch):
+    """Count unified_contacts scans made by the email rules"""
+    import routers.email_rules as email_rules
+
+    calls = []
+    original = email_rules.iter_contacts
+
+    def counting(query, projection, **kwargs):
+        calls.append(query)
+        return original(query, projection, **kwargs)
+
+    monkeypatch.setattr(email_rules, "iter_contacts", counting)
+    return calls
+
+
+async def seed(database):
+    await database.webinar_events_v2.insert_many([
+        {"id": "w-late", "name": "Tarde", "webinar_date": day(20), "webinar_time": "10:00",
+         "buyer_personas": ["Directores"], "registrants": [{"email": "Reg@cliente.com", "name": "R"}]},
+        {"id": "w-soon", "name": "Pronto", "webinar_date": day(5), "webinar_time": "11:00",
+         "buyer_personas": [" directores ", "RRHH"], "registrants": []},
+        {"id": "w-past", "name": "Pasado", "webinar_date": day(-10), "webinar_time": "10:00", "registrants": []},
+    ])
+    await database.quotes.insert_many([
+        {"client_email": "Quote@cliente.com", "created_at": "2026-01-01", "status": "sent"},
+        {"client_email": "quote@cliente.com", "created_at": "2026-02-01", "status": "sent"},
+        {"client_email": "cancel@cliente.com", "created_at": "2026-02-01", "status": "cancelled"},
+    ])
+    await database.cases.insert_many([
+        {"id": "k1", "name": "Caso 1", "status": "active", "stage": "ganados", "company_names": ["Acme"],
+         "contact_ids": ["coachee"], "quotes": []},
+        {"id": "k2", "name": "Caso 2", "status": "active", "stage": "caso_presentado", "company_names": ["Beta"],
+         "contact_ids": ["dm"], "quotes": [{"title": "Q", "source": "hubspot_native"}]},
+        {"id": "k3", "name": "Caso 3", "status": "descartado", "stage": "ganados", "contact_ids": ["otro"]},
+    ])
+    await database.unified_contacts.insert_many([
+        {"id": "lead", "name": "Lead", "email": "lead@cliente.com", "stage": 1, "buyer_persona": "Directores"},
+        {"id": "registered", "name": "Reg", "email": "reg@cliente.com", "stage": 2, "buyer_persona": "directores",
+         "webinar_history": [{"event_id": "w-late", "status": "registered"}]},
+        {"id": "recent", "name": "Reciente", "email": "recent@cliente.com", "stage": 1, "buyer_persona": "RRHH",
+         "last_email_e1_sent": ago(1)},
+        {"id": "quoted", "name": "Quote", "email": "quote@cliente.com", "stage": 3},
+        {"id": "coachee", "name": "Coachee", "email": "coachee@cliente.com", "stage": 4, "roles": ["coachee"],
+         "phone": "+5215500000001"},
+        {"id": "dm", "name": "DM", "email": "dm@cliente.com", "stage": 3, "phone": "+5215500000002"},
+        {"id": "imported", "name": "Imp", "email": "imp@cliente.com", "stage": 2,
+         "webinar_history": [{"event_id": "w-soon", "status": "registered", "registered_at": ago(1), "source": "csv_import"}],
+         "last_email_e07_sent": {"w-soon": ago(1)}},
+    ])
+    return database
+
+
+class TestContext:
+    """Tests for the loaded snapshot"""
+
+    async def test_indexes(self, mock_db):
+        from services.rule_context import RuleEvaluationContext
+
+        ctx = await RuleEvaluationContext.load()
+
+        assert [w["id"] for w in ctx.future_webinars] == []
+        await seed(mock_db)
+        ctx = await RuleEvaluationContext.load()
+
+        assert [w["id"] for w in ctx.future_webinars] == ["w-soon", "w-late"]
+        assert "registrants" not in ctx.future_webinars[0]
+        assert ctx.registered_emails == {"reg@cliente.com"}
+        assert [w["id"] for w in ctx.webinars_for_persona("DIRECTORES")] == ["w-soon", "w-late"]
+        assert set(ctx.past_webinars_by_id) == {"w-past"}
+        assert ctx.quote_by_email == {"quote@cliente.com": "2026-02-01"}
+        assert ctx.contacts_in_cases() == {"coachee", "dm"}
+        assert ctx.contacts_in_cases(with_quotes=True) == {"dm"}
+        assert [c["id"] for c in ctx.contact_cases("coachee", ["ganados"])] == ["k1"]
+
+    async def test_cadence(self):
+        from services.rule_context import RuleEvaluationContext
+
+        ctx = RuleEvaluationContext()
+
+        assert ctx.cadence_ok({}, "last_email_e1_sent", 7)
+        assert ctx.cadence_ok({"last_email_e1_sent": ago(8)}, "last_email_e1_sent", 7)
+        assert not ctx.cadence_ok({"last_email_e1_sent": ago(2)}, "last_email_e1_sent", 7)
+
+
+class TestEmailRules:
+    """Tests for email rule evaluation"""
+
+    async def test_rule_criteria(self, mock_db):
+        from routers.email_rules import get_eligible_contacts_for_rule
+
+        await seed(mock_db)
+
+        e01 = await get_eligible_contacts_for_rule("E01")
+        assert [(c["contact_id"], c["webinar_id"]) for c in e01] == [("lead", "w-soon")]
+        assert [c["contact_id"] for c in await get_eligible_contacts_for_rule("E02")] == ["quoted"]
+        assert [c["contact_id"] for c in await get_eligible_contacts_for_rule("E03")] == ["coachee"]
+        e06 = await get_eligible_contacts_for_rule("E06")
+        assert [(c["contact_id"], c["webinar_name"]) for c in e06] == [("imported", "Pronto")]
+        # E7 already sent for w-soon; the registered contact gets one reminder for w-late
+        e07 = await get_eligible_contacts_for_rule("E07")
+        assert [(c["contact_id"], c["webinar_id"]) for c in e07] == [("registered", "w-late")]
+
+    async def test_all_rules_share_one_scan(self, mock_db, scans):
+        from routers.email_rules import get_eligible_contacts_for_rules
+
+        await seed(mock_db)
+
+        results = await get_eligible_contacts_for_rules(["E01", "E02", "E03", "E04", "E05", "E06", "E07"])
+
+        assert len(scans) == 1
+        assert {rule: len(found) for rule, found in results.items()} == {
+            "E01": 1, "E02": 1, "E03": 1, "E04": 0, "E05": 0, "E06": 1, "E07": 1
+        }
+
+    async def test_limit_per_rule(self, mock_db):
+        from routers.email_rules import get_eligible_contacts_for_rules
+
+        await mock_db.quotes.insert_many([{"client_email": f"q{i}@cliente.com", "created_at": "x"} for i in range(5)])
+        await mock_db.unified_contacts.insert_many([
+            {"id": f"q{i}", "name": "Q", "email": f"q{i}@cliente.com", "stage": 3} for i in range(5)
+        ])
+
+        results = await get_eligible_contacts_for_rules(["E02"], limit=2)
+
+        assert len(results["E02"]) == 2
+
+    async def test_cleanup_uses_batched_lookup(self, mock_db):
+        from routers.email_rules import cleanup_email_queue
+
+        await seed(mock_db)
+        await mock_db.email_queue.insert_many([
+            {"rule": "E03", "status": "pending", "contact_id": "coachee"},
+            {"rule": "E03", "status": "pending", "contact_id": "dm"},
+            {"rule": "E05", "status": "pending", "contact_id": "gone"},
+        ])
+
+        assert await cleanup_email_queue() == 2
+        assert [i["contact_id"] async for i in mock_db.email_queue.find({})] == ["coachee"]
+
+
+class TestWhatsAppRules:
+    """Tests for WhatsApp queue generation"""
+
+    async def test_generate_queue(self, mock_db):
+        from routers.whatsapp_rules import generate_whatsapp_queue
+
+        await seed(mock_db)
+        await mock_db.whatsapp_rules.insert_many([
+            {"id": "W10", "enabled": True, "trigger_type": "dealmaker_propuesta"},
+            {"id": "W12", "enabled": True, "trigger_type": "student_coaching"},
+        ])
+        await mock_db.whatsapp_queue.insert_many([
+            {"rule": "W12", "status": "pending", "contact_id": "dm", "generated_date": "2020-01-01"},
+        ])
+        await mock_db.unified_contacts.update_one(
+            {"id": "dm"}, {"$set": {"whatsapp_snoozed_w10": (datetime.now(timezone.utc) + timedelta(days=3)).isoformat()}}
+        )
+
+        result = await generate_whatsapp_queue(current_user={})
+
+        items = {(i["rule"], i["contact_id"]): i async for i in mock_db.whatsapp_queue.find({}, {"_id": 0})}
+        # dm is snoozed for W10 and was removed from W12 by the cleanup
+        assert set(items) == {("W12", "coachee")}
+        assert items[("W12", "coachee")]["metadata"]["case_name"] == "Caso 1"
+        assert items[("W12", "coachee")]["metadata"]["company"] == "Acme"
+        assert result["generated_count"] == 1
+
+
+    async def test_contact_rules_share_one_scan(self, mock_db, monkeypatch):
+        import routers.whatsapp_rules as whatsapp_rules
+        from routers.whatsapp_rules import generate_whatsapp_queue
+
+        scans = []
+        original = whatsapp_rules.iter_contacts
+
+        def counting(query, projection, **kwargs):
+            scans.append(query)
+            return original(query, projection, **kwargs)
+
+        monkeypatch.setattr(whatsapp_rules, "iter_contacts", counting)
+        await seed(mock_db)
+        await mock_db.unified_contacts.insert_many([
+            {"id": "alum", "name": "Alum", "email": "alum@cliente.com", "stage": 5, "phone": "+5215500000003"},
+            {"id": "alum-recent", "name": "Alum 2", "email": "alum2@cliente.com", "stage": 5,
+             "last_contacted_whatsapp": ago(10)},
+            {"id": "alum-staff", "name": "Staff", "email": "staff@Leaderlix.com", "stage": 5},
+            {"id": "nurture", "name": "Nurture", "email": "n@cliente.com", "stage": 2, "phone": "+5215500000004",
+             "webinar_history": [{"event_id": "w-soon"}, {"event_id": "w-past"}]},
+            {"id": "nurture-future", "name": "Future", "email": "f@cliente.com", "stage": 2, "phone": "+5215500000005",
+             "webinar_history": [{"event_id": "w-soon"}], "last_whatsapp_w14_sent": ago(20)},
+        ])
+        await mock_db.whatsapp_rules.insert_many([
+            {"id": "W10", "enabled": True, "trigger_type": "dealmaker_propuesta"},
+            {"id": "W12", "enabled": True, "trigger_type": "student_coaching"},
+            {"id": "W13", "enabled": True, "trigger_type": "alumni_checkin"},
+            {"id": "W14", "enabled": True, "trigger_type": "nurturing_post_webinar"},
+        ])
+
+        result = await generate_whatsapp_queue(current_user={})
+
+        assert len(scans) == 1
+        items = {(i["rule"], i["contact_id"]): i async for i in mock_db.whatsapp_queue.find({}, {"_id": 0})}
+        assert set(items) == {("W10", "dm"), ("W12", "coachee"), ("W13", "alum"), ("W14", "nurture")}
+        assert items[("W10", "dm")]["metadata"]["case_name"] == "Caso 2"
+        assert items[("W14", "nurture")]["metadata"]["last_webinar"] == "Pasado"
+        assert result["generated_count"] == 4
+
+        # Already generated today: no new scan
+        await generate_whatsapp_queue(current_user={})
+        assert len(scans) == 1
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
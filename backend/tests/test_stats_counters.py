@@ -0,0 +1,183 @@
+"""
+Tests for counter-backed dashboard statistics
+
+Runs services/stats_counters.py and the stats endpoints against an in-memory
+MongoDB (mongomock-motor). Validates:
+- Reconciliation rebuilds field, email outcome and daily counters
+- Increments made while reconciling are kept
+- All-time email totals survive email_logs expiry
+- track_change / track_changes move counters on insert / update / delete
+- Contact write paths keep the counters in step
+- Dashboards read the counters (built on first view) and report their age
+"""
+
+import pytest
+import sys
+import os
+from datetime import datetime, timezone, timedelta
+
+# Configure pytest-asyncio
+pytestmark = pytest.mark.asyncio(loop_scope="function")
+
+# Add backend to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+USER = {"email": "admin@leaderlix.com"}
+NOW = datetime.now(timezone.utc)
+TODAY = NOW.date().isoformat()
+
+
+@pytest.fixture
+def mock_db(monkeypatch):
+    from mongomock_motor import AsyncMongoMockClient
+    import services.stats_counters as stats_counters
+    import services.email_queue as email_queue
+    import routers.contacts as contacts
+
+    database = AsyncMongoMockClient()["leaderlix_test"]
+    for module in (stats_counters, email_queue, contacts):
+        monkeypatch.setattr(module, "db", database)
+    return database
+
+
+async def seed(database):
+    await database.unified_contacts.insert_many([
+        {"id": "a", "stage": 1, "status": "active", "source": "hubspot", "buyer_persona": "mateo"},
+        {"id": "b", "stage": 1, "status": "active", "source": "", "buyer_persona": ""},
+        {"id": "c", "stage": 3, "source": "linkedin", "buyer_persona": "ramona"},
+    ])
+    await database.email_logs.insert_many([
+        {"id": "l1", "sent_at": NOW, "opened": True, "opened_at": NOW.isoformat()},
+        {"id": "l2", "sent_at": (NOW - timedelta(days=1)).isoformat(), "clicked": True, "clicked_at": NOW},
+        {"id": "l3", "sent_at": NOW - timedelta(days=400)},
+    ])
+    await database.email_queue.insert_many([
+        {"id": "q1", "rule": "E1", "status": "pending"},
+        {"id": "q2", "rule": "E1", "status": "sent", "sent_at": NOW},
+        {"id": "q3", "rule": "E2", "status": "sent", "sent_at": NOW.isoformat()},
+    ])
+
+
+class TestReconcile:
+    """Tests for reconcile_counters"""
+
+    async def test_rebuilds_counters(self, mock_db):
+        from services.stats_counters import reconcile_counters, get_counters, get_daily_counters, increment
+
+        await seed(mock_db)
+        await increment("unified_contacts", "stage", "9", 5)  # Drift to be corrected
+
+        await reconcile_counters()
+
+        assert await get_counters("unified_contacts", "stage") == {"1": 2, "3": 1}
+        assert await get_counters("unified_contacts", "status") == {"active": 2, "": 1}
+        assert await get_counters("unified_contacts", "source") == {"hubspot": 1, "": 1, "linkedin": 1}
+        assert await get_counters("email_logs", "outcome") == {"sent": 3, "opened": 1, "clicked": 1}
+        daily = await get_daily_counters("email_logs", "outcome", since=(NOW - timedelta(days=7)).date().isoformat())
+        assert daily[TODAY] == {"sent": 1, "opened": 1, "clicked": 1}
+        assert sum(daily[(NOW - timedelta(days=1)).date().isoformat()].values()) == 1
+        assert await get_counters("email_queue", "sent_by_rule", day=TODAY) == {"E1": 1, "E2": 1}
+
+    async def test_keeps_increments_made_while_reconciling(self, mock_db, monkeypatch):
+        import services.stats_counters as stats_counters
+        from services.stats_counters import reconcile_counters, get_counters, track_change
+
+        await seed(mock_db)
+        await reconcile_counters()
+        field_counts = stats_counters._field_counts
+
+        async def recount_then_write(scope, field):
+            counts = await field_counts(scope, field)
+            if field == "stage":
+                # A contact created after the recount, before the counters are written
+                contact = {"id": "d", "stage": 2}
+                await mock_db.unified_contacts.insert_one(dict(contact))
+                await track_change("unified_contacts", None, contact)
+            return counts
+
+        monkeypatch.setattr(stats_counters, "_field_counts", recount_then_write)
+        await reconcile_counters(["unified_contacts"])
+
+        assert await get_counters("unified_contacts", "stage") == {"1": 2, "2": 1, "3": 1}
+
+    async def test_all_time_email_totals_survive_log_expiry(self, mock_db):
+        from services.stats_counters import reconcile_counters, get_counters
+
+        await seed(mock_db)
+        await reconcile_counters()
+        # TTL index removes the oldest log
+        await mock_db.email_logs.delete_one({"id": "l3"})
+        await reconcile_counters()
+
+        assert await get_counters("email_logs", "outcome") == {"sent": 3, "opened": 1, "clicked": 1}
+
+    async def test_track_changes_batch(self, mock_db):
+        from services.stats_counters import track_changes, get_counters
+
+        await track_changes("unified_contacts", [
+            (None, {"stage": 1, "buyer_persona": "mateo"}),
+            (None, {"stage": 1, "buyer_persona": "mateo"}),
+            ({"buyer_persona": "mateo"}, {"buyer_persona": "ramona"}),
+        ])
+
+        assert await get_counters("unified_contacts", "stage") == {"1": 2}
+        assert await get_counters("unified_contacts", "buyer_persona") == {"mateo": 1, "ramona": 1}
+        assert await get_counters("unified_contacts", "status") == {"": 2}
+
+    async def test_track_change(self, mock_db):
+        from services.stats_counters import track_change, get_counters
+
+        await track_change("unified_contacts", None, {"stage": 1, "source": "manual"})
+        await track_change("unified_contacts", None, {"stage": 1})
+        await track_change("unified_contacts", {"stage": 1, "source": "manual"}, {"stage": 2, "name": "X"})
+        await track_change("unified_contacts", {"stage": 1}, None)
+
+        assert await get_counters("unified_contacts", "stage") == {"2": 1}
+        assert await get_counters("unified_contacts", "source") == {"manual": 1}
+
+
+class TestEndpoints:
+    """Dashboards and write paths"""
+
+    async def test_contact_stats_follow_writes(self, mock_db):
+        from routers.contacts import get_contact_stats, update_contact_stage, delete_contact, get_distinct_sources
+
+        await seed(mock_db)
+
+        stats = await get_contact_stats(current_user=USER)
+        assert stats["total"] == 3 and stats["by_stage"] == {"1": 2, "2": 0, "3": 1, "4": 0, "5": 0}
+        assert stats["by_status"] == {"active": 2, "unknown": 1}
+        assert stats["by_persona"] == {"mateo": 1, "ramona": 1}
+        assert stats["counters"]["reconciled_at"] is not None
+        assert stats["counters"]["reconcile_interval_minutes"] > 0
+
+        await update_contact_stage("a", 4, current_user=USER)
+        await delete_contact("c", current_user=USER)
+
+        stats = await get_contact_stats(current_user=USER)
+        assert stats["total"] == 2 and stats["by_stage"]["1"] == 1 and stats["by_stage"]["4"] == 1
+        assert stats["by_persona"] == {"mateo": 1}
+        sources = await get_distinct_sources(current_user=USER)
+        assert sources["source_counts"] == {"hubspot": 1, "null": 1}
+
+    async def test_queue_stats(self, mock_db):
+        from services.email_queue import email_queue
+
+        await seed(mock_db)
+
+        stats = await email_queue.get_queue_stats()
+        assert stats["pending"] == 1 and stats["sent_today"] == 2 and stats["by_rule"] == {"E1": 1, "E2": 1}
+
+        email_id = await email_queue.add_to_queue(
+            rule="E3", contact_id="a", contact_email="a@x.com", contact_name="A", subject="S", body_html="<p>B</p>"
+        )
+        assert await email_queue.cancel_email(email_id)
+        await email_queue.add_to_queue(
+            rule="E3", contact_id="a", contact_email="a@x.com", contact_name="A", subject="S", body_html="<p>B</p>"
+        )
+
+        assert (await email_queue.get_queue_stats())["pending"] == 2
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
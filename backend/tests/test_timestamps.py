@@ -0,0 +1,153 @@
+"""
+Tests for hot timestamp fields stored as BSON dates
+
+Runs utils/timestamps.py and services/timestamp_migration.py against an
+in-memory MongoDB (mongomock-motor). Validates:
+- Parsing of ISO strings ("Z", offsets, date-only) and datetimes
+- Range queries match both BSON dates and legacy ISO strings
+- Cadence queries work on collections with mixed representations
+- The migration converts strings in batches, including webinar_history
+- TTL indexes are created for queue and log data
+"""
+
+import pytest
+import sys
+import os
+from datetime import datetime, timezone, timedelta
+
+# Add backend to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+NOW = datetime.now(timezone.utc)
+
+
+def ago(days):
+    return NOW - timedelta(days=days)
+
+
+@pytest.fixture
+def mock_db(monkeypatch):
+    from mongomock_motor import AsyncMongoMockClient
+    import services.timestamp_migration as timestamp_migration
+
+    database = AsyncMongoMockClient()["leaderlix_test"]
+    monkeypatch.setattr(timestamp_migration, "db", database)
+    return database
+
+
+class TestHelpers:
+    """Tests for utils/timestamps.py"""
+
+    def test_parse_timestamp(self):
+        from utils.timestamps import parse_timestamp
+
+        expected = datetime(2026, 3, 1, 12, 0, tzinfo=timezone.utc)
+        assert parse_timestamp("2026-03-01T12:00:00Z") == expected
+        assert parse_timestamp("2026-03-01T06:00:00-06:00") == expected
+        assert parse_timestamp(datetime(2026, 3, 1, 12, 0)) == expected
+        assert parse_timestamp("2026-03-01") == datetime(2026, 3, 1, tzinfo=timezone.utc)
+        assert parse_timestamp("Mar 1") is None
+        assert parse_timestamp("") is None
+        assert parse_timestamp(None) is None
+
+    def test_in_range(self):
+        from utils.timestamps import timestamp_in_range
+
+        assert timestamp_in_range(ago(1).isoformat(), gte=ago(2))
+        assert timestamp_in_range(ago(1), gte=ago(2).isoformat(), lt=NOW)
+        assert not timestamp_in_range(ago(3), gte=ago(2))
+        assert not timestamp_in_range(None, lt=NOW)
+
+
+class TestQueries:
+    """Range filters over mixed representations"""
+
+    pytestmark = pytest.mark.asyncio(loop_scope="function")
+
+    async def test_timestamp_query_matches_both(self, mock_db):
+        from utils.timestamps import timestamp_query
+
+        await mock_db.email_logs.insert_many([
+            {"id": "date", "sent_at": ago(1)},
+            {"id": "string", "sent_at": ago(1).isoformat()},
+            {"id": "old_date", "sent_at": ago(10)},
+            {"id": "old_string", "sent_at": ago(10).isoformat()},
+        ])
+
+        found = [d["id"] async for d in mock_db.email_logs.find(timestamp_query("sent_at", gte=ago(2)))]
+
+        assert sorted(found) == ["date", "string"]
+
+    async def test_cadence_query(self, mock_db):
+        from utils.contact_helpers import build_cadence_query
+
+        await mock_db.unified_contacts.insert_many([
+            {"id": "never"},
+            {"id": "empty", "last_email_e1_sent": ""},
+            {"id": "old_date", "last_email_e1_sent": ago(10)},
+            {"id": "old_string", "last_email_e1_sent": ago(10).isoformat()},
+            {"id": "recent_date", "last_email_e1_sent": ago(1)},
+            {"id": "recent_string", "last_email_e1_sent": ago(1).isoformat()},
+        ])
+
+        query = build_cadence_query("last_email_e1_sent", 7)
+        found = [d["id"] async for d in mock_db.unified_contacts.find(query)]
+
+        assert sorted(found) == ["empty", "never", "old_date", "old_string"]
+
+
+class TestMigration:
+    """Tests for services/timestamp_migration.py"""
+
+    pytestmark = pytest.mark.asyncio(loop_scope="function")
+
+    async def test_migrates_strings(self, mock_db):
+        from services.timestamp_migration import migrate_hot_timestamps, get_timestamp_migration_state
+
+        await mock_db.email_queue.insert_many([
+            {"id": f"q{i}", "scheduled_at": "2026-03-01T12:00:00Z", "created_at": ago(1)} for i in range(5)
+        ])
+        await mock_db.unified_contacts.insert_many([
+            {"id": "c1", "last_email_e1_sent": "2026-02-01T10:00:00+00:00", "updated_at": "",
+             "webinar_history": [{"event_id": "w1", "registered_at": "2026-02-02T10:00:00Z"}, {"event_id": "w2"}]},
+            {"id": "c2", "last_contacted_whatsapp": "ayer", "last_email_e07_sent": {"w1": "2026-02-01"}},
+        ])
+
+        dry = await migrate_hot_timestamps(dry_run=True)
+        assert dry["converted"] == 7 and dry["unparseable"] == 1
+        assert isinstance((await mock_db.email_queue.find_one({"id": "q0"}))["scheduled_at"], str)
+
+        result = await migrate_hot_timestamps(batch_size=2)
+
+        assert result["converted"] == 7 and result["unparseable"] == 1
+        queued = await mock_db.email_queue.find_one({"id": "q0"})
+        assert queued["scheduled_at"].replace(tzinfo=timezone.utc) == datetime(2026, 3, 1, 12, 0, tzinfo=timezone.utc)
+        c1 = await mock_db.unified_contacts.find_one({"id": "c1"})
+        assert isinstance(c1["last_email_e1_sent"], datetime)
+        # Contact created_at / updated_at stay strings (see HOT_TIMESTAMP_FIELDS)
+        assert c1["updated_at"] == ""
+        assert isinstance(c1["webinar_history"][0]["registered_at"], datetime)
+        assert c1["webinar_history"][1] == {"event_id": "w2"}
+        c2 = await mock_db.unified_contacts.find_one({"id": "c2"})
+        # Unparseable values and per-webinar dicts are left alone
+        assert c2["last_contacted_whatsapp"] == "ayer"
+        assert c2["last_email_e07_sent"] == {"w1": "2026-02-01"}
+
+        again = await migrate_hot_timestamps()
+        assert again["converted"] == 0
+        assert (await get_timestamp_migration_state())["converted"] == 0
+
+    async def test_ttl_indexes(self, mock_db):
+        from services.timestamp_migration import ensure_timestamp_indexes
+
+        assert await ensure_timestamp_indexes() == []
+
+        indexes = await mock_db.email_queue.index_information()
+        assert indexes["sent_at_ttl"]["expireAfterSeconds"] > 0
+        assert indexes["sent_at_ttl"]["partialFilterExpression"] == {"status": "sent"}
+        assert "created_at_ttl" in await mock_db.scraping_logs.index_information()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,108 @@
+"""
+DataLoader-style batch loading for response enrichment
+
+Endpoints that enrich a list of parents (cases -> contacts, cases -> quotes)
+used to run one query per parent. BatchLoader collects the keys of the whole
+response first, fetches them with a single $in query (chunked for very large
+key sets) and fans the documents back out per parent:
+
+    contacts = BatchLoader(db.unified_contacts, projection={"_id": 0, "id": 1, "name": 1})
+    for case in cases:
+        contacts.add_many(case.get("contact_ids"))
+    await contacts.load()
+    for case in cases:
+        case["contacts"] = contacts.get_many(case.get("contact_ids"))
+
+With many=True the key is not unique (quotes by case_id): get() returns the
+list of documents for a key, in `sort` order.
+"""
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Keys per $in query
+BATCH_LOADER_CHUNK_SIZE = 1000
+
+
+class BatchLoader:
+    """Collects keys, loads them with one $in per chunk and serves them from memory"""
+
+    def __init__(
+        self,
+        collection,
+        key: str = "id",
+        projection: Optional[Dict[str, Any]] = None,
+        query: Optional[Dict[str, Any]] = None,
+        sort: Optional[List[Tuple[str, int]]] = None,
+        many: bool = False,
+        chunk_size: int = BATCH_LOADER_CHUNK_SIZE
+    ):
+        self.collection = collection
+        self.key = key
+        self.projection = dict(projection) if projection is not None else {"_id": 0}
+        # Inclusion projections must return the key to fan documents out
+        if any(value for field, value in self.projection.items() if field != "_id"):
+            self.projection[key] = 1
+        self.query = query or {}
+        self.sort = sort
+        self.many = many
+        self.chunk_size = chunk_size
+        self.queries = 0
+        self._pending: List[Any] = []
+        self._pending_set = set()
+        self._docs: Dict[Any, Any] = {}
+
+    def add(self, key: Any):
+        """Queue a key for the next load() (None and already loaded keys are ignored)"""
+        if key is None or key in self._docs or key in self._pending_set:
+            return
+        self._pending.append(key)
+        self._pending_set.add(key)
+
+    def add_many(self, keys: Optional[Iterable[Any]]):
+        for key in keys or []:
+            self.add(key)
+
+    async def load(self) -> Dict[Any, Any]:
+        """Fetch every queued key. Keys without a document are remembered as missing."""
+        pending, self._pending, self._pending_set = self._pending, [], set()
+        for start in range(0, len(pending), self.chunk_size):
+            chunk = pending[start:start + self.chunk_size]
+            for key in chunk:
+                self._docs[key] = [] if self.many else None
+            cursor = self.collection.find({**self.query, self.key: {"$in": chunk}}, self.projection)
+            if self.sort:
+                cursor = cursor.sort(self.sort)
+            self.queries += 1
+            async for doc in cursor:
+                value = doc.get(self.key)
+                if self.many:
+                    self._docs.setdefault(value, []).append(doc)
+                elif self._docs.get(value) is None:
+                    self._docs[value] = doc
+        return self._docs
+
+    async def load_many(self, keys: Optional[Iterable[Any]]) -> List[Dict[str, Any]]:
+        """add_many + load + get_many, for a single parent"""
+        keys = list(keys or [])
+        self.add_many(keys)
+        await self.load()
+        return self.get_many(keys)
+
+    def get(self, key: Any) -> Any:
+        """Document for key (many=False) or list of documents (many=True)"""
+        if self.many:
+            return list(self._docs.get(key) or [])
+        return self._docs.get(key)
+
+    def get_many(self, keys: Optional[Iterable[Any]]) -> List[Dict[str, Any]]:
+        """Documents of the given keys, in key order, without duplicates or missing keys"""
+        result = []
+        seen = set()
+        for key in keys or []:
+            if key is None or key in seen:
+                continue
+            seen.add(key)
+            if self.many:
+                result.extend(self.get(key))
+            elif self._docs.get(key) is not None:
+                result.append(self._docs[key])
+        return result
@@ -1,22 +1,13 @@
 """
 Calendar helper utilities for consistent calendar access across modules.
-Centralizes Google Calendar API interactions.
+Events come from the local cache in services/calendar_sync.py.
 """
 from typing import List, Dict, Set, Optional
 from datetime import datetime, timezone, timedelta
 import logging
-import os
-
-from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import build
 
 logger = logging.getLogger(__name__)
 
-# Google OAuth config
-GOOGLE_CLIENT_ID = os.environ.get("GOOGLE_CLIENT_ID", "")
-GOOGLE_CLIENT_SECRET = os.environ.get("GOOGLE_CLIENT_SECRET", "")
-CALENDAR_SCOPES = ["https://www.googleapis.com/auth/calendar.readonly"]
-
 
 async def get_calendar_events(days: int = 21, settings_getter=None, credentials_refresher=None) -> List[Dict]:
     """
@@ -43,36 +34,12 @@ async def get_calendar_events(days: int = 21, settings_getter=None, credentials_
     if not calendar_credentials:
         return []
     
+    # Served from the local event cache (services/calendar_sync.py), which
+    # refreshes credentials itself; credentials_refresher is kept for callers.
+    from services.calendar_sync import calendar_sync
+    
     try:
-        if credentials_refresher:
-            calendar_credentials = credentials_refresher(calendar_credentials)
-        
-        credentials = Credentials(
-            token=calendar_credentials.get("token"),
-            refresh_token=calendar_credentials.get("refresh_token"),
-            token_uri=calendar_credentials.get("token_uri", "https://oauth2.googleapis.com/token"),
-            client_id=calendar_credentials.get("client_id", GOOGLE_CLIENT_ID),
-            client_secret=calendar_credentials.get("client_secret", GOOGLE_CLIENT_SECRET),
-            scopes=calendar_credentials.get("scopes", CALENDAR_SCOPES)
-        )
-        
-        service = build('calendar', 'v3', credentials=credentials, cache_discovery=False)
-        
-        now = datetime.now(timezone.utc)
-        time_min = now.isoformat()
-        time_max = (now + timedelta(days=days)).isoformat()
-        
-        events_result = service.events().list(
-            calendarId='primary',
-            timeMin=time_min,
-            timeMax=time_max,
-            singleEvents=True,
-            orderBy='startTime',
-            showDeleted=False
-        ).execute()
-        
-        return events_result.get('items', [])
-        
+        return await calendar_sync.get_events(days=days)
     except Exception as e:
         logger.error(f"Error fetching calendar events: {e}")
         return []
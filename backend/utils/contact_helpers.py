@@ -4,6 +4,8 @@ Contact helper utilities for consistent role, status, and cadence checking.
 from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime, timezone, timedelta
 
+from utils.timestamps import parse_timestamp, timestamp_query
+
 
 # Valid student role variations (students who only attend classes, no coaching)
 STUDENT_ROLES = {"student", "estudiante"}
@@ -55,24 +57,17 @@ def check_contact_cadence(
     if not last_contacted:
         return True, None
     
-    try:
-        # Handle both ISO format strings and datetime objects
-        if isinstance(last_contacted, str):
-            last_contact_date = datetime.fromisoformat(last_contacted.replace("Z", "+00:00"))
-        else:
-            last_contact_date = last_contacted
-        
-        now = datetime.now(timezone.utc)
-        days_since = (now - last_contact_date).days
-        
-        threshold_date = (now - timedelta(days=days)).isoformat()
-        can_contact = last_contacted < threshold_date if isinstance(last_contacted, str) else last_contact_date < (now - timedelta(days=days))
-        
-        return can_contact, days_since
-        
-    except (ValueError, TypeError) as e:
+    # Handles both ISO format strings and BSON dates
+    last_contact_date = parse_timestamp(last_contacted)
+    if last_contact_date is None:
         # If parsing fails, assume we can contact
         return True, None
+    
+    now = datetime.now(timezone.utc)
+    days_since = (now - last_contact_date).days
+    can_contact = last_contact_date < (now - timedelta(days=days))
+    
+    return can_contact, days_since
 
 
 def build_cadence_query(field: str, days: int) -> Dict:
@@ -86,13 +81,14 @@ def build_cadence_query(field: str, days: int) -> Dict:
     Returns:
         MongoDB query dict for $or condition
     """
-    threshold = (datetime.now(timezone.utc) - timedelta(days=days)).isoformat()
+    threshold = datetime.now(timezone.utc) - timedelta(days=days)
     
+    # Matches BSON dates and not-yet-migrated ISO strings
     return {
         "$or": [
             {field: {"$exists": False}},
             {field: None},
-            {field: {"$lt": threshold}}
+            *timestamp_query(field, lt=threshold)["$or"]
         ]
     }
 
@@ -0,0 +1,175 @@
+"""
+Keyset (cursor) pagination for list endpoints
+
+skip()/limit() pages get linearly slower the deeper the client scrolls, and
+every page used to re-run count_documents(query). List endpoints now page on
+(sort field, _id):
+
+- keyset_page() returns the page plus an opaque next_cursor (the sort value
+  and _id of the last document). Passing it back continues right after that
+  document with an index range scan, whatever the depth.
+- Without a cursor the first page still honours skip, so existing clients
+  keep working and can switch to cursors from any page.
+- cached_total() reuses the total per (collection, filter hash) for
+  PAGINATION_TOTAL_CACHE_SECONDS; an empty filter uses the collection
+  metadata count. Totals are approximate by up to that long.
+
+Sort fields may hold mixed types (created_at is a BSON date or a legacy ISO
+string until the timestamp migration catches up). MongoDB sorts by type
+first, so the "after cursor" filter also takes in the types that sort
+beyond the cursor's own.
+"""
+import base64
+import hashlib
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from bson import json_util
+
+from config import PAGINATION_TOTAL_CACHE_MAX_ENTRIES, PAGINATION_TOTAL_CACHE_SECONDS
+
+_JSON_OPTIONS = json_util.CANONICAL_JSON_OPTIONS.with_options(tz_aware=True, tzinfo=timezone.utc)
+
+# BSON sort order of the value types list endpoints sort on, lowest first
+_TYPE_ORDER = ["null", "number", "string", "date"]
+
+
+class InvalidCursor(ValueError):
+    """Cursor that was not issued by keyset_page (or doesn't match its sort)"""
+
+
+# ============ CURSORS ============
+
+def encode_cursor(value: Any, last_id: Any) -> str:
+    """Opaque cursor for the position after (value, _id)"""
+    raw = json_util.dumps([value, last_id], json_options=_JSON_OPTIONS)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[Any, Any]:
+    """(sort value, _id) of a cursor; raises InvalidCursor"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        value, last_id = json_util.loads(raw, json_options=_JSON_OPTIONS)
+    except Exception:
+        raise InvalidCursor("Invalid pagination cursor")
+    return value, last_id
+
+
+def _type_class(value: Any) -> Optional[str]:
+    if value is None:
+        return "null"
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return "number"
+    if isinstance(value, str):
+        return "string"
+    if isinstance(value, datetime):
+        return "date"
+    return None
+
+
+def _type_filter(field: str, type_class: str) -> Dict[str, Any]:
+    if type_class == "null":
+        return {field: None}
+    return {field: {"$type": type_class}}
+
+
+def keyset_filter(field: str, direction: int, value: Any, last_id: Any) -> Dict[str, Any]:
+    """Filter for the documents after (value, _id) in (field, _id) order"""
+    op = "$lt" if direction < 0 else "$gt"
+    conditions = [{field: value, "_id": {op: last_id}}]
+    if value is not None:
+        conditions.append({field: {op: value}})
+    type_class = _type_class(value)
+    if type_class:
+        rank = _TYPE_ORDER.index(type_class)
+        beyond = _TYPE_ORDER[:rank] if direction < 0 else _TYPE_ORDER[rank + 1:]
+        conditions.extend(_type_filter(field, other) for other in beyond)
+    return {"$or": conditions}
+
+
+# ============ PAGES ============
+
+async def keyset_page(
+    collection,
+    query: Dict[str, Any],
+    projection: Optional[Dict[str, Any]],
+    sort_field: str,
+    direction: int = -1,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    skip: int = 0
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    One page of collection sorted by (sort_field, _id) and the cursor of the
+    next page (None on the last page). skip only applies without a cursor.
+    """
+    projection = dict(projection) if projection is not None else {}
+    # _id is the tie-breaker: fetch it even when the caller hides it
+    hide_id = projection.pop("_id", 1) == 0
+    inclusion = any(value for field, value in projection.items())
+    hide_sort_field = inclusion and not projection.get(sort_field)
+    if inclusion:
+        projection[sort_field] = 1
+    elif projection.get(sort_field) == 0:
+        del projection[sort_field]
+        hide_sort_field = True
+
+    if cursor:
+        after = keyset_filter(sort_field, direction, *decode_cursor(cursor))
+        query = {"$and": [query, after]} if query else after
+        skip = 0
+
+    find = collection.find(query, projection or None).sort([(sort_field, direction), ("_id", direction)])
+    if skip:
+        find = find.skip(skip)
+    docs = await find.limit(limit).to_list(limit)
+
+    next_cursor = None
+    if limit and len(docs) == limit:
+        last = docs[-1]
+        next_cursor = encode_cursor(last.get(sort_field), last["_id"])
+    for doc in docs:
+        if hide_id:
+            doc.pop("_id", None)
+        if hide_sort_field:
+            doc.pop(sort_field, None)
+    return docs, next_cursor
+
+
+# ============ TOTALS ============
+
+_totals: "OrderedDict[str, Tuple[float, int]]" = OrderedDict()
+
+
+def _total_key(collection, query: Dict[str, Any]) -> str:
+    raw = json_util.dumps(query, sort_keys=True, json_options=_JSON_OPTIONS)
+    return f"{collection.name}:{hashlib.sha1(raw.encode()).hexdigest()}"
+
+
+async def cached_total(collection, query: Dict[str, Any]) -> int:
+    """Document count for a filter, reused for PAGINATION_TOTAL_CACHE_SECONDS"""
+    key = _total_key(collection, query)
+    now = time.monotonic()
+    hit = _totals.get(key)
+    if hit and hit[0] > now:
+        _totals.move_to_end(key)
+        return hit[1]
+
+    if query:
+        total = await collection.count_documents(query)
+    else:
+        total = await collection.estimated_document_count()
+    _totals[key] = (now + PAGINATION_TOTAL_CACHE_SECONDS, total)
+    _totals.move_to_end(key)
+    while len(_totals) > PAGINATION_TOTAL_CACHE_MAX_ENTRIES:
+        _totals.popitem(last=False)
+    return total
+
+
+def clear_cached_totals():
+    _totals.clear()
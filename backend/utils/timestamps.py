@@ -0,0 +1,104 @@
+"""
+Timestamp helpers for fields moving from ISO strings to BSON dates.
+
+Hot timestamp fields (see services/timestamp_migration.py) are stored as
+BSON Date. Until every document is migrated, a field can hold either an ISO
+string or a datetime, so readers go through these helpers instead of
+datetime.fromisoformat(value.replace("Z", "+00:00")) or string comparison:
+
+    parse_timestamp(value)                  str | datetime -> aware UTC datetime
+    timestamp_query(field, lt=...)          range filter matching both representations
+    build_cadence_query in contact_helpers  uses timestamp_query
+
+The Motor client is not tz_aware: existing code stores and compares naive
+datetime.now() values, so dates read back stay naive (UTC). Normalize with
+parse_timestamp before comparing with utc_now().
+"""
+from datetime import datetime, timezone, date
+from typing import Any, Dict, List, Optional
+
+
+def utc_now() -> datetime:
+    """Current time, for writing hot timestamp fields as BSON dates"""
+    return datetime.now(timezone.utc)
+
+
+def parse_timestamp(value: Any) -> Optional[datetime]:
+    """
+    Aware UTC datetime from a stored timestamp (ISO string, "Z" suffix, date-only
+    string, naive or aware datetime). None when missing or unparseable.
+    """
+    if value is None or value == "":
+        return None
+    if isinstance(value, datetime):
+        dt = value
+    elif isinstance(value, date):
+        dt = datetime(value.year, value.month, value.day)
+    elif isinstance(value, str):
+        try:
+            dt = datetime.fromisoformat(value.strip().replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    else:
+        return None
+    if dt.tzinfo is None:
+        return dt.replace(tzinfo=timezone.utc)
+    return dt.astimezone(timezone.utc)
+
+
+def timestamp_iso(value: Any) -> Optional[str]:
+    """ISO string for a stored timestamp (API responses that expect strings)"""
+    dt = parse_timestamp(value)
+    return dt.isoformat() if dt else None
+
+
+def timestamp_sort_key(value: Any) -> datetime:
+    """Sort key for mixed string / datetime values (missing values sort first)"""
+    return parse_timestamp(value) or datetime.min.replace(tzinfo=timezone.utc)
+
+
+def _bounds(gt, gte, lt, lte, as_string: bool) -> Dict[str, Any]:
+    bounds = {}
+    for op, value in (("$gt", gt), ("$gte", gte), ("$lt", lt), ("$lte", lte)):
+        if value is not None:
+            dt = parse_timestamp(value)
+            bounds[op] = dt.isoformat() if as_string else dt
+    return bounds
+
+
+def timestamp_query(
+    field: str,
+    gt: Any = None,
+    gte: Any = None,
+    lt: Any = None,
+    lte: Any = None
+) -> Dict[str, Any]:
+    """
+    Range filter on a timestamp field that matches BSON dates and legacy ISO
+    strings (MongoDB never compares across types):
+
+        {"$or": [{field: {"$lt": <date>}}, {field: {"$lt": "<iso>"}}]}
+
+    Bounds may be datetimes or ISO strings. Combine with other $or clauses via $and.
+    """
+    return {"$or": [
+        {field: _bounds(gt, gte, lt, lte, as_string=False)},
+        {field: _bounds(gt, gte, lt, lte, as_string=True)},
+    ]}
+
+
+def timestamp_in_range(value: Any, gt: Any = None, gte: Any = None, lt: Any = None, lte: Any = None) -> bool:
+    """In-memory equivalent of timestamp_query (False when value is missing)"""
+    dt = parse_timestamp(value)
+    if dt is None:
+        return False
+    checks: List[bool] = []
+    if gt is not None:
+        checks.append(dt > parse_timestamp(gt))
+    if gte is not None:
+        checks.append(dt >= parse_timestamp(gte))
+    if lt is not None:
+        checks.append(dt < parse_timestamp(lt))
+    if lte is not None:
+        checks.append(dt <= parse_timestamp(lte))
+    return all(checks)
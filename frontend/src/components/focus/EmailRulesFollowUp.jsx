@@ -252,6 +252,10 @@ export default function EmailRulesFollowUp({ onStatusChange }) {
   const [groupPages, setGroupPages] = useState({});
   const [groupPageSizes, setGroupPageSizes] = useState({});
   
+  // Group members are loaded from the server one page at a time
+  const [groupMembers, setGroupMembers] = useState({});
+  const memberTargets = useRef({});
+  
   // Variable insertion
   const [sendActiveField, setSendActiveField] = useState("body");
   const sendSubjectRef = useRef(null);
@@ -358,20 +362,44 @@ export default function EmailRulesFollowUp({ onStatusChange }) {
   const setPageSize = (groupKey, size) => {
     setGroupPageSizes(prev => ({ ...prev, [groupKey]: size }));
     setGroupPages(prev => ({ ...prev, [groupKey]: 1 })); // Reset to page 1
+    reloadGroupMembers(groupKey, 1, size);
   };
   const getCurrentPage = (groupKey) => groupPages[groupKey] || 1;
   const setCurrentPage = (groupKey, page) => {
     setGroupPages(prev => ({ ...prev, [groupKey]: page }));
+    reloadGroupMembers(groupKey, page, getPageSize(groupKey));
   };
-  const getPaginatedContacts = (groupKey, contacts) => {
-    const currentPage = getCurrentPage(groupKey);
+  const getPaginatedContacts = (groupKey) => groupMembers[groupKey] || [];
+  const getTotalPages = (groupKey, count) => {
     const pageSize = getPageSize(groupKey);
-    const startIndex = (currentPage - 1) * pageSize;
-    return contacts.slice(startIndex, startIndex + pageSize);
+    return Math.ceil(count / pageSize);
   };
-  const getTotalPages = (groupKey, contacts) => {
-    const pageSize = getPageSize(groupKey);
-    return Math.ceil(contacts.length / pageSize);
+
+  // Load one page of a group's (or subgroup's) pending emails
+  const loadGroupMembers = useCallback(async (groupKey, target, page, pageSize) => {
+    memberTargets.current[groupKey] = { ...target, pageSize };
+    try {
+      const res = await api.get(`/email-rules/rule/${target.ruleId}/pending-grouped/members`, {
+        params: {
+          group_id: target.groupId,
+          subgroup_id: target.subgroupId || undefined,
+          page,
+          page_size: pageSize
+        }
+      });
+      setGroupMembers(prev => ({ ...prev, [groupKey]: res.data.emails || [] }));
+    } catch (error) {
+      console.error(`Error loading members for ${groupKey}:`, error);
+    }
+  }, []);
+  const reloadGroupMembers = (groupKey, page, pageSize) => {
+    const target = memberTargets.current[groupKey];
+    if (target) {
+      loadGroupMembers(groupKey, target, page, pageSize);
+    }
+  };
+  const openGroupMembers = (groupKey, ruleId, groupId, subgroupId = null) => {
+    loadGroupMembers(groupKey, { ruleId, groupId, subgroupId }, getCurrentPage(groupKey), getPageSize(groupKey));
   };
 
   // Generate preview with variables replaced
@@ -461,10 +489,18 @@ export default function EmailRulesFollowUp({ onStatusChange }) {
         ...prev,
         [ruleId]: res.data
       }));
+      
+      // Groups changed: reload loaded member pages of this rule from page 1
+      Object.entries(memberTargets.current)
+        .filter(([, target]) => target.ruleId === ruleId)
+        .forEach(([key, target]) => {
+          setGroupPages(prev => ({ ...prev, [key]: 1 }));
+          loadGroupMembers(key, target, 1, target.pageSize);
+        });
     } catch (error) {
       console.error(`Error loading pending for ${ruleId}:`, error);
     }
-  }, []);
+  }, [loadGroupMembers]);
 
   // Load pending grouped when accordion opens
   const handleAccordionChange = useCallback((value) => {
@@ -954,6 +990,9 @@ export default function EmailRulesFollowUp({ onStatusChange }) {
                                   onOpenChange={(open) => {
                                     setExpandedGroup(open ? `${rule.id}-${grp.group_id}` : null);
                                     setExpandedSubgroup(null);
+                                    if (open && !rulePendingGrouped[rule.id].has_subgroups) {
+                                      openGroupMembers(`${rule.id}-${grp.group_id}`, rule.id, grp.group_id);
+                                    }
                                   }}
                                 >
                                   <CollapsibleTrigger className="w-full">
@@ -984,6 +1023,9 @@ export default function EmailRulesFollowUp({ onStatusChange }) {
                                             onOpenChange={(open) => {
                                               setExpandedSubgroup(open ? `${rule.id}-${grp.group_id}-${subgrp.subgroup_id}` : null);
                                               setExpandedEmail(null);
+                                              if (open) {
+                                                openGroupMembers(`${rule.id}-${grp.group_id}-${subgrp.subgroup_id}`, rule.id, grp.group_id, subgrp.subgroup_id);
+                                              }
                                             }}
                                           >
                                             <CollapsibleTrigger className="w-full">
@@ -1001,15 +1043,15 @@ export default function EmailRulesFollowUp({ onStatusChange }) {
                                             <CollapsibleContent>
                                               {(() => {
                                                 const subgroupKey = `${rule.id}-${grp.group_id}-${subgrp.subgroup_id}`;
-                                                const paginatedEmails = getPaginatedContacts(subgroupKey, subgrp.emails);
-                                                const totalPages = getTotalPages(subgroupKey, subgrp.emails);
+                                                const paginatedEmails = getPaginatedContacts(subgroupKey);
+                                                const totalPages = getTotalPages(subgroupKey, subgrp.count);
                                                 const currentPage = getCurrentPage(subgroupKey);
                                                 const pageSize = getPageSize(subgroupKey);
                                                 
                                                 return (
                                                   <div className="mt-2 ml-4 space-y-1">
                                                     {/* Pagination Controls */}
-                                                    {subgrp.emails.length > DEFAULT_PAGE_SIZE && (
+                                                    {subgrp.count > DEFAULT_PAGE_SIZE && (
                                                       <div className="flex items-center justify-between py-2 border-b border-[#222]">
                                                         <div className="flex items-center gap-2">
                                                           <span className="text-slate-400 text-xs">Mostrar:</span>
@@ -1067,15 +1109,15 @@ export default function EmailRulesFollowUp({ onStatusChange }) {
                                         /* Direct emails (no subgroups) */
                                         (() => {
                                           const groupKey = `${rule.id}-${grp.group_id}`;
-                                          const paginatedEmails = getPaginatedContacts(groupKey, grp.emails);
-                                          const totalPages = getTotalPages(groupKey, grp.emails);
+                                          const paginatedEmails = getPaginatedContacts(groupKey);
+                                          const totalPages = getTotalPages(groupKey, grp.count);
                                           const currentPage = getCurrentPage(groupKey);
                                           const pageSize = getPageSize(groupKey);
                                           
                                           return (
                                             <div className="space-y-1">
                                               {/* Pagination Controls */}
-                                              {grp.emails.length > DEFAULT_PAGE_SIZE && (
+                                              {grp.count > DEFAULT_PAGE_SIZE && (
                                                 <div className="flex items-center justify-between py-2 border-b border-[#222]">
                                                   <div className="flex items-center gap-2">
                                                     <span className="text-slate-400 text-xs">Mostrar:</span>
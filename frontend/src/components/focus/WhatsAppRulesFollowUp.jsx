@@ -306,6 +306,10 @@ export default function WhatsAppRulesFollowUp({ onStatusChange }) {
   const [groupPages, setGroupPages] = useState({});
   const [groupPageSizes, setGroupPageSizes] = useState({});
   
+  // Group members are loaded from the server one page at a time
+  const [groupMembers, setGroupMembers] = useState({});
+  const memberTargets = useRef({});
+  
   // Message ref for cursor position
   const messageRef = useRef(null);
 
@@ -361,20 +365,44 @@ export default function WhatsAppRulesFollowUp({ onStatusChange }) {
   const setPageSize = (groupKey, size) => {
     setGroupPageSizes(prev => ({ ...prev, [groupKey]: size }));
     setGroupPages(prev => ({ ...prev, [groupKey]: 1 })); // Reset to page 1
+    reloadGroupMembers(groupKey, 1, size);
   };
   const getCurrentPage = (groupKey) => groupPages[groupKey] || 1;
   const setCurrentPage = (groupKey, page) => {
     setGroupPages(prev => ({ ...prev, [groupKey]: page }));
+    reloadGroupMembers(groupKey, page, getPageSize(groupKey));
   };
-  const getPaginatedContacts = (groupKey, contacts) => {
-    const currentPage = getCurrentPage(groupKey);
+  const getPaginatedContacts = (groupKey) => groupMembers[groupKey] || [];
+  const getTotalPages = (groupKey, count) => {
     const pageSize = getPageSize(groupKey);
-    const startIndex = (currentPage - 1) * pageSize;
-    return contacts.slice(startIndex, startIndex + pageSize);
+    return Math.ceil(count / pageSize);
   };
-  const getTotalPages = (groupKey, contacts) => {
-    const pageSize = getPageSize(groupKey);
-    return Math.ceil(contacts.length / pageSize);
+
+  // Load one page of a group's (or subgroup's) pending messages
+  const loadGroupMembers = useCallback(async (groupKey, target, page, pageSize) => {
+    memberTargets.current[groupKey] = { ...target, pageSize };
+    try {
+      const res = await api.get(`/whatsapp-rules/rule/${target.ruleId}/pending-grouped/members`, {
+        params: {
+          group_id: target.groupId,
+          subgroup_id: target.subgroupId || undefined,
+          page,
+          page_size: pageSize
+        }
+      });
+      setGroupMembers(prev => ({ ...prev, [groupKey]: res.data.emails || [] }));
+    } catch (error) {
+      console.error(`Error loading members for ${groupKey}:`, error);
+    }
+  }, []);
+  const reloadGroupMembers = (groupKey, page, pageSize) => {
+    const target = memberTargets.current[groupKey];
+    if (target) {
+      loadGroupMembers(groupKey, target, page, pageSize);
+    }
+  };
+  const openGroupMembers = (groupKey, ruleId, groupId, subgroupId = null) => {
+    loadGroupMembers(groupKey, { ruleId, groupId, subgroupId }, getCurrentPage(groupKey), getPageSize(groupKey));
   };
 
   // Load rules on mount
@@ -412,10 +440,18 @@ export default function WhatsAppRulesFollowUp({ onStatusChange }) {
         ...prev,
         [ruleId]: res.data
       }));
+      
+      // Groups changed: reload loaded member pages of this rule from page 1
+      Object.entries(memberTargets.current)
+        .filter(([, target]) => target.ruleId === ruleId)
+        .forEach(([key, target]) => {
+          setGroupPages(prev => ({ ...prev, [key]: 1 }));
+          loadGroupMembers(key, target, 1, target.pageSize);
+        });
     } catch (error) {
       console.error(`Error loading pending for ${ruleId}:`, error);
     }
-  }, []);
+  }, [loadGroupMembers]);
 
   const handleAccordionChange = useCallback((value) => {
     if (value && !rulePendingGrouped[value]) {
@@ -1080,6 +1116,9 @@ export default function WhatsAppRulesFollowUp({ onStatusChange }) {
                                   onOpenChange={(open) => {
                                     setExpandedGroup(open ? `${rule.id}-${grp.group_id}` : null);
                                     setExpandedSubgroup(null);
+                                    if (open && !rulePendingGrouped[rule.id].has_subgroups) {
+                                      openGroupMembers(`${rule.id}-${grp.group_id}`, rule.id, grp.group_id);
+                                    }
                                   }}
                                 >
                                   <CollapsibleTrigger className="w-full">
@@ -1106,6 +1145,9 @@ export default function WhatsAppRulesFollowUp({ onStatusChange }) {
                                             open={expandedSubgroup === `${rule.id}-${grp.group_id}-${subgrp.subgroup_id}`}
                                             onOpenChange={(open) => {
                                               setExpandedSubgroup(open ? `${rule.id}-${grp.group_id}-${subgrp.subgroup_id}` : null);
+                                              if (open) {
+                                                openGroupMembers(`${rule.id}-${grp.group_id}-${subgrp.subgroup_id}`, rule.id, grp.group_id, subgrp.subgroup_id);
+                                              }
                                             }}
                                           >
                                             <CollapsibleTrigger className="w-full">
@@ -1123,8 +1165,8 @@ export default function WhatsAppRulesFollowUp({ onStatusChange }) {
                                             <CollapsibleContent>
                                               {(() => {
                                                 const subgroupKey = `${rule.id}-${grp.group_id}-${subgrp.subgroup_id}`;
-                                                const paginatedContacts = getPaginatedContacts(subgroupKey, subgrp.emails);
-                                                const totalPages = getTotalPages(subgroupKey, subgrp.emails);
+                                                const paginatedContacts = getPaginatedContacts(subgroupKey);
+                                                const totalPages = getTotalPages(subgroupKey, subgrp.count);
                                                 const currentPage = getCurrentPage(subgroupKey);
                                                 const pageSize = getPageSize(subgroupKey);
                                                 
@@ -1142,7 +1184,7 @@ export default function WhatsAppRulesFollowUp({ onStatusChange }) {
                                                     )}
                                                     
                                                     {/* Pagination Controls */}
-                                                    {subgrp.emails.length > DEFAULT_PAGE_SIZE && (
+                                                    {subgrp.count > DEFAULT_PAGE_SIZE && (
                                                       <div className="flex items-center justify-between py-2 border-b border-[#222]">
                                                         <div className="flex items-center gap-2">
                                                           <span className="text-slate-400 text-xs">Mostrar:</span>
@@ -1199,8 +1241,8 @@ export default function WhatsAppRulesFollowUp({ onStatusChange }) {
                                       ) : (
                                         (() => {
                                           const groupKey = `${rule.id}-${grp.group_id}`;
-                                          const paginatedContacts = getPaginatedContacts(groupKey, grp.emails);
-                                          const totalPages = getTotalPages(groupKey, grp.emails);
+                                          const paginatedContacts = getPaginatedContacts(groupKey);
+                                          const totalPages = getTotalPages(groupKey, grp.count);
                                           const currentPage = getCurrentPage(groupKey);
                                           const pageSize = getPageSize(groupKey);
                                           
@@ -1218,7 +1260,7 @@ export default function WhatsAppRulesFollowUp({ onStatusChange }) {
                                               )}
                                               
                                               {/* Pagination Controls */}
-                                              {grp.emails.length > DEFAULT_PAGE_SIZE && (
+                                              {grp.count > DEFAULT_PAGE_SIZE && (
                                                 <div className="flex items-center justify-between py-2 border-b border-[#222]">
                                                   <div className="flex items-center gap-2">
                                                     <span className="text-slate-400 text-xs">Mostrar:</span>
@@ -119,6 +119,9 @@ const RULE_GROUPS = [
   }
 ];
 
+// Members shown when a group is expanded (the rest are counted only)
+const GROUP_PREVIEW_SIZE = 20;
+
 // Template variables available for each rule type
 const WEBINAR_RULES = ["E01", "E06", "E07", "E08", "E09", "E10"];
 
@@ -227,6 +230,7 @@ export default function EmailRulesSettings() {
   const [ruleStats, setRuleStats] = useState({});
   const [rulePending, setRulePending] = useState({});
   const [rulePendingGrouped, setRulePendingGrouped] = useState({});
+  const [groupMembers, setGroupMembers] = useState({}); // First members of each open group
   const [rulePendingCounts, setRulePendingCounts] = useState({});
   const [expandedEmail, setExpandedEmail] = useState(null);
   const [expandedGroup, setExpandedGroup] = useState(null);
@@ -550,11 +554,54 @@ export default function EmailRulesSettings() {
     try {
       const res = await api.get(`/email-rules/rule/${ruleId}/pending-grouped`);
       setRulePendingGrouped(prev => ({ ...prev, [ruleId]: res.data }));
+      // Groups changed: drop loaded members of this rule
+      setGroupMembers(prev => Object.fromEntries(
+        Object.entries(prev).filter(([key]) => !key.startsWith(`${ruleId}-`))
+      ));
+      setExpandedGroup(prev => (prev && prev.startsWith(`${ruleId}-`) ? null : prev));
+      setExpandedSubgroup(null);
     } catch (error) {
       console.error(`Error loading grouped pending for ${ruleId}:`, error);
     }
   };
 
+  const loadGroupPreview = async (groupKey, ruleId, groupId, subgroupId = null) => {
+    try {
+      const res = await api.get(`/email-rules/rule/${ruleId}/pending-grouped/members`, {
+        params: { group_id: groupId, subgroup_id: subgroupId || undefined, page_size: GROUP_PREVIEW_SIZE }
+      });
+      setGroupMembers(prev => ({ ...prev, [groupKey]: res.data.emails || [] }));
+    } catch (error) {
+      console.error(`Error loading members for ${groupKey}:`, error);
+    }
+  };
+
+  // Sending targets the whole group, so fetch every member (without bodies)
+  const loadAllGroupMembers = async (ruleId, groupId, subgroupId = null) => {
+    const members = [];
+    let page = 1;
+    let totalPages = 1;
+    while (page <= totalPages) {
+      const res = await api.get(`/email-rules/rule/${ruleId}/pending-grouped/members`, {
+        params: { group_id: groupId, subgroup_id: subgroupId || undefined, page, page_size: 500 }
+      });
+      members.push(...(res.data.emails || []));
+      totalPages = res.data.total_pages || 0;
+      page += 1;
+    }
+    return members;
+  };
+
+  const openGroupSendDialog = async (rule, group, subgroup = null) => {
+    try {
+      const members = await loadAllGroupMembers(rule.id, group.group_id, subgroup?.subgroup_id);
+      openSendDialog(rule, members, group.group_id, subgroup ? subgroup.subgroup_id : null, group);
+    } catch (error) {
+      console.error("Error loading group recipients:", error);
+      toast.error("Error cargando destinatarios");
+    }
+  };
+
   const generateForRule = async (ruleId) => {
     setGeneratingRule(ruleId);
     try {
@@ -1041,6 +1088,9 @@ export default function EmailRulesSettings() {
                               setExpandedGroup(open ? `${rule.id}-${group.group_id}` : null);
                               setExpandedSubgroup(null);
                               setExpandedEmail(null);
+                              if (open && !rulePendingGrouped[rule.id].has_subgroups) {
+                                loadGroupPreview(`${rule.id}-${group.group_id}`, rule.id, group.group_id);
+                              }
                             }}
                           >
                             <CollapsibleTrigger className="w-full">
@@ -1092,6 +1142,9 @@ export default function EmailRulesSettings() {
                                       onOpenChange={(open) => {
                                         setExpandedSubgroup(open ? `${rule.id}-${group.group_id}-${subgroup.subgroup_id}` : null);
                                         setExpandedEmail(null);
+                                        if (open) {
+                                          loadGroupPreview(`${rule.id}-${group.group_id}-${subgroup.subgroup_id}`, rule.id, group.group_id, subgroup.subgroup_id);
+                                        }
                                       }}
                                     >
                                       <CollapsibleTrigger className="w-full">
@@ -1122,7 +1175,7 @@ export default function EmailRulesSettings() {
                                       
                                       <CollapsibleContent>
                                         <div className="mt-1 ml-4 space-y-1 max-h-48 overflow-y-auto">
-                                          {subgroup.emails.slice(0, 15).map((email) => (
+                                          {(groupMembers[`${rule.id}-${group.group_id}-${subgroup.subgroup_id}`] || []).slice(0, 15).map((email) => (
                                             <EmailItem 
                                               key={email.id}
                                               email={email}
@@ -1132,19 +1185,19 @@ export default function EmailRulesSettings() {
                                               setEditingContact={setEditingContact}
                                             />
                                           ))}
-                                          {subgroup.emails.length > 15 && (
+                                          {subgroup.count > 15 && (
                                             <p className="text-xs text-slate-500 text-center py-1">
-                                              ... y {subgroup.emails.length - 15} más
+                                              ... y {subgroup.count - 15} más
                                             </p>
                                           )}
                                           
                                           {/* Send button for subgroup */}
-                                          {!subgroup.has_error && subgroup.emails.length > 0 && (
+                                          {!subgroup.has_error && subgroup.count > 0 && (
                                             <Button
                                               size="sm"
                                               onClick={(e) => {
                                                 e.stopPropagation();
-                                                openSendDialog(rule, subgroup.emails, group.group_id, subgroup.subgroup_id, group);
+                                                openGroupSendDialog(rule, group, subgroup);
                                               }}
                                               className="w-full mt-2 bg-green-600 hover:bg-green-700 h-8 text-xs"
                                               data-testid={`send-subgroup-${rule.id}-${group.group_id}-${subgroup.subgroup_id}`}
@@ -1161,7 +1214,7 @@ export default function EmailRulesSettings() {
                                   /* For buyer_persona rules: show emails directly */
                                   <div className="space-y-1">
                                     <div className="max-h-60 overflow-y-auto space-y-1">
-                                      {group.emails.slice(0, 20).map((email) => (
+                                      {(groupMembers[`${rule.id}-${group.group_id}`] || []).slice(0, 20).map((email) => (
                                         <EmailItem 
                                           key={email.id}
                                           email={email}
@@ -1171,20 +1224,20 @@ export default function EmailRulesSettings() {
                                           setEditingContact={setEditingContact}
                                         />
                                       ))}
-                                      {group.emails.length > 20 && (
+                                      {group.count > 20 && (
                                         <p className="text-xs text-slate-500 text-center py-2">
-                                          ... y {group.emails.length - 20} más
+                                          ... y {group.count - 20} más
                                         </p>
                                       )}
                                     </div>
                                     
                                     {/* Send button for group (buyer_persona rules) */}
-                                    {!group.has_error && group.emails.length > 0 && (
+                                    {!group.has_error && group.count > 0 && (
                                       <Button
                                         size="sm"
                                         onClick={(e) => {
                                           e.stopPropagation();
-                                          openSendDialog(rule, group.emails, group.group_id, null, group);
+                                          openGroupSendDialog(rule, group);
                                         }}
                                         className="w-full mt-2 bg-green-600 hover:bg-green-700 h-8 text-xs"
                                         data-testid={`send-group-${rule.id}-${group.group_id}`}
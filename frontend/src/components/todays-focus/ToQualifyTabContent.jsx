@@ -308,7 +308,7 @@ export function ToQualifyTabContent({ buyerPersonas: externalBuyerPersonas = []
                 {currentContact.first_connected_on_linkedin && (
                   <div className="flex items-center gap-3 text-slate-300">
                     <Calendar className="w-4 h-4 text-slate-500" />
-                    <span className="text-sm">Conectado: {currentContact.first_connected_on_linkedin}</span>
+                    <span className="text-sm">Conectado: {String(currentContact.first_connected_on_linkedin).slice(0, 10)}</span>
                   </div>
                 )}
                 
@@ -70,7 +70,8 @@ export default function AllContacts() {
   const [showDashboard, setShowDashboard] = useState(false);
   const [buyerPersonas, setBuyerPersonas] = useState([]);
   const [sources, setSources] = useState([]);
-  const [pagination, setPagination] = useState({ skip: 0, limit: 50, total: 0 });
+  // cursors: next_cursor returned for each page start (skip), so paging forward is constant time
+  const [pagination, setPagination] = useState({ skip: 0, limit: 50, total: 0, cursors: {} });
   const [tabCounts, setTabCounts] = useState({});
   const [dashboardStats, setDashboardStats] = useState(null);
   
@@ -169,7 +170,9 @@ export default function AllContacts() {
     try {
       const params = new URLSearchParams();
       params.append("limit", pagination.limit);
-      params.append("skip", pagination.skip);
+      const cursor = pagination.cursors[pagination.skip];
+      if (cursor) params.append("cursor", cursor);
+      else params.append("skip", pagination.skip);
       
       if (currentTabConfig.stage !== null) params.append("stage", currentTabConfig.stage);
       if (currentTabConfig.role) params.append("role", currentTabConfig.role);
@@ -182,7 +185,14 @@ export default function AllContacts() {
       
       const response = await api.get(`/contacts?${params.toString()}`);
       setContacts(response.data.contacts || response.data || []);
-      setPagination(prev => ({ ...prev, total: response.data.total || 0 }));
+      setPagination(prev => ({
+        ...prev,
+        total: response.data.total || 0,
+        // Ignore the cursor of a page that is no longer current (tab / filter reset meanwhile)
+        cursors: prev.skip === pagination.skip
+          ? { ...prev.cursors, [prev.skip + prev.limit]: response.data.next_cursor }
+          : prev.cursors
+      }));
     } catch (error) {
       console.error("Error loading contacts:", error);
       toast.error("Error cargando contactos");
@@ -242,7 +252,7 @@ export default function AllContacts() {
   };
 
   const handleSearch = useCallback(() => {
-    setPagination(prev => ({ ...prev, skip: 0 }));
+    setPagination(prev => ({ ...prev, skip: 0, cursors: {} }));
     loadContacts();
     // eslint-disable-next-line react-hooks/exhaustive-deps
   }, [searchQuery, filters]);
@@ -253,7 +263,7 @@ export default function AllContacts() {
 
   const handleTabChange = (newTab) => {
     setActiveTab(newTab);
-    setPagination(prev => ({ ...prev, skip: 0 }));
+    setPagination(prev => ({ ...prev, skip: 0, cursors: {} }));
     setSearchQuery("");
     setFilters({ buyer_persona: "", source: "", companies: [] });
     setCompanySearch("");